@@ -0,0 +1,64 @@
+"""
+迁移脚本：创建检测事件日志（detection_events）并回填近期数据
+
+内容：
+- 创建按天范围分区的 detection_events 表与 detection_events_daily 日汇总表
+- 从 detection_records.objects 回填最近 N 天（默认与保留期一致）的对象事件
+- 执行一次保留策略（汇总并删除超出保留期的分区）
+
+用法：
+    python scripts/migrations/006_create_detection_events.py [days]
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(project_root))
+
+from src.infrastructure.repositories.postgresql_detection_event_log import (  # noqa: E402
+    DetectionEventLog,
+)
+from src.services.database_service import get_db_service  # noqa: E402
+
+
+async def create_detection_events(days: int):
+    """创建检测事件日志并回填最近 days 天的数据"""
+    try:
+        db_service = await get_db_service()
+        if not db_service or not db_service.pool:
+            print("无法获取数据库连接池")
+            return False
+
+        pool = db_service.pool
+
+        async def get_pool():
+            return pool
+
+        event_log = DetectionEventLog(get_pool, retention_days=days)
+        end_time = datetime.utcnow()
+        start_time = (end_time - timedelta(days=days)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        print(f"回填检测事件: {start_time.isoformat()} ~ {end_time.isoformat()}")
+        count = await event_log.backfill(start_time, end_time)
+        print(f"[OK] 已回填 {count} 条检测事件")
+
+        dropped = await event_log.apply_retention()
+        print(f"[OK] 已汇总并删除 {len(dropped)} 个过期分区")
+        return True
+    except Exception as e:
+        print(f"迁移失败: {e}")
+        import traceback
+
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    default_days = int(os.getenv("DETECTION_EVENT_RETENTION_DAYS", "30"))
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else default_days
+    success = asyncio.run(create_detection_events(days))
+    sys.exit(0 if success else 1)
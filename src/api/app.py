@@ -127,8 +127,8 @@ except ImportError:
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 
-# 设置API日志到 logs/api/ 目录
-api_log_dir = Path("logs/api")
+# 设置API日志到 logs/api/ 目录（可通过 API_LOG_DIR 覆盖）
+api_log_dir = Path(os.getenv("API_LOG_DIR", "logs/api"))
 api_log_dir.mkdir(parents=True, exist_ok=True)
 api_log_file = api_log_dir / "api.log"
 
@@ -192,6 +192,15 @@ async def lifespan(app: FastAPI):  # noqa: C901
     except Exception as e:
         logger.warning(f"领域服务单例重置失败: {e}")
 
+    # 初始化进程共享的数据库连接池与Redis客户端
+    try:
+        from src.infrastructure.connection_fabric import startup_connection_fabric
+
+        await startup_connection_fabric()
+        logger.info("共享连接池已初始化")
+    except Exception as e:
+        logger.warning(f"共享连接池初始化失败 (非关键): {e}")
+
     # 初始化数据库服务
     try:
         from src.database.connection import init_database
@@ -300,6 +309,31 @@ async def lifespan(app: FastAPI):  # noqa: C901
     except Exception as e:
         logger.warning(f"高级监控启动失败: {e}")
 
+    # 监控告警转发到实时推送中心
+    try:
+        from src.services.push_hub import attach_monitoring_alerts, get_push_hub
+
+        attach_monitoring_alerts(get_push_hub())
+    except Exception as e:
+        logger.warning(f"告警推送注册失败: {e}")
+
+    # 启动训练任务调度（接管仍在运行的训练子进程，恢复中断的任务）
+    try:
+        from src.application.training_jobs import get_training_job_runner
+
+        get_training_job_runner().start()
+        logger.info("训练任务调度已启动")
+    except Exception as e:
+        logger.warning(f"训练任务调度启动失败: {e}")
+
+    # 启动难例审核队列清理（过期的已审核记录与长期未审核样本）
+    try:
+        from src.infrastructure.storage.review_queue import start_review_queue_janitor
+
+        start_review_queue_janitor()
+    except Exception as e:
+        logger.warning(f"审核队列清理任务启动失败: {e}")
+
     # 启动Redis监听器
     try:
         await start_redis_listener()
@@ -376,6 +410,9 @@ async def lifespan(app: FastAPI):  # noqa: C901
 
         from src.workflow.workflow_engine import workflow_engine
 
+        # 停止调度循环（下一次触发时间已持久化，重启后继续调度）
+        await workflow_engine.stop_schedules()
+
         # 获取所有正在运行的工作流ID
         running_workflow_ids = list(workflow_engine.running_workflows.keys())
         # 获取所有有取消事件的工作流ID（可能不在运行列表中，但训练任务还在运行）
@@ -486,6 +523,48 @@ async def lifespan(app: FastAPI):  # noqa: C901
     except Exception as e:
         logger.warning(f"Redis监听器关闭失败: {e}")
 
+    # 关闭实时推送中心
+    try:
+        from src.services.push_hub import shutdown_push_hub
+
+        await shutdown_push_hub()
+    except Exception as e:
+        logger.warning(f"实时推送中心关闭失败: {e}")
+
+    # 停止训练任务调度（训练子进程继续运行，下次启动时接管）
+    try:
+        from src.application.training_jobs import shutdown_training_job_runner
+
+        await shutdown_training_job_runner()
+    except Exception as e:
+        logger.warning(f"训练任务调度关闭失败: {e}")
+
+    # 停止审核队列清理
+    try:
+        from src.infrastructure.storage.review_queue import (
+            shutdown_review_queue_janitor,
+        )
+
+        await shutdown_review_queue_janitor()
+    except Exception as e:
+        logger.warning(f"审核队列清理任务关闭失败: {e}")
+
+    # 关闭数据集入库线程池
+    try:
+        from src.application.dataset_ingestion import shutdown_dataset_ingestion_service
+
+        await shutdown_dataset_ingestion_service()
+    except Exception as e:
+        logger.warning(f"数据集入库服务关闭失败: {e}")
+
+    # 关闭推理服务（拒绝排队中的请求）
+    try:
+        from src.services.inference_service import shutdown_inference_service
+
+        await shutdown_inference_service()
+    except Exception as e:
+        logger.warning(f"推理服务关闭失败: {e}")
+
     # 关闭视频流管理器
     try:
         from src.services.video_stream_manager import shutdown_stream_manager
@@ -506,6 +585,17 @@ async def lifespan(app: FastAPI):  # noqa: C901
     except Exception as e:
         logger.warning(f"数据库服务关闭失败: {e}")
 
+    # 关闭共享连接池（先执行各仓储注册的关闭回调）
+    try:
+        from src.infrastructure.connection_fabric import shutdown_connection_fabric
+
+        await shutdown_connection_fabric()
+        logger.info("共享连接池已关闭")
+    except (asyncio.CancelledError, KeyboardInterrupt):
+        logger.info("共享连接池关闭过程中收到取消信号")
+    except Exception as e:
+        logger.warning(f"共享连接池关闭失败: {e}")
+
     # 停止错误监控
     try:
         stop_error_monitoring()
@@ -569,7 +659,11 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
                 or error_response["error"]["request_id"] is None
             ):
                 error_response["error"]["request_id"] = request_id
-        return JSONResponse(status_code=exc.status_code, content=error_response)
+        return JSONResponse(
+            status_code=exc.status_code,
+            content=error_response,
+            headers=getattr(exc, "headers", None),
+        )
     else:
         # 旧格式（字符串），转换为统一格式
         error_response = create_error_response(
@@ -577,7 +671,11 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
             message=str(exc.detail) if exc.detail else "HTTP错误",
             request_id=request_id,
         )
-        return JSONResponse(status_code=exc.status_code, content=error_response)
+        return JSONResponse(
+            status_code=exc.status_code,
+            content=error_response,
+            headers=getattr(exc, "headers", None),
+        )
 
 
 @app.exception_handler(404)
@@ -8,6 +8,7 @@ from fastapi import APIRouter, HTTPException, Path, Query
 from pydantic import BaseModel
 
 from ...services.database_service import get_db_service
+from ...utils.pagination import CursorError
 from ..schemas.error_schemas import ErrorCode
 from ..utils.error_helpers import raise_http_exception
 
@@ -89,8 +90,15 @@ async def get_alert_history_db(
         None, description="排序字段: timestamp, camera_id, alert_type, id"
     ),
     sort_order: str = Query("desc", description="排序方向: asc 或 desc"),
+    cursor: Optional[str] = Query(
+        None, description="上一页返回的 next_cursor（提供时忽略offset/page）"
+    ),
+    approximate_total: bool = Query(False, description="使用估算总数代替 COUNT(*)"),
 ):
-    """从 alert_history 表查询告警历史（支持分页和排序）."""
+    """从 alert_history 表查询告警历史（支持分页和排序）.
+
+    深分页请使用 cursor：按 (排序字段, id) seek，耗时与翻页深度无关。
+    """
     try:
         get_service = _ensure_alert_service()
         alert_service = await get_service()
@@ -113,10 +121,19 @@ async def get_alert_history_db(
             alert_type=alert_type,
             sort_by=sort_by,
             sort_order=sort_order,
+            cursor=cursor,
+            approximate_total=approximate_total,
         )
         return result
     except HTTPException:
         raise
+    except CursorError as e:
+        raise raise_http_exception(
+            status_code=400,
+            message="分页游标无效，请从第一页重新查询",
+            error_code=ErrorCode.INVALID_PARAMETER,
+            details=str(e),
+        )
     except Exception as e:
         logger.error(f"查询告警历史失败: {e}", exc_info=True)
         raise raise_http_exception(
@@ -83,6 +83,7 @@ async def get_cache_stats_endpoint(pattern: str = "stats:*") -> Dict[str, Any]:
         - pattern: 使用的模式
         - memory_used_mb: Redis使用的内存（MB）
         - memory_peak_mb: Redis内存峰值（MB）
+        - local: 本进程缓存计数器（l1_hits/redis_hits/misses/stale/coalesced等）
 
     Raises:
         HTTPException: 如果获取统计失败
@@ -94,7 +95,8 @@ async def get_cache_stats_endpoint(pattern: str = "stats:*") -> Dict[str, Any]:
             "total_keys": 10,
             "pattern": "stats:*",
             "memory_used_mb": 5.2,
-            "memory_peak_mb": 8.3
+            "memory_peak_mb": 8.3,
+            "local": {"l1_hits": 120, "misses": 3, "l1_hit_ratio": 0.97, ...}
           }
     """
     try:
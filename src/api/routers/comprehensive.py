@@ -1,11 +1,15 @@
 import logging
 from typing import Any, Dict, Optional
 
-from fastapi import APIRouter, Depends, File, Query, UploadFile
+from fastapi import APIRouter, Depends, File, Query, Request, UploadFile
 
 from src.api.dependencies import get_detection_app_service, get_optimized_pipeline
 from src.application.detection_application_service import DetectionApplicationService
 from src.core.optimized_detection_pipeline import OptimizedDetectionPipeline
+from src.services.inference_service import (
+    InferenceDeadlineExceeded,
+    InferenceOverloaded,
+)
 
 from ..schemas.error_schemas import ErrorCode
 from ..utils.error_helpers import raise_http_exception
@@ -14,8 +18,30 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+def _client_id(request: Request) -> Optional[str]:
+    """推理队列公平调度使用的请求方标识（客户端地址）。"""
+    return request.client.host if request.client else None
+
+
+def _inference_unavailable(e: Exception):
+    """推理服务过载返回429，超过截止时间返回503，均附带 Retry-After。"""
+    overloaded = isinstance(e, InferenceOverloaded)
+    logger.warning(f"检测请求未执行: {e}")
+    return raise_http_exception(
+        status_code=429 if overloaded else 503,
+        message=str(e),
+        error_code=(
+            ErrorCode.RATE_LIMIT_EXCEEDED
+            if overloaded
+            else ErrorCode.SERVICE_UNAVAILABLE
+        ),
+        headers={"Retry-After": str(int(getattr(e, "retry_after", 1.0) + 0.999))},
+    )
+
+
 @router.post("/comprehensive", summary="综合检测接口（图片）")
 async def detect_comprehensive(
+    request: Request,
     file: UploadFile = File(...),
     camera_id: str = Query("api_upload", description="摄像头ID"),
     save_to_db: bool = Query(True, description="是否保存到数据库"),
@@ -66,7 +92,10 @@ async def detect_comprehensive(
 
         # 使用应用服务处理（完整流程）
         result = await app_service.process_image_detection(
-            camera_id=camera_id, image_bytes=contents, save_to_db=save_to_db
+            camera_id=camera_id,
+            image_bytes=contents,
+            save_to_db=save_to_db,
+            client_id=_client_id(request),
         )
 
         logger.info(
@@ -78,6 +107,8 @@ async def detect_comprehensive(
 
         return result
 
+    except (InferenceOverloaded, InferenceDeadlineExceeded) as e:
+        raise _inference_unavailable(e)
     except Exception as e:
         logger.exception(f"综合检测失败: {e}")
         raise raise_http_exception(
@@ -90,6 +121,7 @@ async def detect_comprehensive(
 
 @router.post("/image", summary="单张图像检测")
 async def detect_image(
+    request: Request,
     file: UploadFile = File(...),
     camera_id: str = Query("api_upload", description="摄像头ID"),
     save_to_db: bool = Query(True, description="是否保存到数据库"),
@@ -135,7 +167,10 @@ async def detect_image(
 
         # 使用应用服务处理
         result = await app_service.process_image_detection(
-            camera_id=camera_id, image_bytes=contents, save_to_db=save_to_db
+            camera_id=camera_id,
+            image_bytes=contents,
+            save_to_db=save_to_db,
+            client_id=_client_id(request),
         )
 
         logger.info(
@@ -145,6 +180,8 @@ async def detect_image(
 
         return result
 
+    except (InferenceOverloaded, InferenceDeadlineExceeded) as e:
+        raise _inference_unavailable(e)
     except Exception as e:
         logger.exception(f"图像检测失败: {e}")
         raise raise_http_exception(
@@ -157,6 +194,7 @@ async def detect_image(
 
 @router.post("/hairnet", summary="发网检测接口")
 async def detect_hairnet(
+    request: Request,
     file: UploadFile = File(...),
     camera_id: str = Query("api_upload", description="摄像头ID"),
     save_to_db: bool = Query(True, description="是否保存到数据库"),
@@ -202,7 +240,10 @@ async def detect_hairnet(
 
         # 使用应用服务处理
         full_result = await app_service.process_image_detection(
-            camera_id=camera_id, image_bytes=contents, save_to_db=save_to_db
+            camera_id=camera_id,
+            image_bytes=contents,
+            save_to_db=save_to_db,
+            client_id=_client_id(request),
         )
 
         # 提取发网检测结果
@@ -230,6 +271,8 @@ async def detect_hairnet(
 
         return result
 
+    except (InferenceOverloaded, InferenceDeadlineExceeded) as e:
+        raise _inference_unavailable(e)
     except Exception as e:
         logger.exception(f"发网检测失败: {e}")
         raise raise_http_exception(
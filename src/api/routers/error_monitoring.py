@@ -400,6 +400,7 @@ async def get_monitoring_status():
             "alert_channels_count": len(error_monitor.alert_channels),
             "active_alerts_count": len(error_monitor.get_active_alerts()),
             "error_tracker_stats": error_monitor.error_handler.error_tracker.get_error_stats(),
+            "rule_stats": error_monitor.engine.get_stats(),
         }
 
     except Exception as e:
@@ -411,6 +412,36 @@ async def get_monitoring_status():
         )
 
 
+@router.post("/rules/reload", summary="从告警规则库重新加载错误监控规则")
+async def reload_alert_rules():
+    """从告警规则库加载 rule_type 为 error_monitor 的规则"""
+    try:
+        from ...infrastructure.repositories.postgresql_alert_rule_repository import (
+            PostgreSQLAlertRuleRepository,
+        )
+        from ...services.database_service import get_db_service
+
+        db = await get_db_service()
+        error_monitor = get_error_monitor()
+        loaded = await error_monitor.load_rules_from_store(
+            PostgreSQLAlertRuleRepository(db.pool)
+        )
+
+        return {
+            "message": "告警规则已重新加载",
+            "loaded": loaded,
+            "alert_rules_count": len(error_monitor.alert_rules),
+        }
+
+    except Exception as e:
+        logger.error(f"重新加载告警规则失败: {e}")
+        raise raise_http_exception(
+            status_code=500,
+            message="重新加载告警规则失败",
+            error_code=ErrorCode.INTERNAL_SERVER_ERROR,
+        )
+
+
 # 错误分类和严重程度枚举端点
 @router.get("/errors/categories", summary="获取错误分类列表")
 async def get_error_categories():
@@ -10,13 +10,25 @@ import logging
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 
+from src.infrastructure.connection_fabric import set_db_subsystem
+
 from ..schemas.error_schemas import ErrorCode
 from ..utils.error_helpers import raise_http_exception
 
-router = APIRouter(prefix="/api/v1/export", tags=["Export"])
+
+async def _use_export_connection_quota() -> None:
+    """导出请求使用 export 子系统的连接配额（流式响应任务继承该上下文）."""
+    set_db_subsystem("export")
+
+
+router = APIRouter(
+    prefix="/api/v1/export",
+    tags=["Export"],
+    dependencies=[Depends(_use_export_connection_quota)],
+)
 logger = logging.getLogger(__name__)
 
 # 领域服务依赖
@@ -6,6 +6,10 @@ from typing import Dict
 
 from fastapi import APIRouter
 from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+from src.infrastructure.connection_fabric import get_shared_redis
+from src.monitoring.metrics_core import collect_snapshots, render_prometheus
 
 router = APIRouter()
 
@@ -53,9 +57,9 @@ def _read_event_counts(max_lines: int = 5000) -> Dict[str, int]:
 
 
 @router.get("/metrics", response_class=PlainTextResponse)
-def metrics():
-    """Prometheus 文本格式指标。"""
-    counts = _read_event_counts()
+async def metrics():
+    """Prometheus 文本格式指标（事件计数 + 各进程合并后的延迟/耗时分位数）。"""
+    counts = await run_in_threadpool(_read_event_counts)
     total = sum(counts.values())
     lines = []
     lines.append("# HELP hbd_events_total Total number of events recorded")
@@ -72,4 +76,5 @@ def metrics():
     for et, c in by_type.items():
         lines.append(f'hbd_events_total{{type="{et}"}} {c}')
     lines.append(f"hbd_events_total {total}")
-    return "\n".join(lines) + "\n"
+    snapshots = await collect_snapshots(get_shared_redis())
+    return "\n".join(lines) + "\n" + render_prometheus(snapshots)
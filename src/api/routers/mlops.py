@@ -6,16 +6,25 @@ MLOps API路由
 import asyncio
 import json
 import logging
-import os
 import shutil
-import tarfile
-import zipfile
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import partial
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+)
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -23,15 +32,43 @@ from src.application.dataset_generation_service import (
     DatasetGenerationRequest,
     DatasetGenerationService,
 )
+from src.application.dataset_ingestion import (
+    IngestionError,
+    UploadOffsetMismatch,
+    archive_format,
+    get_dataset_ingestion_service,
+    get_upload_session_store,
+    spool_upload,
+)
 from src.application.dataset_validation_service import DatasetValidationService
+from src.application.hard_example_mining import (
+    get_hard_example_miner,
+    review_item_to_entry,
+)
 from src.application.model_registry_service import (
     ModelRegistrationInfo,
     ModelRegistryService,
 )
+from src.application.training_jobs import get_training_job_runner
 from src.container.service_container import get_service
-from src.database.connection import get_async_session
+from src.database.connection import AsyncSessionLocal, get_async_session
 from src.database.dao import DatasetDAO, DeploymentDAO, WorkflowDAO, WorkflowRunDAO
 from src.domain.interfaces.deployment_interface import IDeploymentService
+from src.infrastructure.storage.dataset_archive import (
+    ARCHIVE_FORMATS,
+    ArchiveSourceChanged,
+    RangeNotSatisfiable,
+    StreamingArchive,
+    build_archive,
+    parse_range,
+)
+from src.infrastructure.storage.dataset_manifest import get_dataset_catalog
+from src.infrastructure.storage.review_queue import (
+    REVIEW_STATUSES,
+    ReviewItemNotFound,
+    ReviewStateError,
+    get_review_queue,
+)
 
 try:
     from src.deployment.docker_manager import DockerManager
@@ -40,6 +77,7 @@ except ModuleNotFoundError:  # pragma: no cover - optional dependency
 except ImportError:
     DockerManager = None
 
+from src.utils.pagination import CursorError, KeysetCursor, next_cursor_for
 from src.workflow.workflow_engine import workflow_engine
 
 from ..schemas.error_schemas import ErrorCode
@@ -175,6 +213,18 @@ class DatasetGenerateRequestModel(BaseModel):
     max_records: int = 2000
 
 
+class ReviewDecisionModel(BaseModel):
+    decision: str  # approved / rejected
+    label: Optional[str] = None  # 人工确认的违规类型，无违规时为空
+    has_violation: Optional[bool] = None
+    reviewer: Optional[str] = None
+
+
+class ReviewExportRequestModel(BaseModel):
+    dataset_name: str
+    max_items: Optional[int] = None
+
+
 class ModelInfo(BaseModel):
     id: str
     name: str
@@ -212,20 +262,68 @@ class ModelStatusUpdate(BaseModel):
     status: str
 
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _decode_listing_cursor(cursor: Optional[str]):
+    """解析列表游标为 (created_at, id)，created_at 转为naive UTC以匹配数据库列."""
+    if not cursor:
+        return None
+    try:
+        keyset = KeysetCursor.decode(cursor, "created_at", True)
+    except CursorError as e:
+        raise raise_http_exception(
+            status_code=400,
+            message="分页游标无效，请从第一页重新查询",
+            error_code=ErrorCode.INVALID_PARAMETER,
+            details=str(e),
+        )
+    created_at = keyset.sort_value
+    if isinstance(created_at, datetime) and created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return created_at, keyset.row_id
+
+
+def _listing_key(item: Dict[str, Any]):
+    created_at = item.get("created_at")
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    return created_at, item["id"]
+
+
+def _set_listing_cursor(
+    response: Response, items: List[Dict[str, Any]], limit: int
+) -> List[Dict[str, Any]]:
+    """按 limit + 1 行的查询结果截取本页，还有下一页时在响应头中返回游标（响应体保持列表格式）."""
+    page = items[: max(limit, 0)]
+    if page and page[-1].get("created_at"):
+        next_cursor = next_cursor_for(items, limit, _listing_key, "created_at", True)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return page
+
+
 # 数据集管理API
 @router.get("/datasets", response_model=List[DatasetInfo])
 async def get_datasets(
+    response: Response,
     status: Optional[str] = Query(None, description="数据集状态筛选"),
     limit: int = Query(100, description="返回数量限制"),
     offset: int = Query(0, description="偏移量"),
+    cursor: Optional[str] = Query(
+        None, description="上一页响应头 X-Next-Cursor 的值（提供时忽略offset）"
+    ),
     session: AsyncSession = Depends(get_async_session),
 ):
     """获取数据集列表"""
+    after = _decode_listing_cursor(cursor)
     try:
+        # 多取一行用于判断是否还有下一页
         datasets = await DatasetDAO.get_all(
-            session, status=status, limit=limit, offset=offset
+            session, status=status, limit=limit + 1, offset=offset, after=after
         )
-        return [dataset.to_dict() for dataset in datasets]
+        items = [dataset.to_dict() for dataset in datasets]
+        return _set_listing_cursor(response, items, limit)
     except Exception as e:
         logger.error(f"获取数据集列表失败: {e}")
         raise raise_http_exception(
@@ -244,14 +342,15 @@ async def upload_dataset(
     validate_files: bool = Form(True, description="是否验证文件完整性"),
     session: AsyncSession = Depends(get_async_session),
 ):
-    """上传数据集（带文件完整性校验）"""
+    """上传数据集（分块落盘、压缩包安全检查、后台线程池解压）"""
     dataset_id = f"dataset_{int(datetime.utcnow().timestamp())}"
     base_dir = Path("data/datasets")
     dataset_dir = base_dir / dataset_id
     dataset_dir.mkdir(parents=True, exist_ok=True)
+    ingestion = get_dataset_ingestion_service()
 
     try:
-        # 1. 文件校验阶段
+        # 1. 文件校验阶段（压缩包只读取中央目录/头部）
         if validate_files:
             logger.info(f"开始验证 {len(files)} 个文件...")
             all_valid, errors = await DatasetValidationService.validate_files(
@@ -270,55 +369,52 @@ async def upload_dataset(
                 )
             logger.info("所有文件校验通过")
 
-        # 2. 文件上传阶段
+        # 2. 文件分块写入磁盘（同时计算 SHA-256）
         uploaded_files = []
+        checksums: Dict[str, str] = {}
         total_size = 0
         archive_files = []  # 记录压缩文件，用于后续解压和结构验证
 
         for file in files:
-            file_path = dataset_dir / file.filename
-            with file_path.open("wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
-                total_size += len(content)
-                uploaded_files.append(file.filename)
-
-            # 记录压缩文件
-            filename_lower = file.filename.lower() if file.filename else ""
-            if filename_lower.endswith((".zip", ".tar", ".tar.gz", ".tgz")):
-                archive_files.append(file_path)
-
-        # 3. 如果是压缩文件，解压并验证结构
+            filename = Path((file.filename or "").replace("\\", "/")).name
+            if not filename:
+                continue
+            spooled = await spool_upload(
+                file,
+                dataset_dir / filename,
+                max_bytes=ingestion.limits.max_upload_bytes,
+            )
+            total_size += spooled.size
+            uploaded_files.append(filename)
+            checksums[filename] = spooled.sha256
+            if archive_format(filename):
+                archive_files.append(spooled.path)
+
+        # 3. 如果是压缩文件，在线程池中解压并验证结构
+        ingestion_job = None
         if archive_files and validate_files:
-            for archive_path in archive_files:
-                try:
-                    logger.info(f"解压文件: {archive_path.name}")
-                    if archive_path.suffix.lower() == ".zip":
-                        with zipfile.ZipFile(archive_path, "r") as zip_file:
-                            zip_file.extractall(
-                                dataset_dir
-                            )  # nosec B202 - path from upload, dataset_dir controlled
-                    elif archive_path.suffix.lower() in (".tar", ".gz", ".tgz"):
-                        mode = "r:gz" if archive_path.suffix.endswith("gz") else "r"
-                        with tarfile.open(archive_path, mode) as tar_file:
-                            tar_file.extractall(
-                                dataset_dir
-                            )  # nosec B202 - path from upload, dataset_dir controlled
-
-                    # 验证数据集结构（如果是 YOLO 格式）
-                    (
-                        is_valid,
-                        error_msg,
-                    ) = await DatasetValidationService.validate_dataset_structure(
-                        dataset_dir, require_yolo_format=False
-                    )
-                    if not is_valid:
-                        logger.warning(f"数据集结构验证警告: {error_msg}")
-                        # 不阻止上传，只记录警告
-
-                except Exception as e:
-                    logger.warning(f"解压或验证文件 {archive_path.name} 时出错: {e}")
+            ingestion_job = await ingestion.ingest(
+                dataset_id, archive_files, dataset_dir
+            )
+            if ingestion_job.get("rejected"):
+                await asyncio.to_thread(shutil.rmtree, dataset_dir, True)
+                raise raise_http_exception(
+                    status_code=400,
+                    message=f"压缩包未通过安全检查: {ingestion_job['error']}",
+                    error_code=ErrorCode.VALIDATION_ERROR,
+                )
+            if ingestion_job["status"] == "succeeded":
+                # 验证数据集结构（如果是 YOLO 格式）
+                (
+                    is_valid,
+                    error_msg,
+                ) = await DatasetValidationService.validate_dataset_structure(
+                    dataset_dir, require_yolo_format=False
+                )
+                if not is_valid:
+                    logger.warning(f"数据集结构验证警告: {error_msg}")
                     # 不阻止上传，只记录警告
+            # 解压失败（如条目 CRC 错误）不阻止上传，只记录警告
 
         # 保存数据集元数据到数据库
         dataset_data = {
@@ -333,6 +429,7 @@ async def upload_dataset(
         }
 
         dataset = await DatasetDAO.create(session, dataset_data)
+        await _build_dataset_manifest(dataset.id, dataset_dir)
         logger.info(
             f"数据集上传成功: {dataset_name}, 文件数: {len(uploaded_files)}, 总大小: {total_size}"
         )
@@ -343,7 +440,18 @@ async def upload_dataset(
             "dataset_name": dataset_name,
             "uploaded_files": uploaded_files,
             "total_size": total_size,
+            "checksums": checksums,
+            "ingestion": ingestion_job,
         }
+    except HTTPException:
+        raise
+    except IngestionError as e:
+        await asyncio.to_thread(shutil.rmtree, dataset_dir, True)
+        raise raise_http_exception(
+            status_code=400,
+            message=str(e),
+            error_code=ErrorCode.VALIDATION_ERROR,
+        )
     except Exception as e:
         logger.error(f"数据集上传失败: {e}")
         raise raise_http_exception(
@@ -353,6 +461,176 @@ async def upload_dataset(
         )
 
 
+class UploadSessionCreateRequest(BaseModel):
+    filename: str
+    total_size: int
+    sha256: Optional[str] = None
+
+
+class UploadSessionCompleteRequest(BaseModel):
+    dataset_name: str
+    dataset_type: str = "detection"
+    description: str = ""
+
+
+def _upload_session_not_found():
+    return raise_http_exception(
+        status_code=404,
+        message="上传会话不存在或已过期",
+        error_code=ErrorCode.RESOURCE_NOT_FOUND,
+    )
+
+
+def _get_upload_session(upload_id: str) -> Dict[str, Any]:
+    upload = get_upload_session_store().get(upload_id)
+    if upload is None:
+        raise _upload_session_not_found()
+    return upload
+
+
+def _upload_offset_conflict(e: UploadOffsetMismatch):
+    return raise_http_exception(
+        status_code=409,
+        message=str(e),
+        error_code=ErrorCode.RESOURCE_CONFLICT,
+        details=f"offset={e.expected}",
+        headers={"Upload-Offset": str(e.expected)},
+    )
+
+
+@router.post("/datasets/uploads", summary="创建可续传上传会话")
+async def create_upload_session(payload: UploadSessionCreateRequest):
+    try:
+        return await asyncio.to_thread(
+            get_upload_session_store().create,
+            payload.filename,
+            payload.total_size,
+            payload.sha256,
+        )
+    except IngestionError as e:
+        raise raise_http_exception(
+            status_code=400, message=str(e), error_code=ErrorCode.VALIDATION_ERROR
+        )
+
+
+@router.get("/datasets/uploads/{upload_id}", summary="查询上传会话（续传偏移量）")
+async def get_upload_session(upload_id: str, response: Response):
+    upload = _get_upload_session(upload_id)
+    response.headers["Upload-Offset"] = str(upload["offset"])
+    return upload
+
+
+@router.patch("/datasets/uploads/{upload_id}", summary="从指定偏移量追加上传数据")
+async def append_upload_session(
+    upload_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+):
+    """请求体为原始字节流；连接中断时已接收部分保留，客户端查询偏移量后续传。"""
+    try:
+        offset = await get_upload_session_store().append(
+            upload_id, upload_offset, request.stream()
+        )
+    except KeyError:
+        raise _upload_session_not_found()
+    except UploadOffsetMismatch as e:
+        raise _upload_offset_conflict(e)
+    except IngestionError as e:
+        raise raise_http_exception(
+            status_code=400, message=str(e), error_code=ErrorCode.VALIDATION_ERROR
+        )
+    response.headers["Upload-Offset"] = str(offset)
+    return {"upload_id": upload_id, "offset": offset}
+
+
+async def _on_ingestion_complete(dataset_dir: Path, job: Dict[str, Any]) -> None:
+    dataset_id = job["dataset_id"]
+    succeeded = job["status"] == "succeeded"
+    if job.get("rejected"):
+        await asyncio.to_thread(shutil.rmtree, dataset_dir, True)
+    async with AsyncSessionLocal() as session:
+        await DatasetDAO.update(
+            session, dataset_id, {"status": "active" if succeeded else "failed"}
+        )
+    if succeeded:
+        await _build_dataset_manifest(dataset_id, dataset_dir)
+
+
+@router.post("/datasets/uploads/{upload_id}/complete", summary="完成上传并入库")
+async def complete_upload_session(
+    upload_id: str,
+    payload: UploadSessionCompleteRequest,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """校验大小与 SHA-256 后入库；压缩包在后台解压，通过入库任务查询进度。"""
+    upload = _get_upload_session(upload_id)
+    dataset_id = f"dataset_{int(datetime.utcnow().timestamp())}"
+    dataset_dir = Path("data/datasets") / dataset_id
+    try:
+        spooled = await get_upload_session_store().finalize(
+            upload_id, dataset_dir / upload["filename"]
+        )
+    except KeyError:
+        raise _upload_session_not_found()
+    except UploadOffsetMismatch as e:
+        raise _upload_offset_conflict(e)
+    except IngestionError as e:
+        raise raise_http_exception(
+            status_code=400, message=str(e), error_code=ErrorCode.VALIDATION_ERROR
+        )
+
+    is_archive = archive_format(spooled.path.name) is not None
+    dataset = await DatasetDAO.create(
+        session,
+        {
+            "id": dataset_id,
+            "name": payload.dataset_name,
+            "version": "1.0.0",
+            "status": "processing" if is_archive else "active",
+            "size": spooled.size,
+            "description": payload.description,
+            "file_path": str(dataset_dir),
+            "tags": [payload.dataset_type],
+        },
+    )
+    result: Dict[str, Any] = {
+        "dataset_id": dataset.id,
+        "dataset_name": payload.dataset_name,
+        "size": spooled.size,
+        "sha256": spooled.sha256,
+        "status": dataset.status,
+    }
+    if is_archive:
+        job = get_dataset_ingestion_service().start(
+            dataset_id,
+            [spooled.path],
+            dataset_dir,
+            on_complete=partial(_on_ingestion_complete, dataset_dir),
+        )
+        result["ingestion_job_id"] = job["job_id"]
+    else:
+        await _build_dataset_manifest(dataset_id, dataset_dir)
+    return result
+
+
+@router.get("/datasets/ingestions", summary="获取数据集入库任务列表")
+async def list_dataset_ingestions() -> List[Dict[str, Any]]:
+    return get_dataset_ingestion_service().list_jobs()
+
+
+@router.get("/datasets/ingestions/{job_id}", summary="获取数据集入库任务进度")
+async def get_dataset_ingestion(job_id: str) -> Dict[str, Any]:
+    job = get_dataset_ingestion_service().get_job(job_id)
+    if job is None:
+        raise raise_http_exception(
+            status_code=404,
+            message="入库任务不存在",
+            error_code=ErrorCode.RESOURCE_NOT_FOUND,
+        )
+    return job
+
+
 @router.get("/datasets/{dataset_id}")
 async def get_dataset(
     dataset_id: str, session: AsyncSession = Depends(get_async_session)
@@ -403,6 +681,7 @@ async def delete_dataset(
                 logger.warning(f"删除数据集文件失败: {file_error}")
 
         await DatasetDAO.delete(session, dataset_id)
+        await asyncio.to_thread(get_dataset_catalog().remove, dataset_id)
         logger.info(f"数据集删除成功: {dataset_id}")
         return {"message": "数据集删除成功"}
     except Exception as e:
@@ -414,73 +693,106 @@ async def delete_dataset(
         )
 
 
+async def _build_dataset_manifest(dataset_id: str, dataset_dir: Path) -> None:
+    """入库时构建数据集清单；失败不影响入库，首次访问时会重建。"""
+    try:
+        await asyncio.to_thread(get_dataset_catalog().build, dataset_id, dataset_dir)
+    except Exception as e:
+        logger.warning(f"构建数据集清单失败: {dataset_id}, {e}")
+
+
+async def _get_dataset_root(session: AsyncSession, dataset_id: str) -> Path:
+    dataset = await DatasetDAO.get_by_id(session, dataset_id)
+    if not dataset:
+        raise raise_http_exception(
+            status_code=404,
+            message="数据集不存在",
+            error_code=ErrorCode.RESOURCE_NOT_FOUND,
+        )
+    dataset_path = Path(dataset.file_path) if dataset.file_path else None
+    if not dataset_path or not dataset_path.exists():
+        raise raise_http_exception(
+            status_code=404,
+            message="数据集文件不存在",
+            error_code=ErrorCode.RESOURCE_NOT_FOUND,
+        )
+    return dataset_path
+
+
+def _stream_archive(dataset_id: str, archive: StreamingArchive, start: int, end: int):
+    try:
+        yield from archive.iter_bytes(start, end)
+    except ArchiveSourceChanged as e:
+        # 已发送的字节无法撤回：中断连接，客户端带 If-Range 续传时会拿到新版本
+        logger.warning(f"数据集下载中断，文件已变化: {dataset_id}, {e}")
+        get_dataset_catalog().invalidate(dataset_id)
+        raise
+
+
+def _archive_response(
+    request: Request, dataset_id: str, archive: StreamingArchive, etag: str
+) -> Response:
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Content-Disposition": f'attachment; filename="{dataset_id}{archive.suffix}"',
+    }
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if not if_range or if_range == etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), archive.size)
+        except RangeNotSatisfiable:
+            headers["Content-Range"] = f"bytes */{archive.size}"
+            return Response(status_code=416, headers=headers)
+    start, end = byte_range or (0, archive.size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{archive.size}"
+    return StreamingResponse(
+        _stream_archive(dataset_id, archive, start, end),
+        status_code=206 if byte_range else 200,
+        media_type=archive.media_type,
+        headers=headers,
+    )
+
+
 @router.get("/datasets/{dataset_id}/download")
 async def download_dataset(
     dataset_id: str,
+    request: Request,
     format: str = Query("zip", description="下载格式: zip, tar, individual"),
     session: AsyncSession = Depends(get_async_session),
 ):
-    """下载数据集"""
+    """下载数据集（zip/tar 按清单流式生成，支持 Range 续传）"""
     try:
-        dataset = await DatasetDAO.get_by_id(session, dataset_id)
-        if not dataset:
-            raise raise_http_exception(
-                status_code=404,
-                message="数据集不存在",
-                error_code=ErrorCode.NOT_FOUND,
-            )
-        dataset_path = Path(dataset.file_path) if dataset.file_path else None
-        if not dataset_path or not dataset_path.exists():
+        dataset_path = await _get_dataset_root(session, dataset_id)
+        if format != "individual" and format not in ARCHIVE_FORMATS:
             raise raise_http_exception(
-                status_code=404,
-                message="数据集文件不存在",
-                error_code=ErrorCode.NOT_FOUND,
-            )
-
-        if format == "zip":
-            # 创建ZIP文件
-            temp_dir = Path("data/temp")
-            temp_dir.mkdir(parents=True, exist_ok=True)
-            zip_path = temp_dir / f"{dataset_id}.zip"
-
-            with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-                for root, dirs, files in os.walk(dataset_path):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, dataset_path)
-                        zipf.write(file_path, arcname)
-
-            return FileResponse(
-                path=zip_path,
-                filename=f"{dataset_id}.zip",
-                media_type="application/zip",
+                status_code=400,
+                message="不支持的下载格式",
+                error_code=ErrorCode.VALIDATION_ERROR,
             )
+        manifest = await asyncio.to_thread(
+            get_dataset_catalog().get, dataset_id, dataset_path
+        )
 
-        elif format == "individual":
+        if format == "individual":
             # 返回文件列表，让前端逐个下载
-            files = []
-            for root, dirs, filenames in os.walk(dataset_path):
-                for filename in filenames:
-                    file_path = os.path.join(root, filename)
-                    relative_path = os.path.relpath(file_path, dataset_path)
-                    files.append(
-                        {
-                            "name": filename,
-                            "path": relative_path,
-                            "size": os.path.getsize(file_path),
-                            "download_url": f"/api/v1/mlops/datasets/{dataset_id}/files/{relative_path}",
-                        }
-                    )
-
+            files = await asyncio.to_thread(manifest.list_files)
+            for item in files:
+                item[
+                    "download_url"
+                ] = f"/api/v1/mlops/datasets/{dataset_id}/files/{item['path']}"
             return {"files": files}
 
-        else:
-            raise raise_http_exception(
-                status_code=400,
-                message="不支持的下载格式",
-                error_code=ErrorCode.VALIDATION_ERROR,
-            )
+        version, entries = await asyncio.to_thread(manifest.archive_snapshot)
+        archive = await asyncio.to_thread(build_archive, format, entries)
+        etag = f'"{dataset_id}-v{version}-{format}"'
+        return _archive_response(request, dataset_id, archive, etag)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"数据集下载失败: {e}")
         raise raise_http_exception(
@@ -538,99 +850,35 @@ async def download_dataset_file(
 async def get_dataset_samples(
     dataset_id: str,
     file_type: Optional[str] = Query("image", description="文件类型筛选: image, all"),
+    violation_type: Optional[str] = Query(None, description="违规类型筛选"),
+    has_violation: Optional[bool] = Query(None, description="是否违规筛选"),
+    camera_id: Optional[str] = Query(None, description="摄像头筛选"),
     limit: int = Query(20, description="返回数量限制"),
     offset: int = Query(0, description="偏移量"),
     session: AsyncSession = Depends(get_async_session),
 ):
-    """获取数据集中的样本文件列表（用于预览）"""
+    """获取数据集中的样本文件列表（用于预览，基于数据集清单索引）"""
     try:
-        import csv
-
-        dataset = await DatasetDAO.get_by_id(session, dataset_id)
-        if not dataset:
-            raise raise_http_exception(
-                status_code=404,
-                message="数据集不存在",
-                error_code=ErrorCode.NOT_FOUND,
-            )
-
-        dataset_path = Path(dataset.file_path) if dataset.file_path else None
-        if not dataset_path or not dataset_path.exists():
-            raise raise_http_exception(
-                status_code=404,
-                message="数据集文件不存在",
-                error_code=ErrorCode.NOT_FOUND,
-            )
-
-        # 读取标注文件
-        annotations_file = dataset_path / "annotations.csv"
-        annotations_map: Dict[str, Dict[str, Any]] = {}
-        if annotations_file.exists():
-            try:
-                with annotations_file.open("r", encoding="utf-8") as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        image_path = row.get("image_path", "")
-                        if image_path:
-                            # 标准化路径（统一使用 / 分隔符）
-                            normalized_path = image_path.replace("\\", "/")
-                            annotations_map[normalized_path] = {
-                                "has_violation": row.get(
-                                    "has_violation", "False"
-                                ).lower()
-                                in ("true", "1", "yes"),
-                                "violation_type": row.get("violation_type", ""),
-                                "camera_id": row.get("camera_id", ""),
-                                "timestamp": row.get("timestamp", ""),
-                                "record_id": row.get("record_id", ""),
-                            }
-            except Exception as e:
-                logger.warning(f"读取标注文件失败: {e}")
-
-        # 支持的图片格式
-        image_extensions = {".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp"}
-
-        samples = []
-        for root, dirs, filenames in os.walk(dataset_path):
-            for filename in filenames:
-                file_path = Path(root) / filename
-                relative_path = file_path.relative_to(dataset_path)
-
-                # 筛选文件类型
-                if file_type == "image":
-                    if file_path.suffix.lower() not in image_extensions:
-                        continue
-
-                # 跳过 annotations.csv 等非样本文件
-                if filename in {"annotations.csv", "data.yaml"} or filename.startswith(
-                    "."
-                ):
-                    continue
-
-                # 标准化路径用于匹配标注
-                normalized_path = str(relative_path).replace("\\", "/")
-                annotation = annotations_map.get(normalized_path, {})
-
-                sample_data = {
-                    "name": filename,
-                    "path": normalized_path,
-                    "size": file_path.stat().st_size,
-                    "url": f"/api/v1/mlops/datasets/{dataset_id}/files/{relative_path.as_posix()}",
-                    "has_violation": annotation.get("has_violation", False),
-                    "violation_type": annotation.get("violation_type", ""),
-                    "camera_id": annotation.get("camera_id", ""),
-                    "timestamp": annotation.get("timestamp", ""),
-                    "record_id": annotation.get("record_id", ""),
-                }
-                samples.append(sample_data)
-
-        # 排序并分页
-        samples.sort(key=lambda x: x["name"])
-        total = len(samples)
-        paginated_samples = samples[offset : offset + limit]
+        dataset_path = await _get_dataset_root(session, dataset_id)
+        manifest = await asyncio.to_thread(
+            get_dataset_catalog().get, dataset_id, dataset_path
+        )
+        samples, total = await asyncio.to_thread(
+            manifest.query_samples,
+            file_type=file_type,
+            violation_type=violation_type,
+            has_violation=has_violation,
+            camera_id=camera_id,
+            limit=limit,
+            offset=offset,
+        )
+        for sample in samples:
+            sample[
+                "url"
+            ] = f"/api/v1/mlops/datasets/{dataset_id}/files/{sample['path']}"
 
         return {
-            "samples": paginated_samples,
+            "samples": samples,
             "total": total,
             "limit": limit,
             "offset": offset,
@@ -647,6 +895,29 @@ async def get_dataset_samples(
         )
 
 
+@router.get("/datasets/{dataset_id}/stats")
+async def get_dataset_stats(
+    dataset_id: str,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """获取数据集统计（文件数量与大小、违规类型分布、标签类别分布、分辨率）"""
+    try:
+        dataset_path = await _get_dataset_root(session, dataset_id)
+        manifest = await asyncio.to_thread(
+            get_dataset_catalog().get, dataset_id, dataset_path
+        )
+        return await asyncio.to_thread(manifest.stats)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"获取数据集统计失败: {e}", exc_info=True)
+        raise raise_http_exception(
+            status_code=500,
+            message="获取数据集统计失败",
+            error_code=ErrorCode.INTERNAL_SERVER_ERROR,
+        )
+
+
 @router.post("/datasets/generate")
 async def generate_dataset(
     request: DatasetGenerateRequestModel,
@@ -667,6 +938,9 @@ async def generate_dataset(
             generation_request,
             session,
         )
+        await _build_dataset_manifest(
+            result["dataset_id"], Path(result["dataset_path"])
+        )
         return result
     except Exception as e:
         logger.error(f"生成数据集失败: {e}", exc_info=True)
@@ -678,20 +952,179 @@ async def generate_dataset(
         )
 
 
+# 难例审核队列 API
+def _review_item_view(item: Dict[str, Any]) -> Dict[str, Any]:
+    base = f"{router.prefix}/review-queue/{item['id']}"
+    view = {k: v for k, v in item.items() if k not in ("frame_path", "crops", "phash")}
+    view["frame_url"] = f"{base}/frame"
+    view["crop_urls"] = [f"{base}/crops/{i}" for i in range(len(item["crops"]))]
+    return view
+
+
+@router.get("/review-queue", summary="分页获取难例审核队列（按不确定性从高到低）")
+async def list_review_queue(
+    status: Optional[str] = Query("pending", description="样本状态筛选"),
+    camera_id: Optional[str] = Query(None, description="摄像头筛选"),
+    reason: Optional[str] = Query(None, description="不确定性信号筛选"),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+) -> Dict[str, Any]:
+    if status and status not in REVIEW_STATUSES:
+        raise raise_http_exception(
+            status_code=400,
+            message=f"不支持的样本状态: {status}",
+            error_code=ErrorCode.VALIDATION_ERROR,
+        )
+    items, total = await asyncio.to_thread(
+        get_review_queue().list_items, status, camera_id, reason, limit, offset
+    )
+    return {
+        "items": [_review_item_view(item) for item in items],
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+    }
+
+
+@router.get("/review-queue/stats", summary="难例审核队列统计")
+async def get_review_queue_stats() -> Dict[str, Any]:
+    stats = await asyncio.to_thread(get_review_queue().stats)
+    miner = get_hard_example_miner()
+    stats["miner"] = miner.get_stats() if miner is not None else None
+    return stats
+
+
+def _get_review_item(item_id: str) -> Dict[str, Any]:
+    item = get_review_queue().get(item_id)
+    if item is None:
+        raise raise_http_exception(
+            status_code=404,
+            message="审核样本不存在",
+            error_code=ErrorCode.RESOURCE_NOT_FOUND,
+        )
+    return item
+
+
+def _review_file_response(relative_path: str) -> FileResponse:
+    path = get_review_queue().resolve(relative_path)
+    if not path.is_file():
+        raise raise_http_exception(
+            status_code=404,
+            message="样本图片不存在（可能已驳回）",
+            error_code=ErrorCode.RESOURCE_NOT_FOUND,
+        )
+    return FileResponse(path=str(path), media_type="image/jpeg")
+
+
+@router.get("/review-queue/{item_id}", summary="获取审核样本详情")
+async def get_review_item(item_id: str) -> Dict[str, Any]:
+    return _review_item_view(_get_review_item(item_id))
+
+
+@router.get("/review-queue/{item_id}/frame", summary="获取审核样本整帧图片")
+async def get_review_item_frame(item_id: str) -> FileResponse:
+    return _review_file_response(_get_review_item(item_id)["frame_path"])
+
+
+@router.get("/review-queue/{item_id}/crops/{index}", summary="获取审核样本人员裁剪图")
+async def get_review_item_crop(item_id: str, index: int) -> FileResponse:
+    crops = _get_review_item(item_id)["crops"]
+    if not 0 <= index < len(crops):
+        raise raise_http_exception(
+            status_code=404,
+            message="裁剪图不存在",
+            error_code=ErrorCode.RESOURCE_NOT_FOUND,
+        )
+    return _review_file_response(crops[index])
+
+
+@router.post("/review-queue/{item_id}/review", summary="审核难例样本")
+async def review_item(item_id: str, request: ReviewDecisionModel) -> Dict[str, Any]:
+    try:
+        item = await asyncio.to_thread(
+            get_review_queue().review,
+            item_id,
+            request.decision,
+            request.label,
+            request.has_violation,
+            request.reviewer,
+        )
+    except ReviewItemNotFound:
+        raise raise_http_exception(
+            status_code=404,
+            message="审核样本不存在",
+            error_code=ErrorCode.RESOURCE_NOT_FOUND,
+        )
+    except ReviewStateError as e:
+        raise raise_http_exception(
+            status_code=409,
+            message=str(e),
+            error_code=ErrorCode.RESOURCE_CONFLICT,
+        )
+    return _review_item_view(item)
+
+
+@router.post("/review-queue/export", summary="用审核通过的难例生成数据集")
+async def export_review_queue(
+    request: ReviewExportRequestModel,
+    session: AsyncSession = Depends(get_async_session),
+):
+    queue = get_review_queue()
+    items = await asyncio.to_thread(queue.approved_items, request.max_items)
+    if not items:
+        raise raise_http_exception(
+            status_code=400,
+            message="没有已审核通过的难例样本",
+            error_code=ErrorCode.VALIDATION_ERROR,
+        )
+    try:
+        dataset_service = get_service(DatasetGenerationService)
+        entries = [review_item_to_entry(item, queue) for item in items]
+        result = await dataset_service.generate_from_review_queue(
+            request.dataset_name, entries, session
+        )
+        await _build_dataset_manifest(
+            result["dataset_id"], Path(result["dataset_path"])
+        )
+        # 只标记实际复制进数据集的样本，图片缺失的样本留在 approved 状态
+        copied_ids = [e["record_id"] for e in entries if "dataset_image_name" in e]
+        result["exported_items"] = await asyncio.to_thread(
+            queue.mark_exported, copied_ids, result["dataset_id"]
+        )
+        return result
+    except Exception as e:
+        logger.error(f"难例导出数据集失败: {e}", exc_info=True)
+        raise raise_http_exception(
+            status_code=500,
+            message="难例导出数据集失败",
+            error_code=ErrorCode.INTERNAL_SERVER_ERROR,
+            details=str(e),
+        )
+
+
 # 模型注册管理 API
 @router.get("/models", response_model=List[ModelInfo])
 async def list_models(
+    response: Response,
     model_type: Optional[str] = Query(None, description="模型类型筛选"),
     status: Optional[str] = Query(None, description="模型状态筛选"),
     limit: int = Query(100, description="返回数量限制"),
     offset: int = Query(0, description="偏移量"),
+    cursor: Optional[str] = Query(
+        None, description="上一页响应头 X-Next-Cursor 的值（提供时忽略offset）"
+    ),
 ):
+    after = _decode_listing_cursor(cursor)
     try:
         service = get_service(ModelRegistryService)
         models = await service.list_models(
-            model_type=model_type, status=status, limit=limit, offset=offset
+            model_type=model_type,
+            status=status,
+            limit=limit + 1,  # 多取一行用于判断是否还有下一页
+            offset=offset,
+            after=after,
         )
-        return models
+        return _set_listing_cursor(response, models, limit)
     except ValueError:
         raise raise_http_exception(
             status_code=503,
@@ -846,6 +1279,99 @@ async def get_deployments(session: AsyncSession = Depends(get_async_session)):
         )
 
 
+DEPLOYABLE_TASKS = ["hairnet_detection", "human_detection", "pose_detection"]
+
+
+def _validate_deployment_request(deployment: Dict[str, Any]):
+    """校验部署请求，返回 (model_id, detection_task)"""
+    model_id = deployment.get("model_id")
+    detection_task = deployment.get("detection_task")
+
+    if not model_id:
+        raise raise_http_exception(
+            status_code=400,
+            message="缺少必需参数: model_id",
+            error_code=ErrorCode.VALIDATION_ERROR,
+        )
+    if not detection_task:
+        raise raise_http_exception(
+            status_code=400,
+            message="缺少必需参数: detection_task",
+            error_code=ErrorCode.VALIDATION_ERROR,
+        )
+    if detection_task not in DEPLOYABLE_TASKS:
+        raise raise_http_exception(
+            status_code=400,
+            message=f"无效的检测任务: {detection_task}，有效值: {', '.join(DEPLOYABLE_TASKS)}",
+            error_code=ErrorCode.VALIDATION_ERROR,
+        )
+    return model_id, detection_task
+
+
+async def _get_deployable_model(model_id: str):
+    """获取模型记录并确认模型文件存在，返回 (model, model_path)"""
+    try:
+        service = get_service(ModelRegistryService)
+        model = await service.get_model(model_id)
+    except ValueError:
+        raise raise_http_exception(
+            status_code=503,
+            message="模型注册服务不可用",
+            error_code=ErrorCode.SERVICE_UNAVAILABLE,
+        )
+    if not model:
+        raise raise_http_exception(
+            status_code=404,
+            message="模型不存在",
+            error_code=ErrorCode.NOT_FOUND,
+        )
+
+    model_path = Path(model.get("model_path", ""))
+    if not model_path or not model_path.exists():
+        raise raise_http_exception(
+            status_code=404,
+            message=f"模型文件不存在: {model_path}",
+            error_code=ErrorCode.NOT_FOUND,
+        )
+    return model, model_path
+
+
+async def _apply_model_path_config(detection_task: str, model_path: Path) -> str:
+    """将模型路径写入全局检测配置（YAML与数据库），返回写入的路径"""
+    from config.unified_params import save_global_params, update_global_param
+
+    # 将模型路径转换为相对路径（相对于项目根目录）
+    project_root = Path(__file__).resolve().parents[3]
+    try:
+        relative_path = model_path.relative_to(project_root)
+        model_path_str = str(relative_path).replace("\\", "/")
+    except ValueError:
+        # 如果无法转换为相对路径，使用绝对路径
+        model_path_str = str(model_path).replace("\\", "/")
+
+    # 更新全局配置并保存到YAML文件
+    update_global_param(detection_task, "model_path", model_path_str)
+    save_global_params()
+    logger.info(f"[模型部署] 已更新 {detection_task}.model_path = {model_path_str}")
+
+    # 如果启用数据库配置，也更新数据库（可选）
+    try:
+        from src.api.routers.detection_config import get_config_service
+
+        config_service = await get_config_service()
+        if config_service:
+            await config_service.save_config(
+                camera_id=None,  # 全局配置
+                module=detection_task,
+                param="model_path",
+                value=model_path_str,
+            )
+            logger.info(f"[模型部署] 已更新数据库配置: {detection_task}.model_path")
+    except Exception as db_error:
+        logger.warning(f"[模型部署] 更新数据库配置失败（非关键）: {db_error}")
+    return model_path_str
+
+
 @router.post("/deployments")
 async def create_deployment(
     deployment: Dict[str, Any], session: AsyncSession = Depends(get_async_session)
@@ -863,57 +1389,8 @@ async def create_deployment(
     }
     """
     try:
-        # 检查必需参数
-        model_id = deployment.get("model_id")
-        detection_task = deployment.get("detection_task")
-
-        if not model_id:
-            raise raise_http_exception(
-                status_code=400,
-                message="缺少必需参数: model_id",
-                error_code=ErrorCode.VALIDATION_ERROR,
-            )
-        if not detection_task:
-            raise raise_http_exception(
-                status_code=400,
-                message="缺少必需参数: detection_task",
-                error_code=ErrorCode.VALIDATION_ERROR,
-            )
-
-        # 验证检测任务
-        valid_tasks = ["hairnet_detection", "human_detection", "pose_detection"]
-        if detection_task not in valid_tasks:
-            raise raise_http_exception(
-                status_code=400,
-                message=f"无效的检测任务: {detection_task}，有效值: {', '.join(valid_tasks)}",
-                error_code=ErrorCode.VALIDATION_ERROR,
-            )
-
-        # 获取模型信息
-        try:
-            service = get_service(ModelRegistryService)
-            model = await service.get_model(model_id)
-            if not model:
-                raise raise_http_exception(
-                    status_code=404,
-                    message="模型不存在",
-                    error_code=ErrorCode.NOT_FOUND,
-                )
-        except ValueError:
-            raise raise_http_exception(
-                status_code=503,
-                message="模型注册服务不可用",
-                error_code=ErrorCode.SERVICE_UNAVAILABLE,
-            )
-
-        # 验证模型文件是否存在
-        model_path = Path(model.get("model_path", ""))
-        if not model_path or not model_path.exists():
-            raise raise_http_exception(
-                status_code=404,
-                message=f"模型文件不存在: {model_path}",
-                error_code=ErrorCode.NOT_FOUND,
-            )
+        model_id, detection_task = _validate_deployment_request(deployment)
+        model, model_path = await _get_deployable_model(model_id)
 
         # 生成部署ID
         deployment_id = f"deployment_{int(datetime.utcnow().timestamp())}"
@@ -926,39 +1403,7 @@ async def create_deployment(
         apply_immediately = deployment.get("apply_immediately", False)
 
         # 更新检测配置
-        from config.unified_params import save_global_params, update_global_param
-
-        # 将模型路径转换为相对路径（相对于项目根目录）
-        project_root = Path(__file__).resolve().parents[3]
-        try:
-            relative_path = model_path.relative_to(project_root)
-            model_path_str = str(relative_path).replace("\\", "/")
-        except ValueError:
-            # 如果无法转换为相对路径，使用绝对路径
-            model_path_str = str(model_path).replace("\\", "/")
-
-        # 更新全局配置
-        update_global_param(detection_task, "model_path", model_path_str)
-
-        # 保存到YAML文件
-        save_global_params()
-        logger.info(f"[模型部署] 已更新 {detection_task}.model_path = {model_path_str}")
-
-        # 如果启用数据库配置，也更新数据库（可选）
-        try:
-            from src.api.routers.detection_config import get_config_service
-
-            config_service = await get_config_service()
-            if config_service:
-                await config_service.save_config(
-                    camera_id=None,  # 全局配置
-                    module=detection_task,
-                    param="model_path",
-                    value=model_path_str,
-                )
-                logger.info(f"[模型部署] 已更新数据库配置: {detection_task}.model_path")
-        except Exception as db_error:
-            logger.warning(f"[模型部署] 更新数据库配置失败（非关键）: {db_error}")
+        model_path_str = await _apply_model_path_config(detection_task, model_path)
 
         # 保存部署记录到数据库
         deployment_record = {
@@ -987,6 +1432,18 @@ async def create_deployment(
             logger.warning(f"[模型部署] 保存部署记录失败（非关键）: {db_error}")
             # 继续执行，不影响部署
 
+        # 通知检测进程热切换（后台加载、预热、影子评估通过后切换）
+        hot_swap_published = False
+        if apply_immediately:
+            from src.infrastructure.notifications import publish_model_activation_async
+
+            hot_swap_published = await publish_model_activation_async(
+                detection_task=detection_task,
+                model_path=model_path_str,
+                model_id=model_id,
+                version=model.get("version"),
+            )
+
         # 返回部署结果
         result = {
             "message": "模型部署成功",
@@ -997,7 +1454,8 @@ async def create_deployment(
             "detection_task": detection_task,
             "status": "running",
             "apply_immediately": apply_immediately,
-            "note": "配置已更新，请重启检测服务以使用新模型" if not apply_immediately else "配置已更新并立即应用",
+            "hot_swap_published": hot_swap_published,
+            "note": "配置已更新并已通知检测进程热切换" if hot_swap_published else "配置已更新，请重启检测服务以使用新模型",
         }
 
         logger.info(f"[模型部署] ✅ 部署成功: {deployment_name} -> {detection_task}")
@@ -1015,6 +1473,40 @@ async def create_deployment(
         )
 
 
+@router.post("/deployments/rollback")
+async def rollback_deployment(payload: Dict[str, Any]):
+    """通知检测进程立即回滚到内存中的上一个模型
+
+    请求体示例:
+    {
+        "detection_task": "hairnet_detection",
+        "camera_id": null
+    }
+    """
+    detection_task = payload.get("detection_task")
+    if detection_task not in ("hairnet_detection", "human_detection", "pose_detection"):
+        raise raise_http_exception(
+            status_code=400,
+            message=f"无效的检测任务: {detection_task}",
+            error_code=ErrorCode.VALIDATION_ERROR,
+        )
+
+    from src.infrastructure.notifications import publish_model_activation_async
+
+    published = await publish_model_activation_async(
+        detection_task=detection_task,
+        action="rollback",
+        camera_id=payload.get("camera_id"),
+    )
+    if not published:
+        raise raise_http_exception(
+            status_code=503,
+            message="回滚通知发布失败（Redis不可用）",
+            error_code=ErrorCode.SERVICE_UNAVAILABLE,
+        )
+    return {"message": "回滚通知已发布", "detection_task": detection_task}
+
+
 @router.put("/deployments/{deployment_id}/scale")
 async def scale_deployment(
     deployment_id: str,
@@ -1290,6 +1782,10 @@ async def update_workflow(
                 _normalize_step_config(step) for step in workflow.get("steps", [])
             ]
 
+        # 调度表达式变化后重新计算下一次触发时间
+        if "schedule" in workflow:
+            workflow["next_run"] = None
+
         # 更新数据库中的工作流信息
         updated_workflow = await WorkflowDAO.update(session, workflow_id, workflow)
         if not updated_workflow:
@@ -1299,6 +1795,19 @@ async def update_workflow(
                 error_code=ErrorCode.NOT_FOUND,
             )
 
+        # 调度相关字段变化时重新注册调度循环（停用的工作流会自行退出调度循环）
+        if {"schedule", "trigger", "status"} & workflow.keys() and (
+            updated_workflow.status == "active"
+            and updated_workflow.trigger == "schedule"
+        ):
+            engine_result = await workflow_engine.create_workflow(
+                updated_workflow.to_dict()
+            )
+            if not engine_result.get("success"):
+                logger.warning(
+                    f"工作流 {workflow_id} 重新调度失败: {engine_result.get('error')}"
+                )
+
         logger.info(f"更新工作流 {workflow_id}: {workflow}")
         return {"message": "工作流更新成功", "workflow_id": workflow_id}
     except HTTPException:
@@ -1629,6 +2138,61 @@ async def delete_workflow(workflow_id: str):
         )
 
 
+# ========== 训练任务 ==========
+
+
+def _get_training_job(job_id: str) -> Dict[str, Any]:
+    job = get_training_job_runner().store.get(job_id)
+    if job is None:
+        raise raise_http_exception(
+            status_code=404,
+            message="训练任务不存在",
+            error_code=ErrorCode.RESOURCE_NOT_FOUND,
+        )
+    return job
+
+
+@router.get("/training-jobs", summary="获取训练任务列表")
+async def list_training_jobs(
+    status: Optional[str] = Query(None, description="按状态过滤"),
+) -> Dict[str, Any]:
+    """列出训练任务（按创建时间倒序）及调度器状态."""
+    runner = get_training_job_runner()
+    jobs = await asyncio.to_thread(runner.store.list)
+    if status:
+        jobs = [job for job in jobs if job["status"] == status]
+    jobs.sort(key=lambda job: job["created_at"], reverse=True)
+    return {"jobs": jobs, "scheduler": runner.get_stats()}
+
+
+@router.get("/training-jobs/{job_id}", summary="获取训练任务详情")
+async def get_training_job(job_id: str) -> Dict[str, Any]:
+    return _get_training_job(job_id)
+
+
+@router.get("/training-jobs/{job_id}/progress", summary="获取训练任务每轮指标")
+async def get_training_job_progress(
+    job_id: str,
+    offset: int = Query(0, ge=0, description="上次返回的 next_offset，用于增量读取"),
+) -> Dict[str, Any]:
+    """增量读取训练子进程写出的每轮指标."""
+    job = _get_training_job(job_id)
+    records, next_offset = get_training_job_runner().store.read_progress(job_id, offset)
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "epochs": records,
+        "next_offset": next_offset,
+    }
+
+
+@router.post("/training-jobs/{job_id}/cancel", summary="取消训练任务")
+async def cancel_training_job(job_id: str) -> Dict[str, Any]:
+    """排队中的任务直接取消；运行中的任务发送 SIGTERM，在当前轮结束后停止."""
+    _get_training_job(job_id)
+    return get_training_job_runner().cancel(job_id)
+
+
 # 健康检查
 @router.get("/health")
 async def health_check():
@@ -5,9 +5,22 @@
 
 import logging
 import os
-from typing import Any, Dict
-
-from fastapi import APIRouter
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Query
+from fastapi.responses import PlainTextResponse
+
+from src.monitoring.metrics_core import (
+    collect_snapshots,
+    get_metrics_registry,
+    merge_snapshots,
+)
+from src.monitoring.tracing import (
+    build_flamegraph,
+    collect_trace_snapshots,
+    merge_profiles,
+    render_folded,
+)
 
 from ..schemas.error_schemas import ErrorCode
 from ..utils.error_helpers import raise_http_exception
@@ -24,6 +37,10 @@ _request_metrics = {
     "response_times": [],
 }
 
+_request_duration = get_metrics_registry().histogram(
+    "hbd_http_request_duration_seconds", help_text="HTTP 请求耗时（秒）"
+)
+
 
 def record_request(
     status_code: int,
@@ -53,6 +70,7 @@ def record_request(
     _request_metrics["response_times"].append(response_time_ms)
     if len(_request_metrics["response_times"]) > 1000:
         _request_metrics["response_times"].pop(0)
+    _request_duration.record(response_time_ms / 1000.0)
 
 
 @router.get("/db-pool/status", summary="获取数据库连接池状态")
@@ -164,6 +182,45 @@ async def db_pool_health_check() -> Dict[str, Any]:
         return {"healthy": False, "message": f"健康检查异常: {str(e)}"}
 
 
+@router.get("/connections", summary="获取共享连接池状态")
+async def get_connection_fabric_stats() -> Dict[str, Any]:
+    """获取进程共享连接池统计.
+
+    Returns:
+        共享连接池统计，包括：
+        - postgres: 连接池大小/空闲数、各子系统配额、占用数、等待耗时、慢获取与超时次数
+        - orm: SQLAlchemy 引擎连接池占用（引擎已加载时）
+        - redis: 共享Redis客户端的连接占用
+    """
+    from src.infrastructure.connection_fabric import get_connection_fabric
+
+    return get_connection_fabric().get_stats()
+
+
+@router.get("/push-hub", summary="获取实时推送状态")
+async def get_push_hub_stats() -> Dict[str, Any]:
+    """获取实时推送中心统计.
+
+    Returns:
+        推送统计，包括客户端数、各主题发布量与订阅数、队列深度、覆盖与丢弃数量
+    """
+    from src.services.push_hub import get_push_hub
+
+    return get_push_hub().get_stats()
+
+
+@router.get("/inference", summary="获取推理服务状态")
+async def get_inference_stats() -> Dict[str, Any]:
+    """获取按需推理服务统计.
+
+    Returns:
+        推理统计，包括队列深度、批大小分布、排队等待时间、拒绝与过期数量
+    """
+    from src.services.inference_service import get_inference_service
+
+    return get_inference_service().get_stats()
+
+
 @router.get("/metrics", summary="获取请求指标")
 async def get_metrics() -> Dict[str, Any]:
     """获取请求指标（用于监控面板）.
@@ -196,3 +253,183 @@ async def get_metrics() -> Dict[str, Any]:
             error_code=ErrorCode.INTERNAL_SERVER_ERROR,
             details=str(e),
         )
+
+
+@router.get("/histograms", summary="获取延迟直方图窗口汇总")
+async def get_histogram_rollups() -> Dict[str, Any]:
+    """获取所有进程合并后的直方图统计.
+
+    Returns:
+        按指标名分组的序列列表，每个序列包含标签、累计统计与 1m/5m/1h 窗口统计
+        （分位数相对误差不超过 relative_accuracy）
+    """
+    from src.infrastructure.connection_fabric import get_shared_redis
+
+    snapshots = await collect_snapshots(get_shared_redis())
+    result: Dict[str, Any] = {}
+    for name, family in sorted(merge_snapshots(snapshots).items()):
+        if family["type"] != "summary":
+            continue
+        result[name] = [
+            {
+                "labels": dict(key),
+                "total": series["total"].stats(),
+                "windows": {w: h.stats() for w, h in series["windows"].items()},
+            }
+            for key, series in sorted(family["series"].items())
+        ]
+    return {
+        "sources": len(snapshots),
+        "relative_accuracy": get_metrics_registry().relative_accuracy,
+        "histograms": result,
+    }
+
+
+async def _trace_snapshots():
+    from src.infrastructure.connection_fabric import get_shared_redis
+
+    return await collect_trace_snapshots(get_shared_redis())
+
+
+@router.get("/traces", summary="获取最近保留的逐帧追踪")
+async def list_traces(
+    camera_id: Optional[str] = None,
+    reason: Optional[str] = Query(None, description="slow 或 sampled"),
+    min_duration_ms: float = 0.0,
+    limit: int = Query(50, ge=1, le=500),
+) -> Dict[str, Any]:
+    """获取各进程尾部采样保留的帧追踪摘要（按耗时从高到低）.
+
+    Returns:
+        traces: 追踪摘要（trace_id、摄像头、耗时、保留原因、span 数）
+        sources: 各进程的采样配置与计数（总帧数、慢帧数、随机保留数）
+    """
+    snapshots = await _trace_snapshots()
+    traces = [
+        {k: v for k, v in record.items() if k != "otlp"}
+        for snapshot in snapshots
+        for record in snapshot.get("traces", [])
+        if (camera_id is None or record["camera_id"] == camera_id)
+        and (reason is None or record["reason"] == reason)
+        and record["duration_ms"] >= min_duration_ms
+    ]
+    traces.sort(key=lambda r: r["duration_ms"], reverse=True)
+    return {
+        "traces": traces[:limit],
+        "sources": [
+            {
+                "source": snapshot["source"],
+                "settings": snapshot["settings"],
+                "stats": snapshot["stats"],
+            }
+            for snapshot in snapshots
+        ],
+    }
+
+
+@router.get("/traces/flamegraph", summary="获取逐帧追踪火焰图")
+async def get_trace_flamegraph(
+    camera_id: Optional[str] = None,
+    output: str = Query("json", alias="format", pattern="^(json|folded)$"),
+):
+    """获取所有帧（不受采样影响）按调用栈累计的耗时.
+
+    Args:
+        camera_id: 只统计指定摄像头
+        format: json 为嵌套火焰图（d3-flame-graph，单位毫秒）；
+            folded 为 folded stacks 文本（自身耗时微秒，可用于 flamegraph.pl / speedscope）
+    """
+    profile = merge_profiles(await _trace_snapshots(), camera_id)
+    if output == "folded":
+        return PlainTextResponse(render_folded(profile))
+    return build_flamegraph(profile)
+
+
+@router.get("/traces/{trace_id}", summary="获取单条追踪（OTLP JSON）")
+async def get_trace(trace_id: str) -> Dict[str, Any]:
+    """获取单条追踪的 OTLP JSON（ExportTraceServiceRequest 格式）."""
+    for snapshot in await _trace_snapshots():
+        for record in snapshot.get("traces", []):
+            if record["trace_id"] == trace_id:
+                return record["otlp"]
+    raise raise_http_exception(
+        status_code=404,
+        message="追踪不存在或已过期",
+        error_code=ErrorCode.RESOURCE_NOT_FOUND,
+        details=trace_id,
+    )
+
+
+@router.get("/snapshot-storage", summary="获取快照存储状态")
+async def get_snapshot_storage_stats(scan: bool = False) -> Dict[str, Any]:
+    """获取快照存储统计（编码池、去重、保存耗时、保留清理）.
+
+    Args:
+        scan: 是否立即扫描快照目录统计各摄像头磁盘占用（不删除文件）
+
+    Returns:
+        快照存储统计信息
+    """
+    from src.container.service_container import get_service
+    from src.interfaces.storage import SnapshotStorageProtocol
+
+    try:
+        storage = get_service(SnapshotStorageProtocol)
+    except Exception as e:
+        raise raise_http_exception(
+            status_code=503,
+            message="快照存储服务未配置",
+            error_code=ErrorCode.SERVICE_UNAVAILABLE,
+            details=str(e),
+        )
+
+    get_stats = getattr(storage, "get_stats", None)
+    result: Dict[str, Any] = get_stats() if get_stats is not None else {}
+    janitor = getattr(storage, "janitor", None)
+    if scan and janitor is not None:
+        import asyncio
+
+        cameras = await asyncio.to_thread(janitor.scan)
+        result["disk_usage"] = {
+            camera_id: {
+                "files": len(files),
+                "bytes": sum(f.size for f in files),
+            }
+            for camera_id, files in cameras.items()
+        }
+    return result
+
+
+@router.get("/compute-budget", summary="获取主机算力预算分配")
+async def get_compute_budget() -> Dict[str, Any]:
+    """获取同主机各摄像头的负载信号与检测帧率分配.
+
+    Returns:
+        全局预算（unit 为 ms 时表示每秒推理毫秒，fps 时表示每秒检测帧数）
+        与各摄像头的运动/人数/违规信号、权重、分配帧率及令牌发放计数
+    """
+    import asyncio
+
+    from src.application.compute_budget import BudgetSettings
+    from src.infrastructure.storage.compute_budget_store import get_compute_budget_store
+
+    settings = BudgetSettings.from_env()
+    try:
+        store = get_compute_budget_store()
+        cameras = await asyncio.to_thread(store.live, settings.stale_after)
+    except Exception as e:
+        raise raise_http_exception(
+            status_code=503,
+            message="算力预算状态不可用",
+            error_code=ErrorCode.SERVICE_UNAVAILABLE,
+            details=str(e),
+        )
+    return {
+        "enabled": settings.enabled,
+        "unit": settings.unit,
+        "budget": settings.total_budget(),
+        "allocated": round(sum(c["allocated_ms"] or 0.0 for c in cameras), 3),
+        "min_fps": settings.min_fps,
+        "idle_fps": settings.idle_fps,
+        "cameras": cameras,
+    }
@@ -12,7 +12,7 @@ except ImportError:
     get_detection_service_domain = None
 
 from src.services.database_service import DatabaseService, get_db_service
-from src.utils.pagination import PaginatedResponse, PaginationParams
+from src.utils.pagination import CursorError, PaginatedResponse, PaginationParams
 
 from ..schemas.error_schemas import ErrorCode
 from ..utils.error_helpers import raise_http_exception
@@ -22,6 +22,16 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1/records", tags=["records"])
 
 
+def _invalid_cursor(e: CursorError):
+    """游标无效时返回400."""
+    return raise_http_exception(
+        status_code=400,
+        message="分页游标无效，请从第一页重新查询",
+        error_code=ErrorCode.INVALID_PARAMETER,
+        details=str(e),
+    )
+
+
 def _ensure_domain_service():
     """确保领域服务可用，如果不可用则抛出HTTP异常."""
     if get_detection_service_domain is None:
@@ -51,6 +61,10 @@ async def get_violations(
     ),
     page: int = Query(1, ge=1, description="页码（从1开始）"),
     page_size: int = Query(20, ge=1, le=100, description="每页大小"),
+    cursor: Optional[str] = Query(
+        None, description="上一页返回的 next_cursor（提供时忽略page，深分页耗时恒定）"
+    ),
+    approximate_total: bool = Query(False, description="使用估算总数代替 COUNT(*)"),
 ) -> PaginatedResponse[Dict[str, Any]]:
     """获取违规记录列表（分页）.
 
@@ -60,6 +74,8 @@ async def get_violations(
         violation_type: 违规类型筛选
         page: 页码（从1开始）
         page_size: 每页大小（1-100）
+        cursor: 游标（keyset分页）
+        approximate_total: 是否使用估算总数
 
     Returns:
         分页响应，包含：
@@ -68,6 +84,7 @@ async def get_violations(
         - page: 当前页
         - page_size: 每页大小
         - total_pages: 总页数
+        - next_cursor: 下一页游标
     """
     try:
         domain_service = _ensure_domain_service()
@@ -86,6 +103,8 @@ async def get_violations(
             violation_type=violation_type,
             limit=pagination.limit,
             offset=pagination.offset,
+            cursor=cursor,
+            approximate_total=approximate_total,
         )
 
         # 提取数据
@@ -99,10 +118,18 @@ async def get_violations(
         ]
 
         # 返回分页响应
-        return PaginatedResponse.create(filtered_violations, total, pagination)
+        return PaginatedResponse.create(
+            filtered_violations,
+            total,
+            pagination,
+            next_cursor=result.get("next_cursor"),
+            total_is_estimate=bool(result.get("total_is_estimate", False)),
+        )
 
     except HTTPException:
         raise
+    except CursorError as e:
+        raise _invalid_cursor(e)
     except Exception as e:
         logger.error(f"查询违规记录失败: {e}", exc_info=True)
         raise raise_http_exception(
@@ -316,6 +343,7 @@ async def get_detection_records(
     offset: int = Query(0, ge=0, description="偏移量"),
     start_time: Optional[str] = Query(None, description="开始时间 (ISO格式)"),
     end_time: Optional[str] = Query(None, description="结束时间 (ISO格式)"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor（提供时忽略offset）"),
 ) -> Dict[str, Any]:
     """获取检测记录列表.
 
@@ -325,9 +353,10 @@ async def get_detection_records(
         offset: 偏移量
         start_time: 开始时间（可选，用于优化查询性能）
         end_time: 结束时间（可选，用于优化查询性能）
+        cursor: 游标（keyset分页）
 
     Returns:
-        检测记录列表
+        检测记录列表（含 next_cursor）
     """
     try:
         domain_service = _ensure_domain_service()
@@ -352,10 +381,13 @@ async def get_detection_records(
             offset=offset,
             start_time=start_dt,
             end_time=end_dt,
+            cursor=cursor,
         )
         return result
     except HTTPException:
         raise
+    except CursorError as e:
+        raise _invalid_cursor(e)
     except Exception as e:
         logger.error(f"查询检测记录失败: {e}", exc_info=True)
         raise raise_http_exception(
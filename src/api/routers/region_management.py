@@ -41,6 +41,30 @@ except Exception:
     get_region_domain_service = None  # type: ignore
     RegionDomainService = None  # type: ignore
 
+
+async def _notify_region_change(
+    camera_id: Optional[str],
+    region_id: str,
+    region: Optional[Dict[str, Any]],
+    change_type: str = "update",
+) -> None:
+    """发布区域变更通知（检测进程据此增量更新本地配置快照）"""
+    try:
+        from src.infrastructure.notifications.config_change_notifier import (
+            publish_config_change_notification_async,
+        )
+
+        await publish_config_change_notification_async(
+            camera_id=camera_id,
+            config_type="regions",
+            config_key=region_id,
+            config_value=region,
+            change_type=change_type,
+        )
+    except Exception as e:
+        logger.warning(f"发布区域变更通知失败: region_id={region_id}, error={e}")
+
+
 router = APIRouter()
 # 兼容旧前端的路由（/api/regions）
 compat_router = APIRouter()
@@ -111,6 +135,13 @@ async def create_region(
                 result = await region_domain_service.create_region(
                     region_data, camera_id
                 )
+                region_id = result.get("region_id")
+                if region_id:
+                    await _notify_region_change(
+                        camera_id,
+                        region_id,
+                        await region_domain_service.get_region_by_id(region_id),
+                    )
                 return result
             else:
                 logger.error("区域领域服务未初始化")
@@ -227,9 +258,20 @@ async def update_region(
         if get_region_domain_service is not None:
             region_domain_service = await get_region_domain_service()
             if region_domain_service:
+                previous = await region_domain_service.get_region_by_id(region_id)
                 result = await region_domain_service.update_region(
                     region_id, region_data
                 )
+                # 按存储的关联相机通知（部分更新时请求体中没有camera_id）
+                region = result.get("region") or {}
+                camera_id = region.get("camera_id")
+                previous_camera_id = (previous or {}).get("camera_id")
+                if previous_camera_id and previous_camera_id != camera_id:
+                    # 区域改关联到其他相机：从原相机的快照中移除
+                    await _notify_region_change(
+                        previous_camera_id, region_id, None, "delete"
+                    )
+                await _notify_region_change(camera_id, region_id, region or None)
                 return result
             else:
                 logger.error("区域领域服务未初始化")
@@ -278,6 +320,7 @@ async def delete_region(
             region_domain_service = await get_region_domain_service()
             if region_domain_service:
                 result = await region_domain_service.delete_region(region_id)
+                await _notify_region_change(None, region_id, None, "delete")
                 return result
             else:
                 logger.error("区域领域服务未初始化")
@@ -44,7 +44,12 @@ def _ensure_domain_service():
 
 
 @router.get("/statistics/realtime", summary="实时统计接口")
-@redis_cache(ttl=10, key_prefix="stats:realtime:v1")
+@redis_cache(
+    ttl=10,
+    key_prefix="stats:realtime:v1",
+    stale_ttl=30,
+    tags=["detection_records", "cameras"],
+)
 async def get_realtime_statistics() -> Dict[str, Any]:
     """获取实时统计信息.
 
@@ -71,7 +76,12 @@ async def get_realtime_statistics() -> Dict[str, Any]:
 
 
 @router.get("/statistics/detection-realtime", summary="智能检测实时统计接口")
-@redis_cache(ttl=10, key_prefix="stats:detection:v1")
+@redis_cache(
+    ttl=10,
+    key_prefix="stats:detection:v1",
+    stale_ttl=30,
+    tags=["detection_records", "cameras"],
+)
 async def get_detection_realtime_statistics() -> Dict[str, Any]:
     """获取智能检测实时统计数据（用于首页检测面板）.
 
@@ -4,12 +4,22 @@
 提供实时视频流推送的WebSocket端点
 """
 
+import json
 from typing import Optional
 
-from fastapi import APIRouter, Body, Header, Request, WebSocket, WebSocketDisconnect
+from fastapi import (
+    APIRouter,
+    Body,
+    Header,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
 from loguru import logger
 from pydantic import BaseModel, Field
 
+from src.services.stream_renditions import DEFAULT_RENDITION, RENDITIONS
 from src.services.video_stream_manager import get_stream_manager
 
 from ..schemas.error_schemas import ErrorCode
@@ -44,6 +54,7 @@ class VideoStreamConfigResponse(BaseModel):
 async def video_stream_websocket(
     websocket: WebSocket,
     camera_id: str,
+    rendition: str = Query(DEFAULT_RENDITION, description="视频流档位"),
 ):
     """
     视频流WebSocket端点
@@ -51,18 +62,21 @@ async def video_stream_websocket(
     Args:
         websocket: WebSocket连接
         camera_id: 摄像头ID
+        rendition: 初始档位（thumb/medium/full，默认medium）
 
     WebSocket协议:
         - 客户端连接后，服务器自动推送视频帧（JPEG格式）
         - 客户端可以发送 "ping" 进行心跳检测，服务器回复 "pong"
+        - 客户端可以发送 {"action": "set_rendition", "rendition": "thumb"} 切换档位，
+          服务器回复 {"type": "rendition", "rendition": ..., "ok": true/false}
         - 服务器推送格式: 二进制JPEG数据
     """
     stream_manager = get_stream_manager()
 
     try:
         # 建立连接
-        await stream_manager.connect(websocket, camera_id)
-        logger.info(f"WebSocket已连接: camera={camera_id}")
+        await stream_manager.connect(websocket, camera_id, rendition)
+        logger.info(f"WebSocket已连接: camera={camera_id}, rendition={rendition}")
 
         # 保持连接，接收客户端消息
         while True:
@@ -74,6 +88,14 @@ async def video_stream_websocket(
                 if data == "ping":
                     await websocket.send_text("pong")
                     logger.debug(f"心跳响应: camera={camera_id}")
+                    continue
+
+                # 处理档位切换
+                reply = await _handle_control_message(
+                    stream_manager, websocket, camera_id, data
+                )
+                if reply is not None:
+                    await websocket.send_text(json.dumps(reply))
 
             except WebSocketDisconnect:
                 logger.info(f"客户端主动断开: camera={camera_id}")
@@ -91,6 +113,43 @@ async def video_stream_websocket(
         logger.info(f"WebSocket已清理: camera={camera_id}")
 
 
+async def _handle_control_message(
+    stream_manager, websocket: WebSocket, camera_id: str, data: str
+) -> Optional[dict]:
+    """处理客户端控制消息，返回需要回复的内容（无法识别的消息返回None）"""
+    try:
+        message = json.loads(data)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(message, dict) or message.get("action") != "set_rendition":
+        return None
+
+    rendition = message.get("rendition")
+    ok = await stream_manager.set_rendition(websocket, camera_id, rendition)
+    reply = {"type": "rendition", "rendition": rendition, "ok": ok}
+    if not ok:
+        reply["available"] = list(RENDITIONS)
+    return reply
+
+
+@router.get("/renditions", summary="获取视频流档位")
+async def get_video_stream_renditions():
+    """
+    获取可选的视频流档位
+
+    Returns:
+        - default: 默认档位
+        - renditions: 档位列表（名称、最大宽度、JPEG质量）
+    """
+    return {
+        "default": DEFAULT_RENDITION,
+        "renditions": [
+            {"name": r.name, "max_width": r.max_width, "quality": r.quality}
+            for r in RENDITIONS.values()
+        ],
+    }
+
+
 @router.get("/stats", summary="获取视频流统计")
 async def get_video_stream_stats():
     """
@@ -124,6 +183,7 @@ async def get_camera_stream_status(camera_id: str):
         "camera_id": camera_id,
         "has_clients": stream_manager.has_clients(camera_id),
         "client_count": stream_manager.get_client_count(camera_id),
+        "rendition_demand": stream_manager.get_rendition_demand(camera_id),
     }
 
 
@@ -177,9 +237,7 @@ async def update_video_stream_config(
     Returns:
         配置响应
     """
-    import os
-
-    import redis
+    from src.infrastructure.connection_fabric import get_shared_redis
 
     try:
         # 处理逐帧模式
@@ -192,20 +250,23 @@ async def update_video_stream_config(
             stream_interval = config.stream_interval or 3
 
         # 保存配置到Redis（用于检测进程读取）
-        redis_url = os.getenv("REDIS_URL")
-        if redis_url:
+        r = get_shared_redis()
+        if r is not None:
             try:
-                r = redis.from_url(redis_url)
                 config_key = f"video_stream:config:{camera_id}"
                 config_data = {
                     "stream_interval": stream_interval,
                     "log_interval": config.log_interval,
                     "frame_by_frame": stream_interval == 1,
                 }
-                # 只保存非None的配置
-                config_data = {k: v for k, v in config_data.items() if v is not None}
-                r.hset(config_key, mapping=config_data)
-                r.expire(config_key, 3600)  # 1小时过期
+                # 只保存非None的配置（redis-py 不接受 bool，统一转为字符串）
+                config_data = {
+                    k: str(v) for k, v in config_data.items() if v is not None
+                }
+                async with r.pipeline(transaction=False) as pipe:
+                    pipe.hset(config_key, mapping=config_data)
+                    pipe.expire(config_key, 3600)  # 1小时过期
+                    await pipe.execute()
                 logger.info(f"视频流配置已保存到Redis: camera={camera_id}, config={config_data}")
             except Exception as e:
                 logger.warning(f"保存配置到Redis失败: {e}，将仅返回配置信息")
@@ -240,16 +301,15 @@ async def get_video_stream_config(camera_id: str):
     """
     import os
 
-    import redis
+    from src.infrastructure.connection_fabric import get_shared_redis
 
     try:
         # 从Redis读取配置
-        redis_url = os.getenv("REDIS_URL")
-        if redis_url:
+        r = get_shared_redis()
+        if r is not None:
             try:
-                r = redis.from_url(redis_url)
                 config_key = f"video_stream:config:{camera_id}"
-                config_data = r.hgetall(config_key)
+                config_data = await r.hgetall(config_key)
                 if config_data:
                     # 解码bytes为字符串
                     config_data = {
@@ -1,19 +1,33 @@
 """WebSocket路由模块.
 
-提供实时图像检测的WebSocket端点.
+提供实时图像检测的WebSocket端点，以及经推送中心（src/services/push_hub.py）
+分发的状态、事件、告警推送端点.
 """
 import asyncio
 import base64
 import json
 import logging
-import os
+import time
+from typing import List, Optional
 
 import cv2
 import numpy as np
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect
 from websockets.exceptions import ConnectionClosedOK
 
 from src.api.redis_listener import CAMERA_STATS_CACHE
+from src.services.inference_service import (
+    InferenceDeadlineExceeded,
+    InferenceOverloaded,
+    get_inference_service,
+)
+from src.services.push_hub import (
+    TOPIC_EVENTS,
+    TOPIC_STATUS,
+    Subscription,
+    get_push_hub,
+    split_param,
+)
 from src.services.websocket_service import (
     ConnectionManager,
     WebSocketSession,
@@ -23,85 +37,117 @@ from src.services.websocket_service import (
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# 状态推送连接管理器
-status_connections: set[WebSocket] = set()
 
-
-@router.websocket("/ws/status")
-async def websocket_status_endpoint(websocket: WebSocket):
-    """WebSocket状态推送端点."""
-    await websocket.accept()
-    status_connections.add(websocket)
-    logger.info(f"状态推送客户端已连接，当前连接数: {len(status_connections)}")
-
-    try:
-        # 发送初始状态
-        await send_all_camera_status(websocket)
-
-        # 保持连接并处理心跳
+async def _serve_push_client(
+    websocket: WebSocket,
+    subscription: Subscription,
+    initial_messages: Optional[List[dict]] = None,
+) -> None:
+    """
+    推送客户端主循环：注册到推送中心，由独立任务发送队列中的消息，
+    当前任务处理心跳与订阅变更。慢客户端只影响自己的队列。
+    """
+    hub = get_push_hub()
+    hub.register(websocket, subscription)
+    logger.info(
+        f"推送客户端已连接: topics={sorted(subscription.topics)}, 当前连接数: {hub.client_count}"
+    )
+
+    async def receive_loop():
         while True:
             data = await websocket.receive_text()
             try:
                 message = json.loads(data)
-                if message.get("type") == "ping":
-                    await websocket.send_text(json.dumps({"type": "pong"}))
             except json.JSONDecodeError:
-                pass
-    except WebSocketDisconnect:
-        logger.info("状态推送客户端已断开连接")
-    finally:
-        status_connections.discard(websocket)
-        logger.info(f"状态推送客户端已移除，当前连接数: {len(status_connections)}")
-
+                continue
+            if not isinstance(message, dict):
+                continue
+            if message.get("type") == "ping":
+                await websocket.send_text(json.dumps({"type": "pong"}))
+            elif message.get("type") == "subscribe":
+                try:
+                    new_subscription = Subscription.create(
+                        message.get("topics") or subscription.topics,
+                        message.get("camera_ids"),
+                        message.get("event_types"),
+                    )
+                except ValueError as e:
+                    await websocket.send_text(
+                        json.dumps({"type": "error", "message": str(e)})
+                    )
+                    continue
+                hub.resubscribe(websocket, new_subscription)
+                await websocket.send_text(
+                    json.dumps(
+                        {
+                            "type": "subscribed",
+                            "topics": sorted(new_subscription.topics),
+                        }
+                    )
+                )
 
-async def send_all_camera_status(websocket: WebSocket):
-    """发送所有摄像头的状态信息."""
     try:
-        # 获取所有摄像头的状态
-        all_status = {}
-        for camera_id, stats_data in CAMERA_STATS_CACHE.items():
-            if isinstance(stats_data, dict) and stats_data.get("type") == "stats":
-                all_status[camera_id] = {
-                    "camera_id": camera_id,
-                    "timestamp": stats_data.get("timestamp"),
-                    "data": stats_data.get("data", {}),
-                }
-
-        # 发送状态更新
-        message = {
-            "type": "status_update",
-            "data": all_status,
-            "timestamp": asyncio.get_event_loop().time(),
-        }
-        await websocket.send_text(json.dumps(message))
-    except Exception as e:
-        logger.error(f"发送状态信息失败: {e}")
-
-
-async def broadcast_status_update(camera_id: str, stats_data: dict):
-    """向所有连接的客户端广播状态更新."""
-    if not status_connections:
-        return
-
-    message = {
+        for message in initial_messages or []:
+            await websocket.send_text(json.dumps(message))
+        tasks = [
+            asyncio.create_task(receive_loop()),
+            asyncio.create_task(hub.pump(websocket, websocket.send_text)),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                exc = task.exception()
+                if exc is not None and not isinstance(
+                    exc, (WebSocketDisconnect, ConnectionClosedOK)
+                ):
+                    logger.debug(f"推送客户端连接结束: {exc!r}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    except (WebSocketDisconnect, ConnectionClosedOK):
+        pass
+    finally:
+        hub.unregister(websocket)
+        logger.info(f"推送客户端已断开，当前连接数: {hub.client_count}")
+
+
+def _camera_status_snapshot(camera_ids: Optional[List[str]] = None) -> dict:
+    """当前所有（或指定）摄像头的状态快照."""
+    all_status = {}
+    for camera_id, stats_data in CAMERA_STATS_CACHE.items():
+        if camera_ids and camera_id not in camera_ids:
+            continue
+        if isinstance(stats_data, dict) and stats_data.get("type") == "stats":
+            all_status[camera_id] = {
+                "camera_id": camera_id,
+                "timestamp": stats_data.get("timestamp"),
+                "data": stats_data.get("data", {}),
+            }
+    return {
         "type": "status_update",
-        "camera_id": camera_id,
-        "data": stats_data,
-        "timestamp": asyncio.get_event_loop().time(),
+        "data": all_status,
+        "timestamp": time.time(),
     }
 
-    message_text = json.dumps(message)
-    disconnected = set()
 
-    for websocket in status_connections:
-        try:
-            await websocket.send_text(message_text)
-        except Exception:
-            disconnected.add(websocket)
+@router.websocket("/ws/status")
+async def websocket_status_endpoint(
+    websocket: WebSocket,
+    camera_id: Optional[str] = Query(None, description="摄像头ID，逗号分隔，不提供则推送全部"),
+):
+    """WebSocket状态推送端点（每个摄像头只推送最新状态）."""
+    await websocket.accept()
+    camera_ids = split_param(camera_id)
+    subscription = Subscription.create([TOPIC_STATUS], camera_ids)
+    await _serve_push_client(
+        websocket, subscription, [_camera_status_snapshot(camera_ids)]
+    )
 
-    # 清理断开的连接
-    for websocket in disconnected:
-        status_connections.discard(websocket)
+
+async def broadcast_status_update(camera_id: str, stats_data: dict):
+    """向订阅了该摄像头状态的客户端推送状态更新（只入队，不等待发送）."""
+    get_push_hub().publish_status(camera_id, stats_data)
 
 
 @router.websocket("/ws")
@@ -153,7 +199,7 @@ async def websocket_endpoint(
 
 async def process_image_detection(session: WebSocketSession, message: dict):
     """处理图像检测请求."""
-    from src.services.detection_service import process_tracked_frame
+    from src.services.detection_service import process_tracked_frames
 
     try:
         image_data = message.get("data")
@@ -173,10 +219,27 @@ async def process_image_detection(session: WebSocketSession, message: dict):
         # 从 app state 获取检测管道
         optimized_pipeline = session.websocket.scope["app"].state.optimized_pipeline
 
-        # 调用新的带跟踪的处理函数
-        detection_result = await asyncio.get_event_loop().run_in_executor(
-            None, process_tracked_frame, session, frame, optimized_pipeline
-        )
+        # 经推理服务排队、合批执行带跟踪的检测
+        try:
+            detection_result = await get_inference_service().submit(
+                id(session),
+                process_tracked_frames,
+                (session, frame, optimized_pipeline),
+                batch_key=id(optimized_pipeline),
+            )
+        except (InferenceOverloaded, InferenceDeadlineExceeded) as e:
+            # 过载或超时：告知客户端丢弃本帧，连接保持
+            await session.websocket.send_text(
+                json.dumps(
+                    {
+                        "type": "error",
+                        "code": 429 if isinstance(e, InferenceOverloaded) else 503,
+                        "message": str(e),
+                        "retry_after": getattr(e, "retry_after", None),
+                    }
+                )
+            )
+            return
 
         # 发送检测结果
         try:
@@ -195,71 +258,39 @@ async def process_image_detection(session: WebSocketSession, message: dict):
 
 
 @router.websocket("/ws/events")
-async def websocket_events(websocket: WebSocket):
+async def websocket_events(
+    websocket: WebSocket,
+    etype: Optional[str] = Query(None, description="事件类型，逗号分隔"),
+    camera_id: Optional[str] = Query(None, description="摄像头ID，逗号分隔"),
+):
+    """WebSocket事件推送端点（事件日志由推送中心统一追踪）."""
+    await websocket.accept()
+    subscription = Subscription.create(
+        [TOPIC_EVENTS], split_param(camera_id), split_param(etype)
+    )
+    await _serve_push_client(websocket, subscription)
+
+
+@router.websocket("/ws/push")
+async def websocket_push(
+    websocket: WebSocket,
+    topics: str = Query("status,events,alerts", description="订阅主题，逗号分隔"),
+    camera_id: Optional[str] = Query(None, description="摄像头ID，逗号分隔"),
+    etype: Optional[str] = Query(None, description="事件类型，逗号分隔（仅events主题）"),
+):
+    """通用推送端点：按主题、摄像头、事件类型订阅."""
     await websocket.accept()
     try:
-        try:
-            from urllib.parse import parse_qs
-
-            qs = (
-                parse_qs(websocket.url.query or "") if hasattr(websocket, "url") else {}
-            )
-            etype_filter = None
-            if isinstance(qs, dict):
-                vals = qs.get("etype")
-                if vals and len(vals) > 0:
-                    etype_filter = str(vals[0])
-        except Exception:
-            etype_filter = None
-
-        project_root = os.path.dirname(
-            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        )
-        # 事件日志现在位于 logs/events/ 目录下
-        events_file = os.path.join(
-            project_root, "logs", "events", "events_record.jsonl"
+        subscription = Subscription.create(
+            split_param(topics), split_param(camera_id), split_param(etype)
         )
+    except ValueError as e:
+        await websocket.send_text(json.dumps({"type": "error", "message": str(e)}))
+        await websocket.close(code=1008)
+        return
 
-        last_pos = 0
-        while True:
-            try:
-                if not os.path.exists(events_file):
-                    await asyncio.sleep(0.5)
-                    continue
-                with open(events_file, "r", encoding="utf-8") as f:
-                    if last_pos == 0:
-                        f.seek(0, os.SEEK_END)
-                        last_pos = f.tell()
-                    else:
-                        f.seek(last_pos)
-                    lines = f.readlines()
-                    last_pos = f.tell()
-                if lines:
-                    for line in lines:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        try:
-                            obj = json.loads(line)
-                            if etype_filter and str(obj.get("type")) != etype_filter:
-                                continue
-                            await websocket.send_text(
-                                json.dumps({"type": "event", "data": obj})
-                            )
-                        except Exception:
-                            continue
-                try:
-                    await websocket.send_text(json.dumps({"type": "ping"}))
-                except Exception:
-                    pass
-                await asyncio.sleep(0.5)
-            except (WebSocketDisconnect, ConnectionClosedOK):
-                break
-            except Exception as e:
-                logger.debug(f"ws/events tail error: {e}")
-                await asyncio.sleep(0.5)
-    finally:
-        try:
-            await websocket.close()
-        except Exception:
-            pass
+    initial = []
+    if TOPIC_STATUS in subscription.topics:
+        camera_ids = sorted(subscription.camera_ids or [])
+        initial.append(_camera_status_snapshot(camera_ids))
+    await _serve_push_client(websocket, subscription, initial)
@@ -74,6 +74,7 @@ def raise_http_exception(
     error_code: Optional[ErrorCode] = None,
     error_type: Optional[ErrorType] = None,
     details: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
 ) -> HTTPException:
     """
     抛出统一格式的HTTPException
@@ -84,6 +85,7 @@ def raise_http_exception(
         error_code: 错误码（可选，默认根据状态码推断）
         error_type: 错误类型（可选，默认根据状态码推断）
         details: 详细错误信息（可选，仅开发环境返回）
+        headers: 额外响应头（可选，如 Retry-After）
 
     Returns:
         HTTPException对象（包含统一格式的detail）
@@ -105,4 +107,6 @@ def raise_http_exception(
         details=details,
     )
 
-    return HTTPException(status_code=status_code, detail=error_response)
+    return HTTPException(
+        status_code=status_code, detail=error_response, headers=headers
+    )
@@ -0,0 +1,420 @@
+"""
+主机级算力预算调度。
+
+DynamicSkipManager / AdaptiveFrameProcessor 只根据本摄像头自己的耗时和 CPU 采样
+调整跳帧，多路摄像头争抢同一台主机时会一起降速。这里把主机的推理能力视为一份
+全局预算（每秒推理毫秒数，或每秒帧数），按各摄像头的负载在摄像头之间分配：
+
+- 信号：运动强度（低分辨率帧差）、人数、近期违规与配置的优先级，合成为权重；
+  无运动、无人、无违规的摄像头视为空闲，帧率上限为 idle_fps（涓流）。
+- 分配：总需求不超过预算时所有摄像头满帧率；否则每路先保底 min_fps，剩余预算
+  按权重注水式分配（达到自身满帧率的摄像头退出，余量继续分给其他摄像头）。
+- 执行：各检测进程周期性上报信号、读取同主机其他摄像头的信号并用同一规则计算
+  分配（各进程输入一致时结果一致），再以令牌桶按分配帧率发放检测令牌；
+  分配结果写回共享状态并通过 /monitoring/compute-budget 查看。
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from src.infrastructure.storage.compute_budget_store import (
+    ComputeBudgetStore,
+    get_compute_budget_store,
+)
+from src.monitoring.metrics_core import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+# 权重 = 优先级 × (idle + Σ 信号权重 × 归一化信号)
+SIGNAL_WEIGHTS = {
+    "idle": 0.05,
+    "motion": 1.0,
+    "persons": 2.0,
+    "violation": 4.0,
+}
+MOTION_SIZE = (64, 36)  # 帧差计算分辨率
+MOTION_PIXEL_DELTA = 20  # 灰度差超过该值的像素计为运动
+EWMA_ALPHA = 0.3
+
+
+@dataclass
+class BudgetSettings:
+    """算力预算配置"""
+
+    enabled: bool = True
+    budget_ms: Optional[float] = None  # 每秒可用推理毫秒，默认 CPU 核数×1000×utilization
+    budget_fps: Optional[float] = None  # 设置后按帧数分配，忽略 budget_ms
+    utilization: float = 0.8
+    min_fps: float = 0.5  # 每路保底帧率
+    idle_fps: float = 1.0  # 空闲摄像头帧率上限
+    refresh_interval: float = 1.0  # 上报与重新分配间隔（秒）
+    stale_after: float = 5.0  # 超过该时间未上报的摄像头不参与分配
+    burst_seconds: float = 1.0  # 令牌桶容量（按分配帧率折算的秒数）
+    motion_ref: float = 0.05  # 运动像素比例达到该值视为满运动
+    idle_motion: float = 0.005  # 低于该运动像素比例视为静止
+    person_ref: float = 3.0  # 人数达到该值视为满负载
+    violation_hold: float = 30.0  # 违规后保持“活跃违规”的时间（秒）
+    default_cost_ms: float = 100.0  # 尚无耗时数据时的单帧耗时估计
+
+    @classmethod
+    def from_env(cls) -> "BudgetSettings":
+        budget_ms = os.getenv("COMPUTE_BUDGET_MS")
+        budget_fps = os.getenv("COMPUTE_BUDGET_FPS")
+        return cls(
+            enabled=os.getenv("COMPUTE_BUDGET_ENABLED", "true").lower()
+            in ("1", "true", "yes"),
+            budget_ms=float(budget_ms) if budget_ms else None,
+            budget_fps=float(budget_fps) if budget_fps else None,
+            utilization=float(os.getenv("COMPUTE_BUDGET_UTILIZATION", "0.8")),
+            min_fps=float(os.getenv("COMPUTE_BUDGET_MIN_FPS", "0.5")),
+            idle_fps=float(os.getenv("COMPUTE_BUDGET_IDLE_FPS", "1.0")),
+            refresh_interval=float(os.getenv("COMPUTE_BUDGET_REFRESH", "1.0")),
+            stale_after=float(os.getenv("COMPUTE_BUDGET_STALE_AFTER", "5.0")),
+            violation_hold=float(os.getenv("COMPUTE_BUDGET_VIOLATION_HOLD", "30")),
+        )
+
+    @property
+    def unit(self) -> str:
+        return "fps" if self.budget_fps else "ms"
+
+    def total_budget(self) -> float:
+        """全局预算（fps 模式为帧/秒，ms 模式为推理毫秒/秒）。"""
+        if self.budget_fps:
+            return self.budget_fps
+        if self.budget_ms:
+            return self.budget_ms
+        return (os.cpu_count() or 1) * 1000.0 * self.utilization
+
+
+def camera_weight(report: Dict[str, Any], settings: BudgetSettings) -> float:
+    """摄像头权重：优先级 × 负载信号合成分数。"""
+    motion = min(report["motion"] / settings.motion_ref, 1.0)
+    persons = min(report["persons"] / settings.person_ref, 1.0)
+    violation = 1.0 if report["violation_active"] else 0.0
+    activity = (
+        SIGNAL_WEIGHTS["idle"]
+        + SIGNAL_WEIGHTS["motion"] * motion
+        + SIGNAL_WEIGHTS["persons"] * persons
+        + SIGNAL_WEIGHTS["violation"] * violation
+    )
+    return max(report["priority"], 0.0) * activity
+
+
+def is_idle(report: Dict[str, Any], settings: BudgetSettings) -> bool:
+    return (
+        report["motion"] < settings.idle_motion
+        and report["persons"] < 0.5
+        and not report["violation_active"]
+    )
+
+
+def allocate(
+    reports: List[Dict[str, Any]], settings: BudgetSettings
+) -> Dict[str, Dict[str, Any]]:
+    """
+    在摄像头之间分配全局预算。
+
+    Returns:
+        {camera_id: {"weight", "allocated_fps", "allocated_ms", "budget_ms", "reason"}}
+        （fps 模式下 allocated_ms / budget_ms 的单位为帧）
+    """
+    budget = settings.total_budget()
+    cameras = []
+    for report in reports:
+        cost = (
+            1.0
+            if settings.unit == "fps"
+            else (report["cost_ms"] or settings.default_cost_ms)
+        )
+        idle = is_idle(report, settings)
+        cap_fps = max(report["max_fps"], 0.0)
+        if idle:
+            cap_fps = min(cap_fps, settings.idle_fps)
+        cameras.append(
+            {
+                "id": report["camera_id"],
+                "cost": cost,
+                "cap": cap_fps,
+                "floor": min(settings.min_fps, cap_fps),
+                "weight": camera_weight(report, settings),
+                "idle": idle,
+            }
+        )
+
+    demand = sum(c["cap"] * c["cost"] for c in cameras)
+    floors = sum(c["floor"] * c["cost"] for c in cameras)
+    if demand <= budget:
+        fps = {c["id"]: c["cap"] for c in cameras}
+    elif floors >= budget:
+        scale = budget / floors if floors else 0.0
+        fps = {c["id"]: c["floor"] * scale for c in cameras}
+    else:
+        fps = {c["id"]: c["floor"] for c in cameras}
+        remaining = budget - floors
+        active = [c for c in cameras if c["cap"] > c["floor"]]
+        # 注水：按权重分配剩余预算，达到满帧率的摄像头退出并把余量让给其他摄像头
+        # （权重全为 0 时均分，否则权重为 0 的摄像头不参与分配）
+        while active and remaining > 1e-9:
+            total_weight = sum(c["weight"] for c in active)
+            shares = {
+                c["id"]: (
+                    remaining * c["weight"] / total_weight
+                    if total_weight > 0
+                    else remaining / len(active)
+                )
+                for c in active
+            }
+            saturated = [
+                c
+                for c in active
+                if fps[c["id"]] * c["cost"] + shares[c["id"]] >= c["cap"] * c["cost"]
+            ]
+            if not saturated:
+                for c in active:
+                    fps[c["id"]] += shares[c["id"]] / c["cost"]
+                remaining = 0.0
+                break
+            for c in saturated:
+                remaining -= (c["cap"] - fps[c["id"]]) * c["cost"]
+                fps[c["id"]] = c["cap"]
+                active.remove(c)
+
+    allocations = {}
+    for c in cameras:
+        allocated = fps[c["id"]]
+        if c["idle"]:
+            reason = "idle"
+        elif allocated >= c["cap"] * 0.999:
+            reason = "full"
+        else:
+            reason = "throttled"
+        allocations[c["id"]] = {
+            "weight": round(c["weight"], 4),
+            "allocated_fps": round(allocated, 3),
+            "allocated_ms": round(allocated * c["cost"], 3),
+            "budget_ms": budget,
+            "reason": reason,
+        }
+    return allocations
+
+
+class TokenBucket:
+    """检测令牌桶（rate 为 None 时不限速）。"""
+
+    def __init__(self, rate: Optional[float] = None, capacity: float = 1.0) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at: Optional[float] = None
+
+    def set_rate(self, rate: Optional[float], capacity: float) -> None:
+        if self.rate is None:
+            self.tokens = max(capacity, 1.0)  # 从不限速切换时以满桶开始
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = min(self.tokens, self.capacity)
+
+    def try_acquire(self, now: float) -> bool:
+        if self.rate is None:
+            return True
+        if self.updated_at is not None:
+            elapsed = max(now - self.updated_at, 0.0)
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+def frame_motion(previous: Optional[np.ndarray], frame: np.ndarray) -> tuple:
+    """低分辨率帧差：返回 (运动像素比例, 当前缩略灰度图)。"""
+    small = cv2.resize(frame, MOTION_SIZE, interpolation=cv2.INTER_LINEAR)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    if previous is None:
+        return 0.0, small
+    diff = cv2.absdiff(small, previous)
+    return float(np.count_nonzero(diff > MOTION_PIXEL_DELTA)) / diff.size, small
+
+
+def count_violations(result: Any) -> int:
+    """本帧未佩戴发网的人数（用于“活跃违规”信号）。"""
+    return sum(
+        1
+        for h in getattr(result, "hairnet_results", None) or []
+        if h.get("has_hairnet") is False
+    )
+
+
+class CameraComputeBudget:
+    """单个摄像头检测进程的预算客户端：采集信号、参与分配、发放检测令牌。"""
+
+    def __init__(
+        self,
+        camera_id: str,
+        store: Optional[ComputeBudgetStore] = None,
+        settings: Optional[BudgetSettings] = None,
+        priority: Callable[[], float] = lambda: 1.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.camera_id = camera_id
+        self.store = store or get_compute_budget_store()
+        self.settings = settings or BudgetSettings.from_env()
+        self.priority = priority
+        self._clock = clock
+        self._bucket = TokenBucket()  # 首次分配前不限速
+        self._previous_small: Optional[np.ndarray] = None
+        self._window_start: Optional[float] = None
+        self._window_offered = 0
+        self._next_refresh = 0.0
+        self._store_failed = False
+        self.motion = 0.0
+        self.persons = 0.0
+        self.cost_ms: Optional[float] = None
+        self.max_fps = 0.0
+        self.last_violation_at: Optional[float] = None
+        self.allocation: Optional[Dict[str, Any]] = None
+        self.granted = 0
+        self.denied = 0
+        registry = get_metrics_registry()
+        help_text = "检测令牌发放次数"
+        self._granted_counter = registry.counter(
+            "hbd_detection_tokens_total",
+            {"camera": camera_id, "result": "granted"},
+            help_text,
+        )
+        self._denied_counter = registry.counter(
+            "hbd_detection_tokens_total",
+            {"camera": camera_id, "result": "denied"},
+            help_text,
+        )
+
+    def offer(self, frame: Optional[np.ndarray]) -> bool:
+        """候选检测帧：更新运动信号，返回是否获得检测令牌。"""
+        now = self._clock()
+        if self._window_start is None:
+            self._window_start = now
+        self._window_offered += 1
+        if frame is not None:
+            motion, self._previous_small = frame_motion(self._previous_small, frame)
+            self.motion += EWMA_ALPHA * (motion - self.motion)
+        if now >= self._next_refresh:
+            self.refresh(now)
+        if self._bucket.try_acquire(now):
+            self.granted += 1
+            self._granted_counter.inc()
+            return True
+        self.denied += 1
+        self._denied_counter.inc()
+        return False
+
+    def record_detection(self, seconds: float, result: Any) -> None:
+        """检测完成后更新单帧耗时、人数与违规信号。"""
+        cost_ms = seconds * 1000.0
+        if self.cost_ms is None:
+            self.cost_ms = cost_ms
+        else:
+            self.cost_ms += EWMA_ALPHA * (cost_ms - self.cost_ms)
+        persons = len(getattr(result, "person_detections", None) or [])
+        self.persons += EWMA_ALPHA * (persons - self.persons)
+        if count_violations(result):
+            self.last_violation_at = self._clock()
+
+    def _signals(self, now: float) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "updated_at": now,
+            "priority": float(self.priority()),
+            "motion": self.motion,
+            "persons": self.persons,
+            "violation_active": int(
+                self.last_violation_at is not None
+                and now - self.last_violation_at <= self.settings.violation_hold
+            ),
+            "cost_ms": self.cost_ms or 0.0,
+            "max_fps": self.max_fps,
+            "granted": self.granted,
+            "denied": self.denied,
+        }
+
+    def refresh(self, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """上报信号并重新计算分配（共享状态不可用时不限速）。"""
+        now = self._clock() if now is None else now
+        self._next_refresh = now + self.settings.refresh_interval
+        elapsed = now - (self._window_start or now)
+        if elapsed >= self.settings.refresh_interval * 0.5:
+            offered_fps = self._window_offered / elapsed
+            self.max_fps = (
+                offered_fps
+                if not self.max_fps
+                else self.max_fps + EWMA_ALPHA * (offered_fps - self.max_fps)
+            )
+            self._window_start, self._window_offered = now, 0
+        if not self.max_fps:
+            return None
+
+        try:
+            self.store.report(self.camera_id, self._signals(now))
+            reports = self.store.live(self.settings.stale_after, now=now)
+            allocation = allocate(reports, self.settings).get(self.camera_id)
+            if allocation is not None:
+                self.store.set_allocation(self.camera_id, allocation)
+            self._store_failed = False
+        except Exception as e:
+            if not self._store_failed:
+                logger.warning(f"算力预算共享状态不可用，暂不限速: {e}")
+            self._store_failed = True
+            self._bucket.set_rate(None, 1.0)
+            return None
+        if allocation is None:
+            return None
+
+        previous = self.allocation
+        self.allocation = allocation
+        rate = allocation["allocated_fps"]
+        self._bucket.set_rate(rate, rate * self.settings.burst_seconds)
+        if previous is None or previous["reason"] != allocation["reason"]:
+            logger.info(
+                f"算力预算分配: camera={self.camera_id}, fps={rate:.2f}/"
+                f"{self.max_fps:.2f}, reason={allocation['reason']}, "
+                f"weight={allocation['weight']}, cameras={len(reports)}"
+            )
+        return allocation
+
+    def close(self) -> None:
+        """退出时移除本摄像头，释放预算给其他摄像头。"""
+        try:
+            self.store.remove(self.camera_id)
+        except Exception as e:
+            logger.debug(f"移除算力预算记录失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "camera_id": self.camera_id,
+            "motion": round(self.motion, 4),
+            "persons": round(self.persons, 2),
+            "cost_ms": round(self.cost_ms, 2) if self.cost_ms else None,
+            "max_fps": round(self.max_fps, 2),
+            "granted": self.granted,
+            "denied": self.denied,
+            "allocation": self.allocation,
+        }
+
+
+def create_camera_budget(
+    camera_id: str, priority: Callable[[], float] = lambda: 1.0
+) -> Optional[CameraComputeBudget]:
+    """为检测进程创建预算客户端，未启用时返回 None。"""
+    settings = BudgetSettings.from_env()
+    if not settings.enabled:
+        return None
+    return CameraComputeBudget(camera_id, settings=settings, priority=priority)
@@ -0,0 +1,424 @@
+"""检测进程配置快照（版本化、推送失效）.
+
+每个检测进程持有一份不可变的配置快照（运行时配置、检测参数、区域），
+热路径上的读取只是字典查找，不再访问Redis/PostgreSQL。
+
+配置变更通知（config_change）携带按作用域（global / camera:{camera_id}）
+单调递增的版本号，作为增量应用到快照；发现版本缺口（丢消息、订阅断开）
+时回退为全量重新同步。每个应用的版本都会记录日志，便于比对多个检测进程
+之间的配置漂移。
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field, replace
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.infrastructure.notifications.config_change_notifier import (
+    config_scope,
+    config_version_key,
+)
+
+logger = logging.getLogger(__name__)
+
+CONFIG_TYPE_RUNTIME = "runtime"
+CONFIG_TYPE_REGIONS = "regions"
+
+# apply() 的返回状态
+STATUS_APPLIED = "applied"
+STATUS_STALE = "stale"
+STATUS_GAP = "gap"
+STATUS_BUFFERED = "buffered"
+STATUS_IGNORED = "ignored"
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """某一时刻的完整配置（只读；更新时整体替换）"""
+
+    versions: Dict[str, int] = field(default_factory=dict)
+    runtime: Dict[str, Any] = field(default_factory=dict)
+    detection: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    regions: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    updated_at: float = 0.0
+
+    def get_runtime(self, key: str, default: Any = None) -> Any:
+        return self.runtime.get(key, default)
+
+    def get_detection(self, config_type: str, key: str, default: Any = None) -> Any:
+        return self.detection.get(config_type, {}).get(key, default)
+
+
+def build_regions(regions: Dict[str, Dict[str, Any]]) -> List[Any]:
+    """将快照中的区域字典构建为启用的 Region 对象（无效区域跳过）"""
+    from src.core.region import Region, RegionType
+
+    built = []
+    for region_id, data in regions.items():
+        if not data.get("is_active", True):
+            continue
+        try:
+            region = Region(
+                region_id=data.get("region_id", region_id),
+                region_type=RegionType(data["region_type"]),
+                polygon=[(float(p[0]), float(p[1])) for p in data["polygon"]],
+                name=data.get("name", ""),
+            )
+        except (KeyError, TypeError, ValueError, IndexError) as e:
+            logger.warning(f"忽略无效区域配置: region_id={region_id}, error={e}")
+            continue
+        if len(region.polygon) < 3:
+            continue
+        region.rules.update(data.get("rules") or {})
+        built.append(region)
+    return built
+
+
+SnapshotLoader = Callable[[str], Awaitable[Optional[Dict[str, Any]]]]
+VersionReader = Callable[[str], Awaitable[Dict[str, int]]]
+
+
+def _coerce_runtime_value(value: Any) -> Any:
+    """运行时配置经Redis传输时为字符串，尽量还原为整数"""
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    return value
+
+
+async def read_config_versions(camera_id: str) -> Dict[str, int]:
+    """读取全局与相机作用域的当前配置版本号"""
+    from src.infrastructure.connection_fabric import get_shared_redis
+
+    client = get_shared_redis(decode_responses=True)
+    if client is None:
+        return {}
+
+    global_version, camera_version = await client.mget(
+        config_version_key(None), config_version_key(camera_id)
+    )
+    return {
+        config_scope(None): int(global_version or 0),
+        config_scope(camera_id): int(camera_version or 0),
+    }
+
+
+async def load_config_snapshot(camera_id: str) -> Optional[Dict[str, Any]]:
+    """从权威数据源全量加载配置
+
+    先读取版本号再读取数据：加载期间到达的增量版本号必然更大，会在加载完成后重放。
+    某一部分加载失败时返回 None，保留快照中原有的该部分；数据库部分加载失败时
+    不采用远端版本号（versions 为空），否则缺失的变更会被视为已应用，
+    版本探测会在稍后重试全量同步。
+    """
+    try:
+        versions = await read_config_versions(camera_id)
+    except Exception as e:
+        logger.warning(f"读取配置版本号失败: {e}")
+        versions = {}
+
+    from src.infrastructure.notifications.redis_config_sync import (
+        get_camera_config_from_redis_async,
+    )
+
+    runtime = await get_camera_config_from_redis_async(camera_id)
+
+    detection: Optional[Dict[str, Dict[str, Any]]] = None
+    regions: Optional[Dict[str, Dict[str, Any]]] = None
+    try:
+        from src.domain.services.detection_config_service import DetectionConfigService
+        from src.domain.services.region_service import RegionDomainService
+        from src.infrastructure.repositories.postgresql_detection_config_repository import (
+            PostgreSQLDetectionConfigRepository,
+        )
+        from src.infrastructure.repositories.postgresql_region_repository import (
+            PostgreSQLRegionRepository,
+        )
+        from src.services.database_service import get_db_service
+
+        db = await get_db_service()
+        if db.pool:
+            detection = await DetectionConfigService(
+                PostgreSQLDetectionConfigRepository(db.pool)
+            ).get_all_configs(camera_id)
+            region_list = await RegionDomainService(
+                PostgreSQLRegionRepository(db.pool)
+            ).get_regions_by_camera_id(camera_id)
+            regions = {r["region_id"]: r for r in region_list}
+    except Exception as e:
+        logger.warning(f"从数据库加载检测配置/区域失败（保留现有快照）: {e}")
+
+    if detection is None or regions is None:
+        versions = {}
+
+    return {
+        "versions": versions,
+        "runtime": runtime,
+        "detection": detection,
+        "regions": regions,
+    }
+
+
+class ConfigSnapshotStore:
+    """
+    检测进程的配置快照存储
+
+    Args:
+        camera_id: 摄像头ID
+        loader: 全量加载函数（默认从Redis/PostgreSQL加载）
+        version_reader: 版本号读取函数（用于周期性探测漏掉的变更）
+        on_resync: 全量同步完成后的回调 (old_snapshot, new_snapshot)
+        probe_interval: 版本探测间隔（秒），<=0 表示不探测
+        resync_timeout: 单次全量同步超时（秒）
+    """
+
+    def __init__(
+        self,
+        camera_id: str,
+        loader: Optional[SnapshotLoader] = None,
+        version_reader: Optional[VersionReader] = None,
+        on_resync: Optional[Callable[[ConfigSnapshot, ConfigSnapshot], None]] = None,
+        probe_interval: Optional[float] = None,
+        resync_timeout: float = 10.0,
+    ):
+        self.camera_id = camera_id
+        self.loader = loader or load_config_snapshot
+        self.version_reader = version_reader or read_config_versions
+        self.on_resync = on_resync
+        self.probe_interval = (
+            float(os.getenv("CONFIG_SNAPSHOT_PROBE_INTERVAL", "30"))
+            if probe_interval is None
+            else probe_interval
+        )
+        self.resync_timeout = resync_timeout
+
+        self._snapshot = ConfigSnapshot()
+        self._resyncing = False
+        self._buffered: List[Dict[str, Any]] = []
+        self._resync_lock = asyncio.Lock()
+        self._resync_task: Optional[asyncio.Task] = None
+        self._probe_task: Optional[asyncio.Task] = None
+        self.history: deque = deque(maxlen=200)
+        self.stats = {
+            "applied": 0,
+            "stale": 0,
+            "gaps": 0,
+            "resyncs": 0,
+            "resync_failures": 0,
+        }
+
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        """当前快照（读取无需加锁）"""
+        return self._snapshot
+
+    # ---------------- 增量 ----------------
+
+    def apply(self, notification: Dict[str, Any]) -> str:  # noqa: C901
+        """应用一条配置变更通知，返回处理状态"""
+        if notification.get("type") != "config_change":
+            return STATUS_IGNORED
+        camera_id = notification.get("camera_id")
+        if camera_id is not None and camera_id != self.camera_id:
+            return STATUS_IGNORED
+
+        if self._resyncing:
+            # 全量同步期间到达的增量在同步完成后按版本重放
+            self._buffered.append(notification)
+            return STATUS_BUFFERED
+
+        scope = notification.get("scope") or config_scope(camera_id)
+        version = notification.get("version")
+        current = self._snapshot.versions.get(scope, 0)
+        if version is not None:
+            version = int(version)
+            if version <= current:
+                self.stats["stale"] += 1
+                return STATUS_STALE
+            if version != current + 1:
+                self.stats["gaps"] += 1
+                logger.warning(
+                    f"配置版本缺口: camera={self.camera_id}, scope={scope}, "
+                    f"local={current}, received={version}，将全量重新同步"
+                )
+                self.request_resync()
+                return STATUS_GAP
+
+        config_type = notification.get("config_type")
+        config_key = notification.get("config_key")
+        value = notification.get("config_value")
+        deleted = notification.get("change_type") == "delete"
+
+        snapshot = self._snapshot
+        changes: Dict[str, Any] = {}
+        if config_type == CONFIG_TYPE_RUNTIME:
+            runtime = dict(snapshot.runtime)
+            if deleted:
+                runtime.pop(config_key, None)
+            else:
+                runtime[config_key] = _coerce_runtime_value(value)
+                # 与 sync_camera_config_to_redis 一致：推流间隔跟随检测间隔
+                if config_key == "log_interval":
+                    runtime["stream_interval"] = runtime[config_key]
+            changes["runtime"] = runtime
+        elif config_type == CONFIG_TYPE_REGIONS:
+            regions = dict(snapshot.regions)
+            if (
+                deleted
+                or value is None
+                # 关联到其他相机的区域不进入本相机快照（改关联时从原相机移除）
+                or value.get("camera_id") not in (None, self.camera_id)
+            ):
+                regions.pop(config_key, None)
+            else:
+                regions[config_key] = value
+            changes["regions"] = regions
+        elif config_type:
+            detection = dict(snapshot.detection)
+            section = dict(detection.get(config_type, {}))
+            if deleted:
+                section.pop(config_key, None)
+            else:
+                section[config_key] = value
+            detection[config_type] = section
+            changes["detection"] = detection
+
+        if version is not None:
+            changes["versions"] = {**snapshot.versions, scope: version}
+        self._snapshot = replace(snapshot, updated_at=time.time(), **changes)
+
+        self.stats["applied"] += 1
+        self.history.append(
+            {
+                "scope": scope,
+                "version": version,
+                "config_type": config_type,
+                "config_key": config_key,
+                "change_type": notification.get("change_type", "update"),
+                "applied_at": self._snapshot.updated_at,
+            }
+        )
+        logger.info(
+            f"配置版本已应用: camera={self.camera_id}, scope={scope}, "
+            f"version={version}, {config_type}.{config_key}"
+        )
+        return STATUS_APPLIED
+
+    # ---------------- 全量同步 ----------------
+
+    async def resync(self) -> bool:
+        """从权威数据源全量加载并替换快照"""
+        async with self._resync_lock:
+            self._resyncing = True
+            try:
+                loaded = await asyncio.wait_for(
+                    self.loader(self.camera_id), timeout=self.resync_timeout
+                )
+            except Exception as e:
+                loaded = None
+                logger.warning(f"配置全量同步失败: camera={self.camera_id}, error={e}")
+            finally:
+                self._resyncing = False
+
+            buffered, self._buffered = self._buffered, []
+            if loaded is None:
+                self.stats["resync_failures"] += 1
+                for notification in buffered:
+                    self.apply(notification)
+                return False
+
+            old = self._snapshot
+            self._snapshot = ConfigSnapshot(
+                versions=dict(loaded.get("versions") or old.versions),
+                runtime=dict(
+                    old.runtime if loaded.get("runtime") is None else loaded["runtime"]
+                ),
+                detection=dict(
+                    old.detection
+                    if loaded.get("detection") is None
+                    else loaded["detection"]
+                ),
+                regions=dict(
+                    old.regions if loaded.get("regions") is None else loaded["regions"]
+                ),
+                updated_at=time.time(),
+            )
+            self.stats["resyncs"] += 1
+            logger.info(
+                f"配置全量同步完成: camera={self.camera_id}, "
+                f"versions={self._snapshot.versions}, "
+                f"detection_types={len(self._snapshot.detection)}, "
+                f"regions={len(self._snapshot.regions)}"
+            )
+
+            for notification in sorted(
+                buffered, key=lambda n: (n.get("scope") or "", n.get("version") or 0)
+            ):
+                self.apply(notification)
+
+        if self.on_resync:
+            try:
+                self.on_resync(old, self._snapshot)
+            except Exception as e:
+                logger.error(f"执行配置同步回调失败: {e}")
+        return True
+
+    def request_resync(self) -> None:
+        """在后台安排一次全量同步（已有同步进行中则忽略）"""
+        if self._resync_task is not None and not self._resync_task.done():
+            return
+        try:
+            self._resync_task = asyncio.get_running_loop().create_task(self.resync())
+        except RuntimeError:
+            logger.debug("无运行中的事件循环，跳过全量同步")
+
+    async def check_versions(self) -> bool:
+        """探测远端版本号，落后时全量同步（用于发现整段丢失的通知）"""
+        try:
+            remote = await self.version_reader(self.camera_id)
+        except Exception as e:
+            logger.debug(f"读取配置版本号失败: {e}")
+            return False
+        local = self._snapshot.versions
+        if any(version > local.get(scope, 0) for scope, version in remote.items()):
+            logger.info(f"配置版本落后: local={local}, remote={remote}，全量重新同步")
+            return await self.resync()
+        return False
+
+    # ---------------- 生命周期 ----------------
+
+    async def start(self) -> None:
+        """首次全量同步并启动版本探测"""
+        await self.resync()
+        if self.probe_interval > 0 and self._probe_task is None:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def stop(self) -> None:
+        for task in (self._probe_task, self._resync_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._probe_task = None
+        self._resync_task = None
+
+    async def _probe_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            await self.check_versions()
+
+    def get_stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            **self.stats,
+            "versions": dict(snapshot.versions),
+            "updated_at": snapshot.updated_at,
+            "recent": list(self.history)[-10:],
+        }
@@ -63,23 +63,70 @@ class DatasetGenerationService:
         if not snapshot_entries:
             raise ValueError("未找到符合条件的检测快照，无法生成数据集")
 
-        copied_files = await self._copy_snapshots(snapshot_entries, images_dir)
-        annotation_path = await self._write_annotations(
+        return await self._build_dataset(
+            request.dataset_name,
             dataset_dir,
             snapshot_entries,
+            session,
+            description="Generated from detection snapshots",
+            tags=["generated"],
+        )
+
+    async def generate_from_review_queue(
+        self,
+        dataset_name: str,
+        entries: List[Dict[str, object]],
+        session: AsyncSession,
+    ) -> Dict[str, object]:
+        """
+        用难例审核队列中已通过的样本生成数据集。
+
+        entries 为快照条目（见 hard_example_mining.review_item_to_entry），
+        violation_type / has_violation 取自人工审核结果。
+        """
+
+        if not entries:
+            raise ValueError("没有已审核通过的难例样本，无法生成数据集")
+
+        dataset_dir = self._prepare_dataset_directory(dataset_name)
+        (dataset_dir / "images").mkdir(parents=True, exist_ok=True)
+        return await self._build_dataset(
+            dataset_name,
+            dataset_dir,
+            entries,
+            session,
+            description="Generated from reviewed hard examples",
+            tags=["generated", "hard_examples"],
+        )
+
+    async def _build_dataset(
+        self,
+        dataset_name: str,
+        dataset_dir: Path,
+        snapshot_entries: List[Dict[str, object]],
+        session: AsyncSession,
+        description: str,
+        tags: List[str],
+    ) -> Dict[str, object]:
+        copied_files = await self._copy_snapshots(
+            snapshot_entries, dataset_dir / "images"
+        )
+        annotation_path = await self._write_annotations(
+            dataset_dir,
+            [e for e in snapshot_entries if "dataset_image_name" in e],
         )
 
         dataset_size = sum(dest.stat().st_size for _, dest in copied_files)
 
         dataset_data = {
             "id": f"dataset_{int(datetime.utcnow().timestamp())}",
-            "name": request.dataset_name,
+            "name": dataset_name,
             "version": datetime.utcnow().strftime("%Y%m%d%H%M%S"),
             "status": "active",
             "size": dataset_size,
-            "description": "Generated from detection snapshots",
+            "description": description,
             "file_path": str(dataset_dir),
-            "tags": ["generated"],
+            "tags": tags,
         }
 
         dataset = await DatasetDAO.create(session, dataset_data)
@@ -0,0 +1,741 @@
+"""
+数据集入库：上传落盘、可续传上传、压缩包检查与解压。
+
+- spool_upload：分块读取 UploadFile 写入磁盘并同时计算 SHA-256；
+- UploadSessionStore：可续传上传会话（<DATASET_UPLOAD_DIR>/<upload_id>/），
+  已接收的偏移量就是 data.part 的文件大小，连接中断后从该偏移继续；
+  追加写入持有会话目录下的文件锁，多个 API 进程不会同时写同一会话；
+- inspect_archive：只读 zip 中央目录 / tar 头部，按条目数、解压总大小、压缩比
+  拒绝压缩炸弹，拒绝路径穿越、链接与设备文件；
+- extract_archive：逐条目流式解压，按实际写入字节数再次校验限制（zip 读到
+  条目末尾时校验 CRC）；
+- DatasetIngestionService：在专用线程池中执行检查与解压，进度写入
+  <DATASET_INGEST_JOB_DIR>/<job_id>.json，任一 API 进程都能查询。
+
+所有读写都是固定大小的分块，峰值内存与上传/压缩包大小无关。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import stat
+import tarfile
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Union,
+)
+
+from fastapi import UploadFile
+
+from src.application.training_jobs import (
+    _pid_alive,
+    _process_started_at,
+    write_json_atomic,
+)
+from src.utils.file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 20
+SESSION_FILE = "upload.json"
+PART_FILE = "data.part"
+SESSION_LOCK_FILE = ".append.lock"
+# 解压进度落盘的最小间隔（秒），开始与结束时总是写入
+JOB_WRITE_INTERVAL = 0.5
+# 小于该大小的条目不做单条压缩比检查（小文本文件压缩比天然很高）
+RATIO_CHECK_MIN_BYTES = 1 << 20
+
+ArchiveSource = Union[str, Path, IO[bytes]]
+ProgressCallback = Callable[[int, int], None]
+
+
+class IngestionError(ValueError):
+    """数据集入库失败（客户端可修正的错误）。"""
+
+
+class ArchiveRejected(IngestionError):
+    """压缩包未通过安全检查（路径穿越、链接、超出限制等）。"""
+
+
+class UploadOffsetMismatch(IngestionError):
+    """续传偏移量与服务器已接收的字节数不一致。"""
+
+    def __init__(self, expected: int) -> None:
+        super().__init__(f"上传偏移量不一致，服务器已接收 {expected} 字节")
+        self.expected = expected
+
+
+@dataclass
+class ArchiveLimits:
+    """压缩包限制（解压后总大小、条目数、压缩比）与单次上传大小上限。"""
+
+    max_entries: int = 200_000
+    max_total_bytes: int = 50 << 30
+    max_ratio: float = 100.0
+    max_upload_bytes: int = 20 << 30
+
+    @classmethod
+    def from_env(cls) -> "ArchiveLimits":
+        return cls(
+            max_entries=int(os.getenv("DATASET_ARCHIVE_MAX_ENTRIES", "200000")),
+            max_total_bytes=int(os.getenv("DATASET_ARCHIVE_MAX_BYTES", str(50 << 30))),
+            max_ratio=float(os.getenv("DATASET_ARCHIVE_MAX_RATIO", "100")),
+            max_upload_bytes=int(os.getenv("DATASET_UPLOAD_MAX_BYTES", str(20 << 30))),
+        )
+
+
+@dataclass
+class SpooledUpload:
+    path: Path
+    size: int
+    sha256: str
+
+
+@dataclass
+class ArchiveReport:
+    format: str
+    entries: int
+    total_bytes: int
+    compressed_bytes: int
+    has_data_yaml: bool
+
+
+def archive_format(filename: str) -> Optional[str]:
+    """按文件名识别压缩包格式：zip / tar / tar.gz，其他返回 None。"""
+    name = filename.lower()
+    if name.endswith(".zip"):
+        return "zip"
+    if name.endswith((".tar.gz", ".tgz")):
+        return "tar.gz"
+    if name.endswith(".tar"):
+        return "tar"
+    return None
+
+
+def safe_member_path(name: str) -> str:
+    """规范化压缩包内路径；绝对路径、盘符或包含 .. 时拒绝。"""
+    normalized = name.replace("\\", "/")
+    if normalized.startswith("/") or re.match(r"^[A-Za-z]:", normalized):
+        raise ArchiveRejected(f"压缩包包含绝对路径: {name}")
+    parts = [p for p in normalized.split("/") if p not in ("", ".")]
+    if ".." in parts:
+        raise ArchiveRejected(f"压缩包包含路径穿越: {name}")
+    return "/".join(parts)
+
+
+def _source_size(source: ArchiveSource) -> int:
+    if isinstance(source, (str, Path)):
+        return os.path.getsize(source)
+    position = source.tell()
+    source.seek(0, os.SEEK_END)
+    size = source.tell()
+    source.seek(position)
+    return size
+
+
+def _open_tar(source: ArchiveSource, fmt: str) -> tarfile.TarFile:
+    mode = "r:gz" if fmt == "tar.gz" else "r:"
+    if isinstance(source, (str, Path)):
+        return tarfile.open(str(source), mode)
+    source.seek(0)
+    return tarfile.open(fileobj=source, mode=mode)
+
+
+class _Budget:
+    """按条目累计解压大小并检查限制。"""
+
+    def __init__(self, limits: ArchiveLimits, compressed_bytes: int) -> None:
+        self.limits = limits
+        self.compressed_bytes = max(compressed_bytes, 1)
+        self.entries = 0
+        self.total_bytes = 0
+
+    def add_entry(self, name: str, size: int, compressed: Optional[int]) -> None:
+        self.entries += 1
+        if self.entries > self.limits.max_entries:
+            raise ArchiveRejected(f"压缩包条目数超过上限 {self.limits.max_entries}")
+        self.total_bytes += size
+        if self.total_bytes > self.limits.max_total_bytes:
+            raise ArchiveRejected(f"压缩包解压后大小超过上限 {self.limits.max_total_bytes} 字节")
+        if (
+            compressed is not None
+            and size >= RATIO_CHECK_MIN_BYTES
+            and size / max(compressed, 1) > self.limits.max_ratio
+        ):
+            raise ArchiveRejected(f"压缩比异常（疑似压缩炸弹）: {name}")
+        if (
+            self.total_bytes >= RATIO_CHECK_MIN_BYTES
+            and self.total_bytes / self.compressed_bytes > self.limits.max_ratio
+        ):
+            raise ArchiveRejected("压缩包整体压缩比异常（疑似压缩炸弹）")
+
+
+def _check_zip_info(info: zipfile.ZipInfo) -> str:
+    name = safe_member_path(info.filename)
+    if stat.S_ISLNK(info.external_attr >> 16):
+        raise ArchiveRejected(f"压缩包包含符号链接: {info.filename}")
+    if info.flag_bits & 0x1:
+        raise ArchiveRejected(f"压缩包包含加密条目: {info.filename}")
+    return name
+
+
+def _check_tar_member(member: tarfile.TarInfo) -> str:
+    name = safe_member_path(member.name)
+    if not (member.isfile() or member.isdir()):
+        raise ArchiveRejected(f"压缩包包含链接或特殊文件: {member.name}")
+    return name
+
+
+def inspect_archive(
+    source: ArchiveSource,
+    filename: str,
+    limits: Optional[ArchiveLimits] = None,
+) -> ArchiveReport:
+    """检查压缩包元数据（不解压数据），不合规时抛出 ArchiveRejected。"""
+    limits = limits or ArchiveLimits.from_env()
+    fmt = archive_format(filename)
+    if fmt is None:
+        raise ArchiveRejected(f"不支持的压缩包格式: {filename}")
+    compressed = _source_size(source)
+    budget = _Budget(limits, compressed)
+    has_yaml = False
+    try:
+        if fmt == "zip":
+            with zipfile.ZipFile(source) as zf:
+                infos = zf.infolist()
+                if len(infos) > limits.max_entries:
+                    raise ArchiveRejected(f"压缩包条目数超过上限 {limits.max_entries}")
+                for info in infos:
+                    name = _check_zip_info(info)
+                    if info.is_dir():
+                        continue
+                    budget.add_entry(name, info.file_size, info.compress_size)
+                    has_yaml = has_yaml or name.rsplit("/", 1)[-1] in (
+                        "data.yaml",
+                        "data.yml",
+                    )
+        else:
+            with _open_tar(source, fmt) as tf:
+                for member in tf:
+                    name = _check_tar_member(member)
+                    tf.members.clear()  # 不保留成员列表，条目数再多内存也不增长
+                    if member.isdir():
+                        continue
+                    budget.add_entry(name, member.size, None)
+                    has_yaml = has_yaml or name.rsplit("/", 1)[-1] in (
+                        "data.yaml",
+                        "data.yml",
+                    )
+    except zipfile.BadZipFile as e:
+        raise ArchiveRejected(f"不是有效的 ZIP 文件格式: {e}") from e
+    except (tarfile.TarError, EOFError) as e:
+        raise ArchiveRejected(f"TAR 文件格式错误: {e}") from e
+    finally:
+        if not isinstance(source, (str, Path)):
+            source.seek(0)
+    return ArchiveReport(
+        format=fmt,
+        entries=budget.entries,
+        total_bytes=budget.total_bytes,
+        compressed_bytes=compressed,
+        has_data_yaml=has_yaml,
+    )
+
+
+def _copy_member(
+    src: IO[bytes],
+    target: Path,
+    declared_size: int,
+    on_bytes: Callable[[int], None],
+) -> None:
+    tmp = target.with_name(target.name + ".extracting")
+    written = 0
+    try:
+        with open(tmp, "wb") as dst:
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > declared_size:
+                    raise ArchiveRejected(f"条目实际大小超过声明大小: {target.name}")
+                dst.write(chunk)
+                on_bytes(len(chunk))
+        os.replace(tmp, target)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def extract_archive(
+    path: Path,
+    dest: Path,
+    limits: Optional[ArchiveLimits] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> ArchiveReport:
+    """检查后逐条目流式解压到 dest；progress(已写入字节, 预计总字节)。"""
+    limits = limits or ArchiveLimits.from_env()
+    report = inspect_archive(path, path.name, limits)
+    dest = Path(dest)
+    dest.mkdir(parents=True, exist_ok=True)
+    root = dest.resolve()
+    done = 0
+
+    def on_bytes(n: int) -> None:
+        nonlocal done
+        done += n
+        if done > limits.max_total_bytes:
+            raise ArchiveRejected("解压数据超过大小上限")
+        if progress:
+            progress(done, report.total_bytes)
+
+    def target_for(name: str) -> Path:
+        target = (dest / name).resolve()
+        if target != root and root not in target.parents:
+            raise ArchiveRejected(f"压缩包条目解压路径越界: {name}")
+        return target
+
+    if report.format == "zip":
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                name = _check_zip_info(info)
+                if not name:
+                    continue
+                target = target_for(name)
+                if info.is_dir():
+                    target.mkdir(parents=True, exist_ok=True)
+                    continue
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with zf.open(info) as src:
+                    _copy_member(src, target, info.file_size, on_bytes)
+    else:
+        with _open_tar(path, report.format) as tf:
+            for member in tf:
+                name = _check_tar_member(member)
+                tf.members.clear()
+                if not name:
+                    continue
+                target = target_for(name)
+                if member.isdir():
+                    target.mkdir(parents=True, exist_ok=True)
+                    continue
+                target.parent.mkdir(parents=True, exist_ok=True)
+                src = tf.extractfile(member)
+                with src:
+                    _copy_member(src, target, member.size, on_bytes)
+    if progress:
+        progress(done, report.total_bytes)
+    return report
+
+
+def file_sha256(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+async def spool_upload(
+    upload: UploadFile,
+    target: Path,
+    max_bytes: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> SpooledUpload:
+    """分块把上传文件写入 target，同时计算 SHA-256；超过 max_bytes 时中止。"""
+    hasher = hashlib.sha256()
+    size = 0
+    part = target.with_name(target.name + ".part")
+    try:
+        with open(part, "wb") as out:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise IngestionError(f"上传文件超过大小上限 {max_bytes} 字节")
+                hasher.update(chunk)
+                await asyncio.to_thread(out.write, chunk)
+        os.replace(part, target)
+    finally:
+        if part.exists():
+            part.unlink()
+    return SpooledUpload(path=target, size=size, sha256=hasher.hexdigest())
+
+
+class UploadSessionStore:
+    """可续传上传会话（会话元数据 upload.json + 数据 data.part）。"""
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        limits: Optional[ArchiveLimits] = None,
+        max_age_seconds: Optional[float] = None,
+    ) -> None:
+        self.root = Path(root or os.getenv("DATASET_UPLOAD_DIR", "data/uploads"))
+        self.limits = limits or ArchiveLimits.from_env()
+        self.max_age_seconds = (
+            max_age_seconds
+            if max_age_seconds is not None
+            else float(os.getenv("DATASET_UPLOAD_MAX_AGE_SECONDS", str(7 * 86400)))
+        )
+
+    def _dir(self, upload_id: str) -> Path:
+        if not re.fullmatch(r"[0-9a-f]{32}", upload_id):
+            raise KeyError(upload_id)
+        return self.root / upload_id
+
+    def create(
+        self, filename: str, total_size: int, sha256: Optional[str] = None
+    ) -> Dict[str, Any]:
+        name = Path(filename.replace("\\", "/")).name
+        if not name:
+            raise IngestionError("文件名不能为空")
+        if total_size < 0 or total_size > self.limits.max_upload_bytes:
+            raise IngestionError(f"上传文件超过大小上限 {self.limits.max_upload_bytes} 字节")
+        self.purge_expired()
+        upload_id = uuid.uuid4().hex
+        session_dir = self.root / upload_id
+        session_dir.mkdir(parents=True, exist_ok=True)
+        (session_dir / PART_FILE).touch()
+        session = {
+            "upload_id": upload_id,
+            "filename": name,
+            "total_size": total_size,
+            "sha256": sha256.lower() if sha256 else None,
+            "created_at": time.time(),
+        }
+        write_json_atomic(session_dir / SESSION_FILE, session)
+        return {**session, "offset": 0}
+
+    def get(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            session_dir = self._dir(upload_id)
+            with open(session_dir / SESSION_FILE, "r", encoding="utf-8") as f:
+                session = json.load(f)
+            session["offset"] = (session_dir / PART_FILE).stat().st_size
+        except (KeyError, OSError, ValueError):
+            return None
+        return session
+
+    async def append(
+        self, upload_id: str, offset: int, chunks: AsyncIterator[bytes]
+    ) -> int:
+        """从 offset 追加数据，返回新的偏移量；连接中断时已写入部分保留。"""
+        session = self.get(upload_id)
+        if session is None:
+            raise KeyError(upload_id)
+        session_dir = self._dir(upload_id)
+        with file_lock(session_dir / SESSION_LOCK_FILE, blocking=False) as locked:
+            part = session_dir / PART_FILE
+            current = part.stat().st_size
+            if not locked or offset != current:
+                # 其他请求（可能在另一个进程）正在追加，客户端按返回的偏移重试
+                raise UploadOffsetMismatch(current)
+            with open(part, "ab") as out:
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    if current + len(chunk) > session["total_size"]:
+                        raise IngestionError("上传数据超过声明的文件大小")
+                    await asyncio.to_thread(out.write, chunk)
+                    current += len(chunk)
+        return current
+
+    async def finalize(self, upload_id: str, target: Path) -> SpooledUpload:
+        """校验大小与 SHA-256 后把数据移动到 target，并删除会话。"""
+        session = self.get(upload_id)
+        if session is None:
+            raise KeyError(upload_id)
+        if session["offset"] != session["total_size"]:
+            raise UploadOffsetMismatch(session["offset"])
+        part = self._dir(upload_id) / PART_FILE
+        digest = await asyncio.to_thread(file_sha256, part)
+        if session["sha256"] and digest != session["sha256"]:
+            raise IngestionError("上传文件 SHA-256 校验失败")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(shutil.move, str(part), str(target))
+        self.discard(upload_id)
+        return SpooledUpload(path=target, size=session["total_size"], sha256=digest)
+
+    def discard(self, upload_id: str) -> None:
+        try:
+            shutil.rmtree(self._dir(upload_id), ignore_errors=True)
+        except KeyError:
+            pass
+
+    def purge_expired(self) -> int:
+        """删除超过保留时间仍未完成的上传会话。"""
+        if not self.root.exists():
+            return 0
+        cutoff = time.time() - self.max_age_seconds
+        removed = 0
+        for session_dir in self.root.iterdir():
+            try:
+                if session_dir.stat().st_mtime >= cutoff:
+                    continue
+                with file_lock(session_dir / SESSION_LOCK_FILE, blocking=False) as free:
+                    if free:  # 正在追加的会话不删除
+                        shutil.rmtree(session_dir, ignore_errors=True)
+                        removed += 1
+            except OSError:
+                continue
+        if removed:
+            logger.info(f"已清理过期上传会话: {removed}")
+        return removed
+
+
+class DatasetIngestionService:
+    """
+    在专用线程池中检查并解压数据集压缩包，记录每个入库任务的进度。
+
+    任务记录以 JSON 文件保存在 root 目录（而不是数据集目录内，避免被计入数据集清单），
+    多 worker 部署时任一进程都能查询；执行任务的进程退出后，未完成的任务按失败返回。
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        limits: Optional[ArchiveLimits] = None,
+        max_history: int = 100,
+        root: Optional[str] = None,
+    ) -> None:
+        self.limits = limits or ArchiveLimits.from_env()
+        self.workers = workers or int(os.getenv("DATASET_INGEST_WORKERS", "2"))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="dataset-ingest"
+        )
+        self.root = Path(
+            root or os.getenv("DATASET_INGEST_JOB_DIR", "data/ingestion_jobs")
+        )
+        self.root.mkdir(parents=True, exist_ok=True)
+        # 本进程执行中的任务（最新进度以内存为准）
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._written_at: Dict[str, float] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.max_history = max_history
+
+    def _path(self, job_id: str) -> Path:
+        if not re.fullmatch(r"[0-9a-f]{32}", job_id):
+            raise KeyError(job_id)
+        return self.root / f"{job_id}.json"
+
+    def _save(self, job: Dict[str, Any], force: bool = True) -> None:
+        now = time.monotonic()
+        last = self._written_at.get(job["job_id"])
+        if not force and last is not None and now - last < JOB_WRITE_INTERVAL:
+            return
+        self._written_at[job["job_id"]] = now
+        try:
+            write_json_atomic(self._path(job["job_id"]), job)
+        except OSError as e:
+            logger.warning(f"保存入库任务进度失败: {job['job_id']}, {e}")
+
+    def _load(self, path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if job.get("status") in ("queued", "running") and not _pid_alive(
+            job.get("pid"), job.get("pid_started_at")
+        ):
+            job["status"] = "failed"
+            job["error"] = "执行入库任务的进程已退出"
+        return job
+
+    def _new_job(self, dataset_id: str, archives: List[Path]) -> Dict[str, Any]:
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "dataset_id": dataset_id,
+            "status": "queued",
+            "archives": [p.name for p in archives],
+            "current_archive": None,
+            "bytes_done": 0,
+            "bytes_total": 0,
+            "progress": 0.0,
+            "entries": 0,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": None,
+            "pid": os.getpid(),
+            "pid_started_at": _process_started_at(os.getpid()),
+        }
+        self._jobs[job["job_id"]] = job
+        self._save(job)
+        self._prune_history()
+        return job
+
+    def _prune_history(self) -> None:
+        """只保留最近 max_history 个已结束任务的记录。"""
+        finished = [
+            job
+            for job in self.list_jobs()
+            if job["status"] not in ("queued", "running")
+        ]
+        for job in finished[self.max_history :]:
+            self._path(job["job_id"]).unlink(missing_ok=True)
+
+    def _extract_all(
+        self, job: Dict[str, Any], archives: List[Path], dest: Path, remove: bool
+    ) -> None:
+        job["status"] = "running"
+        self._save(job)
+        base_done = 0
+        for archive in archives:
+            job["current_archive"] = archive.name
+
+            def progress(done: int, total: int) -> None:
+                job["bytes_done"] = base_done + done
+                job["bytes_total"] = max(job["bytes_total"], base_done + total)
+                if job["bytes_total"]:
+                    job["progress"] = round(job["bytes_done"] / job["bytes_total"], 4)
+                self._save(job, force=False)
+
+            report = extract_archive(archive, dest, self.limits, progress)
+            base_done += report.total_bytes
+            job["entries"] += report.entries
+            if remove:
+                archive.unlink(missing_ok=True)
+
+    async def ingest(
+        self,
+        dataset_id: str,
+        archives: List[Path],
+        dest: Path,
+        remove_archives: bool = False,
+    ) -> Dict[str, Any]:
+        """解压压缩包并等待完成，返回任务记录（失败时 status=failed）。"""
+        job = self._new_job(dataset_id, archives)
+        await self._run(job, archives, dest, remove_archives)
+        return job
+
+    def start(
+        self,
+        dataset_id: str,
+        archives: List[Path],
+        dest: Path,
+        remove_archives: bool = True,
+        on_complete: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+    ) -> Dict[str, Any]:
+        """后台解压，立即返回任务记录；完成后调用 on_complete(job)。"""
+        job = self._new_job(dataset_id, archives)
+
+        async def run() -> None:
+            await self._run(job, archives, dest, remove_archives)
+            if on_complete is not None:
+                try:
+                    await on_complete(job)
+                except Exception as e:
+                    logger.error(f"数据集入库完成回调失败: {job['job_id']}, {e}")
+
+        task = asyncio.get_running_loop().create_task(run())
+        self._tasks[job["job_id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job["job_id"], None))
+        return job
+
+    async def _run(
+        self, job: Dict[str, Any], archives: List[Path], dest: Path, remove: bool
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self._executor, self._extract_all, job, archives, dest, remove
+            )
+            job["status"] = "succeeded"
+            job["progress"] = 1.0
+            logger.info(
+                f"数据集解压完成: {job['dataset_id']}, 条目 {job['entries']}, "
+                f"{job['bytes_done']} 字节"
+            )
+        except asyncio.CancelledError:
+            job["status"] = "failed"
+            job["error"] = "服务关闭，入库任务已中断"
+            raise
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+            job["rejected"] = isinstance(e, ArchiveRejected)
+            logger.warning(f"数据集解压失败: {job['dataset_id']}, {e}")
+        finally:
+            job["current_archive"] = None
+            job["finished_at"] = time.time()
+            self._save(job)
+            self._jobs.pop(job["job_id"], None)
+            self._written_at.pop(job["job_id"], None)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return dict(job)
+        try:
+            return self._load(self._path(job_id))
+        except KeyError:
+            return None
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """所有进程的入库任务（按创建时间从新到旧）。"""
+        jobs = []
+        for path in self.root.glob("*.json"):
+            job = self._jobs.get(path.stem)
+            job = dict(job) if job is not None else self._load(path)
+            if job is not None:
+                jobs.append(job)
+        jobs.sort(key=lambda job: job["created_at"], reverse=True)
+        return jobs
+
+    def get_stats(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for job in self.list_jobs():
+            statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+        return {"workers": self.workers, "jobs": statuses}
+
+    async def shutdown(self) -> None:
+        for task in list(self._tasks.values()):
+            task.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_ingestion_service: Optional[DatasetIngestionService] = None
+_upload_sessions: Optional[UploadSessionStore] = None
+
+
+def get_dataset_ingestion_service() -> DatasetIngestionService:
+    global _ingestion_service
+    if _ingestion_service is None:
+        _ingestion_service = DatasetIngestionService()
+    return _ingestion_service
+
+
+def get_upload_session_store() -> UploadSessionStore:
+    global _upload_sessions
+    if _upload_sessions is None:
+        _upload_sessions = UploadSessionStore()
+    return _upload_sessions
+
+
+async def shutdown_dataset_ingestion_service() -> None:
+    global _ingestion_service
+    if _ingestion_service is not None:
+        await _ingestion_service.shutdown()
+        _ingestion_service = None
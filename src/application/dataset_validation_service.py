@@ -3,18 +3,33 @@
 提供数据集文件完整性校验和结构验证功能
 """
 
-import io
+import asyncio
 import logging
-import tarfile
-import zipfile
+import os
 from pathlib import Path
 from typing import List, Tuple
 
 from fastapi import UploadFile
 
+from src.application.dataset_ingestion import (
+    ArchiveRejected,
+    archive_format,
+    inspect_archive,
+)
+
 logger = logging.getLogger(__name__)
 
 
+def _upload_size(file: UploadFile) -> int:
+    """通过 seek 获取上传临时文件大小（不读取内容）。"""
+    f = file.file
+    position = f.tell()
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(position)
+    return size
+
+
 class DatasetValidationService:
     """数据集验证服务"""
 
@@ -38,15 +53,9 @@ class DatasetValidationService:
         if not filename:
             return False, "文件名不能为空"
 
-        # 2. ZIP 文件校验
-        if filename.endswith(".zip"):
-            return await DatasetValidationService._validate_zip_file(
-                file, validate_content
-            )
-
-        # 3. TAR 文件校验
-        elif filename.endswith((".tar", ".tar.gz", ".tgz")):
-            return await DatasetValidationService._validate_tar_file(
+        # 2. ZIP/TAR 文件校验
+        if archive_format(filename):
+            return await DatasetValidationService._validate_archive_file(
                 file, validate_content
             )
 
@@ -58,11 +67,10 @@ class DatasetValidationService:
         elif filename.endswith((".jpg", ".jpeg", ".png", ".bmp", ".webp")):
             # 基础校验：只检查文件大小
             try:
-                content = await file.read()
-                await file.seek(0)  # 重置文件指针
-                if len(content) == 0:
+                size = await asyncio.to_thread(_upload_size, file)
+                if size == 0:
                     return False, "图像文件为空"
-                if len(content) < 100:  # 最小文件大小检查
+                if size < 100:  # 最小文件大小检查
                     return False, "图像文件过小，可能已损坏"
                 return True, ""
             except Exception as e:
@@ -78,95 +86,32 @@ class DatasetValidationService:
             return True, ""
 
     @staticmethod
-    async def _validate_zip_file(
+    async def _validate_archive_file(
         file: UploadFile, validate_content: bool
     ) -> Tuple[bool, str]:
-        """验证 ZIP 文件"""
-        try:
-            # 读取文件内容到内存
-            content = await file.read()
-            await file.seek(0)  # 重置文件指针
-
-            if len(content) == 0:
-                return False, "ZIP 文件为空"
-
-            # 尝试打开 ZIP 文件
-            try:
-                with zipfile.ZipFile(io.BytesIO(content)) as zip_file:
-                    # 检查 ZIP 文件是否损坏
-                    if validate_content:
-                        bad_file = zip_file.testzip()
-                        if bad_file:
-                            return False, f"ZIP 文件损坏: {bad_file}"
-
-                    # 检查是否包含必要文件（可选）
-                    file_list = zip_file.namelist()
-                    if len(file_list) == 0:
-                        return False, "ZIP 文件为空（不包含任何文件）"
-
-                    # 检查是否有 data.yaml（如果是数据集压缩包）
-                    has_yaml = any(
-                        "data.yaml" in f.lower() or "data.yml" in f.lower()
-                        for f in file_list
-                    )
-                    if not has_yaml:
-                        logger.warning("ZIP 文件中未找到 data.yaml，可能不是标准数据集格式")
-
-                    return True, ""
-            except zipfile.BadZipFile:
-                return False, "不是有效的 ZIP 文件格式"
-            except zipfile.LargeZipFile:
-                return False, "ZIP 文件过大（超过 4GB），请使用其他格式"
-        except Exception as e:
-            logger.error(f"ZIP 文件校验异常: {e}")
-            return False, f"ZIP 文件校验失败: {str(e)}"
+        """验证 ZIP/TAR 文件：直接读取上传临时文件的中央目录/头部，不整体载入内存。
 
-    @staticmethod
-    async def _validate_tar_file(
-        file: UploadFile, validate_content: bool
-    ) -> Tuple[bool, str]:
-        """验证 TAR 文件"""
+        CRC 在解压时逐条目校验（见 dataset_ingestion.extract_archive）。
+        """
+        filename = file.filename or ""
+        label = "ZIP" if archive_format(filename) == "zip" else "TAR"
         try:
-            # 读取文件内容到内存
-            content = await file.read()
-            await file.seek(0)  # 重置文件指针
-
-            if len(content) == 0:
-                return False, "TAR 文件为空"
-
-            # 确定 TAR 模式
-            filename = file.filename.lower() if file.filename else ""
-            mode = "r:gz" if filename.endswith((".tar.gz", ".tgz")) else "r"
-
-            # 尝试打开 TAR 文件
-            try:
-                with tarfile.open(fileobj=io.BytesIO(content), mode=mode) as tar_file:
-                    # 检查 TAR 文件是否损坏
-                    if validate_content:
-                        try:
-                            tar_file.getmembers()  # 尝试读取成员列表
-                        except tarfile.TarError as e:
-                            return False, f"TAR 文件损坏: {str(e)}"
-
-                    # 检查文件列表
-                    file_list = tar_file.getnames()
-                    if len(file_list) == 0:
-                        return False, "TAR 文件为空（不包含任何文件）"
-
-                    # 检查是否有 data.yaml
-                    has_yaml = any(
-                        "data.yaml" in f.lower() or "data.yml" in f.lower()
-                        for f in file_list
-                    )
-                    if not has_yaml:
-                        logger.warning("TAR 文件中未找到 data.yaml，可能不是标准数据集格式")
-
-                    return True, ""
-            except tarfile.TarError as e:
-                return False, f"TAR 文件格式错误: {str(e)}"
+            if await asyncio.to_thread(_upload_size, file) == 0:
+                return False, f"{label} 文件为空"
+            report = await asyncio.to_thread(inspect_archive, file.file, filename)
+        except ArchiveRejected as e:
+            return False, str(e)
         except Exception as e:
-            logger.error(f"TAR 文件校验异常: {e}")
-            return False, f"TAR 文件校验失败: {str(e)}"
+            logger.error(f"{label} 文件校验异常: {e}")
+            return False, f"{label} 文件校验失败: {str(e)}"
+        finally:
+            await file.seek(0)
+
+        if report.entries == 0:
+            return False, f"{label} 文件为空（不包含任何文件）"
+        if not report.has_data_yaml:
+            logger.warning(f"{label} 文件中未找到 data.yaml，可能不是标准数据集格式")
+        return True, ""
 
     @staticmethod
     async def _validate_yaml_file(file: UploadFile) -> Tuple[bool, str]:
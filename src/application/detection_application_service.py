@@ -21,7 +21,12 @@ from src.core.optimized_detection_pipeline import (
     OptimizedDetectionPipeline,
 )
 from src.interfaces.storage import SnapshotInfo, SnapshotStorageProtocol
+from src.monitoring.tracing import trace_span
 from src.services.detection_service_domain import DetectionServiceDomain
+from src.services.inference_service import (
+    detect_comprehensive_batch,
+    get_inference_service,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -595,7 +600,11 @@ class DetectionApplicationService:
     # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
     async def process_image_detection(
-        self, camera_id: str, image_bytes: bytes, save_to_db: bool = True
+        self,
+        camera_id: str,
+        image_bytes: bytes,
+        save_to_db: bool = True,
+        client_id: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         处理单张图片检测
@@ -604,6 +613,11 @@ class DetectionApplicationService:
             camera_id: 摄像头ID
             image_bytes: 图像字节数据
             save_to_db: 是否保存到数据库（默认True）
+            client_id: 请求方标识，用于推理队列的公平调度（默认按摄像头ID）
+
+        Raises:
+            InferenceOverloaded: 推理队列已满（应返回429）
+            InferenceDeadlineExceeded: 检测未在截止时间前完成
 
         Returns:
             检测结果字典
@@ -613,9 +627,14 @@ class DetectionApplicationService:
         # 1. 图像解码
         image = self._decode_image(image_bytes)
 
-        # 2. 执行检测（基础设施层）
+        # 2. 执行检测（基础设施层，经推理服务排队并在专用线程中执行）
         start_time = time.time()
-        detection_result = self.detection_pipeline.detect_comprehensive(image)
+        detection_result = await get_inference_service().submit(
+            client_id or camera_id,
+            detect_comprehensive_batch,
+            (self.detection_pipeline, image),
+            batch_key=id(self.detection_pipeline),
+        )
         processing_time = time.time() - start_time
 
         # 3. 分析违规
@@ -743,17 +762,18 @@ class DetectionApplicationService:
                 else None
             )
 
-            snapshot_info = await self._save_snapshot_if_possible(
-                frame,
-                camera_id,
-                violation_type=primary_violation_type,
-                metadata={
-                    "mode": DetectionMode.REALTIME_STREAM.value,
-                    "frame_count": frame_count,
-                    "has_violations": has_violations,
-                },
-                annotated_image=annotated_image,
-            )
+            with trace_span("record.snapshot"):
+                snapshot_info = await self._save_snapshot_if_possible(
+                    frame,
+                    camera_id,
+                    violation_type=primary_violation_type,
+                    metadata={
+                        "mode": DetectionMode.REALTIME_STREAM.value,
+                        "frame_count": frame_count,
+                        "has_violations": has_violations,
+                    },
+                    annotated_image=annotated_image,
+                )
 
             # 记录快照保存结果
             if snapshot_info:
@@ -770,13 +790,14 @@ class DetectionApplicationService:
                 )
 
             # 保存检测记录（传入快照信息）
-            record = await self.detection_domain_service.process_detection(
-                camera_id=camera_id,
-                detected_objects=detected_objects,
-                processing_time=processing_time,
-                frame_id=frame_count,
-                snapshots=[snapshot_info] if snapshot_info else None,
-            )
+            with trace_span("record.db_write", objects=len(detected_objects)):
+                record = await self.detection_domain_service.process_detection(
+                    camera_id=camera_id,
+                    detected_objects=detected_objects,
+                    processing_time=processing_time,
+                    frame_id=frame_count,
+                    snapshots=[snapshot_info] if snapshot_info else None,
+                )
 
             self.logger.info(
                 f"保存检测记录: camera={camera_id}, frame={frame_count}, "
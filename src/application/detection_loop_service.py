@@ -17,7 +17,7 @@ import signal
 import time
 from collections import defaultdict
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 import cv2
 import numpy as np
@@ -27,6 +27,8 @@ from src.application.video_stream_application_service import (
     VideoStreamApplicationService,
 )
 from src.core.optimized_detection_pipeline import OptimizedDetectionPipeline
+from src.monitoring.metrics_core import get_metrics_registry, publish_snapshot
+from src.monitoring.tracing import get_tracer, publish_trace_snapshot, trace_span
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +45,7 @@ class DetectionLoopConfig:
         video_quality: int = 60,
         stream_width: int = 800,
         stream_height: int = 450,
+        compute_priority: float = 1.0,
     ):
         self.camera_id = camera_id
         self.source = source
@@ -51,6 +54,36 @@ class DetectionLoopConfig:
         self.video_quality = video_quality
         self.stream_width = stream_width
         self.stream_height = stream_height
+        self.compute_priority = compute_priority  # 主机算力预算中的优先级权重
+
+    def apply_runtime(self, runtime: Dict[str, Any]) -> bool:
+        """应用配置快照中的运行时配置，返回是否有变化"""
+        changed = False
+        for key in ("stream_interval", "log_interval"):
+            value = runtime.get(key)
+            if value is None:
+                continue
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                continue
+            if getattr(self, key) != value:
+                logger.info(f"运行时配置更新 {key}: {getattr(self, key)} -> {value}")
+                setattr(self, key, value)
+                changed = True
+        value = runtime.get("compute_priority")
+        if value is not None:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                value = self.compute_priority
+            if value != self.compute_priority:
+                logger.info(
+                    f"运行时配置更新 compute_priority: {self.compute_priority} -> {value}"
+                )
+                self.compute_priority = value
+                changed = True
+        return changed
 
     def update_from_redis(self):
         """从Redis读取配置并更新"""
@@ -145,6 +178,31 @@ class DetectionLoopService:
         self.last_stats_publish_time = None
         self.stats_publish_interval = 5.0  # 每5秒发布一次统计数据
 
+        # 可合并的耗时直方图（随统计一起发布快照，由 API 的 /metrics 合并暴露）
+        registry = get_metrics_registry()
+        camera_labels = {"camera": config.camera_id}
+        self.detection_latency = registry.histogram(
+            "hbd_detection_latency_seconds", camera_labels, "单帧检测耗时（秒）"
+        )
+        self.frames_detected = registry.counter(
+            "hbd_frames_detected_total", camera_labels, "已检测帧数"
+        )
+
+        # 模型热切换管理器（run()中启动）
+        self.model_rollout = None
+
+        # 难例挖掘器（run()中按环境变量启用）
+        self.hard_example_miner = None
+
+        # 主机级算力预算（run()中按环境变量启用；为None时仅按log_interval跳帧）
+        self.compute_budget = None
+
+        # 版本化配置快照（run()中启动；为None时回退为定期轮询Redis）
+        self.config_snapshot = None
+        # 由配置快照构建的区域（快照中的区域字典被替换时重建）
+        self._region_source: Optional[Dict[str, Any]] = None
+        self._regions: List[Any] = []
+
         # 注册信号处理器
         self._register_signal_handlers()
 
@@ -262,7 +320,7 @@ class DetectionLoopService:
         self, frame: np.ndarray, frame_count: int
     ) -> Dict[str, Any]:
         """
-        处理单个帧
+        处理单个帧（整帧为一条 trace，检测/保存/推送等阶段为子 span）
 
         Args:
             frame: 视频帧
@@ -271,8 +329,42 @@ class DetectionLoopService:
         Returns:
             处理结果
         """
+        with get_tracer().start_trace(
+            "frame", camera_id=self.config.camera_id, frame=frame_count
+        ) as span:
+            processed = await self._run_frame_stages(frame, frame_count)
+            persons = getattr(processed["result"], "person_detections", None) or []
+            span.set_attribute("persons", len(persons))
+            span.set_attribute("saved_to_db", bool(processed["saved_to_db"]))
+            return processed
+
+    async def _run_frame_stages(
+        self, frame: np.ndarray, frame_count: int
+    ) -> Dict[str, Any]:
+        """依次执行单帧的检测、难例挖掘、记录保存与视频推送"""
+        # 应用已通过评估的新模型（位于两帧之间）
+        if self.model_rollout is not None:
+            self.model_rollout.before_frame(frame)
+
         # 1. 执行检测
+        detect_start = time.perf_counter()
         result = self.detection_pipeline.detect_comprehensive(frame)
+        detect_seconds = time.perf_counter() - detect_start
+        self.detection_latency.record(detect_seconds)
+        self.frames_detected.inc()
+        if self.compute_budget is not None:
+            self.compute_budget.record_detection(detect_seconds, result)
+        self._tag_person_regions(result)
+
+        # 抽样影子推理（候选模型与在线模型对比）
+        if self.model_rollout is not None:
+            with trace_span("rollout.shadow"):
+                self.model_rollout.after_frame(frame, result)
+
+        # 难例挖掘：不确定样本进入人工审核队列
+        if self.hard_example_miner is not None:
+            with trace_span("hard_example.observe"):
+                self.hard_example_miner.observe(self.config.camera_id, frame, result)
 
         # 2. 保存记录（如果配置了应用服务）
         saved_to_db = False
@@ -348,11 +440,14 @@ class DetectionLoopService:
 
         if self.detection_app_service:
             try:
-                app_result = await self.detection_app_service.process_realtime_stream(
-                    camera_id=self.config.camera_id,
-                    frame=frame,
-                    frame_count=frame_count,
-                )
+                with trace_span("record.process"):
+                    app_result = (
+                        await self.detection_app_service.process_realtime_stream(
+                            camera_id=self.config.camera_id,
+                            frame=frame,
+                            frame_count=frame_count,
+                        )
+                    )
                 saved_to_db = app_result.get("saved_to_db", False)
                 save_reason = app_result.get("save_reason")
 
@@ -393,13 +488,15 @@ class DetectionLoopService:
                     f"has_annotations={has_annotations}"
                 )
 
-                success = await self.video_stream_service.push_frame(
-                    camera_id=self.config.camera_id,
-                    frame=frame_to_push,
-                    quality=self.config.video_quality,
-                    target_width=self.config.stream_width,
-                    target_height=self.config.stream_height,
-                )
+                with trace_span("stream.push", annotated=has_annotations) as span:
+                    success = await self.video_stream_service.push_frame(
+                        camera_id=self.config.camera_id,
+                        frame=frame_to_push,
+                        quality=self.config.video_quality,
+                        target_width=self.config.stream_width,
+                        target_height=self.config.stream_height,
+                    )
+                    span.set_attribute("success", bool(success))
 
                 if success:
                     logger.info(
@@ -520,12 +617,19 @@ class DetectionLoopService:
                         "last_detection_time": now
                         if self.detection_stats["processed_frames"] > 0
                         else None,
+                        "budget_fps": (self.compute_budget.allocation or {}).get(
+                            "allocated_fps"
+                        )
+                        if self.compute_budget is not None
+                        else None,
                     },
                 }
 
                 # 发布到Redis
                 payload = json.dumps(stats_data).encode("utf-8")
                 redis_client.publish("hbd:stats", payload)
+                publish_snapshot(redis_client)
+                publish_trace_snapshot(redis_client)
 
                 self.last_stats_publish_time = now
                 logger.info(
@@ -584,52 +688,36 @@ class DetectionLoopService:
                 f"detected_handwash={self.detection_stats['detected_handwash']}"
             )
 
-            # 启动时立即从Redis读取配置（不等待100帧）
-            # 注意：Redis配置用于运行时动态更新，但不应覆盖命令行参数（初始化值）
-            # 这里只用于同步，不强制覆盖已设置的命令行参数值
+            # 启动时全量同步配置快照（运行时配置、检测参数、区域）
+            # 注意：快照中的运行时配置用于运行时动态更新，但不应覆盖命令行参数（初始化值）
             initial_log_interval = self.config.log_interval  # 保存初始值（来自命令行参数或默认值）
-            self.config.stream_interval
-
-            # 从Redis读取配置
-            redis_log_interval = None
             try:
-                import os
+                self.config_snapshot = self._create_config_snapshot()
+                await self.config_snapshot.start()
+            except Exception as e:
+                logger.warning(f"启动配置快照失败: {e}，回退为定期从Redis读取配置")
+                self.config_snapshot = None
 
-                import redis
+            if self.config_snapshot is not None:
+                snapshot_log_interval = self.config_snapshot.snapshot.get_runtime(
+                    "log_interval"
+                )
+                self.config.apply_runtime(self.config_snapshot.snapshot.runtime)
+            else:
+                self.config.update_from_redis()
+                snapshot_log_interval = self.config.log_interval
 
-                redis_url = os.getenv("REDIS_URL")
-                if redis_url:
-                    r = redis.from_url(redis_url)
-                    config_key = f"video_stream:config:{self.camera_id}"
-                    config_data = r.hgetall(config_key)
-                    if config_data:
-                        config_data = {
-                            k.decode(): v.decode() if isinstance(v, bytes) else v
-                            for k, v in config_data.items()
-                        }
-                        if "log_interval" in config_data:
-                            redis_log_interval = int(config_data["log_interval"])
-            except Exception:
-                pass
-
-            # 更新配置（但保留初始值用于比较）
-            self.config.update_from_redis()
-
-            # 如果初始值（命令行参数）与Redis中的值不同，优先使用命令行参数
+            # 如果初始值（命令行参数）与快照中的值不同，优先使用命令行参数
             # 这确保了用户通过相机配置设置的log_interval不会被Redis中的旧值覆盖
             if (
-                redis_log_interval is not None
-                and initial_log_interval != redis_log_interval
+                snapshot_log_interval is not None
+                and initial_log_interval != snapshot_log_interval
             ):
                 logger.info(
                     f"检测到配置冲突：命令行参数 log_interval={initial_log_interval}，"
-                    f"Redis中的值={redis_log_interval}，优先使用命令行参数"
+                    f"配置快照中的值={snapshot_log_interval}，优先使用命令行参数"
                 )
                 self.config.log_interval = initial_log_interval
-            elif redis_log_interval is not None:
-                logger.info(
-                    f"从Redis读取配置 log_interval={self.config.log_interval} " f"（与命令行参数一致）"
-                )
 
             logger.info(
                 f"开始视频处理循环: camera_id={self.config.camera_id}, "
@@ -641,53 +729,53 @@ class DetectionLoopService:
             try:
                 from src.application.config_change_listener import ConfigChangeListener
 
-                def on_config_change(notification: Dict[str, Any]):
-                    """配置变更回调函数"""
-                    config_type = notification.get("config_type")
-                    config_key = notification.get("config_key")
-                    config_value = notification.get("config_value")
-                    change_type = notification.get("change_type", "update")
+                self.config_change_listener = ConfigChangeListener(
+                    camera_id=self.config.camera_id,
+                    on_config_change=self._on_config_change,
+                )
+                await self.config_change_listener.start()
+                logger.info("配置变更监听器已启动")
+            except Exception as e:
+                logger.warning(f"启动配置变更监听器失败: {e}，将继续运行但不监听配置变更")
 
-                    logger.info(
-                        f"收到配置变更通知: config_type={config_type}, "
-                        f"config_key={config_key}, change_type={change_type}, "
-                        f"config_value={config_value}"
+            # 启动模型热切换（订阅模型注册中心的激活事件）
+            try:
+                from src.application.model_rollout import (
+                    ModelRolloutManager,
+                    RolloutSettings,
+                )
+
+                rollout_settings = RolloutSettings.from_env()
+                if rollout_settings.enabled:
+                    self.model_rollout = ModelRolloutManager(
+                        self.detection_pipeline,
+                        self.config.camera_id,
+                        settings=rollout_settings,
                     )
+                    await self.model_rollout.start()
+            except Exception as e:
+                logger.warning(f"启动模型热切换失败: {e}，新模型需重启检测进程后生效")
+                self.model_rollout = None
 
-                    # 重新加载检测配置
-                    try:
-                        from src.core.config_reload_helper import (
-                            reload_detection_config,
-                        )
+            try:
+                from src.application.hard_example_mining import get_hard_example_miner
 
-                        success = reload_detection_config(
-                            detection_pipeline=self.detection_pipeline,
-                            config_type=config_type,
-                            config_key=config_key,
-                            config_value=config_value,
-                        )
+                self.hard_example_miner = get_hard_example_miner()
+            except Exception as e:
+                logger.warning(f"启动难例挖掘失败: {e}，将继续运行但不采集难例")
+                self.hard_example_miner = None
 
-                        if success:
-                            logger.info(
-                                f"配置已重新加载: config_type={config_type}, "
-                                f"config_key={config_key}, config_value={config_value}"
-                            )
-                        else:
-                            logger.warning(
-                                f"配置重新加载失败: config_type={config_type}, "
-                                f"config_key={config_key}"
-                            )
-                    except Exception as e:
-                        logger.error(f"重新加载配置失败: {e}", exc_info=True)
+            # 主机级算力预算：按运动/人数/违规/优先级在同主机摄像头间分配检测帧率
+            try:
+                from src.application.compute_budget import create_camera_budget
 
-                self.config_change_listener = ConfigChangeListener(
-                    camera_id=self.config.camera_id,
-                    on_config_change=on_config_change,
+                self.compute_budget = create_camera_budget(
+                    self.config.camera_id,
+                    priority=lambda: self.config.compute_priority,
                 )
-                await self.config_change_listener.start()
-                logger.info("配置变更监听器已启动")
             except Exception as e:
-                logger.warning(f"启动配置变更监听器失败: {e}，将继续运行但不监听配置变更")
+                logger.warning(f"启动算力预算失败: {e}，将仅按log_interval跳帧")
+                self.compute_budget = None
 
             # 主循环
             while not self.shutdown_requested:
@@ -711,9 +799,8 @@ class DetectionLoopService:
 
                 self.frame_count += 1
 
-                # 定期从Redis读取配置更新（每100帧检查一次）
-                # 注意：这是运行时动态更新，允许前端修改配置后实时生效
-                if self.frame_count % 100 == 0:
+                # 配置快照由变更通知推送更新；快照不可用时回退为每100帧读取一次Redis
+                if self.config_snapshot is None and self.frame_count % 100 == 0:
                     old_log_interval = self.config.log_interval
                     self.config.update_from_redis()
                     if old_log_interval != self.config.log_interval:
@@ -726,6 +813,9 @@ class DetectionLoopService:
                     self.config.log_interval == 1
                     or self.frame_count % self.config.log_interval == 0
                 )
+                # 算力预算：候选帧需获得检测令牌（空闲摄像头降为涓流帧率）
+                if should_process_detection and self.compute_budget is not None:
+                    should_process_detection = self.compute_budget.offer(frame)
 
                 if should_process_detection:
                     self.process_count += 1
@@ -757,10 +847,139 @@ class DetectionLoopService:
             raise
 
         finally:
+            if self.model_rollout is not None:
+                await self.model_rollout.stop()
+
+            if self.compute_budget is not None:
+                self.compute_budget.close()
+
+            if self.config_snapshot is not None:
+                await self.config_snapshot.stop()
+
+            close_stream = getattr(self.video_stream_service, "close", None)
+            if close_stream is not None:
+                await close_stream()
+
             # 释放资源
             if cap is not None:
                 self._release_video_source(cap)
 
+    def _create_config_snapshot(self):
+        """创建配置快照存储（子类可替换数据源）"""
+        from src.application.config_snapshot import ConfigSnapshotStore
+
+        return ConfigSnapshotStore(
+            self.config.camera_id, on_resync=self._on_config_resync
+        )
+
+    def _on_config_change(self, notification: Dict[str, Any]) -> None:
+        """配置变更回调：先应用到配置快照，再由快照驱动各配置消费者"""
+        config_type = notification.get("config_type")
+        config_key = notification.get("config_key")
+        config_value = notification.get("config_value")
+        change_type = notification.get("change_type", "update")
+
+        logger.info(
+            f"收到配置变更通知: config_type={config_type}, "
+            f"config_key={config_key}, change_type={change_type}, "
+            f"config_value={config_value}"
+        )
+
+        if self.config_snapshot is None:
+            self._reload_detection_config(config_type, config_key, config_value)
+            return
+
+        from src.application.config_snapshot import (
+            CONFIG_TYPE_REGIONS,
+            CONFIG_TYPE_RUNTIME,
+            STATUS_APPLIED,
+        )
+
+        # 过期/缺口/同步中缓存的变更由全量同步回调（_on_config_resync）统一处理
+        if self.config_snapshot.apply(notification) != STATUS_APPLIED:
+            return
+        snapshot = self.config_snapshot.snapshot
+        if config_type == CONFIG_TYPE_RUNTIME:
+            self.config.apply_runtime(snapshot.runtime)
+        elif config_type == CONFIG_TYPE_REGIONS:
+            # 区域在下一帧由 _current_regions() 按新快照重建
+            pass
+        elif config_type:
+            self._reload_detection_config(
+                config_type,
+                config_key,
+                snapshot.get_detection(config_type, config_key),
+            )
+
+    def _reload_detection_config(
+        self, config_type: Optional[str], config_key: Optional[str], config_value: Any
+    ) -> None:
+        """将单个检测参数应用到检测管线"""
+        try:
+            from src.core.config_reload_helper import reload_detection_config
+
+            success = reload_detection_config(
+                detection_pipeline=self.detection_pipeline,
+                config_type=config_type,
+                config_key=config_key,
+                config_value=config_value,
+            )
+            if success:
+                logger.info(
+                    f"配置已重新加载: config_type={config_type}, "
+                    f"config_key={config_key}, config_value={config_value}"
+                )
+            else:
+                logger.warning(
+                    f"配置重新加载失败: config_type={config_type}, " f"config_key={config_key}"
+                )
+        except Exception as e:
+            logger.error(f"重新加载配置失败: {e}", exc_info=True)
+
+    def _current_regions(self) -> List[Any]:
+        """配置快照中的有效区域（快照中的区域被替换后才重新构建）"""
+        if self.config_snapshot is None:
+            return []
+        regions = self.config_snapshot.snapshot.regions
+        if regions is not self._region_source:
+            from src.application.config_snapshot import build_regions
+
+            self._region_source = regions
+            self._regions = build_regions(regions)
+        return self._regions
+
+    def _tag_person_regions(self, result: Any) -> None:
+        """为每个人员检测标注其所在区域（region_id列表）"""
+        regions = self._current_regions()
+        if not regions:
+            return
+        for person in getattr(result, "person_detections", None) or []:
+            bbox = person.get("bbox")
+            if bbox and len(bbox) >= 4:
+                person["regions"] = [
+                    r.region_id for r in regions if r.bbox_in_region(bbox[:4])
+                ]
+
+    def _on_config_resync(self, old, new) -> None:
+        """全量同步后只应用与旧快照不同的配置项"""
+        self.config.apply_runtime(new.runtime)
+        if not old.updated_at:
+            # 首次同步：检测管线初始化时已加载同一份检测参数
+            return
+
+        from src.core.config_reload_helper import reload_detection_config
+
+        for config_type, values in new.detection.items():
+            previous = old.detection.get(config_type, {})
+            for config_key in values:
+                if previous.get(config_key) != values[config_key]:
+                    reload_detection_config(
+                        detection_pipeline=self.detection_pipeline,
+                        config_type=config_type,
+                        config_key=config_key,
+                        config_value=new.get_detection(config_type, config_key),
+                    )
+
     def stop(self):
         """停止检测循环"""
         logger.info("请求停止检测循环...")
@@ -0,0 +1,363 @@
+"""
+生产环境难例挖掘（主动学习样本队列）。
+
+在检测管线的每帧结果上计算不确定性信号，只把“模型拿不准”的样本送去人工审核：
+- hairnet_margin：发网置信度落在判定阈值附近；
+- model_disagreement：BehaviorRecognizer 中 XGBoost 与 Transformer 的洗手分数分歧；
+- cascade_mismatch：轻量检测器与级联重模型对同一人员的分数差异（含重模型未检出）；
+- id_switch：跟踪器通过距离复活重新认领 ID（常规关联失败，可能发生了 ID 切换）。
+
+各信号归一化到 [0, 1] 后按 noisy-or 合成人员分数，帧分数取人员最大值。
+超过阈值的帧再经过四道筛选后才入队：
+1. 每摄像头最小检查间隔（进程内，被拒绝的尝试同样计时，避免逐帧访问队列）；
+2. 每摄像头滑动窗口预算（按队列记录统计，多进程共享）；
+3. 待审核样本总数上限（无人审核时队列不会无限增长）；
+4. 对最不确定人员的裁剪图做 dHash，与该摄像头最近入队样本比较去重，保证多样性。
+
+审核通过的样本通过 DatasetGenerationService.generate_from_review_queue 生成数据集。
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.infrastructure.storage.review_queue import ReviewQueue, get_review_queue
+from src.infrastructure.storage.snapshot_dedup import dhash, hamming_distance
+
+logger = logging.getLogger(__name__)
+
+# ID 切换本身不说明哪个模型出错，权重低于模型分数类信号
+SIGNAL_WEIGHTS = {
+    "hairnet_margin": 1.0,
+    "model_disagreement": 1.0,
+    "cascade_mismatch": 1.0,
+    "id_switch": 0.6,
+}
+CROP_PADDING = 0.1
+
+
+@dataclass
+class MiningSettings:
+    """难例挖掘配置"""
+
+    enabled: bool = True
+    min_score: float = 0.5  # 帧不确定性分数入队阈值
+    hairnet_margin: float = 0.15  # 发网置信度距阈值多近算“临界”
+    min_disagreement: float = 0.3  # XGBoost / Transformer 分数差下限
+    min_cascade_gap: float = 0.3  # 检测器 / 级联分数差下限
+    camera_budget: int = 50  # 每摄像头每个预算窗口最多入队样本数
+    budget_window: float = 3600.0
+    max_pending: int = 2000  # 待审核样本总数上限（0 表示不限制）
+    min_interval: float = 2.0  # 同一摄像头两次访问队列的最小间隔（秒）
+    dedup_distance: int = 10  # dHash 汉明距离不超过该值视为重复
+    dedup_history: int = 200  # 去重比较的最近样本数
+
+    @classmethod
+    def from_env(cls) -> "MiningSettings":
+        return cls(
+            enabled=os.getenv("HARD_EXAMPLE_MINING_ENABLED", "true").lower()
+            in ("1", "true", "yes"),
+            min_score=float(os.getenv("HARD_EXAMPLE_MIN_SCORE", "0.5")),
+            hairnet_margin=float(os.getenv("HARD_EXAMPLE_HAIRNET_MARGIN", "0.15")),
+            min_disagreement=float(os.getenv("HARD_EXAMPLE_MIN_DISAGREEMENT", "0.3")),
+            min_cascade_gap=float(os.getenv("HARD_EXAMPLE_MIN_CASCADE_GAP", "0.3")),
+            camera_budget=int(os.getenv("HARD_EXAMPLE_CAMERA_BUDGET", "50")),
+            budget_window=float(os.getenv("HARD_EXAMPLE_BUDGET_WINDOW", "3600")),
+            max_pending=int(os.getenv("HARD_EXAMPLE_MAX_PENDING", "2000")),
+            min_interval=float(os.getenv("HARD_EXAMPLE_MIN_INTERVAL", "2")),
+            dedup_distance=int(os.getenv("HARD_EXAMPLE_DEDUP_DISTANCE", "10")),
+            dedup_history=int(os.getenv("HARD_EXAMPLE_DEDUP_HISTORY", "200")),
+        )
+
+
+def _person_signals(
+    detection: Dict[str, Any],
+    hairnet: Optional[Dict[str, Any]],
+    handwash: Optional[Dict[str, Any]],
+    switched_ids: set,
+    hairnet_threshold: float,
+    settings: MiningSettings,
+) -> Dict[str, float]:
+    signals: Dict[str, float] = {}
+
+    if hairnet is not None and settings.hairnet_margin > 0:
+        gap = abs(float(hairnet.get("hairnet_confidence", 0.0)) - hairnet_threshold)
+        if gap < settings.hairnet_margin:
+            signals["hairnet_margin"] = 1.0 - gap / settings.hairnet_margin
+
+    scores = (handwash or {}).get("model_scores") or {}
+    if "xgb" in scores and "transformer" in scores:
+        gap = abs(float(scores["xgb"]) - float(scores["transformer"]))
+        if gap >= settings.min_disagreement:
+            signals["model_disagreement"] = min(1.0, gap)
+
+    if "cascade_confidence" in detection:
+        gap = abs(
+            float(detection.get("detector_confidence", 0.0))
+            - float(detection["cascade_confidence"])
+        )
+        if gap >= settings.min_cascade_gap:
+            signals["cascade_mismatch"] = min(1.0, gap)
+
+    if detection.get("track_id") in switched_ids:
+        signals["id_switch"] = 1.0
+
+    return {name: round(value, 4) for name, value in signals.items()}
+
+
+def combine_signals(signals: Dict[str, float]) -> float:
+    """noisy-or 合成：多个独立信号同时出现时分数更高，但不超过 1。"""
+    certainty = 1.0
+    for name, value in signals.items():
+        certainty *= 1.0 - SIGNAL_WEIGHTS.get(name, 1.0) * value
+    return 1.0 - certainty
+
+
+def score_persons(
+    result: Any,
+    hairnet_threshold: float,
+    settings: MiningSettings,
+    tracked_objects: Optional[Sequence[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    计算每个人员的不确定性信号。
+
+    Args:
+        result: DetectionResult（person_detections / hairnet_results / handwash_results）
+        hairnet_threshold: 发网判定阈值
+        settings: 挖掘配置
+        tracked_objects: 跟踪器输出（可选，用于识别 ID 切换）
+
+    Returns:
+        有信号的人员列表，按分数从高到低：{"index", "bbox", "track_id", "score", "signals"}
+    """
+    persons = list(getattr(result, "person_detections", None) or [])
+    by_person = {}
+    for key in ("hairnet_results", "handwash_results"):
+        by_person[key] = {
+            r.get("person_id"): r for r in (getattr(result, key, None) or [])
+        }
+    switched_ids = {
+        t.get("track_id") for t in (tracked_objects or []) if t.get("id_switch")
+    }
+
+    scored = []
+    for i, detection in enumerate(persons):
+        signals = _person_signals(
+            detection,
+            by_person["hairnet_results"].get(i + 1),
+            by_person["handwash_results"].get(i + 1),
+            switched_ids,
+            hairnet_threshold,
+            settings,
+        )
+        if signals:
+            scored.append(
+                {
+                    "index": i,
+                    "bbox": [int(v) for v in detection.get("bbox", [0, 0, 0, 0])],
+                    "track_id": detection.get("track_id"),
+                    "score": round(combine_signals(signals), 4),
+                    "signals": signals,
+                }
+            )
+    scored.sort(key=lambda p: p["score"], reverse=True)
+    return scored
+
+
+def crop_person(frame: np.ndarray, bbox: Sequence[int]) -> Optional[np.ndarray]:
+    """按人员框（外扩 CROP_PADDING）裁剪，框无效时返回 None。"""
+    h, w = frame.shape[:2]
+    x1, y1, x2, y2 = [int(v) for v in bbox]
+    pad_x = int((x2 - x1) * CROP_PADDING)
+    pad_y = int((y2 - y1) * CROP_PADDING)
+    x1, y1 = max(0, x1 - pad_x), max(0, y1 - pad_y)
+    x2, y2 = min(w, x2 + pad_x), min(h, y2 + pad_y)
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return frame[y1:y2, x1:x2]
+
+
+def _default_hairnet_threshold() -> float:
+    try:
+        from src.config.unified_params import get_unified_params
+
+        return float(get_unified_params().hairnet_detection.confidence_threshold)
+    except Exception:
+        return 0.6
+
+
+class HardExampleMiner:
+    """逐帧挖掘难例并写入审核队列（队列写入失败不影响检测）。"""
+
+    def __init__(
+        self,
+        queue: Optional[ReviewQueue] = None,
+        settings: Optional[MiningSettings] = None,
+        hairnet_threshold: Optional[float] = None,
+    ) -> None:
+        self.settings = settings or MiningSettings.from_env()
+        self._queue = queue
+        self.hairnet_threshold = (
+            hairnet_threshold
+            if hairnet_threshold is not None
+            else _default_hairnet_threshold()
+        )
+        # 每摄像头最近一次访问队列的时间（无论是否入队）
+        self._last_checked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "frames": 0,
+            "candidates": 0,
+            "throttled": 0,
+            "over_budget": 0,
+            "queue_full": 0,
+            "duplicates": 0,
+            "queued": 0,
+            "errors": 0,
+        }
+
+    @property
+    def queue(self) -> ReviewQueue:
+        if self._queue is None:
+            self._queue = get_review_queue()
+        return self._queue
+
+    def observe(
+        self,
+        camera_id: str,
+        frame: np.ndarray,
+        result: Any,
+        tracked_objects: Optional[Sequence[Dict[str, Any]]] = None,
+        now: Optional[float] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        处理一帧检测结果，满足条件时入队。
+
+        Returns:
+            入队的样本记录；未入队时返回 None
+        """
+        self.stats["frames"] += 1
+        try:
+            persons = score_persons(
+                result, self.hairnet_threshold, self.settings, tracked_objects
+            )
+            if not persons or persons[0]["score"] < self.settings.min_score:
+                return None
+            self.stats["candidates"] += 1
+            now = time.time() if now is None else now
+            with self._lock:
+                return self._enqueue(camera_id, frame, persons, now)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"难例挖掘失败（不影响检测）: camera={camera_id}, error={e}")
+            return None
+
+    def _enqueue(
+        self,
+        camera_id: str,
+        frame: np.ndarray,
+        persons: List[Dict[str, Any]],
+        now: float,
+    ) -> Optional[Dict[str, Any]]:
+        settings = self.settings
+        last = self._last_checked.get(camera_id)
+        if last is not None and now - last < settings.min_interval:
+            self.stats["throttled"] += 1
+            return None
+        self._last_checked[camera_id] = now
+
+        if (
+            self.queue.count_since(camera_id, now - settings.budget_window)
+            >= settings.camera_budget
+        ):
+            self.stats["over_budget"] += 1
+            return None
+
+        if settings.max_pending and self.queue.pending_count() >= settings.max_pending:
+            self.stats["queue_full"] += 1
+            return None
+
+        uncertain = [p for p in persons if p["score"] >= settings.min_score]
+        crops = []
+        for person in uncertain:
+            crop = crop_person(frame, person["bbox"])
+            if crop is not None:
+                crops.append(crop)
+        if not crops:
+            return None
+
+        phash = dhash(crops[0])
+        for seen in self.queue.recent_hashes(camera_id, settings.dedup_history):
+            if hamming_distance(seen, phash) <= settings.dedup_distance:
+                self.stats["duplicates"] += 1
+                return None
+
+        reasons: Dict[str, float] = {}
+        for person in uncertain:
+            for name, value in person["signals"].items():
+                reasons[name] = max(reasons.get(name, 0.0), value)
+        context = {
+            "frame_size": list(frame.shape[:2][::-1]),
+            "hairnet_threshold": self.hairnet_threshold,
+            "persons": uncertain,
+        }
+        item = self.queue.add(
+            camera_id,
+            frame,
+            crops,
+            score=persons[0]["score"],
+            reasons=reasons,
+            context=context,
+            phash=phash,
+            created_at=now,
+        )
+        self.stats["queued"] += 1
+        logger.info(
+            f"难例入队: camera={camera_id}, score={item['score']:.3f}, "
+            f"reasons={sorted(reasons)}, id={item['id']}"
+        )
+        return item
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.settings.enabled,
+            "hairnet_threshold": self.hairnet_threshold,
+            **self.stats,
+        }
+
+
+def review_item_to_entry(item: Dict[str, Any], queue: ReviewQueue) -> Dict[str, object]:
+    """审核通过的样本 → DatasetGenerationService 的快照条目格式。"""
+    created = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(item["created_at"]))
+    return {
+        "record_id": item["id"],
+        "camera_id": item["camera_id"],
+        "timestamp": created,
+        "violation_type": item["label"],
+        "source_path": queue.resolve(item["frame_path"]),
+        "relative_path": item["frame_path"],
+        "metadata": {"score": item["score"], "reasons": item["reasons"]},
+        "has_violation": bool(item["has_violation"]),
+    }
+
+
+_hard_example_miner: Optional[HardExampleMiner] = None
+
+
+def get_hard_example_miner() -> Optional[HardExampleMiner]:
+    """获取进程级难例挖掘器，未启用时返回 None。"""
+    global _hard_example_miner
+    if _hard_example_miner is None:
+        settings = MiningSettings.from_env()
+        if not settings.enabled:
+            return None
+        _hard_example_miner = HardExampleMiner(settings=settings)
+    return _hard_example_miner
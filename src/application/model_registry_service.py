@@ -8,14 +8,30 @@ import json
 import logging
 import uuid
 from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from src.database.connection import AsyncSessionLocal
 from src.database.dao import ModelRegistryDAO
 
 logger = logging.getLogger(__name__)
 
+# 支持热切换的检测任务
+DETECTION_TASKS = ("human_detection", "hairnet_detection", "pose_detection")
+# 模型状态变更为以下状态时通知检测进程热切换
+PROMOTED_STATUSES = ("active", "production")
+
+
+def resolve_detection_task(model: Dict[str, Any]) -> Optional[str]:
+    """从模型记录推断其对应的检测任务（无法确定时返回None）。"""
+    for source in (model.get("artifacts"), model.get("training_params")):
+        if isinstance(source, dict) and source.get("detection_task") in DETECTION_TASKS:
+            return source["detection_task"]
+    if model.get("model_type") in DETECTION_TASKS:
+        return model["model_type"]
+    return None
+
 
 @dataclass
 class ModelRegistrationInfo:
@@ -65,8 +81,9 @@ class ModelRegistryService:
         status: Optional[str] = None,
         limit: int = 100,
         offset: int = 0,
+        after: Optional[Tuple[datetime, str]] = None,
     ) -> List[Dict[str, Any]]:
-        """列出模型记录。"""
+        """列出模型记录（after 为上一页最后一条的 (created_at, id)）。"""
         async with AsyncSessionLocal() as session:
             models = await ModelRegistryDAO.list_models(
                 session,
@@ -74,8 +91,9 @@ class ModelRegistryService:
                 status=status,
                 limit=limit,
                 offset=offset,
+                after=after,
             )
-            if models:
+            if models or after is not None:
                 return [model.to_dict() for model in models]
 
         synced = await self._sync_artifacts_from_disk()
@@ -101,10 +119,36 @@ class ModelRegistryService:
     async def update_status(
         self, model_id: str, status: str
     ) -> Optional[Dict[str, Any]]:
-        """更新模型状态。"""
+        """更新模型状态；提升为生效状态时通知检测进程热切换。"""
         async with AsyncSessionLocal() as session:
+            previous = await ModelRegistryDAO.get_by_id(session, model_id)
+            if previous is None:
+                return None
+            previous_status = previous.status
             model = await ModelRegistryDAO.update(session, model_id, {"status": status})
-            return model.to_dict() if model else None
+            if model is None:
+                return None
+            result = model.to_dict()
+
+        if status in PROMOTED_STATUSES and previous_status != status:
+            await self._publish_activation(result)
+        return result
+
+    async def _publish_activation(self, model: Dict[str, Any]) -> bool:
+        """发布模型激活事件（与部署接口 apply_immediately 的通知一致）。"""
+        detection_task = resolve_detection_task(model)
+        if detection_task is None:
+            logger.debug("模型 %s 未关联检测任务，跳过热切换通知", model.get("id"))
+            return False
+
+        from src.infrastructure.notifications import publish_model_activation_async
+
+        return await publish_model_activation_async(
+            detection_task=detection_task,
+            model_path=model.get("model_path"),
+            model_id=model.get("id"),
+            version=model.get("version"),
+        )
 
     async def update_model(
         self, model_id: str, update_data: Dict[str, Any]
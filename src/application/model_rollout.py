@@ -0,0 +1,528 @@
+"""模型热切换（Redis Pub/Sub 驱动）.
+
+检测进程订阅模型注册中心的激活事件，在后台线程加载新权重并用最近的帧预热。
+可选的影子推理不调用在线检测器：检测管道记录各模型本帧的原始输出与调用方式
+（DetectionResult.model_outputs，后处理之前），后台线程在候选模型上用相同输入
+重放同一次调用，比较输出与耗时。只有延迟与一致性均达标时，才在两帧之间原子地
+切换检测器；上一个模型保留在内存中，可立即回滚。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 检测任务 -> 检测管道中的检测器属性
+TASK_ATTRIBUTES = {
+    "human_detection": "human_detector",
+    "hairnet_detection": "hairnet_detector",
+    "pose_detection": "pose_detector",
+}
+
+STATE_LOADING = "loading"
+STATE_SHADOW = "shadow"
+STATE_READY = "ready"
+STATE_ACTIVE = "active"
+STATE_REJECTED = "rejected"
+
+
+@dataclass
+class RolloutSettings:
+    """热切换配置"""
+
+    enabled: bool = True
+    recent_frames: int = 16  # 用于预热的最近帧数量
+    warmup_runs: int = 8
+    shadow_sample_rate: float = 0.2  # 影子推理抽样比例，0表示预热通过即切换
+    shadow_min_frames: int = 20  # 影子比较的最少帧数
+    min_agreement: float = 0.9  # 与在线模型的最低一致性（逐帧F1均值）
+    max_latency_ratio: float = 1.3  # 新模型p50延迟 / 在线模型p50延迟 上限
+
+    @classmethod
+    def from_env(cls) -> "RolloutSettings":
+        return cls(
+            enabled=os.getenv("MODEL_HOT_SWAP_ENABLED", "true").lower()
+            in ("1", "true", "yes"),
+            recent_frames=int(os.getenv("MODEL_ROLLOUT_RECENT_FRAMES", "16")),
+            warmup_runs=int(os.getenv("MODEL_ROLLOUT_WARMUP_RUNS", "8")),
+            shadow_sample_rate=float(os.getenv("MODEL_ROLLOUT_SHADOW_RATE", "0.2")),
+            shadow_min_frames=int(os.getenv("MODEL_ROLLOUT_SHADOW_FRAMES", "20")),
+            min_agreement=float(os.getenv("MODEL_ROLLOUT_MIN_AGREEMENT", "0.9")),
+            max_latency_ratio=float(
+                os.getenv("MODEL_ROLLOUT_MAX_LATENCY_RATIO", "1.3")
+            ),
+        )
+
+
+@dataclass
+class RolloutCandidate:
+    """待切换的候选模型"""
+
+    task: str
+    model_path: str
+    model_id: Optional[str] = None
+    version: Optional[str] = None
+    detector: Any = None
+    state: str = STATE_LOADING
+    reason: Optional[str] = None
+    warmup_ms: List[float] = field(default_factory=list)
+    live_ms: List[float] = field(default_factory=list)
+    shadow_ms: List[float] = field(default_factory=list)
+    agreements: List[float] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        def p50(values):
+            return round(float(np.median(values)), 3) if values else None
+
+        return {
+            "task": self.task,
+            "model_path": self.model_path,
+            "model_id": self.model_id,
+            "version": self.version,
+            "state": self.state,
+            "reason": self.reason,
+            "warmup_p50_ms": p50(self.warmup_ms),
+            "live_p50_ms": p50(self.live_ms),
+            "shadow_p50_ms": p50(self.shadow_ms),
+            "shadow_frames": len(self.agreements),
+            "agreement": round(float(np.mean(self.agreements)), 4)
+            if self.agreements
+            else None,
+        }
+
+
+def load_detector(task: str, model_path: str, reference: Any = None) -> Any:
+    """按任务类型加载新检测器，设备等参数沿用当前在线检测器"""
+    device = getattr(reference, "device", None) or "auto"
+    if task == "human_detection":
+        from src.detection.detector import HumanDetector
+
+        return HumanDetector(model_path=model_path, device=device)
+    if task == "hairnet_detection":
+        from src.detection.yolo_hairnet_detector import YOLOHairnetDetector
+
+        return YOLOHairnetDetector(
+            model_path=model_path,
+            device=device,
+            conf_thres=getattr(reference, "conf_thres", None),
+        )
+    if task == "pose_detection":
+        from src.detection.pose_detector import PoseDetectorFactory
+
+        return PoseDetectorFactory.create(
+            backend="yolov8", model_path=model_path, device=device
+        )
+    raise ValueError(f"不支持热切换的检测任务: {task}")
+
+
+def extract_boxes(output: Any) -> Dict[str, np.ndarray]:
+    """将检测器输出统一为 boxes/classes/scores 数组"""
+    if isinstance(output, dict):
+        output = output.get("detections", [])
+    boxes, classes, scores = [], [], []
+    for det in output or []:
+        bbox = det.get("bbox") if isinstance(det, dict) else None
+        if not bbox or len(bbox) < 4:
+            continue
+        boxes.append([float(v) for v in bbox[:4]])
+        # 发网合规结果没有类别名，以是否佩戴作为类别比较
+        label = det.get("class", det.get("class_name", det.get("has_hairnet", "")))
+        classes.append(str(label))
+        scores.append(float(det.get("confidence", 0.0)))
+    return {
+        "boxes": np.asarray(boxes, dtype=np.float64).reshape(-1, 4),
+        "classes": np.asarray(classes, dtype=object),
+        "scores": np.asarray(scores, dtype=np.float64),
+    }
+
+
+class ModelRolloutManager:
+    """
+    检测进程内的模型热切换管理器
+
+    Args:
+        detection_pipeline: 检测管道（OptimizedDetectionPipeline）
+        camera_id: 当前检测进程的摄像头ID
+        settings: 热切换配置
+        loader: 检测器加载函数 (task, model_path, reference) -> detector
+    """
+
+    def __init__(
+        self,
+        detection_pipeline: Any,
+        camera_id: str,
+        settings: Optional[RolloutSettings] = None,
+        loader: Callable[[str, str, Any], Any] = load_detector,
+    ):
+        self.detection_pipeline = detection_pipeline
+        self.camera_id = camera_id
+        self.settings = settings or RolloutSettings.from_env()
+        self.loader = loader
+
+        self.recent_frames: Deque[np.ndarray] = deque(
+            maxlen=max(1, self.settings.recent_frames)
+        )
+        self.candidates: Dict[str, RolloutCandidate] = {}
+        self.previous: Dict[str, Any] = {}
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=50)
+
+        self._lock = threading.Lock()
+        self._frame_index = 0
+        self._pending_tasks: set = set()
+        self._shadow_executor: Optional[ThreadPoolExecutor] = None
+        self._shadow_future: Optional[Future] = None
+        self.shadow_skipped = 0
+        self.running = False
+        self.listener_task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # 帧边界钩子（在检测循环内调用，与检测同线程，切换天然位于两帧之间）
+    # ------------------------------------------------------------------
+
+    def before_frame(self, frame: np.ndarray) -> None:
+        """检测前调用：应用已就绪的候选模型，并记录最近帧用于预热"""
+        # cv2读取的每一帧都是新数组，直接保存引用即可
+        self.recent_frames.append(frame)
+        self._frame_index += 1
+
+        with self._lock:
+            ready = [c for c in self.candidates.values() if c.state == STATE_READY]
+        for candidate in ready:
+            self._swap(candidate)
+
+    def after_frame(self, frame: np.ndarray, result: Any = None) -> None:
+        """检测后调用：将抽样帧交给后台线程做影子推理（复用本帧的在线模型原始输出）
+
+        本帧没有对应任务的在线原始输出（缓存未记录、异步管道、该任务未执行）时跳过。
+        """
+        rate = self.settings.shadow_sample_rate
+        if rate <= 0:
+            return
+        interval = max(1, int(round(1.0 / min(rate, 1.0))))
+        if self._frame_index % interval != 0:
+            return
+
+        live_outputs = getattr(result, "model_outputs", None) or {}
+        with self._lock:
+            shadowing = [
+                c
+                for c in self.candidates.values()
+                if c.state == STATE_SHADOW and c.task in live_outputs
+            ]
+        if not shadowing:
+            return
+        if self._shadow_future is not None and not self._shadow_future.done():
+            # 上一个抽样帧的影子推理尚未完成，丢弃本帧而不是排队
+            self.shadow_skipped += 1
+            return
+
+        live_outputs = {c.task: live_outputs[c.task] for c in shadowing}
+        if self._shadow_executor is None:
+            self._shadow_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f"rollout-shadow-{self.camera_id}"
+            )
+        self._shadow_future = self._shadow_executor.submit(
+            self._shadow_batch, shadowing, frame, live_outputs
+        )
+
+    def wait_shadow(self, timeout: Optional[float] = None) -> None:
+        """等待进行中的影子推理完成"""
+        future = self._shadow_future
+        if future is not None:
+            future.result(timeout=timeout)
+
+    # ------------------------------------------------------------------
+    # 候选模型生命周期
+    # ------------------------------------------------------------------
+
+    async def stage(
+        self,
+        task: str,
+        model_path: str,
+        model_id: Optional[str] = None,
+        version: Optional[str] = None,
+    ) -> RolloutCandidate:
+        """在后台线程加载并预热新模型（不阻塞检测循环）"""
+        if task not in TASK_ATTRIBUTES:
+            raise ValueError(f"不支持热切换的检测任务: {task}")
+
+        candidate = RolloutCandidate(task, model_path, model_id, version)
+        with self._lock:
+            # 同一任务的新版本覆盖尚未切换的旧候选
+            self.candidates[task] = candidate
+        logger.info(f"开始准备候选模型: task={task}, model={model_path}")
+
+        # 在事件循环中复制最近帧，后台线程不直接遍历检测循环正在追加的deque
+        frames = list(self.recent_frames)
+        await asyncio.to_thread(self._prepare, candidate, frames)
+        return candidate
+
+    def _prepare(self, candidate: RolloutCandidate, frames: List[np.ndarray]) -> None:
+        attr = TASK_ATTRIBUTES[candidate.task]
+        reference = getattr(self.detection_pipeline, attr, None)
+        try:
+            detector = self.loader(candidate.task, candidate.model_path, reference)
+            for i in range(min(self.settings.warmup_runs, len(frames))):
+                start = time.perf_counter()
+                detector.detect(frames[-(i + 1)])
+                candidate.warmup_ms.append((time.perf_counter() - start) * 1000)
+        except Exception as e:
+            self._finish(candidate, STATE_REJECTED, f"加载或预热失败: {e}")
+            return
+
+        with self._lock:
+            if self.candidates.get(candidate.task) is not candidate:
+                return  # 已被更新的版本取代
+            candidate.detector = detector
+            if self.settings.shadow_sample_rate > 0 and reference is not None:
+                candidate.state = STATE_SHADOW
+            else:
+                candidate.state = STATE_READY
+        logger.info(
+            f"候选模型已预热: task={candidate.task}, "
+            f"warmup_runs={len(candidate.warmup_ms)}, next={candidate.state}"
+        )
+
+    def _shadow_batch(
+        self,
+        candidates: List[RolloutCandidate],
+        frame: np.ndarray,
+        live_outputs: Dict[str, Any],
+    ) -> None:
+        for candidate in candidates:
+            try:
+                self._shadow(candidate, frame, live_outputs[candidate.task])
+            except Exception as e:
+                logger.error(f"影子推理异常: task={candidate.task}, error={e}")
+
+    def _shadow(
+        self, candidate: RolloutCandidate, frame: np.ndarray, live: Any
+    ) -> None:
+        """在影子线程中执行候选模型推理
+
+        live 为检测管道记录的在线模型原始输出（ModelOutput），候选模型以相同的方法与
+        参数重放这次调用，两者的输出与耗时口径一致。
+        """
+        from src.detection.inference_backend import detection_agreement
+
+        detector = candidate.detector
+        if candidate.state != STATE_SHADOW or detector is None:
+            return  # 已被取代或拒绝
+        try:
+            method = getattr(detector, live.method)
+        except AttributeError:
+            self._finish(candidate, STATE_REJECTED, f"候选模型不支持 {live.method}")
+            return
+        try:
+            start = time.perf_counter()
+            shadow_output = method(frame, *live.args, **live.kwargs)
+            shadow_ms = (time.perf_counter() - start) * 1000
+        except Exception as e:
+            self._finish(candidate, STATE_REJECTED, f"影子推理失败: {e}")
+            return
+
+        candidate.live_ms.append(live.seconds * 1000)
+        candidate.shadow_ms.append(shadow_ms)
+        candidate.agreements.append(
+            detection_agreement(
+                [extract_boxes(live.output)], [extract_boxes(shadow_output)]
+            )
+        )
+        if len(candidate.agreements) >= self.settings.shadow_min_frames:
+            self._evaluate(candidate)
+
+    def _evaluate(self, candidate: RolloutCandidate) -> None:
+        agreement = float(np.mean(candidate.agreements))
+        live_p50 = float(np.median(candidate.live_ms))
+        shadow_p50 = float(np.median(candidate.shadow_ms))
+
+        if agreement < self.settings.min_agreement:
+            self._finish(
+                candidate,
+                STATE_REJECTED,
+                f"一致性不足: {agreement:.3f} < {self.settings.min_agreement}",
+            )
+        elif live_p50 > 0 and shadow_p50 > live_p50 * self.settings.max_latency_ratio:
+            self._finish(
+                candidate,
+                STATE_REJECTED,
+                f"延迟超标: {shadow_p50:.1f}ms > {live_p50:.1f}ms × "
+                f"{self.settings.max_latency_ratio}",
+            )
+        else:
+            with self._lock:
+                candidate.state = STATE_READY
+            logger.info(
+                f"候选模型影子评估通过: task={candidate.task}, "
+                f"agreement={agreement:.3f}, p50={shadow_p50:.1f}ms/{live_p50:.1f}ms"
+            )
+
+    def _finish(self, candidate: RolloutCandidate, state: str, reason: str) -> None:
+        with self._lock:
+            candidate.state = state
+            candidate.reason = reason
+            if state == STATE_REJECTED:
+                candidate.detector = None
+            if self.candidates.get(candidate.task) is candidate:
+                del self.candidates[candidate.task]
+        self.history.append(candidate.to_dict())
+        logger.warning(f"候选模型未切换: task={candidate.task}, 原因: {reason}")
+
+    def _swap(self, candidate: RolloutCandidate) -> None:
+        attr = TASK_ATTRIBUTES[candidate.task]
+        current = getattr(self.detection_pipeline, attr, None)
+        self.detection_pipeline.update_models(**{attr: candidate.detector})
+
+        with self._lock:
+            self.previous[candidate.task] = current
+            candidate.state = STATE_ACTIVE
+            if self.candidates.get(candidate.task) is candidate:
+                del self.candidates[candidate.task]
+        self.history.append(candidate.to_dict())
+        logger.info(
+            f"模型已热切换: task={candidate.task}, model={candidate.model_path}, "
+            f"version={candidate.version}"
+        )
+
+    def rollback(self, task: str) -> bool:
+        """立即回滚到内存中的上一个模型"""
+        attr = TASK_ATTRIBUTES.get(task)
+        with self._lock:
+            previous = self.previous.pop(task, None)
+            self.candidates.pop(task, None)
+        if attr is None or previous is None:
+            logger.warning(f"没有可回滚的模型: task={task}")
+            return False
+
+        current = getattr(self.detection_pipeline, attr, None)
+        self.detection_pipeline.update_models(**{attr: previous})
+        with self._lock:
+            # 允许再次回滚（在两个版本间切换）
+            self.previous[task] = current
+        self.history.append({"task": task, "state": "rolled_back"})
+        logger.info(f"模型已回滚: task={task}")
+        return True
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取候选模型与切换历史"""
+        with self._lock:
+            candidates = {t: c.to_dict() for t, c in self.candidates.items()}
+            rollback_ready = sorted(self.previous)
+        return {
+            "candidates": candidates,
+            "rollback_available": rollback_ready,
+            "history": list(self.history),
+        }
+
+    # ------------------------------------------------------------------
+    # 事件订阅
+    # ------------------------------------------------------------------
+
+    async def handle_event(self, notification: Dict[str, Any]) -> None:
+        """处理模型激活/回滚事件"""
+        if notification.get("type") != "model_activation":
+            return
+        camera_id = notification.get("camera_id")
+        if camera_id is not None and camera_id != self.camera_id:
+            return
+
+        task = notification.get("detection_task")
+        if notification.get("action") == "rollback":
+            self.rollback(task)
+            return
+
+        model_path = notification.get("model_path")
+        if task not in TASK_ATTRIBUTES or not model_path:
+            logger.warning(f"忽略无效的模型激活事件: {notification}")
+            return
+        try:
+            await self.stage(
+                task,
+                model_path,
+                notification.get("model_id"),
+                notification.get("version"),
+            )
+        except Exception as e:
+            logger.error(f"准备候选模型失败: {e}")
+
+    async def start(self) -> None:
+        """启动模型激活事件监听"""
+        if self.running:
+            return
+        self.running = True
+        self.listener_task = asyncio.create_task(self._listen())
+        logger.info(f"模型热切换监听器已启动: camera_id={self.camera_id}")
+
+    async def stop(self) -> None:
+        """停止监听并取消进行中的候选准备"""
+        if self._shadow_executor is not None:
+            await asyncio.to_thread(self._shadow_executor.shutdown, True)
+            self._shadow_executor = None
+
+        if not self.running:
+            return
+        self.running = False
+        tasks = [t for t in (self.listener_task, *self._pending_tasks) if t]
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        logger.info(f"模型热切换监听器已停止: camera_id={self.camera_id}")
+
+    def _dispatch(self, notification: Dict[str, Any]) -> None:
+        # 加载与预热可能耗时数秒，放到独立任务中，不阻塞消息接收
+        task = asyncio.create_task(self.handle_event(notification))
+        self._pending_tasks.add(task)
+        task.add_done_callback(self._pending_tasks.discard)
+
+    async def _listen(self) -> None:
+        from src.infrastructure.notifications.model_activation_notifier import (
+            MODEL_ACTIVATION_CHANNEL,
+        )
+
+        while self.running:
+            try:
+                import redis.asyncio as aioredis
+
+                redis_url = os.getenv("REDIS_URL")
+                if not redis_url:
+                    logger.debug("REDIS_URL未设置，跳过模型激活事件监听")
+                    await asyncio.sleep(10)
+                    continue
+
+                redis_client = aioredis.from_url(redis_url, decode_responses=True)
+                pubsub = redis_client.pubsub()
+                await pubsub.subscribe(MODEL_ACTIVATION_CHANNEL)
+                try:
+                    while self.running:
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True, timeout=1.0
+                        )
+                        if message and message.get("data"):
+                            self._dispatch(json.loads(message["data"]))
+                finally:
+                    try:
+                        await pubsub.unsubscribe()
+                        await pubsub.close()
+                        await redis_client.aclose()
+                    except Exception:
+                        pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"模型热切换监听器错误: {e}，5秒后重试")
+                await asyncio.sleep(5)
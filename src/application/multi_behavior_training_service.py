@@ -18,6 +18,11 @@ from src.application.model_registry_service import (
     ModelRegistrationInfo,
     ModelRegistryService,
 )
+from src.application.training_jobs import (
+    STATUS_CANCELLED,
+    STATUS_SUCCEEDED,
+    TrainingJobRunner,
+)
 from src.config.multi_behavior_training_config import MultiBehaviorTrainingConfig
 
 logger = logging.getLogger(__name__)
@@ -36,13 +41,45 @@ class MultiBehaviorTrainingResult:
 class MultiBehaviorTrainingService:
     """调用 YOLOv8 进行多行为检测模型训练。"""
 
+    JOB_KIND = "multi_behavior"
+
     def __init__(
         self,
         config: MultiBehaviorTrainingConfig,
         model_registry_service: Optional[ModelRegistryService] = None,
+        job_runner: Optional[TrainingJobRunner] = None,
     ) -> None:
         self._config = config
         self._model_registry = model_registry_service
+        # 配置了训练任务调度器时，训练在受限的子进程中运行
+        self._job_runner = job_runner
+        if job_runner is not None:
+            job_runner.register_handler(self.JOB_KIND, self._on_job_succeeded)
+
+    def checkpoint_path(self, run_name: str) -> Path:
+        """训练运行的最新检查点（ultralytics 每轮保存 weights/last.pt）。"""
+        return self._config.output_dir / "runs" / run_name / "weights" / "last.pt"
+
+    @staticmethod
+    def checkpoint_finished(checkpoint: Path) -> bool:
+        """检查点是否来自已完成的训练。
+
+        ultralytics 训练正常结束时会剥离 last.pt 的优化器状态并把 epoch 置为 -1，
+        这种检查点无法 resume（子进程在写 result.json 前退出时会出现）。
+        """
+        try:
+            import torch
+
+            try:
+                ckpt = torch.load(
+                    str(checkpoint), map_location="cpu", weights_only=False
+                )
+            except TypeError:  # 旧版 torch 不支持 weights_only
+                ckpt = torch.load(str(checkpoint), map_location="cpu")
+        except Exception as exc:
+            logger.warning("读取检查点失败，按未完成处理: %s (%s)", checkpoint, exc)
+            return False
+        return isinstance(ckpt, dict) and ckpt.get("epoch") == -1
 
     async def train(
         self,
@@ -59,6 +96,12 @@ class MultiBehaviorTrainingService:
             raise FileNotFoundError(f"未找到 data.yaml: {data_config}")
 
         training_params = training_params or {}
+        if self._job_runner is not None:
+            # 子进程任务完成后由调度器回调注册模型
+            return await self._train_as_job(
+                dataset_dir, data_config, training_params, dataset_metadata
+            )
+
         # 创建一个可取消的线程任务
         loop = asyncio.get_event_loop()
         try:
@@ -80,38 +123,115 @@ class MultiBehaviorTrainingService:
             logger.warning("训练任务被取消，但训练线程可能仍在运行")
             raise
 
-        if self._model_registry:
-            try:
-                dataset_info = dataset_metadata or {}
-                registration = ModelRegistrationInfo(
-                    name=training_params.get(
-                        "model_name", f"multi_behavior_{result.version}"
-                    ),
-                    model_type=training_params.get("model_type", "multi_behavior"),
-                    version=result.version,
-                    model_path=result.model_path,
-                    report_path=result.report_path,
-                    dataset_id=dataset_info.get("dataset_id"),
-                    dataset_path=dataset_info.get("dataset_path"),
-                    metrics=result.metrics,
-                    artifacts=result.artifacts,
-                    training_params=training_params,
-                    description=training_params.get("description"),
-                )
-                await self._model_registry.register_model(registration)
-            except Exception as exc:  # pragma: no cover
-                logger.warning("多行为模型注册失败: %s", exc)
-
+        await self._register_result(result, training_params, dataset_metadata)
         return result
 
+    async def _register_result(
+        self,
+        result: MultiBehaviorTrainingResult,
+        training_params: Dict[str, Any],
+        dataset_metadata: Optional[Dict[str, Any]],
+        raise_errors: bool = False,
+    ) -> None:
+        if not self._model_registry:
+            return
+        try:
+            dataset_info = dataset_metadata or {}
+            registration = ModelRegistrationInfo(
+                name=training_params.get(
+                    "model_name", f"multi_behavior_{result.version}"
+                ),
+                model_type=training_params.get("model_type", "multi_behavior"),
+                version=result.version,
+                model_path=result.model_path,
+                report_path=result.report_path,
+                dataset_id=dataset_info.get("dataset_id"),
+                dataset_path=dataset_info.get("dataset_path"),
+                metrics=result.metrics,
+                artifacts=result.artifacts,
+                training_params=training_params,
+                description=training_params.get("description"),
+            )
+            await self._model_registry.register_model(registration)
+        except Exception as exc:  # pragma: no cover
+            logger.warning("多行为模型注册失败: %s", exc)
+            if raise_errors:
+                raise
+
+    async def _train_as_job(
+        self,
+        dataset_dir: Path,
+        data_config: Path,
+        training_params: Dict[str, Any],
+        dataset_metadata: Optional[Dict[str, Any]],
+    ) -> MultiBehaviorTrainingResult:
+        """提交子进程训练任务并等待结束；工作流取消时向子进程发送取消信号。"""
+        cancel_event = training_params.pop("_cancel_event", None)
+        priority = int(training_params.pop("priority", 0))
+        params = {
+            "dataset_dir": str(dataset_dir),
+            "data_config": str(data_config),
+            "training_params": training_params,
+            "dataset_metadata": dataset_metadata,
+        }
+        job = self._job_runner.submit(self.JOB_KIND, params, priority=priority)
+        job_id = job["job_id"]
+        try:
+            job = await self._job_runner.wait(job_id, cancel_event=cancel_event)
+        except asyncio.CancelledError:
+            # 仅在显式取消时终止训练；服务关闭时训练继续，重启后重新接管
+            if cancel_event is not None and cancel_event.is_set():
+                self._job_runner.cancel(job_id)
+            raise
+
+        if job["status"] == STATUS_CANCELLED:
+            raise RuntimeError("训练已被取消")
+        if job["status"] != STATUS_SUCCEEDED:
+            raise RuntimeError(job.get("error") or f"训练任务失败: {job_id}")
+        return self._result_from_job(job)
+
+    @staticmethod
+    def _result_from_job(job: Dict[str, Any]) -> MultiBehaviorTrainingResult:
+        result = job["result"]
+        return MultiBehaviorTrainingResult(
+            model_path=Path(result["model_path"]),
+            report_path=Path(result["report_path"]),
+            metrics=result.get("metrics") or {},
+            samples_used=result.get("samples_used", 0),
+            version=result["version"],
+            artifacts={
+                **(result.get("artifacts") or {}),
+                "training_job_id": job["job_id"],
+            },
+        )
+
+    async def _on_job_succeeded(self, job: Dict[str, Any]) -> None:
+        """训练任务成功回调：注册模型（不依赖提交方是否仍在等待）。
+
+        注册失败时抛出异常，由调度器稍后重试。
+        """
+        params = job["params"]
+        await self._register_result(
+            self._result_from_job(job),
+            params.get("training_params") or {},
+            params.get("dataset_metadata"),
+            raise_errors=True,
+        )
+
     def _run_training(  # noqa: C901
         self,
         dataset_dir: Path,
         data_config: Path,
         training_params: Dict[str, Any],
     ) -> MultiBehaviorTrainingResult:
-        # 从训练参数中获取取消事件
+        # 从训练参数中获取取消事件、检查点与每轮回调（训练子进程传入）
         cancel_event = training_params.pop("_cancel_event", None)
+        resume_checkpoint = training_params.pop("_resume_checkpoint", None)
+        # 训练已完成但结果未写出：跳过训练，直接整理已有的训练输出
+        training_done = bool(resume_checkpoint) and self.checkpoint_finished(
+            Path(resume_checkpoint)
+        )
+        on_epoch_end = training_params.pop("_on_epoch_end", None)
 
         # 在训练开始前检查 PyTorch 和 CUDA 状态
         try:
@@ -154,7 +274,11 @@ class MultiBehaviorTrainingService:
         resume_from = training_params.get("resume_from") or training_params.get(
             "from_model"
         )
-        if resume_from:
+        if resume_checkpoint:
+            # 中断的训练任务：从 last.pt 恢复，轮数与优化器状态均从检查点读取
+            model_name = str(resume_checkpoint)
+            logger.info(f"从检查点恢复中断的训练: {model_name}")
+        elif resume_from:
             # 如果指定了继续训练的模型路径，使用该路径
             resume_path = Path(resume_from)
             if not resume_path.exists():
@@ -173,6 +297,7 @@ class MultiBehaviorTrainingService:
         # 智能选择设备：如果device="auto"，使用ModelConfig选择设备，否则使用指定设备
         device = self._select_device(device_raw)
         patience = int(training_params.get("patience", self._config.patience))
+        workers = int(training_params.get("workers", 8))
         run_name = training_params.get(
             "run_name", f"multi_behavior_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
         )
@@ -211,6 +336,8 @@ class MultiBehaviorTrainingService:
         )
 
         model = YOLO(model_name)
+        if on_epoch_end is not None:
+            model.add_callback("on_fit_epoch_end", on_epoch_end)
 
         # 强制检查并设置设备（如果 CUDA 可用但设备选择为 CPU，强制使用 CUDA）
         import torch as training_torch
@@ -355,47 +482,53 @@ class MultiBehaviorTrainingService:
                     raise RuntimeError("训练已被取消")
 
                 # 启动训练
-                model.train(
-                    data=str(data_config),
-                    epochs=epochs,
-                    imgsz=imgsz,
-                    batch=batch_size,
-                    device=device,
-                    patience=patience,
-                    project=str(project_dir),
-                    name=run_name,
-                    exist_ok=True,
-                    verbose=False,
-                    save=True,  # 确保保存模型
-                    save_period=1,  # 每轮都保存（包括第1轮）
-                    rect=False,  # 禁用矩形训练（可能导致张量大小不匹配）
-                    augment=True,  # 重新启用数据增强以帮助模型学习
-                    val=True,  # 启用验证以获取验证集指标（mAP50, mAP50-95等）
-                    # 优化器参数
-                    lr0=lr0,  # 初始学习率
-                    lrf=lrf,  # 最终学习率（相对于lr0）
-                    momentum=momentum,  # 动量
-                    weight_decay=weight_decay,  # 权重衰减
-                    warmup_epochs=warmup_epochs,  # 预热轮数
-                    # 损失函数权重参数
-                    box=box,  # 边界框损失权重
-                    cls=cls,  # 分类损失权重
-                    dfl=dfl,  # DFL损失权重
-                    # 数据增强参数（保守设置，避免张量大小问题）
-                    hsv_h=0.015,  # 色调增强（降低）
-                    hsv_s=0.7,  # 饱和度增强
-                    hsv_v=0.4,  # 明度增强
-                    degrees=0.0,  # 旋转角度（禁用旋转，避免张量问题）
-                    translate=0.1,  # 平移
-                    scale=0.5,  # 缩放
-                    shear=0.0,  # 剪切（禁用，避免张量问题）
-                    perspective=0.0,  # 透视变换（禁用，避免张量问题）
-                    flipud=0.0,  # 上下翻转概率（禁用）
-                    fliplr=0.5,  # 左右翻转概率
-                    mosaic=0.5,  # Mosaic增强概率（降低，避免shape mismatch）
-                    mixup=0.0,  # Mixup增强概率（禁用，避免张量问题）
-                    copy_paste=0.0,  # Copy-paste增强（禁用，避免shape问题）
-                )
+                if training_done:
+                    logger.info("检查点训练已完成，跳过训练: %s", resume_checkpoint)
+                elif resume_checkpoint:
+                    model.train(resume=True)
+                else:
+                    model.train(
+                        data=str(data_config),
+                        epochs=epochs,
+                        imgsz=imgsz,
+                        batch=batch_size,
+                        device=device,
+                        patience=patience,
+                        project=str(project_dir),
+                        name=run_name,
+                        exist_ok=True,
+                        verbose=False,
+                        save=True,  # 确保保存模型
+                        save_period=1,  # 每轮都保存（包括第1轮）
+                        rect=False,  # 禁用矩形训练（可能导致张量大小不匹配）
+                        augment=True,  # 重新启用数据增强以帮助模型学习
+                        val=True,  # 启用验证以获取验证集指标（mAP50, mAP50-95等）
+                        # 优化器参数
+                        lr0=lr0,  # 初始学习率
+                        lrf=lrf,  # 最终学习率（相对于lr0）
+                        momentum=momentum,  # 动量
+                        weight_decay=weight_decay,  # 权重衰减
+                        warmup_epochs=warmup_epochs,  # 预热轮数
+                        # 损失函数权重参数
+                        box=box,  # 边界框损失权重
+                        cls=cls,  # 分类损失权重
+                        dfl=dfl,  # DFL损失权重
+                        # 数据增强参数（保守设置，避免张量大小问题）
+                        hsv_h=0.015,  # 色调增强（降低）
+                        hsv_s=0.7,  # 饱和度增强
+                        hsv_v=0.4,  # 明度增强
+                        degrees=0.0,  # 旋转角度（禁用旋转，避免张量问题）
+                        translate=0.1,  # 平移
+                        scale=0.5,  # 缩放
+                        shear=0.0,  # 剪切（禁用，避免张量问题）
+                        perspective=0.0,  # 透视变换（禁用，避免张量问题）
+                        flipud=0.0,  # 上下翻转概率（禁用）
+                        fliplr=0.5,  # 左右翻转概率
+                        mosaic=0.5,  # Mosaic增强概率（降低，避免shape mismatch）
+                        mixup=0.0,  # Mixup增强概率（禁用，避免张量问题）
+                        copy_paste=0.0,  # Copy-paste增强（禁用，避免shape问题）
+                        workers=workers,  # 数据加载进程数（受训练任务CPU限制）
+                    )
 
                 # 训练完成后，设置训练完成标志（如果使用取消监控）
                 if cancel_event and training_finished is not None:
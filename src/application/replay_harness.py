@@ -0,0 +1,740 @@
+"""
+录像回放压测工具
+
+将录制的视频文件或图片序列按固定帧率（模拟实时摄像头，超时丢帧）或最大速度
+送入真实的 DetectionLoopService / OptimizedDetectionPipeline，Redis 与 PostgreSQL
+由内存替身代替。输出各阶段延迟分位数、吞吐、CPU/RSS，以及与基准运行的检测结果差异，
+基准以JSON保存，便于在本地无摄像头环境下对比检测器、追踪器、缓存、仓储的改动。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from src.application.detection_loop_service import (
+    DetectionLoopConfig,
+    DetectionLoopService,
+)
+from src.application.video_stream_application_service import (
+    VideoStreamApplicationService,
+)
+from src.domain.entities.detection_record import DetectionRecord
+from src.domain.repositories.detection_repository import IDetectionRepository
+from src.domain.repositories.violation_repository import IViolationRepository
+from src.services.stream_renditions import DEFAULT_RENDITION
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp"}
+REPORT_VERSION = 1
+
+# 与基准对比时，低于该耗时（毫秒）的阶段不参与回归判断，避免噪声
+MIN_STAGE_MS_FOR_REGRESSION = 0.5
+
+
+class ReplaySource:
+    """
+    cv2.VideoCapture 兼容的回放源
+
+    Args:
+        source: 视频文件路径或图片序列目录
+        fps: 回放帧率，<=0 表示最大速度；>0 时按时间轴取帧，处理不及时的帧被丢弃
+        max_frames: 最多读取的帧数
+        on_exhausted: 回放结束时的回调
+    """
+
+    def __init__(
+        self,
+        source: str,
+        fps: float = 0.0,
+        max_frames: Optional[int] = None,
+        on_exhausted: Optional[Callable[[], None]] = None,
+    ):
+        self.source = str(source)
+        self.fps = float(fps or 0.0)
+        self.max_frames = max_frames
+        self.on_exhausted = on_exhausted
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.last_index = -1
+
+        self._position = 0
+        self._start: Optional[float] = None
+        self._opened = True
+        self._images: Optional[List[Path]] = None
+        self._capture: Optional[cv2.VideoCapture] = None
+
+        path = Path(self.source)
+        if path.is_dir():
+            self._images = sorted(
+                p for p in path.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES
+            )
+            self._source_fps = self.fps or 25.0
+            total = len(self._images)
+        else:
+            self._capture = cv2.VideoCapture(self.source)
+            if not self._capture.isOpened():
+                raise RuntimeError(f"无法打开回放源: {self.source}")
+            self._source_fps = self._capture.get(cv2.CAP_PROP_FPS) or 25.0
+            total = int(self._capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.total_frames = min(total, max_frames) if max_frames else total
+
+    def isOpened(self) -> bool:  # noqa: N802 - 与cv2接口保持一致
+        return self._opened
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.total_frames)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps or self._source_fps)
+        if self._capture is not None:
+            return self._capture.get(prop)
+        if self._images and prop in (
+            cv2.CAP_PROP_FRAME_WIDTH,
+            cv2.CAP_PROP_FRAME_HEIGHT,
+        ):
+            first = cv2.imread(str(self._images[0]))
+            if first is not None:
+                return float(first.shape[1 if prop == cv2.CAP_PROP_FRAME_WIDTH else 0])
+        return 0.0
+
+    def set(self, prop: int, value: float) -> bool:
+        # 回放不循环：检测循环在文件结束时会尝试回到第0帧，这里忽略
+        return True
+
+    def _read_at(self, index: int):
+        if self._images is not None:
+            if index >= len(self._images):
+                return False, None
+            frame = cv2.imread(str(self._images[index]))
+            return frame is not None, frame
+        assert self._capture is not None
+        if index != self._position:
+            self._capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+        return self._capture.read()
+
+    def _next_index(self) -> int:
+        """固定帧率模式下按墙钟计算应读取的帧，跳过的帧计为丢帧"""
+        if self.fps <= 0:
+            return self._position
+        now = time.perf_counter()
+        if self._start is None:
+            self._start = now
+        due = self._start + self._position / self.fps
+        if now < due:
+            time.sleep(due - now)
+            return self._position
+        index = max(self._position, int((now - self._start) * self.fps))
+        self.frames_dropped += index - self._position
+        return index
+
+    def read(self):
+        if not self._opened:
+            return False, None
+        index = self._next_index()
+        if self.max_frames is not None and index >= self.max_frames:
+            return self._exhaust()
+        ok, frame = self._read_at(index)
+        if not ok:
+            return self._exhaust()
+        self._position = index + 1
+        self.last_index = index
+        self.frames_read += 1
+        return True, frame
+
+    def _exhaust(self):
+        if self.on_exhausted is not None:
+            self.on_exhausted()
+        return False, None
+
+    def release(self) -> None:
+        self._opened = False
+        if self._capture is not None:
+            self._capture.release()
+
+
+class StageTimer:
+    """阶段耗时采样（毫秒）"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def record(self, stage: str, elapsed_ms: float) -> None:
+        self.samples[stage].append(elapsed_ms)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for stage, values in sorted(self.samples.items()):
+            arr = np.asarray(values, dtype=np.float64)
+            result[stage] = {
+                "count": int(arr.size),
+                "mean_ms": round(float(arr.mean()), 3),
+                "p50_ms": round(float(np.percentile(arr, 50)), 3),
+                "p90_ms": round(float(np.percentile(arr, 90)), 3),
+                "p99_ms": round(float(np.percentile(arr, 99)), 3),
+                "max_ms": round(float(arr.max()), 3),
+            }
+        return result
+
+
+class ResourceSampler:
+    """后台线程采样本进程CPU与RSS"""
+
+    def __init__(self, interval: float = 0.2):
+        self.interval = interval
+        self.cpu: List[float] = []
+        self.rss_mb: List[float] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._process = None
+
+    def _sample(self) -> None:
+        self.cpu.append(self._process.cpu_percent(None))
+        self.rss_mb.append(self._process.memory_info().rss / (1024 * 1024))
+
+    def start(self) -> None:
+        try:
+            import psutil
+        except ImportError:
+            logger.warning("未安装psutil，跳过CPU/内存采样")
+            return
+
+        self._process = psutil.Process()
+        self._process.cpu_percent(None)
+
+        def _run():
+            while not self._stop.wait(self.interval):
+                self._sample()
+
+        self._thread = threading.Thread(target=_run, name="replay-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Dict[str, float]:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        if self._process is not None:
+            # 回放时间短于采样间隔时也至少保留一个样本
+            self._sample()
+        if not self.cpu:
+            return {}
+        return {
+            "cpu_mean_percent": round(float(np.mean(self.cpu)), 1),
+            "cpu_max_percent": round(float(np.max(self.cpu)), 1),
+            "rss_mean_mb": round(float(np.mean(self.rss_mb)), 1),
+            "rss_max_mb": round(float(np.max(self.rss_mb)), 1),
+        }
+
+
+class InMemoryDetectionRepository(IDetectionRepository):
+    """检测记录仓储内存替身（可模拟写入延迟）"""
+
+    def __init__(
+        self, write_latency_ms: float = 0.0, timer: Optional[StageTimer] = None
+    ):
+        self.records: Dict[str, DetectionRecord] = {}
+        self.write_latency_ms = write_latency_ms
+        self.timer = timer
+
+    async def save(self, record: DetectionRecord) -> str:
+        start = time.perf_counter()
+        if self.write_latency_ms > 0:
+            await asyncio.sleep(self.write_latency_ms / 1000.0)
+        self.records[record.id] = record
+        if self.timer is not None:
+            self.timer.record(
+                "repo.detection_save", (time.perf_counter() - start) * 1000
+            )
+        return record.id
+
+    async def find_by_id(self, record_id: str) -> Optional[DetectionRecord]:
+        return self.records.get(record_id)
+
+    async def find_by_camera_id(
+        self, camera_id: str, limit: int = 100, offset: int = 0
+    ) -> List[DetectionRecord]:
+        matched = [r for r in self.records.values() if r.camera_id == camera_id]
+        return matched[offset : offset + limit]
+
+    async def find_by_time_range(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        camera_id: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[DetectionRecord]:
+        matched = [
+            r
+            for r in self.records.values()
+            if (camera_id is None or r.camera_id == camera_id)
+            and start_time <= r.timestamp.value <= end_time
+        ]
+        return matched[:limit]
+
+    async def find_by_confidence_range(
+        self,
+        min_confidence: float,
+        max_confidence: float,
+        camera_id: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[DetectionRecord]:
+        matched = [
+            r
+            for r in self.records.values()
+            if (camera_id is None or r.camera_id == camera_id)
+            and min_confidence <= r.confidence.value <= max_confidence
+        ]
+        return matched[:limit]
+
+    async def count_by_camera_id(self, camera_id: str) -> int:
+        return sum(1 for r in self.records.values() if r.camera_id == camera_id)
+
+    async def delete_by_id(self, record_id: str) -> bool:
+        return self.records.pop(record_id, None) is not None
+
+    async def delete_by_camera_id(self, camera_id: str) -> int:
+        ids = [k for k, r in self.records.items() if r.camera_id == camera_id]
+        for record_id in ids:
+            del self.records[record_id]
+        return len(ids)
+
+    async def get_statistics(
+        self,
+        camera_id: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        return {"total_records": len(self.records)}
+
+
+class InMemoryViolationRepository(IViolationRepository):
+    """违规仓储内存替身"""
+
+    def __init__(self):
+        self.violations: List[Dict[str, Any]] = []
+
+    async def save(self, violation, detection_id: Optional[str] = None) -> int:
+        self.violations.append({"violation": violation, "detection_id": detection_id})
+        return len(self.violations)
+
+    async def find_by_id(self, violation_id: int) -> Optional[Dict[str, Any]]:
+        if 0 < violation_id <= len(self.violations):
+            return self.violations[violation_id - 1]
+        return None
+
+    async def find_all(
+        self,
+        camera_id: Optional[str] = None,
+        status: Optional[str] = None,
+        violation_type: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> Dict[str, Any]:
+        items = self.violations[offset : offset + limit]
+        return {
+            "violations": items,
+            "total": len(self.violations),
+            "limit": limit,
+            "offset": offset,
+        }
+
+    async def update_status(
+        self,
+        violation_id: int,
+        status: str,
+        notes: Optional[str] = None,
+        handled_by: Optional[str] = None,
+    ) -> bool:
+        return await self.find_by_id(violation_id) is not None
+
+
+class RecordingVideoStreamService(VideoStreamApplicationService):
+    """视频流服务替身：保留缩放与JPEG编码开销，Redis发布改为计数"""
+
+    def __init__(self):
+        super().__init__(stream_manager=None)
+        self.shm_enabled = False
+        self.frames_pushed = 0
+        self.bytes_pushed = 0
+
+    async def _push_via_redis(
+        self, camera_id: str, jpeg_data: bytes, rendition: str = DEFAULT_RENDITION
+    ) -> bool:
+        self.frames_pushed += 1
+        self.bytes_pushed += len(jpeg_data)
+        return True
+
+    async def _rendition_demand(self, camera_id: str) -> Dict[str, int]:
+        return {}
+
+
+def summarize_result(result: Any) -> Dict[str, Any]:
+    """提取用于基准对比的检测输出（框取整，行为取布尔值）"""
+    persons = [
+        [int(round(float(v))) for v in det.get("bbox", [])[:4]]
+        for det in (getattr(result, "person_detections", None) or [])
+    ]
+    return {
+        "persons": persons,
+        "hairnet": [
+            bool(h.get("has_hairnet"))
+            for h in (getattr(result, "hairnet_results", None) or [])
+        ],
+        "handwash": [
+            bool(h.get("is_handwashing"))
+            for h in (getattr(result, "handwash_results", None) or [])
+        ],
+        "sanitize": [
+            bool(h.get("is_sanitizing"))
+            for h in (getattr(result, "sanitize_results", None) or [])
+        ],
+    }
+
+
+class ReplayDetectionLoopService(DetectionLoopService):
+    """使用回放源与内存替身运行的检测循环"""
+
+    def __init__(self, *args, replay_source: ReplaySource, timer: StageTimer, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replay_source = replay_source
+        self.timer = timer
+        self.frame_outputs: Dict[int, Dict[str, Any]] = {}
+        self.published_stats: List[Dict[str, Any]] = []
+        self._current_frame: Optional[int] = None
+        self._instrument()
+
+    def _instrument(self) -> None:
+        """包装各阶段入口以记录耗时（仅作用于本实例持有的对象）"""
+        pipeline = self.detection_pipeline
+        detect = pipeline.detect_comprehensive
+
+        def timed_detect(*args, **kwargs):
+            start = time.perf_counter()
+            result = detect(*args, **kwargs)
+            self.timer.record(
+                "detect_comprehensive", (time.perf_counter() - start) * 1000
+            )
+            frame = self._current_frame
+            if frame is not None and frame not in self.frame_outputs:
+                self.frame_outputs[frame] = summarize_result(result)
+                for stage, seconds in (
+                    getattr(result, "processing_times", None) or {}
+                ).items():
+                    self.timer.record(f"pipeline.{stage}", float(seconds) * 1000)
+            return result
+
+        pipeline.detect_comprehensive = timed_detect
+
+        for owner, attr, stage in (
+            (self.detection_app_service, "process_realtime_stream", "app_service"),
+            (self.video_stream_service, "push_frame", "stream_push"),
+        ):
+            if owner is not None:
+                setattr(owner, attr, self._timed_async(getattr(owner, attr), stage))
+
+    def _timed_async(self, func, stage: str):
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.timer.record(stage, (time.perf_counter() - start) * 1000)
+
+        return wrapper
+
+    def _register_signal_handlers(self):
+        # 回放在调用方进程内运行，不接管其信号处理
+        pass
+
+    def _open_video_source(self):
+        self.resources["cap"] = self.replay_source
+        return self.replay_source
+
+    def _create_config_snapshot(self):
+        # 回放不访问真实Redis/PostgreSQL：快照保持为空，配置来自命令行参数
+        from src.application.config_snapshot import ConfigSnapshotStore
+
+        async def empty_loader(camera_id: str) -> Dict[str, Any]:
+            return {}
+
+        return ConfigSnapshotStore(
+            self.config.camera_id, loader=empty_loader, probe_interval=0
+        )
+
+    def _publish_stats_to_redis(self):
+        now = time.time()
+        if (
+            self.last_stats_publish_time is None
+            or now - self.last_stats_publish_time >= self.stats_publish_interval
+        ):
+            self.published_stats.append(dict(self.detection_stats))
+            self.last_stats_publish_time = now
+
+    async def _process_frame(self, frame: np.ndarray, frame_count: int):
+        self._current_frame = self.replay_source.last_index
+        start = time.perf_counter()
+        try:
+            return await super()._process_frame(frame, frame_count)
+        finally:
+            self.timer.record("frame_total", (time.perf_counter() - start) * 1000)
+            self._current_frame = None
+
+
+class ReplayHarness:
+    """
+    回放压测入口
+
+    Args:
+        pipeline: 检测管线（真实 OptimizedDetectionPipeline 或测试替身）
+        source: 视频文件或图片序列目录
+        fps: 回放帧率，<=0 为最大速度
+        max_frames: 最多回放帧数
+        log_interval: 检测间隔（与生产配置一致）
+        db_latency_ms: 模拟检测记录写入延迟
+        save_policy: 保存策略（默认与生产一致的SMART策略）
+        with_app_service: 是否经过 DetectionApplicationService（含保存逻辑）
+        with_stream: 是否经过视频流推送（缩放+JPEG编码）
+    """
+
+    def __init__(
+        self,
+        pipeline: Any,
+        source: str,
+        camera_id: str = "replay",
+        fps: float = 0.0,
+        max_frames: Optional[int] = None,
+        log_interval: int = 1,
+        db_latency_ms: float = 0.0,
+        save_policy: Any = None,
+        with_app_service: bool = True,
+        with_stream: bool = True,
+    ):
+        self.pipeline = pipeline
+        self.source = str(source)
+        self.camera_id = camera_id
+        self.fps = fps
+        self.max_frames = max_frames
+        self.log_interval = log_interval
+        self.db_latency_ms = db_latency_ms
+        self.save_policy = save_policy
+        self.with_app_service = with_app_service
+        self.with_stream = with_stream
+
+        self.timer = StageTimer()
+        self.detection_repository = InMemoryDetectionRepository(
+            db_latency_ms, self.timer
+        )
+        self.violation_repository = InMemoryViolationRepository()
+        self.stream_service = RecordingVideoStreamService() if with_stream else None
+
+    def _build_app_service(self):
+        from src.application.detection_application_service import (
+            DetectionApplicationService,
+        )
+        from src.services.detection_service_domain import (
+            DefaultCameraRepository,
+            DetectionServiceDomain,
+        )
+
+        domain_service = DetectionServiceDomain(
+            detection_repository=self.detection_repository,
+            camera_repository=DefaultCameraRepository(),
+            violation_repository=self.violation_repository,
+        )
+        return DetectionApplicationService(
+            detection_pipeline=self.pipeline,
+            detection_domain_service=domain_service,
+            snapshot_storage=None,
+            save_policy=self.save_policy,
+        )
+
+    async def run(self, name: str = "replay") -> Dict[str, Any]:
+        """执行一次回放并返回报告"""
+        service: Optional[ReplayDetectionLoopService] = None
+
+        def stop():
+            if service is not None:
+                service.stop()
+
+        replay_source = ReplaySource(self.source, self.fps, self.max_frames, stop)
+        service = ReplayDetectionLoopService(
+            DetectionLoopConfig(
+                camera_id=self.camera_id,
+                source=self.source,
+                log_interval=self.log_interval,
+            ),
+            self.pipeline,
+            self._build_app_service() if self.with_app_service else None,
+            self.stream_service,
+            replay_source=replay_source,
+            timer=self.timer,
+        )
+
+        # 隔离真实Redis：循环内的配置读取与监听器依赖 REDIS_URL
+        saved_redis_url = os.environ.pop("REDIS_URL", None)
+        sampler = ResourceSampler()
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            await service.run()
+        finally:
+            wall_time = time.perf_counter() - start
+            resources = sampler.stop()
+            if saved_redis_url is not None:
+                os.environ["REDIS_URL"] = saved_redis_url
+            listener = getattr(service, "config_change_listener", None)
+            if listener is not None:
+                await listener.stop()
+
+        processed = service.process_count
+        outputs = [
+            dict(frame=index, **service.frame_outputs[index])
+            for index in sorted(service.frame_outputs)
+        ]
+        return {
+            "version": REPORT_VERSION,
+            "name": name,
+            "source": self.source,
+            "created_at": datetime.now().isoformat(),
+            "settings": {
+                "fps": self.fps,
+                "max_frames": self.max_frames,
+                "log_interval": self.log_interval,
+                "db_latency_ms": self.db_latency_ms,
+                "with_app_service": self.with_app_service,
+                "with_stream": self.with_stream,
+            },
+            "frames": {
+                "read": replay_source.frames_read,
+                "processed": processed,
+                "dropped": replay_source.frames_dropped,
+            },
+            "wall_time_s": round(wall_time, 3),
+            "throughput": {
+                "read_fps": round(replay_source.frames_read / wall_time, 2)
+                if wall_time > 0
+                else 0.0,
+                "processed_fps": round(processed / wall_time, 2)
+                if wall_time > 0
+                else 0.0,
+            },
+            "stages": self.timer.summary(),
+            "resources": resources,
+            "stand_ins": {
+                "detection_records": len(self.detection_repository.records),
+                "violations": len(self.violation_repository.violations),
+                "stream_frames": self.stream_service.frames_pushed
+                if self.stream_service
+                else 0,
+                "stats_published": len(service.published_stats),
+            },
+            "outputs": outputs,
+        }
+
+
+def compare_outputs(
+    golden: List[Dict[str, Any]],
+    current: List[Dict[str, Any]],
+    iou_threshold: float = 0.5,
+    max_examples: int = 10,
+) -> Dict[str, Any]:
+    """逐帧对比检测输出（人员框按IoU配对，行为标记逐项比较）"""
+    from src.core.tracker import boxes_to_array, pairwise_iou
+
+    golden_by_frame = {o["frame"]: o for o in golden}
+    current_by_frame = {o["frame"]: o for o in current}
+    frames = sorted(set(golden_by_frame) & set(current_by_frame))
+
+    changed: List[Dict[str, Any]] = []
+    matched_ious: List[float] = []
+    count_mismatch = 0
+    flag_mismatch = 0
+
+    for frame in frames:
+        ref, out = golden_by_frame[frame], current_by_frame[frame]
+        reasons = []
+        if len(ref["persons"]) != len(out["persons"]):
+            count_mismatch += 1
+            reasons.append(f"persons {len(ref['persons'])}->{len(out['persons'])}")
+        if ref["persons"] and out["persons"]:
+            iou = pairwise_iou(
+                boxes_to_array(ref["persons"]), boxes_to_array(out["persons"])
+            )
+            best = iou.max(axis=1)
+            matched_ious.extend(best.tolist())
+            if (best < iou_threshold).any():
+                reasons.append("bbox moved")
+        for key in ("hairnet", "handwash", "sanitize"):
+            if ref.get(key) != out.get(key):
+                flag_mismatch += 1
+                reasons.append(f"{key} changed")
+        if reasons:
+            changed.append({"frame": frame, "reasons": reasons})
+
+    return {
+        "frames_compared": len(frames),
+        "frames_missing": len(set(golden_by_frame) ^ set(current_by_frame)),
+        "frames_changed": len(changed),
+        "person_count_mismatches": count_mismatch,
+        "flag_mismatches": flag_mismatch,
+        "mean_person_iou": round(float(np.mean(matched_ious)), 4)
+        if matched_ious
+        else None,
+        "examples": changed[:max_examples],
+    }
+
+
+def compare_reports(
+    baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.1
+) -> Dict[str, Any]:
+    """
+    与基准报告对比，返回性能回归项与输出差异
+
+    Args:
+        baseline: 基准报告
+        current: 本次报告
+        tolerance: 允许的相对变化（0.1 表示10%）
+    """
+    regressions: List[str] = []
+
+    base_fps = baseline["throughput"]["processed_fps"]
+    cur_fps = current["throughput"]["processed_fps"]
+    if base_fps > 0 and cur_fps < base_fps * (1 - tolerance):
+        regressions.append(f"processed_fps {base_fps} -> {cur_fps}")
+
+    for stage, base in baseline.get("stages", {}).items():
+        cur = current.get("stages", {}).get(stage)
+        if cur is None:
+            continue
+        for metric in ("p50_ms", "p90_ms"):
+            if base[metric] < MIN_STAGE_MS_FOR_REGRESSION:
+                continue
+            if cur[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{stage}.{metric} {base[metric]} -> {cur[metric]}")
+
+    base_rss = baseline.get("resources", {}).get("rss_max_mb")
+    cur_rss = current.get("resources", {}).get("rss_max_mb")
+    if base_rss and cur_rss and cur_rss > base_rss * (1 + tolerance):
+        regressions.append(f"rss_max_mb {base_rss} -> {cur_rss}")
+
+    output_diff = compare_outputs(
+        baseline.get("outputs", []), current.get("outputs", [])
+    )
+    return {
+        "regressions": regressions,
+        "output_diff": output_diff,
+        "ok": not regressions
+        and output_diff["frames_changed"] == 0
+        and output_diff["frames_missing"] == 0,
+    }
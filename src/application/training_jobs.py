@@ -0,0 +1,685 @@
+"""
+训练任务子系统：持久化队列 + 子进程训练监管。
+
+每次训练作为独立子进程运行（python -m src.application.training_worker <job_dir>），
+API 进程只负责排队、调度与监管：
+- 任务持久化在 TRAINING_JOBS_DIR/<job_id>/job.json，按优先级（高优先）和
+  创建时间出队，同时运行的任务数不超过 TRAINING_MAX_CONCURRENT；
+- 子进程限制 CPU 线程数、CPU 亲和性与内存上限（见 TrainingResourceLimits），
+  默认只使用编号最大的 1/4 核心，避免与实时检测争抢 CPU；
+- 子进程使用独立会话启动，API 重启后仍存活的训练会被重新接管（按 PID 与进程
+  启动时间识别，避免 PID 复用误判）；已退出但未写结果的任务（崩溃、被杀、断电）
+  自动从 last.pt 恢复重跑；
+- 成功回调（如模型注册）的完成状态持久化在 job.json 中，API 停机期间结束的任务
+  在恢复后补跑回调，回调失败按退避重试；
+- 取消通过信号完成：先 SIGTERM（子进程在当前轮结束后停止），超时后 SIGKILL；
+- 每个 API worker 都会启动调度器，调度在任务根目录的排他文件锁内进行，同一时刻
+  只有一个进程检查和启动任务（并发上限对整个主机生效）；成功回调在锁内认领后执行；
+- 子进程每轮结束把指标追加到 progress.jsonl，API 按偏移量增量读取。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import psutil
+
+from src.utils.file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+TERMINAL_STATUSES = frozenset({STATUS_SUCCEEDED, STATUS_FAILED, STATUS_CANCELLED})
+
+JOB_FILE = "job.json"
+PROGRESS_FILE = "progress.jsonl"
+RESULT_FILE = "result.json"
+LOG_FILE = "worker.log"
+LOCK_FILE = ".scheduler.lock"
+
+# 成功回调认领租约（秒）：认领进程崩溃后由其他进程在租约过期后接手
+HANDLER_CLAIM_TTL = 600.0
+
+_PROJECT_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def write_json_atomic(path: Path, data: Dict[str, Any]) -> None:
+    """原子写入 JSON（先写临时文件再替换）。
+
+    临时文件名包含 PID 与随机后缀，多个进程/线程同时保存同一文件不会互相覆盖临时文件。
+    """
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def parse_cpu_list(value: Optional[str]) -> Optional[List[int]]:
+    """解析 CPU 列表（如 "0-3,6"）；空值或格式错误返回 None。"""
+    if not value:
+        return None
+    cpus: List[int] = []
+    try:
+        for part in value.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            if "-" in part:
+                low, high = part.split("-", 1)
+                cpus.extend(range(int(low), int(high) + 1))
+            else:
+                cpus.append(int(part))
+    except ValueError:
+        logger.warning(f"CPU 列表格式错误，忽略: {value}")
+        return None
+    return sorted(set(cpus)) or None
+
+
+def _available_cpus() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+@dataclass
+class TrainingResourceLimits:
+    """训练子进程的资源限制。"""
+
+    cpu_threads: int
+    cpu_affinity: Optional[List[int]] = None
+    memory_mb: Optional[int] = None
+    nice: int = 10
+
+    @classmethod
+    def from_env(cls) -> "TrainingResourceLimits":
+        cpus = _available_cpus()
+        affinity = parse_cpu_list(os.getenv("TRAINING_CPU_AFFINITY"))
+        threads = int(os.getenv("TRAINING_CPU_THREADS", "0") or 0)
+        if threads <= 0:
+            threads = len(affinity) if affinity else max(1, len(cpus) // 4)
+        if affinity is None:
+            # 默认使用编号最大的核心，检测进程通常从低编号核心开始调度
+            affinity = cpus[-threads:]
+        memory_mb = int(os.getenv("TRAINING_MEMORY_LIMIT_MB", "0") or 0) or None
+        nice = int(os.getenv("TRAINING_NICE", "10"))
+        return cls(threads, affinity, memory_mb, nice)
+
+    def to_env(self) -> Dict[str, str]:
+        """子进程环境变量：线程数限制对 torch/OpenMP/MKL/OpenCV 生效。"""
+        threads = str(self.cpu_threads)
+        env = {
+            "OMP_NUM_THREADS": threads,
+            "MKL_NUM_THREADS": threads,
+            "OPENBLAS_NUM_THREADS": threads,
+            "NUMEXPR_NUM_THREADS": threads,
+            "TRAINING_CPU_THREADS": threads,
+            "TRAINING_NICE": str(self.nice),
+        }
+        if self.cpu_affinity:
+            env["TRAINING_CPU_AFFINITY"] = ",".join(str(c) for c in self.cpu_affinity)
+        if self.memory_mb:
+            env["TRAINING_MEMORY_LIMIT_MB"] = str(self.memory_mb)
+        return env
+
+    def apply(self) -> None:
+        """在训练子进程内应用限制（不支持的平台跳过对应项）。"""
+        if self.cpu_affinity and hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(0, self.cpu_affinity)
+            except OSError as e:
+                logger.warning(f"设置 CPU 亲和性失败: {e}")
+        if self.memory_mb:
+            try:
+                import resource
+
+                limit = self.memory_mb * 1024 * 1024
+                resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+            except (ImportError, ValueError, OSError) as e:
+                logger.warning(f"设置内存上限失败: {e}")
+        if self.nice and hasattr(os, "nice"):
+            try:
+                os.nice(self.nice)
+            except OSError:
+                pass
+        try:
+            import torch
+
+            torch.set_num_threads(self.cpu_threads)
+        except ImportError:
+            pass
+        try:
+            import cv2
+
+            cv2.setNumThreads(self.cpu_threads)
+        except ImportError:
+            pass
+
+
+class TrainingJobStore:
+    """基于文件系统的训练任务存储（一个任务一个目录）。"""
+
+    def __init__(self, root: Optional[str] = None) -> None:
+        self.root = Path(
+            root or os.getenv("TRAINING_JOBS_DIR", "models/training_jobs")
+        ).expanduser()
+
+    @property
+    def lock_path(self) -> Path:
+        """调度锁文件：所有共享该任务目录的进程在此串行化状态变更。"""
+        return self.root / LOCK_FILE
+
+    def job_dir(self, job_id: str) -> Path:
+        return self.root / job_id
+
+    def create(
+        self, kind: str, params: Dict[str, Any], priority: int = 0
+    ) -> Dict[str, Any]:
+        job_id = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        job = {
+            "job_id": job_id,
+            "kind": kind,
+            "priority": int(priority),
+            "status": STATUS_QUEUED,
+            "params": params,
+            "run_name": f"job_{job_id}",
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "attempts": 0,
+            "pid": None,
+            "cancel_requested": False,
+            "result": None,
+            "error": None,
+        }
+        self.job_dir(job_id).mkdir(parents=True, exist_ok=True)
+        self.save(job)
+        return job
+
+    def save(self, job: Dict[str, Any]) -> None:
+        job["updated_at"] = _now()
+        write_json_atomic(self.job_dir(job["job_id"]) / JOB_FILE, job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.job_dir(job_id) / JOB_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def list(self) -> List[Dict[str, Any]]:
+        if not self.root.exists():
+            return []
+        jobs = []
+        for entry in sorted(self.root.iterdir()):
+            if entry.is_dir():
+                job = self.get(entry.name)
+                if job is not None:
+                    jobs.append(job)
+        return jobs
+
+    def read_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.job_dir(job_id) / RESULT_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def read_progress(
+        self, job_id: str, offset: int = 0
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """从字节偏移 offset 起读取完整的进度行，返回 (记录列表, 下一次的偏移)。"""
+        path = self.job_dir(job_id) / PROGRESS_FILE
+        try:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except OSError:
+            return [], offset
+        end = data.rfind(b"\n") + 1
+        records = []
+        for line in data[:end].splitlines():
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return records, offset + end
+
+
+# 进程启动时间比较容差（秒）
+_START_TIME_TOLERANCE = 1.0
+
+
+def _process_started_at(pid: Optional[int]) -> Optional[float]:
+    if not pid:
+        return None
+    try:
+        return psutil.Process(pid).create_time()
+    except (psutil.Error, ValueError):
+        return None
+
+
+def _pid_alive(pid: Optional[int], started_at: Optional[float] = None) -> bool:
+    """进程是否存活；给出 started_at 时同时比较启动时间，PID 被复用视为已退出。"""
+    if not pid:
+        return False
+    try:
+        proc = psutil.Process(pid)
+        if (
+            started_at is not None
+            and abs(proc.create_time() - started_at) > _START_TIME_TOLERANCE
+        ):
+            return False
+        return proc.status() != psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return False
+    except psutil.AccessDenied:
+        return True
+
+
+class TrainingJobRunner:
+    """训练任务调度与子进程监管。"""
+
+    def __init__(
+        self,
+        store: Optional[TrainingJobStore] = None,
+        max_concurrent: Optional[int] = None,
+        limits: Optional[TrainingResourceLimits] = None,
+        poll_interval: float = 2.0,
+        cancel_grace: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        worker_command: Optional[List[str]] = None,
+    ) -> None:
+        self.store = store or TrainingJobStore()
+        self.max_concurrent = max_concurrent or int(
+            os.getenv("TRAINING_MAX_CONCURRENT", "1")
+        )
+        self.limits = limits or TrainingResourceLimits.from_env()
+        self.poll_interval = poll_interval
+        self.cancel_grace = cancel_grace or float(
+            os.getenv("TRAINING_CANCEL_GRACE_SECONDS", "120")
+        )
+        self.max_attempts = max_attempts or int(
+            os.getenv("TRAINING_JOB_MAX_ATTEMPTS", "3")
+        )
+        self.worker_command = worker_command or [
+            sys.executable,
+            "-m",
+            "src.application.training_worker",
+        ]
+        self._procs: Dict[str, subprocess.Popen] = {}
+        self._handlers: Dict[str, JobHandler] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._recovered = False
+
+    # ---------- 任务操作 ----------
+
+    def register_handler(self, kind: str, handler: JobHandler) -> None:
+        """注册任务成功完成后的回调（如模型注册）。
+
+        回调成功后不再调用；失败时按退避重试，最多 max_attempts 次。
+        """
+        self._handlers[kind] = handler
+
+    def submit(
+        self, kind: str, params: Dict[str, Any], priority: int = 0
+    ) -> Dict[str, Any]:
+        job = self.store.create(kind, params, priority)
+        logger.info(f"训练任务已排队: {job['job_id']} (kind={kind}, priority={priority})")
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """取消任务：排队中直接取消，运行中发送 SIGTERM。"""
+        with file_lock(self.store.lock_path):
+            job = self.store.get(job_id)
+            if job is None or job["status"] in TERMINAL_STATUSES:
+                return job
+            job["cancel_requested"] = True
+            if job["status"] == STATUS_QUEUED:
+                job["status"] = STATUS_CANCELLED
+                job["finished_at"] = _now()
+            elif job.get("pid"):
+                self._signal(job, signal.SIGTERM)
+                # 记录在任务文件中，宽限期由当前持有调度锁的进程检查
+                job["cancel_sent_at"] = job.get("cancel_sent_at") or time.time()
+                logger.info(f"已向训练任务 {job_id} 发送 SIGTERM (pid={job['pid']})")
+            self.store.save(job)
+            return job
+
+    async def wait(
+        self,
+        job_id: str,
+        cancel_event: Optional[Any] = None,
+        poll_interval: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """等待任务结束；cancel_event 被设置时取消任务。"""
+        interval = poll_interval or self.poll_interval
+        while True:
+            job = self.store.get(job_id)
+            if job is None:
+                raise KeyError(f"训练任务不存在: {job_id}")
+            if job["status"] in TERMINAL_STATUSES:
+                return job
+            if (
+                cancel_event is not None
+                and cancel_event.is_set()
+                and not job["cancel_requested"]
+            ):
+                self.cancel(job_id)
+            await asyncio.sleep(interval)
+
+    # ---------- 调度 ----------
+
+    def recover(self) -> None:
+        """启动时恢复：接管仍在运行的子进程，已退出的运行中任务按结果文件结束或重新排队。
+
+        停机期间成功结束的任务在随后的 tick 中补跑成功回调。
+        """
+        with file_lock(self.store.lock_path):
+            self._recover()
+
+    def _recover(self) -> None:
+        for job in self.store.list():
+            if job["status"] != STATUS_RUNNING:
+                continue
+            if _pid_alive(job.get("pid"), job.get("pid_started_at")):
+                logger.info(f"接管运行中的训练任务: {job['job_id']} (pid={job['pid']})")
+                continue
+            self._finish_exited(job, returncode=None)
+        self._recovered = True
+
+    async def tick(self) -> None:
+        """执行一轮监管：检查运行中的任务、处理取消超时、启动排队任务。
+
+        其他进程正持有调度锁时跳过本轮；认领到的成功回调在释放锁后执行。
+        """
+        # 回收本进程启动且已退出的子进程，避免调度由其他进程完成时留下僵尸进程
+        for proc in self._procs.values():
+            proc.poll()
+        with file_lock(self.store.lock_path, blocking=False) as locked:
+            if not locked:
+                return
+            claimed = self._schedule()
+        for job in claimed:
+            await self._run_handler(job)
+
+    def _schedule(self) -> List[Dict[str, Any]]:
+        """持有调度锁时执行：更新运行中任务、启动排队任务，返回本进程认领的回调任务。"""
+        if not self._recovered:
+            self._recover()
+        running = []
+        unhandled = []
+        for job in self.store.list():
+            if self._handler_pending(job):
+                unhandled.append(job)
+                continue
+            if job["status"] != STATUS_RUNNING:
+                # 本进程启动、已由其他进程结束的任务
+                self._procs.pop(job["job_id"], None)
+                continue
+            if self._exited(job):
+                finished = self._finish_exited(job, self._returncode(job["job_id"]))
+                if self._handler_pending(finished):
+                    unhandled.append(finished)
+                continue
+            running.append(job)
+            sent = job.get("cancel_sent_at")
+            if sent is not None and time.time() - sent > self.cancel_grace:
+                logger.warning(f"训练任务 {job['job_id']} 未在宽限期内退出，强制终止")
+                self._signal(job, signal.SIGKILL, group=True)
+
+        queued = sorted(
+            (j for j in self.store.list() if j["status"] == STATUS_QUEUED),
+            key=lambda j: (-j["priority"], j["created_at"]),
+        )
+        for job in queued[: max(0, self.max_concurrent - len(running))]:
+            self._launch(job)
+
+        return [job for job in unhandled if self._claim_handler(job)]
+
+    def _launch(self, job: Dict[str, Any]) -> None:
+        job_dir = self.store.job_dir(job["job_id"])
+        # 上一次尝试的结果文件会被本次覆盖
+        (job_dir / RESULT_FILE).unlink(missing_ok=True)
+        env = {**os.environ, **self.limits.to_env()}
+        log = open(job_dir / LOG_FILE, "a", encoding="utf-8")
+        try:
+            proc = subprocess.Popen(
+                [*self.worker_command, str(job_dir)],
+                cwd=_PROJECT_ROOT,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                stdin=subprocess.DEVNULL,
+                env=env,
+                close_fds=(os.name != "nt"),
+                # 独立会话：API 进程退出或重启不影响训练
+                start_new_session=(os.name != "nt"),
+            )
+        except OSError as e:
+            job["status"] = STATUS_FAILED
+            job["error"] = f"启动训练进程失败: {e}"
+            job["finished_at"] = _now()
+            self.store.save(job)
+            logger.error(job["error"])
+            return
+        finally:
+            log.close()
+        self._procs[job["job_id"]] = proc
+        job["status"] = STATUS_RUNNING
+        job["pid"] = proc.pid
+        job["pid_started_at"] = _process_started_at(proc.pid)
+        job["attempts"] += 1
+        job["started_at"] = job["started_at"] or _now()
+        self.store.save(job)
+        logger.info(
+            f"训练任务已启动: {job['job_id']} (pid={proc.pid}, 第 {job['attempts']} 次尝试)"
+        )
+
+    def _exited(self, job: Dict[str, Any]) -> bool:
+        proc = self._procs.get(job["job_id"])
+        # 任务可能已被其他进程重新启动，只信任 PID 一致的本进程子进程句柄
+        if proc is not None and proc.pid == job.get("pid"):
+            return proc.poll() is not None
+        return not _pid_alive(job.get("pid"), job.get("pid_started_at"))
+
+    def _returncode(self, job_id: str) -> Optional[int]:
+        proc = self._procs.pop(job_id, None)
+        return proc.returncode if proc is not None else None
+
+    def _finish_exited(
+        self, job: Dict[str, Any], returncode: Optional[int]
+    ) -> Dict[str, Any]:
+        """根据子进程写出的结果文件更新任务状态；没有结果时按崩溃处理并自动重试。"""
+        job_id = job["job_id"]
+        job.pop("cancel_sent_at", None)
+        outcome = self.store.read_result(job_id)
+        job["pid"] = None
+        job["pid_started_at"] = None
+        if outcome is not None:
+            job["status"] = outcome.get("status", STATUS_FAILED)
+            job["result"] = outcome.get("result")
+            job["error"] = outcome.get("error")
+            if job["status"] == STATUS_SUCCEEDED:
+                job["handled"] = False
+        elif job["cancel_requested"]:
+            job["status"] = STATUS_CANCELLED
+        elif job["attempts"] < self.max_attempts:
+            # 进程被杀、崩溃或 API 所在主机重启：从检查点恢复
+            job["status"] = STATUS_QUEUED
+            job["error"] = f"训练进程异常退出 (returncode={returncode})，将从检查点恢复"
+            logger.warning(f"训练任务 {job_id}: {job['error']}")
+            self.store.save(job)
+            return job
+        else:
+            job["status"] = STATUS_FAILED
+            job["error"] = f"训练进程异常退出 (returncode={returncode})，已达最大尝试次数"
+        job["finished_at"] = _now()
+        self.store.save(job)
+        logger.info(f"训练任务结束: {job_id} status={job['status']}")
+        return job
+
+    def _handler_pending(self, job: Dict[str, Any]) -> bool:
+        """成功任务的回调尚未完成且未超过重试次数（旧任务没有 handled 字段，视为已处理）。"""
+        return (
+            job["status"] == STATUS_SUCCEEDED
+            and job.get("handled") is False
+            and job.get("handler_attempts", 0) < self.max_attempts
+        )
+
+    def _claim_handler(self, job: Dict[str, Any]) -> bool:
+        """持有调度锁时认领成功回调；其他存活进程的租约未过期时不认领。"""
+        # 回调尚未注册时保留标记，注册后再补跑
+        if self._handlers.get(job["kind"]) is None:
+            return False
+        if time.time() < job.get("handler_retry_at", 0):
+            return False
+        claim = job.get("handler_claim")
+        if (
+            claim
+            and claim["expires_at"] > time.time()
+            and _pid_alive(claim["pid"], claim.get("pid_started_at"))
+        ):
+            return False
+        job["handler_claim"] = {
+            "pid": os.getpid(),
+            "pid_started_at": _process_started_at(os.getpid()),
+            "expires_at": time.time() + HANDLER_CLAIM_TTL,
+        }
+        self.store.save(job)
+        return True
+
+    async def _run_handler(self, job: Dict[str, Any]) -> None:
+        handler = self._handlers[job["kind"]]
+        error: Optional[Exception] = None
+        try:
+            await handler(job)
+        except Exception as e:
+            error = e
+        with file_lock(self.store.lock_path):
+            # 回调执行期间任务文件可能被其他进程更新，基于最新内容记录结果
+            job = self.store.get(job["job_id"]) or job
+            job["handler_claim"] = None
+            if error is not None:
+                attempts = job.get("handler_attempts", 0) + 1
+                job["handler_attempts"] = attempts
+                job["handler_error"] = str(error)
+                job["handler_retry_at"] = time.time() + min(
+                    300.0, self.poll_interval * 2**attempts
+                )
+                logger.warning(
+                    f"训练任务完成回调失败: {job['job_id']} "
+                    f"(第 {attempts}/{self.max_attempts} 次, {error})"
+                )
+            else:
+                job["handled"] = True
+                job["handler_error"] = None
+            self.store.save(job)
+
+    def _signal(self, job: Dict[str, Any], sig: int, group: bool = False) -> None:
+        pid = job.get("pid")
+        if not _pid_alive(pid, job.get("pid_started_at")):
+            # 进程已退出或 PID 已被其他进程复用
+            return
+        try:
+            if group and hasattr(os, "killpg"):
+                # 连同数据加载子进程一起终止
+                os.killpg(pid, sig)
+            else:
+                os.kill(pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    # ---------- 生命周期 ----------
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"训练任务调度失败: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        """在当前事件循环中启动调度任务。"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self) -> None:
+        """停止调度（不终止训练子进程，下次启动时重新接管）。"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self.store.list():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {
+            "jobs": counts,
+            "max_concurrent": self.max_concurrent,
+            "limits": {
+                "cpu_threads": self.limits.cpu_threads,
+                "cpu_affinity": self.limits.cpu_affinity,
+                "memory_mb": self.limits.memory_mb,
+                "nice": self.limits.nice,
+            },
+        }
+
+
+_runner: Optional[TrainingJobRunner] = None
+
+
+def get_training_job_runner() -> TrainingJobRunner:
+    """获取进程内的训练任务调度器单例。"""
+    global _runner
+    if _runner is None:
+        _runner = TrainingJobRunner()
+    return _runner
+
+
+async def shutdown_training_job_runner() -> None:
+    global _runner
+    if _runner is not None:
+        await _runner.stop()
+        _runner = None
@@ -0,0 +1,144 @@
+"""
+训练子进程入口：python -m src.application.training_worker <job_dir>
+
+由 TrainingJobRunner 启动，负责：
+- 应用资源限制（CPU 亲和性/线程数/内存上限/优先级）；
+- SIGTERM/SIGINT 设置取消事件，训练在当前轮结束后停止；
+- 存在上一次尝试的 last.pt 时从检查点恢复；
+- 每轮结束把指标追加到 progress.jsonl；
+- 结束时写出 result.json（succeeded/failed/cancelled）。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.application.training_jobs import (
+    JOB_FILE,
+    PROGRESS_FILE,
+    RESULT_FILE,
+    STATUS_CANCELLED,
+    STATUS_FAILED,
+    STATUS_SUCCEEDED,
+    TrainingResourceLimits,
+    write_json_atomic,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class EpochProgressWriter:
+    """ultralytics on_fit_epoch_end 回调：每轮一行 JSON 写入进度文件。"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def __call__(self, trainer: Any) -> None:
+        from src.application.multi_behavior_training_service import (
+            MultiBehaviorTrainingService,
+        )
+
+        metrics: Dict[str, Any] = {}
+        for source in (
+            _safe_call(
+                trainer, "label_loss_items", getattr(trainer, "tloss", None), "train"
+            ),
+            getattr(trainer, "metrics", None),
+        ):
+            if isinstance(source, dict):
+                for key, value in source.items():
+                    metrics[key] = MultiBehaviorTrainingService._to_serializable(value)
+        record = {
+            "epoch": int(getattr(trainer, "epoch", 0)) + 1,
+            "epochs": getattr(trainer, "epochs", None),
+            "metrics": metrics,
+            "time": time.time(),
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+
+def _safe_call(obj: Any, name: str, *args: Any) -> Any:
+    try:
+        return getattr(obj, name)(*args)
+    except Exception:
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("用法: python -m src.application.training_worker <job_dir>")
+        return 2
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+
+    job_dir = Path(argv[0])
+    with open(job_dir / JOB_FILE, "r", encoding="utf-8") as f:
+        job = json.load(f)
+    TrainingResourceLimits.from_env().apply()
+
+    cancel_event = threading.Event()
+
+    def _on_signal(signum, frame):
+        logger.info(f"收到信号 {signum}，训练将在当前轮结束后停止")
+        cancel_event.set()
+
+    signal.signal(signal.SIGTERM, _on_signal)
+    signal.signal(signal.SIGINT, _on_signal)
+
+    from src.application.multi_behavior_training_service import (
+        MultiBehaviorTrainingService,
+    )
+    from src.config.multi_behavior_training_config import (
+        get_multi_behavior_training_config,
+    )
+
+    params = job["params"]
+    service = MultiBehaviorTrainingService(get_multi_behavior_training_config())
+    training_params = dict(params.get("training_params") or {})
+    training_params["run_name"] = job["run_name"]
+    checkpoint = service.checkpoint_path(job["run_name"])
+    if checkpoint.exists():
+        logger.info(f"从检查点恢复训练: {checkpoint}")
+        training_params["_resume_checkpoint"] = str(checkpoint)
+    training_params["_cancel_event"] = cancel_event
+    training_params["_on_epoch_end"] = EpochProgressWriter(job_dir / PROGRESS_FILE)
+
+    try:
+        result = service._run_training(
+            Path(params["dataset_dir"]), Path(params["data_config"]), training_params
+        )
+    except Exception as e:
+        status = STATUS_CANCELLED if cancel_event.is_set() else STATUS_FAILED
+        logger.error(f"训练任务结束: status={status}, error={e}")
+        write_json_atomic(job_dir / RESULT_FILE, {"status": status, "error": str(e)})
+        return 1
+
+    write_json_atomic(
+        job_dir / RESULT_FILE,
+        {
+            "status": STATUS_SUCCEEDED,
+            "result": {
+                "model_path": str(result.model_path),
+                "report_path": str(result.report_path),
+                "metrics": result.metrics,
+                "samples_used": result.samples_used,
+                "version": result.version,
+                "artifacts": result.artifacts,
+            },
+        },
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
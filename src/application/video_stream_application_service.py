@@ -8,11 +8,30 @@
 from __future__ import annotations
 
 import logging
-from typing import Optional
+import os
+import time
+from typing import Dict, List, Optional, Tuple
 
 import cv2
 import numpy as np
 
+from src.monitoring.tracing import trace_span
+from src.services.shm_frame_transport import (
+    ShmFrameWriter,
+    encode_envelope,
+    shm_enabled,
+)
+from src.services.stream_renditions import (
+    DEFAULT_RENDITION,
+    RENDITIONS,
+    RenditionMeter,
+    aggregate_demand,
+    demand_field,
+    demand_key,
+    scaled_size,
+    stream_channel,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,7 +40,7 @@ class VideoStreamApplicationService:
     视频流应用服务
 
     职责：
-    1. 调整帧大小
+    1. 按订阅者所需档位调整帧大小（每帧每档位只编码一次）
     2. 编码为JPEG
     3. 通过视频流管理器推送
 
@@ -38,6 +57,15 @@ class VideoStreamApplicationService:
             stream_manager: 视频流管理器（可选，延迟初始化）
         """
         self._stream_manager = stream_manager
+        self._redis_client = None
+        # 档位订阅计数缓存: camera_id -> (读取时间, {档位: 客户端数})
+        self._demand_cache: Dict[str, Tuple[float, Dict[str, int]]] = {}
+        self.demand_ttl = float(os.getenv("VIDEO_STREAM_DEMAND_TTL", "1.0"))
+        self.rendition_meter = RenditionMeter()
+        # 同主机共享内存传输：每个摄像头一个环，frame_seq 按档位递增
+        self.shm_enabled = shm_enabled()
+        self._shm_writers: Dict[str, ShmFrameWriter] = {}
+        self._frame_seq: Dict[Tuple[str, str], int] = {}
         logger.info("视频流应用服务已初始化")
 
     @property
@@ -120,74 +148,178 @@ class VideoStreamApplicationService:
 
         return jpeg_data
 
-    async def _push_via_redis(self, camera_id: str, jpeg_data: bytes) -> bool:
+    @staticmethod
+    def _redis_enabled() -> bool:
+        """检查是否启用Redis推送"""
+        return os.getenv("VIDEO_STREAM_USE_REDIS", "1").strip() not in (
+            "0",
+            "false",
+            "False",
+        )
+
+    def _get_redis_client(self):
+        """获取复用的Redis客户端（未启用或未安装redis时返回None）"""
+        if self._redis_client is not None:
+            return self._redis_client
+        if not self._redis_enabled():
+            return None
+
+        # 尝试导入redis
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            logger.debug("未安装 redis，跳过Redis推送")
+            return None
+
+        # 构建 Redis 连接串
+        # 优先使用REDIS_URL，如果没有则从单独的环境变量构建
+        redis_url = os.getenv("REDIS_URL")
+        if not redis_url:
+            host = os.getenv("REDIS_HOST", "localhost")
+            port = os.getenv("REDIS_PORT", "6379")
+            db = os.getenv("REDIS_DB", "0")
+            password = os.getenv("REDIS_PASSWORD")
+
+            # 构建Redis URL
+            if password:
+                redis_url = f"redis://:{password}@{host}:{port}/{db}"
+            else:
+                redis_url = f"redis://{host}:{port}/{db}"
+
+            masked_url = (
+                redis_url.replace(password or "", "***") if password else redis_url
+            )
+            logger.info(f"使用环境变量构建Redis URL: {masked_url}")
+
+        self._redis_client = aioredis.from_url(redis_url, decode_responses=False)
+        return self._redis_client
+
+    async def _push_via_redis(
+        self, camera_id: str, jpeg_data: bytes, rendition: str = DEFAULT_RENDITION
+    ) -> bool:
         """
         通过Redis发布视频帧（用于跨进程通信）
 
         Args:
             camera_id: 摄像头ID
             jpeg_data: JPEG编码的帧数据
+            rendition: 档位名称（决定发布频道）
 
         Returns:
             是否成功发布
         """
         try:
-            import os
+            redis_client = self._get_redis_client()
+            if redis_client is None:
+                return False
 
-            # 检查是否启用Redis
-            enable_redis = os.getenv("VIDEO_STREAM_USE_REDIS", "1").strip() not in (
-                "0",
-                "false",
-                "False",
+            channel = stream_channel(camera_id, rendition)
+            subscribers = await redis_client.publish(channel, jpeg_data)
+            logger.debug(
+                f"Redis发布成功: channel={channel}, "
+                f"size={len(jpeg_data)} bytes, subscribers={subscribers}"
             )
-            if not enable_redis:
-                return False
+            # 如果subscribers为0，说明没有订阅者，但发布仍然成功
+            return True
 
-            # 尝试导入redis
-            try:
-                import redis.asyncio as aioredis
-            except ImportError:
-                logger.debug("未安装 redis，跳过Redis推送")
-                return False
+        except Exception as e:
+            logger.warning(f"通过Redis推送失败: camera={camera_id}, error={e}")
+            return False
 
-            # 构建 Redis 连接串
-            # 优先使用REDIS_URL，如果没有则从单独的环境变量构建
-            redis_url = os.getenv("REDIS_URL")
-            if not redis_url:
-                host = os.getenv("REDIS_HOST", "localhost")
-                port = os.getenv("REDIS_PORT", "6379")
-                db = os.getenv("REDIS_DB", "0")
-                password = os.getenv("REDIS_PASSWORD")
-
-                # 构建Redis URL
-                if password:
-                    redis_url = f"redis://:{password}@{host}:{port}/{db}"
-                else:
-                    redis_url = f"redis://{host}:{port}/{db}"
-
-                masked_url = (
-                    redis_url.replace(password or "", "***") if password else redis_url
-                )
-                logger.info(f"使用环境变量构建Redis URL: {masked_url}")
+    async def _rendition_demand(self, camera_id: str) -> Dict[str, int]:
+        """
+        获取摄像头各档位的订阅客户端数
 
-            # 连接到Redis并发布
-            redis_client = aioredis.from_url(redis_url, decode_responses=False)
-            try:
-                channel = f"video:{camera_id}"
-                subscribers = await redis_client.publish(channel, jpeg_data)
-                logger.info(
-                    f"Redis发布成功: channel={channel}, "
-                    f"size={len(jpeg_data)} bytes, subscribers={subscribers}"
-                )
-                # 如果subscribers为0，说明没有订阅者，但发布仍然成功
-                return True
-            finally:
-                await redis_client.close()
+        检测进程从Redis读取API进程上报的计数（按 demand_ttl 缓存），
+        同进程部署时直接读取视频流管理器。读取失败时返回空字典。
+        """
+        now = time.monotonic()
+        cached = self._demand_cache.get(camera_id)
+        if cached is not None and now - cached[0] < self.demand_ttl:
+            return cached[1]
 
+        demand: Dict[str, int] = {}
+        try:
+            redis_client = self._get_redis_client()
+            if redis_client is not None:
+                raw = await redis_client.hgetall(demand_key(camera_id))
+                demand = aggregate_demand(raw)
+            else:
+                get_demand = getattr(self.stream_manager, "get_rendition_demand", None)
+                if get_demand is not None:
+                    demand = dict(get_demand(camera_id))
         except Exception as e:
-            logger.warning(f"通过Redis推送失败: camera={camera_id}, error={e}")
+            logger.debug(f"读取档位订阅计数失败: camera={camera_id}, error={e}")
+
+        self._demand_cache[camera_id] = (now, demand)
+        return demand
+
+    @staticmethod
+    def _select_renditions(demand: Dict[str, int]) -> List[str]:
+        """需要编码的档位：有订阅者的档位；均无订阅者时仅保留默认档位"""
+        active = [
+            name
+            for name in RENDITIONS
+            if demand.get(name, 0) + demand.get(demand_field(name, True), 0) > 0
+        ]
+        return active or [DEFAULT_RENDITION]
+
+    def _push_via_shm(
+        self, camera_id: str, jpeg_data: bytes, shape, rendition: str, frame_seq: int
+    ) -> bool:
+        """
+        写入本机共享内存环（仅在跨进程部署、即使用Redis时启用）
+
+        Returns:
+            是否写入成功
+        """
+        if not self.shm_enabled or self._get_redis_client() is None:
+            return False
+        try:
+            writer = self._shm_writers.get(camera_id)
+            if writer is None:
+                writer = ShmFrameWriter(camera_id)
+                self._shm_writers[camera_id] = writer
+                logger.info(f"共享内存视频帧环已创建: camera={camera_id}")
+            return writer.write(jpeg_data, shape, rendition, frame_seq)
+        except Exception as e:
+            logger.warning(f"写入共享内存失败，停用共享内存传输: {e}")
+            self.shm_enabled = False
             return False
 
+    def _render(
+        self,
+        frame: np.ndarray,
+        rendition: str,
+        quality: int,
+        target_width: Optional[int],
+        target_height: Optional[int],
+    ) -> Tuple[bytes, Tuple[int, ...]]:
+        """
+        生成指定档位的JPEG数据
+
+        默认档位沿用调用方传入的尺寸与质量；其余档位按档位定义等比缩放。
+
+        Returns:
+            (JPEG字节数据, 编码前的帧形状)
+        """
+        spec = RENDITIONS[rendition]
+        started = time.perf_counter()
+        if rendition == DEFAULT_RENDITION:
+            if target_width and target_height:
+                frame = self._resize_frame(frame, target_width, target_height)
+        else:
+            height, width = frame.shape[:2]
+            size = scaled_size(width, height, spec.max_width)
+            if size is not None:
+                frame = self._resize_frame(frame, *size)
+            quality = spec.quality
+
+        jpeg_data = self._encode_jpeg(frame, quality)
+        encode_ms = (time.perf_counter() - started) * 1000
+        self.rendition_meter.record(rendition, len(jpeg_data), encode_ms)
+        return jpeg_data, frame.shape
+
     async def push_frame(
         self,
         camera_id: str,
@@ -200,43 +332,96 @@ class VideoStreamApplicationService:
         推送视频帧
 
         处理流程：
-        1. 调整帧大小（如果指定）
-        2. 编码为JPEG
-        3. 通过Redis发布（检测进程环境）或直接推送（API服务器环境）
+        1. 确定当前有订阅者的档位（均无订阅者时只编码默认档位）
+        2. 每个档位调整大小并编码为JPEG（每帧每档位只编码一次）
+        3. 写入本机共享内存环；仍有经Redis接收的订阅者时通过Redis发布
+           （检测进程环境），或直接推送（API服务器环境）
 
         Args:
             camera_id: 摄像头ID
             frame: 视频帧（numpy数组）
-            quality: JPEG质量（1-100，默认60）
-            target_width: 目标宽度（None表示不调整）
-            target_height: 目标高度（None表示不调整）
+            quality: 默认档位的JPEG质量（1-100，默认60）
+            target_width: 默认档位的目标宽度（None表示不调整）
+            target_height: 默认档位的目标高度（None表示不调整）
 
         Returns:
-            是否成功推送
+            是否成功推送（任一档位推送成功即为True）
         """
         try:
-            # 1. 调整大小
-            if target_width and target_height:
-                frame = self._resize_frame(frame, target_width, target_height)
-
-            # 2. 编码为JPEG
-            jpeg_data = self._encode_jpeg(frame, quality)
-
-            # 3. 推送方式选择：
-            #    - 如果可以使用Redis，优先使用Redis发布（跨进程通信）
+            demand = await self._rendition_demand(camera_id)
+        except Exception as e:
+            logger.debug(f"读取档位订阅计数失败，使用默认档位: {e}")
+            demand = {}
+
+        pushed = False
+        for rendition in self._select_renditions(demand):
+            if await self._push_rendition(
+                camera_id,
+                frame,
+                rendition,
+                quality,
+                target_width,
+                target_height,
+                demand,
+            ):
+                pushed = True
+        return pushed
+
+    async def _push_rendition(
+        self,
+        camera_id: str,
+        frame: np.ndarray,
+        rendition: str,
+        quality: int,
+        target_width: Optional[int],
+        target_height: Optional[int],
+        demand: Dict[str, int],
+    ) -> bool:
+        """编码并推送单个档位"""
+        try:
+            with trace_span("stream.encode", rendition=rendition) as span:
+                jpeg_data, shape = self._render(
+                    frame, rendition, quality, target_width, target_height
+                )
+                span.set_attribute("bytes", len(jpeg_data))
+            key = (camera_id, rendition)
+            frame_seq = self._frame_seq.get(key, 0) + 1
+            self._frame_seq[key] = frame_seq
+
+            # 推送方式选择：
+            #    - 同主机API进程通过共享内存读取；仅有共享内存订阅者时跳过Redis
+            #    - 如果可以使用Redis，通过Redis发布（跨主机/跨进程通信）
             #    - 否则使用本地VideoStreamManager（同进程）
-            redis_success = await self._push_via_redis(camera_id, jpeg_data)
+            shm_success = self._push_via_shm(
+                camera_id, jpeg_data, shape, rendition, frame_seq
+            )
+            if (
+                shm_success
+                and demand.get(demand_field(rendition, True), 0) > 0
+                and demand.get(rendition, 0) <= 0
+            ):
+                return True
+
+            envelope = encode_envelope(
+                frame_seq, time.time(), shape, rendition, jpeg_data
+            )
+            with trace_span("stream.publish", rendition=rendition):
+                redis_success = await self._push_via_redis(
+                    camera_id, envelope, rendition
+                )
             if redis_success:
-                logger.info(
-                    f"视频帧已通过Redis推送: camera={camera_id}, size={len(jpeg_data)} bytes"
+                logger.debug(
+                    f"视频帧已通过Redis推送: camera={camera_id}, "
+                    f"rendition={rendition}, size={len(jpeg_data)} bytes"
                 )
                 return True
 
             # 回退到本地VideoStreamManager（如果可用）
             if self.stream_manager is not None:
-                await self.stream_manager.update_frame(camera_id, jpeg_data)
-                logger.info(
-                    f"视频帧已通过本地管理器推送: camera={camera_id}, size={len(jpeg_data)} bytes"
+                await self.stream_manager.update_frame(camera_id, jpeg_data, rendition)
+                logger.debug(
+                    f"视频帧已通过本地管理器推送: camera={camera_id}, "
+                    f"rendition={rendition}, size={len(jpeg_data)} bytes"
                 )
                 return True
 
@@ -244,7 +429,9 @@ class VideoStreamApplicationService:
             return False
 
         except Exception as e:
-            logger.error(f"推送视频帧失败: camera={camera_id}, error={e}")
+            logger.error(
+                f"推送视频帧失败: camera={camera_id}, rendition={rendition}, error={e}"
+            )
             return False
 
     async def push_frame_from_file(
@@ -308,6 +495,7 @@ class VideoStreamApplicationService:
                 "camera_id": camera_id,
                 "client_count": client_count,
                 "has_frame": has_frame,
+                "renditions": self.get_rendition_stats(),
             }
         except Exception as e:
             logger.error(f"获取视频流状态失败: {e}")
@@ -316,6 +504,22 @@ class VideoStreamApplicationService:
                 "error": str(e),
             }
 
+    def get_rendition_stats(self) -> Dict[str, Dict[str, float]]:
+        """获取各档位的编码统计（帧数、字节速率、平均编码耗时）"""
+        return self.rendition_meter.snapshot()
+
+    async def close(self) -> None:
+        """关闭共享内存环与复用的Redis客户端"""
+        for writer in self._shm_writers.values():
+            writer.close()
+        self._shm_writers.clear()
+        if self._redis_client is not None:
+            try:
+                await self._redis_client.close()
+            except Exception:
+                pass
+            self._redis_client = None
+
 
 # 单例实例
 _video_stream_service: Optional[VideoStreamApplicationService] = None
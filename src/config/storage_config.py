@@ -11,6 +11,12 @@ from src.infrastructure.storage.filesystem_snapshot_storage import (
     FileSystemSnapshotStorage,
     SnapshotStorageConfig,
 )
+from src.infrastructure.storage.snapshot_janitor import SnapshotRetentionPolicy
+
+
+def _optional_number(name: str, default: str, cast=float):
+    value = cast(os.getenv(name, default))
+    return value if value > 0 else None
 
 
 def get_snapshot_storage_config() -> SnapshotStorageConfig:
@@ -27,10 +33,31 @@ def get_snapshot_storage_config() -> SnapshotStorageConfig:
     image_format = os.getenv("SNAPSHOT_IMAGE_FORMAT", "jpg").lower()
     image_quality = int(os.getenv("SNAPSHOT_IMAGE_QUALITY", "90"))
 
+    # 保留策略：0 表示不限制
+    max_mb = _optional_number("SNAPSHOT_MAX_MB_PER_CAMERA", "0")
+    retention = SnapshotRetentionPolicy(
+        max_age_days=_optional_number("SNAPSHOT_RETENTION_DAYS", "30"),
+        max_files_per_camera=_optional_number(
+            "SNAPSHOT_MAX_FILES_PER_CAMERA", "0", int
+        ),
+        max_bytes_per_camera=int(max_mb * 1024 * 1024) if max_mb else None,
+    )
+
     return SnapshotStorageConfig(
         base_dir=base_dir,
         image_format=image_format,
         image_quality=image_quality,
+        thumbnail_width=int(os.getenv("SNAPSHOT_THUMBNAIL_WIDTH", "320")),
+        thumbnail_quality=int(os.getenv("SNAPSHOT_THUMBNAIL_QUALITY", "70")),
+        dedup_window_seconds=float(os.getenv("SNAPSHOT_DEDUP_WINDOW_SECONDS", "60")),
+        dedup_max_distance=int(os.getenv("SNAPSHOT_DEDUP_MAX_DISTANCE", "6")),
+        encode_workers=int(os.getenv("SNAPSHOT_ENCODE_WORKERS", "2")),
+        max_pending_encodes=int(os.getenv("SNAPSHOT_MAX_PENDING_ENCODES", "16")),
+        encode_timeout=float(os.getenv("SNAPSHOT_ENCODE_TIMEOUT", "2.0")),
+        retention=retention,
+        janitor_interval_seconds=float(
+            os.getenv("SNAPSHOT_JANITOR_INTERVAL_SECONDS", "3600")
+        ),
     )
 
 
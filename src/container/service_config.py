@@ -17,6 +17,7 @@ from src.application.multi_behavior_dataset_service import (
     MultiBehaviorDatasetGenerationService,
 )
 from src.application.multi_behavior_training_service import MultiBehaviorTrainingService
+from src.application.training_jobs import get_training_job_runner
 from src.config.dataset_config import get_dataset_generation_config
 from src.config.handwash_dataset_config import get_handwash_dataset_config
 from src.config.handwash_training_config import get_handwash_training_config
@@ -384,8 +385,14 @@ def _configure_multi_behavior_services():
         model_registry_service = None
         if container.is_registered(ModelRegistryService):
             model_registry_service = container.get(ModelRegistryService)
+        # 默认在受资源限制的子进程中训练（TRAINING_OUT_OF_PROCESS=0 时回退为进程内线程）
+        job_runner = None
+        if os.getenv("TRAINING_OUT_OF_PROCESS", "1") != "0":
+            job_runner = get_training_job_runner()
         multi_training_service = MultiBehaviorTrainingService(
-            multi_training_config, model_registry_service=model_registry_service
+            multi_training_config,
+            model_registry_service=model_registry_service,
+            job_runner=job_runner,
         )
         container.register_instance(
             MultiBehaviorTrainingService, multi_training_service
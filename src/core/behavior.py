@@ -25,6 +25,7 @@ from src.detection.pose_detector import (
     PoseDetectorFactory,
     _gpu_enabled,
 )
+from src.monitoring.tracing import trace_span
 
 # 使用pose_detector中配置好的MediaPipe
 if MEDIAPIPE_AVAILABLE:
@@ -50,6 +51,9 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# 保留各模型分数的追踪目标上限（按最近更新淘汰）
+MAX_TRACKED_MODEL_SCORES = 256
+
 
 class BehaviorState:
     """行为状态类"""
@@ -132,6 +136,8 @@ class BehaviorRecognizer:
         self.ml_seq_buffers: Dict[int, deque] = defaultdict(
             lambda: deque(maxlen=self.ml_window)
         )
+        # 最近一次洗手判定中各模型的分数（供难例挖掘比较 XGBoost / Transformer 分歧）
+        self.model_scores: Dict[int, Dict[str, float]] = {}
         if self.use_ml_classifier:
             # 检查XGBoost是否可用
             if xgb is None:
@@ -546,14 +552,17 @@ class BehaviorRecognizer:
         # 使用 MediaPipe 增强手部检测
         enhanced_hand_regions = hand_regions
         if frame is not None and isinstance(frame, np.ndarray):
-            enhanced_hand_regions = self._enhance_hand_detection_with_mediapipe(
-                frame, hand_regions
-            )
+            with trace_span("behavior.mediapipe", rois=len(hand_regions)) as span:
+                enhanced_hand_regions = self._enhance_hand_detection_with_mediapipe(
+                    frame, hand_regions
+                )
+                span.set_attribute("hands", len(enhanced_hand_regions))
             logger.debug(
                 f"Enhanced hand regions: {len(enhanced_hand_regions)} hands detected"
             )
 
         confidence = 0.0
+        transformer_confidence = None
 
         # 使用高级检测方法
         if self.use_advanced_detection and track_id is not None:
@@ -570,11 +579,12 @@ class BehaviorRecognizer:
 
                 # 姿态检测增强（使用时间平滑，任务1.2.1）
                 if self.pose_detector and frame is not None:
-                    pose_data = self.pose_detector.detect(frame)
-                    # 检查是否存在 detect_hands 方法
-                    hands_data = []
-                    if hasattr(self.pose_detector, "detect_hands"):
-                        hands_data = self.pose_detector.detect_hands(frame)
+                    with trace_span("behavior.pose"):
+                        pose_data = self.pose_detector.detect(frame)
+                        # 检查是否存在 detect_hands 方法
+                        hands_data = []
+                        if hasattr(self.pose_detector, "detect_hands"):
+                            hands_data = self.pose_detector.detect_hands(frame)
 
                     if pose_data and hands_data:
                         # 应用时间平滑（任务1.2.1）
@@ -654,7 +664,8 @@ class BehaviorRecognizer:
                     if len(buf) == self.ml_window:
                         window_feats = np.array(list(buf), dtype=np.float32)
                         agg = self._aggregate_features(window_feats)
-                        proba = self._predict_proba(agg)
+                        with trace_span("behavior.xgb_fusion"):
+                            proba = self._predict_proba(agg)
                         if proba is not None:
                             xgb_confidence = float(proba)
                             confidence = float(
@@ -677,7 +688,8 @@ class BehaviorRecognizer:
                     self.deep_recognizer.update_features(motion_summary)
 
                     # 预测行为
-                    predictions = self.deep_recognizer.predict_behavior()
+                    with trace_span("behavior.transformer_fusion"):
+                        predictions = self.deep_recognizer.predict_behavior()
                     transformer_confidence = predictions.get("handwash", 0.0)
 
                     # 融合结果
@@ -710,6 +722,17 @@ class BehaviorRecognizer:
             except Exception as e:
                 logger.debug(f"Transformer fusion skipped: {e}")
 
+        if track_id is not None:
+            scores = {"fused": float(confidence)}
+            if xgb_confidence is not None:
+                scores["xgb"] = xgb_confidence
+            if transformer_confidence is not None:
+                scores["transformer"] = float(transformer_confidence)
+            self.model_scores.pop(track_id, None)
+            self.model_scores[track_id] = scores
+            if len(self.model_scores) > MAX_TRACKED_MODEL_SCORES:
+                self.model_scores.pop(next(iter(self.model_scores)))
+
         return confidence
 
     # ---- ML辅助方法 ----
@@ -817,11 +840,12 @@ class BehaviorRecognizer:
 
                 # 姿态检测增强
                 if self.pose_detector and frame is not None:
-                    pose_data = self.pose_detector.detect(frame)
-                    # 检查是否存在 detect_hands 方法
-                    hands_data = []
-                    if hasattr(self.pose_detector, "detect_hands"):
-                        hands_data = self.pose_detector.detect_hands(frame)
+                    with trace_span("behavior.pose"):
+                        pose_data = self.pose_detector.detect(frame)
+                        # 检查是否存在 detect_hands 方法
+                        hands_data = []
+                        if hasattr(self.pose_detector, "detect_hands"):
+                            hands_data = self.pose_detector.detect_hands(frame)
 
                     if pose_data and hands_data:
                         pose_confidence = self._analyze_sanitizing_pose(
@@ -1314,12 +1338,22 @@ class BehaviorRecognizer:
 
         return summary
 
+    def get_model_scores(self, track_id: int) -> Dict[str, float]:
+        """
+        获取指定追踪目标最近一次洗手判定的各模型分数
+
+        Returns:
+            {"fused": ..., "xgb": ..., "transformer": ...}，未参与融合的模型不出现
+        """
+        return dict(self.model_scores.get(track_id, {}))
+
     def reset_track(self, track_id: int):
         """重置指定追踪目标的行为状态"""
         if track_id in self.active_behaviors:
             del self.active_behaviors[track_id]
         if track_id in self.behavior_history:
             self.behavior_history[track_id].clear()
+        self.model_scores.pop(track_id, None)
 
         logger.info(f"Behavior state reset for track {track_id}")
 
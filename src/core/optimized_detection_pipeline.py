@@ -13,7 +13,7 @@ import asyncio
 import logging
 import time
 from collections import OrderedDict
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from threading import Lock
 from typing import Any, Dict, List, Optional
 
@@ -22,6 +22,8 @@ import numpy as np
 
 from src.config.unified_params import get_unified_params
 from src.detection.pose_detector import PoseDetectorFactory
+from src.detection.roi_packer import crop_quality, enhance_crop
+from src.monitoring.tracing import trace_span
 
 # 导入FrameMetadata相关类（可选，用于状态管理和异步处理）
 try:
@@ -53,6 +55,20 @@ except Exception:
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class ModelOutput:
+    """单个检测模型在本帧的原始输出（管道后处理之前）
+
+    记录调用方式，影子评估可用相同输入在候选模型上重放同一次调用。
+    """
+
+    method: str  # 检测器方法名
+    args: tuple  # 图像之后的位置参数
+    kwargs: Dict[str, Any]
+    output: Any
+    seconds: float
+
+
 @dataclass
 class DetectionResult:
     """统一的检测结果数据结构"""
@@ -64,6 +80,8 @@ class DetectionResult:
     processing_times: Dict[str, float]
     annotated_image: Optional[np.ndarray] = None
     frame_cache_key: Optional[str] = None
+    # 检测任务 -> 模型原始输出（见 ModelRolloutManager 影子评估）
+    model_outputs: Dict[str, ModelOutput] = field(default_factory=dict)
 
 
 @dataclass
@@ -208,6 +226,9 @@ class OptimizedDetectionPipeline:
                 logger.warning(f"姿态检测器初始化失败: {e}")
                 self.pose_detector = None
 
+        # 手部ROI质量评分低于该阈值时才执行CLAHE增强
+        self.hand_roi_quality_threshold = 0.35
+
         # 初始化缓存
         self.enable_cache = enable_cache
         if enable_cache:
@@ -331,43 +352,47 @@ class OptimizedDetectionPipeline:
         Returns:
             DetectionResult: 综合检测结果
         """
-        start_time = time.time()
-
-        # 检查缓存
-        if self.enable_cache and self.frame_cache is not None and not force_refresh:
-            cached_result = self.frame_cache.get(image)
-            if cached_result is not None:
-                self.stats["cache_hits"] += 1
-                logger.debug("使用缓存的检测结果")
-                return cached_result
+        with trace_span("pipeline.detect") as span:
+            start_time = time.time()
+
+            # 检查缓存
+            if self.enable_cache and self.frame_cache is not None and not force_refresh:
+                cached_result = self.frame_cache.get(image)
+                if cached_result is not None:
+                    self.stats["cache_hits"] += 1
+                    span.set_attribute("cache_hit", True)
+                    logger.debug("使用缓存的检测结果")
+                    return cached_result
+                else:
+                    self.stats["cache_misses"] += 1
+
+            # 执行检测流水线（支持异步和同步两种模式）
+            if self.enable_async and self.async_pipeline:
+                # 使用异步检测（任务1.3）
+                span.set_attribute("mode", "async")
+                result = self._execute_detection_pipeline_async(
+                    image, camera_id, enable_hairnet, enable_handwash, enable_sanitize
+                )
             else:
-                self.stats["cache_misses"] += 1
-
-        # 执行检测流水线（支持异步和同步两种模式）
-        if self.enable_async and self.async_pipeline:
-            # 使用异步检测（任务1.3）
-            result = self._execute_detection_pipeline_async(
-                image, camera_id, enable_hairnet, enable_handwash, enable_sanitize
-            )
-        else:
-            # 使用同步检测（原有逻辑）
-            result = self._execute_detection_pipeline(
-                image, enable_hairnet, enable_handwash, enable_sanitize
-            )
+                # 使用同步检测（原有逻辑）
+                result = self._execute_detection_pipeline(
+                    image, enable_hairnet, enable_handwash, enable_sanitize
+                )
+            span.set_attribute("persons", len(result.person_detections))
 
-        # 更新统计信息
-        total_time = time.time() - start_time
-        self.stats["total_detections"] += 1
-        self.stats["avg_processing_time"] = (
-            self.stats["avg_processing_time"] * (self.stats["total_detections"] - 1)
-            + total_time
-        ) / self.stats["total_detections"]
+            # 更新统计信息
+            total_time = time.time() - start_time
+            self.stats["total_detections"] += 1
+            self.stats["avg_processing_time"] = (
+                self.stats["avg_processing_time"] * (self.stats["total_detections"] - 1)
+                + total_time
+            ) / self.stats["total_detections"]
 
-        # 存入缓存
-        if self.enable_cache and self.frame_cache is not None:
-            self.frame_cache.put(image, result)
+            # 存入缓存
+            if self.enable_cache and self.frame_cache is not None:
+                self.frame_cache.put(image, result)
 
-        return result
+            return result
 
     def _execute_detection_pipeline_async(
         self,
@@ -489,18 +514,35 @@ class OptimizedDetectionPipeline:
         3. 行为检测（洗手、消毒，依赖人体检测结果）
         """
         processing_times = {}
+        model_outputs: Dict[str, ModelOutput] = {}
 
         # 阶段1: 人体检测（必须，其他检测的基础）
-        person_start = time.time()
-        person_detections = self._detect_persons(image)
-        processing_times["person_detection"] = time.time() - person_start
+        with trace_span("pipeline.person_detection") as span:
+            person_start = time.time()
+            person_detections = self._detect_persons(image)
+            processing_times["person_detection"] = time.time() - person_start
+            span.set_attribute("persons", len(person_detections))
+        model_outputs["human_detection"] = ModelOutput(
+            "detect",
+            (),
+            {},
+            list(person_detections),
+            processing_times["person_detection"],
+        )
 
         logger.info(f"人体检测完成: 检测到 {len(person_detections)} 个人")
 
         # 可选：级联二次检测，对边界分数段或ROI内的目标进行重检
         try:
             t0 = time.time()
-            person_detections = self._cascade_refine_persons(image, person_detections)
+            with trace_span("pipeline.cascade_refine") as span:
+                refined_before = self.cascade_stats.get("refined", 0)
+                person_detections = self._cascade_refine_persons(
+                    image, person_detections
+                )
+                span.set_attribute(
+                    "rois", self.cascade_stats.get("refined", 0) - refined_before
+                )
             processing_times["cascade_refine"] = time.time() - t0
         except Exception as e:
             processing_times["cascade_refine"] = 0.0
@@ -515,7 +557,10 @@ class OptimizedDetectionPipeline:
                 f"hairnet_detector={'存在' if self.hairnet_detector else '不存在'}, "
                 f"类型={type(self.hairnet_detector).__name__ if self.hairnet_detector else 'None'}"
             )
-            hairnet_results = self._detect_hairnet_for_persons(image, person_detections)
+            with trace_span("pipeline.hairnet", persons=len(person_detections)):
+                hairnet_results = self._detect_hairnet_for_persons(
+                    image, person_detections, model_outputs
+                )
             processing_times["hairnet_detection"] = time.time() - hairnet_start
             logger.warning(
                 f"🔵 发网检测完成: 处理了 {len(hairnet_results)} 个人, "
@@ -525,9 +570,10 @@ class OptimizedDetectionPipeline:
             # 应用状态稳定判定（任务1.1）
             if self.enable_state_management and self.state_manager:
                 state_start = time.time()
-                hairnet_results = self._apply_state_management_to_hairnet_results(
-                    hairnet_results, image
-                )
+                with trace_span("pipeline.state_management"):
+                    hairnet_results = self._apply_state_management_to_hairnet_results(
+                        hairnet_results, image
+                    )
                 processing_times["state_management"] = time.time() - state_start
         else:
             processing_times["hairnet_detection"] = 0.0
@@ -539,17 +585,33 @@ class OptimizedDetectionPipeline:
         if (enable_handwash or enable_sanitize) and len(person_detections) > 0:
             behavior_start = time.time()
 
-            if enable_handwash:
-                handwash_results = self._detect_handwash_for_persons(
-                    image, person_detections
+            # 手部区域每帧只计算一次，洗手与消毒检测共用
+            hand_start = time.time()
+            with trace_span("pipeline.hand_regions") as span:
+                hand_regions_by_person = self._prepare_hand_regions(
+                    image, person_detections, model_outputs
                 )
+                if hand_regions_by_person is not None:
+                    span.set_attribute(
+                        "rois", sum(len(r) for r in hand_regions_by_person)
+                    )
+            processing_times["hand_regions"] = time.time() - hand_start
+
+            if enable_handwash:
+                with trace_span("pipeline.handwash", persons=len(person_detections)):
+                    handwash_results = self._detect_handwash_for_persons(
+                        image, person_detections, hand_regions_by_person
+                    )
 
             if enable_sanitize:
-                sanitize_results = self._detect_sanitize_for_persons(
-                    image, person_detections
-                )
+                with trace_span("pipeline.sanitize", persons=len(person_detections)):
+                    sanitize_results = self._detect_sanitize_for_persons(
+                        image, person_detections, hand_regions_by_person
+                    )
 
-            processing_times["behavior_detection"] = time.time() - behavior_start
+            processing_times["behavior_detection"] = (
+                time.time() - behavior_start - processing_times["hand_regions"]
+            )
             logger.info(
                 f"行为检测完成: 洗手={len(handwash_results)}, 消毒={len(sanitize_results)}, "
                 f"人员数={len(person_detections)}, 耗时={processing_times['behavior_detection']:.3f}s"
@@ -566,14 +628,15 @@ class OptimizedDetectionPipeline:
             human_conf = self.params.human_detection.confidence_threshold
             min_confidence = max(0.5, human_conf)
 
-        annotated_image = self._create_annotated_image(
-            image,
-            person_detections,
-            hairnet_results,
-            handwash_results,
-            sanitize_results,
-            min_confidence=min_confidence,  # 传递可视化置信度阈值
-        )
+        with trace_span("pipeline.annotate"):
+            annotated_image = self._create_annotated_image(
+                image,
+                person_detections,
+                hairnet_results,
+                handwash_results,
+                sanitize_results,
+                min_confidence=min_confidence,  # 传递可视化置信度阈值
+            )
         processing_times["visualization"] = time.time() - viz_start
 
         # 计算总处理时间
@@ -586,6 +649,7 @@ class OptimizedDetectionPipeline:
             sanitize_results=sanitize_results,
             processing_times=processing_times,
             annotated_image=annotated_image,
+            model_outputs=model_outputs,
         )
 
     def _apply_state_management_to_hairnet_results(
@@ -771,6 +835,10 @@ class OptimizedDetectionPipeline:
                         except Exception:
                             continue
 
+                # 记录轻/重模型分数，供难例挖掘识别两者不一致的目标
+                det = det.copy()
+                det["detector_confidence"] = score
+                det["cascade_confidence"] = float(best[0]) if best else 0.0
                 if best is None:
                     refined.append(det)
                     continue
@@ -782,7 +850,6 @@ class OptimizedDetectionPipeline:
                 gx2 = int(x1 + min(float(x2 - x1), bx2))
                 gy2 = int(y1 + min(float(y2 - y1), by2))
                 if gx2 > gx1 and gy2 > gy1:
-                    det = det.copy()
                     det["bbox"] = [gx1, gy1, gx2, gy2]
                     det["confidence"] = max(
                         float(det.get("confidence", 0.0)), float(conf_h)
@@ -824,14 +891,33 @@ class OptimizedDetectionPipeline:
         detections = self.human_detector.detect(image)
         return detections if detections else []
 
+    def _detect_persons_batch(self, images: List[np.ndarray]) -> List[List[Dict]]:
+        """批量人体检测（检测器支持 detect_batch 时一次前向处理整批图像）
+
+        Args:
+            images: 输入图像列表
+
+        Returns:
+            List[List[Dict]]: 每张图像的人体检测结果列表
+        """
+        if len(images) <= 1 or not hasattr(self.human_detector, "detect_batch"):
+            return [self._detect_persons(image) for image in images]
+
+        batch_detections = self.human_detector.detect_batch(images)
+        return [detections if detections else [] for detections in batch_detections]
+
     def _detect_hairnet_for_persons(
-        self, image: np.ndarray, person_detections: List[Dict]
+        self,
+        image: np.ndarray,
+        person_detections: List[Dict],
+        model_outputs: Optional[Dict[str, ModelOutput]] = None,
     ) -> List[Dict]:
         """为检测到的人员进行发网检测
 
         Args:
             image: 输入图像
             person_detections: 人体检测结果列表
+            model_outputs: 记录发网模型原始输出的字典（可选）
 
         Returns:
             List[Dict]: 发网检测结果列表
@@ -854,9 +940,19 @@ class OptimizedDetectionPipeline:
                     f"人数={len(person_detections)}, 图像大小={image.shape}"
                 )
                 # 使用YOLOHairnetDetector的detect_hairnet_compliance方法，传递已有的人体检测结果避免重复检测
+                persons = list(person_detections)
+                hairnet_start = time.time()
                 compliance_result = self.hairnet_detector.detect_hairnet_compliance(
-                    image, person_detections
+                    image, persons
                 )
+                if model_outputs is not None:
+                    model_outputs["hairnet_detection"] = ModelOutput(
+                        "detect_hairnet_compliance",
+                        (persons,),
+                        {},
+                        compliance_result,
+                        time.time() - hairnet_start,
+                    )
                 logger.warning(
                     f"🔵 YOLOHairnetDetector返回结果: "
                     f"total_persons={compliance_result.get('total_persons', 0)}, "
@@ -962,7 +1058,10 @@ class OptimizedDetectionPipeline:
         return hairnet_results
 
     def _detect_handwash_for_persons(
-        self, image: np.ndarray, person_detections: List[Dict]
+        self,
+        image: np.ndarray,
+        person_detections: List[Dict],
+        hand_regions_by_person: Optional[List[List[Dict]]] = None,
     ) -> List[Dict]:
         """为检测到的人员进行洗手行为检测"""
         if self.behavior_recognizer is None:
@@ -993,7 +1092,11 @@ class OptimizedDetectionPipeline:
                 if person_region.size > 0:
                     # 使用行为识别器检测洗手行为
                     # 获取实际的手部区域信息
-                    hand_regions = self._get_actual_hand_regions(image, bbox)
+                    hand_regions = (
+                        hand_regions_by_person[i]
+                        if hand_regions_by_person is not None
+                        else self._get_actual_hand_regions(image, bbox)
+                    )
 
                     # 传递完整图像帧给行为识别器以支持MediaPipe检测
                     confidence = self.behavior_recognizer.detect_handwashing(
@@ -1007,9 +1110,11 @@ class OptimizedDetectionPipeline:
                     logger.info(
                         f"人员 {i+1} 洗手检测: 置信度={confidence:.3f}, 阈值={self.behavior_recognizer.confidence_threshold}, 结果={is_handwashing}"
                     )
+                    model_scores = self.behavior_recognizer.get_model_scores(i + 1)
                 else:
                     is_handwashing = False
                     confidence = 0.0
+                    model_scores = {}
 
                 handwash_results.append(
                     {
@@ -1018,6 +1123,7 @@ class OptimizedDetectionPipeline:
                         "is_handwashing": is_handwashing,
                         "handwashing": is_handwashing,  # 兼容性字段
                         "handwash_confidence": confidence,
+                        "model_scores": model_scores,
                     }
                 )
             except Exception as e:
@@ -1036,7 +1142,10 @@ class OptimizedDetectionPipeline:
         return handwash_results
 
     def _detect_sanitize_for_persons(
-        self, image: np.ndarray, person_detections: List[Dict]
+        self,
+        image: np.ndarray,
+        person_detections: List[Dict],
+        hand_regions_by_person: Optional[List[List[Dict]]] = None,
     ) -> List[Dict]:
         """为检测到的人员进行消毒行为检测"""
         if self.behavior_recognizer is None:
@@ -1067,7 +1176,11 @@ class OptimizedDetectionPipeline:
                 if person_region.size > 0:
                     # 使用行为识别器检测消毒行为
                     # 获取实际的手部区域信息
-                    hand_regions = self._get_actual_hand_regions(image, bbox)
+                    hand_regions = (
+                        hand_regions_by_person[i]
+                        if hand_regions_by_person is not None
+                        else self._get_actual_hand_regions(image, bbox)
+                    )
 
                     # 传递完整图像帧给行为识别器以支持MediaPipe检测
                     confidence = self.behavior_recognizer.detect_sanitizing(
@@ -1174,25 +1287,10 @@ class OptimizedDetectionPipeline:
                     roi = image[y1:y2, x1:x2]
                     roi_h, roi_w = roi.shape[:2]
 
-                    # 预处理：CLAHE增强亮度、轻度锐化
-                    def _enhance(img: np.ndarray) -> np.ndarray:
-                        try:
-                            lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
-                            l, a, b = cv2.split(lab)
-                            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-                            l2 = clahe.apply(l)
-                            lab2 = cv2.merge((l2, a, b))
-                            enhanced = cv2.cvtColor(lab2, cv2.COLOR_LAB2BGR)
-                            # 轻度锐化
-                            kernel = np.array(
-                                [[0, -1, 0], [-1, 5, -1], [0, -1, 0]], dtype=np.float32
-                            )
-                            sharpened = cv2.filter2D(enhanced, -1, kernel)
-                            return sharpened
-                        except Exception:
-                            return img
+                    # 预处理：仅对质量评分偏低的ROI执行CLAHE增强与锐化
+                    needs_enhance = crop_quality(roi) < self.hand_roi_quality_threshold
 
-                    # 保证最小ROI边长，并做多尺度（1.0 和 1.25倍）
+                    # 保证最小ROI边长；首个尺度未检出时再尝试1.25倍尺度
                     min_side_target = 160
                     base_scale = 1.0
                     min_side = max(1, min(roi_w, roi_h))
@@ -1202,13 +1300,16 @@ class OptimizedDetectionPipeline:
 
                     detected_any = False
                     for scale in scales:
+                        if hand_regions:
+                            break
                         # 缩放ROI
                         scaled_w = max(1, int(round(roi_w * scale)))
                         scaled_h = max(1, int(round(roi_h * scale)))
                         scaled_roi = cv2.resize(
                             roi, (scaled_w, scaled_h), interpolation=cv2.INTER_CUBIC
                         )
-                        scaled_roi = _enhance(scaled_roi)
+                        if needs_enhance:
+                            scaled_roi = enhance_crop(scaled_roi)
 
                         # 调用手部检测（在缩放ROI上）- 检查方法是否存在
                         roi_hands = []
@@ -1329,134 +1430,160 @@ class OptimizedDetectionPipeline:
         Returns:
             手部区域列表
         """
-        hand_regions = []
-
         if self.pose_detector is None:
-            return hand_regions
+            return []
 
         try:
             # 使用姿态检测器检测人体关键点
             pose_detections = self.pose_detector.detect(image)
+            best_pose = self._closest_pose(pose_detections, person_bbox)
+            return self._hand_regions_from_pose(image.shape, best_pose, person_bbox)
+        except Exception as e:
+            logger.debug(f"从姿态关键点提取手部区域失败: {e}")
+            return []
+
+    @staticmethod
+    def _closest_pose(
+        pose_detections: List[Dict], person_bbox: List[int]
+    ) -> Optional[Dict]:
+        """找到中心距离人体框中心最近的姿态检测结果"""
+        x1, y1, x2, y2 = [int(v) for v in person_bbox]
+        cx = (x1 + x2) / 2
+        cy = (y1 + y2) / 2
+
+        best_pose = None
+        min_distance = float("inf")
+        for pose in pose_detections:
+            px1, py1, px2, py2 = pose.get("bbox", [0, 0, 0, 0])
+            distance = (
+                (cx - (px1 + px2) / 2) ** 2 + (cy - (py1 + py2) / 2) ** 2
+            ) ** 0.5
+            if distance < min_distance:
+                min_distance = distance
+                best_pose = pose
+        return best_pose
+
+    @staticmethod
+    def _hand_regions_from_pose(
+        image_shape: tuple, pose: Optional[Dict], person_bbox: List[int]
+    ) -> List[Dict]:
+        """由手腕/手肘关键点估算手部区域（关键点为整帧坐标）"""
+        hand_regions: List[Dict] = []
+        if not pose or "keypoints" not in pose:
+            return hand_regions
+        keypoints = pose["keypoints"]
+        if "xy" not in keypoints or "conf" not in keypoints:
+            return hand_regions
 
-            x1, y1, x2, y2 = [int(v) for v in person_bbox]
-            cx = (x1 + x2) / 2
-            cy = (y1 + y2) / 2
-
-            # 找到最接近的人体姿态检测结果
-            best_pose = None
-            min_distance = float("inf")
-
-            for pose in pose_detections:
-                pose_bbox = pose.get("bbox", [0, 0, 0, 0])
-                px1, py1, px2, py2 = pose_bbox
-                pcx = (px1 + px2) / 2
-                pcy = (py1 + py2) / 2
-                distance = ((cx - pcx) ** 2 + (cy - pcy) ** 2) ** 0.5
-
-                if distance < min_distance:
-                    min_distance = distance
-                    best_pose = pose
-
-            if best_pose and "keypoints" in best_pose:
-                keypoints = best_pose["keypoints"]
-                if "xy" in keypoints and "conf" in keypoints:
-                    kpts_xy = np.array(keypoints["xy"])
-                    kpts_conf = np.array(keypoints["conf"])
-
-                    # COCO姿态关键点索引：
-                    # 9: 左手腕 (left_wrist)
-                    # 10: 右手腕 (right_wrist)
-                    # 7: 左肘 (left_elbow)
-                    # 8: 右肘 (right_elbow)
-
-                    left_wrist_idx = 9
-                    right_wrist_idx = 10
-                    left_elbow_idx = 7
-                    right_elbow_idx = 8
-
-                    # 提取左手区域
-                    if (
-                        left_wrist_idx < len(kpts_xy)
-                        and left_elbow_idx < len(kpts_xy)
-                        and kpts_conf[left_wrist_idx] > 0.3
-                        and kpts_conf[left_elbow_idx] > 0.3
-                    ):
-                        wrist = kpts_xy[left_wrist_idx]
-                        elbow = kpts_xy[left_elbow_idx]
-
-                        # 估算手部区域（以手腕为中心，大小基于肘部到手腕的距离）
-                        hand_size = np.linalg.norm(wrist - elbow) * 0.8
-                        hand_w = int(hand_size)
-                        hand_h = int(hand_size)
-
-                        hand_x1 = max(0, int(wrist[0] - hand_w / 2))
-                        hand_y1 = max(0, int(wrist[1] - hand_h / 2))
-                        hand_x2 = min(image.shape[1], int(wrist[0] + hand_w / 2))
-                        hand_y2 = min(image.shape[0], int(wrist[1] + hand_h / 2))
-
-                        # 检查手部中心是否在人体框内
-                        if x1 <= wrist[0] <= x2 and y1 <= wrist[1] <= y2:
-                            hand_regions.append(
-                                {
-                                    "bbox": [hand_x1, hand_y1, hand_x2, hand_y2],
-                                    "confidence": float(kpts_conf[left_wrist_idx]),
-                                    "landmarks": [
-                                        {
-                                            "x": wrist[0] / image.shape[1],
-                                            "y": wrist[1] / image.shape[0],
-                                        }
-                                    ],
-                                    "source": "yolov8_pose_keypoints",
-                                    "hand_label": "left",
-                                }
-                            )
+        kpts_xy = np.array(keypoints["xy"])
+        kpts_conf = np.array(keypoints["conf"])
+        img_h, img_w = image_shape[:2]
+        x1, y1, x2, y2 = [int(v) for v in person_bbox]
+
+        # COCO姿态关键点索引：9/10 左/右手腕，7/8 左/右肘
+        for hand_label, wrist_idx, elbow_idx in (("left", 9, 7), ("right", 10, 8)):
+            if (
+                wrist_idx >= len(kpts_xy)
+                or elbow_idx >= len(kpts_xy)
+                or kpts_conf[wrist_idx] <= 0.3
+                or kpts_conf[elbow_idx] <= 0.3
+            ):
+                continue
+
+            wrist = kpts_xy[wrist_idx]
+            elbow = kpts_xy[elbow_idx]
+            # 检查手部中心是否在人体框内
+            if not (x1 <= wrist[0] <= x2 and y1 <= wrist[1] <= y2):
+                continue
+
+            # 估算手部区域（以手腕为中心，大小基于肘部到手腕的距离）
+            hand_size = int(np.linalg.norm(wrist - elbow) * 0.8)
+            hand_regions.append(
+                {
+                    "bbox": [
+                        max(0, int(wrist[0] - hand_size / 2)),
+                        max(0, int(wrist[1] - hand_size / 2)),
+                        min(img_w, int(wrist[0] + hand_size / 2)),
+                        min(img_h, int(wrist[1] + hand_size / 2)),
+                    ],
+                    "confidence": float(kpts_conf[wrist_idx]),
+                    "landmarks": [{"x": wrist[0] / img_w, "y": wrist[1] / img_h}],
+                    "source": "yolov8_pose_keypoints",
+                    "hand_label": hand_label,
+                }
+            )
 
-                    # 提取右手区域
-                    if (
-                        right_wrist_idx < len(kpts_xy)
-                        and right_elbow_idx < len(kpts_xy)
-                        and kpts_conf[right_wrist_idx] > 0.3
-                        and kpts_conf[right_elbow_idx] > 0.3
-                    ):
-                        wrist = kpts_xy[right_wrist_idx]
-                        elbow = kpts_xy[right_elbow_idx]
-
-                        # 估算手部区域
-                        hand_size = np.linalg.norm(wrist - elbow) * 0.8
-                        hand_w = int(hand_size)
-                        hand_h = int(hand_size)
-
-                        hand_x1 = max(0, int(wrist[0] - hand_w / 2))
-                        hand_y1 = max(0, int(wrist[1] - hand_h / 2))
-                        hand_x2 = min(image.shape[1], int(wrist[0] + hand_w / 2))
-                        hand_y2 = min(image.shape[0], int(wrist[1] + hand_h / 2))
-
-                        # 检查手部中心是否在人体框内
-                        if x1 <= wrist[0] <= x2 and y1 <= wrist[1] <= y2:
-                            hand_regions.append(
-                                {
-                                    "bbox": [hand_x1, hand_y1, hand_x2, hand_y2],
-                                    "confidence": float(kpts_conf[right_wrist_idx]),
-                                    "landmarks": [
-                                        {
-                                            "x": wrist[0] / image.shape[1],
-                                            "y": wrist[1] / image.shape[0],
-                                        }
-                                    ],
-                                    "source": "yolov8_pose_keypoints",
-                                    "hand_label": "right",
-                                }
-                            )
+        if hand_regions:
+            logger.info(
+                f"从姿态关键点提取到 {len(hand_regions)} 个手部区域, person_bbox={person_bbox}"
+            )
+        return hand_regions
 
-                    if hand_regions:
-                        logger.info(
-                            f"从姿态关键点提取到 {len(hand_regions)} 个手部区域, person_bbox={person_bbox}"
-                        )
+    def _prepare_hand_regions(
+        self,
+        image: np.ndarray,
+        person_detections: List[Dict],
+        model_outputs: Optional[Dict[str, ModelOutput]] = None,
+    ) -> Optional[List[List[Dict]]]:
+        """
+        一次性计算本帧所有人员的手部区域
 
+        YOLOv8姿态检测器：所有人体ROI拼图后只做一次姿态推理（见 RoiPacker），
+        未检出手部的人员共享一次整帧姿态推理，仍未检出时回退到估算。
+        其他后端（MediaPipe手检）返回None，由调用方逐人检测。
+        """
+        detector = self.pose_detector
+        if (
+            detector is None
+            or hasattr(detector, "detect_hands")
+            or not hasattr(detector, "detect_in_rois")
+        ):
+            return None
+
+        bboxes = [d.get("bbox", [0, 0, 0, 0]) for d in person_detections]
+        roi_kwargs = {"use_batch": True, "enhance_low_quality": True}
+        try:
+            pose_start = time.time()
+            roi_poses = detector.detect_in_rois(image, bboxes, **roi_kwargs)
         except Exception as e:
-            logger.debug(f"从姿态关键点提取手部区域失败: {e}")
+            logger.debug(f"ROI拼图姿态检测失败，逐人检测: {e}")
+            return None
+        if model_outputs is not None:
+            model_outputs["pose_detection"] = ModelOutput(
+                "detect_in_rois",
+                (bboxes,),
+                roi_kwargs,
+                roi_poses,
+                time.time() - pose_start,
+            )
 
-        return hand_regions
+        poses_by_roi: Dict[int, List[Dict]] = {}
+        for pose in roi_poses:
+            poses_by_roi.setdefault(pose.get("roi_index", -1), []).append(pose)
+
+        regions: List[List[Dict]] = []
+        full_frame_poses: Optional[List[Dict]] = None
+        for index, bbox in enumerate(bboxes):
+            hands = self._hand_regions_from_pose(
+                image.shape,
+                self._closest_pose(poses_by_roi.get(index, []), bbox),
+                bbox,
+            )
+            if not hands:
+                # 整帧姿态推理只做一次，供所有未检出的人员共享
+                if full_frame_poses is None:
+                    try:
+                        full_frame_poses = detector.detect(image)
+                    except Exception as e:
+                        logger.debug(f"整帧姿态检测失败: {e}")
+                        full_frame_poses = []
+                hands = self._hand_regions_from_pose(
+                    image.shape, self._closest_pose(full_frame_poses, bbox), bbox
+                )
+            if not hands:
+                hands = self._estimate_hand_regions(bbox)
+            regions.append(hands)
+        return regions
 
     # --- Public helper for external callers (e.g., tracking-driven pipelines) ---
     def get_hand_regions_for_person(
@@ -1795,6 +1922,9 @@ class OptimizedDetectionPipeline:
                 }
             )
 
+        if hasattr(self.pose_detector, "get_roi_packing_stats"):
+            stats["roi_packing"] = self.pose_detector.get_roi_packing_stats()
+
         return stats
 
     def clear_cache(self):
@@ -1803,20 +1933,36 @@ class OptimizedDetectionPipeline:
             self.frame_cache.clear()
 
     def update_models(
-        self, human_detector=None, hairnet_detector=None, behavior_recognizer=None
+        self,
+        human_detector=None,
+        hairnet_detector=None,
+        behavior_recognizer=None,
+        pose_detector=None,
     ):
-        """更新模型（热更新支持）"""
-        if human_detector is not None:
-            self.human_detector = human_detector
-            logger.info("人体检测器已更新")
-
-        if hairnet_detector is not None:
-            self.hairnet_detector = hairnet_detector
-            logger.info("发网检测器已更新")
-
-        if behavior_recognizer is not None:
-            self.behavior_recognizer = behavior_recognizer
-            logger.info("行为识别器已更新")
+        """更新模型（热更新支持）
+
+        只替换引用，调用方需保证在两帧之间调用（见 ModelRolloutManager）。
+        """
+        updates = {
+            "human_detector": human_detector,
+            "hairnet_detector": hairnet_detector,
+            "behavior_recognizer": behavior_recognizer,
+            "pose_detector": pose_detector,
+        }
+        names = {
+            "human_detector": "人体检测器",
+            "hairnet_detector": "发网检测器",
+            "behavior_recognizer": "行为识别器",
+            "pose_detector": "姿态检测器",
+        }
+        for attr, model in updates.items():
+            if model is None:
+                continue
+            setattr(self, attr, model)
+            # 异步管道持有同一组检测器引用，需同步替换
+            if self.async_pipeline is not None and hasattr(self.async_pipeline, attr):
+                setattr(self.async_pipeline, attr, model)
+            logger.info(f"{names[attr]}已更新")
 
         # 清空缓存以确保使用新模型
         self.clear_cache()
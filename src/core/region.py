@@ -42,6 +42,7 @@ class Region:
         self.polygon = polygon
         self.name = name or f"{region_type.value}_{region_id}"
         self.is_active = True
+        self.camera_id: Optional[str] = None  # 关联的相机ID（None表示未关联）
 
         # 区域规则配置
         self.rules = {
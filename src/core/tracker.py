@@ -1,9 +1,16 @@
 import logging
 from collections import deque
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Type, Union
 
 import numpy as np
 
+try:
+    from scipy.optimize import linear_sum_assignment
+    from scipy.spatial import cKDTree
+except ImportError:  # pragma: no cover - scipy 为可选加速依赖
+    linear_sum_assignment = None
+    cKDTree = None
+
 logger = logging.getLogger(__name__)
 
 
@@ -63,10 +70,217 @@ class Track:
         return (x2 - x1) * (y2 - y1)
 
 
+def boxes_to_array(boxes: Sequence[Sequence[float]]) -> np.ndarray:
+    """将边界框列表转换为 (N, 4) 的 float64 数组"""
+    if len(boxes) == 0:
+        return np.zeros((0, 4), dtype=np.float64)
+    return np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+
+
+def pairwise_iou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """向量化计算两组边界框的 IoU 矩阵 (N, M)"""
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0.0, None) * np.clip(y2 - y1, 0.0, None)
+
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+
+    iou = np.zeros_like(intersection)
+    np.divide(intersection, union, out=iou, where=union > 0)
+    return iou
+
+
+def box_centers(boxes: np.ndarray) -> np.ndarray:
+    """边界框中心点 (N, 2)"""
+    return np.stack(
+        ((boxes[:, 0] + boxes[:, 2]) / 2.0, (boxes[:, 1] + boxes[:, 3]) / 2.0), axis=1
+    )
+
+
+def pairwise_center_distance(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """向量化计算两组边界框的中心距离矩阵 (N, M)"""
+    diff = box_centers(boxes_a)[:, None, :] - box_centers(boxes_b)[None, :, :]
+    return np.hypot(diff[..., 0], diff[..., 1])
+
+
+class AssignmentStrategy:
+    """轨迹-检测分配策略基类
+
+    输入融合代价、IoU与中心距离矩阵，返回匹配对的 (行索引, 列索引)。
+    """
+
+    name = "base"
+
+    def assign(
+        self,
+        cost_matrix: np.ndarray,
+        iou_matrix: np.ndarray,
+        dist_matrix: np.ndarray,
+        iou_threshold: float,
+        dist_threshold: float,
+    ) -> Tuple[List[int], List[int]]:
+        raise NotImplementedError
+
+
+class GreedyAssignment(AssignmentStrategy):
+    """贪心分配：先按IoU从大到小匹配，再对剩余目标按中心距离从小到大匹配"""
+
+    name = "greedy"
+
+    def assign(
+        self,
+        cost_matrix: np.ndarray,
+        iou_matrix: np.ndarray,
+        dist_matrix: np.ndarray,
+        iou_threshold: float,
+        dist_threshold: float,
+    ) -> Tuple[List[int], List[int]]:
+        num_t, num_d = iou_matrix.shape
+        row_used = np.zeros(num_t, dtype=bool)
+        col_used = np.zeros(num_d, dtype=bool)
+        rows: List[int] = []
+        cols: List[int] = []
+
+        # 第一阶段：IoU降序（稳定排序保证同分时按行优先顺序）
+        flat_iou = iou_matrix.ravel()
+        candidates = np.flatnonzero(flat_iou >= iou_threshold)
+        candidates = candidates[np.argsort(-flat_iou[candidates], kind="stable")]
+        self._take(candidates, num_d, row_used, col_used, rows, cols)
+
+        # 第二阶段：剩余行列按中心距离升序
+        flat_dist = dist_matrix.ravel()
+        remaining = (~row_used)[:, None] & (~col_used)[None, :]
+        candidates = np.flatnonzero(remaining.ravel() & (flat_dist <= dist_threshold))
+        candidates = candidates[np.argsort(flat_dist[candidates], kind="stable")]
+        self._take(candidates, num_d, row_used, col_used, rows, cols)
+
+        return rows, cols
+
+    @staticmethod
+    def _take(candidates, num_cols, row_used, col_used, rows, cols) -> None:
+        for flat_index in candidates:
+            r, c = divmod(int(flat_index), num_cols)
+            if row_used[r] or col_used[c]:
+                continue
+            row_used[r] = True
+            col_used[c] = True
+            rows.append(r)
+            cols.append(c)
+
+
+class HungarianAssignment(AssignmentStrategy):
+    """最优分配（linear_sum_assignment），匹配结果需满足 IoU 或距离门限之一"""
+
+    name = "hungarian"
+
+    def __init__(self):
+        self._fallback = GreedyAssignment()
+
+    def assign(
+        self,
+        cost_matrix: np.ndarray,
+        iou_matrix: np.ndarray,
+        dist_matrix: np.ndarray,
+        iou_threshold: float,
+        dist_threshold: float,
+    ) -> Tuple[List[int], List[int]]:
+        if linear_sum_assignment is None:
+            return self._fallback.assign(
+                cost_matrix, iou_matrix, dist_matrix, iou_threshold, dist_threshold
+            )
+
+        row_ind, col_ind = linear_sum_assignment(cost_matrix)
+        # 放宽门限：IoU 或 距离 其一满足即可
+        keep = (iou_matrix[row_ind, col_ind] >= iou_threshold) | (
+            dist_matrix[row_ind, col_ind] <= dist_threshold
+        )
+        return row_ind[keep].tolist(), col_ind[keep].tolist()
+
+
+ASSIGNMENT_STRATEGIES: Dict[str, Type[AssignmentStrategy]] = {
+    HungarianAssignment.name: HungarianAssignment,
+    GreedyAssignment.name: GreedyAssignment,
+}
+
+
+def register_assignment_strategy(
+    name: str, strategy_class: Type[AssignmentStrategy]
+) -> None:
+    """注册自定义分配策略，之后可通过 match_strategy=name 使用"""
+    ASSIGNMENT_STRATEGIES[name] = strategy_class
+
+
+def create_assignment_strategy(
+    strategy: Union[str, AssignmentStrategy]
+) -> AssignmentStrategy:
+    if isinstance(strategy, AssignmentStrategy):
+        return strategy
+    if strategy not in ASSIGNMENT_STRATEGIES:
+        available = list(ASSIGNMENT_STRATEGIES.keys())
+        raise ValueError(f"不支持的匹配策略: {strategy}. 可用策略: {available}")
+    return ASSIGNMENT_STRATEGIES[strategy]()
+
+
+class RevivalIndex:
+    """候选复活轨迹的空间索引
+
+    候选较多时使用KD树做半径查询，较少时直接向量化计算距离；
+    每个候选在一帧内只能被复活一次。
+    """
+
+    KDTREE_MIN_SIZE = 32
+
+    def __init__(self, track_ids: List[int], centers: np.ndarray):
+        self.track_ids = track_ids
+        self.centers = centers
+        self._used = np.zeros(len(track_ids), dtype=bool)
+        self._tree = (
+            cKDTree(centers)
+            if cKDTree is not None and len(track_ids) >= self.KDTREE_MIN_SIZE
+            else None
+        )
+
+    def __len__(self) -> int:
+        return len(self.track_ids)
+
+    def nearest(self, point: np.ndarray, max_dist: float) -> Optional[int]:
+        """返回 max_dist 范围内最近且未被使用的轨迹ID，并将其标记为已使用"""
+        if not len(self.track_ids):
+            return None
+
+        if self._tree is not None:
+            indices = np.asarray(
+                sorted(self._tree.query_ball_point(point, max_dist)), dtype=np.intp
+            )
+        else:
+            indices = np.arange(len(self.track_ids))
+        if indices.size == 0:
+            return None
+
+        indices = indices[~self._used[indices]]
+        if indices.size == 0:
+            return None
+
+        diff = self.centers[indices] - point
+        dists = np.hypot(diff[:, 0], diff[:, 1])
+        best = int(np.argmin(dists))
+        if dists[best] > max_dist:
+            return None
+
+        chosen = int(indices[best])
+        self._used[chosen] = True
+        return self.track_ids[chosen]
+
+
 class MultiObjectTracker:
     """多目标追踪器
 
-    基于IoU匹配的简单追踪算法
+    基于IoU/中心距离融合代价的追踪算法，代价矩阵向量化计算，
+    分配策略可插拔（默认匈牙利最优分配），丢失轨迹通过空间索引复活。
     """
 
     def __init__(
@@ -74,7 +288,7 @@ class MultiObjectTracker:
         max_disappeared: int = 10,
         iou_threshold: float = 0.3,
         dist_threshold: float = 200.0,
-        match_strategy: str = "hungarian",
+        match_strategy: Union[str, AssignmentStrategy] = "hungarian",
         iou_weight: float = 0.6,
         recycle_ids: bool = False,
         force_revival: bool = False,
@@ -86,13 +300,15 @@ class MultiObjectTracker:
         Args:
             max_disappeared: 目标消失的最大帧数
             iou_threshold: IoU匹配阈值
+            match_strategy: 分配策略名称（见 ASSIGNMENT_STRATEGIES）或策略实例
         """
         self.tracks = {}
         self.next_id = 1
         self.max_disappeared = max_disappeared
         self.iou_threshold = iou_threshold
         self.dist_threshold = dist_threshold
-        self.match_strategy = match_strategy  # 'hungarian' or 'greedy'
+        self.assignment = create_assignment_strategy(match_strategy)
+        self.match_strategy = self.assignment.name
         self.iou_weight = iou_weight  # 0..1, remaining weight for distance
         self.recycle_ids = recycle_ids
         self.force_revival = force_revival
@@ -102,33 +318,17 @@ class MultiObjectTracker:
             else dist_threshold * 1.5
         )
         self._recycle_pool: List[int] = []
+        self.id_switches = 0
 
         logger.info(
-            f"MultiObjectTracker initialized with IoU threshold: {iou_threshold}, dist_threshold: {dist_threshold}, strategy: {match_strategy}, iou_weight: {iou_weight}, recycle_ids: {recycle_ids}, force_revival: {force_revival}"
+            f"MultiObjectTracker initialized with IoU threshold: {iou_threshold}, dist_threshold: {dist_threshold}, strategy: {self.match_strategy}, iou_weight: {iou_weight}, recycle_ids: {recycle_ids}, force_revival: {force_revival}"
         )
 
     def calculate_iou(self, bbox1: List[int], bbox2: List[int]) -> float:
         """计算两个边界框的IoU"""
-        x1_1, y1_1, x2_1, y2_1 = bbox1
-        x1_2, y1_2, x2_2, y2_2 = bbox2
-
-        # 计算交集
-        x1_i = max(x1_1, x1_2)
-        y1_i = max(y1_1, y1_2)
-        x2_i = min(x2_1, x2_2)
-        y2_i = min(y2_1, y2_2)
-
-        if x2_i <= x1_i or y2_i <= y1_i:
-            return 0.0
-
-        intersection = (x2_i - x1_i) * (y2_i - y1_i)
-
-        # 计算并集
-        area1 = (x2_1 - x1_1) * (y2_1 - y1_1)
-        area2 = (x2_2 - x1_2) * (y2_2 - y1_2)
-        union = area1 + area2 - intersection
-
-        return intersection / union if union > 0 else 0.0
+        return float(
+            pairwise_iou(boxes_to_array([bbox1]), boxes_to_array([bbox2]))[0, 0]
+        )
 
     def update(self, detections: List[Dict]) -> List[Dict]:
         """
@@ -149,37 +349,18 @@ class MultiObjectTracker:
                     track.state = "lost"
             return []
 
-        # 计算IoU矩阵与中心距离矩阵
+        # 向量化计算IoU矩阵与中心距离矩阵
         track_ids = list(self.tracks.keys())
-        iou_matrix = np.zeros((len(track_ids), len(detections)))
-        dist_matrix = np.zeros((len(track_ids), len(detections)))
-
-        for i, track_id in enumerate(track_ids):
-            track = self.tracks[track_id]
-            predicted_bbox = track.predict()
-
-            for j, detection in enumerate(detections):
-                iou = self.calculate_iou(predicted_bbox, detection["bbox"])
-                iou_matrix[i, j] = iou
-                # 计算中心距离
-                tx, ty = (
-                    (predicted_bbox[0] + predicted_bbox[2]) / 2.0,
-                    (predicted_bbox[1] + predicted_bbox[3]) / 2.0,
-                )
-                db = detection["bbox"]
-                dx, dy = ((db[0] + db[2]) / 2.0, (db[1] + db[3]) / 2.0)
-                dist_matrix[i, j] = np.hypot(tx - dx, ty - dy)
+        det_boxes = boxes_to_array([d["bbox"] for d in detections])
+        pred_boxes = boxes_to_array([self.tracks[tid].predict() for tid in track_ids])
+        iou_matrix = pairwise_iou(pred_boxes, det_boxes)
+        dist_matrix = pairwise_center_distance(pred_boxes, det_boxes)
 
         # 构造融合代价矩阵：cost = iou_weight*(1 - IoU) + (1-iou_weight)*min(1, dist/dist_threshold)
-        # 注意：匈牙利算法求最小代价
-        if len(track_ids) > 0 and len(detections) > 0:
-            norm_dist = np.clip(dist_matrix / max(1e-5, self.dist_threshold), 0.0, 1.0)
-            cost_matrix = (
-                self.iou_weight * (1.0 - iou_matrix)
-                + (1.0 - self.iou_weight) * norm_dist
-            )
-        else:
-            cost_matrix = np.zeros_like(iou_matrix)
+        norm_dist = np.clip(dist_matrix / max(1e-5, self.dist_threshold), 0.0, 1.0)
+        cost_matrix = (
+            self.iou_weight * (1.0 - iou_matrix) + (1.0 - self.iou_weight) * norm_dist
+        )
 
         # 匹配追踪目标和检测结果
         matched_tracks, matched_detections = self._match_tracks_detections(
@@ -192,79 +373,45 @@ class MultiObjectTracker:
             detection = detections[det_idx]
             self.tracks[track_id].update(detection["bbox"], detection["confidence"])
 
-        # 计算未匹配的track集合（索引与ID）
-        unmatched_track_indices = set(range(len(track_ids))) - set(matched_tracks)
-        id_to_index = {tid: idx for idx, tid in enumerate(track_ids)}
-        unmatched_track_ids = {track_ids[idx] for idx in unmatched_track_indices}
-
-        # 尝试“距离复活”：优先复用本帧未匹配的旧track，其次复活非active的track；否则创建新track
-        unmatched_detections = list(
-            set(range(len(detections))) - set(matched_detections)
-        )
+        # 计算未匹配的track集合
+        matched_track_set = set(matched_tracks)
+        unmatched_track_ids = {
+            tid for idx, tid in enumerate(track_ids) if idx not in matched_track_set
+        }
+
+        # 尝试“距离复活”：候选为本帧未匹配的旧track（即便仍标记active）或非active的track；
+        # 否则创建新track
+        matched_det_set = set(matched_detections)
+        unmatched_detections = [
+            j for j in range(len(detections)) if j not in matched_det_set
+        ]
         revived_infos = []  # 收集本帧复活并更新的track信息，纳入输出
-        revived_track_ids = set()
-        for det_idx in unmatched_detections:
-            detection = detections[det_idx]
-            db = detection["bbox"]
-            dx, dy = ((db[0] + db[2]) / 2.0, (db[1] + db[3]) / 2.0)
-            # 查找最近的非active(track.state != 'active')的track
-            best_tid: Optional[int] = None
-            best_dist = float("inf")
-            for tid, tr in self.tracks.items():
-                # 允许候选：1) 本帧未匹配的旧track（即便仍标记active），或 2) 非active/lost的track
-                if not (tid in unmatched_track_ids or tr.state != "active"):
-                    continue
-                if tid in revived_track_ids:
-                    continue
-                tx, ty = tr.get_center()
-                dist = np.hypot(tx - dx, ty - dy)
-                if dist < best_dist:
-                    best_dist = dist
-                    best_tid = tid
+        if unmatched_detections:
+            revival_index = self._build_revival_index(unmatched_track_ids)
+            det_centers = box_centers(det_boxes)
             # 允许强制复活更宽松的距离阈值
             revival_limit = (
                 self.force_revival_dist if self.force_revival else self.dist_threshold
             )
-            if best_tid is not None and best_dist <= revival_limit:
-                # 复活该track并更新
-                tr = self.tracks[best_tid]
-                tr.update(detection["bbox"], detection["confidence"])
-                revived_infos.append(
-                    {
-                        "track_id": tr.track_id,
-                        "bbox": tr.bbox,
-                        "confidence": tr.confidence,
-                        "age": tr.age,
-                        "hits": tr.hits,
-                    }
-                )
-                revived_track_ids.add(best_tid)
-                # 若该track属于本帧未匹配集合，从未匹配集合中移除，避免后续miss递增
-                if best_tid in unmatched_track_ids:
-                    unmatched_track_ids.remove(best_tid)
-                    # 同步移除其索引
-                    idx = id_to_index.get(best_tid)
-                    if idx is not None and idx in unmatched_track_indices:
-                        unmatched_track_indices.remove(idx)
-            else:
-                # 创建新track，尝试回收旧ID
-                if self.recycle_ids and self._recycle_pool:
-                    reuse_id = min(self._recycle_pool)
-                    self._recycle_pool.remove(reuse_id)
-                    new_track = Track(
-                        reuse_id, detection["bbox"], detection["confidence"]
-                    )
-                    self.tracks[reuse_id] = new_track
+            for det_idx in unmatched_detections:
+                detection = detections[det_idx]
+                best_tid = revival_index.nearest(det_centers[det_idx], revival_limit)
+                if best_tid is not None:
+                    # 复活该track并更新
+                    tr = self.tracks[best_tid]
+                    tr.update(detection["bbox"], detection["confidence"])
+                    # 复活意味着常规关联失败后按距离重新认领ID，可能发生了ID切换
+                    info = self._track_info(tr)
+                    info["id_switch"] = True
+                    revived_infos.append(info)
+                    self.id_switches += 1
+                    # 从未匹配集合中移除，避免后续miss递增
+                    unmatched_track_ids.discard(best_tid)
                 else:
-                    new_track = Track(
-                        self.next_id, detection["bbox"], detection["confidence"]
-                    )
-                    self.tracks[self.next_id] = new_track
-                    self.next_id += 1
+                    self._create_track(detection)
 
         # 更新未匹配的追踪目标（标记missed，不纳入本帧输出）
-        for track_idx in unmatched_track_indices:
-            track_id = track_ids[track_idx]
+        for track_id in unmatched_track_ids:
             track = self.tracks[track_id]
             track.time_since_update += 1
             track.age += 1
@@ -275,24 +422,51 @@ class MultiObjectTracker:
         self._cleanup_tracks()
 
         # 仅返回本帧成功匹配并更新的tracks（含“复活”的tracks）
-        current_active = []
-        for track_idx, det_idx in zip(matched_tracks, matched_detections):
-            tid = track_ids[track_idx]
-            t = self.tracks[tid]
-            current_active.append(
-                {
-                    "track_id": t.track_id,
-                    "bbox": t.bbox,
-                    "confidence": t.confidence,
-                    "age": t.age,
-                    "hits": t.hits,
-                }
-            )
+        current_active = [
+            self._track_info(self.tracks[track_ids[track_idx]])
+            for track_idx in matched_tracks
+        ]
         # 合并复活的tracks到输出
         if revived_infos:
             current_active.extend(revived_infos)
         return current_active
 
+    def _build_revival_index(self, unmatched_track_ids: Set[int]) -> RevivalIndex:
+        """为可复活的轨迹（本帧未匹配或非active）建立空间索引"""
+        candidate_ids = [
+            tid
+            for tid, tr in self.tracks.items()
+            if tid in unmatched_track_ids or tr.state != "active"
+        ]
+        centers = (
+            box_centers(boxes_to_array([self.tracks[t].bbox for t in candidate_ids]))
+            if candidate_ids
+            else np.zeros((0, 2), dtype=np.float64)
+        )
+        return RevivalIndex(candidate_ids, centers)
+
+    def _create_track(self, detection: Dict) -> Track:
+        """创建新track，尝试回收旧ID"""
+        if self.recycle_ids and self._recycle_pool:
+            track_id = min(self._recycle_pool)
+            self._recycle_pool.remove(track_id)
+        else:
+            track_id = self.next_id
+            self.next_id += 1
+        new_track = Track(track_id, detection["bbox"], detection["confidence"])
+        self.tracks[track_id] = new_track
+        return new_track
+
+    @staticmethod
+    def _track_info(track: Track) -> Dict:
+        return {
+            "track_id": track.track_id,
+            "bbox": track.bbox,
+            "confidence": track.confidence,
+            "age": track.age,
+            "hits": track.hits,
+        }
+
     def _match_tracks_detections(
         self,
         iou_matrix: np.ndarray,
@@ -301,81 +475,29 @@ class MultiObjectTracker:
         track_ids: List[int],
         detections: List[Dict],
     ) -> Tuple[List[int], List[int]]:
-        """匹配追踪目标和检测结果（支持匈牙利或贪心），并应用IoU与距离门限"""
-        num_t = len(track_ids)
-        num_d = len(detections)
-        if num_t == 0 or num_d == 0:
+        """匹配追踪目标和检测结果（委托给分配策略），并应用IoU与距离门限"""
+        if len(track_ids) == 0 or len(detections) == 0:
             return [], []
 
-        # 使用匈牙利算法最小化代价
-        matched_tracks: List[int] = []
-        matched_detections: List[int] = []
-
-        if self.match_strategy == "hungarian":
-            try:
-                from scipy.optimize import linear_sum_assignment
-
-                row_ind, col_ind = linear_sum_assignment(cost_matrix)
-                for r, c in zip(row_ind, col_ind):
-                    iou = iou_matrix[r, c]
-                    dist = dist_matrix[r, c]
-                    # 放宽门限：IoU 或 距离 其一满足即可
-                    if (iou >= self.iou_threshold) or (dist <= self.dist_threshold):
-                        matched_tracks.append(r)
-                        matched_detections.append(c)
-            except Exception:
-                # 回退到贪心
-                matched_tracks, matched_detections = self._greedy_match(
-                    iou_matrix, dist_matrix
-                )
-        else:
-            matched_tracks, matched_detections = self._greedy_match(
-                iou_matrix, dist_matrix
+        try:
+            return self.assignment.assign(
+                cost_matrix,
+                iou_matrix,
+                dist_matrix,
+                self.iou_threshold,
+                self.dist_threshold,
             )
-
-        return matched_tracks, matched_detections
+        except Exception as e:
+            # 回退到贪心
+            logger.warning(f"分配策略 {self.match_strategy} 执行失败，回退到贪心匹配: {e}")
+            return self._greedy_match(iou_matrix, dist_matrix)
 
     def _greedy_match(
         self, iou_matrix: np.ndarray, dist_matrix: np.ndarray
     ) -> Tuple[List[int], List[int]]:
-        matched_tracks: List[int] = []
-        matched_detections: List[int] = []
-        available_track_indices = list(range(iou_matrix.shape[0]))
-        available_det_indices = list(range(iou_matrix.shape[1]))
-        mat_iou = iou_matrix.copy()
-        mat_dist = dist_matrix.copy()
-        # 第一阶段：按IoU贪心匹配
-        while mat_iou.size:
-            max_iou_idx = np.unravel_index(np.argmax(mat_iou), mat_iou.shape)
-            max_iou = mat_iou[max_iou_idx]
-            if max_iou < self.iou_threshold:
-                break
-            r, c = max_iou_idx
-            matched_tracks.append(available_track_indices[r])
-            matched_detections.append(available_det_indices[c])
-            mat_iou = np.delete(mat_iou, r, axis=0)
-            mat_iou = np.delete(mat_iou, c, axis=1)
-            mat_dist = np.delete(mat_dist, r, axis=0)
-            mat_dist = np.delete(mat_dist, c, axis=1)
-            available_track_indices.pop(r)
-            available_det_indices.pop(c)
-
-        # 第二阶段：对剩余未匹配，按距离最小但在阈值内匹配
-        while mat_dist.size:
-            min_dist_idx = np.unravel_index(np.argmin(mat_dist), mat_dist.shape)
-            min_dist = mat_dist[min_dist_idx]
-            if min_dist > self.dist_threshold:
-                break
-            r, c = min_dist_idx
-            matched_tracks.append(available_track_indices[r])
-            matched_detections.append(available_det_indices[c])
-            mat_dist = np.delete(mat_dist, r, axis=0)
-            mat_dist = np.delete(mat_dist, c, axis=1)
-            mat_iou = np.delete(mat_iou, r, axis=0) if mat_iou.size else mat_iou
-            mat_iou = np.delete(mat_iou, c, axis=1) if mat_iou.size else mat_iou
-            available_track_indices.pop(r)
-            available_det_indices.pop(c)
-        return matched_tracks, matched_detections
+        return GreedyAssignment().assign(
+            None, iou_matrix, dist_matrix, self.iou_threshold, self.dist_threshold
+        )
 
     def _cleanup_tracks(self):
         """清理长时间丢失的追踪目标"""
@@ -416,4 +538,5 @@ class MultiObjectTracker:
         """重置追踪器"""
         self.tracks.clear()
         self.next_id = 1
+        self.id_switches = 0
         logger.info("MultiObjectTracker reset")
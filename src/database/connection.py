@@ -59,11 +59,15 @@ else:
 sync_engine = create_engine(DATABASE_URL, echo=False, connect_args=_sync_connect_args)
 
 # 异步数据库引擎（asyncpg 驱动，使用 ssl=False 而不是 sslmode）
+# ORM 会话单独持有连接，池大小显式配置，与共享 asyncpg 连接池一起计入进程连接预算
 async_engine = create_async_engine(
     ASYNC_DATABASE_URL,
     echo=False,
     pool_pre_ping=True,
     pool_recycle=300,
+    pool_size=int(os.getenv("DB_ORM_POOL_SIZE", "5")),
+    max_overflow=int(os.getenv("DB_ORM_MAX_OVERFLOW", "5")),
+    pool_timeout=float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "30")),
     connect_args=_async_connect_args,
 )
 
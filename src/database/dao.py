@@ -5,9 +5,9 @@
 
 import logging
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import delete, func, select, update
+from sqlalchemy import delete, func, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import (
@@ -68,14 +68,25 @@ class DatasetDAO:
         status: Optional[str] = None,
         limit: int = 100,
         offset: int = 0,
+        after: Optional[Tuple[datetime, str]] = None,
     ) -> List[Dataset]:
-        """获取所有数据集"""
+        """获取所有数据集
+
+        after 为上一页最后一条的 (created_at, id)，提供时按seek条件翻页并忽略offset
+        """
         query = select(Dataset)
 
         if status:
             query = query.where(Dataset.status == status)
+        if after is not None:
+            query = query.where(tuple_(Dataset.created_at, Dataset.id) < tuple_(*after))
+            offset = 0
 
-        query = query.offset(offset).limit(limit).order_by(Dataset.created_at.desc())
+        query = (
+            query.order_by(Dataset.created_at.desc(), Dataset.id.desc())
+            .offset(offset)
+            .limit(limit)
+        )
 
         result = await session.execute(query)
         return result.scalars().all()
@@ -270,6 +281,35 @@ class WorkflowDAO:
 
         return workflow
 
+    @staticmethod
+    async def claim_next_run(
+        session: AsyncSession,
+        workflow_id: str,
+        expected_next_run: Optional[datetime],
+        new_next_run: datetime,
+    ) -> bool:
+        """
+        以比较并交换方式推进下一次调度时间
+
+        只有当数据库中的 next_run 仍等于 expected_next_run 时才会更新，
+        多个进程同时调度同一工作流时只有一个能够成功，从而避免重复触发。
+
+        Returns:
+            是否抢占成功
+        """
+        condition = (
+            Workflow.next_run.is_(None)
+            if expected_next_run is None
+            else Workflow.next_run == expected_next_run
+        )
+        result = await session.execute(
+            update(Workflow)
+            .where(Workflow.id == workflow_id, condition)
+            .values(next_run=new_next_run)
+        )
+        await session.commit()
+        return result.rowcount == 1
+
     @staticmethod
     async def delete(session: AsyncSession, workflow_id: str) -> bool:
         """删除工作流"""
@@ -478,13 +518,20 @@ class ModelRegistryDAO:
         status: Optional[str] = None,
         limit: int = 100,
         offset: int = 0,
+        after: Optional[Tuple[datetime, str]] = None,
     ) -> List[ModelRegistry]:
         query = select(ModelRegistry)
         if model_type:
             query = query.where(ModelRegistry.model_type == model_type)
         if status:
             query = query.where(ModelRegistry.status == status)
-        query = query.order_by(ModelRegistry.created_at.desc())
+        if after is not None:
+            # 按 (created_at, id) seek 翻页，避免深分页扫描
+            query = query.where(
+                tuple_(ModelRegistry.created_at, ModelRegistry.id) < tuple_(*after)
+            )
+            offset = 0
+        query = query.order_by(ModelRegistry.created_at.desc(), ModelRegistry.id.desc())
         query = query.offset(offset).limit(limit)
         result = await session.execute(query)
         return result.scalars().all()
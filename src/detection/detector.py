@@ -11,6 +11,7 @@ from ultralytics import YOLO
 
 # 导入统一参数配置
 from src.config.unified_params import get_unified_params
+from src.detection.inference_backend import is_exported_model, resolve_inference_model
 
 logger = logging.getLogger(__name__)
 
@@ -146,6 +147,9 @@ class HumanDetector(BaseDetector):
         else:
             logger.info("TensorRT自动转换已禁用，使用PyTorch模型")
 
+        # CPU设备上按配置切换到ONNX Runtime / OpenVINO后端
+        model_path = resolve_inference_model(model_path, device, task="detect")
+
         super().__init__(model_path, device)
 
         # 使用统一参数配置
@@ -308,11 +312,11 @@ class HumanDetector(BaseDetector):
         try:
             model = YOLO(model_path)
 
-            # TensorRT 引擎文件（.engine）不支持 .to() 方法
-            # 而且 TensorRT 引擎已经针对特定设备优化，不需要移动设备
+            # TensorRT/ONNX/OpenVINO 导出模型不支持 .to() 方法
+            # 而且导出模型已经针对特定设备优化，不需要移动设备
             # 只有 PyTorch 模型（.pt）才需要调用 .to() 方法
-            if model_path.endswith(".engine"):
-                logger.info(f"成功加载TensorRT引擎: {model_path}")
+            if is_exported_model(model_path):
+                logger.info(f"成功加载导出模型: {model_path}")
             else:
                 # 在测试环境中使用的 DummyYOLO 可能不实现 .to 方法，这里做兼容处理
                 if hasattr(model, "to"):
@@ -349,55 +353,8 @@ class HumanDetector(BaseDetector):
                 image, conf=self.confidence_threshold, iou=self.iou_threshold
             )
             detections = []
-            total_boxes = 0
-            filtered_boxes = 0
-
             for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    total_boxes += len(boxes)
-                    logger.info(f"YOLO原始检测到 {len(boxes)} 个目标")
-
-                    for box in boxes:
-                        # 只检测人体 (class_id = 0)
-                        if int(box.cls[0]) == 0:
-                            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                            confidence = float(box.conf[0].cpu().numpy())
-
-                            # 计算检测框属性
-                            width = x2 - x1
-                            height = y2 - y1
-                            area = width * height
-                            aspect_ratio = max(width, height) / min(width, height)
-
-                            logger.debug(
-                                f"检测框: ({x1:.1f}, {y1:.1f}, {x2:.1f}, {y2:.1f}), 置信度: {confidence:.3f}, 面积: {area:.1f}, 宽高比: {aspect_ratio:.2f}"
-                            )
-
-                            # 应用后处理过滤
-                            if (
-                                area >= self.min_box_area
-                                and aspect_ratio <= self.max_box_ratio
-                                and width > self.min_width
-                                and height > self.min_height
-                            ):  # 使用配置的最小尺寸要求
-                                detection = {
-                                    "bbox": [int(x1), int(y1), int(x2), int(y2)],
-                                    "confidence": confidence,
-                                    "class_id": 0,
-                                    "class_name": "person",
-                                }
-                                detections.append(detection)
-                                logger.debug(f"检测框通过过滤: {detection}")
-                            else:
-                                filtered_boxes += 1
-                                logger.debug(
-                                    f"检测框被过滤: 面积={area:.1f} (最小={self.min_box_area}), 宽高比={aspect_ratio:.2f} (最大={self.max_box_ratio}), 尺寸={width:.1f}x{height:.1f}"
-                                )
-
-            logger.info(
-                f"YOLO检测完成: 原始检测框={total_boxes}, 过滤后={len(detections)}, 被过滤={filtered_boxes}"
-            )
+                detections.extend(self._parse_person_boxes(result))
             return detections
 
         except Exception as e:
@@ -405,9 +362,61 @@ class HumanDetector(BaseDetector):
             logger.error(error_msg, exc_info=True)
             raise RuntimeError(error_msg) from e
 
+    def _parse_person_boxes(self, result) -> List[Dict]:
+        """从单张图像的YOLO结果中提取并过滤人体检测框"""
+        detections = []
+        total_boxes = 0
+        filtered_boxes = 0
+        boxes = result.boxes
+        if boxes is not None:
+            total_boxes += len(boxes)
+            logger.info(f"YOLO原始检测到 {len(boxes)} 个目标")
+
+            for box in boxes:
+                # 只检测人体 (class_id = 0)
+                if int(box.cls[0]) == 0:
+                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+                    confidence = float(box.conf[0].cpu().numpy())
+
+                    # 计算检测框属性
+                    width = x2 - x1
+                    height = y2 - y1
+                    area = width * height
+                    aspect_ratio = max(width, height) / min(width, height)
+
+                    logger.debug(
+                        f"检测框: ({x1:.1f}, {y1:.1f}, {x2:.1f}, {y2:.1f}), 置信度: {confidence:.3f}, 面积: {area:.1f}, 宽高比: {aspect_ratio:.2f}"
+                    )
+
+                    # 应用后处理过滤
+                    if (
+                        area >= self.min_box_area
+                        and aspect_ratio <= self.max_box_ratio
+                        and width > self.min_width
+                        and height > self.min_height
+                    ):  # 使用配置的最小尺寸要求
+                        detection = {
+                            "bbox": [int(x1), int(y1), int(x2), int(y2)],
+                            "confidence": confidence,
+                            "class_id": 0,
+                            "class_name": "person",
+                        }
+                        detections.append(detection)
+                        logger.debug(f"检测框通过过滤: {detection}")
+                    else:
+                        filtered_boxes += 1
+                        logger.debug(
+                            f"检测框被过滤: 面积={area:.1f} (最小={self.min_box_area}), 宽高比={aspect_ratio:.2f} (最大={self.max_box_ratio}), 尺寸={width:.1f}x{height:.1f}"
+                        )
+
+        logger.info(
+            f"YOLO检测完成: 原始检测框={total_boxes}, 过滤后={len(detections)}, 被过滤={filtered_boxes}"
+        )
+        return detections
+
     def detect_batch(self, images: List[np.ndarray]) -> List[List[Dict]]:
         """
-        批量检测多张图像
+        批量检测多张图像（一次模型前向处理整批图像）
 
         Args:
             images: 图像列表
@@ -415,11 +424,24 @@ class HumanDetector(BaseDetector):
         Returns:
             每张图像的检测结果列表
         """
-        results = []
-        for image in images:
-            detections = self.detect(image)
-            results.append(detections)
-        return results
+        if not images:
+            return []
+        if len(images) == 1:
+            return [self.detect(images[0])]
+        if self.model is None:
+            error_msg = "YOLO模型未正确加载，无法进行人体检测"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+
+        try:
+            results = self.model(
+                list(images), conf=self.confidence_threshold, iou=self.iou_threshold
+            )
+            return [self._parse_person_boxes(result) for result in results]
+        except Exception as e:
+            error_msg = f"YOLO批量检测过程中发生错误: {str(e)}"
+            logger.error(error_msg, exc_info=True)
+            raise RuntimeError(error_msg) from e
 
     def set_confidence_threshold(self, threshold: float):
         """设置置信度阈值"""
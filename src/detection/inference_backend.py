@@ -0,0 +1,620 @@
+"""
+CPU推理后端选择
+
+将YOLO PyTorch模型导出为 ONNX Runtime / OpenVINO 格式（可选INT8静态量化，
+使用现场采集的帧做校准），按模型哈希缓存导出结果，并在启动时以PyTorch
+为基准对比精度与延迟，为每个模型自动选择最快且精度达标的后端。
+
+导出后的模型仍通过 ``ultralytics.YOLO`` 加载，检测器的结果解析逻辑不变。
+"""
+
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import platform
+import shutil
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKEND_AUTO = "auto"
+BACKEND_PYTORCH = "pytorch"
+BACKEND_ONNX = "onnx"
+BACKEND_OPENVINO = "openvino"
+SUPPORTED_BACKENDS = (BACKEND_PYTORCH, BACKEND_ONNX, BACKEND_OPENVINO)
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp"}
+SELECTION_FILE = "selection.json"
+
+ModelLoader = Callable[[str, str], Any]
+
+
+@dataclass
+class BackendSettings:
+    """推理后端配置（默认从环境变量读取）"""
+
+    backend: str = BACKEND_AUTO
+    int8: bool = False
+    imgsz: int = 640
+    cache_dir: str = "output/models/compiled"
+    calibration_dir: Optional[str] = None
+    max_frames: int = 64
+    min_agreement: float = 0.9
+    benchmark_runs: int = 10
+
+    @classmethod
+    def from_env(cls) -> "BackendSettings":
+        return cls(
+            backend=os.getenv("INFERENCE_BACKEND", BACKEND_AUTO).strip().lower(),
+            int8=os.getenv("INFERENCE_INT8", "false").strip().lower()
+            in ("true", "1", "yes"),
+            imgsz=int(os.getenv("INFERENCE_IMGSZ", "640")),
+            cache_dir=os.getenv("INFERENCE_CACHE_DIR", "output/models/compiled"),
+            calibration_dir=os.getenv("INFERENCE_CALIBRATION_DIR") or None,
+            max_frames=int(os.getenv("INFERENCE_MAX_FRAMES", "64")),
+            min_agreement=float(os.getenv("INFERENCE_MIN_AGREEMENT", "0.9")),
+            benchmark_runs=int(os.getenv("INFERENCE_BENCHMARK_RUNS", "10")),
+        )
+
+
+@dataclass
+class BackendSelection:
+    """后端选择结果"""
+
+    backend: str
+    model_path: str
+    int8: bool = False
+    latency_ms: Optional[float] = None
+    agreement: Optional[float] = None
+    candidates: List[Dict[str, Any]] = field(default_factory=list)
+    selected_at: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BackendSelection":
+        return cls(**{k: v for k, v in data.items() if k in cls.__dataclass_fields__})
+
+
+def available_backends() -> List[str]:
+    """返回当前环境可用的推理后端"""
+    backends = [BACKEND_PYTORCH]
+    if importlib.util.find_spec("onnxruntime") is not None:
+        backends.append(BACKEND_ONNX)
+    if importlib.util.find_spec("openvino") is not None:
+        backends.append(BACKEND_OPENVINO)
+    return backends
+
+
+def is_exported_model(model_path: str) -> bool:
+    """是否为导出后的模型（不支持 .to(device)）"""
+    path = str(model_path)
+    return path.endswith((".onnx", ".engine")) or "_openvino_model" in path
+
+
+_hash_memo: Dict[Tuple[str, float, int], str] = {}
+
+
+def file_sha256(path: str) -> str:
+    """计算模型文件的SHA256（按路径、修改时间和大小缓存）"""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_mtime, stat.st_size)
+    if memo_key not in _hash_memo:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        _hash_memo[memo_key] = digest.hexdigest()
+    return _hash_memo[memo_key]
+
+
+def model_cache_dir(model_path: str, cache_dir: str) -> Path:
+    """模型在缓存中的根目录（按内容哈希区分，模型更新后自动失效）"""
+    stem = Path(model_path).stem
+    return Path(cache_dir) / f"{stem}-{file_sha256(model_path)[:16]}"
+
+
+def artifact_dir(model_path: str, backend: str, int8: bool, imgsz: int, cache_dir: str):
+    variant = f"{backend}{'-int8' if int8 else ''}-{imgsz}"
+    return model_cache_dir(model_path, cache_dir) / variant
+
+
+def find_artifact(directory: Path, backend: str, stem: str) -> Optional[Path]:
+    """在缓存目录中查找已导出的模型"""
+    if backend == BACKEND_ONNX:
+        candidate = directory / f"{stem}.onnx"
+        return candidate if candidate.is_file() else None
+    if backend == BACKEND_OPENVINO:
+        candidate = directory / f"{stem}_openvino_model"
+        if candidate.is_dir() and any(candidate.glob("*.xml")):
+            return candidate
+    return None
+
+
+def load_frames(directory: Optional[str], limit: int = 64) -> List[np.ndarray]:
+    """读取校准/验证帧（按文件名排序，均匀抽样至 limit 张）"""
+    if not directory or not Path(directory).is_dir():
+        return []
+    files = sorted(
+        p for p in Path(directory).rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES
+    )
+    if len(files) > limit > 0:
+        step = len(files) / limit
+        files = [files[int(i * step)] for i in range(limit)]
+
+    frames = []
+    for file in files:
+        image = cv2.imread(str(file))
+        if image is not None:
+            frames.append(image)
+    return frames
+
+
+def split_frames(
+    frames: Sequence[np.ndarray],
+) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    """拆分为校准集与留出验证集（交替分配，保证两者覆盖相同时间段）"""
+    if len(frames) < 2:
+        return list(frames), list(frames)
+    return list(frames[0::2]), list(frames[1::2])
+
+
+def letterbox(image: np.ndarray, imgsz: int) -> np.ndarray:
+    """与YOLO一致的等比缩放+灰边填充，返回 NCHW float32 输入张量"""
+    h, w = image.shape[:2]
+    scale = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top = (imgsz - new_h) // 2
+    left = (imgsz - new_w) // 2
+    canvas[top : top + new_h, left : left + new_w] = resized
+
+    tensor = canvas[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+    return np.ascontiguousarray(tensor[None])
+
+
+def quantize_onnx_int8(
+    src: Path, dst: Path, calibration_frames: Sequence[np.ndarray], imgsz: int
+) -> None:
+    """使用ONNX Runtime对ONNX模型做INT8静态量化（QDQ格式，逐通道权重）"""
+    import onnx
+    import onnxruntime
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        QuantType,
+        quantize_static,
+    )
+
+    session = onnxruntime.InferenceSession(str(src), providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+    del session
+
+    class FrameCalibrationReader(CalibrationDataReader):
+        def __init__(self):
+            self._inputs = iter(
+                {input_name: letterbox(frame, imgsz)} for frame in calibration_frames
+            )
+
+        def get_next(self):
+            return next(self._inputs, None)
+
+    quantize_static(
+        str(src),
+        str(dst),
+        FrameCalibrationReader(),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+    )
+
+    # 保留ultralytics写入的元数据（类别名、任务类型、输入尺寸）
+    quantized = onnx.load(str(dst))
+    if not quantized.metadata_props:
+        quantized.metadata_props.extend(onnx.load(str(src)).metadata_props)
+        onnx.save(quantized, str(dst))
+
+
+def _write_calibration_dataset(
+    root: Path, frames: Sequence[np.ndarray], names: Dict[int, str]
+) -> Path:
+    """将校准帧写成ultralytics数据集格式（OpenVINO/NNCF量化需要）"""
+    images = root / "images"
+    images.mkdir(parents=True, exist_ok=True)
+    for i, frame in enumerate(frames):
+        cv2.imwrite(str(images / f"calib_{i:05d}.jpg"), frame)
+
+    data_yaml = root / "calibration.yaml"
+    lines = [f"path: {root}", "train: images", "val: images", "names:"]
+    lines += [f"  {k}: {v}" for k, v in sorted(names.items())]
+    data_yaml.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return data_yaml
+
+
+def export_model(
+    model_path: str,
+    backend: str,
+    target_dir: Path,
+    imgsz: int = 640,
+    int8: bool = False,
+    calibration_frames: Sequence[np.ndarray] = (),
+) -> Path:
+    """
+    导出模型到 target_dir（先写入临时目录，完成后整体替换，避免半成品被加载）
+
+    Returns:
+        导出后的模型路径（.onnx 文件或 *_openvino_model 目录）
+    """
+    from ultralytics import YOLO
+
+    stem = Path(model_path).stem
+    target_dir.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(
+        tempfile.mkdtemp(prefix=f".{target_dir.name}-", dir=target_dir.parent)
+    )
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmp_model = Path(tmpdir) / Path(model_path).name
+            shutil.copy2(model_path, tmp_model)
+            model = YOLO(str(tmp_model))
+
+            if backend == BACKEND_ONNX:
+                exported = Path(
+                    model.export(
+                        format="onnx",
+                        imgsz=imgsz,
+                        dynamic=False,
+                        simplify=True,
+                        verbose=False,
+                    )
+                )
+                if int8:
+                    quantize_onnx_int8(
+                        exported, staging / f"{stem}.onnx", calibration_frames, imgsz
+                    )
+                else:
+                    shutil.move(str(exported), str(staging / f"{stem}.onnx"))
+            elif backend == BACKEND_OPENVINO:
+                export_kwargs: Dict[str, Any] = {"format": "openvino", "imgsz": imgsz}
+                if int8:
+                    export_kwargs["int8"] = True
+                    export_kwargs["data"] = str(
+                        _write_calibration_dataset(
+                            Path(tmpdir) / "calibration",
+                            calibration_frames,
+                            dict(model.names),
+                        )
+                    )
+                exported = Path(model.export(verbose=False, **export_kwargs))
+                shutil.move(str(exported), str(staging / f"{stem}_openvino_model"))
+            else:
+                raise ValueError(f"不支持导出的推理后端: {backend}")
+
+        if target_dir.exists():
+            shutil.rmtree(target_dir)
+        os.replace(staging, target_dir)
+    finally:
+        if staging.exists():
+            shutil.rmtree(staging, ignore_errors=True)
+
+    artifact = find_artifact(target_dir, backend, stem)
+    if artifact is None:
+        raise FileNotFoundError(f"导出完成但未找到模型文件: {target_dir}")
+    return artifact
+
+
+def ensure_artifact(
+    model_path: str,
+    backend: str,
+    settings: BackendSettings,
+    calibration_frames: Sequence[np.ndarray] = (),
+) -> Optional[str]:
+    """返回已缓存的导出模型，不存在时导出；失败返回 None"""
+    int8 = settings.int8
+    if int8 and not calibration_frames:
+        logger.warning(f"未提供校准帧，{backend} 后端回退为FP32导出: {model_path}")
+        int8 = False
+
+    target_dir = artifact_dir(
+        model_path, backend, int8, settings.imgsz, settings.cache_dir
+    )
+    cached = find_artifact(target_dir, backend, Path(model_path).stem)
+    if cached is not None:
+        logger.info(f"✅ 使用缓存的{backend}模型: {cached}")
+        return str(cached)
+
+    try:
+        start = time.perf_counter()
+        logger.info(f"🔄 导出{backend}模型{'（INT8）' if int8 else ''}: {model_path}")
+        artifact = export_model(
+            model_path, backend, target_dir, settings.imgsz, int8, calibration_frames
+        )
+        logger.info(
+            f"✅ {backend}模型导出完成: {artifact} ({time.perf_counter() - start:.1f}s)"
+        )
+        return str(artifact)
+    except Exception as e:
+        logger.error(f"{backend}模型导出失败: {e}")
+        return None
+
+
+def _to_numpy(value: Any) -> np.ndarray:
+    if hasattr(value, "cpu"):
+        value = value.cpu()
+    if hasattr(value, "numpy"):
+        value = value.numpy()
+    return np.asarray(value)
+
+
+def run_detections(model: Any, frame: np.ndarray) -> Dict[str, np.ndarray]:
+    """执行一次推理，返回 boxes/classes/scores 数组"""
+    results = model(frame, verbose=False)
+    boxes = results[0].boxes if results else None
+    if boxes is None or len(boxes) == 0:
+        return {
+            "boxes": np.zeros((0, 4), dtype=np.float64),
+            "classes": np.zeros(0, dtype=np.int64),
+            "scores": np.zeros(0, dtype=np.float64),
+        }
+    return {
+        "boxes": _to_numpy(boxes.xyxy).astype(np.float64).reshape(-1, 4),
+        "classes": _to_numpy(boxes.cls).astype(np.int64).reshape(-1),
+        "scores": _to_numpy(boxes.conf).astype(np.float64).reshape(-1),
+    }
+
+
+def detection_agreement(
+    baseline: Sequence[Dict[str, np.ndarray]],
+    candidate: Sequence[Dict[str, np.ndarray]],
+    iou_threshold: float = 0.5,
+) -> float:
+    """
+    计算候选后端与基准后端检测结果的一致性（逐帧F1的平均值）
+
+    同类别且IoU不低于阈值的框按IoU从高到低贪心配对。两者均无检测的帧计为1。
+    """
+    from src.core.tracker import pairwise_iou
+
+    if not baseline:
+        return 1.0
+
+    scores = []
+    for ref, out in zip(baseline, candidate):
+        n_ref, n_out = len(ref["boxes"]), len(out["boxes"])
+        if n_ref == 0 and n_out == 0:
+            scores.append(1.0)
+            continue
+        if n_ref == 0 or n_out == 0:
+            scores.append(0.0)
+            continue
+
+        iou = pairwise_iou(ref["boxes"], out["boxes"])
+        iou[ref["classes"][:, None] != out["classes"][None, :]] = 0.0
+        order = np.argsort(-iou, axis=None, kind="stable")
+        used_ref, used_out = set(), set()
+        matched = 0
+        for flat in order:
+            r, c = divmod(int(flat), n_out)
+            if iou[r, c] < iou_threshold:
+                break
+            if r in used_ref or c in used_out:
+                continue
+            used_ref.add(r)
+            used_out.add(c)
+            matched += 1
+        scores.append(2.0 * matched / (n_ref + n_out))
+
+    return float(np.mean(scores))
+
+
+def benchmark_latency(model: Any, frames: Sequence[np.ndarray], runs: int) -> float:
+    """测量单帧推理延迟中位数（毫秒），先预热一帧"""
+    if not frames:
+        return float("inf")
+    model(frames[0], verbose=False)
+    timings = []
+    for i in range(max(1, runs)):
+        frame = frames[i % len(frames)]
+        start = time.perf_counter()
+        model(frame, verbose=False)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return float(np.median(timings))
+
+
+def _default_loader(model_path: str, task: str) -> Any:
+    from ultralytics import YOLO
+
+    return YOLO(model_path, task=task)
+
+
+def _selection_key(model_path: str, settings: BackendSettings) -> Dict[str, Any]:
+    return {
+        "model_sha256": file_sha256(model_path),
+        "int8": settings.int8,
+        "imgsz": settings.imgsz,
+        "candidates": available_backends(),
+        "min_agreement": settings.min_agreement,
+        "host": f"{platform.machine()}-{platform.processor()}-{os.cpu_count()}",
+    }
+
+
+def _load_cached_selection(
+    path: Path, key: Dict[str, Any]
+) -> Optional[BackendSelection]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if data.get("key") != key:
+        return None
+    selection = BackendSelection.from_dict(data.get("selection", {}))
+    if selection.backend != BACKEND_PYTORCH and not Path(selection.model_path).exists():
+        return None
+    return selection
+
+
+def select_backend(  # noqa: C901
+    model_path: str,
+    task: str = "detect",
+    settings: Optional[BackendSettings] = None,
+    frames: Optional[Sequence[np.ndarray]] = None,
+    loader: ModelLoader = _default_loader,
+) -> BackendSelection:
+    """
+    为模型选择最快且精度达标的推理后端
+
+    以PyTorch结果为基准，在留出帧上比较各候选后端的检测一致性，低于
+    ``min_agreement`` 的后端被淘汰，其余按延迟中位数择优。选择结果按
+    模型哈希与主机信息缓存，后续启动直接复用。
+    """
+    settings = settings or BackendSettings.from_env()
+    pytorch_selection = BackendSelection(BACKEND_PYTORCH, model_path)
+
+    selection_file = model_cache_dir(model_path, settings.cache_dir) / SELECTION_FILE
+    key = _selection_key(model_path, settings)
+    cached = _load_cached_selection(selection_file, key)
+    if cached is not None:
+        logger.info(f"✅ 使用缓存的推理后端选择: {cached.backend} -> {cached.model_path}")
+        return cached
+
+    candidates = [b for b in key["candidates"] if b != BACKEND_PYTORCH]
+    if not candidates:
+        logger.info("未安装ONNX Runtime/OpenVINO，使用PyTorch推理")
+        return pytorch_selection
+
+    if frames is None:
+        frames = load_frames(settings.calibration_dir, settings.max_frames)
+    if not frames:
+        logger.info("未配置验证帧（INFERENCE_CALIBRATION_DIR），无法校验精度，使用PyTorch推理")
+        return pytorch_selection
+    calibration, holdout = split_frames(frames)
+
+    baseline_model = loader(model_path, task)
+    baseline = [run_detections(baseline_model, f) for f in holdout]
+    best = BackendSelection(
+        BACKEND_PYTORCH,
+        model_path,
+        latency_ms=benchmark_latency(baseline_model, holdout, settings.benchmark_runs),
+        agreement=1.0,
+    )
+    del baseline_model
+    report = [
+        {"backend": BACKEND_PYTORCH, "latency_ms": best.latency_ms, "agreement": 1.0}
+    ]
+
+    for backend in candidates:
+        artifact = ensure_artifact(model_path, backend, settings, calibration)
+        if artifact is None:
+            continue
+        try:
+            model = loader(artifact, task)
+            outputs = [run_detections(model, f) for f in holdout]
+            agreement = detection_agreement(baseline, outputs)
+            latency = benchmark_latency(model, holdout, settings.benchmark_runs)
+        except Exception as e:
+            logger.error(f"{backend}后端评估失败: {e}")
+            continue
+
+        accepted = agreement >= settings.min_agreement
+        report.append(
+            {
+                "backend": backend,
+                "model_path": artifact,
+                "latency_ms": latency,
+                "agreement": agreement,
+                "accepted": accepted,
+            }
+        )
+        logger.info(
+            f"后端评估 {backend}: 延迟={latency:.1f}ms, 一致性={agreement:.3f}"
+            f"{'' if accepted else '（低于阈值，淘汰）'}"
+        )
+        if accepted and latency < best.latency_ms:
+            best = BackendSelection(
+                backend,
+                artifact,
+                int8="-int8-" in Path(artifact).parent.name,
+                latency_ms=latency,
+                agreement=agreement,
+            )
+
+    best.candidates = report
+    try:
+        selection_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = selection_file.with_suffix(".tmp")
+        tmp_file.write_text(
+            json.dumps(
+                {"key": key, "selection": best.to_dict()}, ensure_ascii=False, indent=2
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp_file, selection_file)
+    except OSError as e:
+        logger.warning(f"保存推理后端选择结果失败: {e}")
+
+    logger.info(
+        f"✅ 推理后端选择: {best.backend} ({best.latency_ms:.1f}ms) -> {best.model_path}"
+    )
+    return best
+
+
+def resolve_inference_model(
+    model_path: str,
+    device: str,
+    task: str = "detect",
+    settings: Optional[BackendSettings] = None,
+) -> str:
+    """
+    根据配置返回实际加载的模型路径
+
+    仅在CPU设备上对 .pt 模型生效；任何异常都回退到原始PyTorch模型。
+
+    Args:
+        model_path: 原始 .pt 模型路径
+        device: 计算设备
+        task: YOLO任务类型（detect/pose）
+        settings: 后端配置，默认从环境变量读取
+
+    Returns:
+        模型路径（.pt、.onnx 或 *_openvino_model 目录）
+    """
+    settings = settings or BackendSettings.from_env()
+    if settings.backend == BACKEND_PYTORCH or device != "cpu":
+        return model_path
+    if not str(model_path).endswith(".pt") or not Path(model_path).is_file():
+        return model_path
+
+    try:
+        if settings.backend == BACKEND_AUTO:
+            return select_backend(model_path, task, settings).model_path
+
+        if settings.backend not in SUPPORTED_BACKENDS:
+            logger.warning(f"未知的推理后端: {settings.backend}，使用PyTorch模型")
+            return model_path
+        if settings.backend not in available_backends():
+            logger.warning(f"推理后端 {settings.backend} 不可用，使用PyTorch模型")
+            return model_path
+
+        calibration: List[np.ndarray] = []
+        if settings.int8:
+            frames = load_frames(settings.calibration_dir, settings.max_frames)
+            calibration, _ = split_frames(frames)
+        artifact = ensure_artifact(model_path, settings.backend, settings, calibration)
+        return artifact or model_path
+    except Exception as e:
+        logger.error(f"推理后端解析失败: {e}，回退到PyTorch模型")
+        return model_path
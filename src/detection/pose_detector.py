@@ -5,7 +5,7 @@
 """
 import logging
 import os
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import cv2
 import numpy as np
@@ -108,6 +108,8 @@ from ..config.unified_params import get_unified_params
 from ..utils.logger import get_logger
 from .detector import BaseDetector
 from .enhanced_hand_detector import DetectionMode, EnhancedHandDetector
+from .inference_backend import is_exported_model, resolve_inference_model
+from .roi_packer import RoiPacker
 
 logger = get_logger(__name__)
 
@@ -160,12 +162,18 @@ class YOLOv8PoseDetector(BaseDetector):
         self.params = get_unified_params().pose_detection
         model_path = model_path if model_path is not None else self.params.model_path
         device = device if device != "auto" else self.params.device
+        model_path = resolve_inference_model(
+            model_path, self._get_device(device), task="pose"
+        )
 
         super().__init__(model_path, device)
 
         self.confidence_threshold = self.params.confidence_threshold
         self.iou_threshold = self.params.iou_threshold
 
+        # 多人ROI拼图批量推理
+        self.roi_packer = RoiPacker()
+
         logger.info(
             f"YOLOv8PoseDetector initialized on {self.device} with params: "
             f"conf={self.confidence_threshold}, iou={self.iou_threshold}"
@@ -175,7 +183,7 @@ class YOLOv8PoseDetector(BaseDetector):
         """加载YOLO模型"""
         try:
             model = YOLO(model_path)
-            if hasattr(model, "to"):
+            if hasattr(model, "to") and not is_exported_model(model_path):
                 model.to(self.device)
             logger.info(f"成功加载YOLOv8姿态模型: {model_path} 到设备: {self.device}")
             return model
@@ -252,6 +260,7 @@ class YOLOv8PoseDetector(BaseDetector):
         image: np.ndarray,
         person_bboxes: List[List[float]],
         use_batch: bool = True,  # 任务3.3：是否使用批量检测
+        enhance_low_quality: bool = False,
     ) -> List[Dict[str, Any]]:
         """
         在指定的人体ROI区域进行姿态检测（任务3.2：ROI优化 + 任务3.3：批量优化）
@@ -260,9 +269,10 @@ class YOLOv8PoseDetector(BaseDetector):
             image: 完整图像
             person_bboxes: 人体边界框列表 [x1, y1, x2, y2]
             use_batch: 是否使用批量检测（任务3.3）
+            enhance_low_quality: 是否对低质量ROI执行CLAHE增强（仅批量拼图路径）
 
         Returns:
-            检测结果列表，每个结果包含关键点信息
+            检测结果列表，每个结果包含关键点信息及所属ROI的 roi_index
         """
         if self.model is None:
             raise RuntimeError("YOLOv8姿态模型未正确加载，无法进行检测")
@@ -272,14 +282,16 @@ class YOLOv8PoseDetector(BaseDetector):
 
         # 任务3.3：如果启用批量检测且有多个人，使用批量检测
         if use_batch and len(person_bboxes) > 1:
-            return self._batch_detect_pose_in_rois(image, person_bboxes)
+            return self._batch_detect_pose_in_rois(
+                image, person_bboxes, enhance_low_quality=enhance_low_quality
+            )
 
         # 否则使用逐个检测（原有逻辑）
         try:
             all_detections = []
 
             # 对每个人体ROI进行检测
-            for person_bbox in person_bboxes:
+            for roi_index, person_bbox in enumerate(person_bboxes):
                 x1, y1, x2, y2 = map(int, person_bbox)
 
                 # 确保ROI有效
@@ -354,6 +366,7 @@ class YOLOv8PoseDetector(BaseDetector):
                             },
                             "class_id": 0,
                             "class_name": "person",
+                            "roi_index": roi_index,
                         }
                         all_detections.append(detection)
 
@@ -366,65 +379,95 @@ class YOLOv8PoseDetector(BaseDetector):
             logger.error(f"ROI姿态检测过程中发生错误: {e}", exc_info=True)
             return []
 
+    @staticmethod
+    def _roi_crop_box(
+        image: np.ndarray, person_bbox: List[float]
+    ) -> Optional[Tuple[int, int, int, int]]:
+        """人体框外扩10%（按宽度）并裁剪到图像范围"""
+        x1, y1, x2, y2 = map(int, person_bbox)
+        if x2 <= x1 or y2 <= y1:
+            return None
+        padding = int((x2 - x1) * 0.1)
+        box = (
+            max(0, x1 - padding),
+            max(0, y1 - padding),
+            min(image.shape[1], x2 + padding),
+            min(image.shape[0], y2 + padding),
+        )
+        if box[2] <= box[0] or box[3] <= box[1]:
+            return None
+        return box
+
+    @staticmethod
+    def _parse_pose_result(result) -> List[Dict[str, Any]]:
+        """解析单张输入图的YOLO姿态结果（坐标为该输入图坐标系）"""
+        detections = []
+        if result.boxes is None or result.keypoints is None:
+            return detections
+
+        for box, keypoints in zip(result.boxes, result.keypoints):
+            # 只处理 'person' 类别
+            if box.cls[0].item() != 0:
+                continue
+
+            kpts_xy = keypoints.xy[0].cpu().numpy()
+            kpts_conf = (
+                keypoints.conf[0].cpu().numpy()
+                if keypoints.conf is not None
+                else np.ones(len(kpts_xy))
+            )
+            detections.append(
+                {
+                    "bbox": box.xyxy[0].cpu().numpy().astype(float).tolist(),
+                    "confidence": box.conf[0].item(),
+                    "keypoints": {"xy": kpts_xy, "conf": kpts_conf},
+                    "class_id": 0,
+                    "class_name": "person",
+                }
+            )
+        return detections
+
     def _batch_detect_pose_in_rois(
         self,
         image: np.ndarray,
         person_bboxes: List[List[float]],
+        enhance_low_quality: bool = False,
     ) -> List[Dict[str, Any]]:
         """
         批量检测多个人体ROI的姿态（任务3.3：批量ROI检测优化）
 
+        所有人体ROI按letterbox拼接到固定尺寸画布（见 RoiPacker），
+        一张画布只需一次推理，结果再映射回整帧坐标。
+
         Args:
             image: 完整图像
             person_bboxes: 人体边界框列表 [x1, y1, x2, y2]
+            enhance_low_quality: 是否对低质量ROI执行CLAHE增强
 
         Returns:
-            检测结果列表，每个结果包含关键点信息
+            检测结果列表，每个结果包含关键点信息及所属ROI的 roi_index
         """
         if self.model is None:
             raise RuntimeError("YOLOv8姿态模型未正确加载，无法进行检测")
 
         try:
-            # 步骤1：收集所有人体ROI
-            person_rois = []
-            roi_info = []  # 保存ROI的元信息（用于坐标映射）
-
+            crop_boxes = []
             for person_bbox in person_bboxes:
-                x1, y1, x2, y2 = map(int, person_bbox)
-
-                # 确保ROI有效
-                if x2 <= x1 or y2 <= y1:
+                box = self._roi_crop_box(image, person_bbox)
+                if box is None:
                     logger.warning(f"无效的人体边界框: {person_bbox}")
-                    continue
-
-                # 裁剪人体ROI（添加padding）
-                padding = int((x2 - x1) * 0.1)
-                roi_x1 = max(0, x1 - padding)
-                roi_y1 = max(0, y1 - padding)
-                roi_x2 = min(image.shape[1], x2 + padding)
-                roi_y2 = min(image.shape[0], y2 + padding)
-
-                person_roi = image[roi_y1:roi_y2, roi_x1:roi_x2]
+                    box = (0, 0, 0, 0)  # 占位，保持 roi_index 与输入顺序一致
+                crop_boxes.append(box)
 
-                if person_roi.size == 0:
-                    logger.warning(f"人体ROI为空: {person_bbox}")
-                    continue
-
-                person_rois.append(person_roi)
-                roi_info.append(
-                    {
-                        "roi_offset": (roi_x1, roi_y1),  # ROI在原图中的偏移
-                        "roi_size": (roi_x2 - roi_x1, roi_y2 - roi_y1),
-                    }
-                )
-
-            if not person_rois:
+            canvases = self.roi_packer.pack(
+                image, crop_boxes, enhance_low_quality=enhance_low_quality
+            )
+            if not canvases:
                 return []
 
-            # 步骤2：批量推理（YOLO支持批量输入）
             try:
                 batch_results = self.model(
-                    person_rois,
+                    [canvas.image for canvas in canvases],
                     conf=self.confidence_threshold,
                     iou=self.iou_threshold,
                     verbose=False,
@@ -434,59 +477,19 @@ class YOLOv8PoseDetector(BaseDetector):
                 # 回退到逐个检测
                 return self.detect_in_rois(image, person_bboxes, use_batch=False)
 
-            # 步骤3：处理批量结果并映射坐标
             all_detections = []
+            for canvas, result in zip(canvases, batch_results):
+                all_detections.extend(
+                    self.roi_packer.unpack(canvas, self._parse_pose_result(result))
+                )
 
-            for roi_idx, (result, info) in enumerate(zip(batch_results, roi_info)):
-                roi_x1, roi_y1 = info["roi_offset"]
-
-                # 处理该ROI的检测结果
-                for r in result:
-                    if r.boxes is None or r.keypoints is None:
-                        continue
-
-                    for box, keypoints in zip(r.boxes, r.keypoints):
-                        # 只处理 'person' 类别
-                        if box.cls[0].item() != 0:
-                            continue
-
-                        # ROI内的坐标
-                        roi_bbox = box.xyxy[0].cpu().numpy().astype(int)
-                        conf = box.conf[0].item()
-
-                        roi_kpts_xy = keypoints.xy[0].cpu().numpy()
-                        roi_kpts_conf = (
-                            keypoints.conf[0].cpu().numpy()
-                            if keypoints.conf is not None
-                            else np.ones(len(roi_kpts_xy))
-                        )
-
-                        # 映射回原图坐标
-                        orig_bbox = [
-                            float(roi_x1 + roi_bbox[0]),
-                            float(roi_y1 + roi_bbox[1]),
-                            float(roi_x1 + roi_bbox[2]),
-                            float(roi_y1 + roi_bbox[3]),
-                        ]
-
-                        orig_kpts_xy = roi_kpts_xy.copy()
-                        orig_kpts_xy[:, 0] += roi_x1  # x坐标
-                        orig_kpts_xy[:, 1] += roi_y1  # y坐标
-
-                        detection = {
-                            "bbox": orig_bbox,
-                            "confidence": conf,
-                            "keypoints": {
-                                "xy": orig_kpts_xy,
-                                "conf": roi_kpts_conf,
-                            },
-                            "class_id": 0,
-                            "class_name": "person",
-                        }
-                        all_detections.append(detection)
-
+            stats = self.roi_packer.last_stats
             logger.debug(
-                f"批量ROI姿态检测完成: 检测了 {len(person_bboxes)} 个人体ROI, "
+                f"批量ROI姿态检测完成: ROI数={stats['roi_count']}, "
+                f"推理次数={stats['inference_calls']}, "
+                f"节省推理={stats['saved_inference_calls']}, "
+                f"画布利用率={stats['packing_efficiency']:.2f}, "
+                f"增强ROI数={stats['enhanced_rois']}, "
                 f"得到 {len(all_detections)} 个检测结果"
             )
             return all_detections
@@ -497,6 +500,10 @@ class YOLOv8PoseDetector(BaseDetector):
             logger.info("回退到逐个ROI检测")
             return self.detect_in_rois(image, person_bboxes, use_batch=False)
 
+    def get_roi_packing_stats(self) -> Dict[str, Any]:
+        """ROI拼图统计（每帧ROI数、画布利用率、节省的推理次数）"""
+        return self.roi_packer.get_stats()
+
     def visualize(self, image: np.ndarray, detections: List[Dict]) -> np.ndarray:
         """
         在图像上可视化姿态检测结果
@@ -0,0 +1,315 @@
+"""ROI拼图打包模块.
+
+将一帧中的多个人体ROI以letterbox方式拼接到固定尺寸的画布上，
+只需一次姿态推理即可覆盖所有ROI，再把检测框与关键点映射回整帧坐标。
+网格行列数按ROI的宽高比自适应选择（使画布利用率最高），ROI过多时拆分到多张画布。
+CLAHE等增强只对质量评分偏低（过暗/过亮/低对比度）的ROI执行。
+"""
+
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# YOLO letterbox 填充色
+LETTERBOX_COLOR = 114
+
+
+def crop_quality(crop: np.ndarray) -> float:
+    """
+    ROI质量评分（0~1）
+
+    综合亮度偏离中值的程度与亮度标准差（对比度），过暗、过曝或低对比度的ROI得分低。
+    """
+    if crop.size == 0:
+        return 0.0
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    mean = float(gray.mean())
+    std = float(gray.std())
+    exposure = 1.0 - abs(mean - 128.0) / 128.0
+    contrast = min(1.0, std / 48.0)
+    return max(0.0, min(1.0, exposure * contrast))
+
+
+def enhance_crop(crop: np.ndarray) -> np.ndarray:
+    """CLAHE增强亮度并轻度锐化"""
+    try:
+        lab = cv2.cvtColor(crop, cv2.COLOR_BGR2LAB)
+        l_channel, a_channel, b_channel = cv2.split(lab)
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        enhanced = cv2.cvtColor(
+            cv2.merge((clahe.apply(l_channel), a_channel, b_channel)),
+            cv2.COLOR_LAB2BGR,
+        )
+        kernel = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]], dtype=np.float32)
+        return cv2.filter2D(enhanced, -1, kernel)
+    except Exception:
+        return crop
+
+
+@dataclass
+class RoiPlacement:
+    """单个ROI在画布中的位置"""
+
+    roi_index: int
+    crop_box: Tuple[int, int, int, int]  # ROI在整帧中的坐标 (x1, y1, x2, y2)
+    offset: Tuple[int, int]  # 缩放后ROI在画布中的左上角
+    size: Tuple[int, int]  # 缩放后ROI的宽高
+    scale: Tuple[float, float]  # (sx, sy)，按取整后的尺寸计算，保证反映射精确
+    quality: float
+    enhanced: bool = False
+
+    def contains(self, x: float, y: float) -> bool:
+        ox, oy = self.offset
+        w, h = self.size
+        return ox <= x < ox + w and oy <= y < oy + h
+
+    def to_frame(self, xy: np.ndarray) -> np.ndarray:
+        """画布坐标 -> 整帧坐标（xy: (N, 2)）"""
+        mapped = (np.asarray(xy, dtype=np.float32) - self.offset) / self.scale
+        return mapped + np.asarray(self.crop_box[:2], dtype=np.float32)
+
+
+@dataclass
+class PackedCanvas:
+    """一张拼图画布及其ROI布局"""
+
+    image: np.ndarray
+    placements: List[RoiPlacement] = field(default_factory=list)
+    grid: Tuple[int, int] = (1, 1)  # (cols, rows)
+
+    @property
+    def efficiency(self) -> float:
+        """画布利用率（ROI像素面积 / 画布面积）"""
+        used = sum(p.size[0] * p.size[1] for p in self.placements)
+        return used / float(self.image.shape[0] * self.image.shape[1])
+
+    def find(self, x: float, y: float) -> Optional[RoiPlacement]:
+        for placement in self.placements:
+            if placement.contains(x, y):
+                return placement
+        return None
+
+
+class RoiPacker:
+    """
+    ROI拼图打包器
+
+    Args:
+        canvas_size: 画布边长（与姿态模型输入尺寸一致）
+        min_cell_side: 单元格最小边长，决定单张画布最多容纳的ROI数
+        max_upscale: 小ROI的最大放大倍数
+        gap: 单元格内边距（像素），避免相邻ROI的检测框粘连
+        quality_threshold: 低于该质量评分的ROI执行增强
+    """
+
+    def __init__(
+        self,
+        canvas_size: int = 640,
+        min_cell_side: int = 160,
+        max_upscale: float = 2.0,
+        gap: int = 4,
+        quality_threshold: float = 0.35,
+    ):
+        self.canvas_size = int(canvas_size)
+        self.min_cell_side = int(min_cell_side)
+        self.max_upscale = float(max_upscale)
+        self.gap = int(gap)
+        self.quality_threshold = float(quality_threshold)
+        self.max_grid = max(1, self.canvas_size // max(1, self.min_cell_side))
+
+        self.last_stats: Dict[str, Any] = {}
+        self.totals = {
+            "frames": 0,
+            "rois": 0,
+            "inference_calls": 0,
+            "saved_inference_calls": 0,
+            "enhanced_rois": 0,
+            "efficiency_sum": 0.0,
+        }
+
+    # ---------------- 布局 ----------------
+
+    def _cell_scale(self, size: Tuple[int, int], cell: Tuple[float, float]) -> float:
+        w, h = size
+        inner_w = max(1.0, cell[0] - 2 * self.gap)
+        inner_h = max(1.0, cell[1] - 2 * self.gap)
+        return min(inner_w / w, inner_h / h, self.max_upscale)
+
+    def choose_grid(self, sizes: Sequence[Tuple[int, int]]) -> Tuple[int, int]:
+        """为一组ROI选择利用率最高的 (cols, rows)"""
+        n = len(sizes)
+        best, best_area = (1, 1), -1.0
+        for cols in range(1, self.max_grid + 1):
+            rows = math.ceil(n / cols)
+            if rows > self.max_grid:
+                continue
+            cell = (self.canvas_size / cols, self.canvas_size / rows)
+            area = sum((self._cell_scale(s, cell) ** 2) * s[0] * s[1] for s in sizes)
+            # 面积相同时优先更少的单元格（保留更大的放大余量）
+            if area > best_area + 1e-6:
+                best, best_area = (cols, rows), area
+        return best
+
+    def pack(
+        self,
+        image: np.ndarray,
+        crop_boxes: Sequence[Tuple[int, int, int, int]],
+        enhance_low_quality: bool = False,
+    ) -> List[PackedCanvas]:
+        """
+        将整帧中的ROI打包到一张或多张画布
+
+        Args:
+            image: 整帧图像
+            crop_boxes: ROI坐标列表（已含padding并裁剪到图像范围）
+            enhance_low_quality: 是否对低质量ROI执行CLAHE增强
+
+        Returns:
+            画布列表
+        """
+        items = []
+        for index, (x1, y1, x2, y2) in enumerate(crop_boxes):
+            if x2 > x1 and y2 > y1:
+                items.append((index, (int(x1), int(y1), int(x2), int(y2))))
+
+        capacity = self.max_grid * self.max_grid
+        canvases = []
+        for start in range(0, len(items), capacity):
+            chunk = items[start : start + capacity]
+            canvases.append(self._pack_chunk(image, chunk, enhance_low_quality))
+
+        self._record(len(items), canvases)
+        return canvases
+
+    def _pack_chunk(
+        self,
+        image: np.ndarray,
+        chunk: List[Tuple[int, Tuple[int, int, int, int]]],
+        enhance_low_quality: bool,
+    ) -> PackedCanvas:
+        sizes = [(box[2] - box[0], box[3] - box[1]) for _, box in chunk]
+        cols, rows = self.choose_grid(sizes)
+        cell_w = self.canvas_size / cols
+        cell_h = self.canvas_size / rows
+
+        channels = image.shape[2] if image.ndim == 3 else 1
+        shape = (self.canvas_size, self.canvas_size) + (
+            (channels,) if image.ndim == 3 else ()
+        )
+        canvas = np.full(shape, LETTERBOX_COLOR, dtype=image.dtype)
+        packed = PackedCanvas(image=canvas, grid=(cols, rows))
+
+        for slot, ((index, box), size) in enumerate(zip(chunk, sizes)):
+            x1, y1, x2, y2 = box
+            crop = image[y1:y2, x1:x2]
+            quality = crop_quality(crop)
+            enhanced = enhance_low_quality and quality < self.quality_threshold
+            if enhanced:
+                crop = enhance_crop(crop)
+
+            scale = self._cell_scale(size, (cell_w, cell_h))
+            scaled_w = max(1, int(size[0] * scale))
+            scaled_h = max(1, int(size[1] * scale))
+            interpolation = cv2.INTER_LINEAR if scale >= 1.0 else cv2.INTER_AREA
+            resized = cv2.resize(
+                crop, (scaled_w, scaled_h), interpolation=interpolation
+            )
+
+            col, row = slot % cols, slot // cols
+            ox = int(col * cell_w + (cell_w - scaled_w) / 2)
+            oy = int(row * cell_h + (cell_h - scaled_h) / 2)
+            canvas[oy : oy + scaled_h, ox : ox + scaled_w] = resized
+
+            packed.placements.append(
+                RoiPlacement(
+                    roi_index=index,
+                    crop_box=box,
+                    offset=(ox, oy),
+                    size=(scaled_w, scaled_h),
+                    scale=(scaled_w / float(size[0]), scaled_h / float(size[1])),
+                    quality=quality,
+                    enhanced=enhanced,
+                )
+            )
+        return packed
+
+    # ---------------- 反映射 ----------------
+
+    def unpack(
+        self, canvas: PackedCanvas, detections: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        将画布坐标系下的检测结果映射回整帧坐标
+
+        检测框中心落在某个ROI内的结果归属该ROI（附加 roi_index），
+        落在letterbox填充区域的结果被丢弃。
+        """
+        mapped = []
+        for det in detections:
+            x1, y1, x2, y2 = [float(v) for v in det["bbox"]]
+            placement = canvas.find((x1 + x2) / 2, (y1 + y2) / 2)
+            if placement is None:
+                continue
+
+            corners = placement.to_frame(np.array([[x1, y1], [x2, y2]]))
+            cx1, cy1, cx2, cy2 = placement.crop_box
+            bbox = [
+                float(np.clip(corners[0, 0], cx1, cx2)),
+                float(np.clip(corners[0, 1], cy1, cy2)),
+                float(np.clip(corners[1, 0], cx1, cx2)),
+                float(np.clip(corners[1, 1], cy1, cy2)),
+            ]
+
+            result = dict(det)
+            result["bbox"] = bbox
+            result["roi_index"] = placement.roi_index
+            keypoints = det.get("keypoints")
+            if keypoints is not None and "xy" in keypoints:
+                result["keypoints"] = {
+                    **keypoints,
+                    "xy": placement.to_frame(keypoints["xy"]),
+                }
+            mapped.append(result)
+        return mapped
+
+    # ---------------- 统计 ----------------
+
+    def _record(self, roi_count: int, canvases: List[PackedCanvas]) -> None:
+        calls = len(canvases)
+        efficiency = sum(c.efficiency for c in canvases) / calls if calls else 0.0
+        enhanced = sum(p.enhanced for c in canvases for p in c.placements)
+        self.last_stats = {
+            "roi_count": roi_count,
+            "inference_calls": calls,
+            "saved_inference_calls": max(0, roi_count - calls),
+            "packing_efficiency": efficiency,
+            "enhanced_rois": enhanced,
+            "grids": [c.grid for c in canvases],
+        }
+        self.totals["frames"] += 1
+        self.totals["rois"] += roi_count
+        self.totals["inference_calls"] += calls
+        self.totals["saved_inference_calls"] += max(0, roi_count - calls)
+        self.totals["enhanced_rois"] += enhanced
+        self.totals["efficiency_sum"] += efficiency
+
+    def get_stats(self) -> Dict[str, Any]:
+        frames = self.totals["frames"]
+        return {
+            "last_frame": dict(self.last_stats),
+            "frames": frames,
+            "rois": self.totals["rois"],
+            "inference_calls": self.totals["inference_calls"],
+            "saved_inference_calls": self.totals["saved_inference_calls"],
+            "enhanced_rois": self.totals["enhanced_rois"],
+            "avg_rois_per_frame": self.totals["rois"] / frames if frames else 0.0,
+            "avg_packing_efficiency": self.totals["efficiency_sum"] / frames
+            if frames
+            else 0.0,
+        }
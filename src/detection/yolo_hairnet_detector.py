@@ -26,15 +26,17 @@ except ImportError:
     logging.error("未安装 ultralytics 库，请使用 'pip install ultralytics' 安装")
     raise
 
-# 导入统一参数配置
+# 导入统一参数配置与推理后端
 try:
     from src.config.unified_params import get_unified_params
+    from src.detection.inference_backend import resolve_inference_model
 except ImportError:
     # 兼容性处理
     sys.path.append(
         os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     )
     from src.config.unified_params import get_unified_params
+    from src.detection.inference_backend import resolve_inference_model
 
 logger = logging.getLogger(__name__)
 
@@ -141,6 +143,9 @@ class YOLOHairnetDetector:
             self.model_path = model_path
 
         self.device = self._get_device(device)
+        self.model_path = resolve_inference_model(
+            self.model_path, self.device, task="detect"
+        )
         self.conf_thres = conf_thres
         self.iou_thres = iou_thres
         self.model = self._load_model()
@@ -1,9 +1,10 @@
 """告警仓储接口."""
 
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from src.domain.entities.alert import Alert
+from src.utils.pagination import CursorError
 
 
 class IAlertRepository(ABC):
@@ -63,6 +64,64 @@ class IAlertRepository(ABC):
             符合条件的告警总数
         """
 
+    async def find_page(
+        self,
+        limit: int = 100,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        camera_id: Optional[str] = None,
+        alert_type: Optional[str] = None,
+        sort_by: Optional[str] = None,
+        sort_order: str = "desc",
+    ) -> Tuple[List[Alert], Optional[str]]:
+        """按游标分页查询告警历史.
+
+        默认实现不支持游标，退化为 offset 分页且不返回下一页游标；
+        支持 keyset 分页的存储应覆盖此方法。
+
+        Args:
+            limit: 返回数量限制
+            offset: 偏移量（仅在未提供游标时使用）
+            cursor: 上一页返回的游标
+            camera_id: 摄像头ID过滤（可选）
+            alert_type: 告警类型过滤（可选）
+            sort_by: 排序字段（可选，默认: timestamp）
+            sort_order: 排序方向，asc 或 desc（默认: desc）
+
+        Returns:
+            (告警列表, 下一页游标)
+
+        Raises:
+            CursorError: 提供了游标（默认实现不会签发游标，传入的游标一定无效）
+        """
+        if cursor:
+            raise CursorError("当前告警仓储不支持游标分页")
+        alerts = await self.find_all(
+            limit=limit,
+            offset=offset,
+            camera_id=camera_id,
+            alert_type=alert_type,
+            sort_by=sort_by,
+            sort_order=sort_order,
+        )
+        return alerts, None
+
+    async def estimate_count(
+        self,
+        camera_id: Optional[str] = None,
+        alert_type: Optional[str] = None,
+    ) -> int:
+        """估算告警总数（默认实现返回精确计数）.
+
+        Args:
+            camera_id: 摄像头ID过滤（可选）
+            alert_type: 告警类型过滤（可选）
+
+        Returns:
+            告警总数估算值
+        """
+        return await self.count(camera_id=camera_id, alert_type=alert_type)
+
     @abstractmethod
     async def save(self, alert: Alert) -> int:
         """保存告警.
@@ -31,6 +31,8 @@ class AlertService:
         alert_type: Optional[str] = None,
         sort_by: Optional[str] = None,
         sort_order: str = "desc",
+        cursor: Optional[str] = None,
+        approximate_total: bool = False,
     ) -> Dict[str, Any]:
         """获取告警历史.
 
@@ -41,20 +43,29 @@ class AlertService:
             alert_type: 告警类型过滤（可选）
             sort_by: 排序字段（可选，默认: timestamp）
             sort_order: 排序方向，asc 或 desc（默认: desc）
+            cursor: 上一页返回的 next_cursor（提供时忽略offset）
+            approximate_total: 是否使用估算总数代替精确计数
 
         Returns:
-            包含告警列表、总数和分页信息的字典
+            包含告警列表、总数、分页信息和 next_cursor 的字典
         """
         try:
-            # 获取总数
-            total = await self.alert_repository.count(
-                camera_id=camera_id, alert_type=alert_type
-            )
+            # 获取总数（游标翻页时使用估算值，避免每页 COUNT(*)）
+            total_is_estimate = bool(cursor) or approximate_total
+            if total_is_estimate:
+                total = await self.alert_repository.estimate_count(
+                    camera_id=camera_id, alert_type=alert_type
+                )
+            else:
+                total = await self.alert_repository.count(
+                    camera_id=camera_id, alert_type=alert_type
+                )
 
             # 获取告警列表
-            alerts = await self.alert_repository.find_all(
+            alerts, next_cursor = await self.alert_repository.find_page(
                 limit=limit,
                 offset=offset,
+                cursor=cursor,
                 camera_id=camera_id,
                 alert_type=alert_type,
                 sort_by=sort_by,
@@ -66,9 +77,11 @@ class AlertService:
             return {
                 "count": len(items),
                 "total": total,
+                "total_is_estimate": total_is_estimate,
                 "items": items,
                 "limit": limit,
-                "offset": offset,
+                "offset": 0 if cursor else offset,
+                "next_cursor": next_cursor,
             }
 
         except Exception as e:
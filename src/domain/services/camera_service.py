@@ -33,6 +33,17 @@ class CameraService:
         self.camera_repository = camera_repository
         self.cameras_yaml_path = cameras_yaml_path
 
+    async def _invalidate_camera_cache(self, camera_id: str, action: str) -> None:
+        """摄像头配置变更后失效依赖它的统计缓存（失败只记录日志）."""
+        try:
+            from src.utils.cache import invalidate_tags
+
+            await invalidate_tags("cameras")
+        except Exception as e:
+            logger.warning(
+                f"失效摄像头相关缓存失败（不影响{action}）: camera_id={camera_id}, error={e}"
+            )
+
     def _read_yaml_config(self) -> Dict[str, Any]:
         """读取YAML配置文件."""
         if not self.cameras_yaml_path or not os.path.exists(self.cameras_yaml_path):
@@ -162,7 +173,7 @@ class CameraService:
             # 同步运行时配置到Redis（如果配置了log_interval等）
             try:
                 from src.infrastructure.notifications.redis_config_sync import (
-                    sync_camera_config_to_redis,
+                    sync_camera_config_to_redis_async,
                 )
 
                 # 提取需要同步的配置项（从camera_data中）
@@ -172,7 +183,7 @@ class CameraService:
                     if key in camera_data
                 ]
                 if changed_keys:
-                    sync_camera_config_to_redis(
+                    await sync_camera_config_to_redis_async(
                         camera_id=generated_id,  # 使用生成的ID
                         camera_config=camera.to_dict(),
                         changed_keys=changed_keys,
@@ -185,6 +196,8 @@ class CameraService:
             # 注意: YAML写入已移除，数据库是单一数据源
             # 如需备份，使用导出工具: scripts/export_cameras_to_yaml.py
 
+            await self._invalidate_camera_cache(generated_id, "创建")
+
             logger.info(f"摄像头创建成功: camera_id={generated_id}, name={camera.name}")
             return {"ok": True, "camera": camera.to_dict()}
 
@@ -281,10 +294,10 @@ class CameraService:
             if changed_runtime_keys:
                 try:
                     from src.infrastructure.notifications.redis_config_sync import (
-                        sync_camera_config_to_redis,
+                        sync_camera_config_to_redis_async,
                     )
 
-                    sync_camera_config_to_redis(
+                    await sync_camera_config_to_redis_async(
                         camera_id=camera_id,
                         camera_config=camera.to_dict(),
                         changed_keys=changed_runtime_keys,
@@ -297,6 +310,8 @@ class CameraService:
             # 注意: YAML写入已移除，数据库是单一数据源
             # 如需备份，使用导出工具: scripts/export_cameras_to_yaml.py
 
+            await self._invalidate_camera_cache(camera_id, "更新")
+
             logger.info(f"摄像头更新成功: {camera_id}, updates={updates}")
             return {"status": "success", "camera": camera.to_dict()}
 
@@ -330,10 +345,10 @@ class CameraService:
             # 从Redis删除运行时配置（如果存在）
             try:
                 from src.infrastructure.notifications.redis_config_sync import (
-                    delete_camera_config_from_redis,
+                    delete_camera_config_from_redis_async,
                 )
 
-                delete_camera_config_from_redis(camera_id=camera_id)
+                await delete_camera_config_from_redis_async(camera_id=camera_id)
             except Exception as e:
                 logger.warning(
                     f"从Redis删除相机配置失败（不影响删除）: camera_id={camera_id}, error={e}"
@@ -342,6 +357,8 @@ class CameraService:
             # 注意: YAML写入已移除，数据库是单一数据源
             # 如需备份，使用导出工具: scripts/export_cameras_to_yaml.py
 
+            await self._invalidate_camera_cache(camera_id, "删除")
+
             logger.info(f"摄像头删除成功: camera_id={camera_id}")
             return {"status": "success"}
 
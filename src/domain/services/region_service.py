@@ -80,6 +80,7 @@ class RegionDomainService:
                 name=region_data["name"],
             )
             region.is_active = region_data.get("is_active", True)
+            region.camera_id = camera_id
 
             # 复制rules
             if "rules" in region_data:
@@ -141,9 +142,10 @@ class RegionDomainService:
             if "rules" in updates:
                 region.rules.update(updates["rules"])
 
-            # 更新到数据库
-            camera_id = updates.get("camera_id")
-            await self.region_repository.save(region, camera_id)
+            # 更新到数据库（未提供camera_id时保留原有关联）
+            if "camera_id" in updates:
+                region.camera_id = updates["camera_id"]
+            await self.region_repository.save(region, region.camera_id)
 
             logger.info(f"区域更新成功: {region_id}")
             return {"status": "success", "region": self._region_to_dict(region)}
@@ -348,4 +350,5 @@ class RegionDomainService:
             "polygon": [list(p) for p in region.polygon],
             "is_active": region.is_active,
             "rules": region.rules,
+            "camera_id": getattr(region, "camera_id", None),
         }
@@ -1,19 +1,37 @@
 """基础设施层 - 通知服务."""
 
 from .config_change_notifier import (
+    CONFIG_VERSION_KEY_PREFIX,
+    config_scope,
+    config_version_key,
     publish_config_change_notification,
     publish_config_change_notification_async,
 )
+from .model_activation_notifier import (
+    MODEL_ACTIVATION_CHANNEL,
+    publish_model_activation_async,
+)
 from .redis_config_sync import (
     delete_camera_config_from_redis,
+    delete_camera_config_from_redis_async,
     get_camera_config_from_redis,
+    get_camera_config_from_redis_async,
     sync_camera_config_to_redis,
+    sync_camera_config_to_redis_async,
 )
 
 __all__ = [
+    "CONFIG_VERSION_KEY_PREFIX",
+    "config_scope",
+    "config_version_key",
     "publish_config_change_notification",
     "publish_config_change_notification_async",
+    "MODEL_ACTIVATION_CHANNEL",
+    "publish_model_activation_async",
     "sync_camera_config_to_redis",
+    "sync_camera_config_to_redis_async",
     "get_camera_config_from_redis",
+    "get_camera_config_from_redis_async",
     "delete_camera_config_from_redis",
+    "delete_camera_config_from_redis_async",
 ]
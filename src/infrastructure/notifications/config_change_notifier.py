@@ -8,6 +8,20 @@ from typing import Any, Optional
 
 logger = logging.getLogger(__name__)
 
+# 每个作用域（global / camera:{camera_id}）一个单调递增的配置版本号，
+# 检测进程据此判断增量是否连续，出现缺口时全量重新同步
+CONFIG_VERSION_KEY_PREFIX = "detection_config:version:"
+
+
+def config_scope(camera_id: Optional[str]) -> str:
+    """配置变更的作用域名称"""
+    return f"camera:{camera_id}" if camera_id else "global"
+
+
+def config_version_key(camera_id: Optional[str]) -> str:
+    """作用域版本号在Redis中的键"""
+    return f"{CONFIG_VERSION_KEY_PREFIX}{config_scope(camera_id)}"
+
 
 def publish_config_change_notification(
     camera_id: Optional[str],
@@ -46,6 +60,8 @@ def publish_config_change_notification(
             "config_key": config_key,
             "config_value": config_value,
             "change_type": change_type,
+            "scope": config_scope(camera_id),
+            "version": int(redis_client.incr(config_version_key(camera_id))),
             "timestamp": datetime.utcnow().isoformat(),
         }
 
@@ -67,7 +83,7 @@ def publish_config_change_notification(
         logger.info(
             f"配置变更通知已发布: channel={channel}, "
             f"config_type={config_type}, config_key={config_key}, "
-            f"subscribers={subscribers}"
+            f"version={notification['version']}, subscribers={subscribers}"
         )
         return True
 
@@ -96,15 +112,13 @@ async def publish_config_change_notification_async(
         bool: 是否成功发布
     """
     try:
-        import redis.asyncio as aioredis
+        from src.infrastructure.connection_fabric import get_shared_redis
 
-        redis_url = os.getenv("REDIS_URL")
-        if not redis_url:
+        redis_client = get_shared_redis()
+        if redis_client is None:
             logger.debug("REDIS_URL未设置，跳过配置变更通知")
             return False
 
-        redis_client = aioredis.from_url(redis_url, decode_responses=False)
-
         # 构建通知消息
         notification = {
             "type": "config_change",
@@ -113,6 +127,8 @@ async def publish_config_change_notification_async(
             "config_key": config_key,
             "config_value": config_value,
             "change_type": change_type,
+            "scope": config_scope(camera_id),
+            "version": int(await redis_client.incr(config_version_key(camera_id))),
             "timestamp": datetime.utcnow().isoformat(),
         }
 
@@ -129,12 +145,10 @@ async def publish_config_change_notification_async(
         global_channel = "detection_config:change"
         await redis_client.publish(global_channel, payload)
 
-        await redis_client.aclose()
-
         logger.info(
             f"配置变更通知已发布: channel={channel}, "
             f"config_type={config_type}, config_key={config_key}, "
-            f"subscribers={subscribers}"
+            f"version={notification['version']}, subscribers={subscribers}"
         )
         return True
 
@@ -0,0 +1,65 @@
+"""模型激活通知服务（Redis Pub/Sub）."""
+
+import json
+import logging
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# 检测进程订阅该频道，收到后在后台加载、预热并影子评估新模型
+MODEL_ACTIVATION_CHANNEL = "model_registry:activated"
+
+
+async def publish_model_activation_async(
+    detection_task: str,
+    model_path: Optional[str] = None,
+    model_id: Optional[str] = None,
+    version: Optional[str] = None,
+    action: str = "activate",  # activate, rollback
+    camera_id: Optional[str] = None,
+) -> bool:
+    """发布模型激活/回滚通知到Redis（异步）
+
+    Args:
+        detection_task: 检测任务（human_detection, hairnet_detection, pose_detection）
+        model_path: 新模型路径（回滚时可为空）
+        model_id: 模型注册ID
+        version: 模型版本
+        action: 动作（activate, rollback）
+        camera_id: 目标摄像头（None表示所有检测进程）
+
+    Returns:
+        bool: 是否成功发布
+    """
+    try:
+        from src.infrastructure.connection_fabric import get_shared_redis
+
+        redis_client = get_shared_redis()
+        if redis_client is None:
+            logger.debug("REDIS_URL未设置，跳过模型激活通知")
+            return False
+
+        notification = {
+            "type": "model_activation",
+            "action": action,
+            "detection_task": detection_task,
+            "model_path": model_path,
+            "model_id": model_id,
+            "version": version,
+            "camera_id": camera_id,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+
+        payload = json.dumps(notification).encode("utf-8")
+        subscribers = await redis_client.publish(MODEL_ACTIVATION_CHANNEL, payload)
+
+        logger.info(
+            f"模型激活通知已发布: action={action}, task={detection_task}, "
+            f"model_id={model_id}, subscribers={subscribers}"
+        )
+        return True
+
+    except Exception as e:
+        logger.warning(f"发布模型激活通知失败: {e}")
+        return False
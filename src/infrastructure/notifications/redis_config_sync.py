@@ -2,10 +2,11 @@
 
 import logging
 import os
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from src.infrastructure.notifications.config_change_notifier import (
     publish_config_change_notification,
+    publish_config_change_notification_async,
 )
 
 logger = logging.getLogger(__name__)
@@ -17,12 +18,85 @@ RUNTIME_CONFIG_KEYS: Set[str] = {
 }
 
 
+def _config_key(camera_id: str) -> str:
+    return f"video_stream:config:{camera_id}"
+
+
+def _build_runtime_config(
+    camera_id: str,
+    camera_config: Dict[str, Any],
+    changed_keys: Optional[List[str]],
+) -> Dict[str, str]:
+    """从相机配置中提取需要写入Redis的运行时配置项."""
+    # 支持两种格式：
+    # 1. Camera实体的to_dict()结果：metadata字段包含配置
+    # 2. 直接的配置字典：配置项在顶层
+    metadata = camera_config.get("metadata", {})
+    if not metadata:
+        # 如果没有metadata字段，假设配置项在顶层
+        metadata = camera_config
+
+    redis_config: Dict[str, str] = {}
+
+    # 如果指定了changed_keys，只同步变更的配置项
+    keys_to_sync = changed_keys if changed_keys else list(RUNTIME_CONFIG_KEYS)
+
+    for key in keys_to_sync:
+        if key not in RUNTIME_CONFIG_KEYS:
+            continue
+
+        # 获取配置值
+        value = metadata.get(key) if metadata else None
+        if value is None:
+            # 如果metadata中没有，尝试从顶层获取
+            value = camera_config.get(key)
+
+        if value is not None:
+            # 转换为字符串（Redis hash只支持字符串值）
+            redis_config[key] = str(value)
+
+            # 特殊处理：stream_interval 应该与 log_interval 保持一致
+            if key == "log_interval":
+                redis_config["stream_interval"] = str(value)
+
+    if not redis_config:
+        logger.debug(f"没有需要同步的配置项: camera_id={camera_id}")
+    return redis_config
+
+
+def _changed_runtime_values(
+    redis_config: Dict[str, str], changed_keys: Optional[List[str]]
+) -> List[Tuple[str, str]]:
+    """需要发送变更通知的 (配置项, 值) 列表."""
+    return [
+        (key, redis_config[key])
+        for key in changed_keys or []
+        if key in RUNTIME_CONFIG_KEYS and redis_config.get(key) is not None
+    ]
+
+
+def _parse_runtime_config(config_data: Dict[Any, Any]) -> Dict[str, Any]:
+    """解码Redis中的配置并尽量还原为整数."""
+    result: Dict[str, Any] = {}
+    for key, value in config_data.items():
+        key = key.decode() if isinstance(key, bytes) else key
+        value = value.decode() if isinstance(value, bytes) else value
+        try:
+            result[key] = int(value)
+        except ValueError:
+            # 如果转换失败，保持字符串
+            result[key] = value
+    return result
+
+
 def sync_camera_config_to_redis(
     camera_id: str,
     camera_config: Dict[str, Any],
     changed_keys: Optional[List[str]] = None,
 ) -> bool:
-    """将相机配置同步到Redis（用于运行时配置）
+    """将相机配置同步到Redis（用于运行时配置，同步版本）
+
+    异步上下文中请使用 sync_camera_config_to_redis_async，避免阻塞事件循环。
 
     Args:
         camera_id: 摄像头ID
@@ -40,48 +114,12 @@ def sync_camera_config_to_redis(
             logger.debug("REDIS_URL未设置，跳过Redis配置同步")
             return False
 
-        redis_client = redis.from_url(redis_url)
-        config_key = f"video_stream:config:{camera_id}"
-
-        # 提取运行时配置
-        # 支持两种格式：
-        # 1. Camera实体的to_dict()结果：metadata字段包含配置
-        # 2. 直接的配置字典：配置项在顶层
-        metadata = camera_config.get("metadata", {})
-        if not metadata:
-            # 如果没有metadata字段，假设配置项在顶层
-            metadata = camera_config
-
-        # 构建Redis配置
-        redis_config: Dict[str, str] = {}
-
-        # 如果指定了changed_keys，只同步变更的配置项
-        keys_to_sync = changed_keys if changed_keys else list(RUNTIME_CONFIG_KEYS)
-
-        for key in keys_to_sync:
-            if key not in RUNTIME_CONFIG_KEYS:
-                continue
-
-            # 获取配置值
-            value = metadata.get(key) if metadata else None
-            if value is None:
-                # 如果metadata中没有，尝试从顶层获取
-                value = camera_config.get(key)
-
-            if value is not None:
-                # 转换为字符串（Redis hash只支持字符串值）
-                redis_config[key] = str(value)
-
-                # 特殊处理：stream_interval 应该与 log_interval 保持一致
-                if key == "log_interval":
-                    redis_config["stream_interval"] = str(value)
-
-        # 如果没有任何配置需要同步，直接返回
+        redis_config = _build_runtime_config(camera_id, camera_config, changed_keys)
         if not redis_config:
-            logger.debug(f"没有需要同步的配置项: camera_id={camera_id}")
             return True
 
-        # 同步到Redis
+        redis_client = redis.from_url(redis_url)
+        config_key = _config_key(camera_id)
         redis_client.hset(config_key, mapping=redis_config)
         redis_client.expire(config_key, 3600)  # 1小时过期
 
@@ -91,24 +129,74 @@ def sync_camera_config_to_redis(
         )
 
         # 发布配置变更通知（针对每个变更的配置项）
-        if changed_keys:
-            for key in changed_keys:
-                if key in RUNTIME_CONFIG_KEYS:
-                    value = redis_config.get(key)
-                    if value is not None:
-                        try:
-                            publish_config_change_notification(
-                                camera_id=camera_id,
-                                config_type="runtime",
-                                config_key=key,
-                                config_value=value,
-                                change_type="update",
-                            )
-                        except Exception as e:
-                            logger.warning(
-                                f"发布配置变更通知失败: camera_id={camera_id}, "
-                                f"config_key={key}, error={e}"
-                            )
+        for key, value in _changed_runtime_values(redis_config, changed_keys):
+            try:
+                publish_config_change_notification(
+                    camera_id=camera_id,
+                    config_type="runtime",
+                    config_key=key,
+                    config_value=value,
+                    change_type="update",
+                )
+            except Exception as e:
+                logger.warning(
+                    f"发布配置变更通知失败: camera_id={camera_id}, "
+                    f"config_key={key}, error={e}"
+                )
+
+        return True
+
+    except Exception as e:
+        logger.warning(f"同步相机配置到Redis失败: camera_id={camera_id}, error={e}")
+        return False
+
+
+async def sync_camera_config_to_redis_async(
+    camera_id: str,
+    camera_config: Dict[str, Any],
+    changed_keys: Optional[List[str]] = None,
+) -> bool:
+    """将相机配置同步到Redis（异步版本，使用进程共享的Redis客户端）
+
+    Args:
+        camera_id: 摄像头ID
+        camera_config: 相机配置字典
+        changed_keys: 变更的配置项列表
+
+    Returns:
+        bool: 是否成功同步
+    """
+    try:
+        from src.infrastructure.connection_fabric import get_shared_redis
+
+        redis_client = get_shared_redis()
+        if redis_client is None:
+            logger.debug("REDIS_URL未设置，跳过Redis配置同步")
+            return False
+
+        redis_config = _build_runtime_config(camera_id, camera_config, changed_keys)
+        if not redis_config:
+            return True
+
+        config_key = _config_key(camera_id)
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.hset(config_key, mapping=redis_config)
+            pipe.expire(config_key, 3600)  # 1小时过期
+            await pipe.execute()
+
+        logger.info(
+            f"已同步相机配置到Redis: camera_id={camera_id}, "
+            f"config={redis_config}, changed_keys={changed_keys}"
+        )
+
+        for key, value in _changed_runtime_values(redis_config, changed_keys):
+            await publish_config_change_notification_async(
+                camera_id=camera_id,
+                config_type="runtime",
+                config_key=key,
+                config_value=value,
+                change_type="update",
+            )
 
         return True
 
@@ -118,7 +206,7 @@ def sync_camera_config_to_redis(
 
 
 def get_camera_config_from_redis(camera_id: str) -> Optional[Dict[str, Any]]:
-    """从Redis获取相机配置（运行时配置）
+    """从Redis获取相机配置（运行时配置，同步版本）
 
     Args:
         camera_id: 摄像头ID
@@ -134,29 +222,31 @@ def get_camera_config_from_redis(camera_id: str) -> Optional[Dict[str, Any]]:
             return None
 
         redis_client = redis.from_url(redis_url)
-        config_key = f"video_stream:config:{camera_id}"
-
-        config_data = redis_client.hgetall(config_key)
+        config_data = redis_client.hgetall(_config_key(camera_id))
         if not config_data:
             return None
+        return _parse_runtime_config(config_data)
 
-        # 解码bytes为字符串
-        config_dict = {
-            k.decode(): v.decode() if isinstance(v, bytes) else v
-            for k, v in config_data.items()
-        }
+    except Exception as e:
+        logger.debug(f"从Redis获取相机配置失败: camera_id={camera_id}, error={e}")
+        return None
 
-        # 转换字符串值回原始类型
-        result: Dict[str, Any] = {}
-        for key, value in config_dict.items():
-            # 尝试转换为整数
-            try:
-                result[key] = int(value)
-            except ValueError:
-                # 如果转换失败，保持字符串
-                result[key] = value
 
-        return result
+async def get_camera_config_from_redis_async(
+    camera_id: str,
+) -> Optional[Dict[str, Any]]:
+    """从Redis获取相机配置（异步版本，使用进程共享的Redis客户端）"""
+    try:
+        from src.infrastructure.connection_fabric import get_shared_redis
+
+        redis_client = get_shared_redis()
+        if redis_client is None:
+            return None
+
+        config_data = await redis_client.hgetall(_config_key(camera_id))
+        if not config_data:
+            return None
+        return _parse_runtime_config(config_data)
 
     except Exception as e:
         logger.debug(f"从Redis获取相机配置失败: camera_id={camera_id}, error={e}")
@@ -164,7 +254,7 @@ def get_camera_config_from_redis(camera_id: str) -> Optional[Dict[str, Any]]:
 
 
 def delete_camera_config_from_redis(camera_id: str) -> bool:
-    """从Redis删除相机配置
+    """从Redis删除相机配置（同步版本）
 
     Args:
         camera_id: 摄像头ID
@@ -180,9 +270,28 @@ def delete_camera_config_from_redis(camera_id: str) -> bool:
             return False
 
         redis_client = redis.from_url(redis_url)
-        config_key = f"video_stream:config:{camera_id}"
+        deleted = redis_client.delete(_config_key(camera_id))
+
+        if deleted > 0:
+            logger.info(f"已从Redis删除相机配置: camera_id={camera_id}")
+
+        return deleted > 0
+
+    except Exception as e:
+        logger.warning(f"从Redis删除相机配置失败: camera_id={camera_id}, error={e}")
+        return False
+
+
+async def delete_camera_config_from_redis_async(camera_id: str) -> bool:
+    """从Redis删除相机配置（异步版本，使用进程共享的Redis客户端）"""
+    try:
+        from src.infrastructure.connection_fabric import get_shared_redis
+
+        redis_client = get_shared_redis()
+        if redis_client is None:
+            return False
 
-        deleted = redis_client.delete(config_key)
+        deleted = await redis_client.delete(_config_key(camera_id))
 
         if deleted > 0:
             logger.info(f"已从Redis删除相机配置: camera_id={camera_id}")
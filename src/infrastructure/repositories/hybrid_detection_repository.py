@@ -304,6 +304,18 @@ class HybridDetectionRepository(IDetectionRepository):
             logger.error(f"从混合仓储获取统计信息失败: {e}")
             raise RepositoryError(f"从混合仓储获取统计信息失败: {e}")
 
+    async def get_daily_statistics(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        camera_id: Optional[str] = None,
+    ) -> Optional[Dict[str, Dict[str, Any]]]:
+        """按天统计（主存储支持SQL聚合时使用，否则返回None）"""
+        daily = getattr(self.primary, "get_daily_statistics", None)
+        if daily is None:
+            return None
+        return await daily(start_time, end_time, camera_id)
+
     async def clear_cache(self) -> None:
         """清空缓存"""
         try:
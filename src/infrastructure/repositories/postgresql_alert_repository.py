@@ -2,7 +2,7 @@
 
 import json
 import logging
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 import asyncpg
 from asyncpg import Pool
@@ -10,9 +10,18 @@ from asyncpg import Pool
 from src.domain.entities.alert import Alert
 from src.domain.repositories.alert_repository import IAlertRepository
 from src.interfaces.repositories.detection_repository_interface import RepositoryError
+from src.utils.pagination import (
+    KeysetCursor,
+    estimate_count,
+    keyset_predicate,
+    next_cursor_for,
+)
 
 logger = logging.getLogger(__name__)
 
+# 允许排序的字段（同时用作游标中的排序键）
+_SORT_FIELDS = ("timestamp", "camera_id", "alert_type", "id")
+
 
 class PostgreSQLAlertRepository(IAlertRepository):
     """PostgreSQL告警仓储实现."""
@@ -69,8 +78,7 @@ class PostgreSQLAlertRepository(IAlertRepository):
             conn = await self._get_connection()
             try:
                 # 验证排序字段
-                valid_sort_fields = ["timestamp", "camera_id", "alert_type", "id"]
-                sort_field = sort_by if sort_by in valid_sort_fields else "timestamp"
+                sort_field = sort_by if sort_by in _SORT_FIELDS else "timestamp"
                 sort_direction = "DESC" if sort_order.lower() == "desc" else "ASC"
 
                 rows = await conn.fetch(
@@ -101,6 +109,89 @@ class PostgreSQLAlertRepository(IAlertRepository):
             logger.error(f"查询告警历史失败: {e}")
             raise RepositoryError(f"查询告警历史失败: {e}")
 
+    async def find_page(
+        self,
+        limit: int = 100,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        camera_id: Optional[str] = None,
+        alert_type: Optional[str] = None,
+        sort_by: Optional[str] = None,
+        sort_order: str = "desc",
+    ) -> Tuple[List[Alert], Optional[str]]:
+        """按 (排序字段, id) 游标分页查询告警历史.
+
+        Raises:
+            CursorError: 游标无效或与当前排序不一致
+        """
+        sort_field = sort_by if sort_by in _SORT_FIELDS else "timestamp"
+        descending = sort_order.lower() == "desc"
+        keyset = KeysetCursor.decode(cursor, sort_field, descending) if cursor else None
+        try:
+            conn = await self._get_connection()
+            try:
+                seek_sql, seek_params = keyset_predicate(
+                    keyset, sort_field, "id", first_param=3
+                )
+                sort_direction = "DESC" if descending else "ASC"
+                rows = await conn.fetch(
+                    f"""
+                    SELECT id, rule_id, camera_id, alert_type, message, details,
+                           notification_sent, notification_channels_used, timestamp,
+                           status, handled_at, handled_by
+                    FROM alert_history
+                    WHERE ($1::VARCHAR IS NULL OR camera_id = $1)
+                      AND ($2::VARCHAR IS NULL OR alert_type = $2)
+                      {"AND " + seek_sql if seek_sql else ""}
+                    ORDER BY {sort_field} {sort_direction}, id {sort_direction}
+                    LIMIT ${3 + len(seek_params)} OFFSET ${4 + len(seek_params)}
+                    """,  # nosec B608 - sort_field/sort_direction from allowlist
+                    camera_id,
+                    alert_type,
+                    *seek_params,
+                    limit + 1,
+                    0 if keyset is not None else offset,
+                )
+
+                next_cursor = next_cursor_for(
+                    rows,
+                    limit,
+                    key=lambda r: (r[sort_field], r["id"]),
+                    sort_field=sort_field,
+                    descending=descending,
+                )
+                return [self._row_to_alert(row) for row in rows[:limit]], next_cursor
+            finally:
+                await self.pool.release(conn)
+        except Exception as e:
+            logger.error(f"分页查询告警历史失败: {e}")
+            raise RepositoryError(f"分页查询告警历史失败: {e}")
+
+    async def estimate_count(
+        self,
+        camera_id: Optional[str] = None,
+        alert_type: Optional[str] = None,
+    ) -> int:
+        """用规划器统计信息估算告警总数（不执行 COUNT(*)）."""
+        try:
+            conn = await self._get_connection()
+            try:
+                return await estimate_count(
+                    conn,
+                    """
+                    SELECT id FROM alert_history
+                    WHERE ($1::VARCHAR IS NULL OR camera_id = $1)
+                      AND ($2::VARCHAR IS NULL OR alert_type = $2)
+                    """,
+                    camera_id,
+                    alert_type,
+                )
+            finally:
+                await self.pool.release(conn)
+        except Exception as e:
+            logger.error(f"估算告警总数失败: {e}")
+            raise RepositoryError(f"估算告警总数失败: {e}")
+
     async def count(
         self,
         camera_id: Optional[str] = None,
@@ -17,6 +17,10 @@ logger = logging.getLogger(__name__)
 class PostgreSQLDetectionConfigRepository(IDetectionConfigRepository):
     """PostgreSQL检测参数配置仓储实现."""
 
+    # 已确认detection_configs表存在的连接池（进程内只检查一次，避免每次访问都查询information_schema）
+    # 保存连接池对象本身：id() 在连接池被回收后可能被新对象复用
+    _verified_pools: set = set()
+
     def __init__(self, pool: Pool):
         """初始化PostgreSQL检测参数配置仓储.
 
@@ -31,6 +35,8 @@ class PostgreSQLDetectionConfigRepository(IDetectionConfigRepository):
 
     async def _ensure_table_exists(self):
         """确保detection_configs表存在."""
+        if self.pool in self._verified_pools:
+            return
         try:
             conn = await self._get_connection()
             try:
@@ -67,6 +73,7 @@ class PostgreSQLDetectionConfigRepository(IDetectionConfigRepository):
                         raise RepositoryError(f"SQL文件不存在: {sql_file}")
 
                 logger.debug("detection_configs表已确保存在")
+                self._verified_pools.add(self.pool)
             finally:
                 await self.pool.release(conn)
         except Exception as e:
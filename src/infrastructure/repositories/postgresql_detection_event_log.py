@@ -0,0 +1,617 @@
+"""
+检测事件列式日志（PostgreSQL）
+
+把 detection_records.objects 中的每个检测对象展开为一行窄表记录
+（摄像头、track_id、时间、类别、置信度、bbox、发网/洗手/消毒标志），
+按天进行范围分区，时间列使用BRIN索引，写入通过 COPY 批量完成。
+统计查询直接在类型化的列上用SQL聚合，不再逐行解析JSON。
+
+过期分区先汇总到 detection_events_daily 日汇总表再整体DROP，
+因此按天统计在保留期之外仍然可用，且删除旧数据不产生表膨胀。
+"""
+
+import asyncio
+import logging
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EVENT_TABLE = "detection_events"
+ROLLUP_TABLE = "detection_events_daily"
+
+# COPY 列顺序（与 flatten_objects 生成的元组一致）
+EVENT_COLUMNS = (
+    "record_id",
+    "camera_id",
+    "track_id",
+    "ts",
+    "class_name",
+    "confidence",
+    "x1",
+    "y1",
+    "x2",
+    "y2",
+    "has_hairnet",
+    "is_handwashing",
+    "is_sanitizing",
+)
+
+_PARTITION_RE = re.compile(rf"^{EVENT_TABLE}_(\d{{8}})$")
+
+_SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS {EVENT_TABLE} (
+    record_id VARCHAR(255) NOT NULL,
+    camera_id VARCHAR(255) NOT NULL,
+    track_id INTEGER,
+    ts TIMESTAMP NOT NULL,
+    class_name VARCHAR(64) NOT NULL,
+    confidence REAL NOT NULL DEFAULT 0,
+    x1 REAL,
+    y1 REAL,
+    x2 REAL,
+    y2 REAL,
+    has_hairnet BOOLEAN,
+    is_handwashing BOOLEAN,
+    is_sanitizing BOOLEAN
+) PARTITION BY RANGE (ts);
+
+CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+    day DATE NOT NULL,
+    camera_id VARCHAR(255) NOT NULL,
+    class_name VARCHAR(64) NOT NULL,
+    object_count BIGINT NOT NULL DEFAULT 0,
+    record_count BIGINT NOT NULL DEFAULT 0,
+    confidence_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    hairnet_violations BIGINT NOT NULL DEFAULT 0,
+    handwash_events BIGINT NOT NULL DEFAULT 0,
+    sanitize_events BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, camera_id, class_name)
+);
+"""  # nosec B608
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """转换为naive UTC时间（与 detection_records 的 TIMESTAMP 列一致）"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def partition_name(day: date) -> str:
+    """分区表名：detection_events_YYYYMMDD"""
+    return f"{EVENT_TABLE}_{day.strftime('%Y%m%d')}"
+
+
+def partition_day(name: str) -> Optional[date]:
+    """从分区表名解析日期，非分区表返回None"""
+    match = _PARTITION_RE.match(name)
+    if not match:
+        return None
+    return datetime.strptime(match.group(1), "%Y%m%d").date()
+
+
+def _flag(metadata: Dict[str, Any], key: str) -> Optional[bool]:
+    value = metadata.get(key)
+    return None if value is None else bool(value)
+
+
+def _bbox(value: Any) -> Tuple[Optional[float], ...]:
+    """兼容 [x1, y1, x2, y2] 列表与 BoundingBox.to_dict() 两种格式"""
+    try:
+        if isinstance(value, dict):
+            return tuple(float(value[k]) for k in ("x1", "y1", "x2", "y2"))
+        if value is not None and len(value) >= 4:
+            return tuple(float(v) for v in value[:4])
+    except (KeyError, TypeError, ValueError):
+        pass
+    return (None, None, None, None)
+
+
+def _track_id(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def flatten_objects(
+    record_id: str,
+    camera_id: str,
+    timestamp: datetime,
+    objects: Iterable[Dict[str, Any]],
+) -> List[Tuple[Any, ...]]:
+    """
+    将一条检测记录的对象列表展开为事件行
+
+    Args:
+        record_id: 检测记录ID
+        camera_id: 摄像头ID
+        timestamp: 记录时间
+        objects: 对象字典列表（DetectedObject.to_dict() 格式）
+
+    Returns:
+        按 EVENT_COLUMNS 顺序排列的元组列表
+    """
+    ts = _naive_utc(timestamp)
+    rows = []
+    for obj in objects:
+        if not isinstance(obj, dict):
+            continue
+        metadata = obj.get("metadata")
+        if not isinstance(metadata, dict):
+            metadata = {}
+        try:
+            confidence = float(obj.get("confidence") or 0.0)
+        except (TypeError, ValueError):
+            confidence = 0.0
+        rows.append(
+            (
+                str(record_id),
+                camera_id,
+                _track_id(obj.get("track_id")),
+                ts,
+                str(obj.get("class_name") or "unknown")[:64],
+                confidence,
+                *_bbox(obj.get("bbox")),
+                _flag(metadata, "has_hairnet"),
+                _flag(metadata, "is_handwashing"),
+                _flag(metadata, "is_sanitizing"),
+            )
+        )
+    return rows
+
+
+class DetectionEventLog:
+    """
+    检测事件日志写入与查询
+
+    Args:
+        pool_getter: 返回asyncpg连接池的协程函数
+        batch_size: 缓冲行数达到该值时立即COPY
+        flush_interval: 后台刷新间隔（秒）
+        retention_days: 明细分区保留天数，更早的分区汇总后删除
+        max_buffer: 写入失败时最多保留的待写行数（超出后丢弃最旧的行）
+    """
+
+    # 已确认表结构存在的连接池
+    # 保存连接池对象本身：id() 在连接池被回收后可能被新对象复用
+    _verified_pools: set = set()
+
+    def __init__(
+        self,
+        pool_getter: Callable[[], Awaitable[Any]],
+        batch_size: int = 500,
+        flush_interval: float = 2.0,
+        retention_days: int = 30,
+        max_buffer: int = 50000,
+    ):
+        self._pool_getter = pool_getter
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self.retention_days = max(1, int(retention_days))
+        self.max_buffer = max(self.batch_size, int(max_buffer))
+
+        self._buffer: List[Tuple[Any, ...]] = []
+        self._partitions: set = set()
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_requested: Optional[asyncio.Event] = None
+        self._last_retention: Optional[date] = None
+
+        self.stats = {
+            "rows_written": 0,
+            "copy_batches": 0,
+            "dropped_rows": 0,
+            "flush_errors": 0,
+            "partitions_dropped": 0,
+        }
+
+    # ---------------- 表结构 ----------------
+
+    async def _ensure_schema(self, pool) -> None:
+        if pool in self._verified_pools:
+            return
+        async with pool.acquire() as conn:
+            await conn.execute(_SCHEMA_SQL)
+        self._verified_pools.add(pool)
+
+    async def _ensure_partition(self, conn, day: date) -> None:
+        """创建某天的分区（含 ts 的BRIN索引与 camera_id 索引）"""
+        if day in self._partitions:
+            return
+        name = partition_name(day)
+        start = datetime(day.year, day.month, day.day)
+        end = start + timedelta(days=1)
+        await conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {name}
+            PARTITION OF {EVENT_TABLE}
+            FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}');
+
+            CREATE INDEX IF NOT EXISTS {name}_ts_brin
+            ON {name} USING BRIN (ts);
+
+            CREATE INDEX IF NOT EXISTS {name}_camera_class
+            ON {name} (camera_id, class_name);
+            """  # nosec B608
+        )
+        self._partitions.add(day)
+
+    # ---------------- 写入 ----------------
+
+    def append(
+        self,
+        record_id: str,
+        camera_id: str,
+        timestamp: datetime,
+        objects: Iterable[Dict[str, Any]],
+    ) -> int:
+        """
+        缓冲一条检测记录的事件行（不等待写入，达到批量时唤醒后台刷新）
+
+        Returns:
+            新增的事件行数
+        """
+        rows = flatten_objects(record_id, camera_id, timestamp, objects)
+        if not rows:
+            return 0
+        self._buffer.extend(rows)
+        overflow = len(self._buffer) - self.max_buffer
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.stats["dropped_rows"] += overflow
+            logger.warning(f"检测事件缓冲区已满，丢弃 {overflow} 行最旧事件")
+        self._ensure_flush_task()
+        if self.should_flush() and self._flush_requested is not None:
+            self._flush_requested.set()
+        return len(rows)
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def should_flush(self) -> bool:
+        return len(self._buffer) >= self.batch_size
+
+    async def flush(self) -> int:
+        """
+        将缓冲的事件行COPY到分区表
+
+        失败时事件行放回缓冲区，等待下一次刷新重试。
+
+        Returns:
+            写入的行数
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._buffer:
+                return 0
+            rows, self._buffer = self._buffer, []
+            try:
+                pool = await self._pool_getter()
+                await self._ensure_schema(pool)
+                async with pool.acquire() as conn:
+                    for day in sorted({row[3].date() for row in rows}):
+                        await self._ensure_partition(conn, day)
+                    await conn.copy_records_to_table(
+                        EVENT_TABLE, records=rows, columns=list(EVENT_COLUMNS)
+                    )
+            except Exception as e:
+                self._buffer[:0] = rows
+                self.stats["flush_errors"] += 1
+                logger.warning(f"检测事件写入失败，{len(rows)} 行将重试: {e}")
+                return 0
+
+            self.stats["rows_written"] += len(rows)
+            self.stats["copy_batches"] += 1
+            logger.debug(f"检测事件已写入: {len(rows)} 行")
+            return len(rows)
+
+    def _ensure_flush_task(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._flush_requested = asyncio.Event()
+        self._task = loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        """后台刷新：达到批量或超过刷新间隔时写入，每天执行一次保留策略"""
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(
+                        self._flush_requested.wait(), self.flush_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                self._flush_requested.clear()
+                await self.flush()
+                today = datetime.utcnow().date()
+                if self._last_retention != today:
+                    self._last_retention = today
+                    await self.apply_retention()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.warning(f"检测事件后台刷新异常: {e}")
+
+    async def close(self) -> None:
+        """停止后台任务并写入剩余事件"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        await self.flush()
+
+    # ---------------- 保留策略 ----------------
+
+    async def list_partitions(self, conn) -> List[date]:
+        rows = await conn.fetch(
+            """
+            SELECT c.relname AS name
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = $1
+            """,
+            EVENT_TABLE,
+        )
+        days = [partition_day(row["name"]) for row in rows]
+        return sorted(day for day in days if day is not None)
+
+    async def apply_retention(self, today: Optional[date] = None) -> List[date]:
+        """
+        汇总并删除超出保留期的分区
+
+        每个分区在同一事务内：先按 (天, 摄像头, 类别) 汇总写入日汇总表，再DROP。
+
+        Returns:
+            已删除分区的日期列表
+        """
+        today = today or datetime.utcnow().date()
+        cutoff = today - timedelta(days=self.retention_days)
+        pool = await self._pool_getter()
+        await self._ensure_schema(pool)
+        dropped = []
+        async with pool.acquire() as conn:
+            for day in await self.list_partitions(conn):
+                if day >= cutoff:
+                    continue
+                name = partition_name(day)
+                async with conn.transaction():
+                    await conn.execute(
+                        f"""
+                        INSERT INTO {ROLLUP_TABLE} (
+                            day, camera_id, class_name, object_count, record_count,
+                            confidence_sum, hairnet_violations, handwash_events,
+                            sanitize_events
+                        )
+                        SELECT ts::date, camera_id, class_name, COUNT(*),
+                               COUNT(DISTINCT record_id), SUM(confidence),
+                               COUNT(*) FILTER (WHERE has_hairnet IS FALSE),
+                               COUNT(*) FILTER (WHERE is_handwashing),
+                               COUNT(*) FILTER (WHERE is_sanitizing)
+                        FROM {name}
+                        GROUP BY 1, 2, 3
+                        ON CONFLICT (day, camera_id, class_name) DO UPDATE SET
+                            object_count = {ROLLUP_TABLE}.object_count
+                                + EXCLUDED.object_count,
+                            record_count = {ROLLUP_TABLE}.record_count
+                                + EXCLUDED.record_count,
+                            confidence_sum = {ROLLUP_TABLE}.confidence_sum
+                                + EXCLUDED.confidence_sum,
+                            hairnet_violations = {ROLLUP_TABLE}.hairnet_violations
+                                + EXCLUDED.hairnet_violations,
+                            handwash_events = {ROLLUP_TABLE}.handwash_events
+                                + EXCLUDED.handwash_events,
+                            sanitize_events = {ROLLUP_TABLE}.sanitize_events
+                                + EXCLUDED.sanitize_events;
+
+                        DROP TABLE {name};
+                        """  # nosec B608
+                    )
+                self._partitions.discard(day)
+                dropped.append(day)
+
+        if dropped:
+            self.stats["partitions_dropped"] += len(dropped)
+            logger.info(f"检测事件分区已汇总并删除: {[d.isoformat() for d in dropped]}")
+        return dropped
+
+    async def backfill(self, start_time: datetime, end_time: datetime) -> int:
+        """
+        从 detection_records.objects 回填事件（在数据库内用 jsonb 展开，不经过Python）
+
+        区间内已有的事件会先被删除，重复执行结果一致。
+
+        Returns:
+            回填的行数
+        """
+        start_time, end_time = _naive_utc(start_time), _naive_utc(end_time)
+        pool = await self._pool_getter()
+        await self._ensure_schema(pool)
+        async with pool.acquire() as conn:
+            day = start_time.date()
+            while day <= end_time.date():
+                await self._ensure_partition(conn, day)
+                day += timedelta(days=1)
+            async with conn.transaction():
+                # 先删除区间内已有事件，保证重复回填幂等
+                await conn.execute(
+                    f"DELETE FROM {EVENT_TABLE} WHERE ts >= $1 AND ts < $2",  # nosec
+                    start_time,
+                    end_time,
+                )
+                result = await conn.execute(
+                    f"""
+                INSERT INTO {EVENT_TABLE} ({", ".join(EVENT_COLUMNS)})
+                SELECT r.id::text, r.camera_id,
+                       CASE WHEN o->>'track_id' ~ '^-?[0-9]+$'
+                            THEN (o->>'track_id')::int END,
+                       r.timestamp, LEFT(COALESCE(o->>'class_name', 'unknown'), 64),
+                       COALESCE((o->>'confidence')::real, 0),
+                       COALESCE((o->'bbox'->>'x1')::real, (o->'bbox'->>0)::real),
+                       COALESCE((o->'bbox'->>'y1')::real, (o->'bbox'->>1)::real),
+                       COALESCE((o->'bbox'->>'x2')::real, (o->'bbox'->>2)::real),
+                       COALESCE((o->'bbox'->>'y2')::real, (o->'bbox'->>3)::real),
+                       (o->'metadata'->>'has_hairnet')::boolean,
+                       (o->'metadata'->>'is_handwashing')::boolean,
+                       (o->'metadata'->>'is_sanitizing')::boolean
+                FROM detection_records r
+                CROSS JOIN LATERAL jsonb_array_elements(r.objects) AS o
+                WHERE r.timestamp >= $1 AND r.timestamp < $2
+                  AND jsonb_typeof(r.objects) = 'array'
+                """,  # nosec B608
+                    start_time,
+                    end_time,
+                )
+        count = int(result.split()[-1]) if result else 0
+        logger.info(f"检测事件回填完成: {count} 行")
+        return count
+
+    # ---------------- 查询 ----------------
+
+    @staticmethod
+    def _where(
+        camera_id: Optional[str],
+        start: Any,
+        end: Any,
+        ts_column: str,
+        first_param: int = 1,
+    ) -> Tuple[str, List[Any]]:
+        """构建WHERE子句，参数编号从 first_param 开始"""
+        conditions, params = [], []
+        for column, op, value in (
+            ("camera_id", "=", camera_id),
+            (ts_column, ">=", start),
+            (ts_column, "<=", end),
+        ):
+            if value:
+                params.append(value)
+                conditions.append(f"{column} {op} ${first_param + len(params) - 1}")
+        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+        return where, params
+
+    async def covered_since(self) -> Optional[date]:
+        """
+        事件日志覆盖的最早日期（明细分区与日汇总表中最早的一天）
+
+        该日期之后的每一天都由事件日志统计；更早的数据只存在于 detection_records。
+        事件日志为空时返回None。
+        """
+        pool = await self._pool_getter()
+        await self._ensure_schema(pool)
+        async with pool.acquire() as conn:
+            days = await self.list_partitions(conn)
+            rollup_day = await conn.fetchval(
+                f"SELECT MIN(day) FROM {ROLLUP_TABLE}"  # nosec B608
+            )
+        candidates = [d for d in (days[0] if days else None, rollup_day) if d]
+        return min(candidates) if candidates else None
+
+    async def daily_class_counts(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        camera_id: Optional[str] = None,
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        按天、按类别统计对象数（明细分区 + 已汇总的历史分区）
+
+        Returns:
+            {"YYYY-MM-DD": {class_name: count}}
+        """
+        pool = await self._pool_getter()
+        await self._ensure_schema(pool)
+        start_time = _naive_utc(start_time) if start_time else None
+        end_time = _naive_utc(end_time) if end_time else None
+        event_where, event_params = self._where(camera_id, start_time, end_time, "ts")
+        rollup_where, rollup_params = self._where(
+            camera_id,
+            start_time.date() if start_time else None,
+            end_time.date() if end_time else None,
+            "day",
+            first_param=len(event_params) + 1,
+        )
+        params = event_params + rollup_params
+        sql = f"""
+        SELECT day, class_name, SUM(n)::bigint AS n FROM (
+            SELECT ts::date AS day, class_name, COUNT(*) AS n
+            FROM {EVENT_TABLE} {event_where}
+            GROUP BY 1, 2
+            UNION ALL
+            SELECT day, class_name, object_count AS n
+            FROM {ROLLUP_TABLE} {rollup_where}
+        ) t
+        GROUP BY 1, 2
+        """  # nosec B608
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(sql, *params)
+        result: Dict[str, Dict[str, int]] = {}
+        for row in rows:
+            result.setdefault(row["day"].isoformat(), {})[row["class_name"]] = int(
+                row["n"]
+            )
+        return result
+
+    async def class_statistics(
+        self,
+        camera_id: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        按类别统计对象数、平均置信度及发网/洗手/消毒标志数（仅明细分区）
+        """
+        pool = await self._pool_getter()
+        await self._ensure_schema(pool)
+        where, params = self._where(
+            camera_id,
+            _naive_utc(start_time) if start_time else None,
+            _naive_utc(end_time) if end_time else None,
+            "ts",
+        )
+        sql = f"""
+        SELECT class_name,
+               COUNT(*) AS n,
+               AVG(confidence) AS avg_confidence,
+               COUNT(*) FILTER (WHERE has_hairnet IS FALSE) AS hairnet_violations,
+               COUNT(*) FILTER (WHERE is_handwashing) AS handwash_events,
+               COUNT(*) FILTER (WHERE is_sanitizing) AS sanitize_events
+        FROM {EVENT_TABLE} {where}
+        GROUP BY class_name
+        """  # nosec B608
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(sql, *params)
+
+        counts_by_class = {}
+        totals = {"hairnet_violations": 0, "handwash_events": 0, "sanitize_events": 0}
+        for row in rows:
+            counts_by_class[row["class_name"]] = {
+                "count": int(row["n"]),
+                "avg_confidence": float(row["avg_confidence"] or 0.0),
+            }
+            for key in totals:
+                totals[key] += int(row[key] or 0)
+        return {
+            "total_objects": sum(c["count"] for c in counts_by_class.values()),
+            "counts_by_class": counts_by_class,
+            **totals,
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "pending_rows": len(self._buffer),
+            "known_partitions": len(self._partitions),
+            "retention_days": self.retention_days,
+        }
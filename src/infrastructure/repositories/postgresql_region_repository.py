@@ -16,6 +16,10 @@ logger = logging.getLogger(__name__)
 class PostgreSQLRegionRepository(IRegionRepository):
     """PostgreSQL区域仓储实现."""
 
+    # 已确认regions表存在的连接池（进程内只检查一次，避免每次访问都查询information_schema）
+    # 保存连接池对象本身：id() 在连接池被回收后可能被新对象复用
+    _verified_pools: set = set()
+
     def __init__(self, pool: Pool):
         """初始化PostgreSQL区域仓储.
 
@@ -30,6 +34,8 @@ class PostgreSQLRegionRepository(IRegionRepository):
 
     async def _ensure_table_exists(self):
         """确保regions表存在."""
+        if self.pool in self._verified_pools:
+            return
         try:
             conn = await self._get_connection()
             try:
@@ -76,6 +82,7 @@ class PostgreSQLRegionRepository(IRegionRepository):
                     logger.info("regions表已创建")
 
                 logger.debug("regions表已确保存在")
+                self._verified_pools.add(self.pool)
             finally:
                 await self.pool.release(conn)
         except Exception as e:
@@ -121,6 +128,7 @@ class PostgreSQLRegionRepository(IRegionRepository):
             # 将camera_id存储在metadata中
             if row["camera_id"]:
                 metadata["camera_id"] = row["camera_id"]
+            region.camera_id = row["camera_id"]
 
             return region
         except Exception as e:
@@ -2,6 +2,21 @@
 基础设施层存储实现。
 """
 
+from .compute_budget_store import ComputeBudgetStore
+from .dataset_manifest import DatasetCatalog, DatasetManifest
 from .filesystem_snapshot_storage import FileSystemSnapshotStorage
+from .review_queue import ReviewQueue, ReviewQueueJanitor
+from .snapshot_encode_pool import SnapshotBackpressureError
+from .snapshot_janitor import SnapshotJanitor, SnapshotRetentionPolicy
 
-__all__ = ["FileSystemSnapshotStorage"]
+__all__ = [
+    "ComputeBudgetStore",
+    "DatasetCatalog",
+    "DatasetManifest",
+    "FileSystemSnapshotStorage",
+    "ReviewQueue",
+    "ReviewQueueJanitor",
+    "SnapshotBackpressureError",
+    "SnapshotJanitor",
+    "SnapshotRetentionPolicy",
+]
@@ -0,0 +1,127 @@
+"""
+主机级算力预算状态（SQLite）。
+
+同一主机上的每个摄像头检测进程定期写入自己的负载信号（运动强度、人数、
+违规、优先级、单帧耗时、可处理帧率），读取其他进程的信号后按相同规则计算
+分配结果，并把自己的分配写回，供 API 查看。数据库以 WAL 模式存储，多个检测
+进程与 API 进程可以同时读写；超过存活期未上报的摄像头视为已退出。
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cameras (
+    camera_id TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    priority REAL NOT NULL,
+    motion REAL NOT NULL,
+    persons REAL NOT NULL,
+    violation_active INTEGER NOT NULL,
+    cost_ms REAL NOT NULL,
+    max_fps REAL NOT NULL,
+    weight REAL,
+    allocated_fps REAL,
+    allocated_ms REAL,
+    budget_ms REAL,
+    reason TEXT,
+    granted INTEGER NOT NULL DEFAULT 0,
+    denied INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_REPORT_COLUMNS = (
+    "pid",
+    "updated_at",
+    "priority",
+    "motion",
+    "persons",
+    "violation_active",
+    "cost_ms",
+    "max_fps",
+    "granted",
+    "denied",
+)
+_ALLOCATION_COLUMNS = ("weight", "allocated_fps", "allocated_ms", "budget_ms", "reason")
+
+
+class ComputeBudgetStore:
+    """摄像头负载信号与分配结果（每次操作独立连接，可跨进程共享）。"""
+
+    def __init__(self, root: Optional[str] = None) -> None:
+        self.root = Path(root or os.getenv("COMPUTE_BUDGET_DIR", "data/compute_budget"))
+        self.db_path = self.root / "budget.db"
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def report(self, camera_id: str, signals: Dict[str, Any]) -> None:
+        """写入（覆盖）摄像头最新的负载信号。"""
+        values = [signals[c] for c in _REPORT_COLUMNS]
+        assignments = ", ".join(f"{c} = excluded.{c}" for c in _REPORT_COLUMNS)
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT INTO cameras (camera_id, {', '.join(_REPORT_COLUMNS)}) "
+                f"VALUES (?{', ?' * len(_REPORT_COLUMNS)}) "
+                f"ON CONFLICT(camera_id) DO UPDATE SET {assignments}",
+                [camera_id, *values],
+            )
+
+    def set_allocation(self, camera_id: str, allocation: Dict[str, Any]) -> None:
+        assignments = ", ".join(f"{c} = ?" for c in _ALLOCATION_COLUMNS)
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE cameras SET {assignments} WHERE camera_id = ?",
+                [*(allocation.get(c) for c in _ALLOCATION_COLUMNS), camera_id],
+            )
+
+    def live(self, max_age: float, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """最近 max_age 秒内上报过的摄像头（按 camera_id 排序，保证各进程计算一致）。"""
+        cutoff = (time.time() if now is None else now) - max_age
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM cameras WHERE updated_at >= ? ORDER BY camera_id",
+                (cutoff,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def remove(self, camera_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cameras WHERE camera_id = ?", (camera_id,))
+
+    def purge(self, max_age: float) -> int:
+        """删除长期未上报的摄像头记录。"""
+        with self._connect() as conn:
+            return conn.execute(
+                "DELETE FROM cameras WHERE updated_at < ?", (time.time() - max_age,)
+            ).rowcount
+
+
+_compute_budget_store: Optional[ComputeBudgetStore] = None
+
+
+def get_compute_budget_store() -> ComputeBudgetStore:
+    """获取进程级算力预算状态存储。"""
+    global _compute_budget_store
+    if _compute_budget_store is None:
+        _compute_budget_store = ComputeBudgetStore()
+    return _compute_budget_store
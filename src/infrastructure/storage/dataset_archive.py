@@ -0,0 +1,321 @@
+"""
+按清单流式生成数据集归档（zip / tar）。
+
+归档不落盘：根据清单中每个文件的大小、修改时间与 CRC32 预先算出完整的字节布局，
+总长度在发送第一个字节前即可确定，因此可以设置 Content-Length 并支持 HTTP Range 续传。
+- zip：STORED（图片本身已压缩），条目或偏移超过 4GB 时写入 zip64 扩展；
+- tar：PAX 格式，每个条目 512 字节对齐。
+
+头部按需生成，数据按块读取，内存占用与数据集大小无关。
+"""
+
+from __future__ import annotations
+
+import bisect
+import os
+import struct
+import tarfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP_MAX_ENTRIES = 0xFFFF
+_UNIX_FILE_ATTR = 0o100644 << 16
+
+
+class ArchiveSourceChanged(OSError):
+    """归档生成过程中源文件与清单不一致（被修改或删除）。"""
+
+
+class RangeNotSatisfiable(ValueError):
+    """Range 请求超出归档长度。"""
+
+
+@dataclass(frozen=True)
+class ArchiveEntry:
+    """归档中的一个文件（name 为归档内的 posix 相对路径）。"""
+
+    name: str
+    path: Path
+    size: int
+    mtime_ns: int
+    crc32: int
+
+    @property
+    def mtime(self) -> float:
+        return self.mtime_ns / 1e9
+
+
+def parse_range(header: Optional[str], total: int) -> Optional[Tuple[int, int]]:
+    """解析单段 Range 请求头，返回闭区间 (start, end)。
+
+    无 Range、格式不支持或多段请求时返回 None（按完整内容响应）；
+    起点超出长度时抛出 RangeNotSatisfiable。
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes=") :].strip()
+    if "," in spec or "-" not in spec:
+        return None
+    first, _, last = spec.partition("-")
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable(header)
+            return max(total - suffix, 0), total - 1
+        start = int(first)
+        end = int(last) if last else total - 1
+    except ValueError:
+        return None
+    if start >= total or end < start:
+        raise RangeNotSatisfiable(header)
+    return start, min(end, total - 1)
+
+
+class StreamingArchive:
+    """归档布局基类：段列表为 (偏移, 长度, 类型, 条目序号)。"""
+
+    media_type = "application/octet-stream"
+    suffix = ""
+
+    def __init__(self, entries: Sequence[ArchiveEntry]) -> None:
+        self.entries = list(entries)
+        self._segments: List[Tuple[int, int, str, int]] = []
+        self._offsets: List[int] = []
+        self.size = 0
+        self._layout()
+
+    def _add(self, kind: str, length: int, index: int = -1) -> None:
+        if length <= 0:
+            return
+        self._segments.append((self.size, length, kind, index))
+        self._offsets.append(self.size)
+        self.size += length
+
+    def _layout(self) -> None:
+        raise NotImplementedError
+
+    def _render(self, kind: str, index: int, length: int) -> bytes:
+        raise NotImplementedError
+
+    def iter_bytes(
+        self,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Iterator[bytes]:
+        """按块产出 [start, end] 闭区间内的归档字节。"""
+        end = self.size - 1 if end is None else min(end, self.size - 1)
+        if start > end:
+            return
+        position = start
+        i = max(bisect.bisect_right(self._offsets, start) - 1, 0)
+        while position <= end and i < len(self._segments):
+            offset, length, kind, index = self._segments[i]
+            lo = position - offset
+            hi = min(length, end - offset + 1)
+            if kind == "data":
+                yield from self._read_entry(self.entries[index], lo, hi, chunk_size)
+            else:
+                yield self._render(kind, index, length)[lo:hi]
+            position = offset + hi
+            i += 1
+
+    @staticmethod
+    def _read_entry(
+        entry: ArchiveEntry, lo: int, hi: int, chunk_size: int
+    ) -> Iterator[bytes]:
+        try:
+            f = open(entry.path, "rb")
+        except OSError as e:
+            raise ArchiveSourceChanged(f"数据集文件已不存在: {entry.name}") from e
+        with f:
+            # 同样大小的改写也会使已发出的 CRC32 失效，需同时比较修改时间
+            st = os.fstat(f.fileno())
+            if st.st_size != entry.size or st.st_mtime_ns != entry.mtime_ns:
+                raise ArchiveSourceChanged(f"数据集文件已变化: {entry.name}")
+            f.seek(lo)
+            remaining = hi - lo
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    raise ArchiveSourceChanged(f"数据集文件被截断: {entry.name}")
+                remaining -= len(chunk)
+                yield chunk
+
+
+class ZipStreamingArchive(StreamingArchive):
+    """STORED zip（必要时 zip64）。"""
+
+    media_type = "application/zip"
+    suffix = ".zip"
+
+    def _layout(self) -> None:
+        self._local_offsets: List[int] = []
+        for i, entry in enumerate(self.entries):
+            self._local_offsets.append(self.size)
+            self._add("local", len(self._local_header(i)), i)
+            self._add("data", entry.size, i)
+        self._cd_offset = self.size
+        for i in range(len(self.entries)):
+            self._add("central", len(self._central_header(i)), i)
+        self._cd_size = self.size - self._cd_offset
+        self._add("end", len(self._end_records()))
+
+    def _render(self, kind: str, index: int, length: int) -> bytes:
+        if kind == "local":
+            return self._local_header(index)
+        if kind == "central":
+            return self._central_header(index)
+        return self._end_records()
+
+    @staticmethod
+    def _dos_time(mtime: float) -> Tuple[int, int]:
+        t = time.localtime(mtime)
+        if t.tm_year < 1980:
+            return 0, (0 << 9) | (1 << 5) | 1
+        dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+        dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+        return dos_time, dos_date
+
+    def _local_header(self, index: int) -> bytes:
+        entry = self.entries[index]
+        name = entry.name.encode("utf-8")
+        dos_time, dos_date = self._dos_time(entry.mtime)
+        extra = b""
+        size = entry.size
+        version = 20
+        if size >= ZIP64_LIMIT:
+            extra = struct.pack("<HHQQ", 0x0001, 16, size, size)
+            size = 0xFFFFFFFF
+            version = 45
+        header = struct.pack(
+            "<IHHHHHIIIHH",
+            0x04034B50,
+            version,
+            0x0800,
+            0,
+            dos_time,
+            dos_date,
+            entry.crc32,
+            size,
+            size,
+            len(name),
+            len(extra),
+        )
+        return header + name + extra
+
+    def _central_header(self, index: int) -> bytes:
+        entry = self.entries[index]
+        name = entry.name.encode("utf-8")
+        dos_time, dos_date = self._dos_time(entry.mtime)
+        size = entry.size
+        offset = self._local_offsets[index]
+        fields = []
+        if size >= ZIP64_LIMIT:
+            fields += [size, size]
+            size = 0xFFFFFFFF
+        if offset >= ZIP64_LIMIT:
+            fields.append(offset)
+            offset = 0xFFFFFFFF
+        extra = b""
+        version = 20
+        if fields:
+            extra = struct.pack(f"<HH{len(fields)}Q", 0x0001, 8 * len(fields), *fields)
+            version = 45
+        header = struct.pack(
+            "<IHHHHHHIIIHHHHHII",
+            0x02014B50,
+            (3 << 8) | 45,
+            version,
+            0x0800,
+            0,
+            dos_time,
+            dos_date,
+            entry.crc32,
+            size,
+            size,
+            len(name),
+            len(extra),
+            0,
+            0,
+            0,
+            _UNIX_FILE_ATTR,
+            offset,
+        )
+        return header + name + extra
+
+    def _end_records(self) -> bytes:
+        count = len(self.entries)
+        cd_offset, cd_size = self._cd_offset, self._cd_size
+        records = b""
+        if (
+            count >= ZIP_MAX_ENTRIES
+            or cd_offset >= ZIP64_LIMIT
+            or cd_size >= ZIP64_LIMIT
+        ):
+            zip64_offset = cd_offset + cd_size
+            records += struct.pack(
+                "<IQHHIIQQQQ",
+                0x06064B50,
+                44,
+                45,
+                45,
+                0,
+                0,
+                count,
+                count,
+                cd_size,
+                cd_offset,
+            )
+            records += struct.pack("<IIQI", 0x07064B50, 0, zip64_offset, 1)
+            count = min(count, ZIP_MAX_ENTRIES)
+            cd_offset = min(cd_offset, ZIP64_LIMIT)
+            cd_size = min(cd_size, ZIP64_LIMIT)
+        records += struct.pack(
+            "<IHHHHIIH", 0x06054B50, 0, 0, count, count, cd_size, cd_offset, 0
+        )
+        return records
+
+
+class TarStreamingArchive(StreamingArchive):
+    """PAX 格式 tar。"""
+
+    media_type = "application/x-tar"
+    suffix = ".tar"
+
+    def _layout(self) -> None:
+        for i, entry in enumerate(self.entries):
+            self._add("header", len(self._header(i)), i)
+            self._add("data", entry.size, i)
+            self._add("pad", -entry.size % tarfile.BLOCKSIZE)
+        self._add("pad", 2 * tarfile.BLOCKSIZE)
+        self._add("pad", -self.size % tarfile.RECORDSIZE)
+
+    def _header(self, index: int) -> bytes:
+        entry = self.entries[index]
+        info = tarfile.TarInfo(entry.name)
+        info.size = entry.size
+        info.mtime = int(entry.mtime)
+        info.mode = 0o644
+        return info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+
+    def _render(self, kind: str, index: int, length: int) -> bytes:
+        if kind == "header":
+            return self._header(index)
+        return bytes(length)
+
+
+ARCHIVE_FORMATS = {"zip": ZipStreamingArchive, "tar": TarStreamingArchive}
+
+
+def build_archive(fmt: str, entries: Sequence[ArchiveEntry]) -> StreamingArchive:
+    """按格式名构建流式归档。"""
+    try:
+        return ARCHIVE_FORMATS[fmt](entries)
+    except KeyError:
+        raise ValueError(f"不支持的归档格式: {fmt}") from None
@@ -0,0 +1,600 @@
+"""
+数据集清单索引（SQLite）。
+
+每个数据集一个 SQLite 文件，记录：
+- files：相对路径、大小、修改时间、CRC32、图片宽高、YOLO 标签数量；
+- labels：每张图片各类别的标注框数量（images/ → labels/*.txt）；
+- annotations：annotations.csv 的逐行内容，按 image_path 与 files 关联。
+
+清单在入库（上传/生成）时构建一次，之后按 stat 增量刷新：只有大小或修改时间
+变化的文件才会重新读取。样本分页、违规类型筛选、统计都是索引查询，
+流式下载（见 dataset_archive）直接使用清单中的大小与 CRC32。
+"""
+
+from __future__ import annotations
+
+import csv
+import logging
+import os
+import re
+import sqlite3
+import stat
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .dataset_archive import ArchiveEntry
+
+logger = logging.getLogger(__name__)
+
+ANNOTATIONS_FILE = "annotations.csv"
+NON_SAMPLE_FILES = {ANNOTATIONS_FILE, "data.yaml"}
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp"}
+_CRC_CHUNK = 1 << 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    crc32 INTEGER NOT NULL,
+    is_image INTEGER NOT NULL,
+    is_sample INTEGER NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    label_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_files_sample ON files(is_sample, is_image, name, path);
+CREATE TABLE IF NOT EXISTS labels (
+    path TEXT NOT NULL,
+    class_id INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (path, class_id)
+);
+CREATE TABLE IF NOT EXISTS annotations (
+    path TEXT PRIMARY KEY,
+    has_violation INTEGER NOT NULL,
+    violation_type TEXT NOT NULL,
+    camera_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    record_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_annotations_violation_type ON annotations(violation_type);
+CREATE INDEX IF NOT EXISTS idx_annotations_has_violation ON annotations(has_violation);
+CREATE INDEX IF NOT EXISTS idx_annotations_camera ON annotations(camera_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def label_path_for(image_path: str) -> str:
+    """YOLO 约定：images/.../x.jpg 对应 labels/.../x.txt。"""
+    parts = image_path.split("/")
+    for i in range(len(parts) - 2, -1, -1):
+        if parts[i] == "images":
+            parts[i] = "labels"
+            break
+    parts[-1] = os.path.splitext(parts[-1])[0] + ".txt"
+    return "/".join(parts)
+
+
+def _is_sample(path: str) -> bool:
+    parts = path.split("/")
+    return parts[-1] not in NON_SAMPLE_FILES and not any(
+        p.startswith(".") for p in parts
+    )
+
+
+def _file_crc32(full_path: str) -> int:
+    crc = 0
+    with open(full_path, "rb") as f:
+        while True:
+            chunk = f.read(_CRC_CHUNK)
+            if not chunk:
+                return crc
+            crc = zlib.crc32(chunk, crc)
+
+
+def _image_size(full_path: str) -> Tuple[Optional[int], Optional[int]]:
+    """只读取图片头获取宽高。"""
+    try:
+        from PIL import Image
+
+        with Image.open(full_path) as img:
+            return img.size
+    except Exception:
+        return None, None
+
+
+def _count_labels(full_path: str) -> Counter:
+    counts: Counter = Counter()
+    try:
+        with open(full_path, "r", encoding="utf-8") as f:
+            for line in f:
+                token = line.split(maxsplit=1)[0] if line.strip() else ""
+                if token:
+                    try:
+                        counts[int(float(token))] += 1
+                    except ValueError:
+                        continue
+    except OSError:
+        pass
+    return counts
+
+
+def _normalize_annotation_path(path: str) -> str:
+    path = path.replace("\\", "/")
+    while path.startswith("./"):
+        path = path[2:]
+    return path
+
+
+class DatasetManifest:
+    """单个数据集的清单（每次操作独立连接，可在线程池中并发读取）。"""
+
+    def __init__(self, db_path: Path, root: Path) -> None:
+        self.db_path = Path(db_path)
+        self.root = Path(root)
+        self.refreshed_at: Optional[float] = None
+        self._refresh_lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _get_meta(conn: sqlite3.Connection, key: str) -> Optional[str]:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _set_meta(conn: sqlite3.Connection, key: str, value: Any) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value))
+        )
+
+    @property
+    def version(self) -> int:
+        with self._connect() as conn:
+            return int(self._get_meta(conn, "version") or 0)
+
+    def is_stale(self, max_age: float) -> bool:
+        return (
+            self.refreshed_at is None or time.monotonic() - self.refreshed_at > max_age
+        )
+
+    def _scan(self) -> Dict[str, os.stat_result]:
+        found: Dict[str, os.stat_result] = {}
+        root = str(self.root)
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                full = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                if stat.S_ISREG(st.st_mode):
+                    found[os.path.relpath(full, root).replace(os.sep, "/")] = st
+        return found
+
+    def refresh(self) -> Dict[str, int]:
+        """按 stat 增量同步清单，返回新增/更新/删除的文件数。"""
+        with self._refresh_lock:
+            with self._connect() as conn:
+                report = self._refresh(conn)
+            self.refreshed_at = time.monotonic()
+        if report["added"] or report["updated"] or report["removed"]:
+            logger.info(f"数据集清单已更新: {self.root}, {report}")
+        return report
+
+    def _refresh(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        if self._get_meta(conn, "root") != str(self.root):
+            conn.execute("DELETE FROM files")
+            conn.execute("DELETE FROM labels")
+            conn.execute("DELETE FROM annotations")
+            conn.execute("DELETE FROM meta WHERE key != 'version'")
+        existing = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in conn.execute(
+                "SELECT path, size, mtime_ns FROM files"
+            )
+        }
+        seen = self._scan() if self.root.is_dir() else {}
+        changed = [
+            path
+            for path, st in seen.items()
+            if existing.get(path) != (st.st_size, st.st_mtime_ns)
+        ]
+        removed = [path for path in existing if path not in seen]
+
+        rows = []
+        for path in changed:
+            row = self._read_file(path, seen[path])
+            if row is None:
+                seen.pop(path)
+                if path in existing:
+                    removed.append(path)
+            else:
+                rows.append(row)
+        if removed:
+            conn.executemany(
+                "DELETE FROM files WHERE path = ?", [(p,) for p in removed]
+            )
+            conn.executemany(
+                "DELETE FROM labels WHERE path = ?", [(p,) for p in removed]
+            )
+        conn.executemany(
+            "INSERT OR REPLACE INTO files (path, name, size, mtime_ns, crc32, is_image,"
+            " is_sample, width, height, label_count)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+            rows,
+        )
+        self._refresh_labels(conn, seen, set(changed) | set(removed))
+
+        annotations_signature = ""
+        if ANNOTATIONS_FILE in seen:
+            st = seen[ANNOTATIONS_FILE]
+            annotations_signature = f"{st.st_size}:{st.st_mtime_ns}"
+        annotations_changed = annotations_signature != (
+            self._get_meta(conn, "annotations") or ""
+        )
+        if annotations_changed:
+            self._load_annotations(conn)
+            self._set_meta(conn, "annotations", annotations_signature)
+
+        report = {
+            "added": len([p for p in changed if p not in existing]),
+            "updated": len([p for p in changed if p in existing]),
+            "removed": len(removed),
+        }
+        if any(report.values()) or annotations_changed:
+            version = int(self._get_meta(conn, "version") or 0) + 1
+            self._set_meta(conn, "version", version)
+            self._set_meta(conn, "built_at", time.time())
+        self._set_meta(conn, "root", self.root)
+        return report
+
+    def _read_file(self, path: str, st: os.stat_result) -> Optional[Tuple]:
+        full = str(self.root / path)
+        is_image = os.path.splitext(path)[1].lower() in IMAGE_SUFFIXES
+        try:
+            crc = _file_crc32(full)
+        except OSError as e:
+            logger.warning(f"读取数据集文件失败，已跳过: {full}, {e}")
+            return None
+        width, height = _image_size(full) if is_image else (None, None)
+        return (
+            path,
+            path.rsplit("/", 1)[-1],
+            st.st_size,
+            st.st_mtime_ns,
+            crc,
+            int(is_image),
+            int(_is_sample(path)),
+            width,
+            height,
+        )
+
+    def _refresh_labels(
+        self,
+        conn: sqlite3.Connection,
+        seen: Dict[str, os.stat_result],
+        dirty: Iterable[str],
+    ) -> None:
+        """重新统计图片本身或其标签文件发生变化的图片。"""
+        dirty = set(dirty)
+        if not dirty:
+            return
+        images = {
+            path for path in seen if os.path.splitext(path)[1].lower() in IMAGE_SUFFIXES
+        }
+        label_to_image = {label_path_for(path): path for path in images}
+        targets = set()
+        for path in dirty:
+            if path in images:
+                targets.add(path)
+            elif path in label_to_image:
+                targets.add(label_to_image[path])
+        for image in targets:
+            conn.execute("DELETE FROM labels WHERE path = ?", (image,))
+            label_file = label_path_for(image)
+            counts = (
+                _count_labels(str(self.root / label_file))
+                if label_file in seen
+                else Counter()
+            )
+            conn.executemany(
+                "INSERT INTO labels (path, class_id, count) VALUES (?, ?, ?)",
+                [(image, class_id, count) for class_id, count in counts.items()],
+            )
+            conn.execute(
+                "UPDATE files SET label_count = ? WHERE path = ?",
+                (sum(counts.values()), image),
+            )
+
+    def _load_annotations(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM annotations")
+        annotations_file = self.root / ANNOTATIONS_FILE
+        if not annotations_file.exists():
+            return
+        rows: Dict[str, Tuple] = {}
+        try:
+            with annotations_file.open("r", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    image_path = row.get("image_path", "")
+                    if not image_path:
+                        continue
+                    path = _normalize_annotation_path(image_path)
+                    rows[path] = (
+                        path,
+                        int(
+                            (row.get("has_violation") or "False").lower()
+                            in ("true", "1", "yes")
+                        ),
+                        row.get("violation_type") or "",
+                        row.get("camera_id") or "",
+                        row.get("timestamp") or "",
+                        row.get("record_id") or "",
+                    )
+        except Exception as e:
+            logger.warning(f"读取标注文件失败: {e}")
+        conn.executemany(
+            "INSERT INTO annotations (path, has_violation, violation_type, camera_id,"
+            " timestamp, record_id) VALUES (?, ?, ?, ?, ?, ?)",
+            rows.values(),
+        )
+
+    def query_samples(
+        self,
+        file_type: Optional[str] = "image",
+        violation_type: Optional[str] = None,
+        has_violation: Optional[bool] = None,
+        camera_id: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """分页查询样本（按文件名排序），返回 (样本列表, 总数)。"""
+        clauses = ["f.is_sample = 1"]
+        params: List[Any] = []
+        if file_type == "image":
+            clauses.append("f.is_image = 1")
+        if violation_type:
+            clauses.append("a.violation_type = ?")
+            params.append(violation_type)
+        if has_violation is not None:
+            clauses.append("COALESCE(a.has_violation, 0) = ?")
+            params.append(int(has_violation))
+        if camera_id:
+            clauses.append("a.camera_id = ?")
+            params.append(camera_id)
+        where = " AND ".join(clauses)
+        base = f"FROM files f LEFT JOIN annotations a ON a.path = f.path WHERE {where}"
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) {base}", params).fetchone()[0]
+            rows = conn.execute(
+                "SELECT f.path, f.name, f.size, f.width, f.height, f.label_count,"
+                " a.has_violation, a.violation_type, a.camera_id, a.timestamp,"
+                f" a.record_id {base} ORDER BY f.name, f.path LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            ).fetchall()
+            labels: Dict[str, Dict[str, int]] = {}
+            paths = [row[0] for row in rows if row[5]]
+            if paths:
+                marks = ",".join("?" * len(paths))
+                for path, class_id, count in conn.execute(
+                    f"SELECT path, class_id, count FROM labels WHERE path IN ({marks})",
+                    paths,
+                ):
+                    labels.setdefault(path, {})[str(class_id)] = count
+        samples = [
+            {
+                "name": name,
+                "path": path,
+                "size": size,
+                "width": width,
+                "height": height,
+                "label_count": label_count,
+                "labels": labels.get(path, {}),
+                "has_violation": bool(has),
+                "violation_type": vtype or "",
+                "camera_id": camera or "",
+                "timestamp": ts or "",
+                "record_id": record or "",
+            }
+            for (
+                path,
+                name,
+                size,
+                width,
+                height,
+                label_count,
+                has,
+                vtype,
+                camera,
+                ts,
+                record,
+            ) in rows
+        ]
+        return samples, total
+
+    def stats(self) -> Dict[str, Any]:
+        """数据集统计（文件/图片数量与大小、违规分布、类别分布、分辨率）。"""
+        with self._connect() as conn:
+            files, total_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files"
+            ).fetchone()
+            images, image_bytes, labeled, instances = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0),"
+                " COALESCE(SUM(label_count > 0), 0), COALESCE(SUM(label_count), 0)"
+                " FROM files WHERE is_image = 1"
+            ).fetchone()
+            annotated, violations = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(a.has_violation), 0)"
+                " FROM annotations a JOIN files f ON f.path = a.path"
+            ).fetchone()
+            violation_types = dict(
+                conn.execute(
+                    "SELECT a.violation_type, COUNT(*) FROM annotations a"
+                    " JOIN files f ON f.path = a.path WHERE a.has_violation = 1"
+                    " GROUP BY a.violation_type ORDER BY COUNT(*) DESC"
+                ).fetchall()
+            )
+            cameras = dict(
+                conn.execute(
+                    "SELECT a.camera_id, COUNT(*) FROM annotations a"
+                    " JOIN files f ON f.path = a.path"
+                    " GROUP BY a.camera_id ORDER BY COUNT(*) DESC"
+                ).fetchall()
+            )
+            label_classes = {
+                str(class_id): count
+                for class_id, count in conn.execute(
+                    "SELECT class_id, SUM(count) FROM labels GROUP BY class_id"
+                    " ORDER BY class_id"
+                )
+            }
+            resolutions = [
+                {"width": w, "height": h, "count": c}
+                for w, h, c in conn.execute(
+                    "SELECT width, height, COUNT(*) FROM files"
+                    " WHERE is_image = 1 AND width IS NOT NULL"
+                    " GROUP BY width, height ORDER BY COUNT(*) DESC LIMIT 10"
+                )
+            ]
+            version = int(self._get_meta(conn, "version") or 0)
+            built_at = self._get_meta(conn, "built_at")
+        return {
+            "version": version,
+            "built_at": float(built_at) if built_at else None,
+            "files": files,
+            "total_bytes": total_bytes,
+            "images": images,
+            "image_bytes": image_bytes,
+            "labeled_images": labeled,
+            "label_instances": instances,
+            "label_classes": label_classes,
+            "annotated_images": annotated,
+            "violations": violations,
+            "violation_types": violation_types,
+            "cameras": cameras,
+            "resolutions": resolutions,
+        }
+
+    def list_files(self) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            return [
+                {"name": name, "path": path, "size": size}
+                for path, name, size in conn.execute(
+                    "SELECT path, name, size FROM files ORDER BY path"
+                )
+            ]
+
+    def archive_snapshot(self) -> Tuple[int, List[ArchiveEntry]]:
+        """清单版本与按路径排序的归档条目（同一版本的归档字节完全一致）。"""
+        with self._connect() as conn:
+            version = int(self._get_meta(conn, "version") or 0)
+            entries = [
+                ArchiveEntry(
+                    name=path,
+                    path=self.root / path,
+                    size=size,
+                    mtime_ns=mtime_ns,
+                    crc32=crc,
+                )
+                for path, size, mtime_ns, crc in conn.execute(
+                    "SELECT path, size, mtime_ns, crc32 FROM files ORDER BY path"
+                )
+            ]
+        return version, entries
+
+
+class DatasetCatalog:
+    """按数据集 ID 管理清单：缓存实例，超过刷新间隔才重新 stat 目录。"""
+
+    def __init__(
+        self,
+        manifest_dir: Optional[str] = None,
+        refresh_interval: Optional[float] = None,
+    ) -> None:
+        self.manifest_dir = Path(
+            manifest_dir or os.getenv("DATASET_MANIFEST_DIR", "data/dataset_manifests")
+        )
+        self.refresh_interval = (
+            refresh_interval
+            if refresh_interval is not None
+            else float(os.getenv("DATASET_MANIFEST_REFRESH_SECONDS", "60"))
+        )
+        self._manifests: Dict[str, DatasetManifest] = {}
+        self._lock = threading.Lock()
+
+    def _db_path(self, dataset_id: str) -> Path:
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", dataset_id)
+        return self.manifest_dir / f"{safe}.sqlite"
+
+    def get(
+        self, dataset_id: str, root: Path, refresh: Optional[bool] = None
+    ) -> DatasetManifest:
+        """获取清单；refresh=None 时按刷新间隔决定，True 强制刷新。"""
+        root = Path(root)
+        with self._lock:
+            manifest = self._manifests.get(dataset_id)
+            if manifest is None or manifest.root != root:
+                manifest = DatasetManifest(self._db_path(dataset_id), root)
+                self._manifests[dataset_id] = manifest
+        if refresh or (refresh is None and manifest.is_stale(self.refresh_interval)):
+            manifest.refresh()
+        return manifest
+
+    def build(self, dataset_id: str, root: Path) -> DatasetManifest:
+        """入库时构建（或强制刷新）清单。"""
+        return self.get(dataset_id, root, refresh=True)
+
+    def invalidate(self, dataset_id: str) -> None:
+        manifest = self._manifests.get(dataset_id)
+        if manifest is not None:
+            manifest.refreshed_at = None
+
+    def remove(self, dataset_id: str) -> None:
+        with self._lock:
+            self._manifests.pop(dataset_id, None)
+        db_path = self._db_path(dataset_id)
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(f"{db_path}{suffix}")
+            except FileNotFoundError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "manifest_dir": str(self.manifest_dir),
+            "cached_manifests": len(self._manifests),
+            "refresh_interval": self.refresh_interval,
+        }
+
+
+_dataset_catalog: Optional[DatasetCatalog] = None
+
+
+def get_dataset_catalog() -> DatasetCatalog:
+    """获取进程级数据集清单目录。"""
+    global _dataset_catalog
+    if _dataset_catalog is None:
+        _dataset_catalog = DatasetCatalog()
+    return _dataset_catalog
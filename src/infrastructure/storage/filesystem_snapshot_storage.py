@@ -1,21 +1,39 @@
 """
 基于本地文件系统的检测帧快照存储实现。
+
+- 编码在有界线程池中执行（池满时等待，超时拒绝）；
+- 同一摄像头/目标在时间窗口内的近似重复帧（dHash）复用已保存快照；
+- 文件按内容寻址：objects/{camera_id}/{sha[:2]}/{sha}.{ext}，
+  缩略图位于 thumbs/ 下的相同相对路径；
+- 后台清理任务按保留策略（时长、数量、磁盘配额）删除旧快照。
 """
 
 from __future__ import annotations
 
-import asyncio
-import uuid
-from dataclasses import dataclass
+import hashlib
+import os
+import tempfile
+import time
+from collections import deque
+from dataclasses import dataclass, field, replace
 from datetime import datetime
 from pathlib import Path
-from typing import Mapping, Optional
+from typing import Any, Deque, Dict, Mapping, Optional, Tuple
 
 import cv2
 import numpy as np
 
 from src.interfaces.storage import SnapshotInfo, SnapshotStorageProtocol
 
+from .snapshot_dedup import PerceptualDeduplicator, dhash
+from .snapshot_encode_pool import SnapshotEncodePool, _percentile
+from .snapshot_janitor import (
+    OBJECTS_DIR,
+    THUMBS_DIR,
+    SnapshotJanitor,
+    SnapshotRetentionPolicy,
+)
+
 
 @dataclass
 class SnapshotStorageConfig:
@@ -24,6 +42,24 @@ class SnapshotStorageConfig:
     base_dir: Path
     image_format: str = "jpg"
     image_quality: int = 90
+    thumbnail_width: int = 320
+    thumbnail_quality: int = 70
+    dedup_window_seconds: float = 60.0
+    dedup_max_distance: int = 6
+    encode_workers: int = 2
+    max_pending_encodes: int = 16
+    encode_timeout: float = 2.0
+    retention: SnapshotRetentionPolicy = field(default_factory=SnapshotRetentionPolicy)
+    janitor_interval_seconds: float = 3600.0
+
+
+@dataclass(frozen=True)
+class _EncodedSnapshot:
+    relative_path: Path
+    thumbnail_path: Optional[Path]
+    content_hash: str
+    size: int
+    written: bool
 
 
 class FileSystemSnapshotStorage(SnapshotStorageProtocol):
@@ -36,6 +72,31 @@ class FileSystemSnapshotStorage(SnapshotStorageProtocol):
         self._config = config
         self._base_dir = config.base_dir
         self._base_dir.mkdir(parents=True, exist_ok=True)
+        self._pool = SnapshotEncodePool(
+            max_workers=config.encode_workers,
+            max_pending=config.max_pending_encodes,
+            acquire_timeout=config.encode_timeout,
+        )
+        self._dedup = PerceptualDeduplicator(
+            window_seconds=config.dedup_window_seconds,
+            max_distance=config.dedup_max_distance,
+        )
+        self._janitor = SnapshotJanitor(
+            self._base_dir,
+            config.retention,
+            interval_seconds=config.janitor_interval_seconds,
+        )
+        self._save_latency_ms: Deque[float] = deque(maxlen=500)
+        self._stats = {
+            "saved": 0,
+            "deduplicated": 0,
+            "identical_content": 0,
+            "bytes_written": 0,
+        }
+
+    @property
+    def janitor(self) -> SnapshotJanitor:
+        return self._janitor
 
     async def save_frame(
         self,
@@ -46,67 +107,155 @@ class FileSystemSnapshotStorage(SnapshotStorageProtocol):
         violation_type: Optional[str] = None,
         metadata: Optional[Mapping[str, str]] = None,
     ) -> SnapshotInfo:
+        if frame is None or not isinstance(frame, np.ndarray):
+            raise ValueError("frame must be a valid numpy.ndarray")
+
+        started = time.perf_counter()
         captured_at = captured_at or datetime.utcnow()
-        relative_path = self._build_relative_path(
-            camera_id=camera_id,
-            captured_at=captured_at,
-            violation_type=violation_type,
-        )
-        absolute_path = self._base_dir / relative_path
-        absolute_path.parent.mkdir(parents=True, exist_ok=True)
+        if self._config.retention.enabled:
+            self._janitor.start()
 
-        await asyncio.to_thread(
-            self._write_image,
-            absolute_path,
-            frame,
-        )
+        dedup_key = self._dedup_key(camera_id, violation_type, metadata)
+        phash = None
+        if self._dedup.enabled:
+            phash = dhash(frame)
+            kept = self._dedup.find_duplicate(dedup_key, phash, captured_at)
+            if kept is not None:
+                self._stats["deduplicated"] += 1
+                self._record_latency(started)
+                return replace(
+                    kept,
+                    captured_at=captured_at,
+                    violation_type=violation_type,
+                    metadata=metadata,
+                    deduplicated=True,
+                )
+
+        encoded = await self._pool.run(self._write_snapshot, camera_id, frame)
+        if encoded.written:
+            self._stats["saved"] += 1
+            self._stats["bytes_written"] += encoded.size
+        else:
+            self._stats["identical_content"] += 1
 
-        return SnapshotInfo(
-            relative_path=str(relative_path),
-            absolute_path=str(absolute_path),
+        info = SnapshotInfo(
+            relative_path=str(encoded.relative_path),
+            absolute_path=str(self._base_dir / encoded.relative_path),
             camera_id=camera_id,
             captured_at=captured_at,
             violation_type=violation_type,
             metadata=metadata,
+            thumbnail_path=(
+                str(encoded.thumbnail_path) if encoded.thumbnail_path else None
+            ),
+            content_hash=encoded.content_hash,
         )
+        if phash is not None:
+            self._dedup.remember(dedup_key, phash, captured_at, info)
+        self._record_latency(started)
+        return info
 
-    def _build_relative_path(
-        self,
-        *,
+    @staticmethod
+    def _dedup_key(
         camera_id: str,
-        captured_at: datetime,
         violation_type: Optional[str],
-    ) -> Path:
-        date_path = Path(
-            camera_id,
-            captured_at.strftime("%Y"),
-            captured_at.strftime("%m"),
-            captured_at.strftime("%d"),
-        )
-        filename_parts = [
-            captured_at.strftime("%H%M%S"),
-            f"{captured_at.microsecond:06d}",
-        ]
-        if violation_type:
-            filename_parts.append(violation_type)
-        filename_parts.append(uuid.uuid4().hex[:8])
-        filename = "_".join(filename_parts) + f".{self._config.image_format}"
-        return date_path / filename
-
-    def _write_image(self, path: Path, frame: np.ndarray) -> None:
-        if frame is None or not isinstance(frame, np.ndarray):
-            raise ValueError("frame must be a valid numpy.ndarray")
+        metadata: Optional[Mapping[str, str]],
+    ) -> Tuple[str, str]:
+        track_id = (metadata or {}).get("track_id")
+        return camera_id, str(track_id or violation_type or "")
 
+    def _record_latency(self, started: float) -> None:
+        self._save_latency_ms.append((time.perf_counter() - started) * 1000)
+
+    def _encode(self, frame: np.ndarray, quality: int) -> bytes:
         image_format = self._config.image_format.lower()
         encode_params: list[int] = []
         if image_format in {"jpg", "jpeg"}:
-            encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), self._config.image_quality]
+            encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
         elif image_format == "png":
             encode_params = [int(cv2.IMWRITE_PNG_COMPRESSION), 3]
 
         success, buffer = cv2.imencode(f".{image_format}", frame, encode_params)
         if not success:
             raise RuntimeError("failed to encode frame")
+        return buffer.tobytes()
+
+    def _object_path(self, camera_id: str, content_hash: str) -> Path:
+        filename = f"{content_hash}.{self._config.image_format}"
+        return Path(OBJECTS_DIR, camera_id, content_hash[:2], filename)
+
+    def _write_snapshot(self, camera_id: str, frame: np.ndarray) -> _EncodedSnapshot:
+        """编码并按内容寻址写入快照与缩略图（在编码池线程中执行）。"""
+        data = self._encode(frame, self._config.image_quality)
+        content_hash = hashlib.sha256(data).hexdigest()
+        relative_path = self._object_path(camera_id, content_hash)
+        absolute_path = self._base_dir / relative_path
+
+        if absolute_path.exists():
+            # 相同内容已存在：刷新修改时间，避免被按时长清理
+            os.utime(absolute_path)
+            written = False
+        else:
+            self._atomic_write(absolute_path, data)
+            written = True
+
+        thumbnail_path = self._write_thumbnail(relative_path, frame)
+        return _EncodedSnapshot(
+            relative_path, thumbnail_path, content_hash, len(data), written
+        )
+
+    def _write_thumbnail(
+        self, relative_path: Path, frame: np.ndarray
+    ) -> Optional[Path]:
+        width = self._config.thumbnail_width
+        if not width:
+            return None
+        thumbnail_path = Path(THUMBS_DIR, *relative_path.parts[1:])
+        absolute_path = self._base_dir / thumbnail_path
+        if absolute_path.exists():
+            return thumbnail_path
+
+        height, frame_width = frame.shape[:2]
+        if frame_width > width:
+            size = (width, max(1, int(round(height * width / frame_width))))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        self._atomic_write(
+            absolute_path, self._encode(frame, self._config.thumbnail_quality)
+        )
+        return thumbnail_path
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 临时文件名唯一：编码池的多个线程可能同时写入同一内容寻址路径
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False
+        ) as file:
+            file.write(data)
+        try:
+            os.replace(file.name, path)
+        except OSError:
+            Path(file.name).unlink(missing_ok=True)
+            raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        """快照存储统计：保存/去重数量、写入字节、保存耗时分位数、编码池与最近一次清理结果。"""
+        samples = list(self._save_latency_ms)
+        return {
+            **self._stats,
+            "dedup": dict(self._dedup.stats),
+            "save_p50_ms": round(_percentile(samples, 0.5), 3),
+            "save_p95_ms": round(_percentile(samples, 0.95), 3),
+            "encode_pool": self._pool.get_stats(),
+            "retention": {
+                "max_age_days": self._config.retention.max_age_days,
+                "max_files_per_camera": self._config.retention.max_files_per_camera,
+                "max_bytes_per_camera": self._config.retention.max_bytes_per_camera,
+            },
+            "last_cleanup": self._janitor.last_report,
+        }
 
-        with open(path, "wb") as file:
-            file.write(buffer.tobytes())
+    async def close(self) -> None:
+        """停止后台清理并关闭编码池。"""
+        await self._janitor.stop()
+        self._pool.shutdown()
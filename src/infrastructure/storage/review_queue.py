@@ -0,0 +1,435 @@
+"""
+难例审核队列（SQLite + 图片目录）。
+
+检测进程把挖掘出的不确定样本（整帧 + 人员裁剪图 + 上下文）写入队列，
+API 进程负责分页查看、审核与导出。队列以 WAL 模式的 SQLite 存储，
+多个摄像头进程与 API 进程可以同时读写。
+
+状态流转：pending → approved / rejected；approved → exported（已生成数据集）。
+驳回的样本只保留记录（用于统计与去重），图片文件立即删除。
+API 进程中的 ReviewQueueJanitor 定期删除超过保留期的已驳回/已导出记录，
+以及长期无人审核的 pending 样本。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+REVIEW_STATUSES = ("pending", "approved", "rejected", "exported")
+REVIEW_DECISIONS = ("approved", "rejected")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    camera_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    score REAL NOT NULL,
+    reasons TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    frame_path TEXT NOT NULL,
+    crops TEXT NOT NULL,
+    context TEXT NOT NULL,
+    phash TEXT NOT NULL,
+    label TEXT,
+    has_violation INTEGER,
+    reviewer TEXT,
+    reviewed_at REAL,
+    dataset_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_items_status ON items(status, score);
+CREATE INDEX IF NOT EXISTS idx_items_camera ON items(camera_id, created_at);
+"""
+
+_JSON_COLUMNS = ("reasons", "crops", "context")
+
+
+class ReviewItemNotFound(KeyError):
+    """审核样本不存在。"""
+
+
+class ReviewStateError(ValueError):
+    """审核样本当前状态不允许该操作。"""
+
+
+class ReviewQueue:
+    """难例审核队列（每次操作独立连接，可跨进程共享）。"""
+
+    def __init__(self, root: Optional[str] = None, jpeg_quality: int = 90) -> None:
+        self.root = Path(
+            root or os.getenv("HARD_EXAMPLE_QUEUE_DIR", "data/review_queue")
+        )
+        self.jpeg_quality = jpeg_quality
+        self.db_path = self.root / "queue.db"
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_item(row: sqlite3.Row) -> Dict[str, Any]:
+        item = dict(row)
+        for key in _JSON_COLUMNS:
+            item[key] = json.loads(item[key])
+        item["phash"] = int(item["phash"], 16)
+        if item["has_violation"] is not None:
+            item["has_violation"] = bool(item["has_violation"])
+        return item
+
+    def _write_image(self, path: Path, image: np.ndarray) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        ok, buffer = cv2.imencode(
+            ".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
+        )
+        if not ok:
+            raise ValueError(f"图片编码失败: {path.name}")
+        path.write_bytes(buffer.tobytes())
+
+    def add(
+        self,
+        camera_id: str,
+        frame: np.ndarray,
+        crops: Sequence[np.ndarray],
+        score: float,
+        reasons: Dict[str, float],
+        context: Dict[str, Any],
+        phash: int,
+        created_at: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """保存整帧与裁剪图并入队，返回样本记录。"""
+        item_id = uuid.uuid4().hex
+        created_at = time.time() if created_at is None else created_at
+        day = time.strftime("%Y%m%d", time.localtime(created_at))
+        frame_rel = f"frames/{day}/{item_id}.jpg"
+        crop_rels = [f"crops/{day}/{item_id}_{i}.jpg" for i in range(len(crops))]
+        try:
+            self._write_image(self.root / frame_rel, frame)
+            for rel, crop in zip(crop_rels, crops):
+                self._write_image(self.root / rel, crop)
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO items (id, camera_id, created_at, score, reasons, "
+                    "frame_path, crops, context, phash) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        item_id,
+                        camera_id,
+                        created_at,
+                        float(score),
+                        json.dumps(reasons),
+                        frame_rel,
+                        json.dumps(crop_rels),
+                        json.dumps(context, ensure_ascii=False, default=str),
+                        f"{phash:016x}",
+                    ),
+                )
+        except Exception:
+            self._remove_files([frame_rel, *crop_rels])
+            raise
+        return self.get(item_id)
+
+    def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM items WHERE id = ?", (item_id,)
+            ).fetchone()
+        return self._row_to_item(row) if row else None
+
+    def pending_count(self) -> int:
+        """待审核样本总数，用于限制队列积压。"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM items WHERE status = 'pending'"
+            ).fetchone()[0]
+
+    def count_since(self, camera_id: str, since: float) -> int:
+        """摄像头在时间点之后入队的样本数（含已审核），用于预算控制。"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM items WHERE camera_id = ? AND created_at >= ?",
+                (camera_id, since),
+            ).fetchone()[0]
+
+    def recent_hashes(self, camera_id: str, limit: int) -> List[int]:
+        """摄像头最近入队样本的感知哈希（含已驳回样本，避免重复推送同类样本）。"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT phash FROM items WHERE camera_id = ? "
+                "ORDER BY created_at DESC LIMIT ?",
+                (camera_id, limit),
+            ).fetchall()
+        return [int(row[0], 16) for row in rows]
+
+    def list_items(
+        self,
+        status: Optional[str] = "pending",
+        camera_id: Optional[str] = None,
+        reason: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """按不确定性分数从高到低分页列出样本，返回 (样本, 总数)。"""
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if camera_id:
+            clauses.append("camera_id = ?")
+            params.append(camera_id)
+        if reason:
+            clauses.append("EXISTS (SELECT 1 FROM json_each(reasons) WHERE key = ?)")
+            params.append(reason)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            total = conn.execute(
+                f"SELECT COUNT(*) FROM items {where}", params
+            ).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM items {where} "
+                "ORDER BY score DESC, created_at DESC LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            ).fetchall()
+        return [self._row_to_item(row) for row in rows], total
+
+    def review(
+        self,
+        item_id: str,
+        decision: str,
+        label: Optional[str] = None,
+        has_violation: Optional[bool] = None,
+        reviewer: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        审核样本。
+
+        approved 时 label 为人工确认的违规类型（无违规时可为空，has_violation=False）；
+        rejected 的样本删除图片文件。已导出的样本不可再修改。
+        """
+        if decision not in REVIEW_DECISIONS:
+            raise ReviewStateError(f"不支持的审核结果: {decision}")
+        item = self.get(item_id)
+        if item is None:
+            raise ReviewItemNotFound(item_id)
+        if item["status"] == "exported":
+            raise ReviewStateError("样本已导出到数据集，不能再修改审核结果")
+        if item["status"] == "rejected" and decision == "approved":
+            raise ReviewStateError("样本已驳回且图片已删除，不能再通过")
+        if decision == "approved" and has_violation is None:
+            has_violation = bool(label)
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE items SET status = ?, label = ?, has_violation = ?, "
+                "reviewer = ?, reviewed_at = ? WHERE id = ?",
+                (
+                    decision,
+                    label,
+                    None if has_violation is None else int(has_violation),
+                    reviewer,
+                    time.time(),
+                    item_id,
+                ),
+            )
+        if decision == "rejected":
+            self._remove_files([item["frame_path"], *item["crops"]])
+        return self.get(item_id)
+
+    def approved_items(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """待导出的已通过样本（按审核时间）。"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM items WHERE status = 'approved' "
+                "ORDER BY reviewed_at LIMIT ?",
+                (-1 if limit is None else limit,),
+            ).fetchall()
+        return [self._row_to_item(row) for row in rows]
+
+    def mark_exported(self, item_ids: Iterable[str], dataset_id: str) -> int:
+        ids = list(item_ids)
+        with self._connect() as conn:
+            return conn.executemany(
+                "UPDATE items SET status = 'exported', dataset_id = ? "
+                "WHERE id = ? AND status = 'approved'",
+                [(dataset_id, item_id) for item_id in ids],
+            ).rowcount
+
+    def purge(
+        self,
+        max_age_seconds: float,
+        pending_max_age_seconds: Optional[float] = None,
+    ) -> int:
+        """
+        删除超过保留期的已驳回/已导出记录（已导出样本的图片已复制进数据集）。
+
+        指定 pending_max_age_seconds 时，同时删除超过该时长仍未审核的样本
+        （场景与模型已变化，继续保留只会占用磁盘）。
+        """
+        now = time.time()
+        where = "status IN ('rejected', 'exported') AND created_at < ?"
+        params: List[float] = [now - max_age_seconds]
+        if pending_max_age_seconds is not None:
+            where = f"({where}) OR (status = 'pending' AND created_at < ?)"
+            params.append(now - pending_max_age_seconds)
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT * FROM items WHERE {where}", params).fetchall()
+            conn.execute(f"DELETE FROM items WHERE {where}", params)
+        for row in rows:
+            item = self._row_to_item(row)
+            self._remove_files([item["frame_path"], *item["crops"]])
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            by_status = dict(
+                conn.execute("SELECT status, COUNT(*) FROM items GROUP BY status")
+            )
+            pending_by_camera = dict(
+                conn.execute(
+                    "SELECT camera_id, COUNT(*) FROM items WHERE status = 'pending' "
+                    "GROUP BY camera_id"
+                )
+            )
+            by_reason = dict(
+                conn.execute(
+                    "SELECT j.key, COUNT(*) FROM items, json_each(items.reasons) AS j "
+                    "GROUP BY j.key"
+                )
+            )
+        return {
+            "total": sum(by_status.values()),
+            "by_status": {s: by_status.get(s, 0) for s in REVIEW_STATUSES},
+            "pending_by_camera": pending_by_camera,
+            "by_reason": by_reason,
+        }
+
+    def resolve(self, relative_path: str) -> Path:
+        """队列内相对路径 → 绝对路径（拒绝越出队列目录的路径）。"""
+        root = self.root.resolve()
+        path = (root / relative_path).resolve()
+        if root not in path.parents:
+            raise ValueError(f"非法的队列文件路径: {relative_path}")
+        return path
+
+    def _remove_files(self, relative_paths: Iterable[str]) -> None:
+        for rel in relative_paths:
+            try:
+                (self.root / rel).unlink()
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning(f"删除审核样本文件失败: {rel}, {e}")
+
+
+class ReviewQueueJanitor:
+    """按保留期定期清理审核队列（多个 API 进程同时运行时删除操作幂等）。"""
+
+    def __init__(
+        self,
+        queue: Optional[ReviewQueue] = None,
+        retention_days: float = 30.0,
+        pending_max_age_days: Optional[float] = 14.0,
+        interval_seconds: float = 3600.0,
+    ) -> None:
+        self._queue = queue
+        self.retention_days = retention_days
+        self.pending_max_age_days = pending_max_age_days
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.last_purged: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "ReviewQueueJanitor":
+        pending_days = float(os.getenv("HARD_EXAMPLE_PENDING_MAX_AGE_DAYS", "14"))
+        return cls(
+            retention_days=float(os.getenv("HARD_EXAMPLE_RETENTION_DAYS", "30")),
+            pending_max_age_days=pending_days if pending_days > 0 else None,
+            interval_seconds=float(os.getenv("HARD_EXAMPLE_PURGE_INTERVAL", "3600")),
+        )
+
+    def run_once(self) -> int:
+        queue = self._queue or get_review_queue()
+        pending_max_age = (
+            None
+            if self.pending_max_age_days is None
+            else self.pending_max_age_days * 86400
+        )
+        purged = queue.purge(self.retention_days * 86400, pending_max_age)
+        self.last_purged = purged
+        if purged:
+            logger.info(f"审核队列清理完成: 删除 {purged} 条记录")
+        return purged
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning(f"审核队列清理失败: {exc}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        """在当前事件循环中启动后台清理任务。"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+
+_review_queue: Optional[ReviewQueue] = None
+_review_queue_janitor: Optional[ReviewQueueJanitor] = None
+
+
+def get_review_queue() -> ReviewQueue:
+    """获取进程级难例审核队列。"""
+    global _review_queue
+    if _review_queue is None:
+        _review_queue = ReviewQueue()
+    return _review_queue
+
+
+def start_review_queue_janitor() -> ReviewQueueJanitor:
+    """启动进程级审核队列清理任务（API 生命周期内调用）。"""
+    global _review_queue_janitor
+    if _review_queue_janitor is None:
+        _review_queue_janitor = ReviewQueueJanitor.from_env()
+    _review_queue_janitor.start()
+    return _review_queue_janitor
+
+
+async def shutdown_review_queue_janitor() -> None:
+    global _review_queue_janitor
+    if _review_queue_janitor is not None:
+        await _review_queue_janitor.stop()
+        _review_queue_janitor = None
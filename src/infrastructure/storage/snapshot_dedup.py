@@ -0,0 +1,102 @@
+"""
+快照感知哈希去重。
+
+同一摄像头/目标在时间窗口内的近似重复帧只保留一张，
+后续重复帧复用已保存快照的路径。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.interfaces.storage import SnapshotInfo
+
+
+def dhash(frame: np.ndarray, hash_size: int = 8) -> int:
+    """
+    计算差值哈希（dHash）。
+
+    先缩小到 (hash_size + 1) x hash_size 再转灰度，避免在原始分辨率上做颜色转换。
+
+    Args:
+        frame: BGR 或灰度图像。
+        hash_size: 哈希边长，结果为 hash_size * hash_size 位。
+
+    Returns:
+        int: 感知哈希值。
+    """
+    small = cv2.resize(frame, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个哈希值的汉明距离。"""
+    return bin(a ^ b).count("1")
+
+
+@dataclass
+class _KeptSnapshot:
+    phash: int
+    kept_at: datetime
+    info: SnapshotInfo
+
+
+class PerceptualDeduplicator:
+    """按 (摄像头, 目标/违规类型) 在时间窗口内去重。"""
+
+    def __init__(self, window_seconds: float = 60.0, max_distance: int = 6) -> None:
+        self.window_seconds = window_seconds
+        self.max_distance = max_distance
+        self._kept: Dict[Tuple[str, str], _KeptSnapshot] = {}
+        self.stats = {"checked": 0, "duplicates": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_seconds > 0
+
+    def find_duplicate(
+        self, key: Tuple[str, str], phash: int, captured_at: datetime
+    ) -> Optional[SnapshotInfo]:
+        """
+        查找窗口内与 phash 近似的已保存快照。
+
+        Returns:
+            Optional[SnapshotInfo]: 已保存的快照，不重复时返回 None。
+        """
+        self.stats["checked"] += 1
+        kept = self._kept.get(key)
+        if kept is None:
+            return None
+        age = (captured_at - kept.kept_at).total_seconds()
+        if 0 <= age <= self.window_seconds and (
+            hamming_distance(kept.phash, phash) <= self.max_distance
+        ):
+            self.stats["duplicates"] += 1
+            return kept.info
+        return None
+
+    def remember(
+        self,
+        key: Tuple[str, str],
+        phash: int,
+        captured_at: datetime,
+        info: SnapshotInfo,
+    ) -> None:
+        """记录新保存的快照，并清理已过窗口的条目。"""
+        self._kept[key] = _KeptSnapshot(phash, captured_at, info)
+        if len(self._kept) > 256:
+            expired = [
+                k
+                for k, v in self._kept.items()
+                if (captured_at - v.kept_at).total_seconds() > self.window_seconds
+            ]
+            for k in expired:
+                del self._kept[k]
@@ -0,0 +1,103 @@
+"""
+快照编码线程池。
+
+限制同时排队/执行的编码任务数；池满时等待至超时后拒绝，
+避免检测循环在磁盘或CPU变慢时无限堆积快照任务。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+class SnapshotBackpressureError(RuntimeError):
+    """编码池已满且等待超时。"""
+
+
+def _percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class SnapshotEncodePool:
+    """有界快照编码池。"""
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_pending: int = 16,
+        acquire_timeout: float = 2.0,
+        latency_window: int = 500,
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.acquire_timeout = acquire_timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="snapshot-encode"
+        )
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending = 0
+        self._latency_ms: Deque[float] = deque(maxlen=latency_window)
+        self.stats = {"completed": 0, "rejected": 0, "failed": 0}
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_pending)
+            self._loop = loop
+        return self._slots
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        在池中执行 fn(*args)。
+
+        Raises:
+            SnapshotBackpressureError: 排队任务已满且在 acquire_timeout 内未释放。
+        """
+        slots = self._get_slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.stats["rejected"] += 1
+            raise SnapshotBackpressureError(
+                f"snapshot encode pool is full ({self.max_pending} pending)"
+            )
+
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._executor, fn, *args
+            )
+            self.stats["completed"] += 1
+            return result
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        finally:
+            self._latency_ms.append((time.perf_counter() - started) * 1000)
+            self._pending -= 1
+            slots.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """编码池统计：排队数、完成/拒绝/失败数与耗时分位数（毫秒）。"""
+        samples = list(self._latency_ms)
+        return {
+            **self.stats,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "workers": self.max_workers,
+            "p50_ms": round(_percentile(samples, 0.5), 3),
+            "p95_ms": round(_percentile(samples, 0.95), 3),
+            "max_ms": round(max(samples), 3) if samples else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,221 @@
+"""
+快照保留策略与后台清理。
+
+按摄像头统计快照文件，依次执行：
+1. 删除超过 max_age_days 的快照；
+2. 数量超过 max_files_per_camera 时从最旧开始删除；
+3. 占用超过 max_bytes_per_camera 时从最旧开始删除。
+
+只扫描内容寻址布局（objects/ 与 thumbs/）：删除快照时同时删除缩略图，
+原图已不存在的缩略图按孤立文件计入所属摄像头。基础目录下的其他目录
+（旧布局、上传目录等）不在清理范围内。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+OBJECTS_DIR = "objects"
+THUMBS_DIR = "thumbs"
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SnapshotRetentionPolicy:
+    """快照保留策略（None 表示不限制）。"""
+
+    max_age_days: Optional[float] = None
+    max_files_per_camera: Optional[int] = None
+    max_bytes_per_camera: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return any(
+            v is not None and v > 0
+            for v in (
+                self.max_age_days,
+                self.max_files_per_camera,
+                self.max_bytes_per_camera,
+            )
+        )
+
+
+@dataclass
+class _SnapshotFile:
+    path: Path
+    thumbnail: Optional[Path]
+    size: int
+    mtime: float
+
+
+class SnapshotJanitor:
+    """按保留策略清理快照目录。"""
+
+    def __init__(
+        self,
+        base_dir: Path,
+        policy: SnapshotRetentionPolicy,
+        interval_seconds: float = 3600.0,
+    ) -> None:
+        self._base_dir = base_dir
+        self.policy = policy
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.last_report: Optional[Dict[str, object]] = None
+
+    def _iter_images(self, root: Path):
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                if Path(name).suffix.lower() in IMAGE_SUFFIXES:
+                    yield Path(dirpath) / name
+
+    def scan(self) -> Dict[str, List[_SnapshotFile]]:
+        """按摄像头列出快照文件（按修改时间从旧到新排序）。"""
+        cameras: Dict[str, List[_SnapshotFile]] = {}
+        if not self._base_dir.exists():
+            return cameras
+
+        objects_dir = self._base_dir / OBJECTS_DIR
+        thumbs_dir = self._base_dir / THUMBS_DIR
+        for tree in (objects_dir, thumbs_dir):
+            if not tree.is_dir():
+                continue
+            for entry in os.scandir(tree):
+                if not entry.is_dir():
+                    continue
+                files = cameras.setdefault(entry.name, [])
+                for path in self._iter_images(Path(entry.path)):
+                    if (
+                        tree == thumbs_dir
+                        and (objects_dir / path.relative_to(thumbs_dir)).exists()
+                    ):
+                        continue  # 随原图统计
+                    try:
+                        files.append(self._stat(path))
+                    except FileNotFoundError:
+                        # 其他进程的清理任务已删除
+                        continue
+
+        for files in cameras.values():
+            files.sort(key=lambda f: f.mtime)
+        return cameras
+
+    def _stat(self, path: Path) -> _SnapshotFile:
+        stat = path.stat()
+        size = stat.st_size
+        thumbnail = None
+        relative = path.relative_to(self._base_dir)
+        if relative.parts[0] == OBJECTS_DIR:
+            candidate = self._base_dir / THUMBS_DIR / Path(*relative.parts[1:])
+            if candidate.exists():
+                thumbnail = candidate
+                size += candidate.stat().st_size
+        return _SnapshotFile(path, thumbnail, size, stat.st_mtime)
+
+    def _select_expired(
+        self, files: List[_SnapshotFile], now: float
+    ) -> List[_SnapshotFile]:
+        policy = self.policy
+        doomed = set()
+        if policy.max_age_days:
+            cutoff = now - policy.max_age_days * 86400
+            doomed.update(i for i, f in enumerate(files) if f.mtime < cutoff)
+
+        remaining = [i for i in range(len(files)) if i not in doomed]
+        if policy.max_files_per_camera and len(remaining) > policy.max_files_per_camera:
+            excess = len(remaining) - policy.max_files_per_camera
+            doomed.update(remaining[:excess])
+            remaining = remaining[excess:]
+
+        if policy.max_bytes_per_camera:
+            total = sum(files[i].size for i in remaining)
+            for i in remaining:
+                if total <= policy.max_bytes_per_camera:
+                    break
+                doomed.add(i)
+                total -= files[i].size
+        return [files[i] for i in sorted(doomed)]
+
+    def _remove(self, item: _SnapshotFile) -> None:
+        for path in (item.path, item.thumbnail):
+            if path is None:
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            # 清理空目录（不越过摄像头目录）
+            parent = path.parent
+            for _ in range(3):
+                if parent == self._base_dir:
+                    break
+                try:
+                    parent.rmdir()
+                except OSError:
+                    break
+                parent = parent.parent
+
+    def run_once(self, now: Optional[float] = None) -> Dict[str, object]:
+        """
+        执行一次清理。
+
+        Returns:
+            Dict: 清理报告，含各摄像头剩余文件数/字节数与删除数量。
+        """
+        started = time.perf_counter()
+        now = time.time() if now is None else now
+        report: Dict[str, object] = {"cameras": {}, "deleted": 0, "freed_bytes": 0}
+        for camera_id, files in self.scan().items():
+            expired = self._select_expired(files, now) if self.policy.enabled else []
+            for item in expired:
+                self._remove(item)
+            freed = sum(f.size for f in expired)
+            report["cameras"][camera_id] = {
+                "files": len(files) - len(expired),
+                "bytes": sum(f.size for f in files) - freed,
+                "deleted": len(expired),
+                "freed_bytes": freed,
+            }
+            report["deleted"] += len(expired)
+            report["freed_bytes"] += freed
+        report["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        self.last_report = report
+        if report["deleted"]:
+            logger.info(
+                "快照清理完成: 删除 %s 个文件, 释放 %s bytes",
+                report["deleted"],
+                report["freed_bytes"],
+            )
+        return report
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning(f"快照清理失败: {exc}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        """在当前事件循环中启动后台清理任务。"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
@@ -23,6 +23,9 @@ class SnapshotInfo:
     captured_at: datetime
     violation_type: Optional[str] = None
     metadata: Optional[Mapping[str, str]] = None
+    thumbnail_path: Optional[str] = None
+    content_hash: Optional[str] = None
+    deduplicated: bool = False
 
 
 class SnapshotStorageProtocol(Protocol):
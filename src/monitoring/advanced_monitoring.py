@@ -14,9 +14,16 @@ from dataclasses import dataclass, field
 from enum import Enum
 from typing import Any, Callable, Dict, List, Optional
 
-import numpy as np
 import psutil
 
+from src.monitoring.metrics_core import (
+    ROLLUP_WINDOWS,
+    MetricsRegistry,
+    RollupHistogram,
+    get_metrics_registry,
+    prometheus_name,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -80,20 +87,37 @@ class Alert:
 
 
 class MetricCollector:
-    """指标收集器"""
+    """指标收集器
+
+    每个样本写入 metrics_core 的可合并直方图（按名称 + 标签），统计信息直接读取
+    1m/5m/1h 窗口汇总，不再对原始样本排序求分位数；原始样本只保留最近
+    max_samples 个，供 get_metric / get_latest_metric 使用。
+    """
 
-    def __init__(self, max_samples: int = 10000):
+    def __init__(
+        self, max_samples: int = 256, registry: Optional[MetricsRegistry] = None
+    ):
         self.max_samples = max_samples
+        self.registry = registry or get_metrics_registry()
         self.metrics: Dict[str, deque] = defaultdict(lambda: deque(maxlen=max_samples))
+        self.histograms: Dict[str, Dict[Any, RollupHistogram]] = defaultdict(dict)
         self.lock = threading.Lock()
 
     def record_metric(self, metric: MetricData):
         """记录指标"""
+        label_key = tuple(sorted(metric.labels.items()))
         with self.lock:
             self.metrics[metric.name].append(metric)
+            histogram = self.histograms[metric.name].get(label_key)
+            if histogram is None:
+                histogram = self.registry.histogram(
+                    prometheus_name(metric.name), metric.labels
+                )
+                self.histograms[metric.name][label_key] = histogram
+        histogram.record(metric.value)
 
     def get_metric(self, name: str, duration: int = 3600) -> List[MetricData]:
-        """获取指标数据"""
+        """获取最近的原始指标样本（最多 max_samples 个）"""
         cutoff_time = time.time() - duration
 
         with self.lock:
@@ -111,23 +135,22 @@ class MetricCollector:
             return None
 
     def get_metric_stats(self, name: str, duration: int = 3600) -> Dict[str, float]:
-        """获取指标统计"""
-        metrics = self.get_metric(name, duration)
-        if not metrics:
-            return {}
-
-        values = [m.value for m in metrics]
-
-        return {
-            "count": len(values),
-            "min": min(values),
-            "max": max(values),
-            "mean": np.mean(values),
-            "median": np.median(values),
-            "std": np.std(values),
-            "p95": np.percentile(values, 95),
-            "p99": np.percentile(values, 99),
-        }
+        """
+        获取指标统计（所有标签组合合并）
+
+        duration 向上取整到 1m/5m/1h 窗口，超过 1 小时按 1 小时计算。
+        """
+        window = next(
+            (w for w, seconds, _ in ROLLUP_WINDOWS if duration <= seconds),
+            ROLLUP_WINDOWS[-1][0],
+        )
+        with self.lock:
+            histograms = list(self.histograms.get(name, {}).values())
+        merged = None
+        for histogram in histograms:
+            hist = histogram.window(window)
+            merged = hist if merged is None else merged.merge(hist)
+        return merged.stats() if merged is not None else {}
 
 
 class SystemMetricsCollector:
@@ -301,7 +324,7 @@ class ApplicationMetricsCollector:
             MetricData(
                 name="app.detection.time",
                 value=detection_time,
-                metric_type=MetricData.HISTOGRAM,
+                metric_type=MetricType.HISTOGRAM,
             )
         )
 
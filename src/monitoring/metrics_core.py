@@ -0,0 +1,509 @@
+"""
+可合并的指标核心
+Mergeable Metrics Core
+
+- LogHistogram：DDSketch 风格的对数分桶直方图。值 v 落入桶 ceil(log_γ v)，
+  γ = (1+α)/(1-α)，任意分位数的相对误差不超过 α（默认 1%）。记录为 O(1)，
+  合并只需逐桶相加，因此多个进程/摄像头的直方图合并后分位数误差界不变。
+- RollupHistogram：直方图 + 1m/5m/1h 时间窗口汇总。只写入当前 10 秒槽，
+  槽关闭时再折叠进分钟/五分钟槽，内存上限固定（约 26 个槽）。
+  窗口按槽对齐，实际覆盖范围最多比窗口多出一个槽长。
+- Counter：单调计数器。
+- MetricsRegistry：按名称 + 标签管理指标，导出 JSON 快照（跨进程传输）与
+  Prometheus 文本格式；多份快照可合并后渲染出全集群的分位数。
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import socket
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_MAX_BUCKETS = 2048
+MIN_POSITIVE_VALUE = 1e-9
+_INDEX_OFFSET = 1 << 20
+
+# (窗口名, 窗口秒数, 槽秒数)
+ROLLUP_WINDOWS: Tuple[Tuple[str, int, int], ...] = (
+    ("1m", 60, 10),
+    ("5m", 300, 60),
+    ("1h", 3600, 300),
+)
+SUMMARY_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+# 检测进程把快照写入 Redis（带过期时间），API 进程合并后对外暴露
+SNAPSHOT_KEY_PREFIX = "hbd:metrics:"
+SNAPSHOT_TTL_SECONDS = 60
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+logger = logging.getLogger(__name__)
+
+
+class LogHistogram:
+    """对数分桶直方图（非线程安全，由 RollupHistogram 加锁）。
+
+    桶 i 覆盖 [γ^i, γ^(i+1))，取 2γ^(i+1)/(γ+1) 作为代表值，相对误差不超过 α。
+    为了让热路径只做一次 log 和一次字典自增，最小/最大值与方差均由桶估计
+    （同样在 α 误差内），只有 count 与 sum 是精确值。
+    """
+
+    __slots__ = (
+        "relative_accuracy",
+        "max_buckets",
+        "_inv_log_gamma",
+        "_gamma",
+        "buckets",
+        "zero_count",
+        "count",
+        "sum",
+    )
+
+    def __init__(
+        self,
+        relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+        max_buckets: int = DEFAULT_MAX_BUCKETS,
+    ) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy 必须在 (0, 1) 之间")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._inv_log_gamma = 1.0 / math.log(self._gamma)
+        # 键为 桶序号 + _INDEX_OFFSET，保证为正数，可直接用 int() 向下取整
+        self.buckets: Dict[int, int] = defaultdict(int)
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, value: float, _log=math.log) -> None:
+        """记录一个值（不大于 MIN_POSITIVE_VALUE 的值计入零桶）。"""
+        if value > MIN_POSITIVE_VALUE:
+            self.buckets[int(_log(value) * self._inv_log_gamma + _INDEX_OFFSET)] += 1
+        else:
+            self.zero_count += 1
+        self.count += 1
+        self.sum += value
+
+    def compact(self) -> None:
+        """桶数超过上限时合并最低的桶（只影响最小值附近的精度）。"""
+        excess = len(self.buckets) - self.max_buckets
+        if excess <= 0:
+            return
+        lowest = sorted(self.buckets)[: excess + 1]
+        self.buckets[lowest[-1]] += sum(self.buckets.pop(i) for i in lowest[:-1])
+
+    def merge(self, other: "LogHistogram") -> "LogHistogram":
+        """把 other 合并进当前直方图（要求相同精度）。"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("只能合并相同精度的直方图")
+        if not other.count:
+            return self
+        buckets = self.buckets
+        for index, n in other.buckets.items():
+            buckets[index] += n
+        self.compact()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        return self
+
+    def copy(self) -> "LogHistogram":
+        return LogHistogram(self.relative_accuracy, self.max_buckets).merge(self)
+
+    def _value_of(self, index: int) -> float:
+        return 2 * self._gamma ** (index - _INDEX_OFFSET + 1) / (self._gamma + 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """分位数估计（rank = q·(count-1) 的下界样本），相对误差不超过 α。"""
+        if not self.count:
+            return None
+        rank = min(max(q, 0.0), 1.0) * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                return self._value_of(index)
+        return self._value_of(max(self.buckets))
+
+    def stats(self) -> Dict[str, float]:
+        """与 MetricCollector.get_metric_stats 相同的字段。"""
+        if not self.count:
+            return {}
+        mean = self.sum / self.count
+        sumsq = sum(self._value_of(i) ** 2 * n for i, n in self.buckets.items())
+        variance = max(sumsq / self.count - mean * mean, 0.0)
+        return {
+            "count": self.count,
+            "min": self.quantile(0.0),
+            "max": self.quantile(1.0),
+            "mean": mean,
+            "median": self.quantile(0.5),
+            "std": math.sqrt(variance),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "alpha": self.relative_accuracy,
+            "buckets": {str(k - _INDEX_OFFSET): v for k, v in self.buckets.items()},
+            "zero": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LogHistogram":
+        hist = cls(float(data["alpha"]))
+        for k, v in data.get("buckets", {}).items():
+            hist.buckets[int(k) + _INDEX_OFFSET] = int(v)
+        hist.zero_count = int(data.get("zero", 0))
+        hist.count = int(data.get("count", 0))
+        hist.sum = float(data.get("sum", 0.0))
+        return hist
+
+
+class Counter:
+    """单调计数器。"""
+
+    __slots__ = ("value", "_lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        lock = self._lock
+        lock.acquire()
+        self.value += amount
+        lock.release()
+
+
+class RollupHistogram:
+    """带 1m/5m/1h 窗口汇总的直方图（线程安全）。"""
+
+    def __init__(
+        self,
+        relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.relative_accuracy = relative_accuracy
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._slot = ROLLUP_WINDOWS[0][2]
+        self._current = LogHistogram(relative_accuracy)
+        self._current_start = 0.0
+        self._current_end = 0.0
+        # 已关闭槽的累计（不含当前槽）
+        self._closed_total = LogHistogram(relative_accuracy)
+        self._tiers: List[deque] = [
+            deque(maxlen=window // slot + 1) for _, window, slot in ROLLUP_WINDOWS
+        ]
+
+    def record(self, value: float, _log=math.log) -> None:
+        """记录一个值（热路径：内联 LogHistogram.record，避免额外的方法调用）。"""
+        now = self._clock()
+        lock = self._lock
+        lock.acquire()
+        try:
+            if now >= self._current_end:
+                self._rotate(now)
+            current = self._current
+            if value > MIN_POSITIVE_VALUE:
+                current.buckets[
+                    int(_log(value) * current._inv_log_gamma + _INDEX_OFFSET)
+                ] += 1
+            else:
+                current.zero_count += 1
+            current.count += 1
+            current.sum += value
+        finally:
+            lock.release()
+
+    def _rotate(self, now: float) -> None:
+        """关闭当前槽并折叠进各窗口层级。"""
+        if self._current.count:
+            closed, start = self._current, self._current_start
+            closed.compact()
+            self._closed_total.merge(closed)
+            for tier, (_, _, slot) in zip(self._tiers, ROLLUP_WINDOWS):
+                tier_start = start - start % slot
+                if tier and tier[-1][0] == tier_start:
+                    tier[-1][1].merge(closed)
+                else:
+                    tier.append(
+                        (tier_start, closed if slot == self._slot else closed.copy())
+                    )
+            self._current = LogHistogram(self.relative_accuracy)
+        self._current_start = now - now % self._slot
+        self._current_end = self._current_start + self._slot
+
+    def total(self) -> LogHistogram:
+        """进程启动以来的累计直方图。"""
+        with self._lock:
+            return self._closed_total.copy().merge(self._current)
+
+    def window(self, name: str) -> LogHistogram:
+        """指定窗口（1m/5m/1h）的汇总直方图。"""
+        for tier, (window_name, window, slot) in zip(self._tiers, ROLLUP_WINDOWS):
+            if window_name == name:
+                break
+        else:
+            raise ValueError(f"不支持的窗口: {name}")
+        now = self._clock()
+        with self._lock:
+            if now >= self._current_end:
+                self._rotate(now)
+            merged = LogHistogram(self.relative_accuracy).merge(self._current)
+            for start, hist in tier:
+                if start + slot > now - window:
+                    merged.merge(hist)
+        return merged
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {"total": self.total().to_dict()}
+        data["windows"] = {
+            name: self.window(name).to_dict() for name, _, _ in ROLLUP_WINDOWS
+        }
+        return data
+
+
+def prometheus_name(name: str, prefix: str = "hbd_") -> str:
+    """把 `app.requests.response_time` 之类的名称转换为合法的 Prometheus 指标名。"""
+    return prefix + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    return tuple(sorted((str(k), str(v)) for k, v in (labels or {}).items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: Optional[float]) -> str:
+    if value is None:
+        return "NaN"
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """指标注册表：按 (名称, 标签) 获取或创建指标。"""
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY) -> None:
+        self.relative_accuracy = relative_accuracy
+        self._lock = threading.Lock()
+        self._families: Dict[str, Dict[str, Any]] = {}
+
+    def _get(self, kind: str, name: str, labels, help_text: str, factory):
+        key = _label_key(labels)
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = {"type": kind, "help": help_text, "metrics": {}}
+                self._families[name] = family
+            elif family["type"] != kind:
+                raise ValueError(f"指标 {name} 已注册为 {family['type']}")
+            metric = family["metrics"].get(key)
+            if metric is None:
+                metric = family["metrics"][key] = factory()
+            return metric
+
+    def counter(
+        self, name: str, labels: Optional[Dict[str, str]] = None, help_text: str = ""
+    ) -> Counter:
+        """获取计数器（热路径应持有返回的句柄，避免重复查找）。"""
+        return self._get("counter", name, labels, help_text, Counter)
+
+    def histogram(
+        self, name: str, labels: Optional[Dict[str, str]] = None, help_text: str = ""
+    ) -> RollupHistogram:
+        """获取直方图（热路径应持有返回的句柄，避免重复查找）。"""
+        return self._get(
+            "summary",
+            name,
+            labels,
+            help_text,
+            lambda: RollupHistogram(self.relative_accuracy),
+        )
+
+    def find_histogram(
+        self, name: str, labels: Optional[Dict[str, str]] = None
+    ) -> Optional[RollupHistogram]:
+        family = self._families.get(name)
+        if family is None or family["type"] != "summary":
+            return None
+        return family["metrics"].get(_label_key(labels))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """导出可 JSON 序列化的快照（用于跨进程合并）。"""
+        with self._lock:
+            families = {
+                name: (family["type"], family["help"], list(family["metrics"].items()))
+                for name, family in self._families.items()
+            }
+        metrics = []
+        for name, (kind, help_text, items) in families.items():
+            for key, metric in items:
+                entry = {"name": name, "type": kind, "help": help_text}
+                entry["labels"] = dict(key)
+                if kind == "counter":
+                    entry["value"] = metric.value
+                else:
+                    entry.update(metric.to_dict())
+                metrics.append(entry)
+        return {"timestamp": time.time(), "metrics": metrics}
+
+
+def merge_snapshots(snapshots: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    合并多个进程的快照：计数器相加，直方图逐桶合并。
+
+    Returns:
+        {name: {"type", "help", "series": {label_key: value | {"total", "windows"}}}}
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for snapshot in snapshots:
+        for entry in snapshot.get("metrics", []):
+            family = merged.setdefault(
+                entry["name"],
+                {"type": entry["type"], "help": entry.get("help", ""), "series": {}},
+            )
+            if family["type"] != entry["type"]:
+                continue
+            key = _label_key(entry.get("labels"))
+            series = family["series"]
+            if entry["type"] == "counter":
+                series[key] = series.get(key, 0.0) + float(entry["value"])
+                continue
+            current = series.get(key)
+            if current is None:
+                current = series[key] = {"total": None, "windows": {}}
+            incoming = [("total", entry["total"])] + list(entry["windows"].items())
+            for name, data in incoming:
+                hist = LogHistogram.from_dict(data)
+                if name == "total":
+                    current["total"] = (
+                        hist
+                        if current["total"] is None
+                        else current["total"].merge(hist)
+                    )
+                elif name in current["windows"]:
+                    current["windows"][name].merge(hist)
+                else:
+                    current["windows"][name] = hist
+    return merged
+
+
+def _summary_lines(name: str, labels: LabelKey, series: Dict[str, Any]) -> List[str]:
+    lines = []
+    for window, hist in sorted(series["windows"].items()):
+        for q in SUMMARY_QUANTILES:
+            label_str = _format_labels(
+                list(labels) + [("window", window), ("quantile", str(q))]
+            )
+            lines.append(f"{name}{label_str} {_format_value(hist.quantile(q))}")
+    total = series["total"]
+    label_str = _format_labels(labels)
+    lines.append(f"{name}_sum{label_str} {_format_value(total.sum)}")
+    lines.append(f"{name}_count{label_str} {total.count}")
+    return lines
+
+
+def render_prometheus(snapshots: Iterable[Dict[str, Any]]) -> str:
+    """
+    把快照渲染为 Prometheus 文本格式。
+
+    直方图输出为 summary：分位数带 window 标签（1m/5m/1h），_sum/_count 为累计值。
+    分位数无法在 Prometheus 端跨序列合并，因此有多个标签组合的直方图额外输出
+    `<name>_all`，即所有序列（摄像头/进程）合并后的分位数。
+    """
+    lines: List[str] = []
+    for name, family in sorted(merge_snapshots(snapshots).items()):
+        kind = family["type"]
+        if family["help"]:
+            lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            for key, value in sorted(family["series"].items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+            continue
+        for key, series in sorted(family["series"].items()):
+            lines.extend(_summary_lines(name, key, series))
+        if len(family["series"]) > 1:
+            combined: Dict[str, Any] = {"total": None, "windows": {}}
+            for series in family["series"].values():
+                combined["total"] = (
+                    series["total"].copy()
+                    if combined["total"] is None
+                    else combined["total"].merge(series["total"])
+                )
+                for window, hist in series["windows"].items():
+                    if window in combined["windows"]:
+                        combined["windows"][window].merge(hist)
+                    else:
+                        combined["windows"][window] = hist.copy()
+            lines.append(f"# TYPE {name}_all {kind}")
+            lines.extend(_summary_lines(f"{name}_all", (), combined))
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def publish_snapshot(
+    redis_client,
+    source: Optional[str] = None,
+    registry: Optional["MetricsRegistry"] = None,
+) -> None:
+    """
+    把本进程快照写入 Redis（同步客户端，检测进程使用）。
+
+    快照包含进程内全部指标，因此按进程（默认 主机名:PID）而不是按摄像头命名，
+    同一进程内的多个摄像头不会被重复计数。
+    """
+    source = source or f"{socket.gethostname()}:{os.getpid()}"
+    snapshot = (registry or get_metrics_registry()).snapshot()
+    snapshot["source"] = source
+    redis_client.set(
+        f"{SNAPSHOT_KEY_PREFIX}{source}", json.dumps(snapshot), ex=SNAPSHOT_TTL_SECONDS
+    )
+
+
+async def collect_snapshots(
+    redis_client=None, registry: Optional["MetricsRegistry"] = None
+) -> List[Dict[str, Any]]:
+    """本进程快照 + Redis 中其他进程的快照（Redis 不可用时只返回本进程）。"""
+    snapshots = [(registry or get_metrics_registry()).snapshot()]
+    if redis_client is None:
+        return snapshots
+    try:
+        async for key in redis_client.scan_iter(match=f"{SNAPSHOT_KEY_PREFIX}*"):
+            raw = await redis_client.get(key)
+            if raw:
+                snapshots.append(json.loads(raw))
+    except Exception as e:
+        logger.warning(f"读取进程指标快照失败: {e}")
+    return snapshots
+
+
+_registry: Optional[MetricsRegistry] = None
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """获取进程级指标注册表。"""
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry()
+    return _registry
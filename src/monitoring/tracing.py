@@ -0,0 +1,459 @@
+"""
+逐帧阶段追踪
+Per-frame Stage Tracing
+
+- 每帧一条 trace：根 span 由检测循环创建，流水线各阶段、行为识别、记录保存与
+  视频推送在其中嵌套子 span（通过 contextvars 传递，跨 await 有效）。
+- 尾部采样：整帧结束后再决定是否保留。耗时超过 slow_frame_ms 的帧全部保留，
+  其余按 sample_rate 随机保留；保留的 trace 转换为 OTLP JSON，写入内存环形
+  缓冲区，并可追加到本地 JSONL 文件（每行一个 ExportTraceServiceRequest）。
+- 火焰图：所有帧（不论是否被采样）按调用栈路径累计次数、总耗时与自身耗时，
+  可输出 folded stacks（flamegraph.pl / speedscope）或嵌套 JSON（d3-flame-graph）。
+- 没有活动 trace 时 trace_span() 返回空操作 span，API 侧的按需推理等调用不受影响。
+"""
+
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY_PREFIX = "hbd:traces:"
+SNAPSHOT_TTL_SECONDS = 60
+MAX_PROFILE_PATHS = 1024  # 每个摄像头最多累计的调用栈路径数
+OTHER_PATH = "<other>"
+
+_perf_ns = time.perf_counter_ns
+
+
+@dataclass
+class TracingSettings:
+    """追踪配置"""
+
+    enabled: bool = True
+    slow_frame_ms: float = 200.0  # 超过该耗时的帧全部保留
+    sample_rate: float = 0.01  # 其余帧的随机保留比例
+    buffer_size: int = 200  # 内存中保留的 trace 数
+    max_spans: int = 256  # 单条 trace 的 span 上限
+    export_path: Optional[str] = None  # OTLP JSONL 导出文件（为空则只保留在内存）
+    export_max_bytes: int = 50 * 1024 * 1024  # 超过后轮转为 .1
+    publish_limit: int = 20  # 发布到 Redis 的最近 trace 数
+
+    @classmethod
+    def from_env(cls) -> "TracingSettings":
+        return cls(
+            enabled=os.getenv("TRACING_ENABLED", "true").lower()
+            in ("1", "true", "yes"),
+            slow_frame_ms=float(os.getenv("TRACING_SLOW_FRAME_MS", "200")),
+            sample_rate=float(os.getenv("TRACING_SAMPLE_RATE", "0.01")),
+            buffer_size=int(os.getenv("TRACING_BUFFER_SIZE", "200")),
+            max_spans=int(os.getenv("TRACING_MAX_SPANS", "256")),
+            export_path=os.getenv("TRACING_EXPORT_PATH") or None,
+            export_max_bytes=int(os.getenv("TRACING_EXPORT_MAX_MB", "50"))
+            * 1024
+            * 1024,
+            publish_limit=int(os.getenv("TRACING_PUBLISH_LIMIT", "20")),
+        )
+
+
+class _NoopSpan:
+    """没有活动 trace 时返回的空操作 span。"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _Trace:
+    __slots__ = ("tracer", "trace_id", "root", "spans", "wall_start_ns", "dropped")
+
+    def __init__(self, tracer: "Tracer") -> None:
+        self.tracer = tracer
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.root: Optional[Span] = None
+        self.spans: List[Span] = []
+        self.wall_start_ns = 0
+        self.dropped = 0
+
+
+class Span:
+    """一个计时区间（上下文管理器）。"""
+
+    __slots__ = (
+        "name",
+        "span_id",
+        "parent",
+        "trace",
+        "attributes",
+        "start_ns",
+        "end_ns",
+        "error",
+        "_token",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace: _Trace,
+        parent: Optional["Span"],
+        attributes: Dict[str, Any],
+    ) -> None:
+        self.name = name
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent = parent
+        self.trace = trace
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error: Optional[str] = None
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration_ns(self) -> int:
+        return max(self.end_ns - self.start_ns, 0)
+
+    def __enter__(self) -> "Span":
+        self.start_ns = _perf_ns()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.end_ns = _perf_ns()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        if self.parent is None:
+            self.trace.tracer._finish(self.trace)
+        return False
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("hbd_current_span", default=None)
+
+
+def trace_span(name: str, **attributes: Any):
+    """在当前 trace 中创建子 span；没有活动 trace 时为空操作。"""
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    trace = parent.trace
+    if len(trace.spans) >= trace.tracer.settings.max_spans:
+        trace.dropped += 1
+        return NOOP_SPAN
+    span = Span(name, trace, parent, attributes)
+    trace.spans.append(span)
+    return span
+
+
+def current_span():
+    """当前活动的 span（用于补充属性），没有时返回空操作 span。"""
+    return _current_span.get() or NOOP_SPAN
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items()]
+
+
+class Tracer:
+    """进程级追踪器：尾部采样、OTLP 导出与火焰图聚合。"""
+
+    def __init__(
+        self,
+        settings: Optional[TracingSettings] = None,
+        service_name: str = "hbd-detection",
+    ) -> None:
+        self.settings = settings or TracingSettings.from_env()
+        self.resource = {
+            "service.name": service_name,
+            "host.name": socket.gethostname(),
+            "process.pid": os.getpid(),
+        }
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        self._buffer: deque = deque(maxlen=self.settings.buffer_size)
+        # {camera_id: {"frame;pipeline.detect": [次数, 总耗时ns, 自身耗时ns]}}
+        self._profiles: Dict[str, Dict[str, List[int]]] = {}
+        self.stats = {
+            "traces": 0,
+            "kept_slow": 0,
+            "kept_sampled": 0,
+            "dropped_spans": 0,
+            "export_errors": 0,
+        }
+
+    def start_trace(self, name: str, **attributes: Any):
+        """开始一条 trace（已在 trace 中时退化为子 span）。"""
+        if not self.settings.enabled:
+            return NOOP_SPAN
+        if _current_span.get() is not None:
+            return trace_span(name, **attributes)
+        trace = _Trace(self)
+        trace.wall_start_ns = time.time_ns()
+        root = Span(name, trace, None, attributes)
+        trace.root = root
+        trace.spans.append(root)
+        return root
+
+    def _finish(self, trace: _Trace) -> None:
+        root = trace.root
+        duration_ms = root.duration_ns / 1e6
+        camera_id = str(root.attributes.get("camera_id", ""))
+        if duration_ms >= self.settings.slow_frame_ms:
+            reason = "slow"
+        elif random.random() < self.settings.sample_rate:
+            reason = "sampled"
+        else:
+            reason = None
+
+        with self._lock:
+            self.stats["traces"] += 1
+            self.stats["dropped_spans"] += trace.dropped
+            self._aggregate(camera_id, trace)
+            if reason is None:
+                return
+            self.stats[f"kept_{reason}"] += 1
+
+        record = {
+            "trace_id": trace.trace_id,
+            "name": root.name,
+            "camera_id": camera_id,
+            "start_time": trace.wall_start_ns / 1e9,
+            "duration_ms": round(duration_ms, 3),
+            "reason": reason,
+            "spans": len(trace.spans),
+            "otlp": self._to_otlp(trace, reason),
+        }
+        with self._lock:
+            self._buffer.append(record)
+        if self.settings.export_path:
+            self._export(record["otlp"])
+
+    def _aggregate(self, camera_id: str, trace: _Trace) -> None:
+        """按调用栈路径累计次数、总耗时与自身耗时。"""
+        profile = self._profiles.setdefault(camera_id, {})
+        root_end = trace.root.end_ns
+        paths: Dict[int, str] = {}
+        child_ns: Dict[int, int] = {}
+        for span in trace.spans:
+            if not span.end_ns:
+                span.end_ns = root_end
+            parent = span.parent
+            if parent is None:
+                paths[id(span)] = span.name
+            else:
+                paths[id(span)] = f"{paths[id(parent)]};{span.name}"
+                child_ns[id(parent)] = child_ns.get(id(parent), 0) + span.duration_ns
+        for span in trace.spans:
+            path = paths[id(span)]
+            entry = profile.get(path)
+            if entry is None:
+                if len(profile) >= MAX_PROFILE_PATHS:
+                    path = OTHER_PATH
+                    entry = profile.setdefault(path, [0, 0, 0])
+                else:
+                    entry = profile[path] = [0, 0, 0]
+            duration = span.duration_ns
+            entry[0] += 1
+            entry[1] += duration
+            entry[2] += max(duration - child_ns.get(id(span), 0), 0)
+
+    def _to_otlp(self, trace: _Trace, reason: str) -> Dict[str, Any]:
+        base_ns = trace.wall_start_ns - trace.root.start_ns
+        spans = []
+        for span in trace.spans:
+            entry = {
+                "traceId": trace.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent.span_id if span.parent else "",
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(base_ns + span.start_ns),
+                "endTimeUnixNano": str(base_ns + span.end_ns),
+                "attributes": _otlp_attributes(span.attributes),
+            }
+            if span.error:
+                entry["status"] = {"code": 2, "message": span.error}
+            spans.append(entry)
+        spans[0]["attributes"].append(
+            {"key": "sampling.reason", "value": {"stringValue": reason}}
+        )
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": _otlp_attributes(self.resource)},
+                    "scopeSpans": [{"scope": {"name": "hbd.tracing"}, "spans": spans}],
+                }
+            ]
+        }
+
+    def _export(self, otlp: Dict[str, Any]) -> None:
+        path = self.settings.export_path
+        line = json.dumps(otlp, ensure_ascii=False) + "\n"
+        with self._export_lock:
+            try:
+                if (
+                    os.path.exists(path)
+                    and os.path.getsize(path) > self.settings.export_max_bytes
+                ):
+                    os.replace(path, f"{path}.1")
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except OSError as e:
+                self.stats["export_errors"] += 1
+                if self.stats["export_errors"] == 1:
+                    logger.warning(f"写入追踪导出文件失败: {path}, {e}")
+
+    def recent_traces(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._buffer)
+
+    def get_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for record in self._buffer:
+                if record["trace_id"] == trace_id:
+                    return record
+        return None
+
+    def snapshot(self, trace_limit: Optional[int] = None) -> Dict[str, Any]:
+        """导出可 JSON 序列化的快照（火焰图累计 + 最近保留的 trace）。"""
+        limit = self.settings.buffer_size if trace_limit is None else trace_limit
+        with self._lock:
+            profiles = {
+                camera: {path: list(v) for path, v in profile.items()}
+                for camera, profile in self._profiles.items()
+            }
+            traces = list(self._buffer)[-limit:] if limit > 0 else []
+            stats = dict(self.stats)
+        return {
+            "source": f"{self.resource['host.name']}:{self.resource['process.pid']}",
+            "timestamp": time.time(),
+            "settings": {
+                "slow_frame_ms": self.settings.slow_frame_ms,
+                "sample_rate": self.settings.sample_rate,
+            },
+            "stats": stats,
+            "profiles": profiles,
+            "traces": traces,
+        }
+
+
+def merge_profiles(
+    snapshots: Iterable[Dict[str, Any]], camera_id: Optional[str] = None
+) -> Dict[str, List[int]]:
+    """合并多个快照的调用栈累计（可按摄像头过滤）。"""
+    merged: Dict[str, List[int]] = {}
+    for snapshot in snapshots:
+        for camera, profile in snapshot.get("profiles", {}).items():
+            if camera_id is not None and camera != camera_id:
+                continue
+            for path, values in profile.items():
+                entry = merged.setdefault(path, [0, 0, 0])
+                for i in range(3):
+                    entry[i] += values[i]
+    return merged
+
+
+def render_folded(profile: Dict[str, List[int]]) -> str:
+    """folded stacks 格式（每行 `a;b;c <自身耗时微秒>`），可直接用于 flamegraph.pl。"""
+    lines = [
+        f"{path} {values[2] // 1000}"
+        for path, values in sorted(profile.items())
+        if values[2] >= 1000
+    ]
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def build_flamegraph(profile: Dict[str, List[int]]) -> Dict[str, Any]:
+    """嵌套 JSON 火焰图（d3-flame-graph 格式，value 为包含子节点的总耗时毫秒）。"""
+    root: Dict[str, Any] = {"name": "all", "value": 0.0, "children": []}
+    nodes: Dict[str, Dict[str, Any]] = {}
+    for path in sorted(profile, key=lambda p: p.count(";")):
+        count, total_ns, self_ns = profile[path]
+        node = {
+            "name": path.rsplit(";", 1)[-1],
+            "value": round(total_ns / 1e6, 3),
+            "self": round(self_ns / 1e6, 3),
+            "count": count,
+            "children": [],
+        }
+        nodes[path] = node
+        parent_path = path.rsplit(";", 1)[0] if ";" in path else None
+        parent = nodes.get(parent_path) if parent_path else None
+        if parent is None:
+            root["children"].append(node)
+            root["value"] = round(root["value"] + node["value"], 3)
+        else:
+            parent["children"].append(node)
+    return root
+
+
+def publish_trace_snapshot(redis_client, tracer: Optional[Tracer] = None) -> None:
+    """把本进程的追踪快照写入 Redis（同步客户端，检测进程使用）。"""
+    tracer = tracer or get_tracer()
+    snapshot = tracer.snapshot(tracer.settings.publish_limit)
+    redis_client.set(
+        f"{SNAPSHOT_KEY_PREFIX}{snapshot['source']}",
+        json.dumps(snapshot, ensure_ascii=False),
+        ex=SNAPSHOT_TTL_SECONDS,
+    )
+
+
+async def collect_trace_snapshots(
+    redis_client=None, tracer: Optional[Tracer] = None
+) -> List[Dict[str, Any]]:
+    """本进程快照 + Redis 中检测进程的快照（Redis 不可用时只返回本进程）。"""
+    local = (tracer or get_tracer()).snapshot()
+    snapshots = [local]
+    if redis_client is None:
+        return snapshots
+    try:
+        async for key in redis_client.scan_iter(match=f"{SNAPSHOT_KEY_PREFIX}*"):
+            raw = await redis_client.get(key)
+            if raw:
+                snapshot = json.loads(raw)
+                if snapshot.get("source") != local["source"]:
+                    snapshots.append(snapshot)
+    except Exception as e:
+        logger.warning(f"读取进程追踪快照失败: {e}")
+    return snapshots
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """获取进程级追踪器（配置来自环境变量）。"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
@@ -7,6 +7,7 @@ from typing import Optional
 import cv2
 import numpy as np
 
+from src.application.hard_example_mining import get_hard_example_miner
 from src.core.optimized_detection_pipeline import (
     DetectionResult,
     OptimizedDetectionPipeline,
@@ -353,9 +354,10 @@ def _capture_violation(
         logger.error(f"Failed to capture violation for track {track_id}: {e}")
 
 
-def process_tracked_frame(session, frame, optimized_pipeline):
+def process_tracked_frame(session, frame, optimized_pipeline, person_detections=None):
     time.time()
-    person_detections = optimized_pipeline._detect_persons(frame)
+    if person_detections is None:
+        person_detections = optimized_pipeline._detect_persons(frame)
     tracker_input = [
         {"bbox": p.get("bbox"), "confidence": p.get("confidence")}
         for p in person_detections
@@ -385,6 +387,11 @@ def process_tracked_frame(session, frame, optimized_pipeline):
         processing_times={},
         annotated_image=None,
     )
+    miner = get_hard_example_miner()
+    if miner is not None:
+        miner.observe(
+            getattr(session, "camera_id", "websocket"), frame, result, tracked_objects
+        )
     annotated_frame = _draw_detections_on_frame_with_tracking(
         frame.copy(), result, tracked_objects, optimized_pipeline
     )
@@ -442,3 +449,27 @@ def process_tracked_frame(session, frame, optimized_pipeline):
         "annotated_image": annotated_image_b64,
         "timestamp": end_time,
     }
+
+
+def process_tracked_frames(items):
+    """
+    批量处理带跟踪的帧（推理服务的批处理函数）。
+
+    items 为 (session, frame, optimized_pipeline) 列表且共用同一检测管道：
+    人体检测合批执行，跟踪与后续检测按提交顺序逐帧执行。
+    单帧失败时返回异常实例，不影响同批其他帧。
+    """
+    optimized_pipeline = items[0][2]
+    frames = [frame for _, frame, _ in items]
+    batch_detections = optimized_pipeline._detect_persons_batch(frames)
+    results = []
+    for (session, frame, _), person_detections in zip(items, batch_detections):
+        try:
+            results.append(
+                process_tracked_frame(
+                    session, frame, optimized_pipeline, person_detections
+                )
+            )
+        except Exception as e:
+            results.append(e)
+    return results
@@ -158,6 +158,9 @@ class DetectionServiceDomain:
                             "captured_at": info.captured_at.isoformat(),
                             "violation_type": info.violation_type,
                             "metadata": dict(info.metadata) if info.metadata else None,
+                            "thumbnail_path": info.thumbnail_path,
+                            "content_hash": info.content_hash,
+                            "deduplicated": info.deduplicated,
                         }
                         for info in snapshots
                     ],
@@ -498,23 +501,32 @@ class DetectionServiceDomain:
         violation_type: Optional[str] = None,
         limit: int = 50,
         offset: int = 0,
+        cursor: Optional[str] = None,
+        approximate_total: bool = False,
     ) -> Dict[str, Any]:
         """
         获取违规明细（对仓储暴露的违规查询进行封装）。
 
         若当前仓储不支持违规查询，抛出异常交由上层回退。
+        cursor/approximate_total 仅在提供时透传给仓储（游标分页）。
         """
         try:
             repo = self.detection_repository
             if hasattr(repo, "get_violations") and callable(
                 getattr(repo, "get_violations")
             ):
+                keyset_kwargs: Dict[str, Any] = {}
+                if cursor:
+                    keyset_kwargs["cursor"] = cursor
+                if approximate_total:
+                    keyset_kwargs["approximate_total"] = True
                 return await getattr(repo, "get_violations")(
                     camera_id=camera_id,
                     status=status,
                     violation_type=violation_type,
                     limit=limit,
                     offset=offset,
+                    **keyset_kwargs,
                 )
             raise NotImplementedError("当前仓储未实现违规明细查询")
         except Exception as e:
@@ -528,6 +540,7 @@ class DetectionServiceDomain:
         offset: int = 0,
         start_time: Optional[datetime] = None,
         end_time: Optional[datetime] = None,
+        cursor: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         根据摄像头ID获取检测记录列表
@@ -538,14 +551,34 @@ class DetectionServiceDomain:
             offset: 偏移量
             start_time: 开始时间（可选，用于优化查询）
             end_time: 结束时间（可选，用于优化查询）
+            cursor: 上一页返回的 next_cursor（提供时忽略offset）
 
         Returns:
-            Dict[str, Any]: 包含检测记录列表和总数等信息
+            Dict[str, Any]: 包含检测记录列表、总数和 next_cursor 等信息
         """
         try:
+            next_cursor = None
+            find_page = getattr(self.detection_repository, "find_page_by_camera", None)
             # 完全移除COUNT查询，避免性能问题
+            if find_page is not None:
+                # 游标分页：seek条件定位下一页，耗时与翻页深度无关
+                # 默认的最近1小时窗口只在第一页计算，其起点写入游标，后续页沿用
+                if not cursor and not start_time and not end_time:
+                    end_time = datetime.utcnow()
+                    start_time = end_time - timedelta(hours=1)
+                records, next_cursor = await find_page(
+                    camera_id,
+                    limit=limit,
+                    cursor=cursor,
+                    start_time=start_time,
+                    end_time=end_time,
+                    offset=offset,
+                )
+                if cursor:
+                    offset = 0
+                total = offset + len(records) + (1 if next_cursor else 0)
             # 如果有时间范围，使用时间范围查询（更高效）
-            if start_time and end_time:
+            elif start_time and end_time:
                 records = await self.detection_repository.find_by_time_range(
                     start_time=start_time,
                     end_time=end_time,
@@ -650,6 +683,7 @@ class DetectionServiceDomain:
                 "camera_id": camera_id,
                 "limit": limit,
                 "offset": offset,
+                "next_cursor": next_cursor,
             }
 
         except Exception as e:
@@ -710,57 +744,86 @@ class DetectionServiceDomain:
             # 计算时间范围
             end_time = datetime.now(timezone.utc)
             start_time = end_time - timedelta(days=days)
+            today = end_time.date()
+            dates = [(today - timedelta(days=i)).isoformat() for i in range(days)][::-1]
 
-            # 获取检测记录
-            records = await self.detection_repository.find_by_time_range(
-                start_time, end_time, camera_id, limit=10000
-            )
+            # 优先使用仓储的SQL聚合（基于检测事件日志，无需逐条解析objects）
+            daily_fn = getattr(self.detection_repository, "get_daily_statistics", None)
+            daily: Dict[str, Dict[str, Any]] = {}
+            if daily_fn is not None:
+                try:
+                    daily = await daily_fn(start_time, end_time, camera_id) or {}
+                except Exception as e:
+                    logger.warning(f"SQL按天统计失败，回退到逐条统计: {e}")
+
+            # 事件日志未覆盖的日期（启用事件日志之前的历史数据）逐条统计
+            missing = [d for d in dates if d not in daily]
+            if missing:
+                legacy_start = max(
+                    start_time,
+                    datetime.fromisoformat(missing[0]).replace(tzinfo=timezone.utc),
+                )
+                legacy_end = min(
+                    end_time,
+                    datetime.fromisoformat(missing[-1]).replace(tzinfo=timezone.utc)
+                    + timedelta(days=1),
+                )
+                legacy = await self._daily_statistics_from_records(
+                    legacy_start, legacy_end, camera_id
+                )
+                for date_str in missing:
+                    daily[date_str] = legacy.get(date_str, {})
 
-            # 按天分组统计
-            per_day: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
-            total_day: Dict[str, int] = defaultdict(int)
+            # 组装输出（按日期升序）
+            return [
+                {
+                    "date": date_str,
+                    "total_events": daily[date_str].get("total_events", 0),
+                    "counts_by_type": dict(daily[date_str].get("counts_by_type", {})),
+                }
+                for date_str in dates
+            ]
 
-            for record in records:
-                # 获取日期字符串
-                # timestamp 是 Timestamp 对象，需要获取 value 属性
-                if hasattr(record.timestamp, "value"):
-                    record_date = record.timestamp.value
-                elif isinstance(record.timestamp, datetime):
-                    record_date = record.timestamp
-                else:
-                    # 如果是其他格式，尝试转换
-                    record_date = datetime.fromisoformat(str(record.timestamp))
-                date_str = record_date.date().isoformat()
+        except Exception as e:
+            logger.error(f"获取按天统计失败: {e}")
+            raise
 
-                # 统计对象类型
-                for obj in record.objects:
-                    # 兼容字典格式和对象格式
-                    if isinstance(obj, dict):
-                        class_name = obj.get("class_name", "unknown")
-                    else:
-                        class_name = obj.class_name
-                    per_day[date_str][class_name] += 1
+    async def _daily_statistics_from_records(
+        self, start_time: datetime, end_time: datetime, camera_id: Optional[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """逐条解析检测记录按天统计，返回 {日期: {total_events, counts_by_type}}"""
+        records = await self.detection_repository.find_by_time_range(
+            start_time, end_time, camera_id, limit=10000
+        )
 
-                total_day[date_str] += 1
+        per_day: Dict[str, Dict[str, Any]] = {}
+        for record in records:
+            # 获取日期字符串
+            # timestamp 是 Timestamp 对象，需要获取 value 属性
+            if hasattr(record.timestamp, "value"):
+                record_date = record.timestamp.value
+            elif isinstance(record.timestamp, datetime):
+                record_date = record.timestamp
+            else:
+                # 如果是其他格式，尝试转换
+                record_date = datetime.fromisoformat(str(record.timestamp))
+            day = per_day.setdefault(
+                record_date.date().isoformat(),
+                {"total_events": 0, "counts_by_type": defaultdict(int)},
+            )
 
-            # 组装输出（按日期升序）
-            today = end_time.date()
-            out: List[Dict[str, Any]] = []
-            for i in range(days - 1, -1, -1):
-                date_str = (today - timedelta(days=i)).isoformat()
-                out.append(
-                    {
-                        "date": date_str,
-                        "total_events": total_day.get(date_str, 0),
-                        "counts_by_type": dict(per_day.get(date_str, {})),
-                    }
-                )
+            # 统计对象类型
+            for obj in record.objects:
+                # 兼容字典格式和对象格式
+                if isinstance(obj, dict):
+                    class_name = obj.get("class_name", "unknown")
+                else:
+                    class_name = obj.class_name
+                day["counts_by_type"][class_name] += 1
 
-            return out
+            day["total_events"] += 1
 
-        except Exception as e:
-            logger.error(f"获取按天统计失败: {e}")
-            raise
+        return per_day
 
     async def get_event_history(
         self,
@@ -1853,7 +1916,7 @@ def get_detection_service_domain() -> DetectionServiceDomain:
                 PostgreSQLViolationRepository,
             )
 
-            # 使用连接字符串创建违规仓储（会自动创建连接池）
+            # 未指定连接字符串：使用进程共享的连接池
             violation_repo = PostgreSQLViolationRepository(connection_string=None)
             logger.info("违规仓储已创建")
         except Exception as e:
@@ -0,0 +1,397 @@
+"""
+按需推理服务（准入控制 + 微批处理）。
+
+/ws 图像检测与综合检测接口的推理请求统一经过本服务：
+- 有界请求队列：总深度与单客户端待处理数都有上限，超出时立即拒绝
+  （InferenceOverloaded，HTTP 429），而不是让所有请求一起排队超时；
+- 按估算排队时间提前拒绝：队列中的批次预计无法在请求截止时间前完成时直接拒绝；
+- 客户端公平：按客户端轮询出队，单个客户端的突发上传不会占满批次；
+- 微批处理：batch_window_ms 内到达的同类请求合并为一次批量调用；
+- 截止时间：每个请求带截止时间，出队时已过期的请求不再执行；
+- 推理在专用线程池中执行，不阻塞事件循环，也不与默认线程池中的其他任务竞争。
+
+批处理函数接收 payload 列表、返回等长结果列表；结果为异常实例时
+该异常只抛给对应请求。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BatchRunner = Callable[[List[Any]], List[Any]]
+
+
+class InferenceOverloaded(Exception):
+    """推理服务过载，请求未进入队列。"""
+
+    def __init__(self, reason: str, retry_after: float = 1.0) -> None:
+        super().__init__(f"推理服务繁忙（{reason}），请稍后重试")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class InferenceDeadlineExceeded(Exception):
+    """请求在截止时间前未完成。"""
+
+
+@dataclass
+class _InferenceRequest:
+    client_id: Hashable
+    key: Any
+    runner: BatchRunner
+    payload: Any
+    future: asyncio.Future
+    enqueued_at: float
+    deadline: float
+    started_at: Optional[float] = field(default=None)
+
+
+class InferenceService:
+    """有界、按客户端公平、微批处理的推理请求调度器。"""
+
+    def __init__(
+        self,
+        max_queue: Optional[int] = None,
+        max_pending_per_client: Optional[int] = None,
+        batch_window_ms: Optional[float] = None,
+        max_batch_size: Optional[int] = None,
+        default_deadline: Optional[float] = None,
+        workers: Optional[int] = None,
+    ) -> None:
+        self.max_queue = max_queue or int(os.getenv("INFERENCE_MAX_QUEUE", "32"))
+        self.max_pending_per_client = max_pending_per_client or int(
+            os.getenv("INFERENCE_MAX_PENDING_PER_CLIENT", "4")
+        )
+        self.batch_window = (
+            batch_window_ms
+            if batch_window_ms is not None
+            else float(os.getenv("INFERENCE_BATCH_WINDOW_MS", "5"))
+        ) / 1000.0
+        self.max_batch_size = max_batch_size or int(
+            os.getenv("INFERENCE_MAX_BATCH_SIZE", "8")
+        )
+        self.default_deadline = default_deadline or float(
+            os.getenv("INFERENCE_DEADLINE_SECONDS", "10")
+        )
+        self.workers = max(1, workers or int(os.getenv("INFERENCE_WORKERS", "1")))
+
+        self._queues: "OrderedDict[Hashable, Deque[_InferenceRequest]]" = OrderedDict()
+        self._depth = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._running: set = set()
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        self.stats: Dict[str, Any] = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "expired": 0,
+            "rejected": {"queue_full": 0, "client_limit": 0, "deadline": 0},
+            "batches": 0,
+            "batched_items": 0,
+            "peak_queue_depth": 0,
+        }
+        self._batch_sizes: Dict[int, int] = {}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._batch_time_total = 0.0
+        self._batch_time_ewma: Optional[float] = None
+
+    # ---------- 生命周期 ----------
+
+    def _ensure_started(self) -> None:
+        """在当前事件循环中启动调度任务（事件循环变化时丢弃旧状态）。"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._dispatcher and not self._dispatcher.done():
+            return
+        if self._loop is not loop:
+            self._queues.clear()
+            self._depth = 0
+            self._running = set()
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.workers)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="inference"
+            )
+        self._dispatcher = loop.create_task(self._dispatch_loop())
+
+    async def stop(self) -> None:
+        """停止调度，拒绝所有排队中的请求。"""
+        if self._dispatcher is not None and not self._dispatcher.done():
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+        self._dispatcher = None
+        for queue in self._queues.values():
+            for request in queue:
+                if not request.future.done():
+                    request.future.set_exception(InferenceOverloaded("服务正在停止"))
+        self._queues.clear()
+        self._depth = 0
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    # ---------- 准入 ----------
+
+    def _estimated_wait(self) -> float:
+        """按近期批次耗时估算新请求的排队时间（秒）。"""
+        if self._batch_time_ewma is None:
+            return 0.0
+        batches_ahead = (self._depth // self.max_batch_size) + len(self._running)
+        return batches_ahead * self._batch_time_ewma / self.workers
+
+    def _admit(self, client_id: Hashable, timeout: float) -> None:
+        rejected = self.stats["rejected"]
+        if self._depth >= self.max_queue:
+            rejected["queue_full"] += 1
+            raise InferenceOverloaded("队列已满", self._retry_after())
+        pending = self._queues.get(client_id)
+        if pending is not None and len(pending) >= self.max_pending_per_client:
+            rejected["client_limit"] += 1
+            raise InferenceOverloaded("客户端待处理请求过多", self._retry_after())
+        if self._estimated_wait() > timeout:
+            rejected["deadline"] += 1
+            raise InferenceOverloaded("预计无法在截止时间前完成", self._retry_after())
+
+    def _retry_after(self) -> float:
+        return max(1.0, round(self._estimated_wait(), 1))
+
+    async def submit(
+        self,
+        client_id: Hashable,
+        runner: BatchRunner,
+        payload: Any,
+        batch_key: Any = None,
+        deadline: Optional[float] = None,
+    ) -> Any:
+        """
+        提交一个推理请求并等待结果。
+
+        Args:
+            client_id: 客户端标识（公平调度与单客户端上限）
+            runner: 批处理函数，输入 payload 列表，返回等长结果列表
+            payload: 请求数据
+            batch_key: 可合批的附加标识（runner 与 batch_key 都相同的请求才会合批）
+            deadline: 截止时间（秒，从提交开始计），默认 default_deadline
+
+        Raises:
+            InferenceOverloaded: 队列已满或预计超时，请求未入队
+            InferenceDeadlineExceeded: 请求未在截止时间前完成
+        """
+        self._ensure_started()
+        timeout = deadline if deadline is not None else self.default_deadline
+        self._admit(client_id, timeout)
+
+        now = time.monotonic()
+        request = _InferenceRequest(
+            client_id=client_id,
+            key=(runner, batch_key),
+            runner=runner,
+            payload=payload,
+            future=self._loop.create_future(),
+            enqueued_at=now,
+            deadline=now + timeout,
+        )
+        self._queues.setdefault(client_id, deque()).append(request)
+        self._depth += 1
+        self.stats["submitted"] += 1
+        self.stats["peak_queue_depth"] = max(
+            self.stats["peak_queue_depth"], self._depth
+        )
+        self._wakeup.set()
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(request.future), timeout)
+        except asyncio.TimeoutError:
+            if not request.future.done():
+                # 仍在排队时直接出队；已在执行的批次结果将被丢弃
+                self._discard(request)
+            raise InferenceDeadlineExceeded(f"推理请求超过截止时间（{timeout:.1f}s）")
+
+    def _discard(self, request: _InferenceRequest) -> None:
+        queue = self._queues.get(request.client_id)
+        if queue is not None and request in queue:
+            queue.remove(request)
+            self._depth -= 1
+            self.stats["expired"] += 1
+            if not queue:
+                del self._queues[request.client_id]
+        request.future.cancel()
+
+    # ---------- 调度 ----------
+
+    def _next_batch(self) -> List[_InferenceRequest]:
+        """按客户端轮询取出一批可合并的请求（丢弃已过期请求）。"""
+        batch: List[_InferenceRequest] = []
+        key = None
+        now = time.monotonic()
+        progressed = True
+        while len(batch) < self.max_batch_size and progressed:
+            progressed = False
+            for client_id in list(self._queues.keys()):
+                queue = self._queues[client_id]
+                while queue and (queue[0].deadline <= now or queue[0].future.done()):
+                    expired = queue.popleft()
+                    self._depth -= 1
+                    if not expired.future.done():
+                        self.stats["expired"] += 1
+                        expired.future.set_exception(
+                            InferenceDeadlineExceeded("推理请求在排队期间超过截止时间")
+                        )
+                if queue and (key is None or queue[0].key == key):
+                    request = queue.popleft()
+                    self._depth -= 1
+                    key = request.key
+                    batch.append(request)
+                    progressed = True
+                    # 已出过请求的客户端移到队尾
+                    self._queues.move_to_end(client_id)
+                if not queue:
+                    del self._queues[client_id]
+                if len(batch) >= self.max_batch_size:
+                    break
+        return batch
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            await self._slots.acquire()
+            try:
+                while self._depth == 0:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                # 等待合批窗口，让几毫秒内到达的请求合并执行
+                if self._depth < self.max_batch_size and self.batch_window > 0:
+                    await asyncio.sleep(self.batch_window)
+                batch = self._next_batch()
+            except BaseException:
+                self._slots.release()
+                raise
+            if not batch:
+                self._slots.release()
+                continue
+            task = self._loop.create_task(self._run_batch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, batch: List[_InferenceRequest]) -> None:
+        started = time.monotonic()
+        for request in batch:
+            wait = started - request.enqueued_at
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+            request.started_at = started
+        size = len(batch)
+        self.stats["batches"] += 1
+        self.stats["batched_items"] += size
+        self._batch_sizes[size] = self._batch_sizes.get(size, 0) + 1
+
+        runner = batch[0].runner
+        payloads = [request.payload for request in batch]
+        try:
+            results = await self._loop.run_in_executor(self._executor, runner, payloads)
+            if len(results) != size:
+                raise RuntimeError(f"批处理结果数量不匹配: {len(results)} != {size}")
+        except Exception as e:
+            logger.error(f"推理批次执行失败: size={size}, error={e}", exc_info=True)
+            results = [e] * size
+        finally:
+            elapsed = time.monotonic() - started
+            self._batch_time_total += elapsed
+            self._batch_time_ewma = (
+                elapsed
+                if self._batch_time_ewma is None
+                else 0.8 * self._batch_time_ewma + 0.2 * elapsed
+            )
+            self._slots.release()
+
+        for request, result in zip(batch, results):
+            if request.future.done():
+                continue
+            if isinstance(result, BaseException):
+                self.stats["failed"] += 1
+                request.future.set_exception(result)
+            else:
+                self.stats["completed"] += 1
+                request.future.set_result(result)
+
+    # ---------- 指标 ----------
+
+    @property
+    def queue_depth(self) -> int:
+        return self._depth
+
+    def get_stats(self) -> Dict[str, Any]:
+        batches = self.stats["batches"]
+        items = self.stats["batched_items"]
+        return {
+            **self.stats,
+            "rejected": dict(self.stats["rejected"]),
+            "queue_depth": self._depth,
+            "clients_waiting": len(self._queues),
+            "batches_running": len(self._running),
+            "batch_sizes": dict(sorted(self._batch_sizes.items())),
+            "avg_batch_size": round(items / batches, 2) if batches else 0.0,
+            "avg_wait_ms": round(self._wait_total / items * 1000, 3) if items else 0.0,
+            "max_wait_ms": round(self._wait_max * 1000, 3),
+            "avg_batch_ms": (
+                round(self._batch_time_total / batches * 1000, 3) if batches else 0.0
+            ),
+            "config": {
+                "max_queue": self.max_queue,
+                "max_pending_per_client": self.max_pending_per_client,
+                "batch_window_ms": self.batch_window * 1000,
+                "max_batch_size": self.max_batch_size,
+                "default_deadline": self.default_deadline,
+                "workers": self.workers,
+            },
+        }
+
+
+def detect_comprehensive_batch(items: List[Any]) -> List[Any]:
+    """综合检测批处理函数：items 为 (pipeline, image)，逐张执行完整检测流水线。"""
+    results: List[Any] = []
+    for pipeline, image in items:
+        try:
+            results.append(pipeline.detect_comprehensive(image))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+_service: Optional[InferenceService] = None
+
+
+def get_inference_service() -> InferenceService:
+    """获取进程内的推理服务单例。"""
+    global _service
+    if _service is None:
+        _service = InferenceService()
+    return _service
+
+
+async def shutdown_inference_service() -> None:
+    global _service
+    if _service is not None:
+        await _service.stop()
+        _service = None
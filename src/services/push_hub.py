@@ -0,0 +1,465 @@
+"""
+实时推送中心（WebSocket 扇出）。
+
+每个数据源只有一个生产者：
+- events: 单个任务追踪 events_record.jsonl（替代每个连接各自轮询文件）；
+- status: redis_listener 收到的 hbd:stats 摄像头统计；
+- alerts: 监控系统告警处理器（来自检查线程，线程安全投递）。
+
+每个客户端有独立的有界队列和发送任务，发布方只做入队，不等待网络发送：
+- status 为状态类主题，按 (主题, 摄像头) 只保留最新值（新值覆盖未发送的旧值）；
+- events/alerts 为事件类主题，FIFO 有界，溢出时丢弃最旧消息并计数，
+  下一批发送时附带一条 dropped 通知；
+- 订阅在服务端按主题、摄像头、事件类型过滤。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, FrozenSet, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TOPIC_STATUS = "status"
+TOPIC_EVENTS = "events"
+TOPIC_ALERTS = "alerts"
+TOPICS = frozenset({TOPIC_STATUS, TOPIC_EVENTS, TOPIC_ALERTS})
+# 只需最新值的主题：未发送的旧值被新值覆盖
+CONFLATED_TOPICS = frozenset({TOPIC_STATUS})
+
+_PROJECT_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+DEFAULT_EVENTS_FILE = os.path.join(
+    _PROJECT_ROOT, "logs", "events", "events_record.jsonl"
+)
+
+
+@dataclass(frozen=True)
+class PushMessage:
+    """一条已编码的推送消息（JSON 只编码一次，所有客户端共享）。"""
+
+    topic: str
+    text: str
+    camera_id: Optional[str] = None
+    event_type: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Subscription:
+    """客户端订阅：主题集合及可选的摄像头/事件类型过滤（None 表示不过滤）。"""
+
+    topics: FrozenSet[str]
+    camera_ids: Optional[FrozenSet[str]] = None
+    event_types: Optional[FrozenSet[str]] = None
+
+    @classmethod
+    def create(
+        cls,
+        topics,
+        camera_ids=None,
+        event_types=None,
+    ) -> "Subscription":
+        def _normalize(values) -> Optional[FrozenSet[str]]:
+            values = [str(v) for v in (values or []) if v not in (None, "")]
+            return frozenset(values) if values else None
+
+        topic_set = _normalize(topics)
+        if not topic_set:
+            raise ValueError("至少需要订阅一个主题")
+        unknown = topic_set - TOPICS
+        if unknown:
+            raise ValueError(f"未知的推送主题: {sorted(unknown)}")
+        return cls(topic_set, _normalize(camera_ids), _normalize(event_types))
+
+    def matches(self, message: PushMessage) -> bool:
+        if message.topic not in self.topics:
+            return False
+        if (
+            self.camera_ids is not None
+            and message.camera_id is not None
+            and message.camera_id not in self.camera_ids
+        ):
+            return False
+        if (
+            self.event_types is not None
+            and message.topic == TOPIC_EVENTS
+            and message.event_type not in self.event_types
+        ):
+            return False
+        return True
+
+
+def split_param(value: Optional[str]) -> List[str]:
+    """解析逗号分隔的查询参数。"""
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+class ClientQueue:
+    """单个客户端的有界推送队列。"""
+
+    def __init__(self, subscription: Subscription, max_events: int = 256) -> None:
+        self.subscription = subscription
+        self.max_events = max_events
+        self._latest: "OrderedDict[tuple, PushMessage]" = OrderedDict()
+        self._events: Deque[PushMessage] = deque()
+        self._wakeup = asyncio.Event()
+        self._pending_drops: Dict[str, int] = {}
+        self.stats = {"enqueued": 0, "sent": 0, "conflated": 0, "dropped": 0}
+
+    def __len__(self) -> int:
+        return len(self._latest) + len(self._events)
+
+    def offer(self, message: PushMessage) -> bool:
+        """按订阅过滤后入队（不阻塞）。返回是否接收。"""
+        if not self.subscription.matches(message):
+            return False
+        self.stats["enqueued"] += 1
+        if message.topic in CONFLATED_TOPICS:
+            key = (message.topic, message.camera_id)
+            if key in self._latest:
+                self.stats["conflated"] += 1
+                self._latest.move_to_end(key)
+            self._latest[key] = message
+        else:
+            if len(self._events) >= self.max_events:
+                dropped = self._events.popleft()
+                self.stats["dropped"] += 1
+                self._pending_drops[dropped.topic] = (
+                    self._pending_drops.get(dropped.topic, 0) + 1
+                )
+            self._events.append(message)
+        self._wakeup.set()
+        return True
+
+    def drain(self) -> List[str]:
+        """取出当前全部待发送消息（事件按序在前，最新状态在后）。"""
+        texts = [
+            json.dumps({"type": "dropped", "topic": topic, "count": count})
+            for topic, count in self._pending_drops.items()
+        ]
+        self._pending_drops.clear()
+        texts.extend(m.text for m in self._events)
+        texts.extend(m.text for m in self._latest.values())
+        self._events.clear()
+        self._latest.clear()
+        self._wakeup.clear()
+        return texts
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待新消息；超时返回 False。"""
+        if len(self) or self._pending_drops:
+            return True
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class EventLogTailer:
+    """单一生产者：追踪事件日志文件的新增行并发布到 events 主题。"""
+
+    def __init__(
+        self,
+        hub: "PushHub",
+        path: str = DEFAULT_EVENTS_FILE,
+        interval: float = 0.5,
+    ) -> None:
+        self.hub = hub
+        self.path = path
+        self.interval = interval
+        self._offset: Optional[int] = None
+        self._inode: Optional[int] = None
+        self._partial = b""
+        self.stats = {"lines": 0, "invalid": 0}
+
+    def read_new(self) -> List[Dict[str, Any]]:
+        """读取自上次以来新增的完整行（在线程中执行，只解析不发布）。"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        if self._offset is None:
+            # 首次只从文件末尾开始，不回放历史事件
+            self._offset, self._inode, self._partial = stat.st_size, stat.st_ino, b""
+            return []
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            # 文件被轮转或截断：从头读取新文件
+            self._offset, self._inode, self._partial = 0, stat.st_ino, b""
+        if stat.st_size == self._offset:
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read()
+            self._offset = f.tell()
+
+        lines = (self._partial + chunk).split(b"\n")
+        self._partial = lines.pop()  # 末尾可能是尚未写完的行
+        events = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line.decode("utf-8", errors="replace"))
+            except json.JSONDecodeError:
+                self.stats["invalid"] += 1
+                continue
+            self.stats["lines"] += 1
+            if isinstance(event, dict):
+                events.append(event)
+        return events
+
+    async def poll(self) -> int:
+        """读取新增事件并发布，返回发布数量。"""
+        events = await asyncio.to_thread(self.read_new)
+        for event in events:
+            self.hub.publish_event(event)
+        return len(events)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                if self.hub.has_subscribers(TOPIC_EVENTS):
+                    await self.poll()
+                else:
+                    # 无订阅者时不跟踪位置，重新订阅后从文件末尾开始
+                    self._offset = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"事件日志追踪失败: {e}")
+            await asyncio.sleep(self.interval)
+
+
+class PushHub:
+    """推送中心：管理客户端队列、发布消息并统计。"""
+
+    def __init__(
+        self,
+        max_events_per_client: Optional[int] = None,
+        events_file: str = DEFAULT_EVENTS_FILE,
+        events_poll_interval: float = 0.5,
+    ) -> None:
+        self.max_events_per_client = max_events_per_client or int(
+            os.getenv("PUSH_CLIENT_QUEUE_SIZE", "256")
+        )
+        self._clients: Dict[Any, ClientQueue] = {}
+        self._tailer = EventLogTailer(self, events_file, events_poll_interval)
+        self._tailer_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {"published": 0, "delivered": 0, "clients_total": 0}
+        self._topic_published: Dict[str, int] = {}
+
+    # ---------- 订阅 ----------
+
+    def register(self, client: Any, subscription: Subscription) -> ClientQueue:
+        """注册客户端并返回其队列；首次有事件订阅者时启动事件日志追踪。"""
+        queue = ClientQueue(subscription, self.max_events_per_client)
+        self._clients[client] = queue
+        self.stats["clients_total"] += 1
+        self.bind_loop()
+        if TOPIC_EVENTS in subscription.topics:
+            self._ensure_tailer()
+        return queue
+
+    def resubscribe(self, client: Any, subscription: Subscription) -> None:
+        queue = self._clients.get(client)
+        if queue is not None:
+            queue.subscription = subscription
+            if TOPIC_EVENTS in subscription.topics:
+                self._ensure_tailer()
+
+    def unregister(self, client: Any) -> None:
+        self._clients.pop(client, None)
+
+    def has_subscribers(self, topic: str) -> bool:
+        return any(topic in q.subscription.topics for q in self._clients.values())
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    # ---------- 发布 ----------
+
+    def publish(
+        self,
+        topic: str,
+        payload: Dict[str, Any],
+        camera_id: Optional[str] = None,
+        event_type: Optional[str] = None,
+    ) -> int:
+        """
+        发布消息到所有匹配的客户端队列（只入队，不等待发送）。
+
+        Returns:
+            int: 接收该消息的客户端数量。
+        """
+        self.stats["published"] += 1
+        self._topic_published[topic] = self._topic_published.get(topic, 0) + 1
+        if not self._clients:
+            return 0
+        message = PushMessage(
+            topic,
+            json.dumps(payload, ensure_ascii=False, default=str),
+            None if camera_id is None else str(camera_id),
+            None if event_type is None else str(event_type),
+        )
+        delivered = sum(1 for q in list(self._clients.values()) if q.offer(message))
+        self.stats["delivered"] += delivered
+        return delivered
+
+    def publish_status(self, camera_id: str, stats_data: Dict[str, Any]) -> int:
+        return self.publish(
+            TOPIC_STATUS,
+            {
+                "type": "status_update",
+                "camera_id": camera_id,
+                "data": stats_data,
+                "timestamp": time.time(),
+            },
+            camera_id=camera_id,
+        )
+
+    def publish_event(self, event: Dict[str, Any]) -> int:
+        return self.publish(
+            TOPIC_EVENTS,
+            {"type": "event", "data": event},
+            camera_id=event.get("camera_id"),
+            event_type=event.get("type"),
+        )
+
+    def publish_alert(self, alert: Dict[str, Any]) -> int:
+        return self.publish(
+            TOPIC_ALERTS,
+            {"type": "alert", "data": alert, "timestamp": time.time()},
+            camera_id=alert.get("camera_id"),
+        )
+
+    def bind_loop(self) -> None:
+        """记录所在事件循环，供其他线程投递消息。"""
+        self._loop = asyncio.get_running_loop()
+
+    def publish_threadsafe(self, method: Callable[..., int], *args: Any) -> None:
+        """从其他线程（如告警检查线程）投递到事件循环中发布。"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(method, *args)
+
+    # ---------- 客户端发送 ----------
+
+    async def pump(
+        self,
+        client: Any,
+        send_text: Callable[[str], Awaitable[Any]],
+        ping_interval: float = 15.0,
+        send_timeout: float = 10.0,
+    ) -> None:
+        """
+        客户端发送循环：批量取出队列并发送，空闲时发送 ping。
+
+        发送超时的客户端会被断开（抛出 asyncio.TimeoutError），不影响其他客户端。
+        """
+        queue = self._clients.get(client)
+        if queue is None:
+            return
+        while client in self._clients:
+            if not await queue.wait(timeout=ping_interval):
+                await asyncio.wait_for(
+                    send_text(json.dumps({"type": "ping"})), timeout=send_timeout
+                )
+                continue
+            for text in queue.drain():
+                await asyncio.wait_for(send_text(text), timeout=send_timeout)
+                queue.stats["sent"] += 1
+
+    # ---------- 生命周期与统计 ----------
+
+    def _ensure_tailer(self) -> None:
+        if self._tailer_task is None or self._tailer_task.done():
+            self._tailer_task = asyncio.get_running_loop().create_task(
+                self._tailer.run()
+            )
+
+    async def stop(self) -> None:
+        if self._tailer_task is not None and not self._tailer_task.done():
+            self._tailer_task.cancel()
+            try:
+                await self._tailer_task
+            except asyncio.CancelledError:
+                pass
+        self._tailer_task = None
+        self._clients.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """推送统计：客户端数、各主题发布量、各客户端队列深度/覆盖/丢弃数。"""
+        clients = list(self._clients.values())
+        return {
+            **self.stats,
+            "clients": len(clients),
+            "topics": {
+                topic: {
+                    "published": self._topic_published.get(topic, 0),
+                    "subscribers": sum(
+                        1 for q in clients if topic in q.subscription.topics
+                    ),
+                }
+                for topic in sorted(TOPICS)
+            },
+            "queue_depth_max": max((len(q) for q in clients), default=0),
+            "conflated": sum(q.stats["conflated"] for q in clients),
+            "dropped": sum(q.stats["dropped"] for q in clients),
+            "sent": sum(q.stats["sent"] for q in clients),
+            "event_log": {
+                "path": self._tailer.path,
+                "running": self._tailer_task is not None
+                and not self._tailer_task.done(),
+                **self._tailer.stats,
+            },
+        }
+
+
+def attach_monitoring_alerts(hub: PushHub) -> bool:
+    """将监控系统的告警转发到 alerts 主题（告警在检查线程中触发）。"""
+    try:
+        from src.monitoring.advanced_monitoring import get_monitoring_system
+    except Exception as e:
+        logger.debug(f"监控系统不可用，跳过告警推送: {e}")
+        return False
+
+    def _forward(alert) -> None:
+        data = asdict(alert)
+        severity = data.get("severity")
+        data["severity"] = getattr(severity, "value", severity)
+        hub.publish_threadsafe(hub.publish_alert, data)
+
+    hub.bind_loop()
+    get_monitoring_system().alert_manager.add_alert_handler(_forward)
+    return True
+
+
+_hub: Optional[PushHub] = None
+
+
+def get_push_hub() -> PushHub:
+    """获取进程内的推送中心单例。"""
+    global _hub
+    if _hub is None:
+        _hub = PushHub()
+    return _hub
+
+
+async def shutdown_push_hub() -> None:
+    global _hub
+    if _hub is not None:
+        await _hub.stop()
+        _hub = None
@@ -0,0 +1,394 @@
+"""
+共享内存视频帧传输
+
+检测进程与API进程位于同一主机时，通过每个摄像头一个的共享内存环形缓冲区
+传递已编码帧，省去Redis发布/订阅的网络往返与拷贝；跨主机部署时仍使用Redis。
+
+内存布局:
+    [环头 64B: magic, version, slots, slot_size, write_seq, epoch]
+    [槽0: 帧头 + 负载(slot_size)] [槽1 ...] ...
+
+帧头字段: seq（环内写序号）、frame_seq（档位内帧序号）、timestamp、
+height、width、channels、encoding、rendition、payload_len。
+同一帧头也用于Redis消息封装，使两种传输都能统计时延与丢帧。
+
+写入采用序号校验：先清零槽序号，写入负载后再写回序号；读取前后序号一致才视为有效。
+"""
+
+import hashlib
+import os
+import re
+import struct
+import time
+from collections import deque
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from src.services.stream_renditions import DEFAULT_RENDITION, RENDITIONS
+
+try:  # Python < 3.13 的只读附加会被 resource_tracker 误登记并在退出时删除
+    from multiprocessing import resource_tracker
+except Exception:  # pragma: no cover - 平台不支持
+    resource_tracker = None  # type: ignore
+
+RING_MAGIC = b"PBVS"
+RING_VERSION = 1
+RING_HEADER = struct.Struct("<4sHHIQQ")
+RING_HEADER_SIZE = 64
+WRITE_SEQ_OFFSET = 12
+
+FRAME_HEADER = struct.Struct("<QQdIIHBBI")
+ENVELOPE_MAGIC = b"PBF1"
+
+ENCODING_RAW = 0
+ENCODING_JPEG = 1
+
+RENDITION_CODES: Dict[str, int] = {name: i for i, name in enumerate(RENDITIONS)}
+RENDITION_NAMES: Dict[int, str] = {i: name for name, i in RENDITION_CODES.items()}
+
+DEFAULT_SLOTS = 8
+DEFAULT_SLOT_SIZE = 1024 * 1024
+
+# 本进程创建的环，读端跳过以免同进程重复投递
+_OWNED_RINGS: Set[str] = set()
+
+
+def shm_enabled() -> bool:
+    """检查是否启用共享内存传输（VIDEO_SHM_ENABLED，默认启用）"""
+    return os.getenv("VIDEO_SHM_ENABLED", "1").strip() not in ("0", "false", "False")
+
+
+def ring_name(camera_id: str) -> str:
+    """摄像头对应的共享内存名称"""
+    safe = re.sub(r"[^A-Za-z0-9_]", "_", camera_id)
+    if len(safe) > 24 or safe != camera_id:
+        safe = hashlib.sha1(camera_id.encode()).hexdigest()[:16]
+    return f"pbvs_{safe}"
+
+
+@dataclass
+class SharedFrame:
+    """共享帧（帧头 + 负载）"""
+
+    seq: int
+    frame_seq: int
+    timestamp: float
+    height: int
+    width: int
+    channels: int
+    encoding: int
+    rendition: str
+    payload: bytes
+
+    @property
+    def latency_ms(self) -> float:
+        """从写入到当前的时延（毫秒）"""
+        return max(0.0, (time.time() - self.timestamp) * 1000)
+
+
+def _pack_header(
+    seq: int,
+    frame_seq: int,
+    timestamp: float,
+    shape,
+    encoding: int,
+    rendition: str,
+    payload_len: int,
+) -> bytes:
+    height, width = shape[:2]
+    channels = shape[2] if len(shape) > 2 else 1
+    return FRAME_HEADER.pack(
+        seq,
+        frame_seq,
+        timestamp,
+        height,
+        width,
+        channels,
+        encoding,
+        RENDITION_CODES.get(rendition, RENDITION_CODES[DEFAULT_RENDITION]),
+        payload_len,
+    )
+
+
+def _unpack_header(data, offset: int = 0) -> Tuple[SharedFrame, int]:
+    """解析帧头，返回 (不含负载的帧, 负载长度)"""
+    (
+        seq,
+        frame_seq,
+        ts,
+        height,
+        width,
+        channels,
+        encoding,
+        code,
+        length,
+    ) = FRAME_HEADER.unpack_from(data, offset)
+    frame = SharedFrame(
+        seq,
+        frame_seq,
+        ts,
+        height,
+        width,
+        channels,
+        encoding,
+        RENDITION_NAMES.get(code, DEFAULT_RENDITION),
+        b"",
+    )
+    return frame, length
+
+
+def encode_envelope(
+    frame_seq: int,
+    timestamp: float,
+    shape,
+    rendition: str,
+    payload: bytes,
+    encoding: int = ENCODING_JPEG,
+) -> bytes:
+    """为Redis消息添加帧头"""
+    header = _pack_header(
+        0, frame_seq, timestamp, shape, encoding, rendition, len(payload)
+    )
+    return ENVELOPE_MAGIC + header + payload
+
+
+def decode_envelope(data: bytes) -> Optional[SharedFrame]:
+    """解析Redis消息的帧头（无帧头的旧格式JPEG返回None）"""
+    if not data or data[:4] != ENVELOPE_MAGIC:
+        return None
+    try:
+        frame, length = _unpack_header(data, 4)
+    except struct.error:
+        return None
+    start = 4 + FRAME_HEADER.size
+    frame.payload = bytes(data[start : start + length])
+    return frame
+
+
+class ShmFrameWriter:
+    """共享内存环形缓冲区写端（检测进程，每个摄像头一个）"""
+
+    def __init__(
+        self,
+        camera_id: str,
+        slots: Optional[int] = None,
+        slot_size: Optional[int] = None,
+    ):
+        self.camera_id = camera_id
+        self.name = ring_name(camera_id)
+        self.slots = slots or int(os.getenv("VIDEO_SHM_SLOTS", str(DEFAULT_SLOTS)))
+        self.slot_size = slot_size or int(
+            os.getenv("VIDEO_SHM_SLOT_BYTES", str(DEFAULT_SLOT_SIZE))
+        )
+        self.stride = FRAME_HEADER.size + self.slot_size
+        size = RING_HEADER_SIZE + self.slots * self.stride
+
+        try:
+            self._shm = shared_memory.SharedMemory(
+                name=self.name, create=True, size=size
+            )
+        except FileExistsError:
+            # 上一个写端异常退出遗留的环，重建
+            stale = shared_memory.SharedMemory(name=self.name)
+            stale.close()
+            stale.unlink()
+            self._shm = shared_memory.SharedMemory(
+                name=self.name, create=True, size=size
+            )
+        _OWNED_RINGS.add(self.name)
+
+        # epoch 区分写端重启后重建的同名环
+        self.epoch = time.time_ns()
+        self._write_seq = 0
+        RING_HEADER.pack_into(
+            self._shm.buf,
+            0,
+            RING_MAGIC,
+            RING_VERSION,
+            self.slots,
+            self.slot_size,
+            0,
+            self.epoch,
+        )
+        self.stats = {"frames_written": 0, "oversized": 0}
+
+    def write(
+        self,
+        payload: bytes,
+        shape,
+        rendition: str = DEFAULT_RENDITION,
+        frame_seq: int = 0,
+        timestamp: Optional[float] = None,
+        encoding: int = ENCODING_JPEG,
+    ) -> bool:
+        """
+        写入一帧
+
+        Returns:
+            是否写入成功（负载超过槽容量时返回False）
+        """
+        if len(payload) > self.slot_size:
+            self.stats["oversized"] += 1
+            return False
+
+        seq = self._write_seq + 1
+        offset = RING_HEADER_SIZE + (seq % self.slots) * self.stride
+        buf = self._shm.buf
+        timestamp = time.time() if timestamp is None else timestamp
+
+        # 先使槽失效，再写负载，最后写入帧头（含序号）
+        struct.pack_into("<Q", buf, offset, 0)
+        start = offset + FRAME_HEADER.size
+        buf[start : start + len(payload)] = payload
+        buf[offset : offset + FRAME_HEADER.size] = _pack_header(
+            seq, frame_seq, timestamp, shape, encoding, rendition, len(payload)
+        )
+        struct.pack_into("<Q", buf, WRITE_SEQ_OFFSET, seq)
+
+        self._write_seq = seq
+        self.stats["frames_written"] += 1
+        return True
+
+    def close(self) -> None:
+        """关闭并删除共享内存"""
+        _OWNED_RINGS.discard(self.name)
+        try:
+            self._shm.close()
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class ShmFrameReader:
+    """共享内存环形缓冲区读端（API进程，只读取不写入）"""
+
+    def __init__(self, shm: shared_memory.SharedMemory, camera_id: str):
+        self._shm = shm
+        self.camera_id = camera_id
+        (
+            magic,
+            version,
+            self.slots,
+            self.slot_size,
+            write_seq,
+            self.epoch,
+        ) = RING_HEADER.unpack_from(shm.buf, 0)
+        if magic != RING_MAGIC or version != RING_VERSION:
+            shm.close()
+            raise ValueError(f"共享内存格式不匹配: {shm.name}")
+        self.stride = FRAME_HEADER.size + self.slot_size
+        # 从当前位置开始读取，不回放附加前的历史帧
+        self.last_seq = max(0, write_seq - 1)
+        self.stats = {"frames_read": 0, "torn": 0}
+
+    @classmethod
+    def attach(cls, camera_id: str) -> Optional["ShmFrameReader"]:
+        """附加到摄像头的环（不存在或由本进程创建时返回None）"""
+        name = ring_name(camera_id)
+        if name in _OWNED_RINGS:
+            return None
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        except (FileNotFoundError, OSError):
+            return None
+        if resource_tracker is not None:
+            try:
+                resource_tracker.unregister(shm._name, "shared_memory")
+            except Exception:
+                pass
+        try:
+            return cls(shm, camera_id)
+        except (ValueError, struct.error):
+            return None
+
+    def read_new(self) -> List[SharedFrame]:
+        """
+        读取自上次以来的新帧，每个档位只返回最新一帧
+
+        读取中被改写的槽计入 torn；被覆盖或被同档位更新帧取代的帧
+        体现为 frame_seq 间隔，由 DeliveryMeter 计为丢帧。
+        """
+        buf = self._shm.buf
+        write_seq = struct.unpack_from("<Q", buf, WRITE_SEQ_OFFSET)[0]
+        if write_seq <= self.last_seq:
+            return []
+
+        first = max(self.last_seq + 1, write_seq - self.slots + 1)
+        latest: Dict[str, SharedFrame] = {}
+        for seq in range(first, write_seq + 1):
+            offset = RING_HEADER_SIZE + (seq % self.slots) * self.stride
+            frame, length = _unpack_header(buf, offset)
+            if frame.seq != seq or length > self.slot_size:
+                self.stats["torn"] += 1
+                continue
+            start = offset + FRAME_HEADER.size
+            frame.payload = bytes(buf[start : start + length])
+            if struct.unpack_from("<Q", buf, offset)[0] != seq:
+                self.stats["torn"] += 1
+                continue
+            latest[frame.rendition] = frame
+        self.last_seq = write_seq
+        self.stats["frames_read"] += len(latest)
+        return sorted(latest.values(), key=lambda f: f.seq)
+
+    def close(self) -> None:
+        """断开附加（不删除共享内存）"""
+        try:
+            self._shm.close()
+        except Exception:
+            pass
+
+
+class DeliveryMeter:
+    """按传输方式统计帧数、丢帧与投递时延"""
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._frames: Dict[str, int] = {}
+        self._dropped: Dict[str, int] = {}
+        self._latency: Dict[str, Deque[float]] = {}
+        self._last_seq: Dict[tuple, int] = {}
+
+    def record(self, transport: str, camera_id: str, frame: SharedFrame) -> None:
+        """
+        记录一帧（按 frame_seq 间隔推算丢帧）
+
+        Args:
+            transport: 传输方式（shm/redis）
+            camera_id: 摄像头ID
+            frame: 帧（使用 frame_seq 与 timestamp）
+        """
+        key = (transport, camera_id, frame.rendition)
+        previous = self._last_seq.get(key)
+        dropped = 0
+        if previous is not None and frame.frame_seq > previous + 1:
+            dropped = frame.frame_seq - previous - 1
+        self._last_seq[key] = frame.frame_seq
+        self._frames[transport] = self._frames.get(transport, 0) + 1
+        self._dropped[transport] = self._dropped.get(transport, 0) + dropped
+        latency = self._latency.setdefault(transport, deque(maxlen=self.window))
+        latency.append(frame.latency_ms)
+
+    def add_dropped(self, transport: str, count: int) -> None:
+        """累加丢帧数"""
+        if count > 0:
+            self._dropped[transport] = self._dropped.get(transport, 0) + count
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """返回各传输方式统计: frames, dropped, avg/p95/max 时延（毫秒）"""
+        result: Dict[str, Dict[str, float]] = {}
+        for transport in set(self._frames) | set(self._dropped):
+            samples = sorted(self._latency.get(transport, ()))
+            stats = {
+                "frames": self._frames.get(transport, 0),
+                "dropped": self._dropped.get(transport, 0),
+            }
+            if samples:
+                stats["avg_latency_ms"] = round(sum(samples) / len(samples), 3)
+                stats["p95_latency_ms"] = round(
+                    samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3
+                )
+                stats["max_latency_ms"] = round(samples[-1], 3)
+            result[transport] = stats
+        return result
@@ -0,0 +1,212 @@
+"""
+视频流多分辨率档位（rendition）
+
+同一路摄像头按观看场景提供若干档位：
+- thumb: 多画面墙缩略图
+- medium: 默认档位（沿用原有推送尺寸与质量，频道 video:{camera_id}）
+- full: 全屏原始分辨率
+
+检测进程只为当前有订阅者的档位编码，每帧每档位只编码一次，
+由 VideoStreamManager 按客户端所选档位分发。
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Mapping, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class Rendition:
+    """视频流档位
+
+    Attributes:
+        name: 档位名称
+        max_width: 最大宽度（None表示不缩放）
+        quality: JPEG质量（1-100）
+    """
+
+    name: str
+    max_width: Optional[int]
+    quality: int
+
+
+DEFAULT_RENDITION = "medium"
+
+RENDITIONS: Dict[str, Rendition] = {
+    "thumb": Rendition("thumb", 320, 50),
+    "medium": Rendition("medium", None, 60),
+    "full": Rendition("full", None, 80),
+}
+
+# Redis 哈希：每个API进程写入自己的字段 "{worker_id}/{档位}"，值为该进程订阅该档位
+# 的客户端数（绝对值），读取方按档位求和；通过共享内存接收帧的API进程使用
+# "{档位}:shm" 字段，检测进程据此跳过Redis发布。
+# 各进程定期写入 "{worker_id}/heartbeat" 时间戳并刷新键的TTL，心跳超时的进程
+# （崩溃、被杀）的计数在读取时忽略，并由其他进程的心跳清理。
+DEMAND_KEY_PREFIX = "video:renditions:"
+DEMAND_KEY_TTL = 3600
+SHM_DEMAND_SUFFIX = ":shm"
+DEMAND_HEARTBEAT_FIELD = "heartbeat"
+DEMAND_HEARTBEAT_INTERVAL = 30.0
+DEMAND_WORKER_TIMEOUT = 90.0
+
+
+def is_valid_rendition(name: Optional[str]) -> bool:
+    """检查档位名称是否有效"""
+    return name in RENDITIONS
+
+
+def stream_channel(camera_id: str, rendition: str = DEFAULT_RENDITION) -> str:
+    """档位对应的Redis频道（默认档位保持原频道名 video:{camera_id}）"""
+    if rendition == DEFAULT_RENDITION:
+        return f"video:{camera_id}"
+    return f"video:{camera_id}@{rendition}"
+
+
+def parse_channel(channel: str) -> Tuple[str, str]:
+    """从Redis频道名解析 (camera_id, rendition)"""
+    name = channel.split(":", 1)[-1]
+    camera_id, sep, rendition = name.rpartition("@")
+    if sep and camera_id and rendition in RENDITIONS:
+        return camera_id, rendition
+    return name, DEFAULT_RENDITION
+
+
+def demand_key(camera_id: str) -> str:
+    """档位订阅计数的Redis键"""
+    return f"{DEMAND_KEY_PREFIX}{camera_id}"
+
+
+def demand_field(rendition: str, local: bool = False) -> str:
+    """档位订阅计数字段（local=True 表示经共享内存接收）"""
+    return f"{rendition}{SHM_DEMAND_SUFFIX}" if local else rendition
+
+
+def worker_demand_field(worker_id: str, field: str) -> str:
+    """API进程自己的订阅计数字段"""
+    return f"{worker_id}/{field}"
+
+
+def _parse_demand(
+    raw: Mapping[Any, Any], now: float, timeout: float
+) -> Tuple[Dict[str, int], List[str]]:
+    """解析订阅计数哈希，返回 (按字段求和的计数, 心跳超时进程的原始字段名)"""
+    entries = []
+    heartbeats: Dict[str, float] = {}
+    for name, value in (raw or {}).items():
+        name = name.decode() if isinstance(name, bytes) else str(name)
+        value = value.decode() if isinstance(value, bytes) else value
+        worker, sep, field = name.rpartition("/")
+        if not sep:
+            worker = None  # 旧版本进程写入的计数字段
+        try:
+            if field == DEMAND_HEARTBEAT_FIELD:
+                heartbeats[worker] = float(value)
+            else:
+                entries.append((name, worker, field, int(value)))
+        except (TypeError, ValueError):
+            continue
+
+    totals: Dict[str, int] = {}
+    stale = [
+        f"{worker}/{DEMAND_HEARTBEAT_FIELD}"
+        for worker, beat in heartbeats.items()
+        if now - beat > timeout
+    ]
+    for name, worker, field, count in entries:
+        if worker is not None and now - heartbeats.get(worker, float("-inf")) > timeout:
+            stale.append(name)
+            continue
+        totals[field] = totals.get(field, 0) + count
+    return totals, stale
+
+
+def aggregate_demand(
+    raw: Mapping[Any, Any],
+    now: Optional[float] = None,
+    timeout: float = DEMAND_WORKER_TIMEOUT,
+) -> Dict[str, int]:
+    """
+    汇总各API进程上报的档位订阅计数
+
+    Args:
+        raw: Redis 哈希内容（键值可为bytes）
+        now: 当前时间戳（秒）
+        timeout: 心跳超时（秒），超时进程的计数不计入
+
+    Returns:
+        {计数字段: 客户端数}，计数不大于0的字段不返回
+    """
+    totals, _ = _parse_demand(raw, time.time() if now is None else now, timeout)
+    return {field: count for field, count in totals.items() if count > 0}
+
+
+def stale_demand_fields(
+    raw: Mapping[Any, Any],
+    now: Optional[float] = None,
+    timeout: float = DEMAND_WORKER_TIMEOUT,
+) -> List[str]:
+    """心跳超时的API进程留下的字段（由存活进程清理）"""
+    _, stale = _parse_demand(raw, time.time() if now is None else now, timeout)
+    return stale
+
+
+def scaled_size(
+    width: int, height: int, max_width: Optional[int]
+) -> Optional[Tuple[int, int]]:
+    """按最大宽度等比缩放，无需缩放时返回 None"""
+    if not max_width or width <= max_width:
+        return None
+    return max_width, max(1, int(round(height * max_width / width)))
+
+
+class RenditionMeter:
+    """按档位统计帧数、字节速率与编码耗时（滑动窗口）"""
+
+    def __init__(self, window_seconds: float = 10.0):
+        self.window_seconds = window_seconds
+        self._frames: Dict[str, int] = {}
+        self._bytes: Dict[str, int] = {}
+        self._encode_ms: Dict[str, float] = {}
+        self._recent: Dict[str, Deque[Tuple[float, int]]] = {}
+
+    def record(
+        self,
+        rendition: str,
+        nbytes: int,
+        encode_ms: Optional[float] = None,
+        now: Optional[float] = None,
+    ) -> None:
+        """记录一帧"""
+        now = time.monotonic() if now is None else now
+        self._frames[rendition] = self._frames.get(rendition, 0) + 1
+        self._bytes[rendition] = self._bytes.get(rendition, 0) + nbytes
+        if encode_ms is not None:
+            self._encode_ms[rendition] = self._encode_ms.get(rendition, 0.0) + encode_ms
+        recent = self._recent.setdefault(rendition, deque())
+        recent.append((now, nbytes))
+        self._trim(recent, now)
+
+    def _trim(self, recent: Deque[Tuple[float, int]], now: float) -> None:
+        while recent and now - recent[0][0] > self.window_seconds:
+            recent.popleft()
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """返回各档位统计: frames, bytes, bytes_per_sec, fps, avg_encode_ms"""
+        now = time.monotonic() if now is None else now
+        result: Dict[str, Dict[str, float]] = {}
+        for name, frames in self._frames.items():
+            recent = self._recent[name]
+            self._trim(recent, now)
+            window_bytes = sum(n for _, n in recent)
+            stats = {
+                "frames": frames,
+                "bytes": self._bytes[name],
+                "bytes_per_sec": round(window_bytes / self.window_seconds, 1),
+                "fps": round(len(recent) / self.window_seconds, 2),
+            }
+            if name in self._encode_ms:
+                stats["avg_encode_ms"] = round(self._encode_ms[name] / frames, 3)
+            result[name] = stats
+        return result
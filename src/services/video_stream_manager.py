@@ -6,16 +6,41 @@
 - 帧共享缓存（编码一次，发送多次）
 - 异步发送队列（不阻塞检测线程）
 - 按需推送（无客户端时零影响）
+- 多分辨率档位（客户端可切换，按档位分发并上报订阅数）
+- 同主机共享内存帧传输（跨主机时回退到Redis）
 """
 
 import asyncio
 import os
+import socket
+import time
+import uuid
 from collections import defaultdict
-from typing import Dict, Optional, Set
+from typing import Dict, Optional, Set, Tuple
 
 from fastapi import WebSocket
 from loguru import logger
 
+from src.services.shm_frame_transport import (
+    DeliveryMeter,
+    ShmFrameReader,
+    decode_envelope,
+    shm_enabled,
+)
+from src.services.stream_renditions import (
+    DEFAULT_RENDITION,
+    DEMAND_HEARTBEAT_FIELD,
+    DEMAND_HEARTBEAT_INTERVAL,
+    DEMAND_KEY_TTL,
+    RenditionMeter,
+    demand_field,
+    demand_key,
+    is_valid_rendition,
+    parse_channel,
+    stale_demand_fields,
+    worker_demand_field,
+)
+
 try:
     # Redis is optional; used to bridge frames from detection subprocesses
     import redis.asyncio as aioredis  # type: ignore
@@ -33,6 +58,26 @@ class VideoStreamManager:
         # 每个摄像头的最新帧缓存 (帧共享机制)
         self.frame_cache: Dict[str, bytes] = {}
 
+        # 每个客户端所选档位，以及非默认档位的最新帧缓存
+        self.client_renditions: Dict[str, Dict[WebSocket, str]] = defaultdict(dict)
+        self.rendition_cache: Dict[Tuple[str, str], bytes] = {}
+        self.rendition_meter = RenditionMeter()
+
+        # 本进程在Redis订阅计数哈希中的字段（按进程区分，定期心跳刷新）
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._published_demand: Dict[str, Set[str]] = {}
+        self._demand_lock = asyncio.Lock()
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+        # 共享内存读端（同主机检测进程），以及按传输方式的投递统计
+        self._shm_readers: Dict[str, ShmFrameReader] = {}
+        self._shm_attach_at: Dict[str, float] = {}
+        self._shm_last_frame: Dict[str, float] = {}
+        self._shm_task: Optional[asyncio.Task] = None
+        self.shm_poll_interval = float(os.getenv("VIDEO_SHM_POLL_INTERVAL", "0.01"))
+        self.shm_stale_after = float(os.getenv("VIDEO_SHM_STALE_AFTER", "5.0"))
+        self.delivery_meter = DeliveryMeter()
+
         # 发送队列 (异步发送机制，增加队列大小以减少丢帧)
         self.send_queue: asyncio.Queue = asyncio.Queue(maxsize=200)
 
@@ -50,18 +95,28 @@ class VideoStreamManager:
             "frames_received": 0,
         }
 
-    async def connect(self, websocket: WebSocket, camera_id: str) -> None:
+    async def connect(
+        self,
+        websocket: WebSocket,
+        camera_id: str,
+        rendition: str = DEFAULT_RENDITION,
+    ) -> None:
         """
         客户端连接到指定摄像头视频流
 
         Args:
             websocket: WebSocket连接
             camera_id: 摄像头ID
+            rendition: 档位名称（无效时使用默认档位）
         """
+        if not is_valid_rendition(rendition):
+            rendition = DEFAULT_RENDITION
         try:
             await websocket.accept()
             self.active_connections[camera_id].add(websocket)
+            self.client_renditions[camera_id][websocket] = rendition
             self.stats["total_connections"] += 1
+            await self._publish_demand(camera_id)
 
             logger.info(
                 f"客户端已连接到视频流 [{camera_id}], "
@@ -75,12 +130,11 @@ class VideoStreamManager:
                 logger.info(f"视频流已启动 [{camera_id}]")
 
             # 立即发送最新帧（如果有缓存）
-            if camera_id in self.frame_cache:
+            cached = self.get_cached_frame(camera_id, rendition)
+            if cached is not None:
                 try:
-                    await websocket.send_bytes(self.frame_cache[camera_id])
-                    logger.info(
-                        f"已发送缓存帧到新客户端 [{camera_id}], 帧大小={len(self.frame_cache[camera_id])} bytes"
-                    )
+                    await websocket.send_bytes(cached)
+                    logger.info(f"已发送缓存帧到新客户端 [{camera_id}], 帧大小={len(cached)} bytes")
                 except Exception as e:
                     logger.warning(f"发送缓存帧失败: {e}")
 
@@ -97,7 +151,11 @@ class VideoStreamManager:
             camera_id: 摄像头ID
         """
         try:
+            if websocket not in self.active_connections.get(camera_id, set()):
+                return
             self.active_connections[camera_id].discard(websocket)
+            self.client_renditions[camera_id].pop(websocket, None)
+            await self._publish_demand(camera_id)
             self.stats["total_connections"] = max(
                 0, self.stats["total_connections"] - 1
             )
@@ -116,6 +174,8 @@ class VideoStreamManager:
                 if camera_id in self.frame_cache:
                     del self.frame_cache[camera_id]
                     logger.debug(f"已清理帧缓存 [{camera_id}]")
+                for key in [k for k in self.rendition_cache if k[0] == camera_id]:
+                    del self.rendition_cache[key]
 
         except Exception as e:
             logger.error(f"客户端断开处理失败 [{camera_id}]: {e}")
@@ -144,7 +204,251 @@ class VideoStreamManager:
         """
         return len(self.active_connections.get(camera_id, set()))
 
-    async def update_frame(self, camera_id: str, frame_jpeg: bytes) -> None:
+    def has_frame(self, camera_id: str) -> bool:
+        """检查某个摄像头是否有缓存帧"""
+        return camera_id in self.frame_cache
+
+    def get_rendition_demand(self, camera_id: str) -> Dict[str, int]:
+        """
+        获取某个摄像头各档位的本进程客户端数量
+
+        Args:
+            camera_id: 摄像头ID
+
+        Returns:
+            {档位名称: 客户端数量}
+        """
+        demand: Dict[str, int] = {}
+        for rendition in self.client_renditions.get(camera_id, {}).values():
+            demand[rendition] = demand.get(rendition, 0) + 1
+        return demand
+
+    def has_rendition_clients(self, camera_id: str, rendition: str) -> bool:
+        """检查某个档位是否有客户端"""
+        return rendition in self.client_renditions.get(camera_id, {}).values()
+
+    def get_cached_frame(
+        self, camera_id: str, rendition: str = DEFAULT_RENDITION
+    ) -> Optional[bytes]:
+        """获取档位的最新缓存帧（该档位尚无帧时回退到默认档位）"""
+        if rendition != DEFAULT_RENDITION:
+            cached = self.rendition_cache.get((camera_id, rendition))
+            if cached is not None:
+                return cached
+        return self.frame_cache.get(camera_id)
+
+    def _cache_frame(self, camera_id: str, rendition: str, frame_jpeg: bytes) -> None:
+        if rendition == DEFAULT_RENDITION:
+            self.frame_cache[camera_id] = frame_jpeg
+        else:
+            self.rendition_cache[(camera_id, rendition)] = frame_jpeg
+
+    async def set_rendition(
+        self, websocket: WebSocket, camera_id: str, rendition: str
+    ) -> bool:
+        """
+        切换客户端档位
+
+        Args:
+            websocket: WebSocket连接
+            camera_id: 摄像头ID
+            rendition: 新档位名称
+
+        Returns:
+            是否切换成功（档位无效或客户端未连接时返回False）
+        """
+        clients = self.client_renditions.get(camera_id, {})
+        if not is_valid_rendition(rendition) or websocket not in clients:
+            return False
+        previous = clients[websocket]
+        if previous == rendition:
+            return True
+
+        clients[websocket] = rendition
+        await self._publish_demand(camera_id)
+        logger.info(f"客户端切换档位 [{camera_id}]: {previous} -> {rendition}")
+
+        # 新档位已有缓存帧时立即发送，避免等待下一次推送
+        cached = self.get_cached_frame(camera_id, rendition)
+        if cached is not None:
+            try:
+                await websocket.send_bytes(cached)
+            except Exception as e:
+                logger.debug(f"发送切换档位缓存帧失败: {e}")
+        return True
+
+    async def _publish_demand(self, camera_id: str) -> None:
+        """
+        将本进程的档位订阅计数（绝对值）与心跳写入Redis，供检测进程决定需要编码的档位
+
+        计数写在本进程自己的字段中，不再增减共享计数，重复写入或进程崩溃不会使计数漂移；
+        不再有订阅的字段会被删除。
+        """
+        if self._redis is None:
+            return
+        local = camera_id in self._shm_readers
+        fields: Dict[str, str] = {
+            worker_demand_field(self.worker_id, demand_field(rendition, local)): str(
+                count
+            )
+            for rendition, count in self.get_rendition_demand(camera_id).items()
+        }
+        if fields:
+            heartbeat = worker_demand_field(self.worker_id, DEMAND_HEARTBEAT_FIELD)
+            fields[heartbeat] = f"{time.time():.3f}"
+        key = demand_key(camera_id)
+        async with self._demand_lock:
+            try:
+                removed = self._published_demand.get(camera_id, set()) - set(fields)
+                if removed:
+                    await self._redis.hdel(key, *removed)
+                if fields:
+                    await self._redis.hset(key, mapping=fields)
+                    await self._redis.expire(key, DEMAND_KEY_TTL)
+                    self._published_demand[camera_id] = set(fields)
+                else:
+                    self._published_demand.pop(camera_id, None)
+            except Exception as e:
+                logger.debug(f"更新档位订阅计数失败 [{camera_id}]: {e}")
+
+    async def _prune_demand(self, camera_id: str) -> None:
+        """删除心跳超时的API进程留下的订阅计数"""
+        key = demand_key(camera_id)
+        try:
+            stale = stale_demand_fields(await self._redis.hgetall(key))
+            if stale:
+                await self._redis.hdel(key, *stale)
+                logger.info(f"已清理失效进程的档位订阅计数 [{camera_id}]: {stale}")
+        except Exception as e:
+            logger.debug(f"清理档位订阅计数失败 [{camera_id}]: {e}")
+
+    async def _demand_heartbeat_loop(self) -> None:
+        """定期重新写入本进程的订阅计数并刷新TTL，同时清理失效进程的计数"""
+        while True:
+            try:
+                await asyncio.sleep(DEMAND_HEARTBEAT_INTERVAL)
+                if self._redis is None:
+                    continue
+                cameras = set(self._published_demand) | {
+                    c for c, clients in self.active_connections.items() if clients
+                }
+                for camera_id in cameras:
+                    await self._publish_demand(camera_id)
+                    await self._prune_demand(camera_id)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.debug(f"档位订阅心跳错误: {e}")
+
+    def _deliver_frame(self, camera_id: str, rendition: str, data: bytes) -> None:
+        """缓存帧并放入发送队列（队列将满时丢弃最旧帧）"""
+        self._cache_frame(camera_id, rendition, data)
+        if not self.has_rendition_clients(camera_id, rendition):
+            return
+        if self.send_queue.qsize() > 150:
+            try:
+                self.send_queue.get_nowait()
+                self.stats["frames_dropped"] += 1
+            except asyncio.QueueEmpty:
+                pass
+        try:
+            self.send_queue.put_nowait((camera_id, rendition, data))
+        except asyncio.QueueFull:
+            self.stats["frames_dropped"] += 1
+
+    async def _attach_shm(self, camera_id: str, now: float) -> Optional[ShmFrameReader]:
+        """尝试附加摄像头的共享内存环（每秒最多一次）"""
+        if now - self._shm_attach_at.get(camera_id, float("-inf")) < 1.0:
+            return None
+        self._shm_attach_at[camera_id] = now
+        reader = ShmFrameReader.attach(camera_id)
+        if reader is None:
+            return None
+        self._shm_readers[camera_id] = reader
+        self._shm_last_frame[camera_id] = now
+        await self._publish_demand(camera_id)
+        logger.info(f"视频帧改由共享内存接收 [{camera_id}]")
+        return reader
+
+    async def _detach_shm(self, camera_id: str) -> None:
+        """断开共享内存环，档位订阅计数迁回Redis"""
+        reader = self._shm_readers.pop(camera_id, None)
+        if reader is None:
+            return
+        reader.close()
+        self._shm_last_frame.pop(camera_id, None)
+        await self._publish_demand(camera_id)
+        logger.info(f"共享内存已断开，视频帧回退到Redis [{camera_id}]")
+
+    async def _check_stale_shm(self, camera_id: str, now: float) -> None:
+        """长时间无新帧时检查写端：已退出则断开，已重建则重新附加"""
+        reader = self._shm_readers[camera_id]
+        fresh = ShmFrameReader.attach(camera_id)
+        if fresh is None:
+            await self._detach_shm(camera_id)
+        elif fresh.epoch != reader.epoch:
+            reader.close()
+            self._shm_readers[camera_id] = fresh
+            self._shm_last_frame[camera_id] = now
+        else:
+            fresh.close()
+            self._shm_last_frame[camera_id] = now
+
+    async def poll_shm(self, now: Optional[float] = None) -> int:
+        """
+        轮询有客户端的摄像头的共享内存环并投递新帧
+
+        Returns:
+            本次投递的帧数
+        """
+        now = time.monotonic() if now is None else now
+        delivered = 0
+        for camera_id in [
+            c for c, clients in self.active_connections.items() if clients
+        ]:
+            reader = self._shm_readers.get(camera_id)
+            if reader is None:
+                reader = await self._attach_shm(camera_id, now)
+                if reader is None:
+                    continue
+
+            frames = reader.read_new()
+            if not frames:
+                if now - self._shm_last_frame[camera_id] > self.shm_stale_after:
+                    await self._check_stale_shm(camera_id, now)
+                continue
+
+            self._shm_last_frame[camera_id] = now
+            for frame in frames:
+                self.delivery_meter.record("shm", camera_id, frame)
+                self._deliver_frame(camera_id, frame.rendition, frame.payload)
+                delivered += 1
+
+        for camera_id in list(self._shm_readers):
+            if not self.has_clients(camera_id):
+                await self._detach_shm(camera_id)
+        return delivered
+
+    async def _shm_poll_loop(self) -> None:
+        """后台共享内存轮询循环"""
+        logger.info("视频流共享内存轮询已启动")
+        while True:
+            try:
+                await self.poll_shm()
+                await asyncio.sleep(self.shm_poll_interval)
+            except asyncio.CancelledError:
+                logger.info("视频流共享内存轮询已停止")
+                break
+            except Exception as e:
+                logger.debug(f"共享内存轮询错误: {e}")
+                await asyncio.sleep(0.5)
+
+    async def update_frame(
+        self,
+        camera_id: str,
+        frame_jpeg: bytes,
+        rendition: str = DEFAULT_RENDITION,
+    ) -> None:
         """
         更新帧缓存并异步广播
 
@@ -153,16 +457,17 @@ class VideoStreamManager:
         Args:
             camera_id: 摄像头ID
             frame_jpeg: JPEG编码的帧数据
+            rendition: 帧所属档位
         """
         try:
             # 1. 更新帧共享缓存 (编码一次)
-            self.frame_cache[camera_id] = frame_jpeg
+            self._cache_frame(camera_id, rendition, frame_jpeg)
 
-            # 2. 如果有客户端，放入发送队列（异步发送，不阻塞）
-            if self.has_clients(camera_id):
+            # 2. 如果该档位有客户端，放入发送队列（异步发送，不阻塞）
+            if self.has_rendition_clients(camera_id, rendition):
                 try:
                     # 非阻塞放入队列
-                    self.send_queue.put_nowait((camera_id, frame_jpeg))
+                    self.send_queue.put_nowait((camera_id, rendition, frame_jpeg))
                 except asyncio.QueueFull:
                     self.stats["frames_dropped"] += 1
                     logger.warning(
@@ -180,16 +485,23 @@ class VideoStreamManager:
         while True:
             try:
                 # 从队列获取待发送的帧
-                camera_id, frame_data = await self.send_queue.get()
+                camera_id, rendition, frame_data = await self.send_queue.get()
 
-                # 广播给所有连接的客户端
+                # 广播给所有选择该档位的客户端
                 disconnected = set()
-                clients = self.active_connections.get(camera_id, set())
+                clients = [
+                    ws
+                    for ws, selected in self.client_renditions.get(
+                        camera_id, {}
+                    ).items()
+                    if selected == rendition
+                ]
 
                 for websocket in clients:
                     try:
                         await websocket.send_bytes(frame_data)
                         self.stats["frames_sent"] += 1
+                        self.rendition_meter.record(rendition, len(frame_data))
                     except Exception as e:
                         logger.debug(f"发送失败，标记断开: {e}")
                         disconnected.add(websocket)
@@ -209,7 +521,7 @@ class VideoStreamManager:
         """订阅 Redis Pub/Sub 的视频帧并转发到本地发送队列.
 
         订阅通配频道: video:* ，消息负载为JPEG字节。
-        通道名格式: video:{camera_id}
+        通道名格式: video:{camera_id}（默认档位）或 video:{camera_id}@{rendition}
         """
         if aioredis is None:
             logger.warning("未安装 redis，跳过视频流Redis订阅")
@@ -273,6 +585,9 @@ class VideoStreamManager:
             try:
                 await self._redis.ping()
                 logger.info(f"Redis连接测试成功: {masked_url}")
+                # 补报Redis就绪前已连接客户端的档位订阅
+                for camera_id in list(self.client_renditions):
+                    await self._publish_demand(camera_id)
             except Exception as e:
                 logger.error(f"Redis连接测试失败: {e}, url={masked_url}")
                 raise
@@ -299,14 +614,22 @@ class VideoStreamManager:
                         if isinstance(channel, (bytes, bytearray))
                         else str(channel)
                     )
-                    # Extract camera_id from channel name
-                    camera_id = ch.split(":", 1)[-1]
+                    # Extract camera_id / rendition from channel name
+                    camera_id, rendition = parse_channel(ch)
                     if not camera_id:
                         continue
 
+                    # 已通过共享内存接收该摄像头时忽略Redis副本
+                    if camera_id in self._shm_readers:
+                        continue
+                    frame = decode_envelope(data)
+                    if frame is not None:
+                        self.delivery_meter.record("redis", camera_id, frame)
+                        data = frame.payload
+
                     # 更新帧缓存并加入本地发送队列（不检查客户端，交由sender判断）
                     # 直接调用内部方法，避免重复编码
-                    self.frame_cache[camera_id] = data
+                    self._cache_frame(camera_id, rendition, data)
                     self.stats["frames_received"] += 1
 
                     # 每30帧记录一次，第一次和每100帧也记录
@@ -321,7 +644,7 @@ class VideoStreamManager:
                         )
 
                     # 检查是否有客户端连接
-                    has_clients = self.has_clients(camera_id)
+                    has_clients = self.has_rendition_clients(camera_id, rendition)
 
                     if has_clients:
                         try:
@@ -333,7 +656,7 @@ class VideoStreamManager:
                                     self.stats["frames_dropped"] += 1
                                 except asyncio.QueueEmpty:
                                     pass
-                            self.send_queue.put_nowait((camera_id, data))
+                            self.send_queue.put_nowait((camera_id, rendition, data))
                             # 每100帧记录一次队列日志（减少日志输出）
                             if self.stats["frames_received"] % 100 == 0:
                                 logger.debug(
@@ -391,6 +714,10 @@ class VideoStreamManager:
         )
 
         if enable_redis:
+            if self._heartbeat_task is None or self._heartbeat_task.done():
+                self._heartbeat_task = asyncio.create_task(
+                    self._demand_heartbeat_loop()
+                )
             if self._redis_task is None or self._redis_task.done():
                 try:
                     logger.info("正在启动Redis订阅任务...")
@@ -405,6 +732,10 @@ class VideoStreamManager:
         else:
             logger.info("视频流Redis订阅已禁用（VIDEO_STREAM_USE_REDIS=0）")
 
+        # 启动共享内存轮询（同主机检测进程）
+        if shm_enabled() and (self._shm_task is None or self._shm_task.done()):
+            self._shm_task = asyncio.create_task(self._shm_poll_loop())
+
     async def stop(self) -> None:
         """停止后台任务"""
         if self._sender_task and not self._sender_task.done():
@@ -420,7 +751,23 @@ class VideoStreamManager:
                 await self._redis_task
             except asyncio.CancelledError:
                 pass
+        for task in (self._shm_task, self._heartbeat_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        for camera_id in list(self._shm_readers):
+            await self._detach_shm(camera_id)
         if self._redis is not None:
+            # 删除本进程的档位订阅计数字段
+            for camera_id, fields in list(self._published_demand.items()):
+                try:
+                    await self._redis.hdel(demand_key(camera_id), *fields)
+                except Exception as e:
+                    logger.debug(f"删除档位订阅计数失败 [{camera_id}]: {e}")
+            self._published_demand.clear()
             try:
                 await self._redis.close()
             except Exception:
@@ -435,6 +782,14 @@ class VideoStreamManager:
                 for cam_id, clients in self.active_connections.items()
                 if clients
             },
+            "rendition_demand": {
+                cam_id: self.get_rendition_demand(cam_id)
+                for cam_id, clients in self.active_connections.items()
+                if clients
+            },
+            "renditions": self.rendition_meter.snapshot(),
+            "transports": self.delivery_meter.snapshot(),
+            "shm_cameras": sorted(self._shm_readers),
         }
 
 
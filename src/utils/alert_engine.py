@@ -0,0 +1,312 @@
+"""
+告警规则流式评估引擎
+Streaming Alert Rule Evaluation Engine
+
+规则条件在注册时编译为谓词对象；错误到达时只更新匹配规则的分桶环形计数器，
+监控周期内的评估只读取计数器，开销为 O(规则数)，与错误量无关。
+冷却状态可持久化到JSON文件，进程重启后继续生效；活跃告警只保存在进程内，
+重启后不再用于去重。
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# 每个时间窗口最多划分的桶数（决定计数精度与评估开销上限）
+MAX_BUCKETS = 60
+
+_CLAUSE_RE = re.compile(
+    r"^\s*(?P<field>\w+)\s*(?P<op>==|!=|in|not in)\s*(?P<value>.+?)\s*$"
+)
+_SUPPORTED_FIELDS = ("severity", "category", "camera_id", "module")
+
+
+def _field_value(error_info: Any, name: str) -> Optional[str]:
+    """读取错误记录中的谓词字段"""
+    if name == "severity":
+        return error_info.severity.value
+    if name == "category":
+        return error_info.category.value
+    context = error_info.context
+    if name == "camera_id":
+        camera_id = context.additional_data.get("camera_id")
+        return str(camera_id) if camera_id is not None else None
+    if name == "module":
+        return context.module_name
+    return None
+
+
+@dataclass(frozen=True)
+class FieldPredicate:
+    """单字段谓词：字段值在（或不在）给定集合中"""
+
+    name: str
+    values: FrozenSet[str]
+    negate: bool = False
+
+    def matches(self, error_info: Any) -> bool:
+        return (_field_value(error_info, self.name) in self.values) != self.negate
+
+
+@dataclass(frozen=True)
+class ErrorPredicate:
+    """编译后的规则条件（各字段谓词取与；无谓词表示匹配所有错误）"""
+
+    clauses: tuple = ()
+    source: str = ""
+
+    def matches(self, error_info: Any) -> bool:
+        return all(clause.matches(error_info) for clause in self.clauses)
+
+
+def _parse_values(raw: str) -> FrozenSet[str]:
+    raw = raw.strip()
+    if raw.startswith(("(", "[")) and raw.endswith((")", "]")):
+        raw = raw[1:-1]
+    values = [v.strip().strip("'\"") for v in raw.split(",")]
+    return frozenset(v for v in values if v)
+
+
+def compile_condition(condition: Union[str, Dict[str, Any], None]) -> ErrorPredicate:
+    """
+    编译规则条件
+
+    支持两种形式：
+    - 表达式字符串: "severity == 'critical'"、"category in ('gpu', 'model') and camera_id == 'cam1'"
+    - 字典（告警规则库的 conditions 字段）: {"severity": ["high", "critical"], "category": "gpu"}
+
+    空条件（None、""、"*"）匹配所有错误。
+
+    Raises:
+        ValueError: 条件无法解析或字段不受支持
+    """
+    if condition is None or (
+        isinstance(condition, str) and condition.strip() in ("", "*")
+    ):
+        return ErrorPredicate(source="*")
+
+    clauses: List[FieldPredicate] = []
+    if isinstance(condition, dict):
+        for name, value in condition.items():
+            if name not in _SUPPORTED_FIELDS:
+                continue  # 阈值、窗口等非谓词字段
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            clauses.append(FieldPredicate(name, frozenset(str(v) for v in values)))
+        return ErrorPredicate(tuple(clauses), json.dumps(condition, sort_keys=True))
+
+    for part in re.split(r"\s+and\s+", condition.strip()):
+        match = _CLAUSE_RE.match(part)
+        if not match:
+            raise ValueError(f"无法解析的告警条件: {part!r}")
+        name, op, raw = match.group("field", "op", "value")
+        if name not in _SUPPORTED_FIELDS:
+            raise ValueError(f"不支持的告警条件字段: {name}")
+        clauses.append(
+            FieldPredicate(name, _parse_values(raw), negate=op in ("!=", "not in"))
+        )
+    return ErrorPredicate(tuple(clauses), condition)
+
+
+class WindowCounter:
+    """
+    分桶环形计数器
+
+    时间窗口被划分为固定数量的桶，计数与查询均为 O(桶数)，与事件数量无关。
+    """
+
+    def __init__(self, window_seconds: float, max_buckets: int = MAX_BUCKETS):
+        self.window = float(max(window_seconds, 1))
+        self.bucket_count = int(max(1, min(max_buckets, self.window)))
+        self.bucket_seconds = self.window / self.bucket_count
+        self._counts = [0] * self.bucket_count
+        self._epochs = [-1] * self.bucket_count
+
+    def add(self, timestamp: float, amount: int = 1) -> None:
+        epoch = int(timestamp // self.bucket_seconds)
+        slot = epoch % self.bucket_count
+        if self._epochs[slot] > epoch:
+            # 乱序到达且早于该槽位当前周期（已滑出窗口）的事件直接丢弃，不覆盖新数据
+            return
+        if self._epochs[slot] != epoch:
+            self._epochs[slot] = epoch
+            self._counts[slot] = 0
+        self._counts[slot] += amount
+
+    def count(self, now: float) -> int:
+        current = int(now // self.bucket_seconds)
+        oldest = current - self.bucket_count + 1
+        return sum(
+            c for c, e in zip(self._counts, self._epochs) if oldest <= e <= current
+        )
+
+
+@dataclass
+class CompiledRule:
+    """引擎内的规则运行时状态"""
+
+    name: str
+    predicate: ErrorPredicate
+    threshold: int
+    counter: WindowCounter
+    cooldown: float
+    enabled: bool = True
+    last_triggered: float = 0.0
+    active_alert_id: Optional[str] = None  # 仅进程内有效，不持久化
+    matched_total: int = 0
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+class AlertEngine:
+    """
+    告警规则流式评估引擎
+
+    Args:
+        state_path: 冷却/去重状态持久化文件（None表示不持久化）
+    """
+
+    def __init__(self, state_path: Optional[str] = None):
+        self.state_path = state_path
+        self.rules: Dict[str, CompiledRule] = {}
+        self.lock = threading.Lock()
+        self._persisted = self._load_state()
+
+    # ---------------- 规则管理 ----------------
+
+    def add_rule(
+        self,
+        name: str,
+        condition: Union[str, Dict[str, Any], None],
+        threshold: int,
+        time_window: float,
+        cooldown: float = 300,
+        enabled: bool = True,
+        **extra: Any,
+    ) -> CompiledRule:
+        """编译并注册规则（同名规则被替换，已持久化的冷却状态保留）"""
+        compiled = CompiledRule(
+            name=name,
+            predicate=compile_condition(condition),
+            threshold=max(1, int(threshold)),
+            counter=WindowCounter(time_window),
+            cooldown=float(cooldown),
+            enabled=enabled,
+            extra=extra,
+        )
+        state = self._persisted.get(name, {})
+        compiled.last_triggered = float(state.get("last_triggered", 0.0))
+        previous = self.rules.get(name)
+        if previous is not None:
+            compiled.active_alert_id = previous.active_alert_id
+        with self.lock:
+            self.rules[name] = compiled
+        return compiled
+
+    def remove_rule(self, name: str) -> None:
+        with self.lock:
+            self.rules.pop(name, None)
+
+    # ---------------- 事件与评估 ----------------
+
+    def observe(self, error_info: Any) -> None:
+        """错误到达时更新匹配规则的计数器"""
+        timestamp = error_info.context.timestamp
+        with self.lock:
+            for rule in self.rules.values():
+                if rule.predicate.matches(error_info):
+                    rule.counter.add(timestamp)
+                    rule.matched_total += 1
+
+    def count(self, name: str, now: Optional[float] = None) -> int:
+        """规则时间窗口内的匹配错误数"""
+        now = time.time() if now is None else now
+        with self.lock:
+            rule = self.rules.get(name)
+            return rule.counter.count(now) if rule else 0
+
+    def evaluate(self, now: Optional[float] = None) -> List[CompiledRule]:
+        """返回本周期应触发的规则（已排除禁用与冷却中的规则）"""
+        now = time.time() if now is None else now
+        fired = []
+        with self.lock:
+            for rule in self.rules.values():
+                if not rule.enabled or now - rule.last_triggered < rule.cooldown:
+                    continue
+                if rule.counter.count(now) >= rule.threshold:
+                    fired.append(rule)
+        return fired
+
+    def mark_triggered(
+        self, name: str, alert_id: Optional[str], now: Optional[float] = None
+    ) -> None:
+        """记录触发时间（持久化，用于冷却）与当前活跃告警（进程内去重）"""
+        with self.lock:
+            rule = self.rules.get(name)
+            if rule is None:
+                return
+            rule.last_triggered = time.time() if now is None else now
+            rule.active_alert_id = alert_id
+        self.save_state()
+
+    def clear_active(self, alert_id: str) -> None:
+        """告警解决后清除去重标记"""
+        with self.lock:
+            for rule in self.rules.values():
+                if rule.active_alert_id == alert_id:
+                    rule.active_alert_id = None
+
+    def get_stats(self, now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        now = time.time() if now is None else now
+        with self.lock:
+            return {
+                name: {
+                    "condition": rule.predicate.source,
+                    "window_count": rule.counter.count(now),
+                    "threshold": rule.threshold,
+                    "matched_total": rule.matched_total,
+                    "last_triggered": rule.last_triggered,
+                    "active_alert_id": rule.active_alert_id,
+                    "enabled": rule.enabled,
+                }
+                for name, rule in self.rules.items()
+            }
+
+    # ---------------- 状态持久化 ----------------
+
+    def _load_state(self) -> Dict[str, Dict[str, Any]]:
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("rules", {})
+        except Exception as e:
+            logger.warning(f"读取告警状态失败（忽略）: {e}")
+            return {}
+
+    def save_state(self) -> None:
+        if not self.state_path:
+            return
+        with self.lock:
+            self._persisted.update(
+                {
+                    name: {"last_triggered": rule.last_triggered}
+                    for name, rule in self.rules.items()
+                }
+            )
+            payload = {"updated_at": time.time(), "rules": dict(self._persisted)}
+        try:
+            directory = os.path.dirname(self.state_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            logger.warning(f"保存告警状态失败（忽略）: {e}")
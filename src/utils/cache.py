@@ -1,19 +1,159 @@
 """Redis缓存装饰器模块.
 
-提供通用的Redis缓存装饰器，自动处理缓存读写和降级。
+提供通用的两级缓存装饰器：进程内L1（LRU + TTL）在前，Redis在后，
+自动处理缓存读写、降级、请求合并（single-flight）、过期后台刷新和基于标签的失效。
 """
 
+import asyncio
+import fnmatch
 import functools
 import hashlib
 import json
 import logging
+import os
 import random
-from typing import Any, Callable, Optional
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
 
 from src.utils.redis_client import get_redis_client
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson为可选依赖
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# L1缓存默认容量（每个被装饰函数独立计数）
+L1_MAX_ENTRIES = int(os.getenv("CACHE_L1_MAX_ENTRIES", "512"))
+# 从Redis同步标签版本的最小间隔（秒），用于跨进程失效
+TAG_SYNC_INTERVAL = float(os.getenv("CACHE_TAG_SYNC_INTERVAL", "1.0"))
+# 写入路径触发的标签失效合并窗口（秒）：窗口内的多次写入只执行一次失效
+TAG_INVALIDATE_WINDOW = float(os.getenv("CACHE_TAG_INVALIDATE_WINDOW", "5.0"))
+
+TAG_KEY_PREFIX = "cache:tag:"
+TAG_VERSION_PREFIX = "cache:tagver:"
+
+# 缓存计数器（供 /cache/stats 导出）
+_counters: Dict[str, int] = {
+    "l1_hits": 0,
+    "redis_hits": 0,
+    "misses": 0,
+    "stale": 0,
+    "coalesced": 0,
+    "refreshes": 0,
+    "evictions": 0,
+    "errors": 0,
+    "invalidations": 0,
+    "invalidations_coalesced": 0,
+}
+
+# 进程内已知的标签版本，以及上次从Redis同步的时间
+_tag_versions: Dict[str, int] = {}
+_tag_synced_at = 0.0
+# 进行中的异步标签失效任务（合并高频写入触发的失效）
+_pending_invalidations: Dict[str, asyncio.Task] = {}
+
+_local_caches: "weakref.WeakSet[LocalTTLCache]" = weakref.WeakSet()
+
+
+def _incr(name: str, amount: int = 1) -> None:
+    _counters[name] += amount
+
+
+def dumps_value(value: Any) -> str:
+    """序列化缓存值（优先使用orjson，不可用或失败时回退到json）."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                value,
+                default=str,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+            ).decode()
+        except TypeError:
+            pass
+    return json.dumps(value, default=str)
+
+
+def loads_value(data: Any) -> Any:
+    """反序列化缓存值，数据损坏时抛出 ValueError."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+@dataclass
+class _L1Entry:
+    """L1缓存条目"""
+
+    value: Any
+    fresh_until: float
+    stale_until: float
+    tag_versions: Dict[str, int] = field(default_factory=dict)
+
+    def is_current(self, now: float, versions: Dict[str, int]) -> bool:
+        if now >= self.fresh_until:
+            return False
+        return all(versions.get(t, 0) == v for t, v in self.tag_versions.items())
+
+    def is_servable_stale(self, now: float) -> bool:
+        return self.stale_until > self.fresh_until and now < self.stale_until
+
+
+class LocalTTLCache:
+    """进程内L1缓存（LRU淘汰 + TTL过期 + 过期窗口）.
+
+    仅在事件循环线程中访问，不加锁。
+    """
+
+    def __init__(self, max_entries: int = L1_MAX_ENTRIES):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, _L1Entry]" = OrderedDict()
+        _local_caches.add(self)
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[_L1Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        now = time.monotonic() if now is None else now
+        if now >= max(entry.fresh_until, entry.stale_until):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        fresh_ttl: float,
+        stale_ttl: float = 0.0,
+        tag_versions: Optional[Dict[str, int]] = None,
+    ) -> None:
+        now = time.monotonic()
+        self._entries[key] = _L1Entry(
+            value=value,
+            fresh_until=now + fresh_ttl,
+            stale_until=now + fresh_ttl + max(0.0, stale_ttl),
+            tag_versions=dict(tag_versions or {}),
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            _incr("evictions")
+
+    def delete_matching(self, pattern: str) -> int:
+        keys = [k for k in self._entries if fnmatch.fnmatchcase(k, pattern)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
 
 def generate_cache_key(prefix: str, func_name: str, args: tuple, kwargs: dict) -> str:
     """生成缓存键.
@@ -44,13 +184,62 @@ def generate_cache_key(prefix: str, func_name: str, args: tuple, kwargs: dict) -
     return f"{prefix}:{func_name}:{param_hash}:v1"
 
 
-def redis_cache(
+async def _current_tag_versions(tags: Sequence[str]) -> Dict[str, int]:
+    """返回标签的当前版本，最多每 TAG_SYNC_INTERVAL 秒从Redis同步一次."""
+    global _tag_synced_at
+
+    for tag in tags:
+        _tag_versions.setdefault(tag, 0)
+
+    now = time.monotonic()
+    if now - _tag_synced_at >= TAG_SYNC_INTERVAL:
+        _tag_synced_at = now
+        known = list(_tag_versions)
+        try:
+            redis = await get_redis_client()
+            values = await redis.mget([TAG_VERSION_PREFIX + t for t in known])
+            for tag, value in zip(known, values):
+                if value is not None:
+                    _tag_versions[tag] = max(_tag_versions[tag], int(value))
+        except Exception as e:
+            logger.debug(f"同步缓存标签版本失败: {e}")
+
+    return {t: _tag_versions[t] for t in tags}
+
+
+def _run_single_flight(
+    inflight: Dict[str, asyncio.Task],
+    key: str,
+    factory: Callable[[], Awaitable[Any]],
+) -> "tuple[asyncio.Task, bool]":
+    """获取或创建键对应的加载任务，返回 (任务, 是否复用了进行中的任务)."""
+    loop = asyncio.get_running_loop()
+    task = inflight.get(key)
+    if task is not None and not task.done() and task.get_loop() is loop:
+        return task, True
+
+    task = loop.create_task(factory())
+    inflight[key] = task
+
+    def _cleanup(t: asyncio.Task) -> None:
+        if inflight.get(key) is t:
+            del inflight[key]
+
+    task.add_done_callback(_cleanup)
+    return task, False
+
+
+def redis_cache(  # noqa: C901
     ttl: int = 60,
     key_prefix: str = "cache",
     key_generator: Optional[Callable] = None,
     enable_fallback: bool = True,
+    l1_ttl: Optional[float] = None,
+    stale_ttl: float = 0,
+    tags: Optional[Sequence[str]] = None,
+    l1_max_entries: int = L1_MAX_ENTRIES,
 ):
-    """Redis缓存装饰器.
+    """Redis缓存装饰器（L1内存 + Redis两级）.
 
     自动处理缓存读写、降级和异常。
 
@@ -59,53 +248,58 @@ def redis_cache(
         key_prefix: 缓存键前缀
         key_generator: 自定义缓存键生成函数（可选）
         enable_fallback: 是否启用降级（Redis失败时执行原函数）
+        l1_ttl: L1缓存新鲜期（秒），默认 ttl 的一半；0表示不使用L1
+        stale_ttl: 新鲜期过后仍可返回旧值的时长（秒），期间后台刷新
+        tags: 缓存标签，调用 invalidate_tags() 时失效
+        l1_max_entries: L1缓存最大条目数（LRU淘汰）
 
     Returns:
         装饰器函数
 
     Example:
-        @redis_cache(ttl=10, key_prefix="stats:realtime")
+        @redis_cache(ttl=10, key_prefix="stats:realtime", stale_ttl=30,
+                     tags=["detection_records"])
         async def get_stats():
             return {"users": 100}
 
     Design:
-        - 缓存命中：直接返回缓存数据
-        - 缓存未命中：执行原函数，缓存结果
+        - L1命中：直接返回内存中的结果，不访问Redis、不反序列化
+        - L1过期但在 stale_ttl 窗口内：返回旧值，并在后台刷新
+        - 缓存未命中：同一键的并发请求只执行一次（single-flight）
         - Redis失败：自动降级到原函数（如果enable_fallback=True）
-        - TTL抖动：添加±2秒随机偏移，避免缓存雪崩
+        - TTL抖动：Redis写入添加±2秒随机偏移，避免缓存雪崩
     """
+    tag_list = list(tags or [])
+    l1_fresh = max(1.0, ttl / 2) if l1_ttl is None else l1_ttl
 
     def decorator(func: Callable) -> Callable:
-        @functools.wraps(func)
-        async def wrapper(*args: Any, **kwargs: Any) -> Any:
-            # TTL=0表示不缓存，直接执行原函数
-            if ttl <= 0:
-                logger.debug(f"缓存已禁用（TTL=0）: {func.__name__}")
-                return await func(*args, **kwargs)
-
-            # 生成缓存键
-            if key_generator:
-                cache_key = key_generator(func.__name__, args, kwargs)
-            else:
-                cache_key = generate_cache_key(key_prefix, func.__name__, args, kwargs)
+        l1 = LocalTTLCache(l1_max_entries)
+        inflight: Dict[str, asyncio.Task] = {}
 
+        async def load(cache_key: str, versions: Dict[str, int], args, kwargs) -> Any:
             # 尝试从Redis读取缓存
             try:
                 redis = await get_redis_client()
                 cached_data = await redis.get(cache_key)
 
                 if cached_data:
-                    logger.info(f"✅ 缓存命中: {cache_key}")
                     try:
-                        return json.loads(cached_data)
-                    except json.JSONDecodeError as e:
+                        result = loads_value(cached_data)
+                    except ValueError as e:
                         logger.warning(f"缓存数据解析失败: {e}，删除缓存")
                         await redis.delete(cache_key)
                         # 继续执行原函数
+                    else:
+                        logger.debug(f"✅ Redis缓存命中: {cache_key}")
+                        _incr("redis_hits")
+                        if l1_fresh > 0:
+                            l1.set(cache_key, result, l1_fresh, stale_ttl, versions)
+                        return result
                 else:
                     logger.debug(f"❌ 缓存未命中: {cache_key}")
 
             except Exception as e:
+                _incr("errors")
                 logger.error(f"Redis读取失败: {e}", exc_info=True)
                 if not enable_fallback:
                     raise
@@ -113,7 +307,10 @@ def redis_cache(
                 # 继续执行原函数
 
             # 执行原函数
+            _incr("misses")
             result = await func(*args, **kwargs)
+            if l1_fresh > 0:
+                l1.set(cache_key, result, l1_fresh, stale_ttl, versions)
 
             # 尝试写入Redis缓存
             try:
@@ -124,25 +321,167 @@ def redis_cache(
                 ttl_final = max(1, int(ttl_with_jitter))  # 至少1秒
 
                 # 序列化并存储
-                cached_value = json.dumps(result, default=str)
-                await redis.setex(cache_key, ttl_final, cached_value)
+                await redis.setex(cache_key, ttl_final, dumps_value(result))
+                for tag in tag_list:
+                    tag_key = TAG_KEY_PREFIX + tag
+                    await redis.sadd(tag_key, cache_key)
+                    await redis.expire(tag_key, ttl_final + int(stale_ttl) + 60)
 
                 logger.debug(f"缓存已更新: {cache_key} (TTL={ttl_final}s)")
 
             except Exception as e:
+                _incr("errors")
                 logger.error(f"Redis写入失败: {e}", exc_info=True)
                 # 写入失败不影响返回结果
 
             return result
 
+        def _log_refresh_error(task: asyncio.Task) -> None:
+            if not task.cancelled() and task.exception() is not None:
+                logger.warning(f"后台刷新缓存失败: {task.exception()}")
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            # TTL=0表示不缓存，直接执行原函数
+            if ttl <= 0:
+                logger.debug(f"缓存已禁用（TTL=0）: {func.__name__}")
+                return await func(*args, **kwargs)
+
+            # 生成缓存键
+            if key_generator:
+                cache_key = key_generator(func.__name__, args, kwargs)
+            else:
+                cache_key = generate_cache_key(key_prefix, func.__name__, args, kwargs)
+
+            versions = await _current_tag_versions(tag_list) if tag_list else {}
+
+            def factory() -> Awaitable[Any]:
+                return load(cache_key, versions, args, kwargs)
+
+            entry = l1.get(cache_key) if l1_fresh > 0 else None
+            if entry is not None:
+                now = time.monotonic()
+                if entry.is_current(now, versions):
+                    _incr("l1_hits")
+                    return entry.value
+                if entry.is_servable_stale(now):
+                    # 返回旧值，同时后台刷新（同一键只刷新一次）
+                    _incr("stale")
+                    task, joined = _run_single_flight(inflight, cache_key, factory)
+                    if not joined:
+                        _incr("refreshes")
+                        task.add_done_callback(_log_refresh_error)
+                    return entry.value
+
+            task, joined = _run_single_flight(inflight, cache_key, factory)
+            if joined:
+                _incr("coalesced")
+            # shield：单个调用方被取消不会取消其他等待者共享的加载任务
+            return await asyncio.shield(task)
+
+        wrapper.cache_l1 = l1  # type: ignore[attr-defined]
         return wrapper
 
     return decorator
 
 
+async def invalidate_tags(*tags: str) -> int:
+    """按标签失效缓存.
+
+    本进程的L1条目立即失效（配置了 stale_ttl 的条目在刷新完成前仍返回旧值），
+    Redis中带该标签的键被删除，其他进程在下次同步标签版本时失效。
+
+    Args:
+        tags: 缓存标签
+
+    Returns:
+        删除的Redis缓存键数量
+    """
+    for tag in tags:
+        _tag_versions[tag] = _tag_versions.get(tag, 0) + 1
+
+    deleted = 0
+    try:
+        redis = await get_redis_client()
+        for tag in tags:
+            version = await redis.incr(TAG_VERSION_PREFIX + tag)
+            _tag_versions[tag] = max(_tag_versions[tag], int(version))
+
+            tag_key = TAG_KEY_PREFIX + tag
+            keys = list(await redis.smembers(tag_key) or [])
+            if keys:
+                deleted += await redis.delete(*keys)
+            await redis.delete(tag_key)
+        logger.debug(f"缓存标签已失效: {list(tags)}, 删除 {deleted} 个键")
+    except Exception as e:
+        _incr("errors")
+        logger.warning(f"Redis标签失效失败（仅失效本地缓存）: {e}")
+    return deleted
+
+
+async def _invalidate_after(tag: str, delay: float) -> int:
+    if delay > 0:
+        await asyncio.sleep(delay)
+    # 从这里开始的写入需要新的窗口（本次失效可能早于这些写入提交）
+    if _pending_invalidations.get(tag) is asyncio.current_task():
+        del _pending_invalidations[tag]
+    _incr("invalidations")
+    return await invalidate_tags(tag)
+
+
+def invalidate_tags_soon(*tags: str, window: Optional[float] = None) -> None:
+    """在后台按标签失效缓存（供高频写入路径调用）.
+
+    第一次调用开启一个合并窗口（默认 TAG_INVALIDATE_WINDOW 秒），窗口结束时执行一次
+    失效，窗口内的后续调用直接合并，不访问Redis；被标记的缓存最多比写入滞后一个窗口。
+    没有运行中的事件循环时只失效本地版本。
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        for tag in tags:
+            _tag_versions[tag] = _tag_versions.get(tag, 0) + 1
+        return
+
+    delay = TAG_INVALIDATE_WINDOW if window is None else window
+    for tag in tags:
+        pending = _pending_invalidations.get(tag)
+        if pending is not None and not pending.done() and pending.get_loop() is loop:
+            _incr("invalidations_coalesced")
+            continue
+        task = loop.create_task(_invalidate_after(tag, delay))
+        _pending_invalidations[tag] = task
+        task.add_done_callback(
+            lambda t, tag=tag: _pending_invalidations.pop(tag, None)
+            if _pending_invalidations.get(tag) is t
+            else None
+        )
+
+
+def get_local_cache_stats() -> Dict[str, Any]:
+    """返回进程内缓存计数器与L1占用情况."""
+    lookups = _counters["l1_hits"] + _counters["redis_hits"] + _counters["misses"]
+    stats: Dict[str, Any] = dict(_counters)
+    stats["l1_entries"] = sum(len(c) for c in list(_local_caches))
+    stats["l1_hit_ratio"] = (
+        round((_counters["l1_hits"] + _counters["stale"]) / lookups, 4)
+        if lookups
+        else 0.0
+    )
+    return stats
+
+
+def reset_cache_counters() -> None:
+    """重置缓存计数器."""
+    for name in _counters:
+        _counters[name] = 0
+
+
 async def clear_cache(pattern: str = "*") -> int:
     """清除匹配的缓存键.
 
+    同时清除本进程L1缓存中匹配的条目。
+
     Args:
         pattern: 缓存键模式（支持通配符）
 
@@ -156,6 +495,9 @@ async def clear_cache(pattern: str = "*") -> int:
     Warning:
         使用通配符清除大量缓存时可能影响性能
     """
+    for local_cache in list(_local_caches):
+        local_cache.delete_matching(pattern)
+
     try:
         redis = await get_redis_client()
 
@@ -189,7 +531,7 @@ async def get_cache_stats(pattern: str = "*") -> dict:
 
     Example:
         stats = await get_cache_stats("stats:*")
-        # {"total_keys": 10, "pattern": "stats:*"}
+        # {"total_keys": 10, "pattern": "stats:*", "local": {"l1_hits": 42, ...}}
     """
     try:
         redis = await get_redis_client()
@@ -207,6 +549,7 @@ async def get_cache_stats(pattern: str = "*") -> dict:
             "pattern": pattern,
             "memory_used_mb": round(info.get("used_memory", 0) / 1024 / 1024, 2),
             "memory_peak_mb": round(info.get("used_memory_peak", 0) / 1024 / 1024, 2),
+            "local": get_local_cache_stats(),
         }
 
     except Exception as e:
@@ -212,6 +212,19 @@ class ErrorTracker:
         self.severity_counts: Dict[ErrorSeverity, int] = defaultdict(int)
         self.category_counts: Dict[ErrorCategory, int] = defaultdict(int)
         self.lock = threading.Lock()
+        self.listeners: List[Callable[[ErrorInfo], None]] = []
+
+    def add_listener(self, listener: Callable[[ErrorInfo], None]):
+        """注册错误监听器（每条错误记录后同步回调，如告警引擎计数）"""
+        with self.lock:
+            if listener not in self.listeners:
+                self.listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[ErrorInfo], None]):
+        """移除错误监听器"""
+        with self.lock:
+            if listener in self.listeners:
+                self.listeners.remove(listener)
 
     def add_error(self, error_info: ErrorInfo):
         """添加错误记录"""
@@ -220,6 +233,13 @@ class ErrorTracker:
             self.error_counts[error_info.error_id] += 1
             self.severity_counts[error_info.severity] += 1
             self.category_counts[error_info.category] += 1
+            listeners = list(self.listeners)
+
+        for listener in listeners:
+            try:
+                listener(error_info)
+            except Exception as e:
+                logger.debug(f"错误监听器执行失败: {e}")
 
     def get_error_stats(self) -> Dict[str, Any]:
         """获取错误统计"""
@@ -7,6 +7,7 @@ Error Monitoring and Alerting System
 
 import json
 import logging
+import os
 import smtplib
 import threading
 import time
@@ -15,9 +16,10 @@ from dataclasses import dataclass, field
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Union
 
-from .error_handler import ErrorCategory, ErrorSeverity, UnifiedErrorHandler
+from .alert_engine import AlertEngine
+from .error_handler import UnifiedErrorHandler, get_error_handler
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +38,9 @@ class AlertRule:
     """告警规则"""
 
     name: str
-    condition: str  # 条件表达式
+    condition: Union[
+        str, Dict[str, Any]
+    ]  # 条件表达式或条件字典（见 alert_engine.compile_condition）
     threshold: int  # 阈值
     time_window: int  # 时间窗口（秒）
     alert_level: AlertLevel
@@ -180,11 +184,27 @@ class LogAlertChannel(AlertChannel):
         return True
 
 
+# 告警规则库中由错误监控器消费的规则类型
+ERROR_MONITOR_RULE_TYPE = "error_monitor"
+
+_PRIORITY_LEVELS = {
+    "low": AlertLevel.INFO,
+    "medium": AlertLevel.WARNING,
+    "high": AlertLevel.ERROR,
+    "critical": AlertLevel.CRITICAL,
+}
+
+
 class ErrorMonitor:
     """错误监控器"""
 
-    def __init__(self, error_handler: UnifiedErrorHandler):
+    def __init__(
+        self, error_handler: UnifiedErrorHandler, state_path: Optional[str] = None
+    ):
         self.error_handler = error_handler
+        # 规则编译为谓词，错误到达时增量计数，周期评估只读计数器
+        self.engine = AlertEngine(state_path)
+        self._store_rule_names: set = set()
         self.alert_rules: Dict[str, AlertRule] = {}
         self.alert_channels: List[AlertChannel] = []
         self.active_alerts: Dict[str, Alert] = {}
@@ -199,6 +219,14 @@ class ErrorMonitor:
         # 默认告警通道
         self._setup_default_channels()
 
+        # 订阅错误流，并补计已有的错误
+        tracker = self.error_handler.error_tracker
+        with tracker.lock:
+            existing = list(tracker.errors)
+        for error_info in existing:
+            self.engine.observe(error_info)
+        tracker.add_listener(self.engine.observe)
+
     def _setup_default_rules(self):
         """设置默认告警规则"""
         default_rules = [
@@ -262,6 +290,29 @@ class ErrorMonitor:
 
     def add_alert_rule(self, rule: AlertRule):
         """添加告警规则"""
+        try:
+            compiled = self.engine.add_rule(
+                rule.name,
+                rule.condition,
+                rule.threshold,
+                rule.time_window,
+                cooldown=rule.cooldown,
+                enabled=rule.enabled,
+            )
+        except ValueError as e:
+            # 与旧行为一致：无法识别的条件按总错误数计算
+            logger.warning(f"告警规则条件无效，按总错误数计算: {rule.name}: {e}")
+            compiled = self.engine.add_rule(
+                rule.name,
+                None,
+                rule.threshold,
+                rule.time_window,
+                cooldown=rule.cooldown,
+                enabled=rule.enabled,
+            )
+        # 恢复持久化的冷却时间
+        rule.last_triggered = max(rule.last_triggered, compiled.last_triggered)
+        compiled.last_triggered = rule.last_triggered
         self.alert_rules[rule.name] = rule
         logger.info(f"添加告警规则: {rule.name}")
 
@@ -269,8 +320,56 @@ class ErrorMonitor:
         """移除告警规则"""
         if rule_name in self.alert_rules:
             del self.alert_rules[rule_name]
+            self.engine.remove_rule(rule_name)
             logger.info(f"移除告警规则: {rule_name}")
 
+    async def load_rules_from_store(self, repository: Any) -> int:
+        """
+        从告警规则库加载错误监控规则
+
+        规则库中 rule_type 为 "error_monitor" 的规则会被编译加入引擎，
+        conditions 示例::
+
+            {"severity": ["high", "critical"], "category": "gpu",
+             "threshold": 3, "time_window": 300, "cooldown": 600}
+
+        规则的 camera_id 作为摄像头谓词；规则库中已删除/禁用的规则会从监控器移除。
+
+        Args:
+            repository: IAlertRuleRepository 实现
+
+        Returns:
+            加载的规则数量
+        """
+        rules = await repository.find_all(limit=1000, enabled=True)
+        loaded = set()
+        for stored in rules:
+            if stored.rule_type != ERROR_MONITOR_RULE_TYPE:
+                continue
+            conditions = dict(stored.conditions or {})
+            if stored.camera_id:
+                conditions.setdefault("camera_id", stored.camera_id)
+            level = conditions.get("alert_level")
+            rule = AlertRule(
+                name=stored.name,
+                condition=conditions,
+                threshold=int(conditions.get("threshold", 1)),
+                time_window=int(conditions.get("time_window", 300)),
+                alert_level=AlertLevel(level)
+                if level
+                else _PRIORITY_LEVELS.get(stored.priority, AlertLevel.WARNING),
+                enabled=stored.enabled,
+                cooldown=int(conditions.get("cooldown", 300)),
+            )
+            self.add_alert_rule(rule)
+            loaded.add(rule.name)
+
+        for name in self._store_rule_names - loaded:
+            self.remove_alert_rule(name)
+        self._store_rule_names = loaded
+        logger.info(f"已从告警规则库加载 {len(loaded)} 条错误监控规则")
+        return len(loaded)
+
     def add_alert_channel(self, channel: AlertChannel):
         """添加告警通道"""
         self.alert_channels.append(channel)
@@ -304,69 +403,39 @@ class ErrorMonitor:
                 time.sleep(30)  # 出错时等待更长时间
 
     def _check_alert_rules(self):
-        """检查告警规则"""
+        """检查告警规则（只读取各规则的窗口计数，O(规则数)）"""
         current_time = time.time()
 
-        for rule_name, rule in self.alert_rules.items():
-            if not rule.enabled:
+        for compiled in self.engine.evaluate(current_time):
+            rule = self.alert_rules.get(compiled.name)
+            if rule is None:
                 continue
 
-            # 检查冷却时间
-            if current_time - rule.last_triggered < rule.cooldown:
-                continue
+            # 去重：该规则的告警尚未解决时不新建告警；冷却期已过（evaluate 已排除
+            # 冷却中的规则）则对同一告警再次通知，避免未处理的告警被永久静默
+            with self.lock:
+                active = self.active_alerts.get(compiled.active_alert_id or "")
+            if active is not None and not active.resolved:
+                active.data["repeat_count"] = active.data.get("repeat_count", 0) + 1
+                active.data["last_seen"] = current_time
+                active.data["window_count"] = compiled.counter.count(current_time)
+                self._send_alert(active)
+                alert_id = active.alert_id
+            else:
+                alert_id = self._trigger_alert(rule)
 
-            # 检查规则条件
-            if self._evaluate_rule(rule):
-                self._trigger_alert(rule)
-                rule.last_triggered = current_time
+            rule.last_triggered = current_time
+            self.engine.mark_triggered(rule.name, alert_id, current_time)
 
     def _evaluate_rule(self, rule: AlertRule) -> bool:
         """评估告警规则"""
         try:
-            # 获取时间窗口内的错误
-            cutoff_time = time.time() - rule.time_window
-            recent_errors = [
-                error
-                for error in self.error_handler.error_tracker.errors
-                if error.context.timestamp >= cutoff_time
-            ]
-
-            # 根据条件计算匹配的错误数量
-            if rule.condition == "severity == 'critical'":
-                count = len(
-                    [e for e in recent_errors if e.severity == ErrorSeverity.CRITICAL]
-                )
-            elif rule.condition == "severity == 'high'":
-                count = len(
-                    [e for e in recent_errors if e.severity == ErrorSeverity.HIGH]
-                )
-            elif rule.condition == "category == 'gpu'":
-                count = len(
-                    [e for e in recent_errors if e.category == ErrorCategory.GPU]
-                )
-            elif rule.condition == "category == 'model'":
-                count = len(
-                    [e for e in recent_errors if e.category == ErrorCategory.MODEL]
-                )
-            elif rule.condition == "category == 'network'":
-                count = len(
-                    [e for e in recent_errors if e.category == ErrorCategory.NETWORK]
-                )
-            elif rule.condition == "category == 'detection'":
-                count = len(
-                    [e for e in recent_errors if e.category == ErrorCategory.DETECTION]
-                )
-            else:
-                # 默认条件：总错误数
-                count = len(recent_errors)
-
-            return count >= rule.threshold
-
+            return self.engine.count(rule.name) >= rule.threshold
         except Exception as e:
             logger.error(f"评估告警规则失败: {rule.name}: {e}")
             return False
 
-    def _trigger_alert(self, rule: AlertRule):
+    def _trigger_alert(self, rule: AlertRule) -> str:
         """触发告警"""
         alert_id = f"ALERT_{int(time.time())}_{rule.name}"
 
@@ -380,6 +449,7 @@ class ErrorMonitor:
                 "rule_condition": rule.condition,
                 "threshold": rule.threshold,
                 "time_window": rule.time_window,
+                "window_count": self.engine.count(rule.name),
             },
         )
 
@@ -431,6 +501,7 @@ class ErrorMonitor:
             pass
 
         logger.warning(f"告警触发: {alert_id}")
+        return alert_id
 
     def _send_alert(self, alert: Alert):
         """发送告警到所有通道"""
@@ -448,6 +519,7 @@ class ErrorMonitor:
                 alert.resolved = True
                 alert.resolved_at = time.time()
                 logger.info(f"告警已解决: {alert_id}")
+        self.engine.clear_active(alert_id)
 
     def get_active_alerts(self) -> List[Alert]:
         """获取活跃告警"""
@@ -664,8 +736,13 @@ def get_error_monitor() -> ErrorMonitor:
     """获取全局错误监控器"""
     global _error_monitor
     if _error_monitor is None:
-        error_handler = UnifiedErrorHandler()
-        _error_monitor = ErrorMonitor(error_handler)
+        # 与全局错误处理器共享错误流，handle_error 记录的错误直接进入告警计数
+        _error_monitor = ErrorMonitor(
+            get_error_handler(),
+            state_path=os.getenv(
+                "ERROR_MONITOR_STATE_PATH", "output/error_monitor/alert_state.json"
+            ),
+        )
     return _error_monitor
 
 
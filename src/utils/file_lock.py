@@ -0,0 +1,48 @@
+"""
+进程间文件锁
+
+基于 fcntl.flock 的排他锁，用于多个 API worker 共享同一份文件系统状态
+（训练任务队列、数据集导入任务、上传会话）时串行化读-改-写。
+锁随文件描述符关闭自动释放，持锁进程崩溃不会留下死锁。
+不支持 flock 的平台（Windows）退化为不加锁。
+"""
+
+from __future__ import annotations
+
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Union
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: Union[str, Path], blocking: bool = True) -> Iterator[bool]:
+    """获取 path 上的排他锁.
+
+    Args:
+        path: 锁文件路径（不存在时创建）
+        blocking: 是否等待锁；为False时锁被占用立即返回
+
+    Yields:
+        是否获得了锁（blocking=True 时总为True）
+    """
+    if fcntl is None:
+        yield True
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+    finally:
+        os.close(fd)
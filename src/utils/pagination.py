@@ -1,13 +1,27 @@
 """分页工具模块.
 
 提供统一的分页参数和响应模型，用于API分页功能。
+
+除传统的 page/offset 分页外，还提供基于 (排序键, id) 的游标分页（keyset）：
+游标是经过HMAC签名的不透明令牌，仓储用 ``(sort, id) < ($n, $n+1)`` 的seek条件
+直接定位到下一页，查询耗时与翻页深度无关。总数可改用规划器估算值，避免 COUNT(*)。
 """
 
+import base64
+import hashlib
+import hmac
+import json
+import logging
 import math
-from typing import Generic, List, TypeVar
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Generic, List, Optional, Sequence, Tuple, TypeVar
 
 from pydantic import BaseModel, Field
 
+logger = logging.getLogger(__name__)
+
 # 泛型类型变量
 T = TypeVar("T")
 
@@ -90,10 +104,16 @@ class PaginatedResponse(BaseModel, Generic[T]):
     page: int = Field(ge=1, description="当前页码")
     page_size: int = Field(ge=1, le=100, description="每页大小")
     total_pages: int = Field(ge=0, description="总页数")
+    next_cursor: Optional[str] = Field(None, description="下一页游标（没有更多数据时为空）")
+    total_is_estimate: bool = Field(False, description="总数是否为估算值")
 
     @staticmethod
     def create(
-        items: List[T], total: int, pagination: PaginationParams
+        items: List[T],
+        total: int,
+        pagination: PaginationParams,
+        next_cursor: Optional[str] = None,
+        total_is_estimate: bool = False,
     ) -> "PaginatedResponse[T]":
         """创建分页响应对象的工厂方法.
 
@@ -119,6 +139,8 @@ class PaginatedResponse(BaseModel, Generic[T]):
             page=pagination.page,
             page_size=pagination.page_size,
             total_pages=total_pages,
+            next_cursor=next_cursor,
+            total_is_estimate=total_is_estimate,
         )
 
     class Config:
@@ -200,3 +222,221 @@ def validate_pagination_params(
         page_size = max_page_size
 
     return page, page_size
+
+
+# 游标分页（keyset）
+
+
+class CursorError(ValueError):
+    """游标无效（格式错误、签名不匹配或与当前排序不一致）."""
+
+
+_missing_secret_warned = False
+
+
+def cursor_secret_configured() -> bool:
+    """是否配置了游标签名密钥（PAGINATION_CURSOR_SECRET 或 SECRET_KEY）."""
+    return bool(os.getenv("PAGINATION_CURSOR_SECRET") or os.getenv("SECRET_KEY"))
+
+
+def _cursor_secret() -> bytes:
+    """游标签名密钥.
+
+    未配置时不签发也不接受游标：进程内随机密钥在多 worker 部署下
+    会让其他 worker 签发的游标校验失败，重启后旧游标也全部失效。
+
+    Raises:
+        CursorError: 未配置密钥
+    """
+    secret = os.getenv("PAGINATION_CURSOR_SECRET") or os.getenv("SECRET_KEY")
+    if not secret:
+        raise CursorError("未配置 PAGINATION_CURSOR_SECRET/SECRET_KEY，游标分页不可用")
+    return secret.encode("utf-8")
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    return value
+
+
+def _load_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$dt" in value:
+        return datetime.fromisoformat(value["$dt"])
+    return value
+
+
+@dataclass(frozen=True)
+class KeysetCursor:
+    """游标位置：上一页最后一行的 (排序键值, id)，以及生成游标时的排序方式.
+
+    Attributes:
+        sort_value: 排序列的值（支持 datetime/str/int/float）
+        row_id: 行ID（排序键相同时的决胜列）
+        sort_field: 排序列名
+        descending: 是否降序
+        lower_bound: 第一页使用的排序列下界（如默认时间窗口的起点），
+            后续页沿用，保证整个翻页过程查询同一范围
+    """
+
+    sort_value: Any
+    row_id: Any
+    sort_field: str = "timestamp"
+    descending: bool = True
+    lower_bound: Any = None
+
+    def encode(self, secret: Optional[bytes] = None) -> str:
+        """编码为签名的不透明令牌."""
+        fields = [
+            _dump_value(self.sort_value),
+            self.row_id,
+            self.sort_field,
+            1 if self.descending else 0,
+        ]
+        if self.lower_bound is not None:
+            fields.append(_dump_value(self.lower_bound))
+        payload = json.dumps(
+            fields,
+            separators=(",", ":"),
+            default=str,
+        ).encode("utf-8")
+        signature = hmac.new(secret or _cursor_secret(), payload, hashlib.sha256)
+        return f"{_b64encode(payload)}.{_b64encode(signature.digest()[:12])}"
+
+    @classmethod
+    def decode(
+        cls,
+        token: str,
+        sort_field: Optional[str] = None,
+        descending: Optional[bool] = None,
+        secret: Optional[bytes] = None,
+    ) -> "KeysetCursor":
+        """解码并校验令牌.
+
+        Args:
+            token: 游标令牌
+            sort_field: 当前请求的排序列（提供时必须与游标一致）
+            descending: 当前请求的排序方向（提供时必须与游标一致）
+            secret: 签名密钥（默认读取环境变量）
+
+        Raises:
+            CursorError: 令牌无效或与当前排序不一致
+        """
+        try:
+            payload_text, signature_text = token.split(".", 1)
+            payload = _b64decode(payload_text)
+            signature = _b64decode(signature_text)
+        except (ValueError, AttributeError) as e:
+            raise CursorError("游标格式无效") from e
+
+        expected = hmac.new(secret or _cursor_secret(), payload, hashlib.sha256)
+        if not hmac.compare_digest(expected.digest()[:12], signature):
+            raise CursorError("游标签名无效")
+
+        try:
+            value, row_id, field, desc, *rest = json.loads(payload)
+        except (ValueError, TypeError) as e:
+            raise CursorError("游标内容无效") from e
+
+        lower_bound = _load_value(rest[0]) if rest else None
+        cursor = cls(_load_value(value), row_id, field, bool(desc), lower_bound)
+        if sort_field is not None and cursor.sort_field != sort_field:
+            raise CursorError("游标与当前排序字段不一致")
+        if descending is not None and cursor.descending != descending:
+            raise CursorError("游标与当前排序方向不一致")
+        return cursor
+
+
+def keyset_predicate(
+    cursor: Optional[KeysetCursor],
+    sort_column: str,
+    id_column: str = "id",
+    first_param: int = 1,
+) -> Tuple[str, List[Any]]:
+    """生成seek条件.
+
+    Args:
+        cursor: 游标（为None时返回空条件）
+        sort_column: 排序列SQL表达式（必须来自白名单）
+        id_column: ID列SQL表达式
+        first_param: 参数占位符起始编号
+
+    Returns:
+        (SQL条件, 参数列表)，例如 ``("(timestamp, id) < ($3, $4)", [ts, id])``
+
+    Example:
+        >>> c = KeysetCursor(5, 10, "score", descending=False)
+        >>> keyset_predicate(c, "score", first_param=2)[0]
+        '(score, id) > ($2, $3)'
+    """
+    if cursor is None:
+        return "", []
+    op = "<" if cursor.descending else ">"
+    sql = f"({sort_column}, {id_column}) {op} " f"(${first_param}, ${first_param + 1})"
+    return sql, [cursor.sort_value, cursor.row_id]
+
+
+def next_cursor_for(
+    rows: Sequence[Any],
+    limit: int,
+    key: Callable[[Any], Tuple[Any, Any]],
+    sort_field: str = "timestamp",
+    descending: bool = True,
+    lower_bound: Any = None,
+) -> Optional[str]:
+    """根据本页结果生成下一页游标.
+
+    仓储应查询 ``limit + 1`` 行：多出的一行只用于判断是否还有下一页。
+
+    Args:
+        rows: 查询结果（最多 limit + 1 行）
+        limit: 每页大小
+        key: 从行中提取 (排序键值, id) 的函数
+        sort_field: 排序列名
+        descending: 是否降序
+        lower_bound: 需要在后续页沿用的排序列下界（可选）
+
+    Returns:
+        下一页游标；没有更多数据或未配置游标签名密钥时返回None
+    """
+    global _missing_secret_warned
+    if len(rows) <= limit or limit <= 0:
+        return None
+    if not cursor_secret_configured():
+        if not _missing_secret_warned:
+            _missing_secret_warned = True
+            logger.warning("未配置 PAGINATION_CURSOR_SECRET/SECRET_KEY，不签发游标（请使用页码分页）")
+        return None
+    sort_value, row_id = key(rows[limit - 1])
+    return KeysetCursor(
+        sort_value, row_id, sort_field, descending, lower_bound
+    ).encode()
+
+
+async def estimate_count(conn: Any, sql: str, *params: Any) -> int:
+    """用规划器估算查询的行数（EXPLAIN，不执行查询）.
+
+    Args:
+        conn: asyncpg连接
+        sql: 不含 LIMIT/OFFSET 的查询语句
+        params: 查询参数
+
+    Returns:
+        估算行数（失败时返回0）
+    """
+    try:
+        plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {sql}", *params)
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception as e:
+        logger.debug(f"估算行数失败: {e}")
+        return 0
@@ -0,0 +1,185 @@
+"""
+文字叠加渲染器
+
+每个不同的 (文字, 字号, 颜色) 只用PIL光栅化一次，缓存为Alpha遮罩与预乘颜色层；
+之后只在文字所在的矩形区域内用NumPy做Alpha混合，叠加开销与标签面积成正比，
+不再随整帧尺寸×标签数量增长（无需整帧 BGR→RGB→PIL→BGR 往返转换）。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    from PIL import Image, ImageDraw
+
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+
+@dataclass
+class GlyphMask:
+    """缓存的文字遮罩（相对绘制原点的偏移 + 混合所需的两个层）"""
+
+    offset_x: int
+    offset_y: int
+    inverse_alpha: np.ndarray  # (H, W, 1) uint16，255 - alpha
+    premultiplied: np.ndarray  # (H, W, 3) uint16，color * alpha
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.premultiplied.shape[1], self.premultiplied.shape[0]
+
+
+class TextRenderer:
+    """
+    基于遮罩缓存的文字渲染器
+
+    Args:
+        font_loader: 按字号返回PIL字体的函数
+        max_entries: 遮罩缓存上限（LRU淘汰）
+    """
+
+    def __init__(
+        self, font_loader: Callable[[int], Optional[Any]], max_entries: int = 1024
+    ):
+        self.font_loader = font_loader
+        self.max_entries = max_entries
+        self._masks: "OrderedDict[Tuple, Optional[GlyphMask]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "draws": 0,
+            "render_time_ms": 0.0,
+            "blend_time_ms": 0.0,
+        }
+
+    def _rasterize(
+        self, text: str, font_size: int, color: Tuple[int, int, int]
+    ) -> Optional[GlyphMask]:
+        """用PIL将文字绘制为单通道遮罩"""
+        font = self.font_loader(font_size)
+        if font is None:
+            return None
+
+        probe = ImageDraw.Draw(Image.new("L", (1, 1)))
+        left, top, right, bottom = probe.textbbox((0, 0), text, font=font)
+        width, height = right - left, bottom - top
+        if width <= 0 or height <= 0:
+            return GlyphMask(
+                left,
+                top,
+                np.zeros((0, 0, 1), dtype=np.uint16),
+                np.zeros((0, 0, 3), dtype=np.uint16),
+            )
+
+        canvas = Image.new("L", (width, height), 0)
+        ImageDraw.Draw(canvas).text((-left, -top), text, font=font, fill=255)
+        alpha = np.asarray(canvas, dtype=np.uint16)[:, :, None]
+        premultiplied = alpha * np.asarray(color, dtype=np.uint16)
+        return GlyphMask(left, top, 255 - alpha, premultiplied)
+
+    def get_mask(
+        self, text: str, font_size: int, color: Tuple[int, int, int]
+    ) -> Optional[GlyphMask]:
+        """获取（必要时光栅化并缓存）文字遮罩"""
+        key = (text, int(font_size), tuple(int(c) for c in color))
+        with self._lock:
+            if key in self._masks:
+                self._masks.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._masks[key]
+            self._stats["misses"] += 1
+
+        start = time.perf_counter()
+        mask = self._rasterize(text, int(font_size), key[2])
+        elapsed = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self._stats["render_time_ms"] += elapsed
+            self._masks[key] = mask
+            while len(self._masks) > self.max_entries:
+                self._masks.popitem(last=False)
+                self._stats["evictions"] += 1
+        return mask
+
+    def draw(
+        self,
+        img: np.ndarray,
+        text: str,
+        position: Tuple[int, int],
+        font_size: int = 32,
+        color: Tuple[int, int, int] = (255, 255, 255),
+    ) -> bool:
+        """
+        在图像上原地绘制文字
+
+        Args:
+            img: BGR图像
+            text: 文字
+            position: 文字位置 (x, y)，与 PIL ImageDraw.text 的锚点一致
+            font_size: 字体大小
+            color: 文字颜色 (B, G, R)
+
+        Returns:
+            是否绘制成功（无可用字体时返回False，由调用方回退）
+        """
+        mask = self.get_mask(text, font_size, color)
+        if mask is None:
+            return False
+
+        start = time.perf_counter()
+        width, height = mask.size
+        x0 = int(position[0]) + mask.offset_x
+        y0 = int(position[1]) + mask.offset_y
+        # 裁剪到图像范围内
+        img_h, img_w = img.shape[:2]
+        cx0, cy0 = max(x0, 0), max(y0, 0)
+        cx1, cy1 = min(x0 + width, img_w), min(y0 + height, img_h)
+        if cx1 > cx0 and cy1 > cy0:
+            mx0, my0 = cx0 - x0, cy0 - y0
+            mx1, my1 = mx0 + (cx1 - cx0), my0 + (cy1 - cy0)
+            roi = img[cy0:cy1, cx0:cx1]
+            blended = (
+                roi.astype(np.uint16) * mask.inverse_alpha[my0:my1, mx0:mx1]
+                + mask.premultiplied[my0:my1, mx0:mx1]
+                + 127
+            ) // 255
+            roi[...] = blended.astype(np.uint8)
+
+        with self._lock:
+            self._stats["draws"] += 1
+            self._stats["blend_time_ms"] += (time.perf_counter() - start) * 1000
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """返回缓存命中率与渲染耗时统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            entries = len(self._masks)
+        lookups = stats["hits"] + stats["misses"]
+        stats["entries"] = entries
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["avg_render_ms"] = (
+            round(stats["render_time_ms"] / stats["misses"], 4)
+            if stats["misses"]
+            else 0.0
+        )
+        stats["avg_blend_ms"] = (
+            round(stats["blend_time_ms"] / stats["draws"], 4) if stats["draws"] else 0.0
+        )
+        stats["render_time_ms"] = round(stats["render_time_ms"], 3)
+        stats["blend_time_ms"] = round(stats["blend_time_ms"], 3)
+        return stats
+
+    def clear(self) -> None:
+        """清空遮罩缓存（字体变更时调用）"""
+        with self._lock:
+            self._masks.clear()
@@ -11,13 +11,14 @@ import cv2
 import numpy as np
 
 try:
-    from PIL import Image, ImageDraw, ImageFont
+    from PIL import ImageFont
 
     PIL_AVAILABLE = True
 except ImportError:
     PIL_AVAILABLE = False
 
 from ..utils.logger import get_logger
+from .text_renderer import TextRenderer
 
 logger = get_logger(__name__)
 
@@ -72,6 +73,11 @@ class VisualizationManager:
         # 中文字体缓存
         self._font_cache = {}
 
+        # 文字遮罩渲染器（按文字/字号/颜色缓存，只混合文字所在区域）
+        self._text_renderer = (
+            TextRenderer(self.get_chinese_font) if PIL_AVAILABLE else None
+        )
+
         self.logger.info("可视化管理器初始化完成")
 
     def get_chinese_font(self, font_size: int = 32) -> Optional[Any]:
@@ -162,31 +168,20 @@ class VisualizationManager:
             return img
 
         try:
-            # 转换OpenCV图像为PIL图像
-            img_pil = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-            draw = ImageDraw.Draw(img_pil)
-
-            # 获取中文字体
-            font = self.get_chinese_font(font_size)
-            if font is None:
-                # 如果找不到中文字体，使用英文
-                cv2.putText(
-                    img,
-                    text,
-                    position,
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    font_size / 32,
-                    color,
-                    thickness,
-                )
+            if self._text_renderer.draw(img, text, position, font_size, color):
                 return img
 
-            # 绘制中文文字 (PIL使用RGB，OpenCV使用BGR)
-            draw.text(position, text, font=font, fill=color[::-1])
-
-            # 转换回OpenCV格式
-            img_cv = cv2.cvtColor(np.array(img_pil), cv2.COLOR_RGB2BGR)
-            return img_cv
+            # 如果找不到中文字体，使用英文
+            cv2.putText(
+                img,
+                text,
+                position,
+                cv2.FONT_HERSHEY_SIMPLEX,
+                font_size / 32,
+                color,
+                thickness,
+            )
+            return img
 
         except Exception as e:
             self.logger.warning(f"中文字体绘制失败，回退到英文: {e}")
@@ -202,6 +197,12 @@ class VisualizationManager:
             )
             return img
 
+    def get_text_render_stats(self) -> Dict[str, Any]:
+        """获取文字渲染缓存统计（命中率、光栅化与混合耗时）"""
+        if self._text_renderer is None:
+            return {}
+        return self._text_renderer.get_stats()
+
     def visualize_frame(
         self,
         frame: np.ndarray,
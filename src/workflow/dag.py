@@ -0,0 +1,217 @@
+"""
+工作流DAG
+提供步骤依赖图的构建、拓扑排序以及并发执行时的资源预算控制
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# 各步骤类型的默认资源需求（CPU槽位, 内存MB）
+DEFAULT_STEP_RESOURCES: Dict[str, Dict[str, int]] = {
+    "dataset_generation": {"cpu": 1, "memory_mb": 1024},
+    "handwash_dataset": {"cpu": 1, "memory_mb": 1024},
+    "multi_behavior_dataset": {"cpu": 1, "memory_mb": 1024},
+    "model_training": {"cpu": 2, "memory_mb": 2048},
+    "handwash_training": {"cpu": 2, "memory_mb": 2048},
+    "multi_behavior_training": {"cpu": 4, "memory_mb": 4096},
+}
+_FALLBACK_STEP_RESOURCES = {"cpu": 1, "memory_mb": 256}
+
+
+class WorkflowGraphError(ValueError):
+    """工作流依赖图配置错误（未知依赖、重复名称或存在环）"""
+
+
+@dataclass
+class StepNode:
+    """DAG中的单个步骤节点"""
+
+    index: int
+    name: str
+    config: Dict[str, Any]
+    depends_on: List[str] = field(default_factory=list)
+    cpu: int = 1
+    memory_mb: int = 256
+
+    @property
+    def step_type(self) -> str:
+        return self.config.get("type", "custom")
+
+
+class WorkflowDAG:
+    """
+    工作流步骤依赖图
+
+    步骤通过 ``depends_on``（步骤名称列表）声明依赖。如果工作流中没有任何步骤
+    声明依赖，则按列表顺序串行连接，保持旧工作流的执行语义不变。
+    """
+
+    def __init__(self, nodes: List[StepNode]):
+        self.nodes: Dict[str, StepNode] = {}
+        for node in nodes:
+            if node.name in self.nodes:
+                raise WorkflowGraphError(f"步骤名称重复: {node.name}")
+            self.nodes[node.name] = node
+
+        for node in nodes:
+            for dep in node.depends_on:
+                if dep not in self.nodes:
+                    raise WorkflowGraphError(f"步骤 {node.name} 依赖未知步骤: {dep}")
+                if dep == node.name:
+                    raise WorkflowGraphError(f"步骤 {node.name} 不能依赖自身")
+
+        self.order: List[str] = self._topological_order()
+
+    @classmethod
+    def from_steps(cls, steps: List[Dict[str, Any]]) -> "WorkflowDAG":
+        """根据工作流步骤配置构建DAG"""
+        explicit = any("depends_on" in step for step in steps)
+        nodes: List[StepNode] = []
+        previous: Optional[str] = None
+
+        for i, step in enumerate(steps):
+            name = step.get("name") or f"步骤 {i+1}"
+            if explicit:
+                depends_on = step.get("depends_on") or []
+                if isinstance(depends_on, str):
+                    depends_on = [d.strip() for d in depends_on.split(",") if d.strip()]
+            else:
+                depends_on = [previous] if previous else []
+
+            defaults = DEFAULT_STEP_RESOURCES.get(
+                step.get("type", "custom"), _FALLBACK_STEP_RESOURCES
+            )
+            resources = step.get("resources") or {}
+            nodes.append(
+                StepNode(
+                    index=i,
+                    name=name,
+                    config=step,
+                    depends_on=list(depends_on),
+                    cpu=int(resources.get("cpu", defaults["cpu"])),
+                    memory_mb=int(resources.get("memory_mb", defaults["memory_mb"])),
+                )
+            )
+            previous = name
+
+        return cls(nodes)
+
+    def _topological_order(self) -> List[str]:
+        """Kahn算法拓扑排序，同层按原始顺序稳定输出"""
+        in_degree = {name: len(node.depends_on) for name, node in self.nodes.items()}
+        ready = sorted(
+            (n for n, d in in_degree.items() if d == 0),
+            key=lambda n: self.nodes[n].index,
+        )
+        order: List[str] = []
+
+        while ready:
+            current = ready.pop(0)
+            order.append(current)
+            for child in self.children(current):
+                in_degree[child] -= 1
+                if in_degree[child] == 0:
+                    ready.append(child)
+            ready.sort(key=lambda n: self.nodes[n].index)
+
+        if len(order) != len(self.nodes):
+            cyclic = sorted(set(self.nodes) - set(order))
+            raise WorkflowGraphError(f"步骤依赖存在环: {cyclic}")
+        return order
+
+    def children(self, name: str) -> List[str]:
+        return [n for n, node in self.nodes.items() if name in node.depends_on]
+
+    def ancestors(self, name: str) -> Set[str]:
+        """返回步骤的全部上游步骤（传递闭包）"""
+        seen: Set[str] = set()
+        stack = list(self.nodes[name].depends_on)
+        while stack:
+            dep = stack.pop()
+            if dep not in seen:
+                seen.add(dep)
+                stack.extend(self.nodes[dep].depends_on)
+        return seen
+
+    def ready_steps(self, completed: Set[str], started: Set[str]) -> List[str]:
+        """返回依赖已全部完成且尚未启动的步骤（按拓扑序）"""
+        return [
+            name
+            for name in self.order
+            if name not in started
+            and all(dep in completed for dep in self.nodes[name].depends_on)
+        ]
+
+
+class ResourceBudget:
+    """
+    并发步骤的资源预算（CPU槽位 + 内存）
+
+    单个步骤的需求超过总预算时会被截断到总预算，保证其最终能够独占运行而不会死锁。
+    """
+
+    def __init__(
+        self, cpu_slots: Optional[int] = None, memory_mb: Optional[int] = None
+    ):
+        self.cpu_slots = max(
+            1,
+            int(
+                cpu_slots or os.getenv("WORKFLOW_CPU_SLOTS", 0) or (os.cpu_count() or 2)
+            ),
+        )
+        self.memory_mb = max(
+            1,
+            int(memory_mb or os.getenv("WORKFLOW_MEMORY_MB", 0) or _detect_memory_mb()),
+        )
+        self._cpu_in_use = 0
+        self._memory_in_use = 0
+        self._condition = asyncio.Condition()
+
+    def _clamp(self, cpu: int, memory_mb: int) -> tuple:
+        return (
+            min(max(cpu, 0), self.cpu_slots),
+            min(max(memory_mb, 0), self.memory_mb),
+        )
+
+    def _fits(self, cpu: int, memory_mb: int) -> bool:
+        return (
+            self._cpu_in_use + cpu <= self.cpu_slots
+            and self._memory_in_use + memory_mb <= self.memory_mb
+        )
+
+    async def acquire(self, cpu: int, memory_mb: int) -> None:
+        cpu, memory_mb = self._clamp(cpu, memory_mb)
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._fits(cpu, memory_mb))
+            self._cpu_in_use += cpu
+            self._memory_in_use += memory_mb
+
+    async def release(self, cpu: int, memory_mb: int) -> None:
+        cpu, memory_mb = self._clamp(cpu, memory_mb)
+        async with self._condition:
+            self._cpu_in_use -= cpu
+            self._memory_in_use -= memory_mb
+            self._condition.notify_all()
+
+    def usage(self) -> Dict[str, int]:
+        return {
+            "cpu_in_use": self._cpu_in_use,
+            "cpu_slots": self.cpu_slots,
+            "memory_in_use_mb": self._memory_in_use,
+            "memory_mb": self.memory_mb,
+        }
+
+
+def _detect_memory_mb() -> int:
+    """探测可用内存作为默认内存预算"""
+    try:
+        import psutil
+
+        return int(psutil.virtual_memory().available / (1024 * 1024))
+    except Exception:
+        return 8192
@@ -0,0 +1,163 @@
+"""
+工作流调度表达式
+支持标准5段cron表达式、@hourly/@daily 等别名以及 "@every 30m" 形式的固定间隔
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set
+
+_CRON_ALIASES = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+_INTERVAL_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+_INTERVAL_PATTERN = re.compile(r"^@every\s+((?:\d+[smhd])+)$", re.IGNORECASE)
+_INTERVAL_PART = re.compile(r"(\d+)([smhd])", re.IGNORECASE)
+
+# 搜索下一次触发时间的上限（覆盖闰年2月29日等稀疏表达式）
+_MAX_SEARCH_DAYS = 366 * 5
+
+
+class ScheduleError(ValueError):
+    """调度表达式无效"""
+
+
+class Schedule:
+    """调度表达式基类，所有时间均为 naive UTC（与数据库字段一致）"""
+
+    expression: str = ""
+
+    def next_after(self, after: datetime) -> datetime:
+        raise NotImplementedError
+
+
+class IntervalSchedule(Schedule):
+    """固定间隔调度（@every 30m / @every 1h30m）"""
+
+    def __init__(self, expression: str, seconds: int):
+        if seconds <= 0:
+            raise ScheduleError(f"调度间隔必须大于0: {expression}")
+        self.expression = expression
+        self.interval = timedelta(seconds=seconds)
+
+    def next_after(self, after: datetime) -> datetime:
+        return after + self.interval
+
+
+class CronSchedule(Schedule):
+    """
+    5段cron表达式调度: 分 时 日 月 周
+
+    与crontab一致，按服务器本地时区解释；日与周同时受限时二者满足其一即触发。
+    """
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ScheduleError(f"cron表达式必须包含5个字段: {expression}")
+        self.expression = expression
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12)
+        # 周字段允许 7 表示周日
+        self.weekdays = {d % 7 for d in _parse_field(fields[4], 0, 7)}
+        self._day_restricted = fields[2] != "*"
+        self._weekday_restricted = fields[4] != "*"
+
+    def _day_matches(self, dt: datetime) -> bool:
+        # cron 周日为0，Python weekday() 周一为0
+        cron_weekday = (dt.weekday() + 1) % 7
+        day_ok = dt.day in self.days
+        weekday_ok = cron_weekday in self.weekdays
+        if self._day_restricted and self._weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, after: datetime) -> datetime:
+        local = _utc_to_local(after).replace(second=0, microsecond=0) + timedelta(
+            minutes=1
+        )
+        limit = local + timedelta(days=_MAX_SEARCH_DAYS)
+
+        while local < limit:
+            if local.month not in self.months:
+                year = local.year + (1 if local.month == 12 else 0)
+                month = 1 if local.month == 12 else local.month + 1
+                local = local.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(local):
+                local = (local + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if local.hour not in self.hours:
+                local = (local + timedelta(hours=1)).replace(minute=0)
+                continue
+            if local.minute not in self.minutes:
+                local += timedelta(minutes=1)
+                continue
+            return _local_to_utc(local)
+
+        raise ScheduleError(f"cron表达式在可搜索范围内不会触发: {self.expression}")
+
+
+def _parse_field(field: str, low: int, high: int) -> Set[int]:
+    values: Set[int] = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            if not step_text.isdigit() or int(step_text) <= 0:
+                raise ScheduleError(f"cron步长无效: {field}")
+            step = int(step_text)
+
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            if not (start_text.isdigit() and end_text.isdigit()):
+                raise ScheduleError(f"cron范围无效: {field}")
+            start, end = int(start_text), int(end_text)
+        elif part.isdigit():
+            start = int(part)
+            end = high if step > 1 else start
+        else:
+            raise ScheduleError(f"cron字段无效: {field}")
+
+        if start < low or end > high or start > end:
+            raise ScheduleError(f"cron字段超出范围[{low}-{high}]: {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def _utc_to_local(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+
+
+def _local_to_utc(dt: datetime) -> datetime:
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def parse_schedule(expression: Optional[str]) -> Schedule:
+    """
+    解析调度表达式
+
+    Raises:
+        ScheduleError: 表达式为空或无效
+    """
+    if not expression or not str(expression).strip():
+        raise ScheduleError("调度工作流缺少调度表达式")
+
+    text = " ".join(str(expression).split())
+    interval_match = _INTERVAL_PATTERN.match(text)
+    if interval_match:
+        parts: List[tuple] = _INTERVAL_PART.findall(interval_match.group(1))
+        seconds = sum(int(n) * _INTERVAL_UNITS[u.lower()] for n, u in parts)
+        return IntervalSchedule(text, seconds)
+
+    return CronSchedule(_CRON_ALIASES.get(text.lower(), text))
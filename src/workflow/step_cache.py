@@ -0,0 +1,230 @@
+"""
+工作流步骤缓存
+按 "步骤配置 + 输入产物" 的内容哈希缓存步骤输出，重复运行时跳过未变化的数据集/训练步骤
+"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 默认参与缓存的步骤类型（数据集生成与训练）
+CACHEABLE_STEP_TYPES = {
+    "dataset_generation",
+    "handwash_dataset",
+    "multi_behavior_dataset",
+    "model_training",
+    "handwash_training",
+    "multi_behavior_training",
+}
+_DATASET_STEP_TYPES = {
+    "dataset_generation",
+    "handwash_dataset",
+    "multi_behavior_dataset",
+}
+
+# 配置中引用输入产物的字段，这些路径会按文件内容元数据参与哈希
+_INPUT_PATH_KEYS = (
+    "dataset_path",
+    "dataset_dir",
+    "annotations_path",
+    "annotations_file",
+    "data_config",
+    "resume_from",
+    "from_model",
+)
+# 输出中引用产物的字段，命中缓存时要求这些路径仍然存在
+_OUTPUT_PATH_KEYS = (
+    "dataset_path",
+    "annotations_path",
+    "yaml_path",
+    "model_path",
+    "report_path",
+)
+# 只影响调度、不影响输出的步骤级字段
+_SCHEDULING_KEYS = {"cache", "resources", "depends_on", "name"}
+
+
+def fingerprint_path(path: str) -> Optional[Dict[str, Any]]:
+    """
+    计算路径指纹（文件: 大小+修改时间；目录: 所有文件的相对路径/大小/修改时间汇总）
+
+    Returns:
+        指纹字典；路径不存在时返回 None
+    """
+    p = Path(path)
+    if not p.exists():
+        return None
+    if p.is_file():
+        stat = p.stat()
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    digest = hashlib.sha256()
+    count = 0
+    for root, dirs, files in os.walk(p):
+        dirs.sort()
+        for filename in sorted(files):
+            full = Path(root) / filename
+            try:
+                stat = full.stat()
+            except OSError:
+                continue
+            rel = full.relative_to(p).as_posix()
+            digest.update(f"{rel}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+            count += 1
+    return {"files": count, "digest": digest.hexdigest()}
+
+
+def _normalize_config(value: Any, top_level: bool = False) -> Any:
+    if isinstance(value, dict):
+        return {
+            k: _normalize_config(v)
+            for k, v in sorted(value.items())
+            if not k.startswith("_") and not (top_level and k in _SCHEDULING_KEYS)
+        }
+    if isinstance(value, (list, tuple)):
+        return [_normalize_config(v) for v in value]
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _collect_paths(value: Any, keys: Iterable[str]) -> List[str]:
+    """递归收集配置/输出中引用的产物路径"""
+    keys = tuple(keys)
+    found: List[str] = []
+    if isinstance(value, dict):
+        for k, v in value.items():
+            if k in keys and isinstance(v, (str, os.PathLike)) and v:
+                found.append(str(v))
+            elif isinstance(v, (dict, list)):
+                found.extend(_collect_paths(v, keys))
+    elif isinstance(value, list):
+        for v in value:
+            found.extend(_collect_paths(v, keys))
+    return found
+
+
+def is_step_cacheable(step_config: Dict[str, Any]) -> bool:
+    """
+    判断步骤是否可缓存
+
+    显式的 ``cache`` 字段优先；否则数据集/训练步骤默认可缓存。
+    数据集步骤的数据来源于数据库，只有时间窗口闭合（提供了 end_time）时结果才可复现。
+    """
+    if "cache" in step_config:
+        return bool(step_config["cache"])
+
+    step_type = step_config.get("type", "custom")
+    if step_type not in CACHEABLE_STEP_TYPES:
+        return False
+    if step_type in _DATASET_STEP_TYPES:
+        sources = [step_config, step_config.get("config") or {}]
+        params = step_config.get("dataset_params")
+        if isinstance(params, dict):
+            sources.append(params)
+        return any(
+            isinstance(s, dict) and (s.get("end_time") or s.get("end_timestamp"))
+            for s in sources
+        )
+    return True
+
+
+def compute_step_key(
+    step_config: Dict[str, Any],
+    upstream_keys: Dict[str, str],
+    upstream_outputs: Optional[List[Any]] = None,
+) -> str:
+    """
+    计算步骤的内容地址
+
+    Args:
+        step_config: 步骤配置
+        upstream_keys: 上游步骤名称 -> 上游步骤的内容地址（或输出哈希）
+        upstream_outputs: 上游步骤输出，其中引用的产物按当前磁盘状态参与哈希
+    """
+    paths = set(_collect_paths(step_config, _INPUT_PATH_KEYS))
+    for output in upstream_outputs or []:
+        paths.update(_collect_paths(output, _OUTPUT_PATH_KEYS))
+    input_artifacts = {path: fingerprint_path(path) for path in sorted(paths)}
+    payload = {
+        "type": step_config.get("type", "custom"),
+        "config": _normalize_config(step_config, top_level=True),
+        "inputs": dict(sorted(upstream_keys.items())),
+        "artifacts": input_artifacts,
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def hash_output(output: Any) -> str:
+    """对不可缓存步骤的输出求哈希，作为下游步骤的输入标识"""
+    encoded = json.dumps(output, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class StepCache:
+    """基于文件系统的步骤输出缓存（一个键一个JSON文件）"""
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = Path(
+            cache_dir or os.getenv("WORKFLOW_STEP_CACHE_DIR", "cache/workflow_steps")
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存条目；输出引用的产物已被删除时视为未命中"""
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"步骤缓存条目损坏，忽略: {entry_path} ({e})")
+            self.misses += 1
+            return None
+
+        for path in _collect_paths(entry.get("output"), _OUTPUT_PATH_KEYS):
+            if not Path(path).exists():
+                logger.info(f"步骤缓存产物已不存在，缓存失效: {path}")
+                self.misses += 1
+                return None
+
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, step_config: Dict[str, Any], output: Any) -> None:
+        entry_path = self._entry_path(key)
+        entry = {
+            "key": key,
+            "step_name": step_config.get("name"),
+            "step_type": step_config.get("type"),
+            "created_at": datetime.utcnow().isoformat(),
+            "output": output,
+        }
+        try:
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = entry_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, entry_path)
+        except OSError as e:
+            logger.warning(f"写入步骤缓存失败: {entry_path} ({e})")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "cache_dir": str(self.cache_dir),
+        }
@@ -6,6 +6,7 @@
 import asyncio
 import json
 import logging
+import os
 import threading
 from datetime import datetime
 from enum import Enum
@@ -29,6 +30,14 @@ from src.application.multi_behavior_dataset_service import (
 from src.application.multi_behavior_training_service import MultiBehaviorTrainingService
 from src.container.service_container import get_service
 from src.database.connection import AsyncSessionLocal
+from src.workflow.dag import ResourceBudget, WorkflowDAG
+from src.workflow.schedule import ScheduleError, parse_schedule
+from src.workflow.step_cache import (
+    StepCache,
+    compute_step_key,
+    hash_output,
+    is_step_cacheable,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -59,6 +68,23 @@ class StepType(Enum):
     CUSTOM = "custom"
 
 
+# 步骤输出写入下游上下文时使用的键
+_STEP_CONTEXT_KEYS: Dict[str, tuple] = {
+    StepType.DATASET_GENERATION.value: ("last_dataset_output",),
+    StepType.HANDWASH_DATASET.value: ("last_handwash_dataset",),
+    StepType.MULTI_BEHAVIOR_DATASET.value: ("last_multi_behavior_dataset",),
+    StepType.MODEL_TRAINING.value: ("last_training_output",),
+    StepType.HANDWASH_TRAINING.value: ("last_handwash_training",),
+    StepType.MULTI_BEHAVIOR_TRAINING.value: (
+        "last_multi_behavior_training",
+        "last_training_output",
+    ),
+}
+
+# 调度循环的最长休眠时间（秒），保证调度表达式修改后能及时生效
+SCHEDULE_POLL_SECONDS = float(os.getenv("WORKFLOW_SCHEDULE_POLL_SECONDS", "30"))
+
+
 class WorkflowEngine:
     """工作流引擎"""
 
@@ -67,6 +93,15 @@ class WorkflowEngine:
         self.scheduled_workflows: Dict[str, asyncio.Task] = {}
         # 用于取消训练任务的取消事件字典
         self.cancel_events: Dict[str, threading.Event] = {}
+        # 步骤输出缓存与并发资源预算
+        self.step_cache: Optional[StepCache] = (
+            StepCache()
+            if os.getenv("WORKFLOW_STEP_CACHE_ENABLED", "true").lower() == "true"
+            else None
+        )
+        self.resource_budget: Optional[ResourceBudget] = None
+        # 调度触发的后台运行任务（保持引用防止被回收）
+        self._scheduled_runs: set = set()
         self.step_handlers: Dict[StepType, Callable] = {
             StepType.DATA_PROCESSING: self._handle_data_processing,
             StepType.DATASET_GENERATION: self._handle_dataset_generation,
@@ -341,7 +376,7 @@ class WorkflowEngine:
                 "error": str(e),
             }
 
-    async def _execute_workflow(
+    async def _execute_workflow(  # noqa: C901
         self,
         workflow_id: str,
         run_id: str,
@@ -351,6 +386,9 @@ class WorkflowEngine:
         """
         执行工作流
 
+        步骤按依赖关系组成DAG，依赖已满足的步骤在资源预算内并发执行；
+        可缓存步骤命中缓存时直接复用上次的输出。
+
         Args:
             workflow_id: 工作流ID
             run_id: 运行ID
@@ -359,98 +397,111 @@ class WorkflowEngine:
         Returns:
             执行结果
         """
+        running: Dict[asyncio.Task, str] = {}
         try:
             steps = workflow_config.get("steps", [])
             total_steps = len(steps)
-            completed_steps = 0
-            context: Dict[str, Any] = {"step_outputs": [], "last_output": None}
+            dag = WorkflowDAG.from_steps(steps)
+            budget = self._get_resource_budget()
+
+            results: Dict[str, Dict[str, Any]] = {}
+            step_keys: Dict[str, str] = {}
+            completed: set = set()
+            started: set = set()
 
             logger.info(
-                f"[工作流执行] 开始执行工作流: workflow_id={workflow_id}, total_steps={total_steps}, steps={[s.get('name', '') for s in steps]}"
+                f"[工作流执行] 开始执行工作流: workflow_id={workflow_id}, total_steps={total_steps}, order={dag.order}"
             )
 
-            for i, step in enumerate(steps):
-                try:
-                    # 检查是否被取消
-                    current_task = asyncio.current_task()
-                    if current_task and current_task.cancelled():
-                        raise asyncio.CancelledError("工作流已被取消")
-
-                    # 检查取消事件
-                    if cancel_event and cancel_event.is_set():
-                        logger.info(f"检测到取消事件，停止工作流: {workflow_id}")
-                        raise asyncio.CancelledError("工作流已被取消")
-
-                    step_name = step.get("name", f"步骤 {i+1}")
-                    step_type = StepType(step.get("type", "custom"))
+            while len(completed) < total_steps:
+                # 检查取消事件
+                if cancel_event and cancel_event.is_set():
+                    logger.info(f"检测到取消事件，停止工作流: {workflow_id}")
+                    raise asyncio.CancelledError("工作流已被取消")
 
+                for name in dag.ready_steps(completed, started):
+                    started.add(name)
+                    node = dag.nodes[name]
                     logger.info(
-                        f"[工作流执行] 执行步骤 {i+1}/{total_steps}: step_name={step_name}, step_type={step_type.value}"
+                        f"[工作流执行] 调度步骤 {node.index+1}/{total_steps}: step_name={name}, step_type={node.step_type}, depends_on={node.depends_on}"
                     )
-
-                    # 执行步骤，传递取消事件
-                    step_result = await self._execute_step(
-                        step_type,
-                        step,
-                        workflow_config,
-                        context,
-                        cancel_event,
+                    task = asyncio.create_task(
+                        self._run_dag_step(
+                            dag,
+                            name,
+                            workflow_config,
+                            results,
+                            step_keys,
+                            budget,
+                            cancel_event,
+                        )
                     )
+                    running[task] = name
 
-                    if step_result["success"]:
-                        completed_steps += 1
-                        logger.info(f"✅ 步骤 {i+1} 执行成功: {step_name}")
-                        context["last_output"] = step_result.get("output")
-                        context["step_outputs"].append(
-                            {
-                                "name": step_name,
-                                "type": step_type.value,
-                                "output": step_result.get("output"),
-                            }
-                        )
-                        if step_type == StepType.DATASET_GENERATION:
-                            context["last_dataset_output"] = step_result.get("output")
-                    else:
-                        logger.error(
-                            f"❌ 步骤 {i+1} 执行失败: {step_name} - {step_result.get('error')}"
-                        )
-                        return {
-                            "success": False,
-                            "workflow_id": workflow_id,
-                            "run_id": run_id,
-                            "completed_steps": completed_steps,
-                            "total_steps": total_steps,
-                            "failed_step": i + 1,
-                            "error": step_result.get("error", "步骤执行失败"),
-                        }
+                if not running:
+                    break
 
-                except Exception as e:
-                    logger.error(f"步骤 {i+1} 执行异常: {e}")
+                # 定时醒来检查取消事件
+                done, _ = await asyncio.wait(
+                    running.keys(), timeout=1.0, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                failed: Optional[tuple] = None
+                for task in done:
+                    name = running.pop(task)
+                    node = dag.nodes[name]
+                    step_result = task.result()
+                    if not step_result.get("success"):
+                        failed = (node, step_result)
+                        break
+                    completed.add(name)
+                    results[name] = step_result
+                    step_keys[name] = step_result["_step_key"]
+                    cached_note = "（缓存命中）" if step_result.get("cached") else ""
+                    logger.info(f"✅ 步骤 {node.index+1} 执行成功{cached_note}: {name}")
+
+                if failed:
+                    node, step_result = failed
+                    logger.error(
+                        f"❌ 步骤 {node.index+1} 执行失败: {node.name} - {step_result.get('error')}"
+                    )
+                    await self._cancel_running_steps(running)
                     return {
                         "success": False,
                         "workflow_id": workflow_id,
                         "run_id": run_id,
-                        "completed_steps": completed_steps,
+                        "completed_steps": len(completed),
                         "total_steps": total_steps,
-                        "failed_step": i + 1,
-                        "error": str(e),
+                        "failed_step": node.index + 1,
+                        "error": step_result.get("error", "步骤执行失败"),
                     }
 
+            cached_steps = [n for n in dag.order if results[n].get("cached")]
             logger.info(
-                f"✅ 工作流执行完成: {workflow_id} ({completed_steps}/{total_steps} 步骤)"
+                f"✅ 工作流执行完成: {workflow_id} ({len(completed)}/{total_steps} 步骤, 缓存命中 {len(cached_steps)})"
             )
             return {
                 "success": True,
                 "workflow_id": workflow_id,
                 "run_id": run_id,
-                "completed_steps": completed_steps,
+                "completed_steps": len(completed),
                 "total_steps": total_steps,
+                "cached_steps": cached_steps,
                 "message": "工作流执行完成",
-                "outputs": context.get("step_outputs", []),
+                "outputs": [
+                    {
+                        "name": name,
+                        "type": dag.nodes[name].step_type,
+                        "output": results[name].get("output"),
+                        "cached": bool(results[name].get("cached")),
+                    }
+                    for name in dag.order
+                ],
             }
 
         except asyncio.CancelledError:
             logger.info(f"工作流被取消: {workflow_id}")
+            await self._cancel_running_steps(running)
             return {
                 "success": False,
                 "workflow_id": workflow_id,
@@ -461,6 +512,7 @@ class WorkflowEngine:
             }
         except Exception as e:
             logger.error(f"工作流执行异常: {e}")
+            await self._cancel_running_steps(running)
             return {
                 "success": False,
                 "workflow_id": workflow_id,
@@ -476,6 +528,94 @@ class WorkflowEngine:
             if workflow_id in self.cancel_events:
                 del self.cancel_events[workflow_id]
 
+    async def _run_dag_step(
+        self,
+        dag: WorkflowDAG,
+        name: str,
+        workflow_config: Dict[str, Any],
+        results: Dict[str, Dict[str, Any]],
+        step_keys: Dict[str, str],
+        budget: ResourceBudget,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> Dict[str, Any]:
+        """执行DAG中的单个步骤（缓存查找 -> 资源预算 -> 执行 -> 写缓存）"""
+        node = dag.nodes[name]
+        step = node.config
+        try:
+            step_type = StepType(step.get("type", "custom"))
+            context = self._build_step_context(dag, name, results)
+
+            cache_key: Optional[str] = None
+            if self.step_cache is not None and is_step_cacheable(step):
+                cache_key = compute_step_key(
+                    step,
+                    {dep: step_keys[dep] for dep in node.depends_on},
+                    [results[dep].get("output") for dep in node.depends_on],
+                )
+                entry = self.step_cache.get(cache_key)
+                if entry is not None:
+                    return {
+                        "success": True,
+                        "cached": True,
+                        "output": entry.get("output"),
+                        "_step_key": cache_key,
+                    }
+
+            await budget.acquire(node.cpu, node.memory_mb)
+            try:
+                step_result = await self._execute_step(
+                    step_type, step, workflow_config, context, cancel_event
+                )
+            finally:
+                await budget.release(node.cpu, node.memory_mb)
+
+            if step_result.get("success"):
+                if cache_key is not None:
+                    self.step_cache.put(cache_key, step, step_result.get("output"))
+                step_result["_step_key"] = cache_key or hash_output(
+                    step_result.get("output")
+                )
+            return step_result
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"步骤 {node.index+1} 执行异常: {e}")
+            return {"success": False, "error": str(e)}
+
+    def _build_step_context(
+        self, dag: WorkflowDAG, name: str, results: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """根据上游步骤（按拓扑序）的输出构建步骤上下文"""
+        ancestors = dag.ancestors(name)
+        context: Dict[str, Any] = {"step_outputs": [], "last_output": None}
+        for upstream in dag.order:
+            if upstream not in ancestors:
+                continue
+            output = results[upstream].get("output")
+            upstream_type = dag.nodes[upstream].step_type
+            context["last_output"] = output
+            context["step_outputs"].append(
+                {"name": upstream, "type": upstream_type, "output": output}
+            )
+            for key in _STEP_CONTEXT_KEYS.get(upstream_type, ()):
+                context[key] = output
+        return context
+
+    @staticmethod
+    async def _cancel_running_steps(running: Dict[asyncio.Task, str]) -> None:
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running.keys(), return_exceptions=True)
+        running.clear()
+
+    def _get_resource_budget(self) -> ResourceBudget:
+        # 延迟创建，确保asyncio原语绑定到运行中的事件循环
+        if self.resource_budget is None:
+            self.resource_budget = ResourceBudget()
+        return self.resource_budget
+
     async def _execute_step(
         self,
         step_type: StepType,
@@ -1131,6 +1271,19 @@ class WorkflowEngine:
                         "error": f"步骤 {i+1} 包含无效的类型: {step['type']}",
                     }
 
+            # 验证步骤依赖关系（未知依赖、重复名称、环）
+            try:
+                WorkflowDAG.from_steps(steps)
+            except ValueError as e:
+                return {"valid": False, "error": str(e)}
+
+            # 验证调度表达式
+            if workflow_config.get("trigger") == "schedule":
+                try:
+                    parse_schedule(workflow_config.get("schedule"))
+                except ScheduleError as e:
+                    return {"valid": False, "error": str(e)}
+
             return {"valid": True}
 
         except Exception as e:
@@ -1189,6 +1342,10 @@ class WorkflowEngine:
         """
         调度工作流
 
+        为工作流启动一个调度循环。下一次触发时间持久化在 workflows.next_run 中，
+        API重启后从数据库继续；多个进程通过比较并交换 next_run 抢占触发权，
+        同一次触发只会被一个进程执行。
+
         Args:
             workflow_config: 工作流配置
 
@@ -1196,15 +1353,153 @@ class WorkflowEngine:
             调度结果
         """
         try:
-            # 这里可以实现基于cron的调度
-            # 目前只是简单返回成功
-            logger.info(f"工作流调度成功: {workflow_config.get('name')}")
+            workflow_id = workflow_config.get("id")
+            schedule = parse_schedule(workflow_config.get("schedule"))
+
+            # 重新调度时替换旧的调度循环
+            existing = self.scheduled_workflows.pop(workflow_id, None)
+            if existing and not existing.done():
+                existing.cancel()
+
+            self.scheduled_workflows[workflow_id] = asyncio.create_task(
+                self._schedule_loop(workflow_id, schedule)
+            )
+            logger.info(
+                f"工作流调度成功: {workflow_config.get('name')} (schedule={schedule.expression})"
+            )
             return {"success": True}
 
         except Exception as e:
             logger.error(f"工作流调度异常: {e}")
             return {"success": False, "error": str(e)}
 
+    async def _schedule_loop(self, workflow_id: str, schedule) -> None:
+        """单个调度工作流的触发循环"""
+        from src.database.dao import WorkflowDAO
+
+        while True:
+            try:
+                fire_config: Optional[Dict[str, Any]] = None
+                sleep_seconds = SCHEDULE_POLL_SECONDS
+
+                async with AsyncSessionLocal() as session:
+                    workflow = await WorkflowDAO.get_by_id(session, workflow_id)
+                    if (
+                        workflow is None
+                        or workflow.status != "active"
+                        or workflow.trigger != "schedule"
+                    ):
+                        logger.info(f"工作流 {workflow_id} 不再处于调度状态，停止调度循环")
+                        break
+
+                    now = datetime.utcnow()
+                    if workflow.next_run is None:
+                        # 首次调度：写入下一次触发时间（并发写入时只有一个生效）
+                        await WorkflowDAO.claim_next_run(
+                            session, workflow_id, None, schedule.next_after(now)
+                        )
+                        continue
+
+                    if workflow.next_run > now:
+                        sleep_seconds = min(
+                            sleep_seconds, (workflow.next_run - now).total_seconds()
+                        )
+                    else:
+                        # 已到期（包括停机期间错过的触发，只补触发一次）
+                        expected = workflow.next_run
+                        fire_config = workflow.to_dict()
+                        claimed = await WorkflowDAO.claim_next_run(
+                            session, workflow_id, expected, schedule.next_after(now)
+                        )
+                        if not claimed:
+                            logger.debug(f"工作流 {workflow_id} 本次触发已被其他进程抢占")
+                            fire_config = None
+                        sleep_seconds = 0
+
+                if fire_config is not None:
+                    logger.info(f"⏰ 调度触发工作流: {workflow_id}")
+                    run_task = asyncio.create_task(
+                        self._run_scheduled_workflow(workflow_id, fire_config)
+                    )
+                    self._scheduled_runs.add(run_task)
+                    run_task.add_done_callback(self._scheduled_runs.discard)
+
+                await asyncio.sleep(max(sleep_seconds, 0))
+
+            except asyncio.CancelledError:
+                logger.info(f"工作流 {workflow_id} 调度循环已停止")
+                raise
+            except Exception as e:
+                logger.error(f"工作流 {workflow_id} 调度循环异常: {e}")
+                await asyncio.sleep(SCHEDULE_POLL_SECONDS)
+
+        self.scheduled_workflows.pop(workflow_id, None)
+
+    async def _run_scheduled_workflow(
+        self, workflow_id: str, workflow_config: Dict[str, Any]
+    ) -> None:
+        """执行一次调度触发的工作流并记录运行结果"""
+        from src.database.dao import WorkflowDAO, WorkflowRunDAO
+
+        if workflow_id in self.running_workflows:
+            logger.warning(f"工作流 {workflow_id} 仍在运行，跳过本次调度触发")
+            return
+
+        try:
+            async with AsyncSessionLocal() as session:
+                run_record = await WorkflowRunDAO.create(
+                    session,
+                    {
+                        "id": f"run_{int(datetime.utcnow().timestamp())}",
+                        "workflow_id": workflow_id,
+                        "status": "running",
+                        "started_at": datetime.utcnow(),
+                        "run_config": workflow_config,
+                    },
+                )
+
+            result = await self.run_workflow(workflow_id, workflow_config)
+
+            async with AsyncSessionLocal() as session:
+                if result.get("success"):
+                    status, error_message = "success", None
+                else:
+                    status = "cancelled" if result.get("cancelled") else "failed"
+                    error_message = result.get("error") or result.get("message")
+                await WorkflowRunDAO.finish_run(
+                    session,
+                    run_record.id,
+                    status,
+                    error_message,
+                    additional_data={
+                        "run_log": json.dumps(
+                            result.get("outputs", []), ensure_ascii=False, default=str
+                        )
+                    },
+                )
+                workflow = await WorkflowDAO.get_by_id(session, workflow_id)
+                if workflow:
+                    await WorkflowDAO.update(
+                        session,
+                        workflow_id,
+                        {
+                            "run_count": workflow.run_count + 1,
+                            "last_run": datetime.utcnow(),
+                        },
+                    )
+            logger.info(f"调度工作流运行结束: {workflow_id}, status={status}")
+        except Exception as e:
+            logger.error(f"调度工作流运行异常 {workflow_id}: {e}")
+
+    async def stop_schedules(self) -> None:
+        """停止所有调度循环（应用关闭时调用，不影响持久化的 next_run）"""
+        tasks = list(self.scheduled_workflows.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self.scheduled_workflows.clear()
+
 
 # 全局工作流引擎实例
 workflow_engine = WorkflowEngine()
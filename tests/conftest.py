@@ -7,7 +7,10 @@ Pytest配置文件
 
 # 添加pytest标记功能，用于跳过特定测试
 
+import os
+import shutil
 import sys
+import tempfile
 import types
 import unittest.mock
 from pathlib import Path
@@ -49,6 +52,34 @@ sys.modules.setdefault("ultralytics", _dummy_ultralytics)
 sys.path.append(str(Path(__file__).parent.parent))
 
 
+# 运行时目录（日志、快照、计算预算库、复核队列等）默认写在仓库内，
+# 测试期间统一重定向到临时目录，避免在工作区留下产物
+_RUNTIME_DIR_ENV = {
+    "API_LOG_DIR": "logs/api",
+    "SNAPSHOT_BASE_DIR": "datasets/raw",
+    "COMPUTE_BUDGET_DIR": "data/compute_budget",
+    "HARD_EXAMPLE_QUEUE_DIR": "data/review_queue",
+    "DATASET_MANIFEST_DIR": "data/dataset_manifests",
+    "DATASET_UPLOAD_DIR": "data/uploads",
+    "DATASET_INGEST_JOB_DIR": "data/ingestion_jobs",
+    "WORKFLOW_STEP_CACHE_DIR": "cache/workflow_steps",
+}
+_runtime_root = None
+
+
+def pytest_configure(config):
+    """在收集测试（导入 src.api.app）之前重定向运行时目录."""
+    global _runtime_root
+    _runtime_root = tempfile.mkdtemp(prefix="pepgmp-tests-")
+    for name, relative in _RUNTIME_DIR_ENV.items():
+        os.environ[name] = os.path.join(_runtime_root, relative)
+
+
+def pytest_unconfigure(config):
+    if _runtime_root:
+        shutil.rmtree(_runtime_root, ignore_errors=True)
+
+
 def get_fixtures_dir() -> Path:
     """获取测试数据目录"""
     return Path(__file__).parent / "fixtures"
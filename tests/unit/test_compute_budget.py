@@ -0,0 +1,164 @@
+"""
+主机算力预算单元测试（权重分配、令牌桶、多进程共享状态与 API）
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.application.compute_budget import (
+    BudgetSettings,
+    CameraComputeBudget,
+    TokenBucket,
+    allocate,
+)
+from src.infrastructure.storage.compute_budget_store import ComputeBudgetStore
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _report(camera_id, motion=0.0, persons=0.0, violation=0, priority=1.0, fps=25.0):
+    return {
+        "camera_id": camera_id,
+        "priority": priority,
+        "motion": motion,
+        "persons": persons,
+        "violation_active": violation,
+        "cost_ms": 100.0,
+        "max_fps": fps,
+    }
+
+
+def test_idle_camera_trickles_while_busy_cameras_share_budget():
+    settings = BudgetSettings(budget_fps=30)
+    busy = _report("cam_busy", motion=0.2, persons=4, violation=1)
+    corridor = _report("cam_corridor")
+    result = allocate([busy, corridor], settings)
+    assert result["cam_busy"]["allocated_fps"] == 25.0
+    assert result["cam_busy"]["reason"] == "full"
+    assert result["cam_corridor"]["allocated_fps"] == settings.idle_fps
+    assert result["cam_corridor"]["reason"] == "idle"
+
+    # 三路忙碌摄像头争抢预算：保底后按权重分配，空闲摄像头不超过涓流帧率
+    reports = [
+        busy,
+        _report("cam_line", motion=0.02, persons=1),
+        _report("cam_low", motion=0.2, persons=4, violation=1, priority=0.5),
+        corridor,
+    ]
+    result = allocate(reports, settings)
+    assert sum(a["allocated_fps"] for a in result.values()) == pytest.approx(30, 1e-3)
+    assert result["cam_corridor"]["allocated_fps"] <= settings.idle_fps
+    assert result["cam_busy"]["allocated_fps"] > result["cam_low"]["allocated_fps"]
+    assert result["cam_low"]["allocated_fps"] > result["cam_line"]["allocated_fps"]
+    assert result["cam_line"]["allocated_fps"] >= settings.min_fps
+    assert result["cam_busy"]["reason"] == "throttled"
+
+
+def test_budget_in_inference_ms_saturates_and_redistributes():
+    settings = BudgetSettings(budget_ms=1000, min_fps=0.5)
+    cheap = dict(_report("cam_a", motion=0.2, persons=4, fps=2), cost_ms=50.0)
+    heavy = dict(_report("cam_b", motion=0.2, persons=4), cost_ms=200.0)
+    result = allocate([cheap, heavy], settings)
+    # cam_a 只需 100ms/s 即满帧率，剩余预算全部让给 cam_b
+    assert result["cam_a"]["allocated_fps"] == 2.0
+    assert result["cam_b"]["allocated_ms"] == pytest.approx(900, abs=0.01)
+    assert result["cam_b"]["budget_ms"] == 1000
+
+    # 连保底都超出预算时按比例缩减
+    crowded = [_report(f"cam{i}", fps=25) for i in range(40)]
+    result = allocate(crowded, BudgetSettings(budget_fps=10, min_fps=0.5))
+    assert all(a["allocated_fps"] == 0.25 for a in result.values())
+
+
+def test_zero_priority_camera_gets_no_share_beyond_its_floor():
+    settings = BudgetSettings(budget_fps=10)
+    muted = _report("cam_muted", motion=0.2, persons=4, priority=0)
+    busy = _report("cam_busy", motion=0.2, persons=4, violation=1)
+    result = allocate([muted, busy], settings)
+    assert sum(a["allocated_fps"] for a in result.values()) <= 10 + 1e-3
+    assert result["cam_muted"]["allocated_fps"] == settings.min_fps
+    assert result["cam_busy"]["allocated_fps"] == pytest.approx(10 - settings.min_fps)
+
+    # 全部为零优先级时均分剩余预算
+    result = allocate([muted, dict(muted, camera_id="cam_other")], settings)
+    assert [a["allocated_fps"] for a in result.values()] == [5.0, 5.0]
+
+
+def test_token_bucket_enforces_rate():
+    bucket = TokenBucket()
+    assert all(bucket.try_acquire(0.0) for _ in range(100))
+    bucket.set_rate(2.0, 2.0)
+    granted = sum(bucket.try_acquire(10.0 + i / 25) for i in range(250))
+    assert granted == pytest.approx(2 + 2 * 249 / 25, abs=1)
+
+
+def test_cameras_share_budget_through_store(tmp_path):
+    clock = FakeClock()
+    store = ComputeBudgetStore(str(tmp_path))
+    settings = BudgetSettings(budget_fps=8, refresh_interval=1.0)
+    busy = CameraComputeBudget("cam_busy", store, settings, clock=clock)
+    corridor = CameraComputeBudget("cam_corridor", store, settings, clock=clock)
+
+    rng = np.random.default_rng(0)
+    still = np.full((360, 640, 3), 80, dtype=np.uint8)
+    crowded = SimpleNamespace(
+        person_detections=[{}] * 3, hairnet_results=[{"has_hairnet": False}]
+    )
+    empty = SimpleNamespace(person_detections=[], hairnet_results=[])
+    granted = {"cam_busy": 0, "cam_corridor": 0}
+    for i in range(25 * 12):
+        clock.now += 0.04
+        moving = rng.integers(0, 255, (360, 640, 3), dtype=np.uint8)
+        if busy.offer(moving):
+            busy.record_detection(0.05, crowded)
+            granted["cam_busy"] += i >= 25 * 6
+        if corridor.offer(still):
+            corridor.record_detection(0.05, empty)
+            granted["cam_corridor"] += i >= 25 * 6
+
+    assert corridor.allocation["reason"] == "idle"
+    assert corridor.allocation["allocated_fps"] <= settings.idle_fps
+    assert busy.allocation["allocated_fps"] >= 6.5
+    # 后 6 秒实际发放的检测令牌受分配帧率约束
+    assert granted["cam_corridor"] <= 6 * settings.idle_fps + 2
+    assert granted["cam_busy"] == pytest.approx(6 * 7, abs=6)
+    assert busy.get_stats()["denied"] > 0
+
+    rows = {row["camera_id"]: row for row in store.live(5, now=clock.now)}
+    assert rows["cam_busy"]["violation_active"] == 1
+    assert rows["cam_corridor"]["reason"] == "idle"
+    corridor.close()
+    assert [r["camera_id"] for r in store.live(5, now=clock.now)] == ["cam_busy"]
+    assert store.live(5, now=clock.now + 10) == []
+
+
+def test_compute_budget_endpoint(tmp_path, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from src.api.routers import monitoring
+    from src.infrastructure.storage import compute_budget_store
+
+    store = ComputeBudgetStore(str(tmp_path))
+    CameraComputeBudget("cam1", store, BudgetSettings(budget_fps=4)).refresh()
+    budget = CameraComputeBudget("cam2", store, BudgetSettings(budget_fps=4))
+    budget.max_fps = 10.0
+    budget.refresh()
+    monkeypatch.setattr(compute_budget_store, "_compute_budget_store", store)
+    monkeypatch.setenv("COMPUTE_BUDGET_FPS", "4")
+
+    app = FastAPI()
+    app.include_router(monitoring.router)
+    body = TestClient(app).get("/monitoring/compute-budget").json()
+    assert body["unit"] == "fps" and body["budget"] == 4.0
+    [camera] = body["cameras"]
+    assert camera["camera_id"] == "cam2" and camera["allocated_fps"] == 1.0
+    assert camera["reason"] == "idle"
@@ -0,0 +1,246 @@
+"""
+检测进程配置快照单元测试
+"""
+
+import asyncio
+
+from src.application.config_snapshot import (
+    STATUS_APPLIED,
+    STATUS_BUFFERED,
+    STATUS_GAP,
+    STATUS_IGNORED,
+    STATUS_STALE,
+    ConfigSnapshotStore,
+)
+from src.application.detection_loop_service import DetectionLoopConfig
+
+
+def _change(
+    version,
+    config_type="human_detection",
+    key="confidence_threshold",
+    value=0.5,
+    camera_id="cam1",
+    change_type="update",
+):
+    return {
+        "type": "config_change",
+        "camera_id": camera_id,
+        "config_type": config_type,
+        "config_key": key,
+        "config_value": value,
+        "change_type": change_type,
+        "version": version,
+    }
+
+
+def _store(snapshot=None, remote=None):
+    loads = []
+
+    async def loader(camera_id):
+        loads.append(camera_id)
+        return snapshot or {
+            "versions": {"global": 0, "camera:cam1": 3},
+            "runtime": {"log_interval": 5},
+            "detection": {"human_detection": {"confidence_threshold": 0.3}},
+            "regions": {"r1": {"region_id": "r1"}},
+        }
+
+    async def version_reader(camera_id):
+        return remote or {}
+
+    store = ConfigSnapshotStore(
+        "cam1", loader=loader, version_reader=version_reader, probe_interval=0
+    )
+    return store, loads
+
+
+class TestConfigSnapshotStore:
+    def test_resync_then_apply_consecutive_deltas(self):
+        store, loads = _store()
+        asyncio.run(store.resync())
+        before = store.snapshot
+
+        assert store.apply(_change(4, value=0.6)) == STATUS_APPLIED
+        assert (
+            store.snapshot.get_detection("human_detection", "confidence_threshold")
+            == 0.6
+        )
+        assert store.snapshot.versions["camera:cam1"] == 4
+        # 旧快照不被修改（读取方持有的引用保持一致）
+        assert before.get_detection("human_detection", "confidence_threshold") == 0.3
+
+        assert store.apply(_change(4, value=0.9)) == STATUS_STALE
+        assert (
+            store.snapshot.get_detection("human_detection", "confidence_threshold")
+            == 0.6
+        )
+        assert loads == ["cam1"]
+
+    def test_runtime_and_region_deltas(self):
+        store, _ = _store()
+        asyncio.run(store.resync())
+        store.apply(_change(4, "runtime", "log_interval", "10"))
+        assert store.snapshot.get_runtime("log_interval") == 10
+        assert store.snapshot.get_runtime("stream_interval") == 10
+
+        store.apply(_change(1, "regions", "r2", {"region_id": "r2"}, camera_id=None))
+        store.apply(
+            _change(2, "regions", "r1", None, camera_id=None, change_type="delete")
+        )
+        assert set(store.snapshot.regions) == {"r2"}
+        assert store.snapshot.versions["global"] == 2
+
+        # 其他相机的区域即使以全局作用域通知也不进入本相机快照
+        store.apply(
+            _change(3, "regions", "r3", {"region_id": "r3", "camera_id": "cam2"}, None)
+        )
+        store.apply(
+            _change(4, "regions", "r2", {"region_id": "r2", "camera_id": "cam2"}, None)
+        )
+        assert store.snapshot.regions == {}
+        assert store.snapshot.versions["global"] == 4
+
+    def test_failed_database_load_keeps_local_versions(self, monkeypatch):
+        import sys
+        import types
+
+        from src.application import config_snapshot
+
+        async def versions(camera_id):
+            return {"global": 9, "camera:cam1": 9}
+
+        async def runtime(camera_id):
+            return {"log_interval": 5}
+
+        async def no_db():
+            raise ConnectionError("database down")
+
+        monkeypatch.setattr(config_snapshot, "read_config_versions", versions)
+        monkeypatch.setattr(
+            "src.infrastructure.notifications.redis_config_sync."
+            "get_camera_config_from_redis_async",
+            runtime,
+        )
+        database_service = types.ModuleType("src.services.database_service")
+        database_service.get_db_service = no_db
+        monkeypatch.setitem(
+            sys.modules, "src.services.database_service", database_service
+        )
+
+        loaded = asyncio.run(config_snapshot.load_config_snapshot("cam1"))
+        assert loaded["detection"] is None and loaded["regions"] is None
+        assert loaded["versions"] == {}
+
+        store, _ = _store()
+        asyncio.run(store.resync())
+        store.loader = config_snapshot.load_config_snapshot
+        asyncio.run(store.resync())
+        # 未采用远端版本号，版本探测仍会发现落后并重试
+        assert store.snapshot.versions == {"global": 0, "camera:cam1": 3}
+        assert store.snapshot.regions == {"r1": {"region_id": "r1"}}
+
+    def test_gap_triggers_full_resync(self):
+        async def scenario():
+            store, loads = _store()
+            await store.resync()
+            assert store.apply(_change(6)) == STATUS_GAP
+            await store._resync_task
+            return store, loads
+
+        store, loads = asyncio.run(scenario())
+        assert loads == ["cam1", "cam1"]
+        assert store.stats["gaps"] == 1
+        assert store.snapshot.versions["camera:cam1"] == 3
+
+    def test_deltas_during_resync_are_replayed(self):
+        async def scenario():
+            gate = asyncio.Event()
+
+            async def slow_loader(camera_id):
+                await gate.wait()
+                return {"versions": {"camera:cam1": 2}, "detection": {}}
+
+            store = ConfigSnapshotStore("cam1", loader=slow_loader, probe_interval=0)
+            task = asyncio.create_task(store.resync())
+            await asyncio.sleep(0)
+            assert store.apply(_change(2, value=0.1)) == STATUS_BUFFERED
+            assert store.apply(_change(3, value=0.7)) == STATUS_BUFFERED
+            gate.set()
+            await task
+            return store
+
+        store = asyncio.run(scenario())
+        assert store.snapshot.versions["camera:cam1"] == 3
+        assert (
+            store.snapshot.get_detection("human_detection", "confidence_threshold")
+            == 0.7
+        )
+
+    def test_failed_resync_keeps_previous_snapshot(self):
+        async def failing_loader(camera_id):
+            raise ConnectionError("redis down")
+
+        store, _ = _store()
+        asyncio.run(store.resync())
+        store.loader = failing_loader
+        assert asyncio.run(store.resync()) is False
+        assert store.snapshot.get_runtime("log_interval") == 5
+        assert store.stats["resync_failures"] == 1
+
+    def test_version_probe_and_foreign_camera(self):
+        store, loads = _store(remote={"camera:cam1": 9})
+        asyncio.run(store.resync())
+        assert store.apply(_change(4, camera_id="cam2")) == STATUS_IGNORED
+        assert asyncio.run(store.check_versions()) is True
+        assert len(loads) == 2
+
+
+def test_detection_loop_config_apply_runtime():
+    config = DetectionLoopConfig(camera_id="cam1", source="0", log_interval=1)
+    assert config.apply_runtime({"log_interval": "4", "stream_interval": 4})
+    assert config.log_interval == 4
+    assert not config.apply_runtime({"log_interval": 4, "other": "x"})
+
+
+def test_detection_loop_consumes_snapshot(monkeypatch):
+    from types import SimpleNamespace
+
+    from src.application.detection_loop_service import DetectionLoopService
+
+    store, _ = _store()
+    asyncio.run(store.resync())
+    service = DetectionLoopService.__new__(DetectionLoopService)
+    service.config = DetectionLoopConfig(camera_id="cam1", source="0")
+    service.detection_pipeline = object()
+    service.config_snapshot = store
+    service._region_source, service._regions = None, []
+
+    reloads = []
+    monkeypatch.setattr(
+        "src.core.config_reload_helper.reload_detection_config",
+        lambda **kwargs: reloads.append(kwargs) or True,
+    )
+
+    # 检测参数：应用到快照后从快照读取并下发到检测管线
+    service._on_config_change(_change(4, value=0.7))
+    assert reloads[-1]["config_value"] == 0.7
+    service._on_config_change(_change(4, value=0.9))
+    assert len(reloads) == 1  # 过期版本不生效
+
+    # 区域：无效区域被跳过，区域变更后下一帧按新快照重建
+    wash = {
+        "region_id": "wash",
+        "region_type": "handwash",
+        "polygon": [[0, 0], [100, 0], [100, 100], [0, 100]],
+    }
+    result = SimpleNamespace(person_detections=[{"bbox": [10, 10, 50, 90]}])
+    service._tag_person_regions(result)
+    assert "regions" not in result.person_detections[0]
+
+    service._on_config_change(_change(1, "regions", "wash", wash, camera_id=None))
+    service._tag_person_regions(result)
+    assert result.person_detections[0]["regions"] == ["wash"]
+    regions = service._current_regions()
+    assert service._current_regions() is regions
+    assert reloads[-1]["config_value"] == 0.7
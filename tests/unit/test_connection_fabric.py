@@ -0,0 +1,199 @@
+"""
+共享连接池（子系统配额、获取统计、生命周期）单元测试
+"""
+
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.database.pool_config import PoolConfig
+from src.infrastructure import connection_fabric
+from src.infrastructure.connection_fabric import (
+    ConnectionFabric,
+    QuotaPool,
+    current_db_subsystem,
+    db_subsystem,
+    parse_quotas,
+)
+
+
+class FakePool:
+    """模拟 asyncpg.Pool：max_size 个连接，满时等待。"""
+
+    def __init__(self, max_size=4):
+        self.max_size = max_size
+        self._free = asyncio.Queue()
+        for i in range(max_size):
+            self._free.put_nowait(object())
+        self.closed = False
+
+    async def acquire(self, timeout=None):
+        return await asyncio.wait_for(self._free.get(), timeout=timeout)
+
+    async def release(self, conn, timeout=None):
+        self._free.put_nowait(conn)
+
+    def get_size(self):
+        return self.max_size
+
+    def get_idle_size(self):
+        return self._free.qsize()
+
+    def get_max_size(self):
+        return self.max_size
+
+    async def close(self):
+        self.closed = True
+
+
+def test_parse_quotas_skips_invalid_items():
+    assert parse_quotas("export=2, analytics=4,bad,x=y,zero=0") == {
+        "export": 2,
+        "analytics": 4,
+        "zero": 1,
+    }
+    assert parse_quotas(None) == {}
+
+
+def test_export_quota_does_not_starve_default_subsystem():
+    async def run():
+        pool = QuotaPool(FakePool(4), quotas={"export": 1}, acquire_timeout=0.05)
+
+        with db_subsystem("export"):
+            held = await pool.acquire()
+            # 配额已满：第二个导出连接等待超时
+            with pytest.raises(asyncio.TimeoutError):
+                await pool.acquire()
+
+        # 写入路径不受导出配额影响
+        async with pool.acquire() as conn:
+            assert conn is not None
+            stats = pool.get_stats()
+            assert stats["in_use"] == 2
+
+        await pool.release(held)
+        with db_subsystem("export"):
+            async with pool.acquire():
+                pass
+        return pool.get_stats()
+
+    stats = asyncio.run(run())
+    export = stats["subsystems"]["export"]
+    assert export["quota"] == 1
+    assert export["acquires"] == 2 and export["timeouts"] == 1
+    assert export["in_use"] == 0 and export["peak_in_use"] == 1
+    assert stats["subsystems"]["default"]["acquires"] == 1
+    assert stats["in_use"] == 0 and stats["idle_size"] == 4
+
+
+def test_slow_acquire_is_counted():
+    async def run():
+        pool = QuotaPool(FakePool(1), slow_acquire_ms=20)
+        first = await pool.acquire()
+
+        async def release_later():
+            await asyncio.sleep(0.05)
+            await pool.release(first)
+
+        asyncio.ensure_future(release_later())
+        conn = await pool.acquire()
+        await pool.release(conn)
+        return pool.get_stats()["subsystems"]["default"]
+
+    stats = asyncio.run(run())
+    assert stats["acquires"] == 2
+    assert stats["slow_acquires"] == 1
+    assert stats["max_wait_ms"] >= 40
+
+
+def test_fabric_shares_one_pool_and_runs_shutdown_hooks_first():
+    created = []
+
+    async def factory(url, **kwargs):
+        await asyncio.sleep(0.01)
+        pool = FakePool(kwargs["max_size"])
+        created.append((url, kwargs, pool))
+        return pool
+
+    config = PoolConfig(
+        min_size=1,
+        max_size=8,
+        command_timeout=5,
+        max_queries=100,
+        max_inactive_connection_lifetime=60,
+    )
+    fabric = ConnectionFabric(
+        database_url="postgresql://test@localhost/test",
+        redis_url="",
+        pool_config=config,
+        quotas=None,
+        pool_factory=factory,
+    )
+    order = []
+
+    async def run():
+        pools = await asyncio.gather(*(fabric.get_pool() for _ in range(5)))
+        assert all(p is pools[0] for p in pools)
+
+        async def flush():
+            order.append(("flush", created[0][2].closed))
+
+        fabric.on_shutdown(flush)
+        fabric.on_shutdown(flush)
+        await fabric.close()
+
+    asyncio.run(run())
+
+    assert len(created) == 1
+    url, kwargs, raw_pool = created[0]
+    assert url == "postgresql://test@localhost/test"
+    assert kwargs["max_size"] == 8 and kwargs["command_timeout"] == 5
+    # 默认导出配额为连接池的四分之一；关闭回调只执行一次且先于关闭连接池
+    assert fabric.quotas == {"export": 2}
+    assert order == [("flush", False)]
+    assert raw_pool.closed and fabric.pool is None
+    assert fabric.get_redis() is None
+
+
+def test_export_router_dependency_applies_to_streaming_body():
+    from src.api.routers.export import _use_export_connection_quota
+
+    app = FastAPI()
+    seen = {}
+
+    @app.get("/stream", dependencies=[Depends(_use_export_connection_quota)])
+    async def stream():
+        seen["handler"] = current_db_subsystem()
+
+        async def body():
+            seen["body"] = current_db_subsystem()
+            yield b"ok"
+
+        return StreamingResponse(body())
+
+    @app.get("/plain")
+    async def plain():
+        return {"subsystem": current_db_subsystem()}
+
+    client = TestClient(app)
+    assert client.get("/stream").content == b"ok"
+    assert seen == {"handler": "export", "body": "export"}
+    assert client.get("/plain").json() == {"subsystem": "default"}
+
+
+def test_async_camera_config_uses_shared_redis(monkeypatch):
+    from src.infrastructure.notifications.redis_config_sync import (
+        get_camera_config_from_redis_async,
+    )
+
+    class FakeRedis:
+        async def hgetall(self, key):
+            assert key == "video_stream:config:cam1"
+            return {b"log_interval": b"5", b"mode": b"fast"}
+
+    monkeypatch.setattr(connection_fabric, "get_shared_redis", lambda: FakeRedis())
+    result = asyncio.run(get_camera_config_from_redis_async("cam1"))
+    assert result == {"log_interval": 5, "mode": "fast"}
@@ -0,0 +1,275 @@
+"""
+数据集入库单元测试（分块落盘、压缩包安全检查、线程池解压、可续传上传）
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import stat
+import tarfile
+import threading
+import zipfile
+
+import pytest
+from fastapi import UploadFile
+
+from src.application.dataset_ingestion import (
+    SESSION_LOCK_FILE,
+    ArchiveLimits,
+    ArchiveRejected,
+    DatasetIngestionService,
+    IngestionError,
+    UploadOffsetMismatch,
+    UploadSessionStore,
+    extract_archive,
+    inspect_archive,
+    spool_upload,
+)
+from src.application.dataset_validation_service import DatasetValidationService
+from src.utils.file_lock import file_lock
+
+
+def _zip(path, members, compression=zipfile.ZIP_DEFLATED):
+    with zipfile.ZipFile(path, "w", compression) as zf:
+        for name, data in members.items():
+            if isinstance(data, zipfile.ZipInfo):
+                zf.writestr(data, b"target")
+            else:
+                zf.writestr(name, data)
+    return path
+
+
+def test_inspect_rejects_traversal_links_bombs_and_entry_limit(tmp_path):
+    traversal = _zip(tmp_path / "a.zip", {"../evil.txt": b"x"})
+    with pytest.raises(ArchiveRejected, match="路径穿越"):
+        inspect_archive(traversal, traversal.name)
+
+    link = zipfile.ZipInfo("images/link")
+    link.external_attr = (stat.S_IFLNK | 0o777) << 16
+    symlink = _zip(tmp_path / "b.zip", {"images/link": link})
+    with pytest.raises(ArchiveRejected, match="符号链接"):
+        inspect_archive(symlink, symlink.name)
+
+    bomb = _zip(tmp_path / "c.zip", {"zeros.bin": bytes(4 << 20)})
+    with pytest.raises(ArchiveRejected, match="压缩炸弹"):
+        inspect_archive(bomb, bomb.name)
+
+    many = _zip(tmp_path / "d.zip", {f"{i}.txt": b"x" for i in range(5)})
+    with pytest.raises(ArchiveRejected, match="条目数"):
+        inspect_archive(many, many.name, ArchiveLimits(max_entries=4))
+
+    report = inspect_archive(many, many.name)
+    assert report.entries == 5 and report.total_bytes == 5
+    assert not report.has_data_yaml
+
+
+def test_extract_tar_gz_streams_with_progress_and_rejects_links(tmp_path):
+    archive = tmp_path / "ds.tar.gz"
+    with tarfile.open(archive, "w:gz") as tf:
+        for name, data in {
+            "data.yaml": b"nc: 1\n",
+            "images/a.jpg": b"j" * 3000,
+        }.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    progress = []
+    report = extract_archive(
+        archive, tmp_path / "out", progress=lambda d, t: progress.append((d, t))
+    )
+    assert report.has_data_yaml and report.entries == 2
+    assert (tmp_path / "out" / "images" / "a.jpg").read_bytes() == b"j" * 3000
+    assert progress[-1] == (3006, 3006)
+
+    linked = tmp_path / "link.tar"
+    with tarfile.open(linked, "w") as tf:
+        info = tarfile.TarInfo("passwd")
+        info.type = tarfile.SYMTYPE
+        info.linkname = "/etc/passwd"
+        tf.addfile(info)
+    with pytest.raises(ArchiveRejected, match="链接"):
+        extract_archive(linked, tmp_path / "out2")
+    assert not (tmp_path / "out2" / "passwd").exists()
+
+
+def test_extract_detects_corrupted_zip_entry(tmp_path):
+    path = _zip(
+        tmp_path / "bad.zip", {"a.txt": b"hello world" * 10}, zipfile.ZIP_STORED
+    )
+    raw = bytearray(path.read_bytes())
+    offset = raw.index(b"hello world")
+    raw[offset] ^= 0xFF
+    path.write_bytes(bytes(raw))
+    with pytest.raises(zipfile.BadZipFile):
+        extract_archive(path, tmp_path / "out")
+    assert not (tmp_path / "out" / "a.txt").exists()
+
+
+def test_spool_upload_hashes_in_chunks_and_enforces_limit(tmp_path):
+    data = b"0123456789" * 1000
+
+    async def run():
+        spooled = await spool_upload(
+            UploadFile(io.BytesIO(data), filename="a.bin"),
+            tmp_path / "a.bin",
+            chunk_size=64,
+        )
+        with pytest.raises(IngestionError):
+            await spool_upload(
+                UploadFile(io.BytesIO(data), filename="b.bin"),
+                tmp_path / "b.bin",
+                max_bytes=100,
+            )
+        return spooled
+
+    spooled = asyncio.run(run())
+    assert spooled.size == len(data)
+    assert spooled.sha256 == hashlib.sha256(data).hexdigest()
+    assert (tmp_path / "a.bin").read_bytes() == data
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.bin"]
+
+
+async def _chunks(*parts):
+    for part in parts:
+        yield part
+
+
+def test_upload_session_resumes_from_offset_and_verifies_hash(tmp_path):
+    data = b"abcdefghij" * 10
+    store = UploadSessionStore(str(tmp_path / "uploads"))
+
+    async def run():
+        upload = store.create(
+            "sub/dir/ds.zip", len(data), hashlib.sha256(data).hexdigest()
+        )
+        assert upload["filename"] == "ds.zip"
+        upload_id = upload["upload_id"]
+        assert await store.append(upload_id, 0, _chunks(data[:30], data[30:40])) == 40
+        with pytest.raises(UploadOffsetMismatch) as mismatch:
+            await store.append(upload_id, 0, _chunks(data))
+        assert mismatch.value.expected == 40
+        assert store.get(upload_id)["offset"] == 40
+        with pytest.raises(UploadOffsetMismatch):
+            await store.finalize(upload_id, tmp_path / "out" / "ds.zip")
+        # 另一个进程持有追加锁时拒绝写入，客户端按返回的偏移重试
+        with file_lock(tmp_path / "uploads" / upload_id / SESSION_LOCK_FILE):
+            with pytest.raises(UploadOffsetMismatch):
+                await store.append(upload_id, 40, _chunks(data[40:]))
+        assert store.get(upload_id)["offset"] == 40
+        await store.append(upload_id, 40, _chunks(data[40:]))
+        spooled = await store.finalize(upload_id, tmp_path / "out" / "ds.zip")
+        assert store.get(upload_id) is None
+
+        bad = store.create("x.bin", 3, "0" * 64)
+        await store.append(bad["upload_id"], 0, _chunks(b"abc"))
+        with pytest.raises(IngestionError, match="SHA-256"):
+            await store.finalize(bad["upload_id"], tmp_path / "out" / "x.bin")
+        return spooled
+
+    spooled = asyncio.run(run())
+    assert (tmp_path / "out" / "ds.zip").read_bytes() == data
+    assert spooled.sha256 == hashlib.sha256(data).hexdigest()
+
+
+def test_ingestion_service_extracts_in_worker_pool(tmp_path):
+    good = _zip(
+        tmp_path / "good.zip", {"images/a.jpg": b"a" * 100, "data.yaml": b"nc: 1"}
+    )
+    bomb = _zip(tmp_path / "bomb.zip", {"zeros.bin": bytes(4 << 20)})
+    threads = []
+    service = DatasetIngestionService(workers=1, root=str(tmp_path / "jobs"))
+    original = service._extract_all
+
+    def recording(*args):
+        threads.append(threading.current_thread().name)
+        return original(*args)
+
+    service._extract_all = recording
+
+    async def run():
+        ok = await service.ingest("ds1", [good], tmp_path / "ds1", remove_archives=True)
+        rejected = await service.ingest("ds2", [bomb], tmp_path / "ds2")
+        await service.shutdown()
+        return ok, rejected
+
+    ok, rejected = asyncio.run(run())
+    assert ok["status"] == "succeeded" and ok["progress"] == 1.0
+    assert ok["bytes_done"] == ok["bytes_total"] == 105 and not good.exists()
+    assert rejected["status"] == "failed" and rejected["rejected"]
+    assert all(name.startswith("dataset-ingest") for name in threads)
+    assert service.get_stats()["jobs"] == {"succeeded": 1, "failed": 1}
+
+
+def test_ingestion_jobs_are_visible_to_other_workers(tmp_path):
+    archive = _zip(tmp_path / "ds.zip", {"images/a.jpg": b"a" * 100})
+    worker_a = DatasetIngestionService(workers=1, root=str(tmp_path / "jobs"))
+    worker_b = DatasetIngestionService(workers=1, root=str(tmp_path / "jobs"))
+
+    async def run():
+        job = worker_a.start("ds1", [archive], tmp_path / "ds1")
+        assert worker_b.get_job(job["job_id"])["status"] == "queued"
+        await asyncio.gather(*worker_a._tasks.values())
+        await worker_a.shutdown()
+        await worker_b.shutdown()
+        return job
+
+    job = asyncio.run(run())
+    seen = worker_b.get_job(job["job_id"])
+    assert seen["status"] == "succeeded" and seen["bytes_done"] == 100
+    assert [j["job_id"] for j in worker_b.list_jobs()] == [job["job_id"]]
+    assert worker_b.get_job("0" * 32) is None and worker_b.get_job("../x") is None
+
+    # 执行任务的进程已退出时，未完成的任务按失败返回
+    orphan = {**seen, "job_id": "f" * 32, "status": "running", "pid": 0}
+    (tmp_path / "jobs" / f"{orphan['job_id']}.json").write_text(json.dumps(orphan))
+    assert worker_b.get_job(orphan["job_id"])["status"] == "failed"
+
+
+def test_validation_reads_archive_headers_without_buffering(tmp_path):
+    bomb = _zip(tmp_path / "bomb.zip", {"zeros.bin": bytes(4 << 20)})
+    good = _zip(tmp_path / "good.zip", {"data.yaml": b"nc: 1"})
+
+    async def run():
+        results = []
+        for path in (bomb, good):
+            with open(path, "rb") as f:
+                upload = UploadFile(f, filename=path.name)
+                results.append(await DatasetValidationService.validate_file(upload))
+                assert f.tell() == 0
+        return results
+
+    (bomb_ok, bomb_error), (good_ok, _) = asyncio.run(run())
+    assert not bomb_ok and "压缩炸弹" in bomb_error
+    assert good_ok
+
+
+def test_resumable_upload_endpoints(tmp_path, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from src.api.routers import mlops
+
+    store = UploadSessionStore(str(tmp_path / "uploads"))
+    monkeypatch.setattr(mlops, "get_upload_session_store", lambda: store)
+    app = FastAPI()
+    app.include_router(mlops.router)
+    client = TestClient(app)
+    base = "/api/v1/mlops/datasets/uploads"
+
+    upload = client.post(base, json={"filename": "ds.zip", "total_size": 10}).json()
+    url = f"{base}/{upload['upload_id']}"
+    first = client.patch(url, content=b"01234", headers={"Upload-Offset": "0"})
+    assert first.json()["offset"] == 5 and first.headers["upload-offset"] == "5"
+
+    conflict = client.patch(url, content=b"56789", headers={"Upload-Offset": "0"})
+    assert conflict.status_code == 409 and conflict.headers["upload-offset"] == "5"
+
+    assert client.get(url).json()["offset"] == 5
+    assert (
+        client.patch(url, content=b"56789", headers={"Upload-Offset": "5"}).json()[
+            "offset"
+        ]
+        == 10
+    )
+    assert client.get(f"{base}/{'0' * 32}").status_code == 404
@@ -0,0 +1,232 @@
+"""
+数据集清单与流式归档单元测试（索引查询、增量刷新、zip/tar 布局、Range 续传）
+"""
+
+import io
+import os
+import tarfile
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from src.infrastructure.storage import dataset_archive, dataset_manifest
+from src.infrastructure.storage.dataset_archive import (
+    ArchiveSourceChanged,
+    RangeNotSatisfiable,
+    build_archive,
+    parse_range,
+)
+from src.infrastructure.storage.dataset_manifest import DatasetCatalog, label_path_for
+
+ANNOTATIONS = (
+    "image_path,camera_id,timestamp,violation_type,has_violation,record_id\n"
+    "images/a.jpg,cam1,t1,no_hairnet,True,1\n"
+    "images\\b.png,cam2,t2,,False,2\n"
+    "./images/c.jpg,cam1,t3,no_handwash,true,3\n"
+)
+
+
+def _make_dataset(root):
+    (root / "images").mkdir(parents=True)
+    (root / "labels").mkdir()
+    Image.new("RGB", (64, 32)).save(root / "images" / "a.jpg")
+    Image.new("RGB", (16, 16)).save(root / "images" / "b.png")
+    Image.new("RGB", (64, 32)).save(root / "images" / "c.jpg")
+    (root / "labels" / "a.txt").write_text(
+        "0 0.5 0.5 0.1 0.1\n1 0.2 0.2 0.1 0.1\n0 0 0 1 1\n"
+    )
+    (root / "annotations.csv").write_text(ANNOTATIONS)
+    (root / "data.yaml").write_text("names: [head, hairnet]\n")
+    (root / "说明.txt").write_text("中文文件名")
+    return root
+
+
+def _catalog(tmp_path):
+    return DatasetCatalog(str(tmp_path / "manifests"), refresh_interval=3600)
+
+
+def test_manifest_indexes_samples_labels_and_annotations(tmp_path):
+    root = _make_dataset(tmp_path / "ds")
+    manifest = _catalog(tmp_path).build("ds1", root)
+
+    samples, total = manifest.query_samples(limit=2)
+    assert total == 3
+    assert [s["name"] for s in samples] == ["a.jpg", "b.png"]
+    first = samples[0]
+    assert (first["width"], first["height"]) == (64, 32)
+    assert first["labels"] == {"0": 2, "1": 1} and first["label_count"] == 3
+    assert first["violation_type"] == "no_hairnet" and first["has_violation"]
+    assert samples[1]["camera_id"] == "cam2" and not samples[1]["has_violation"]
+
+    violating, total = manifest.query_samples(has_violation=True)
+    assert total == 2 and {s["path"] for s in violating} == {
+        "images/a.jpg",
+        "images/c.jpg",
+    }
+    assert manifest.query_samples(violation_type="no_handwash")[1] == 1
+    assert manifest.query_samples(camera_id="cam1", offset=1)[0][0]["name"] == "c.jpg"
+
+    everything, total = manifest.query_samples(file_type="all")
+    assert total == 5 and "annotations.csv" not in {s["name"] for s in everything}
+
+    stats = manifest.stats()
+    assert stats["files"] == 7 and stats["images"] == 3
+    assert stats["violations"] == 2
+    assert stats["violation_types"] == {"no_hairnet": 1, "no_handwash": 1}
+    assert stats["label_classes"] == {"0": 2, "1": 1}
+    assert stats["resolutions"][0] == {"width": 64, "height": 32, "count": 2}
+
+
+def test_refresh_only_rereads_changed_files(tmp_path, monkeypatch):
+    root = _make_dataset(tmp_path / "ds")
+    catalog = _catalog(tmp_path)
+    manifest = catalog.build("ds1", root)
+    version = manifest.version
+
+    read = []
+    original = dataset_manifest._file_crc32
+    monkeypatch.setattr(
+        dataset_manifest,
+        "_file_crc32",
+        lambda path: read.append(os.path.basename(path)) or original(path),
+    )
+    assert manifest.refresh() == {"added": 0, "updated": 0, "removed": 0}
+    assert read == [] and manifest.version == version
+
+    (root / "labels" / "a.txt").write_text("1 0 0 1 1\n")
+    (root / "images" / "b.png").unlink()
+    Image.new("RGB", (8, 8)).save(root / "images" / "d.jpg")
+    assert manifest.refresh() == {"added": 1, "updated": 1, "removed": 1}
+    assert sorted(read) == ["a.txt", "d.jpg"]
+    assert manifest.version == version + 1
+
+    samples, total = manifest.query_samples()
+    assert total == 3 and samples[0]["labels"] == {"1": 1}
+
+    # 新的清单实例（进程重启）复用磁盘上的索引，无需重新读取文件
+    read.clear()
+    reopened = DatasetCatalog(str(tmp_path / "manifests")).get("ds1", root)
+    assert read == [] and reopened.version == version + 1
+
+
+def test_label_path_convention():
+    assert label_path_for("train/images/x.jpg") == "train/labels/x.txt"
+    assert label_path_for("images/val/y.png") == "labels/val/y.txt"
+    assert label_path_for("z.jpg") == "z.txt"
+
+
+@pytest.mark.parametrize("force_zip64", [False, True])
+def test_streaming_zip_is_valid_and_range_consistent(
+    tmp_path, monkeypatch, force_zip64
+):
+    if force_zip64:
+        monkeypatch.setattr(dataset_archive, "ZIP64_LIMIT", 8)
+        monkeypatch.setattr(dataset_archive, "ZIP_MAX_ENTRIES", 2)
+    root = _make_dataset(tmp_path / "ds")
+    _, entries = _catalog(tmp_path).build("ds1", root).archive_snapshot()
+    archive = build_archive("zip", entries)
+
+    data = b"".join(archive.iter_bytes(chunk_size=7))
+    assert len(data) == archive.size
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        assert sorted(zf.namelist()) == sorted(e.name for e in entries)
+        assert zf.read("说明.txt") == "中文文件名".encode()
+
+    for start, end in [(0, 0), (5, 100), (archive.size - 30, archive.size - 1)]:
+        assert b"".join(archive.iter_bytes(start, end)) == data[start : end + 1]
+
+
+def test_streaming_tar_is_valid(tmp_path):
+    root = _make_dataset(tmp_path / "ds")
+    _, entries = _catalog(tmp_path).build("ds1", root).archive_snapshot()
+    archive = build_archive("tar", entries)
+
+    data = b"".join(archive.iter_bytes())
+    assert len(data) == archive.size and archive.size % tarfile.RECORDSIZE == 0
+    with tarfile.open(fileobj=io.BytesIO(data)) as tf:
+        assert (
+            tf.extractfile("labels/a.txt").read()
+            == (root / "labels" / "a.txt").read_bytes()
+        )
+        assert "说明.txt" in tf.getnames()
+    assert b"".join(archive.iter_bytes(1000, 3000)) == data[1000:3001]
+
+
+def test_same_size_rewrite_aborts_the_stream(tmp_path):
+    root = _make_dataset(tmp_path / "ds")
+    _, entries = _catalog(tmp_path).build("ds1", root).archive_snapshot()
+    archive = build_archive("zip", entries)
+
+    # 大小不变但内容变化：已写入的 CRC32 与新内容不符，必须中止
+    label = root / "labels" / "a.txt"
+    stat = label.stat()
+    label.write_text("1" + label.read_text()[1:])
+    os.utime(label, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    with pytest.raises(ArchiveSourceChanged):
+        b"".join(archive.iter_bytes())
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=10-", 100) == (10, 99)
+    assert parse_range("bytes=10-500", 100) == (10, 99)
+    assert parse_range("bytes=-20", 100) == (80, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=100-", 100)
+
+
+def test_download_endpoint_streams_with_range_and_if_range(tmp_path, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from src.api.routers import mlops
+    from src.database.connection import get_async_session
+
+    root = _make_dataset(tmp_path / "ds")
+    catalog = _catalog(tmp_path)
+
+    async def get_by_id(session, dataset_id):
+        return SimpleNamespace(file_path=str(root)) if dataset_id == "ds1" else None
+
+    monkeypatch.setattr(mlops.DatasetDAO, "get_by_id", get_by_id)
+    monkeypatch.setattr(mlops, "get_dataset_catalog", lambda: catalog)
+    app = FastAPI()
+    app.include_router(mlops.router)
+    app.dependency_overrides[get_async_session] = lambda: None
+    client = TestClient(app)
+    url = "/api/v1/mlops/datasets/ds1"
+
+    full = client.get(f"{url}/download", params={"format": "zip"})
+    assert full.status_code == 200
+    assert int(full.headers["content-length"]) == len(full.content)
+    etag = full.headers["etag"]
+
+    partial = client.get(
+        f"{url}/download", headers={"Range": "bytes=100-", "If-Range": etag}
+    )
+    assert partial.status_code == 206
+    assert (
+        partial.headers["content-range"]
+        == f"bytes 100-{len(full.content) - 1}/{len(full.content)}"
+    )
+    assert full.content[:100] + partial.content == full.content
+
+    stale = client.get(
+        f"{url}/download", headers={"Range": "bytes=100-", "If-Range": '"old"'}
+    )
+    assert stale.status_code == 200 and stale.content == full.content
+    assert (
+        client.get(f"{url}/download", headers={"Range": "bytes=99999999-"}).status_code
+        == 416
+    )
+
+    samples = client.get(
+        f"{url}/samples", params={"violation_type": "no_hairnet"}
+    ).json()
+    assert samples["total"] == 1
+    assert samples["samples"][0]["url"] == f"{url}/files/images/a.jpg"
+    assert client.get(f"{url}/stats").json()["images"] == 3
@@ -0,0 +1,221 @@
+"""
+检测事件列式日志单元测试
+"""
+
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+from src.infrastructure.repositories.postgresql_detection_event_log import (
+    EVENT_COLUMNS,
+    DetectionEventLog,
+    flatten_objects,
+    partition_day,
+    partition_name,
+)
+
+
+class _Transaction:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def execute(self, sql, *args):
+        self.pool.executed.append(sql)
+        if self.pool.fail_copy and "PARTITION OF" in sql:
+            raise RuntimeError("connection lost")
+        return "INSERT 0 0"
+
+    async def fetch(self, sql, *args):
+        self.pool.fetched.append((sql, args))
+        return self.pool.fetch_rows
+
+    async def fetchval(self, sql, *args):
+        self.pool.fetched.append((sql, args))
+        return self.pool.fetchval_value
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.pool.copies.append((table, list(records), tuple(columns)))
+
+    def transaction(self):
+        return _Transaction()
+
+
+class _Acquire:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def __aenter__(self):
+        return FakeConnection(self.pool)
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class FakePool:
+    def __init__(self):
+        self.executed = []
+        self.fetched = []
+        self.copies = []
+        self.fetch_rows = []
+        self.fetchval_value = None
+        self.fail_copy = False
+
+    def acquire(self):
+        return _Acquire(self)
+
+
+def _event_log(pool, **kwargs):
+    async def get_pool():
+        return pool
+
+    return DetectionEventLog(get_pool, **kwargs)
+
+
+def _objects():
+    return [
+        {
+            "class_name": "person",
+            "confidence": 0.9,
+            "bbox": {"x1": 1, "y1": 2, "x2": 30, "y2": 80, "width": 29},
+            "track_id": "7",
+            "metadata": {"has_hairnet": False, "is_handwashing": True},
+        },
+        {"class_name": "hairnet", "confidence": 0.6, "bbox": [5, 5, 10, 10]},
+        "not-a-dict",
+    ]
+
+
+def test_flatten_objects_produces_typed_rows():
+    ts = datetime(2024, 5, 1, 10, 0, tzinfo=timezone(timedelta(hours=8)))
+    rows = flatten_objects("r1", "cam1", ts, _objects())
+
+    assert len(rows) == 2
+    person = dict(zip(EVENT_COLUMNS, rows[0]))
+    assert person["ts"] == datetime(2024, 5, 1, 2, 0)
+    assert person["track_id"] == 7
+    assert (person["x1"], person["y2"]) == (1.0, 80.0)
+    assert person["has_hairnet"] is False
+    assert person["is_handwashing"] is True
+    assert person["is_sanitizing"] is None
+
+    hairnet = dict(zip(EVENT_COLUMNS, rows[1]))
+    assert (hairnet["x2"], hairnet["track_id"]) == (10.0, None)
+
+
+def test_partition_naming_round_trip():
+    day = date(2024, 5, 1)
+    assert partition_name(day) == "detection_events_20240501"
+    assert partition_day(partition_name(day)) == day
+    assert partition_day("detection_events_daily") is None
+
+
+def test_flush_copies_batches_and_creates_partitions_once():
+    pool = FakePool()
+    log = _event_log(pool, batch_size=3)
+    ts = datetime(2024, 5, 1, 23, 59)
+
+    async def run():
+        log.append("r1", "cam1", ts, _objects())
+        assert not log.should_flush()
+        log.append("r2", "cam1", ts + timedelta(minutes=2), _objects())
+        assert log.should_flush()
+        assert await log.flush() == 4
+        log.append("r3", "cam1", ts, _objects())
+        await log.flush()
+
+    asyncio.run(run())
+
+    assert [len(rows) for _, rows, _ in pool.copies] == [4, 2]
+    assert pool.copies[0][2] == EVENT_COLUMNS
+    partitions = [sql for sql in pool.executed if "PARTITION OF" in sql]
+    assert len(partitions) == 2  # 5月1日与5月2日各创建一次
+    assert "USING BRIN (ts)" in partitions[0]
+    assert log.get_stats()["rows_written"] == 6
+
+
+def test_append_wakes_background_flush_without_waiting():
+    pool = FakePool()
+    log = _event_log(pool, batch_size=2, flush_interval=60)
+
+    async def run():
+        assert log.append("r1", "cam1", datetime(2024, 5, 1), _objects()) == 2
+        # append 不等待 COPY，由后台任务在达到批量后写入
+        assert pool.copies == []
+        await asyncio.sleep(0.05)
+        assert [len(rows) for _, rows, _ in pool.copies] == [2]
+        await log.close()
+
+    asyncio.run(run())
+
+
+def test_failed_flush_keeps_rows_for_retry():
+    pool = FakePool()
+    pool.fail_copy = True
+    log = _event_log(pool)
+
+    async def run():
+        log.append("r1", "cam1", datetime(2024, 5, 3), _objects())
+        assert await log.flush() == 0
+        assert log.pending == 2
+        pool.fail_copy = False
+        assert await log.flush() == 2
+
+    asyncio.run(run())
+    assert log.stats["flush_errors"] == 1
+    assert log.pending == 0
+
+
+def test_retention_rolls_up_then_drops_old_partitions():
+    pool = FakePool()
+    pool.fetch_rows = [
+        {"name": "detection_events_20240501"},
+        {"name": "detection_events_20240520"},
+        {"name": "detection_events_daily"},
+    ]
+    log = _event_log(pool, retention_days=10)
+
+    dropped = asyncio.run(log.apply_retention(today=date(2024, 5, 25)))
+
+    assert dropped == [date(2024, 5, 1)]
+    rollup = [sql for sql in pool.executed if "DROP TABLE" in sql]
+    assert len(rollup) == 1
+    assert "INSERT INTO detection_events_daily" in rollup[0]
+    assert "detection_events_20240501" in rollup[0]
+
+
+def test_daily_class_counts_merges_detail_and_rollup_params():
+    pool = FakePool()
+    pool.fetch_rows = [
+        {"day": date(2024, 5, 1), "class_name": "person", "n": 5},
+        {"day": date(2024, 5, 1), "class_name": "hairnet", "n": 2},
+    ]
+    log = _event_log(pool)
+    start, end = datetime(2024, 4, 25), datetime(2024, 5, 2)
+
+    counts = asyncio.run(log.daily_class_counts(start, end, camera_id="cam1"))
+
+    assert counts == {"2024-05-01": {"person": 5, "hairnet": 2}}
+    sql, args = pool.fetched[-1]
+    assert "camera_id = $4" in sql and "day >= $5" in sql and "day <= $6" in sql
+    assert args == ("cam1", start, end, "cam1", start.date(), end.date())
+
+
+def test_covered_since_uses_earliest_partition_or_rollup_day():
+    pool = FakePool()
+    log = _event_log(pool)
+    assert asyncio.run(log.covered_since()) is None
+
+    pool.fetch_rows = [
+        {"name": "detection_events_20240520"},
+        {"name": "detection_events_20240510"},
+    ]
+    assert asyncio.run(log.covered_since()) == date(2024, 5, 10)
+    pool.fetchval_value = date(2024, 4, 1)
+    assert asyncio.run(log.covered_since()) == date(2024, 4, 1)
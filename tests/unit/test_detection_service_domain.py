@@ -1938,3 +1938,46 @@ class TestDetectionServiceDomainEdgeCases:
         assert "total" in result
         assert len(result["cameras"]) == 0
         # 验证零摄像头时，平均值计算被跳过（len(camera_ids) == 0）
+
+
+@pytest.mark.asyncio
+async def test_daily_statistics_counts_uncovered_days_from_records():
+    """事件日志未覆盖的日期回退到逐条统计"""
+    from datetime import timezone
+
+    now = datetime.now(timezone.utc)
+    today = now.date().isoformat()
+
+    class EventLogRepository(MockDetectionRepository):
+        async def get_daily_statistics(self, start_time, end_time, camera_id=None):
+            # 事件日志只覆盖今天
+            return {today: {"total_events": 4, "counts_by_type": {"person": 6}}}
+
+    repository = EventLogRepository()
+    old = DetectionRecord(
+        id="old", camera_id="cam0", timestamp=Timestamp(now - timedelta(days=3))
+    )
+    old.add_object(
+        DetectedObject(
+            class_id=0,
+            class_name="person",
+            confidence=Confidence(0.8),
+            bbox=BoundingBox(10, 20, 30, 40),
+        )
+    )
+    repository.records[old.id] = old
+    service = DetectionServiceDomain(
+        detection_repository=repository, camera_repository=MockCameraRepository()
+    )
+
+    result = await service.get_daily_statistics(days=5)
+
+    by_date = {day["date"]: day for day in result}
+    assert len(result) == 5 and result[-1]["date"] == today
+    assert by_date[today]["total_events"] == 4
+    old_day = by_date[(now - timedelta(days=3)).date().isoformat()]
+    assert old_day == {
+        "date": old_day["date"],
+        "total_events": 1,
+        "counts_by_type": {"person": 1},
+    }
@@ -0,0 +1,230 @@
+"""
+难例挖掘单元测试（不确定性信号、摄像头预算、感知去重、审核队列与数据集导出）
+"""
+
+import asyncio
+import csv
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.application import dataset_generation_service
+from src.application.dataset_generation_service import DatasetGenerationService
+from src.application.hard_example_mining import (
+    HardExampleMiner,
+    MiningSettings,
+    combine_signals,
+    review_item_to_entry,
+    score_persons,
+)
+from src.config.dataset_config import DatasetGenerationConfig
+from src.infrastructure.storage.review_queue import (
+    ReviewItemNotFound,
+    ReviewQueue,
+    ReviewQueueJanitor,
+    ReviewStateError,
+)
+
+
+def _result(hairnet_conf=0.9, model_scores=None, cascade=None, track_id=None):
+    person = {"bbox": [10, 10, 60, 110], "confidence": 0.8}
+    if cascade is not None:
+        person.update(detector_confidence=0.8, cascade_confidence=cascade)
+    if track_id is not None:
+        person["track_id"] = track_id
+    return SimpleNamespace(
+        person_detections=[person],
+        hairnet_results=[{"person_id": 1, "hairnet_confidence": hairnet_conf}],
+        handwash_results=[{"person_id": 1, "model_scores": model_scores or {}}],
+    )
+
+
+def _frame(seed):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 255, size=(120, 160, 3), dtype=np.uint8)
+
+
+def test_score_persons_reports_each_uncertainty_signal():
+    settings = MiningSettings()
+    assert score_persons(_result(), 0.6, settings) == []
+
+    near = score_persons(_result(hairnet_conf=0.62), 0.6, settings)[0]
+    assert near["signals"] == {"hairnet_margin": pytest.approx(0.8667, abs=1e-4)}
+
+    disagree = score_persons(
+        _result(model_scores={"xgb": 0.9, "transformer": 0.2}), 0.6, settings
+    )[0]
+    assert disagree["signals"] == {"model_disagreement": pytest.approx(0.7)}
+    agree = _result(model_scores={"xgb": 0.9, "transformer": 0.8})
+    assert score_persons(agree, 0.6, settings) == []
+
+    missed = score_persons(_result(cascade=0.0), 0.6, settings)[0]
+    assert missed["signals"] == {"cascade_mismatch": pytest.approx(0.8)}
+
+    switched = score_persons(
+        _result(track_id=7, hairnet_conf=0.6),
+        0.6,
+        settings,
+        tracked_objects=[{"track_id": 7, "id_switch": True}],
+    )[0]
+    assert set(switched["signals"]) == {"hairnet_margin", "id_switch"}
+    assert switched["score"] == pytest.approx(1.0)
+    assert combine_signals({"id_switch": 1.0}) == pytest.approx(0.6)
+
+
+def test_miner_enforces_interval_budget_and_dedup(tmp_path):
+    queue = ReviewQueue(str(tmp_path / "queue"))
+    settings = MiningSettings(min_interval=1.0, camera_budget=2, dedup_distance=10)
+    miner = HardExampleMiner(queue, settings, hairnet_threshold=0.6)
+    uncertain = _result(hairnet_conf=0.6)
+
+    first = miner.observe("cam1", _frame(1), uncertain, now=100.0)
+    assert first["reasons"] == {"hairnet_margin": 1.0} and len(first["crops"]) == 1
+    assert miner.observe("cam1", _frame(2), uncertain, now=100.5) is None
+    assert miner.observe("cam1", _frame(1), uncertain, now=102.0) is None
+    assert miner.observe("cam1", _frame(2), uncertain, now=104.0) is not None
+    assert miner.observe("cam1", _frame(3), uncertain, now=106.0) is None
+    # 预算按摄像头独立计算
+    assert miner.observe("cam2", _frame(3), uncertain, now=106.0) is not None
+    # 确定的帧不访问队列
+    assert miner.observe("cam2", _frame(4), _result(), now=200.0) is None
+
+    stats = miner.get_stats()
+    assert stats["queued"] == 3 and stats["throttled"] == 1
+    assert stats["duplicates"] == 1 and stats["over_budget"] == 1
+    assert stats["frames"] == 7 and stats["candidates"] == 6
+    assert queue.stats()["pending_by_camera"] == {"cam1": 2, "cam2": 1}
+
+
+def test_rejected_attempts_are_throttled_too(tmp_path, monkeypatch):
+    queue = ReviewQueue(str(tmp_path / "queue"))
+    settings = MiningSettings(min_interval=1.0, camera_budget=1)
+    miner = HardExampleMiner(queue, settings, hairnet_threshold=0.6)
+    uncertain = _result(hairnet_conf=0.6)
+    assert miner.observe("cam1", _frame(1), uncertain, now=100.0) is not None
+
+    calls = []
+    original = queue.count_since
+    monkeypatch.setattr(
+        queue, "count_since", lambda *args: calls.append(args) or original(*args)
+    )
+    assert miner.observe("cam1", _frame(2), uncertain, now=101.0) is None
+    assert miner.get_stats()["over_budget"] == 1
+    # 预算拒绝后的 min_interval 内不再访问队列
+    for i in range(1, 10):
+        assert miner.observe("cam1", _frame(2), uncertain, now=101.0 + i / 10) is None
+    assert len(calls) == 1
+    assert miner.get_stats()["throttled"] == 9
+
+
+def test_review_queue_transitions_and_export(tmp_path, monkeypatch):
+    queue = ReviewQueue(str(tmp_path / "queue"))
+    miner = HardExampleMiner(queue, MiningSettings(min_interval=0), 0.6)
+    kept = miner.observe("cam1", _frame(1), _result(hairnet_conf=0.6), now=1.0)
+    dropped = miner.observe(
+        "cam1",
+        _frame(2),
+        _result(model_scores={"xgb": 1.0, "transformer": 0.0}),
+        now=2.0,
+    )
+
+    items, total = queue.list_items(reason="model_disagreement")
+    assert total == 1 and items[0]["id"] == dropped["id"]
+
+    queue.review(dropped["id"], "rejected")
+    assert not queue.resolve(dropped["frame_path"]).exists()
+    with pytest.raises(ReviewStateError):
+        queue.review(dropped["id"], "approved")
+    with pytest.raises(ReviewItemNotFound):
+        queue.review("missing", "approved")
+
+    approved = queue.review(kept["id"], "approved", label="no_hairnet")
+    assert approved["has_violation"] and approved["reviewed_at"]
+
+    async def create(session, data):
+        return SimpleNamespace(id=data["id"], name=data["name"])
+
+    monkeypatch.setattr(dataset_generation_service.DatasetDAO, "create", create)
+    service = DatasetGenerationService(
+        None, DatasetGenerationConfig(tmp_path / "exports", tmp_path / "raw")
+    )
+    entries = [review_item_to_entry(item, queue) for item in queue.approved_items()]
+    result = asyncio.run(service.generate_from_review_queue("hard", entries, None))
+    assert result["records"] == 1 and result["files_copied"] == 1
+    with open(result["annotations_path"], encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0]["violation_type"] == "no_hairnet"
+    assert rows[0]["record_id"] == kept["id"]
+    assert (Path(result["dataset_path"]) / rows[0]["image_path"]).is_file()
+
+    assert queue.mark_exported([kept["id"]], result["dataset_id"]) == 1
+    assert queue.approved_items() == []
+    with pytest.raises(ReviewStateError):
+        queue.review(kept["id"], "rejected")
+    assert queue.stats()["by_status"] == {
+        "pending": 0,
+        "approved": 0,
+        "rejected": 1,
+        "exported": 1,
+    }
+    assert queue.purge(max_age_seconds=0) == 2
+    assert not queue.resolve(kept["frame_path"]).exists()
+
+
+def test_pending_backlog_is_bounded_and_purged(tmp_path):
+    queue = ReviewQueue(str(tmp_path / "queue"))
+    settings = MiningSettings(min_interval=0, max_pending=2)
+    miner = HardExampleMiner(queue, settings, hairnet_threshold=0.6)
+    uncertain = _result(hairnet_conf=0.6)
+
+    stale = miner.observe("cam1", _frame(1), uncertain, now=1.0)
+    assert miner.observe("cam2", _frame(2), uncertain) is not None
+    assert miner.observe("cam3", _frame(3), uncertain) is None
+    assert miner.get_stats()["queue_full"] == 1
+
+    # 长期无人审核的样本由清理任务删除，腾出队列空间
+    janitor = ReviewQueueJanitor(queue, retention_days=30, pending_max_age_days=1)
+    assert janitor.run_once() == 1
+    assert queue.get(stale["id"]) is None
+    assert not queue.resolve(stale["frame_path"]).exists()
+    assert queue.pending_count() == 1
+    assert miner.observe("cam3", _frame(3), uncertain) is not None
+
+
+def test_review_queue_endpoints(tmp_path, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from src.api.routers import mlops
+
+    queue = ReviewQueue(str(tmp_path / "queue"))
+    miner = HardExampleMiner(queue, MiningSettings(), 0.6)
+    item = miner.observe("cam1", _frame(1), _result(hairnet_conf=0.6))
+    monkeypatch.setattr(mlops, "get_review_queue", lambda: queue)
+    monkeypatch.setattr(mlops, "get_hard_example_miner", lambda: miner)
+    app = FastAPI()
+    app.include_router(mlops.router)
+    client = TestClient(app)
+    base = "/api/v1/mlops/review-queue"
+
+    listing = client.get(base).json()
+    assert listing["total"] == 1
+    view = listing["items"][0]
+    assert view["frame_url"] == f"{base}/{item['id']}/frame"
+    assert "frame_path" not in view and "phash" not in view
+    assert client.get(view["crop_urls"][0]).headers["content-type"] == "image/jpeg"
+    assert client.get(f"{base}/{item['id']}/crops/5").status_code == 404
+    assert client.get(base, params={"status": "bogus"}).status_code == 400
+
+    reviewed = client.post(f"{base}/{item['id']}/review", json={"decision": "rejected"})
+    assert reviewed.json()["status"] == "rejected"
+    assert client.get(view["frame_url"]).status_code == 404
+    conflict = client.post(f"{base}/{item['id']}/review", json={"decision": "ok"})
+    assert conflict.status_code == 409
+
+    stats = client.get(f"{base}/stats").json()
+    assert stats["by_status"]["rejected"] == 1 and stats["miner"]["queued"] == 1
+    export = client.post(f"{base}/export", json={"dataset_name": "hard"})
+    assert export.status_code == 400
@@ -0,0 +1,208 @@
+"""
+推理后端选择单元测试
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from src.detection import inference_backend as backend_module
+from src.detection.inference_backend import (
+    BACKEND_ONNX,
+    BACKEND_OPENVINO,
+    BACKEND_PYTORCH,
+    BackendSettings,
+    artifact_dir,
+    detection_agreement,
+    letterbox,
+    resolve_inference_model,
+    select_backend,
+    split_frames,
+)
+
+
+class _Boxes:
+    def __init__(self, boxes, classes, scores):
+        self.xyxy = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.cls = np.asarray(classes, dtype=np.float32)
+        self.conf = np.asarray(scores, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.cls)
+
+
+class _Result:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class FakeModel:
+    """按帧亮度返回固定检测框的模型，可模拟延迟和偏移"""
+
+    def __init__(self, delay=0.0, shift=0.0):
+        self.delay = delay
+        self.shift = shift
+
+    def __call__(self, frame, verbose=False):
+        time.sleep(self.delay)
+        x = float(frame[0, 0, 0]) + self.shift
+        return [_Result(_Boxes([[x, 10, x + 50, 110]], [0], [0.9]))]
+
+
+def _detections(boxes, classes):
+    return {
+        "boxes": np.asarray(boxes, dtype=np.float64).reshape(-1, 4),
+        "classes": np.asarray(classes, dtype=np.int64),
+        "scores": np.ones(len(classes)),
+    }
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    path = tmp_path / "yolov8n.pt"
+    path.write_bytes(b"weights-v1")
+    return path
+
+
+@pytest.fixture
+def frames():
+    return [np.full((64, 96, 3), i * 10, dtype=np.uint8) for i in range(6)]
+
+
+class TestHelpers:
+    """辅助函数测试"""
+
+    def test_artifact_dir_follows_model_hash(self, model_file, tmp_path):
+        first = artifact_dir(str(model_file), BACKEND_ONNX, True, 640, str(tmp_path))
+        assert first.name == "onnx-int8-640"
+
+        model_file.write_bytes(b"weights-v2-longer")
+        second = artifact_dir(str(model_file), BACKEND_ONNX, True, 640, str(tmp_path))
+        assert first.parent != second.parent
+
+    def test_letterbox_shape(self):
+        tensor = letterbox(np.zeros((480, 640, 3), dtype=np.uint8), 320)
+        assert tensor.shape == (1, 3, 320, 320)
+        assert tensor.dtype == np.float32
+        # 上下填充灰边
+        assert tensor[0, 0, 0, 0] == pytest.approx(114 / 255.0)
+
+    def test_split_frames_is_disjoint(self, frames):
+        calibration, holdout = split_frames(frames)
+        assert len(calibration) == 3 and len(holdout) == 3
+        assert calibration[0] is frames[0] and holdout[0] is frames[1]
+
+
+class TestDetectionAgreement:
+    """检测一致性测试"""
+
+    def test_identical_results(self):
+        dets = [_detections([[0, 0, 10, 10], [20, 20, 40, 40]], [0, 0])]
+        assert detection_agreement(dets, dets) == pytest.approx(1.0)
+
+    def test_class_mismatch_and_missing_boxes(self):
+        baseline = [_detections([[0, 0, 10, 10], [20, 20, 40, 40]], [0, 0])]
+        candidate = [_detections([[0, 0, 10, 10]], [1])]
+        assert detection_agreement(baseline, candidate) == 0.0
+
+        candidate = [_detections([[0, 0, 10, 10]], [0])]
+        assert detection_agreement(baseline, candidate) == pytest.approx(2 / 3)
+
+    def test_empty_frames_agree(self):
+        empty = [_detections(np.zeros((0, 4)), [])]
+        assert detection_agreement(empty, empty) == 1.0
+
+
+class TestSelectBackend:
+    """后端选择测试"""
+
+    def _setup(self, monkeypatch, tmp_path, models):
+        monkeypatch.setattr(
+            backend_module,
+            "available_backends",
+            lambda: [BACKEND_PYTORCH, BACKEND_ONNX, BACKEND_OPENVINO],
+        )
+        artifacts = {
+            BACKEND_ONNX: str(tmp_path / "onnx-int8-640" / "yolov8n.onnx"),
+            BACKEND_OPENVINO: str(tmp_path / "openvino-int8-640" / "m_openvino_model"),
+        }
+        for path in artifacts.values():
+            (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+            open(path, "w").close()
+        monkeypatch.setattr(
+            backend_module,
+            "ensure_artifact",
+            lambda model_path, backend, settings, calibration: artifacts[backend],
+        )
+
+        loads = []
+
+        def loader(path, task):
+            loads.append(path)
+            if path.endswith(".onnx"):
+                return models[BACKEND_ONNX]
+            if "openvino" in path:
+                return models[BACKEND_OPENVINO]
+            return models[BACKEND_PYTORCH]
+
+        return artifacts, loader, loads
+
+    def test_fastest_accurate_backend_wins_and_is_cached(
+        self, monkeypatch, tmp_path, model_file, frames
+    ):
+        models = {
+            BACKEND_PYTORCH: FakeModel(delay=0.004),
+            BACKEND_ONNX: FakeModel(delay=0.002),
+            # 最快但检测框偏移过大，精度不达标
+            BACKEND_OPENVINO: FakeModel(delay=0.0, shift=40.0),
+        }
+        artifacts, loader, loads = self._setup(monkeypatch, tmp_path, models)
+        settings = BackendSettings(
+            int8=True, cache_dir=str(tmp_path / "cache"), benchmark_runs=3
+        )
+
+        selection = select_backend(str(model_file), "detect", settings, frames, loader)
+        assert selection.backend == BACKEND_ONNX
+        assert selection.model_path == artifacts[BACKEND_ONNX]
+        assert selection.int8
+        rejected = [c for c in selection.candidates if c.get("accepted") is False]
+        assert [c["backend"] for c in rejected] == [BACKEND_OPENVINO]
+
+        # 第二次启动直接使用缓存的选择结果
+        loads.clear()
+        again = select_backend(str(model_file), "detect", settings, frames, loader)
+        assert again.backend == BACKEND_ONNX
+        assert loads == []
+
+    def test_without_frames_keeps_pytorch(self, monkeypatch, tmp_path, model_file):
+        models = {b: FakeModel() for b in (BACKEND_PYTORCH, BACKEND_ONNX)}
+        models[BACKEND_OPENVINO] = FakeModel()
+        _, loader, loads = self._setup(monkeypatch, tmp_path, models)
+        settings = BackendSettings(cache_dir=str(tmp_path / "cache"))
+
+        selection = select_backend(str(model_file), "detect", settings, [], loader)
+        assert selection.backend == BACKEND_PYTORCH
+        assert loads == []
+
+
+class TestResolveInferenceModel:
+    """模型路径解析测试"""
+
+    @pytest.mark.parametrize(
+        "backend, device", [("pytorch", "cpu"), ("onnx", "cuda"), ("auto", "mps")]
+    )
+    def test_passthrough(self, model_file, tmp_path, backend, device):
+        settings = BackendSettings(backend=backend, cache_dir=str(tmp_path))
+        assert resolve_inference_model(str(model_file), device, "detect", settings) == (
+            str(model_file)
+        )
+
+    def test_unavailable_backend_falls_back(self, monkeypatch, model_file, tmp_path):
+        monkeypatch.setattr(
+            backend_module, "available_backends", lambda: [BACKEND_PYTORCH]
+        )
+        settings = BackendSettings(backend=BACKEND_OPENVINO, cache_dir=str(tmp_path))
+        assert resolve_inference_model(str(model_file), "cpu", "detect", settings) == (
+            str(model_file)
+        )
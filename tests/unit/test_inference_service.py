@@ -0,0 +1,165 @@
+"""
+按需推理服务单元测试（合批、客户端公平、准入拒绝、截止时间、429 映射）
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.services.inference_service import (
+    InferenceDeadlineExceeded,
+    InferenceOverloaded,
+    InferenceService,
+    detect_comprehensive_batch,
+)
+
+
+class RecordingRunner:
+    """记录每次批调用的 payload；可阻塞以模拟推理耗时。"""
+
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.delay = delay
+        self.threads = set()
+
+    def __call__(self, payloads):
+        self.threads.add(threading.current_thread().name)
+        self.batches.append(list(payloads))
+        time.sleep(self.delay)
+        return [p * 10 if p >= 0 else ValueError(f"bad {p}") for p in payloads]
+
+
+def test_requests_within_window_are_batched_off_loop():
+    runner = RecordingRunner()
+
+    async def run():
+        service = InferenceService(batch_window_ms=20, max_batch_size=8)
+        results = await asyncio.gather(
+            *(service.submit(f"c{i}", runner, i) for i in range(5))
+        )
+        stats = service.get_stats()
+        await service.stop()
+        return results, stats
+
+    results, stats = asyncio.run(run())
+    assert results == [0, 10, 20, 30, 40]
+    assert runner.batches == [[0, 1, 2, 3, 4]]
+    assert all(name.startswith("inference") for name in runner.threads)
+    assert stats["batch_sizes"] == {5: 1} and stats["avg_batch_size"] == 5
+    assert stats["completed"] == 5 and stats["queue_depth"] == 0
+
+
+def test_round_robin_fairness_and_per_item_errors():
+    runner = RecordingRunner()
+
+    async def run():
+        service = InferenceService(
+            batch_window_ms=20, max_batch_size=3, max_pending_per_client=8
+        )
+        burst = [service.submit("burst", runner, i) for i in range(4)]
+        other = [
+            service.submit("other", runner, 100),
+            service.submit("bad", runner, -1),
+        ]
+        results = await asyncio.gather(*burst, *other, return_exceptions=True)
+        await service.stop()
+        return results
+
+    results = asyncio.run(run())
+    # 突发客户端只占第一批的一个位置
+    assert runner.batches[0] == [0, 100, -1]
+    assert results[:5] == [0, 10, 20, 30, 1000]
+    assert isinstance(results[5], ValueError)
+
+
+def test_overload_is_rejected_before_queueing():
+    runner = RecordingRunner(delay=0.05)
+
+    async def run():
+        service = InferenceService(
+            max_queue=3, max_pending_per_client=1, batch_window_ms=0, max_batch_size=1
+        )
+        first = asyncio.ensure_future(service.submit("a", runner, 1))
+        await asyncio.sleep(0.01)  # 第一个请求已在执行
+        queued = asyncio.ensure_future(service.submit("a", runner, 2))
+        other = asyncio.ensure_future(service.submit("b", runner, 3))
+        await asyncio.sleep(0)
+        with pytest.raises(InferenceOverloaded) as client_limit:
+            await service.submit("a", runner, 4)
+        last = asyncio.ensure_future(service.submit("d", runner, 6))
+        await asyncio.sleep(0)
+        with pytest.raises(InferenceOverloaded):
+            await service.submit("c", runner, 5)
+        results = await asyncio.gather(first, queued, other, last)
+        stats = service.get_stats()
+        await service.stop()
+        return results, client_limit.value, stats
+
+    results, error, stats = asyncio.run(run())
+    assert results == [10, 20, 30, 60]
+    assert error.retry_after >= 1
+    assert stats["rejected"]["client_limit"] == 1
+    assert stats["rejected"]["queue_full"] == 1
+    assert stats["peak_queue_depth"] == 3
+
+
+def test_deadline_expires_queued_request_and_estimate_rejects_early():
+    runner = RecordingRunner(delay=0.1)
+
+    async def run():
+        service = InferenceService(batch_window_ms=0, max_batch_size=1)
+        slow = asyncio.ensure_future(service.submit("a", runner, 1))
+        await asyncio.sleep(0.01)
+        with pytest.raises(InferenceDeadlineExceeded):
+            await service.submit("b", runner, 2, deadline=0.03)
+        await slow
+        # 已观测到批次耗时约 100ms：截止时间更短的请求在排队前被拒绝
+        blocker = asyncio.ensure_future(service.submit("a", runner, 3))
+        await asyncio.sleep(0.01)
+        with pytest.raises(InferenceOverloaded):
+            await service.submit("c", runner, 4, deadline=0.02)
+        await blocker
+        stats = service.get_stats()
+        await service.stop()
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats["expired"] == 1
+    assert stats["rejected"]["deadline"] == 1
+    assert [b for b in runner.batches] == [[1], [3]]
+
+
+def test_comprehensive_batch_isolates_failures():
+    class Pipeline:
+        def detect_comprehensive(self, image):
+            if image is None:
+                raise RuntimeError("no image")
+            return image + 1
+
+    results = detect_comprehensive_batch([(Pipeline(), 1), (Pipeline(), None)])
+    assert results[0] == 2 and isinstance(results[1], RuntimeError)
+
+
+def test_overload_maps_to_429_with_retry_after():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from src.api.routers import comprehensive
+
+    class OverloadedService:
+        async def process_image_detection(self, **kwargs):
+            assert kwargs["client_id"] == "testclient"
+            raise InferenceOverloaded("队列已满", retry_after=2.5)
+
+    app = FastAPI()
+    app.include_router(comprehensive.router)
+    app.dependency_overrides[
+        comprehensive.get_detection_app_service
+    ] = lambda: OverloadedService()
+    client = TestClient(app)
+
+    response = client.post("/image", files={"file": ("a.jpg", b"x", "image/jpeg")})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "3"
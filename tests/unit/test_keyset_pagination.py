@@ -0,0 +1,188 @@
+"""游标（keyset）分页单元测试."""
+
+import json
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.infrastructure.repositories.postgresql_alert_repository import (
+    PostgreSQLAlertRepository,
+)
+from src.infrastructure.repositories.postgresql_detection_repository import (
+    PostgreSQLDetectionRepository,
+)
+from src.utils.pagination import (
+    CursorError,
+    KeysetCursor,
+    estimate_count,
+    keyset_predicate,
+    next_cursor_for,
+)
+
+BASE = datetime(2024, 5, 1, 12, 0, 0)
+
+
+@pytest.fixture(autouse=True)
+def _cursor_secret(monkeypatch):
+    monkeypatch.setenv("PAGINATION_CURSOR_SECRET", "test-cursor-secret")
+
+
+class TestKeysetCursor:
+    def test_round_trip_preserves_types(self):
+        cursor = KeysetCursor(BASE, 42, "timestamp", True)
+        token = cursor.encode()
+
+        decoded = KeysetCursor.decode(token, "timestamp", True)
+        assert decoded == cursor
+        assert isinstance(decoded.sort_value, datetime)
+
+    def test_tampered_or_mismatched_cursor_is_rejected(self):
+        token = KeysetCursor(BASE, 42).encode()
+        signature = token.split(".")[1]
+        forged = KeysetCursor(BASE, 1).encode().split(".")[0] + "." + signature
+
+        with pytest.raises(CursorError):
+            KeysetCursor.decode(forged)
+        with pytest.raises(CursorError):
+            KeysetCursor.decode("not-a-cursor")
+        with pytest.raises(CursorError):
+            KeysetCursor.decode(token, sort_field="camera_id")
+        with pytest.raises(CursorError):
+            KeysetCursor.decode(token, descending=False)
+        with pytest.raises(CursorError):
+            KeysetCursor.decode(token, secret=b"other-secret")
+
+    def test_predicate_direction_and_placeholders(self):
+        sql, params = keyset_predicate(KeysetCursor(BASE, 7), "timestamp", "id", 3)
+        assert sql == "(timestamp, id) < ($3, $4)"
+        assert params == [BASE, 7]
+
+        sql, _ = keyset_predicate(KeysetCursor("cam1", 7, "camera_id", False), "c")
+        assert sql == "(c, id) > ($1, $2)"
+        assert keyset_predicate(None, "timestamp") == ("", [])
+
+    def test_next_cursor_only_when_extra_row_present(self):
+        rows = [{"ts": BASE - timedelta(minutes=i), "id": i} for i in range(4)]
+        key = lambda r: (r["ts"], r["id"])  # noqa: E731
+
+        assert next_cursor_for(rows[:3], 3, key) is None
+        token = next_cursor_for(rows, 3, key)
+        assert KeysetCursor.decode(token).row_id == 2
+
+    def test_lower_bound_is_carried_to_later_pages(self):
+        rows = [{"ts": BASE - timedelta(minutes=i), "id": i} for i in range(4)]
+        key = lambda r: (r["ts"], r["id"])  # noqa: E731
+        window_start = BASE - timedelta(hours=1)
+
+        token = next_cursor_for(rows, 3, key, lower_bound=window_start)
+        decoded = KeysetCursor.decode(token, "timestamp", True)
+        assert decoded.lower_bound == window_start
+        assert KeysetCursor.decode(next_cursor_for(rows, 3, key)).lower_bound is None
+
+    def test_cursors_are_disabled_without_a_shared_secret(self, monkeypatch):
+        rows = [{"ts": BASE - timedelta(minutes=i), "id": i} for i in range(4)]
+        key = lambda r: (r["ts"], r["id"])  # noqa: E731
+        token = next_cursor_for(rows, 3, key)
+
+        monkeypatch.delenv("PAGINATION_CURSOR_SECRET")
+        monkeypatch.delenv("SECRET_KEY", raising=False)
+        # 每个 worker 各自生成随机密钥会让跨 worker 的游标失效，因此不签发也不接受
+        assert next_cursor_for(rows, 3, key) is None
+        with pytest.raises(CursorError):
+            KeysetCursor.decode(token)
+
+    @pytest.mark.asyncio
+    async def test_estimate_count_reads_planner_rows(self):
+        conn = AsyncMock()
+        conn.fetchval = AsyncMock(
+            return_value=json.dumps([{"Plan": {"Plan Rows": 1234}}])
+        )
+        assert await estimate_count(conn, "SELECT id FROM t WHERE a = $1", 1) == 1234
+        assert conn.fetchval.call_args.args[0].startswith("EXPLAIN (FORMAT JSON)")
+
+        conn.fetchval = AsyncMock(side_effect=Exception("boom"))
+        assert await estimate_count(conn, "SELECT 1") == 0
+
+
+def _alert_row(i):
+    return {
+        "id": i,
+        "rule_id": None,
+        "camera_id": "cam1",
+        "alert_type": "violation",
+        "message": f"alert {i}",
+        "details": "{}",
+        "notification_sent": False,
+        "notification_channels_used": "[]",
+        "timestamp": BASE - timedelta(minutes=i),
+        "status": "pending",
+        "handled_at": None,
+        "handled_by": None,
+    }
+
+
+@pytest.mark.asyncio
+class TestAlertRepositoryKeyset:
+    def _repository(self, rows):
+        pool = MagicMock()
+        conn = AsyncMock()
+        conn.fetch = AsyncMock(return_value=rows)
+        pool.acquire = AsyncMock(return_value=conn)
+        pool.release = AsyncMock()
+        return PostgreSQLAlertRepository(pool), conn
+
+    async def test_first_page_returns_cursor_and_next_page_seeks(self):
+        repo, conn = self._repository([_alert_row(i) for i in range(1, 4)])
+
+        alerts, token = await repo.find_page(limit=2)
+        assert [a.id for a in alerts] == [1, 2]
+        sql, *args = conn.fetch.call_args.args
+        assert "ORDER BY timestamp DESC, id DESC" in sql
+        assert args[-2:] == [3, 0]  # limit + 1，offset 0
+
+        conn.fetch = AsyncMock(return_value=[_alert_row(3)])
+        alerts, next_token = await repo.find_page(limit=2, offset=500, cursor=token)
+        sql, *args = conn.fetch.call_args.args
+        assert "(timestamp, id) < ($3, $4)" in sql
+        assert "OFFSET $6" in sql
+        assert args == [None, None, _alert_row(2)["timestamp"], 2, 3, 0]
+        assert [a.id for a in alerts] == [3]
+        assert next_token is None
+
+    async def test_cursor_from_other_sort_is_rejected(self):
+        repo, conn = self._repository([])
+        token = KeysetCursor(BASE, 1, "timestamp", True).encode()
+        with pytest.raises(CursorError):
+            await repo.find_page(limit=2, cursor=token, sort_by="camera_id")
+        conn.fetch.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_violation_cursor_pages_use_seek_and_estimated_total():
+    repo = PostgreSQLDetectionRepository("postgresql://unused")
+    conn = AsyncMock()
+    conn.fetchval = AsyncMock(return_value=[{"Plan": {"Plan Rows": 900}}])
+    rows = [
+        {"id": 10 - i, "timestamp": BASE - timedelta(seconds=i), "bbox": None}
+        for i in range(3)
+    ]
+    conn.fetch = AsyncMock(return_value=rows)
+    repo._get_connection = AsyncMock(return_value=conn)
+
+    token = KeysetCursor(BASE + timedelta(seconds=1), 11).encode()
+    result = await repo.get_violations(
+        camera_id="cam1", violation_type="no_hairnet", limit=2, cursor=token
+    )
+
+    sql, *args = conn.fetch.call_args.args
+    assert "(timestamp, id) < ($3, $4)" in sql
+    assert "ORDER BY timestamp DESC, id DESC" in sql
+    assert args[-2:] == [3, 0]
+    assert "COUNT(*)" not in conn.fetchval.call_args.args[0]
+    assert result["total"] == 900 and result["total_is_estimate"] is True
+    assert [v["id"] for v in result["violations"]] == [10, 9]
+    assert KeysetCursor.decode(result["next_cursor"]).row_id == 9
+
+    with pytest.raises(CursorError):
+        await repo.get_violations(cursor="bogus")
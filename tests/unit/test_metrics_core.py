@@ -0,0 +1,178 @@
+"""
+可合并指标核心单元测试（分位数误差界、跨进程合并、时间窗口汇总、Prometheus 输出）
+"""
+
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from src.monitoring.advanced_monitoring import MetricCollector, MetricData
+from src.monitoring.metrics_core import (
+    LogHistogram,
+    MetricsRegistry,
+    RollupHistogram,
+    collect_snapshots,
+    merge_snapshots,
+    publish_snapshot,
+    render_prometheus,
+)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _latencies(seed, n=20000):
+    rng = np.random.default_rng(seed)
+    return rng.lognormal(mean=-3.0, sigma=0.8, size=n)
+
+
+def test_quantiles_stay_within_relative_error():
+    values = _latencies(1)
+    hist = LogHistogram(0.01)
+    for v in values:
+        hist.record(float(v))
+    hist.record(0.0)
+
+    for q in (0.5, 0.9, 0.95, 0.99):
+        exact = np.quantile(np.append(values, 0.0), q, method="lower")
+        assert abs(hist.quantile(q) - exact) <= 0.01 * exact
+    assert hist.quantile(0.0) == 0.0
+    assert hist.count == len(values) + 1
+    assert hist.sum == pytest.approx(values.sum())
+    stats = hist.stats()
+    assert stats["max"] == pytest.approx(values.max(), rel=0.01)
+    assert stats["std"] == pytest.approx(values.std(), rel=0.02)
+    assert LogHistogram().quantile(0.5) is None and LogHistogram().stats() == {}
+
+
+def test_merge_equals_recording_everything_in_one_histogram():
+    a, b = _latencies(2, 5000), _latencies(3, 7000)
+    left, right, combined = LogHistogram(), LogHistogram(), LogHistogram()
+    for v in a:
+        left.record(float(v))
+        combined.record(float(v))
+    for v in b:
+        right.record(float(v))
+        combined.record(float(v))
+
+    restored = LogHistogram.from_dict(json.loads(json.dumps(right.to_dict())))
+    merged = left.copy().merge(restored)
+    assert dict(merged.buckets) == dict(combined.buckets)
+    assert merged.count == combined.count
+    assert merged.quantile(0.99) == combined.quantile(0.99)
+    with pytest.raises(ValueError):
+        merged.merge(LogHistogram(0.02))
+
+    bounded = LogHistogram(max_buckets=10)
+    for v in _latencies(4, 1000):
+        bounded.record(float(v))
+    p99 = bounded.quantile(0.99)
+    bounded.compact()
+    assert len(bounded.buckets) == 10 and bounded.quantile(0.99) == p99
+
+
+def test_rollup_windows_expire_with_clock():
+    clock = FakeClock()
+    hist = RollupHistogram(clock=clock)
+    hist.record(1.0)
+    clock.now += 30
+    hist.record(2.0)
+    assert hist.window("1m").count == 2
+
+    clock.now += 100
+    hist.record(3.0)
+    assert hist.window("1m").count == 1
+    assert hist.window("5m").count == 3
+
+    clock.now += 3700
+    assert hist.window("1h").count == 0
+    assert hist.total().count == 3
+    assert hist.total().sum == pytest.approx(6.0)
+    assert len(hist._tiers[0]) <= hist._tiers[0].maxlen
+    with pytest.raises(ValueError):
+        hist.window("1d")
+
+
+def test_prometheus_merges_snapshots_across_processes():
+    processes = []
+    for seed, camera in ((5, "cam1"), (6, "cam2")):
+        registry = MetricsRegistry()
+        latency = registry.histogram(
+            "hbd_detection_latency_seconds", {"camera": camera}, "检测耗时"
+        )
+        for v in _latencies(seed, 2000):
+            latency.record(float(v))
+        registry.counter("hbd_frames_detected_total", {"camera": camera}).inc(2000)
+        processes.append(registry)
+
+    class FakeRedis:
+        def __init__(self):
+            self.store = {}
+
+        def set(self, key, value, ex=None):
+            self.store[key] = value
+
+    redis = FakeRedis()
+    for i, registry in enumerate(processes):
+        publish_snapshot(redis, f"worker-{i}", registry)
+    snapshots = [json.loads(raw) for raw in redis.store.values()]
+    text = render_prometheus(snapshots)
+
+    assert "# TYPE hbd_detection_latency_seconds summary" in text
+    assert 'hbd_frames_detected_total{camera="cam1"} 2000.0' in text
+    assert 'hbd_detection_latency_seconds_count{camera="cam2"} 2000' in text
+    assert (
+        'hbd_detection_latency_seconds{camera="cam1",window="1m",quantile="0.99"}'
+        in text
+    )
+    assert "hbd_detection_latency_seconds_all_count 4000" in text
+
+    family = merge_snapshots(snapshots)["hbd_detection_latency_seconds"]
+    fleet = LogHistogram()
+    for series in family["series"].values():
+        fleet.merge(series["total"])
+    exact = np.quantile(
+        np.concatenate([_latencies(5, 2000), _latencies(6, 2000)]), 0.95, method="lower"
+    )
+    assert abs(fleet.quantile(0.95) - exact) <= 0.01 * exact
+
+    class AsyncRedis:
+        async def scan_iter(self, match):
+            for key in redis.store:
+                yield key
+
+        async def get(self, key):
+            return redis.store[key]
+
+    collected = asyncio.run(collect_snapshots(AsyncRedis(), MetricsRegistry()))
+    assert len(collected) == 3
+
+
+def test_metric_collector_reads_stats_from_rollups():
+    collector = MetricCollector(max_samples=4, registry=MetricsRegistry())
+    for i in range(1, 101):
+        collector.record_metric(
+            MetricData(name="app.requests.response_time", value=float(i))
+        )
+    collector.record_metric(
+        MetricData(
+            name="app.requests.response_time", value=200.0, labels={"path": "/x"}
+        )
+    )
+
+    stats = collector.get_metric_stats("app.requests.response_time", 3600)
+    assert stats["count"] == 101
+    assert stats["median"] == pytest.approx(51, rel=0.01)
+    assert stats["max"] == pytest.approx(200, rel=0.01)
+    assert len(collector.get_metric("app.requests.response_time")) == 4
+    assert collector.get_latest_metric("app.requests.response_time").value == 200.0
+    assert collector.get_metric_stats("missing") == {}
+    family = collector.registry.snapshot()["metrics"]
+    assert {m["name"] for m in family} == {"hbd_app_requests_response_time"}
@@ -0,0 +1,313 @@
+"""
+模型热切换单元测试
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.application.model_rollout import (
+    STATE_READY,
+    STATE_SHADOW,
+    ModelRolloutManager,
+    RolloutSettings,
+    extract_boxes,
+)
+
+
+class FakeDetector:
+    """按帧亮度返回固定人体框的检测器"""
+
+    def __init__(self, name, shift=0.0, fail=False):
+        self.name = name
+        self.shift = shift
+        self.fail = fail
+        self.calls = 0
+
+    def detect(self, image):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("broken weights")
+        x = float(image[0, 0, 0]) + self.shift
+        return [
+            {"bbox": [x, 0, x + 50, 100], "confidence": 0.9, "class_name": "person"}
+        ]
+
+
+class FakePipeline:
+    def __init__(self, detector):
+        self.human_detector = detector
+        self.hairnet_detector = None
+        self.cache_clears = 0
+
+    def update_models(self, human_detector=None, **kwargs):
+        if human_detector is not None:
+            self.human_detector = human_detector
+        self.cache_clears += 1
+
+
+def _frames(count=6):
+    return [np.full((32, 32, 3), i * 20, dtype=np.uint8) for i in range(count)]
+
+
+def _manager(pipeline, candidate, **overrides):
+    settings = RolloutSettings(
+        shadow_sample_rate=1.0, shadow_min_frames=3, warmup_runs=2, **overrides
+    )
+    loads = []
+
+    def loader(task, model_path, reference):
+        loads.append((task, model_path, reference))
+        return candidate
+
+    return ModelRolloutManager(pipeline, "cam1", settings, loader), loads
+
+
+def _stage(manager, model_path="models/v2.pt", task="human_detection"):
+    return asyncio.run(manager.stage(task, model_path, "m2", "v2"))
+
+
+def _result(live, frame, seconds=0.02):
+    """检测循环的结果：管道记录的在线模型原始输出"""
+    output = SimpleNamespace(
+        method="detect", args=(), kwargs={}, output=live.detect(frame), seconds=seconds
+    )
+    return SimpleNamespace(model_outputs={"human_detection": output})
+
+
+class TestModelRollout:
+    """热切换流程测试"""
+
+    def test_warmup_shadow_then_swap_between_frames(self):
+        live = FakeDetector("v1")
+        candidate = FakeDetector("v2", shift=1.0)
+        pipeline = FakePipeline(live)
+        manager, loads = _manager(pipeline, candidate)
+
+        frames = _frames()
+        for frame in frames[:4]:
+            manager.before_frame(frame)
+        staged = _stage(manager)
+
+        assert loads[0][2] is live
+        assert staged.state == STATE_SHADOW
+        assert len(staged.warmup_ms) == 2
+
+        for frame in frames[:3]:
+            manager.before_frame(frame)
+            assert pipeline.human_detector is live
+            manager.after_frame(frame, _result(live, frame))
+            manager.wait_shadow()
+        assert staged.state == STATE_READY
+        # 切换只发生在下一帧开始前
+        assert pipeline.human_detector is live
+
+        manager.before_frame(frames[3])
+        assert pipeline.human_detector is candidate
+        assert pipeline.cache_clears == 1
+        assert manager.get_status()["rollback_available"] == ["human_detection"]
+
+    def test_rejects_on_low_agreement(self):
+        live = FakeDetector("v1")
+        pipeline = FakePipeline(live)
+        manager, _ = _manager(pipeline, FakeDetector("v2", shift=200.0))
+        _stage(manager)
+
+        for frame in _frames(4):
+            manager.before_frame(frame)
+            manager.after_frame(frame, _result(live, frame))
+            manager.wait_shadow()
+
+        assert pipeline.human_detector is live
+        status = manager.get_status()
+        assert status["candidates"] == {}
+        assert status["history"][-1]["state"] == "rejected"
+        assert "一致性不足" in status["history"][-1]["reason"]
+
+    def test_shadow_reuses_live_result_off_the_loop(self):
+        live = FakeDetector("v1")
+        candidate = FakeDetector("v2", shift=1.0)
+        pipeline = FakePipeline(live)
+        manager, _ = _manager(pipeline, candidate)
+        manager.before_frame(_frames(1)[0])
+        staged = _stage(manager)
+
+        for frame in _frames(3):
+            manager.before_frame(frame)
+            manager.after_frame(frame, _result(live, frame))
+            manager.wait_shadow()
+        # 没有在线原始输出的帧不抽样，也不在影子线程调用在线检测器
+        manager.after_frame(_frames(1)[0])
+        manager.after_frame(_frames(1)[0], SimpleNamespace(model_outputs={}))
+
+        # 在线输出来自检测结果，只有影子线程调用了候选模型
+        assert live.calls == 3 and candidate.calls == 1 + 3
+        assert staged.live_ms == [20.0] * 3
+        assert staged.state == STATE_READY
+        asyncio.run(manager.stop())
+
+    def test_shadow_replays_the_recorded_hairnet_call(self):
+        class FakeHairnet(FakeDetector):
+            def detect_hairnet_compliance(self, image, persons):
+                self.calls += 1
+                self.persons = persons
+                return {
+                    "detections": [
+                        {"bbox": p["bbox"], "has_hairnet": self.name == "v1"}
+                        for p in persons
+                    ]
+                }
+
+        live_hairnet = FakeHairnet("v1")
+        candidate = FakeHairnet("v2")
+        pipeline = FakePipeline(FakeDetector("human"))
+        pipeline.hairnet_detector = live_hairnet
+        manager, _ = _manager(pipeline, candidate)
+        staged = _stage(manager, task="hairnet_detection")
+        assert staged.state == STATE_SHADOW
+
+        persons = [{"bbox": [0, 0, 10, 20]}]
+        for frame in _frames(3):
+            manager.before_frame(frame)
+            recorded = SimpleNamespace(
+                method="detect_hairnet_compliance",
+                args=(persons,),
+                kwargs={},
+                output=live_hairnet.detect_hairnet_compliance(frame, persons),
+                seconds=0.01,
+            )
+            result = SimpleNamespace(model_outputs={"hairnet_detection": recorded})
+            manager.after_frame(frame, result)
+            manager.wait_shadow()
+
+        # 候选模型使用与在线模型相同的人员输入，佩戴判断不一致即视为不一致
+        assert live_hairnet.calls == 3 and candidate.calls == 3
+        assert candidate.persons is persons
+        assert manager.get_status()["history"][-1]["state"] == "rejected"
+        asyncio.run(manager.stop())
+
+    def test_rejects_failed_load(self):
+        pipeline = FakePipeline(FakeDetector("v1"))
+        manager, _ = _manager(pipeline, FakeDetector("v2", fail=True))
+        manager.before_frame(_frames(1)[0])
+        staged = _stage(manager)
+        assert staged.state == "rejected"
+        assert "预热失败" in staged.reason
+
+    def test_no_shadow_swaps_after_warmup(self):
+        live = FakeDetector("v1")
+        candidate = FakeDetector("v2")
+        pipeline = FakePipeline(live)
+        manager, _ = _manager(pipeline, candidate)
+        manager.settings.shadow_sample_rate = 0.0
+
+        _stage(manager)
+        manager.before_frame(_frames(1)[0])
+        assert pipeline.human_detector is candidate
+
+    def test_instant_rollback(self):
+        live = FakeDetector("v1")
+        candidate = FakeDetector("v2")
+        pipeline = FakePipeline(live)
+        manager, _ = _manager(pipeline, candidate)
+        manager.settings.shadow_sample_rate = 0.0
+        _stage(manager)
+        manager.before_frame(_frames(1)[0])
+
+        asyncio.run(
+            manager.handle_event(
+                {
+                    "type": "model_activation",
+                    "action": "rollback",
+                    "detection_task": "human_detection",
+                }
+            )
+        )
+        assert pipeline.human_detector is live
+        # 再次回滚回到新模型
+        assert manager.rollback("human_detection")
+        assert pipeline.human_detector is candidate
+
+    def test_events_for_other_cameras_are_ignored(self):
+        pipeline = FakePipeline(FakeDetector("v1"))
+        manager, loads = _manager(pipeline, FakeDetector("v2"))
+        asyncio.run(
+            manager.handle_event(
+                {
+                    "type": "model_activation",
+                    "detection_task": "human_detection",
+                    "model_path": "models/v2.pt",
+                    "camera_id": "other",
+                }
+            )
+        )
+        assert loads == []
+
+    def test_unknown_task(self):
+        manager, _ = _manager(FakePipeline(FakeDetector("v1")), None)
+        with pytest.raises(ValueError):
+            asyncio.run(manager.stage("unknown", "x.pt"))
+
+
+def test_extract_boxes_handles_hairnet_output():
+    boxes = extract_boxes(
+        {"detections": [{"bbox": [1, 2, 3, 4], "class": "hairnet", "confidence": 0.5}]}
+    )
+    assert boxes["boxes"].shape == (1, 4)
+    assert list(boxes["classes"]) == ["hairnet"]
+    assert extract_boxes([])["boxes"].shape == (0, 4)
+
+
+def test_promoting_model_status_publishes_activation(monkeypatch):
+    from contextlib import asynccontextmanager
+
+    import src.infrastructure.notifications as notifications
+    from src.application import model_registry_service as registry_module
+
+    record = SimpleNamespace(status="staging")
+    row = {
+        "id": "m2",
+        "model_type": "human_detection",
+        "model_path": "models/v2.pt",
+        "version": "v2",
+    }
+    record.to_dict = lambda: {**row, "status": record.status}
+
+    class FakeDAO:
+        @staticmethod
+        async def get_by_id(session, model_id):
+            return record
+
+        @staticmethod
+        async def update(session, model_id, data):
+            record.status = data["status"]
+            return record
+
+    @asynccontextmanager
+    async def session_factory():
+        yield None
+
+    published = []
+
+    async def publish(**kwargs):
+        published.append(kwargs)
+        return True
+
+    monkeypatch.setattr(registry_module, "ModelRegistryDAO", FakeDAO)
+    monkeypatch.setattr(registry_module, "AsyncSessionLocal", session_factory)
+    monkeypatch.setattr(notifications, "publish_model_activation_async", publish)
+
+    service = registry_module.ModelRegistryService()
+    asyncio.run(service.update_status("m2", "active"))
+    asyncio.run(service.update_status("m2", "active"))
+    asyncio.run(service.update_status("m2", "archived"))
+    assert published == [
+        {
+            "detection_task": "human_detection",
+            "model_path": "models/v2.pt",
+            "model_id": "m2",
+            "version": "v2",
+        }
+    ]
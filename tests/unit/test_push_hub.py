@@ -0,0 +1,172 @@
+"""
+实时推送中心单元测试（主题过滤、最新值覆盖、丢弃计数、单一事件生产者、慢客户端隔离）
+"""
+
+import asyncio
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.services.push_hub import (
+    TOPIC_ALERTS,
+    TOPIC_EVENTS,
+    TOPIC_STATUS,
+    ClientQueue,
+    PushHub,
+    Subscription,
+    split_param,
+)
+
+
+def _texts(queue):
+    return [json.loads(t) for t in queue.drain()]
+
+
+def test_status_topic_keeps_latest_value_per_camera():
+    async def run():
+        hub = PushHub()
+        queue = hub.register("c1", Subscription.create([TOPIC_STATUS]))
+        only_cam2 = hub.register("c2", Subscription.create([TOPIC_STATUS], ["cam2"]))
+        for i in range(5):
+            hub.publish_status("cam1", {"fps": i})
+        hub.publish_status("cam2", {"fps": 9})
+        return hub, queue, only_cam2
+
+    hub, queue, only_cam2 = asyncio.run(run())
+    messages = _texts(queue)
+    assert [(m["camera_id"], m["data"]["fps"]) for m in messages] == [
+        ("cam1", 4),
+        ("cam2", 9),
+    ]
+    assert queue.stats["conflated"] == 4
+    assert [m["camera_id"] for m in _texts(only_cam2)] == ["cam2"]
+    assert hub.get_stats()["topics"]["status"] == {"published": 6, "subscribers": 2}
+
+
+def test_event_topic_drops_oldest_and_reports_gap():
+    queue = ClientQueue(Subscription.create([TOPIC_EVENTS], None, ["violation"]), 3)
+    hub = PushHub()
+    hub._clients["c"] = queue
+    for i in range(5):
+        hub.publish_event({"type": "violation", "seq": i, "camera_id": "cam1"})
+    hub.publish_event({"type": "heartbeat", "seq": 99})
+
+    messages = _texts(queue)
+    assert messages[0] == {"type": "dropped", "topic": "events", "count": 2}
+    assert [m["data"]["seq"] for m in messages[1:]] == [2, 3, 4]
+    assert queue.stats["dropped"] == 2
+    # 丢弃通知只发送一次
+    hub.publish_event({"type": "violation", "seq": 5})
+    assert [m["type"] for m in _texts(queue)] == ["event"]
+
+
+def test_subscription_validation_and_alert_filter():
+    assert split_param(" a, ,b ") == ["a", "b"]
+    try:
+        Subscription.create(["status", "bogus"])
+    except ValueError as e:
+        assert "bogus" in str(e)
+    else:
+        raise AssertionError("未知主题应被拒绝")
+
+    sub = Subscription.create([TOPIC_ALERTS], ["cam1"])
+    queue = ClientQueue(sub)
+    hub = PushHub()
+    hub._clients["c"] = queue
+    hub.publish_alert({"rule_name": "cpu", "severity": "high"})  # 无摄像头的全局告警
+    hub.publish_alert({"rule_name": "fps", "camera_id": "cam2"})
+    assert [m["data"]["rule_name"] for m in _texts(queue)] == ["cpu"]
+
+
+def test_event_log_has_single_tailer_for_all_clients(tmp_path):
+    events_file = tmp_path / "events_record.jsonl"
+    events_file.write_text('{"type": "old"}\n')
+
+    async def run():
+        hub = PushHub(events_file=str(events_file), events_poll_interval=0.01)
+        queues = [
+            hub.register(f"c{i}", Subscription.create([TOPIC_EVENTS])) for i in range(3)
+        ]
+        tailer_task = hub._tailer_task
+        await asyncio.sleep(0.05)
+        with open(events_file, "a") as f:
+            f.write('{"type": "violation", "camera_id": "cam1"}\n{"type": "par')
+        await asyncio.sleep(0.05)
+        with open(events_file, "a") as f:
+            f.write('tial"}\nnot json\n')
+        await asyncio.sleep(0.05)
+        # 文件被截断（日志轮转）后从头读取
+        events_file.write_text('{"type": "rotated"}\n')
+        await asyncio.sleep(0.05)
+        assert hub._tailer_task is tailer_task
+        stats = hub.get_stats()
+        await hub.stop()
+        return queues, stats
+
+    queues, stats = asyncio.run(run())
+    for queue in queues:
+        assert [m["data"]["type"] for m in _texts(queue)] == [
+            "violation",
+            "partial",
+            "rotated",
+        ]
+    assert stats["topics"]["events"]["published"] == 3
+    assert stats["event_log"]["invalid"] == 1
+
+
+def test_slow_client_does_not_delay_others():
+    async def run():
+        hub = PushHub()
+        hub.register("slow", Subscription.create([TOPIC_STATUS]))
+        hub.register("fast", Subscription.create([TOPIC_STATUS]))
+        received = {"slow": [], "fast": []}
+        release = asyncio.Event()
+
+        async def slow_send(text):
+            await release.wait()
+            received["slow"].append(json.loads(text))
+
+        async def fast_send(text):
+            received["fast"].append(json.loads(text))
+
+        pumps = [
+            asyncio.create_task(hub.pump("slow", slow_send)),
+            asyncio.create_task(hub.pump("fast", fast_send)),
+        ]
+        for i in range(10):
+            hub.publish_status("cam1", {"seq": i})
+            await asyncio.sleep(0.01)
+        fast_seen = [m["data"]["seq"] for m in received["fast"]]
+        release.set()
+        await asyncio.sleep(0.02)
+        hub.unregister("slow")
+        hub.unregister("fast")
+        for task in pumps:
+            task.cancel()
+        await asyncio.gather(*pumps, return_exceptions=True)
+        return fast_seen, [m["data"]["seq"] for m in received["slow"]]
+
+    fast_seen, slow_seen = asyncio.run(run())
+    assert fast_seen == list(range(10))
+    # 慢客户端只收到第一条和积压期间的最新状态
+    assert slow_seen == [0, 9]
+
+
+def test_push_endpoint_handles_ping_and_rejects_unknown_topics():
+    from src.api.routers import websocket as ws_router
+
+    app = FastAPI()
+    app.include_router(ws_router.router)
+    client = TestClient(app)
+
+    with client.websocket_connect("/ws/push?topics=status&camera_id=cam1") as ws:
+        snapshot = ws.receive_json()
+        assert snapshot["type"] == "status_update"
+        ws.send_text(json.dumps({"type": "ping"}))
+        assert ws.receive_json() == {"type": "pong"}
+        ws.send_text(json.dumps({"type": "subscribe", "topics": ["alerts"]}))
+        assert ws.receive_json() == {"type": "subscribed", "topics": ["alerts"]}
+
+    with client.websocket_connect("/ws/push?topics=bogus") as ws:
+        assert ws.receive_json()["type"] == "error"
@@ -0,0 +1,175 @@
+"""
+录像回放压测工具单元测试
+"""
+
+import asyncio
+import copy
+import os
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from src.application.replay_harness import (
+    ReplayHarness,
+    ReplaySource,
+    StageTimer,
+    compare_outputs,
+    compare_reports,
+)
+from src.core.optimized_detection_pipeline import DetectionResult
+
+
+class FakePipeline:
+    """按帧亮度返回固定人员框的检测管线"""
+
+    def __init__(self, delay=0.0, shift=0):
+        self.delay = delay
+        self.shift = shift
+        self.calls = 0
+
+    def detect_comprehensive(self, image, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        x = int(image[0, 0, 0]) + self.shift
+        return DetectionResult(
+            person_detections=[
+                {"bbox": [x, 10, x + 40, 90], "confidence": 0.9, "class_name": "person"}
+            ],
+            hairnet_results=[{"has_hairnet": x % 20 == 0, "bbox": [x, 10, x + 40, 30]}],
+            handwash_results=[],
+            sanitize_results=[],
+            processing_times={"person_detection": self.delay, "total": self.delay},
+            annotated_image=image,
+        )
+
+
+@pytest.fixture
+def frames_dir(tmp_path):
+    directory = tmp_path / "frames"
+    directory.mkdir()
+    for i in range(8):
+        frame = np.full((96, 128, 3), i * 10, dtype=np.uint8)
+        cv2.imwrite(str(directory / f"{i:04d}.png"), frame)
+    return directory
+
+
+def _run(harness, name="replay"):
+    return asyncio.run(harness.run(name=name))
+
+
+class TestReplaySource:
+    """回放源测试"""
+
+    def test_reads_image_sequence_and_stops(self, frames_dir):
+        exhausted = []
+        source = ReplaySource(str(frames_dir), on_exhausted=lambda: exhausted.append(1))
+        assert source.get(cv2.CAP_PROP_FRAME_COUNT) == 8
+        assert source.get(cv2.CAP_PROP_FRAME_WIDTH) == 128
+
+        count = 0
+        while True:
+            ok, frame = source.read()
+            if not ok:
+                break
+            assert frame[0, 0, 0] == count * 10
+            count += 1
+        assert count == 8 and exhausted == [1]
+
+    def test_max_frames(self, frames_dir):
+        source = ReplaySource(str(frames_dir), max_frames=3)
+        assert source.get(cv2.CAP_PROP_FRAME_COUNT) == 3
+        assert [source.read()[0] for _ in range(4)] == [True, True, True, False]
+
+    def test_fixed_fps_drops_late_frames(self, frames_dir):
+        source = ReplaySource(str(frames_dir), fps=100)
+        assert source.read()[0]
+        # 模拟处理耗时超过多个帧间隔
+        time.sleep(0.045)
+        assert source.read()[0]
+        assert source.frames_dropped >= 3
+        assert source.last_index == source.frames_dropped + 1
+
+
+class TestStageTimer:
+    """阶段耗时统计测试"""
+
+    def test_percentiles(self):
+        timer = StageTimer()
+        for value in range(1, 101):
+            timer.record("stage", float(value))
+        stats = timer.summary()["stage"]
+        assert stats["count"] == 100
+        assert stats["p50_ms"] == pytest.approx(50.5)
+        assert stats["p99_ms"] == pytest.approx(99.01)
+        assert stats["max_ms"] == 100.0
+
+
+class TestReplayHarness:
+    """回放运行测试"""
+
+    def test_runs_real_loop_with_stand_ins(self, frames_dir, monkeypatch):
+        monkeypatch.setenv("REDIS_URL", "redis://unused:6379/0")
+        pipeline = FakePipeline()
+        harness = ReplayHarness(pipeline, str(frames_dir))
+
+        report = _run(harness)
+
+        assert report["frames"] == {"read": 8, "processed": 8, "dropped": 0}
+        # 应用服务会再次调用检测，输出只记录每帧第一次结果
+        assert [o["frame"] for o in report["outputs"]] == list(range(8))
+        assert report["outputs"][2]["persons"] == [[20, 10, 60, 90]]
+        assert report["outputs"][2]["hairnet"] == [True]
+        for stage in ("frame_total", "detect_comprehensive", "app_service"):
+            assert report["stages"][stage]["count"] >= 8
+        assert "pipeline.person_detection" in report["stages"]
+        assert report["stand_ins"]["stream_frames"] == 8
+        # 运行期间隔离Redis，结束后恢复
+        assert os.environ["REDIS_URL"] == "redis://unused:6379/0"
+
+    def test_log_interval_skips_detection(self, frames_dir):
+        harness = ReplayHarness(
+            FakePipeline(), str(frames_dir), log_interval=2, with_app_service=False
+        )
+        report = _run(harness)
+        assert report["frames"]["processed"] == 4
+        assert [o["frame"] for o in report["outputs"]] == [1, 3, 5, 7]
+
+
+class TestComparison:
+    """基准对比测试"""
+
+    def test_identical_outputs(self, frames_dir):
+        report = _run(ReplayHarness(FakePipeline(), str(frames_dir)))
+        diff = compare_outputs(report["outputs"], report["outputs"])
+        assert diff["frames_changed"] == 0
+        assert diff["mean_person_iou"] == pytest.approx(1.0)
+
+    def test_output_diff_detects_moved_boxes(self, frames_dir):
+        golden = _run(ReplayHarness(FakePipeline(), str(frames_dir)))
+        moved = _run(ReplayHarness(FakePipeline(shift=30), str(frames_dir)))
+        diff = compare_outputs(golden["outputs"], moved["outputs"])
+        assert diff["frames_changed"] == 8
+        assert "bbox moved" in diff["examples"][0]["reasons"]
+
+    def test_latency_regression(self):
+        baseline = {
+            "throughput": {"processed_fps": 100.0},
+            "stages": {
+                "frame_total": {"p50_ms": 10.0, "p90_ms": 12.0},
+                "tiny": {"p50_ms": 0.01, "p90_ms": 0.02},
+            },
+            "resources": {"rss_max_mb": 500.0},
+            "outputs": [],
+        }
+        current = copy.deepcopy(baseline)
+        current["stages"]["tiny"] = {"p50_ms": 0.2, "p90_ms": 0.3}
+        assert compare_reports(baseline, current)["ok"]
+
+        current["throughput"]["processed_fps"] = 80.0
+        current["stages"]["frame_total"]["p50_ms"] = 13.0
+        result = compare_reports(baseline, current, tolerance=0.1)
+        assert not result["ok"]
+        assert any(r.startswith("processed_fps") for r in result["regressions"])
+        assert any(r.startswith("frame_total.p50_ms") for r in result["regressions"])
@@ -0,0 +1,211 @@
+"""
+ROI拼图打包单元测试
+"""
+
+import numpy as np
+
+from src.detection.pose_detector import YOLOv8PoseDetector
+from src.detection.roi_packer import RoiPacker, crop_quality
+
+
+class _Tensor:
+    """模拟 ultralytics 结果中的张量（支持 cpu().numpy() / item()）"""
+
+    def __init__(self, value):
+        self.value = np.asarray(value, dtype=np.float32)
+
+    def __getitem__(self, index):
+        return _Tensor(self.value[index])
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.value
+
+    def item(self):
+        return float(self.value)
+
+
+class _Box:
+    def __init__(self, xyxy, conf=0.9):
+        self.cls = _Tensor([0])
+        self.conf = _Tensor([conf])
+        self.xyxy = _Tensor([xyxy])
+
+
+class _Keypoints:
+    def __init__(self, xy):
+        self.xy = _Tensor([xy])
+        self.conf = _Tensor([np.ones(len(xy))])
+
+
+class _Result:
+    def __init__(self, poses):
+        self.boxes = [_Box(bbox) for bbox, _ in poses]
+        self.keypoints = [_Keypoints(xy) for _, xy in poses]
+
+
+class FakePoseModel:
+    """在每个拼图单元中心返回一个姿态（坐标为画布坐标）"""
+
+    def __init__(self, packer):
+        self.packer = packer
+        self.calls = []
+
+    def __call__(self, images, **kwargs):
+        self.calls.append(len(images))
+        results = []
+        for canvas in self._canvases:
+            poses = []
+            for p in canvas.placements:
+                ox, oy = p.offset
+                w, h = p.size
+                bbox = [ox + 2, oy + 2, ox + w - 2, oy + h - 2]
+                poses.append((bbox, [[ox + w / 2, oy + h / 2]]))
+            results.append(_Result(poses))
+        return results
+
+
+def _frame():
+    rng = np.random.default_rng(0)
+    return rng.integers(40, 220, size=(720, 1280, 3), dtype=np.uint8)
+
+
+class TestRoiPacker:
+    def test_pack_and_unpack_round_trip(self):
+        packer = RoiPacker(canvas_size=640, min_cell_side=160)
+        boxes = [(100, 50, 220, 350), (400, 100, 500, 380), (900, 200, 1000, 500)]
+        canvases = packer.pack(_frame(), boxes)
+
+        assert len(canvases) == 1
+        canvas = canvases[0]
+        assert canvas.image.shape == (640, 640, 3)
+        # 竖长ROI应选择列多于行的网格
+        assert canvas.grid[0] >= canvas.grid[1]
+
+        detections = []
+        for p in canvas.placements:
+            ox, oy = p.offset
+            w, h = p.size
+            detections.append(
+                {
+                    "bbox": [ox, oy, ox + w, oy + h],
+                    "keypoints": {"xy": np.array([[ox, oy], [ox + w, oy + h]])},
+                }
+            )
+        # letterbox 填充区域中的检测被丢弃
+        detections.append({"bbox": [0, 0, 1, 1]})
+        mapped = packer.unpack(canvas, detections)
+
+        assert [m["roi_index"] for m in mapped] == [0, 1, 2]
+        for m, box in zip(mapped, boxes):
+            np.testing.assert_allclose(m["bbox"], box, atol=1.0)
+            np.testing.assert_allclose(
+                m["keypoints"]["xy"], [box[:2], box[2:]], atol=1.0
+            )
+
+        stats = packer.last_stats
+        assert stats["roi_count"] == 3
+        assert stats["inference_calls"] == 1
+        assert stats["saved_inference_calls"] == 2
+        assert 0.0 < stats["packing_efficiency"] <= 1.0
+
+    def test_splits_when_rois_exceed_canvas_capacity(self):
+        packer = RoiPacker(canvas_size=320, min_cell_side=160)
+        boxes = [(i * 60, 0, i * 60 + 50, 120) for i in range(6)]
+        canvases = packer.pack(_frame(), boxes)
+        assert [len(c.placements) for c in canvases] == [4, 2]
+        assert packer.get_stats()["saved_inference_calls"] == 4
+
+    def test_enhancement_only_for_low_quality_crops(self):
+        frame = _frame()
+        frame[0:200, 0:100] = 8  # 过暗、无对比度
+        assert crop_quality(frame[0:200, 0:100]) < 0.1
+
+        packer = RoiPacker()
+        canvas = packer.pack(
+            frame, [(0, 0, 100, 200), (300, 0, 400, 200)], enhance_low_quality=True
+        )[0]
+        assert [p.enhanced for p in canvas.placements] == [True, False]
+        assert packer.last_stats["enhanced_rois"] == 1
+
+
+def _detector(packer):
+    detector = YOLOv8PoseDetector.__new__(YOLOv8PoseDetector)
+    detector.roi_packer = packer
+    detector.confidence_threshold = 0.25
+    detector.iou_threshold = 0.45
+    detector.model = FakePoseModel(packer)
+    return detector
+
+
+def test_batch_pose_detection_uses_single_inference():
+    packer = RoiPacker()
+    detector = _detector(packer)
+    original_pack = packer.pack
+
+    def pack(*args, **kwargs):
+        canvases = original_pack(*args, **kwargs)
+        detector.model._canvases = canvases
+        return canvases
+
+    packer.pack = pack
+    bboxes = [[100, 100, 200, 400], [500, 120, 600, 420], [50, 50, 40, 40]]
+    detections = detector.detect_in_rois(_frame(), bboxes)
+
+    assert detector.model.calls == [1]
+    assert sorted(d["roi_index"] for d in detections) == [0, 1]
+    for det in detections:
+        x1, y1, x2, y2 = bboxes[det["roi_index"]]
+        kx, ky = det["keypoints"]["xy"][0]
+        assert x1 - 20 <= kx <= x2 + 20 and y1 - 20 <= ky <= y2 + 20
+    assert detector.get_roi_packing_stats()["rois"] == 2
+
+
+def test_pipeline_prepares_hand_regions_once_per_frame():
+    from src.core.optimized_detection_pipeline import OptimizedDetectionPipeline
+
+    def pose(bbox, wrist_y):
+        x1, y1, x2, _ = bbox
+        xy = np.zeros((17, 2))
+        conf = np.zeros(17)
+        xy[7] = [x1 + 10, wrist_y - 40]
+        xy[9] = [x1 + 10, wrist_y]
+        conf[[7, 9]] = 0.9
+        return {"bbox": bbox, "keypoints": {"xy": xy, "conf": conf}}
+
+    class FakeDetector:
+        def __init__(self):
+            self.roi_calls = 0
+            self.full_calls = 0
+
+        def detect_in_rois(self, image, bboxes, use_batch=True, **kwargs):
+            self.roi_calls += 1
+            # 只有第一个人在ROI中检出手腕
+            return [dict(pose(bboxes[0], 200), roi_index=0)]
+
+        def detect(self, image):
+            self.full_calls += 1
+            return []
+
+    pipeline = OptimizedDetectionPipeline.__new__(OptimizedDetectionPipeline)
+    pipeline.pose_detector = FakeDetector()
+    persons = [
+        {"bbox": [100, 100, 200, 400]},
+        {"bbox": [500, 100, 600, 400]},
+        {"bbox": [800, 100, 900, 400]},
+    ]
+    model_outputs = {}
+    regions = pipeline._prepare_hand_regions(_frame(), persons, model_outputs)
+
+    assert pipeline.pose_detector.roi_calls == 1
+    assert pipeline.pose_detector.full_calls == 1
+    # 记录拼图姿态推理的原始输出与调用参数，供影子评估重放
+    recorded = model_outputs["pose_detection"]
+    assert recorded.method == "detect_in_rois"
+    assert recorded.args == ([p["bbox"] for p in persons],)
+    assert [p["roi_index"] for p in recorded.output] == [0]
+    assert regions[0][0]["source"] == "yolov8_pose_keypoints"
+    # 未检出的人员回退到估算的左右手区域
+    assert [len(r) for r in regions[1:]] == [2, 2]
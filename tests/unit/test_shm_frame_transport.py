@@ -0,0 +1,163 @@
+"""
+共享内存视频帧传输单元测试
+"""
+
+import asyncio
+import uuid
+
+import numpy as np
+import pytest
+
+from src.application.video_stream_application_service import (
+    VideoStreamApplicationService,
+)
+from src.services import shm_frame_transport
+from src.services.shm_frame_transport import (
+    DeliveryMeter,
+    ShmFrameReader,
+    ShmFrameWriter,
+    decode_envelope,
+    encode_envelope,
+)
+from src.services.video_stream_manager import VideoStreamManager
+
+
+@pytest.fixture
+def camera_id():
+    return f"cam{uuid.uuid4().hex[:8]}"
+
+
+@pytest.fixture
+def writer(camera_id, monkeypatch):
+    writer = ShmFrameWriter(camera_id, slots=4, slot_size=64)
+    # 模拟写端位于另一个进程，允许本进程附加读取；
+    # 同进程内读写共用 resource_tracker 登记，读端无需注销
+    shm_frame_transport._OWNED_RINGS.discard(writer.name)
+    monkeypatch.setattr(shm_frame_transport, "resource_tracker", None)
+    yield writer
+    writer.close()
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+
+class FakeRedis:
+    def __init__(self, demand):
+        self.demand = demand
+        self.published = []
+
+    async def publish(self, channel, data):
+        self.published.append((channel, data))
+        return 1
+
+    async def hgetall(self, key):
+        return {k.encode(): str(v).encode() for k, v in self.demand.items()}
+
+
+def test_envelope_round_trip_and_legacy_payload():
+    data = encode_envelope(7, 123.5, (180, 320, 3), "thumb", b"\xff\xd8jpeg")
+    frame = decode_envelope(data)
+    assert (frame.frame_seq, frame.timestamp, frame.rendition) == (7, 123.5, "thumb")
+    assert (frame.height, frame.width, frame.channels) == (180, 320, 3)
+    assert frame.payload == b"\xff\xd8jpeg"
+    assert decode_envelope(b"\xff\xd8legacy") is None
+
+
+def test_reader_returns_latest_frame_per_rendition(camera_id, writer):
+    writer.write(b"old", (10, 10, 3), "medium", frame_seq=1)
+    reader = ShmFrameReader.attach(camera_id)
+    try:
+        # 附加时只回放最新一帧
+        assert [f.payload for f in reader.read_new()] == [b"old"]
+        assert reader.read_new() == []
+
+        writer.write(b"m2", (10, 10, 3), "medium", frame_seq=2)
+        writer.write(b"t1", (5, 5, 3), "thumb", frame_seq=1)
+        writer.write(b"m3", (10, 10, 3), "medium", frame_seq=3)
+        frames = reader.read_new()
+        assert [(f.rendition, f.payload) for f in frames] == [
+            ("thumb", b"t1"),
+            ("medium", b"m3"),
+        ]
+        assert not writer.write(b"x" * 65, (1, 1, 3))
+        assert writer.stats["oversized"] == 1
+    finally:
+        reader.close()
+
+
+def test_reader_skips_overwritten_slots_and_meter_counts_drops(camera_id, writer):
+    reader = ShmFrameReader.attach(camera_id)
+    meter = DeliveryMeter()
+    try:
+        writer.write(b"f1", (1, 1, 3), frame_seq=1)
+        for frame in reader.read_new():
+            meter.record("shm", camera_id, frame)
+        for seq in range(2, 9):  # 超过槽数，未读的帧被覆盖
+            writer.write(f"f{seq}".encode(), (1, 1, 3), frame_seq=seq)
+        frames = reader.read_new()
+        assert [f.payload for f in frames] == [b"f8"]
+        for frame in frames:
+            meter.record("shm", camera_id, frame)
+    finally:
+        reader.close()
+
+    stats = meter.snapshot()["shm"]
+    assert stats["frames"] == 2
+    assert stats["dropped"] == 6
+    assert stats["max_latency_ms"] >= 0.0
+
+
+def test_own_rings_are_not_attached():
+    writer = ShmFrameWriter(f"cam{uuid.uuid4().hex[:8]}", slots=2, slot_size=16)
+    try:
+        assert ShmFrameReader.attach(writer.camera_id) is None
+    finally:
+        writer.close()
+    assert ShmFrameReader.attach("missing-camera") is None
+
+
+def test_service_skips_redis_when_only_shm_readers_want_rendition(camera_id):
+    service = VideoStreamApplicationService(stream_manager=object())
+    redis = service._redis_client = FakeRedis({"thumb:shm": 2, "full": 1})
+    frame = np.full((360, 640, 3), 90, dtype=np.uint8)
+
+    async def run():
+        assert await service.push_frame(camera_id, frame)
+        await service.close()
+
+    try:
+        asyncio.run(run())
+    finally:
+        for writer in service._shm_writers.values():
+            writer.close()
+
+    assert [c for c, _ in redis.published] == [f"video:{camera_id}@full"]
+    assert decode_envelope(redis.published[0][1]).frame_seq == 1
+
+
+def test_manager_polls_shm_and_falls_back_when_writer_exits(camera_id, writer):
+    manager = VideoStreamManager()
+    ws = FakeWebSocket()
+
+    async def run():
+        await manager.connect(ws, camera_id, "thumb")
+        writer.write(b"thumb-1", (5, 5, 3), "thumb", frame_seq=1)
+        assert await manager.poll_shm(now=100.0) == 1
+        assert camera_id in manager._shm_readers
+        assert manager.send_queue.get_nowait() == (camera_id, "thumb", b"thumb-1")
+
+        # 写端退出后超过 stale_after 无新帧，回退到Redis
+        writer.close()
+        await manager.poll_shm(now=100.0 + manager.shm_stale_after + 1)
+        assert camera_id not in manager._shm_readers
+
+    asyncio.run(run())
+    assert manager.get_stats()["transports"]["shm"]["frames"] == 1
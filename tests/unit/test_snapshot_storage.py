@@ -0,0 +1,157 @@
+"""
+快照存储引擎单元测试（去重、内容寻址、缩略图、编码池背压、保留清理）
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+import cv2
+import numpy as np
+import pytest
+
+from src.infrastructure.storage.filesystem_snapshot_storage import (
+    FileSystemSnapshotStorage,
+    SnapshotStorageConfig,
+)
+from src.infrastructure.storage.snapshot_dedup import dhash, hamming_distance
+from src.infrastructure.storage.snapshot_encode_pool import (
+    SnapshotBackpressureError,
+    SnapshotEncodePool,
+)
+from src.infrastructure.storage.snapshot_janitor import (
+    SnapshotJanitor,
+    SnapshotRetentionPolicy,
+)
+
+T0 = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def _scene(seed=0, shift=0):
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 255, size=(48, 64, 3), dtype=np.uint8)
+    frame = np.kron(frame, np.ones((10, 10, 1), dtype=np.uint8))  # 480x640 色块
+    return np.roll(frame, shift, axis=1)
+
+
+def _storage(tmp_path, **kwargs):
+    return FileSystemSnapshotStorage(SnapshotStorageConfig(base_dir=tmp_path, **kwargs))
+
+
+def test_dhash_tolerates_noise_but_separates_scenes():
+    frame = _scene(0)
+    noisy = np.clip(frame.astype(int) + 3, 0, 255).astype(np.uint8)
+    assert hamming_distance(dhash(frame), dhash(noisy)) <= 2
+    assert hamming_distance(dhash(frame), dhash(_scene(1))) > 10
+
+
+def test_near_duplicates_reuse_kept_snapshot_within_window(tmp_path):
+    storage = _storage(tmp_path, dedup_window_seconds=30)
+
+    async def run():
+        first = await storage.save_frame(
+            _scene(0), "cam1", captured_at=T0, violation_type="no_hairnet"
+        )
+        again = await storage.save_frame(
+            _scene(0, shift=1),
+            "cam1",
+            captured_at=T0 + timedelta(seconds=10),
+            violation_type="no_hairnet",
+        )
+        other_type = await storage.save_frame(
+            _scene(0), "cam1", captured_at=T0, violation_type="no_handwash"
+        )
+        later = await storage.save_frame(
+            _scene(0, shift=2),
+            "cam1",
+            captured_at=T0 + timedelta(seconds=45),
+            violation_type="no_hairnet",
+        )
+        return first, again, other_type, later
+
+    first, again, other_type, later = asyncio.run(run())
+
+    assert again.deduplicated and again.relative_path == first.relative_path
+    assert again.captured_at == T0 + timedelta(seconds=10)
+    # 不同违规类型不互相去重；相同内容只写一次
+    assert not other_type.deduplicated
+    assert other_type.relative_path == first.relative_path
+    assert not later.deduplicated and later.relative_path != first.relative_path
+
+    stats = storage.get_stats()
+    assert stats["saved"] == 2
+    assert stats["deduplicated"] == 1
+    assert stats["identical_content"] == 1
+    assert stats["encode_pool"]["completed"] == 3
+
+
+def test_content_addressed_layout_with_thumbnail(tmp_path):
+    storage = _storage(tmp_path, dedup_window_seconds=0, thumbnail_width=160)
+    info = asyncio.run(storage.save_frame(_scene(3), "cam1", captured_at=T0))
+
+    parts = info.relative_path.split(os.sep)
+    assert parts[:2] == ["objects", "cam1"]
+    assert parts[3] == f"{info.content_hash}.jpg" and parts[2] == info.content_hash[:2]
+    assert os.path.exists(info.absolute_path)
+
+    thumb = cv2.imread(str(tmp_path / info.thumbnail_path))
+    assert thumb.shape[:2] == (120, 160)
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_encode_pool_rejects_when_full():
+    pool = SnapshotEncodePool(max_workers=1, max_pending=1, acquire_timeout=0.05)
+
+    async def run():
+        slow = asyncio.ensure_future(pool.run(time.sleep, 0.3))
+        await asyncio.sleep(0.01)
+        with pytest.raises(SnapshotBackpressureError):
+            await pool.run(time.sleep, 0)
+        await slow
+
+    asyncio.run(run())
+    stats = pool.get_stats()
+    assert stats["rejected"] == 1 and stats["completed"] == 1
+    assert stats["pending"] == 0 and stats["max_ms"] >= 300
+    pool.shutdown()
+
+
+def _write(path, size, mtime):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    os.utime(path, (mtime, mtime))
+
+
+def test_janitor_enforces_age_count_and_quota(tmp_path):
+    now = 1_000_000.0
+    day = 86400
+    for i in range(5):
+        _write(tmp_path / "objects" / "cam1" / "aa" / f"a{i}.jpg", 100, now - i * day)
+        _write(tmp_path / "thumbs" / "cam1" / "aa" / f"a{i}.jpg", 10, now - i * day)
+    # 原图已删除的孤立缩略图按所属摄像头清理
+    _write(tmp_path / "thumbs" / "cam2" / "bb" / "old.jpg", 50, now - 40 * day)
+    _write(tmp_path / "thumbs" / "cam2" / "bb" / "new.jpg", 50, now)
+    # objects/、thumbs/ 之外的目录（旧布局、上传目录）不在清理范围内
+    _write(tmp_path / "api_upload" / "old.jpg", 50, now - 40 * day)
+
+    policy = SnapshotRetentionPolicy(
+        max_age_days=3.5, max_files_per_camera=3, max_bytes_per_camera=250
+    )
+    report = SnapshotJanitor(tmp_path, policy).run_once(now=now)
+
+    remaining = sorted(p.name for p in (tmp_path / "objects").rglob("*.jpg"))
+    # 4天前的超龄；数量限制保留3个；配额 250 字节（含缩略图 110/个）只余2个
+    assert remaining == ["a0.jpg", "a1.jpg"]
+    thumbs = tmp_path / "thumbs" / "cam1"
+    assert sorted(p.name for p in thumbs.rglob("*.jpg")) == remaining
+    assert report["cameras"]["cam1"] == {
+        "files": 2,
+        "bytes": 220,
+        "deleted": 3,
+        "freed_bytes": 330,
+    }
+    assert report["cameras"]["cam2"]["deleted"] == 1
+    assert (tmp_path / "thumbs" / "cam2" / "bb" / "new.jpg").exists()
+    assert set(report["cameras"]) == {"cam1", "cam2"}
+    assert (tmp_path / "api_upload" / "old.jpg").exists()
@@ -0,0 +1,206 @@
+"""
+视频流多分辨率档位单元测试
+"""
+
+import asyncio
+
+import cv2
+import numpy as np
+
+from src.application.video_stream_application_service import (
+    VideoStreamApplicationService,
+)
+from src.services.shm_frame_transport import decode_envelope
+from src.services.stream_renditions import (
+    RenditionMeter,
+    aggregate_demand,
+    parse_channel,
+    scaled_size,
+    stale_demand_fields,
+    stream_channel,
+)
+from src.services.video_stream_manager import VideoStreamManager
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+
+class FakeRedis:
+    def __init__(self, demand=None):
+        self.demand = demand or {}
+        self.published = []
+        self.hgetall_calls = 0
+
+    async def publish(self, channel, data):
+        self.published.append((channel, data))
+        return 1
+
+    async def hgetall(self, key):
+        self.hgetall_calls += 1
+        return {k.encode(): str(v).encode() for k, v in self.demand.items()}
+
+    async def hset(self, key, mapping):
+        self.demand.update(mapping)
+
+    async def hdel(self, key, *fields):
+        for field in fields:
+            self.demand.pop(field, None)
+
+    async def expire(self, key, ttl):
+        pass
+
+
+def _frame():
+    return np.full((720, 1280, 3), 128, dtype=np.uint8)
+
+
+def _service(demand):
+    service = VideoStreamApplicationService(stream_manager=object())
+    service._redis_client = FakeRedis(demand)
+    service.shm_enabled = False
+    return service
+
+
+def test_channel_naming_round_trip():
+    assert stream_channel("cam1") == "video:cam1"
+    assert stream_channel("cam1", "thumb") == "video:cam1@thumb"
+    assert parse_channel("video:cam1@thumb") == ("cam1", "thumb")
+    assert parse_channel("video:cam1") == ("cam1", "medium")
+    assert parse_channel("video:cam@unknown") == ("cam@unknown", "medium")
+    assert scaled_size(1280, 720, 320) == (320, 180)
+    assert scaled_size(200, 100, 320) is None
+
+
+def test_meter_tracks_bytes_per_second_and_encode_time():
+    meter = RenditionMeter(window_seconds=10.0)
+    meter.record("thumb", 1000, 2.0, now=0.0)
+    meter.record("thumb", 3000, 4.0, now=5.0)
+    meter.record("thumb", 1000, 3.0, now=12.0)  # 第一帧滑出窗口
+
+    stats = meter.snapshot(now=12.0)["thumb"]
+    assert stats["frames"] == 3 and stats["bytes"] == 5000
+    assert stats["bytes_per_sec"] == 400.0
+    assert stats["avg_encode_ms"] == 3.0
+
+
+def test_push_encodes_only_demanded_renditions_once():
+    service = _service({"thumb": 16, "medium": 0})
+
+    async def run():
+        assert await service.push_frame("cam1", _frame(), 60, 960, 540)
+        assert await service.push_frame("cam1", _frame(), 60, 960, 540)
+
+    asyncio.run(run())
+
+    redis = service._redis_client
+    assert [c for c, _ in redis.published] == ["video:cam1@thumb"] * 2
+    # 订阅计数在 demand_ttl 内缓存
+    assert redis.hgetall_calls == 1
+    stats = service.get_rendition_stats()
+    assert list(stats) == ["thumb"]
+    assert stats["thumb"]["frames"] == 2
+    assert "avg_encode_ms" in stats["thumb"]
+
+
+def test_push_without_demand_keeps_default_rendition():
+    service = _service({})
+    asyncio.run(service.push_frame("cam1", _frame(), 60, 640, 360))
+
+    channel, data = service._redis_client.published[0]
+    assert channel == "video:cam1"
+    frame = decode_envelope(data)
+    assert (frame.frame_seq, frame.height, frame.width) == (1, 360, 640)
+    decoded = cv2.imdecode(np.frombuffer(frame.payload, np.uint8), cv2.IMREAD_COLOR)
+    assert decoded.shape[:2] == (360, 640)
+
+
+def test_demand_sums_live_workers_and_drops_stale_ones():
+    raw = {
+        b"w1/heartbeat": b"100.0",
+        b"w1/thumb": b"2",
+        b"w2/heartbeat": b"95.0",
+        b"w2/thumb": b"1",
+        b"w2/full:shm": b"1",
+        b"w3/heartbeat": b"0.0",  # 心跳超时的进程
+        b"w3/full": b"5",
+        b"w4/medium": b"3",  # 无心跳
+        b"medium": b"-2",  # 旧版本漂移为负的计数
+    }
+
+    assert aggregate_demand(raw, now=100.0, timeout=90.0) == {
+        "thumb": 3,
+        "full:shm": 1,
+    }
+    assert sorted(stale_demand_fields(raw, now=100.0, timeout=90.0)) == [
+        "w3/full",
+        "w3/heartbeat",
+        "w4/medium",
+    ]
+
+
+def test_manager_publishes_its_own_demand_fields():
+    manager = VideoStreamManager()
+    manager._redis = FakeRedis()
+    ws1, ws2 = FakeWebSocket(), FakeWebSocket()
+    own = manager.worker_id
+
+    async def run():
+        await manager.connect(ws1, "cam1", "thumb")
+        await manager.connect(ws2, "cam1", "thumb")
+        await manager._publish_demand("cam1")  # 心跳重复写入不改变计数
+        assert aggregate_demand(await manager._redis.hgetall("k")) == {"thumb": 2}
+
+        await manager.set_rendition(ws1, "cam1", "full")
+        demand = manager._redis.demand
+        assert demand[f"{own}/thumb"] == "1" and demand[f"{own}/full"] == "1"
+
+        await manager.disconnect(ws1, "cam1")
+        await manager.disconnect(ws2, "cam1")
+        assert demand == {}
+
+    asyncio.run(run())
+
+
+def test_manager_fans_out_per_rendition_and_switches():
+    manager = VideoStreamManager()
+    grid, fullscreen = FakeWebSocket(), FakeWebSocket()
+
+    async def run():
+        await manager.connect(grid, "cam1", "thumb")
+        await manager.connect(fullscreen, "cam1", "full")
+        assert manager.get_rendition_demand("cam1") == {"thumb": 1, "full": 1}
+
+        await manager.update_frame("cam1", b"thumb-1", "thumb")
+        await manager.update_frame("cam1", b"full-1", "full")
+        await manager.update_frame("cam1", b"medium-1")  # 无客户端选择默认档位
+        assert manager.send_queue.qsize() == 2
+
+        sender = asyncio.create_task(manager._sender_loop())
+        await asyncio.sleep(0.01)
+        assert grid.sent == [b"thumb-1"]
+        assert fullscreen.sent == [b"full-1"]
+
+        # 切换档位后立即收到新档位的缓存帧
+        assert await manager.set_rendition(grid, "cam1", "full")
+        assert not await manager.set_rendition(grid, "cam1", "bogus")
+        assert grid.sent[-1] == b"full-1"
+        assert manager.get_rendition_demand("cam1") == {"full": 2}
+
+        await manager.disconnect(grid, "cam1")
+        await manager.disconnect(grid, "cam1")  # 重复断开不影响计数
+        assert manager.get_rendition_demand("cam1") == {"full": 1}
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+
+    asyncio.run(run())
+    stats = manager.get_stats()
+    assert stats["renditions"]["full"]["frames"] == 1
+    assert stats["rendition_demand"] == {"cam1": {"full": 1}}
@@ -0,0 +1,185 @@
+"""
+逐帧追踪单元测试（嵌套 span、尾部采样、OTLP 导出、火焰图聚合与 API）
+"""
+
+import asyncio
+import json
+import time
+
+from src.monitoring.tracing import (
+    NOOP_SPAN,
+    Tracer,
+    TracingSettings,
+    build_flamegraph,
+    merge_profiles,
+    render_folded,
+    trace_span,
+)
+
+
+def _frame(tracer, camera_id="cam1", sleep=0.0):
+    with tracer.start_trace("frame", camera_id=camera_id) as root:
+        with trace_span("pipeline.detect") as detect:
+            with trace_span("pipeline.person_detection") as person:
+                person.set_attribute("persons", 3)
+                time.sleep(sleep)
+            with trace_span("pipeline.hand_regions", rois=6):
+                pass
+            detect.set_attribute("cache_hit", False)
+        with trace_span("stream.push"):
+            pass
+    return root
+
+
+def test_tail_sampling_keeps_slow_frames_and_exports_otlp(tmp_path):
+    export = tmp_path / "traces.jsonl"
+    tracer = Tracer(
+        TracingSettings(slow_frame_ms=5, sample_rate=0.0, export_path=str(export))
+    )
+    assert trace_span("orphan") is NOOP_SPAN
+
+    _frame(tracer)
+    slow_root = _frame(tracer, sleep=0.01)
+    assert tracer.stats["traces"] == 2 and tracer.stats["kept_slow"] == 1
+
+    [record] = tracer.recent_traces()
+    assert record["reason"] == "slow" and record["spans"] == 5
+    assert record["duration_ms"] >= 5 and record["camera_id"] == "cam1"
+    assert tracer.get_trace(record["trace_id"]) is record
+
+    lines = export.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [record["otlp"]]
+    spans = record["otlp"]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    by_name = {span["name"]: span for span in spans}
+    assert by_name["frame"]["parentSpanId"] == "" and slow_root.span_id == (
+        by_name["frame"]["spanId"]
+    )
+    assert by_name["pipeline.person_detection"]["parentSpanId"] == (
+        by_name["pipeline.detect"]["spanId"]
+    )
+    assert {"key": "persons", "value": {"intValue": "3"}} in by_name[
+        "pipeline.person_detection"
+    ]["attributes"]
+    assert {"key": "sampling.reason", "value": {"stringValue": "slow"}} in by_name[
+        "frame"
+    ]["attributes"]
+    assert all(s["traceId"] == record["trace_id"] for s in spans)
+    assert int(by_name["frame"]["startTimeUnixNano"]) <= int(
+        by_name["pipeline.detect"]["startTimeUnixNano"]
+    )
+
+    sampled = Tracer(TracingSettings(slow_frame_ms=1e9, sample_rate=1.0))
+    _frame(sampled)
+    assert sampled.recent_traces()[0]["reason"] == "sampled"
+    disabled = Tracer(TracingSettings(enabled=False))
+    assert disabled.start_trace("frame") is NOOP_SPAN
+
+
+def test_span_limit_and_errors_are_recorded():
+    tracer = Tracer(TracingSettings(slow_frame_ms=0, max_spans=3))
+    try:
+        with tracer.start_trace("frame"):
+            for _ in range(4):
+                with trace_span("stage"):
+                    pass
+            with trace_span("nope"):
+                raise ValueError("boom")
+    except ValueError:
+        pass
+    [record] = tracer.recent_traces()
+    assert record["spans"] == 3 and tracer.stats["dropped_spans"] == 3
+    spans = record["otlp"]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert spans[0]["status"] == {"code": 2, "message": "ValueError: boom"}
+
+
+def test_context_propagates_across_awaits_without_mixing_tasks():
+    tracer = Tracer(TracingSettings(slow_frame_ms=0))
+
+    async def frame(camera_id):
+        with tracer.start_trace("frame", camera_id=camera_id):
+            with trace_span("record.process"):
+                await asyncio.sleep(0.001)
+                with trace_span("record.db_write", camera=camera_id):
+                    await asyncio.sleep(0.001)
+
+    async def run():
+        await asyncio.gather(frame("cam1"), frame("cam2"))
+
+    asyncio.run(run())
+    records = tracer.recent_traces()
+    assert sorted(r["camera_id"] for r in records) == ["cam1", "cam2"]
+    for record in records:
+        spans = record["otlp"]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert [s["name"] for s in spans] == [
+            "frame",
+            "record.process",
+            "record.db_write",
+        ]
+        assert spans[2]["attributes"][0]["value"]["stringValue"] == record["camera_id"]
+
+
+def test_flamegraph_aggregates_all_frames_with_self_time():
+    tracer = Tracer(TracingSettings(slow_frame_ms=1e9, sample_rate=0.0))
+    for _ in range(3):
+        _frame(tracer, sleep=0.002)
+    _frame(tracer, camera_id="cam2")
+    assert tracer.recent_traces() == []
+
+    snapshot = json.loads(json.dumps(tracer.snapshot()))
+    profile = merge_profiles([snapshot, snapshot], camera_id="cam1")
+    count, total_ns, self_ns = profile[
+        "frame;pipeline.detect;pipeline.person_detection"
+    ]
+    assert count == 6 and total_ns == self_ns and total_ns >= 6 * 2_000_000
+    detect = profile["frame;pipeline.detect"]
+    children = sum(
+        profile[p][1]
+        for p in (
+            "frame;pipeline.detect;pipeline.person_detection",
+            "frame;pipeline.detect;pipeline.hand_regions",
+        )
+    )
+    assert detect[2] == detect[1] - children
+    assert len(merge_profiles([snapshot])["frame"]) == 3
+    assert merge_profiles([snapshot])["frame"][0] == 4
+
+    folded = render_folded(profile)
+    assert "frame;pipeline.detect;pipeline.person_detection " in folded
+    tree = build_flamegraph(profile)
+    [frame] = tree["children"]
+    assert frame["name"] == "frame" and frame["count"] == 6
+    assert {c["name"] for c in frame["children"]} == {"pipeline.detect", "stream.push"}
+    assert tree["value"] == frame["value"]
+
+
+def test_trace_endpoints(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from src.api.routers import monitoring
+
+    tracer = Tracer(TracingSettings(slow_frame_ms=5, sample_rate=0.0))
+    _frame(tracer, sleep=0.01)
+    _frame(tracer, camera_id="cam2", sleep=0.01)
+
+    async def collect(redis_client=None):
+        return [tracer.snapshot()]
+
+    monkeypatch.setattr(monitoring, "collect_trace_snapshots", collect)
+    app = FastAPI()
+    app.include_router(monitoring.router)
+    client = TestClient(app)
+
+    listing = client.get("/monitoring/traces", params={"camera_id": "cam2"}).json()
+    [summary] = listing["traces"]
+    assert "otlp" not in summary and listing["sources"][0]["stats"]["kept_slow"] == 2
+    otlp = client.get(f"/monitoring/traces/{summary['trace_id']}").json()
+    assert otlp["resourceSpans"][0]["scopeSpans"][0]["spans"][0]["name"] == "frame"
+    assert client.get("/monitoring/traces/missing").status_code == 404
+
+    tree = client.get("/monitoring/traces/flamegraph").json()
+    assert tree["children"][0]["count"] == 2
+    folded = client.get("/monitoring/traces/flamegraph", params={"format": "folded"})
+    assert folded.text.startswith("frame")
+    bad = client.get("/monitoring/traces/flamegraph", params={"format": "svg"})
+    assert bad.status_code == 422
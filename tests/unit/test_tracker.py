@@ -0,0 +1,161 @@
+"""
+MultiObjectTracker单元测试
+"""
+
+import numpy as np
+import pytest
+
+from src.core import tracker as tracker_module
+from src.core.tracker import (
+    AssignmentStrategy,
+    GreedyAssignment,
+    HungarianAssignment,
+    MultiObjectTracker,
+    RevivalIndex,
+    boxes_to_array,
+    pairwise_center_distance,
+    pairwise_iou,
+    register_assignment_strategy,
+)
+
+
+class TestVectorizedMatrices:
+    """代价矩阵向量化计算测试"""
+
+    def test_pairwise_iou_matches_scalar(self):
+        tracker = MultiObjectTracker()
+        boxes_a = [[0, 0, 10, 10], [5, 5, 15, 15], [100, 100, 110, 120]]
+        boxes_b = [[0, 0, 10, 10], [8, 8, 20, 20]]
+        matrix = pairwise_iou(boxes_to_array(boxes_a), boxes_to_array(boxes_b))
+
+        assert matrix.shape == (3, 2)
+        for i, a in enumerate(boxes_a):
+            for j, b in enumerate(boxes_b):
+                assert matrix[i, j] == pytest.approx(tracker.calculate_iou(a, b))
+
+    def test_degenerate_boxes_have_zero_iou(self):
+        matrix = pairwise_iou(
+            boxes_to_array([[0, 0, 0, 0]]), boxes_to_array([[0, 0, 0, 0]])
+        )
+        assert matrix[0, 0] == 0.0
+
+    def test_center_distance(self):
+        dist = pairwise_center_distance(
+            boxes_to_array([[0, 0, 10, 10]]), boxes_to_array([[30, 40, 40, 50]])
+        )
+        assert dist[0, 0] == pytest.approx(50.0)
+
+
+class TestAssignmentStrategies:
+    """分配策略测试"""
+
+    def _matrices(self):
+        iou = np.array([[0.9, 0.5], [0.6, 0.0]])
+        dist = np.array([[10.0, 50.0], [40.0, 500.0]])
+        cost = 1.0 - iou
+        return cost, iou, dist
+
+    def test_greedy_takes_highest_iou_first(self):
+        rows, cols = GreedyAssignment().assign(*self._matrices(), 0.3, 100.0)
+        # (1, 1) 的距离超出门限，剩余行列不会被强行匹配
+        assert list(zip(rows, cols)) == [(0, 0)]
+
+    def test_hungarian_respects_gates(self):
+        rows, cols = HungarianAssignment().assign(*self._matrices(), 0.3, 100.0)
+        pairs = list(zip(rows, cols))
+        # (1, 1) 既不满足IoU门限也不满足距离门限
+        assert (1, 1) not in pairs
+
+    def test_custom_strategy_registration(self, monkeypatch):
+        monkeypatch.setattr(
+            tracker_module,
+            "ASSIGNMENT_STRATEGIES",
+            dict(tracker_module.ASSIGNMENT_STRATEGIES),
+        )
+
+        class NoMatch(AssignmentStrategy):
+            name = "none"
+
+            def assign(self, *args, **kwargs):
+                return [], []
+
+        register_assignment_strategy("none", NoMatch)
+        tracker = MultiObjectTracker(match_strategy="none", dist_threshold=1.0)
+        tracker.update([{"bbox": [0, 0, 10, 10], "confidence": 0.9}])
+        tracker.update([{"bbox": [500, 500, 510, 510], "confidence": 0.9}])
+        assert len(tracker.tracks) == 2
+
+    def test_unknown_strategy(self):
+        with pytest.raises(ValueError):
+            MultiObjectTracker(match_strategy="does-not-exist")
+
+
+class TestRevivalIndex:
+    """复活空间索引测试"""
+
+    @pytest.mark.parametrize("count", [4, 64])
+    def test_nearest_unused(self, count):
+        centers = np.array([[i * 100.0, 0.0] for i in range(count)])
+        index = RevivalIndex(list(range(1, count + 1)), centers)
+
+        assert index.nearest(np.array([110.0, 0.0]), 50.0) == 2
+        # 同一候选每帧只能复活一次，次近的超出范围
+        assert index.nearest(np.array([110.0, 0.0]), 50.0) is None
+        assert index.nearest(np.array([110.0, 0.0]), 150.0) in (1, 3)
+
+
+class TestMultiObjectTracker:
+    """追踪流程测试"""
+
+    def test_track_ids_are_stable(self):
+        tracker = MultiObjectTracker()
+        first = tracker.update(
+            [
+                {"bbox": [0, 0, 50, 100], "confidence": 0.9},
+                {"bbox": [300, 0, 350, 100], "confidence": 0.8},
+            ]
+        )
+        # 第一帧创建轨迹，不输出
+        assert first == []
+        second = tracker.update(
+            [
+                {"bbox": [305, 2, 355, 102], "confidence": 0.8},
+                {"bbox": [4, 1, 54, 101], "confidence": 0.9},
+            ]
+        )
+        by_id = {t["track_id"]: t["bbox"] for t in second}
+        assert by_id == {1: [4, 1, 54, 101], 2: [305, 2, 355, 102]}
+
+    def test_lost_track_is_revived(self):
+        tracker = MultiObjectTracker(max_disappeared=1, dist_threshold=100.0)
+        tracker.update([{"bbox": [0, 0, 50, 100], "confidence": 0.9}])
+        tracker.update([])
+        tracker.update([])
+        assert tracker.tracks[1].state == "lost"
+
+        result = tracker.update([{"bbox": [20, 0, 70, 100], "confidence": 0.9}])
+        assert [t["track_id"] for t in result] == [1]
+        assert tracker.tracks[1].state == "active"
+        assert "id_switch" not in result[0]
+
+    def test_forced_revival_is_flagged_as_id_switch(self):
+        tracker = MultiObjectTracker(dist_threshold=100.0, force_revival=True)
+        tracker.update([{"bbox": [0, 0, 50, 100], "confidence": 0.9}])
+        result = tracker.update([{"bbox": [120, 0, 170, 100], "confidence": 0.9}])
+        assert [t["track_id"] for t in result] == [1]
+        assert result[0]["id_switch"] and tracker.id_switches == 1
+
+    def test_crowded_scene_keeps_one_track_per_person(self):
+        tracker = MultiObjectTracker()
+        people = [[i * 90, (i % 4) * 220] for i in range(24)]
+        for step in range(10):
+            tracker.update(
+                [
+                    {
+                        "bbox": [x + step * 3, y, x + step * 3 + 60, y + 180],
+                        "confidence": 0.9,
+                    }
+                    for x, y in people
+                ]
+            )
+        assert len(tracker.tracks) == 24
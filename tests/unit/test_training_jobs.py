@@ -0,0 +1,323 @@
+"""
+训练任务子系统单元测试（优先级与并发上限、崩溃恢复、信号取消、重启接管、进度读取）
+"""
+
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+from src.application.training_jobs import (
+    STATUS_CANCELLED,
+    STATUS_QUEUED,
+    STATUS_RUNNING,
+    STATUS_SUCCEEDED,
+    TrainingJobRunner,
+    TrainingJobStore,
+    TrainingResourceLimits,
+    parse_cpu_list,
+)
+
+# 模拟训练子进程：按 params.mode 成功、首次崩溃或等待 SIGTERM
+FAKE_WORKER = r"""
+import json, os, signal, sys, time
+job_dir = sys.argv[1]
+job = json.load(open(os.path.join(job_dir, "job.json")))
+params = job["params"]
+mode = params.get("mode") or params["training_params"]["mode"]
+
+def finish(status, **extra):
+    with open(os.path.join(job_dir, "result.json"), "w") as f:
+        json.dump({"status": status, **extra}, f)
+    sys.exit(0)
+
+signal.signal(signal.SIGTERM, lambda *a: finish("cancelled", error="训练已被取消"))
+with open(os.path.join(job_dir, "progress.jsonl"), "a") as f:
+    f.write(json.dumps({"epoch": 1, "threads": os.environ["OMP_NUM_THREADS"]}) + "\n")
+marker = os.path.join(job_dir, "crashed")
+if mode == "crash_once" and not os.path.exists(marker):
+    open(marker, "w").close()
+    os._exit(3)
+if mode == "wait":
+    while True:
+        time.sleep(0.01)
+finish("succeeded", result={"model_path": "m.pt", "report_path": "r.json",
+                            "version": job["job_id"], "metrics": {"mAP50": 0.5}})
+"""
+
+
+def _runner(tmp_path, **kwargs):
+    return TrainingJobRunner(
+        store=TrainingJobStore(str(tmp_path / "jobs")),
+        limits=TrainingResourceLimits(cpu_threads=2, cpu_affinity=None),
+        poll_interval=0.01,
+        worker_command=[sys.executable, "-c", FAKE_WORKER],
+        **kwargs,
+    )
+
+
+async def _tick_until(runner, predicate, timeout=10.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "等待训练任务状态超时"
+        await runner.tick()
+        await asyncio.sleep(0.02)
+
+
+def test_resource_limits_env_and_cpu_list(monkeypatch):
+    assert parse_cpu_list("0-2, 5,5") == [0, 1, 2, 5]
+    assert parse_cpu_list("a-b") is None
+
+    monkeypatch.setenv("TRAINING_CPU_AFFINITY", "2-3")
+    monkeypatch.setenv("TRAINING_MEMORY_LIMIT_MB", "2048")
+    monkeypatch.delenv("TRAINING_CPU_THREADS", raising=False)
+    limits = TrainingResourceLimits.from_env()
+    assert limits.cpu_threads == 2 and limits.cpu_affinity == [2, 3]
+    env = limits.to_env()
+    assert env["OMP_NUM_THREADS"] == "2"
+    assert env["TRAINING_CPU_AFFINITY"] == "2,3"
+    assert env["TRAINING_MEMORY_LIMIT_MB"] == "2048"
+
+
+def test_priority_order_concurrency_cap_and_progress(tmp_path):
+    runner = _runner(tmp_path, max_concurrent=1)
+    low = runner.submit("multi_behavior", {"mode": "ok"}, priority=0)
+    high = runner.submit("multi_behavior", {"mode": "ok"}, priority=5)
+    handled = []
+
+    async def handler(job):
+        handled.append(job["job_id"])
+
+    runner.register_handler("multi_behavior", handler)
+
+    async def run():
+        await runner.tick()
+        states = {j["job_id"]: j["status"] for j in runner.store.list()}
+        await _tick_until(
+            runner,
+            lambda: all(j["status"] == STATUS_SUCCEEDED for j in runner.store.list()),
+        )
+        return states
+
+    states = asyncio.run(run())
+    assert states == {high["job_id"]: STATUS_RUNNING, low["job_id"]: STATUS_QUEUED}
+    assert handled == [high["job_id"], low["job_id"]]
+    job = runner.store.get(high["job_id"])
+    assert job["result"]["metrics"] == {"mAP50": 0.5} and job["attempts"] == 1
+
+    records, offset = runner.store.read_progress(high["job_id"])
+    assert records == [{"epoch": 1, "threads": "2"}]
+    assert runner.store.read_progress(high["job_id"], offset) == ([], offset)
+
+
+def test_crashed_worker_is_retried(tmp_path):
+    runner = _runner(tmp_path, max_attempts=2)
+    job = runner.submit("multi_behavior", {"mode": "crash_once"})
+
+    async def run():
+        await _tick_until(
+            runner,
+            lambda: runner.store.get(job["job_id"])["status"] == STATUS_SUCCEEDED,
+        )
+
+    asyncio.run(run())
+    finished = runner.store.get(job["job_id"])
+    assert finished["attempts"] == 2
+    records, _ = runner.store.read_progress(job["job_id"])
+    assert len(records) == 2
+
+
+def test_cancel_sends_sigterm_to_running_worker(tmp_path):
+    runner = _runner(tmp_path)
+    job = runner.submit("multi_behavior", {"mode": "wait"})
+    queued = runner.submit("multi_behavior", {"mode": "ok"})
+    runner.max_concurrent = 1
+
+    async def run():
+        await _tick_until(
+            runner,
+            lambda: os.path.exists(
+                runner.store.job_dir(job["job_id"]) / "progress.jsonl"
+            ),
+        )
+        assert runner.cancel(queued["job_id"])["status"] == STATUS_CANCELLED
+        runner.cancel(job["job_id"])
+        await _tick_until(
+            runner,
+            lambda: runner.store.get(job["job_id"])["status"] == STATUS_CANCELLED,
+        )
+
+    asyncio.run(run())
+    cancelled = runner.store.get(job["job_id"])
+    assert cancelled["cancel_requested"] and cancelled["pid"] is None
+    assert runner.store.get(queued["job_id"])["attempts"] == 0
+
+
+def test_runners_sharing_a_store_launch_and_handle_each_job_once(tmp_path):
+    from src.utils.file_lock import file_lock
+
+    # 模拟多个 API worker：两个调度器共享同一任务目录
+    first = _runner(tmp_path, max_concurrent=1)
+    second = _runner(tmp_path, max_concurrent=1)
+    jobs = [first.submit("multi_behavior", {"mode": "ok"}) for _ in range(2)]
+    handled = []
+
+    async def handler(job):
+        handled.append(job["job_id"])
+
+    for runner in (first, second):
+        runner.register_handler("multi_behavior", handler)
+
+    async def run():
+        with file_lock(first.store.lock_path):
+            # 其他进程持有调度锁时本轮跳过
+            await second.tick()
+            assert {j["status"] for j in second.store.list()} == {STATUS_QUEUED}
+        await first.tick()
+        await second.tick()
+        assert [j["status"] for j in second.store.list()].count(STATUS_RUNNING) == 1
+
+        def done():
+            return all(j.get("handled") for j in first.store.list())
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + 10.0
+        while not done():
+            assert loop.time() < deadline, "等待训练任务状态超时"
+            for runner in (first, second):
+                await runner.tick()
+            await asyncio.sleep(0.02)
+
+    asyncio.run(run())
+    assert sorted(handled) == sorted(j["job_id"] for j in jobs)
+    assert all(j["attempts"] == 1 for j in first.store.list())
+    assert not list(first.store.root.rglob("*.tmp"))
+
+
+def test_recover_adopts_live_and_requeues_dead_workers(tmp_path):
+    store = TrainingJobStore(str(tmp_path / "jobs"))
+    live = store.create("multi_behavior", {"mode": "ok"})
+    dead = store.create("multi_behavior", {"mode": "ok"})
+    for job, pid in ((live, os.getpid()), (dead, 2**22 + 12345)):
+        job.update(status=STATUS_RUNNING, pid=pid, attempts=1)
+        store.save(job)
+
+    runner = TrainingJobRunner(
+        store=store, limits=TrainingResourceLimits(cpu_threads=1), max_attempts=3
+    )
+    runner.recover()
+    assert store.get(live["job_id"])["status"] == STATUS_RUNNING
+    recovered = store.get(dead["job_id"])
+    assert recovered["status"] == STATUS_QUEUED and "检查点" in recovered["error"]
+
+
+def test_recover_detects_reused_pid_and_runs_missed_handler(tmp_path):
+    store = TrainingJobStore(str(tmp_path / "jobs"))
+    reused = store.create("multi_behavior", {"mode": "ok"})
+    done = store.create("multi_behavior", {"mode": "ok"})
+    # PID 仍存在但属于另一个进程（启动时间不符）
+    reused.update(status=STATUS_RUNNING, pid=os.getpid(), pid_started_at=1.0)
+    done.update(status=STATUS_RUNNING, pid=2**22 + 12345, attempts=1)
+    for job in (reused, done):
+        store.save(job)
+    # API 停机期间训练已完成并写出结果
+    (store.job_dir(done["job_id"]) / "result.json").write_text(
+        json.dumps({"status": STATUS_SUCCEEDED, "result": {"version": "v1"}})
+    )
+
+    runner = TrainingJobRunner(
+        store=store,
+        limits=TrainingResourceLimits(cpu_threads=1),
+        max_concurrent=1,
+        poll_interval=0.01,
+        max_attempts=3,
+        worker_command=[sys.executable, "-c", "pass"],
+    )
+    calls = []
+
+    async def handler(job):
+        calls.append(job["job_id"])
+        if len(calls) == 1:
+            raise RuntimeError("数据库不可用")
+
+    runner.register_handler("multi_behavior", handler)
+
+    async def run():
+        await runner.tick()
+        assert store.get(done["job_id"])["handler_attempts"] == 1
+        await asyncio.sleep(0.05)
+        await runner.tick()
+
+    asyncio.run(run())
+    relaunched = store.get(reused["job_id"])
+    assert "检查点" in relaunched["error"] and relaunched["pid"] != os.getpid()
+    finished = store.get(done["job_id"])
+    assert finished["status"] == STATUS_SUCCEEDED and finished["handled"] is True
+    assert calls == [done["job_id"], done["job_id"]]
+
+    asyncio.run(runner.tick())
+    assert len(calls) == 2
+
+
+def test_finished_checkpoint_is_not_resumed(tmp_path):
+    import torch
+
+    from src.application.multi_behavior_training_service import (
+        MultiBehaviorTrainingService,
+    )
+
+    running, finished = tmp_path / "running.pt", tmp_path / "finished.pt"
+    torch.save({"epoch": 4, "optimizer": {}}, running)
+    torch.save({"epoch": -1, "optimizer": None}, finished)
+    assert not MultiBehaviorTrainingService.checkpoint_finished(running)
+    assert MultiBehaviorTrainingService.checkpoint_finished(finished)
+    assert not MultiBehaviorTrainingService.checkpoint_finished(tmp_path / "x.pt")
+
+
+def test_training_service_submits_job_and_registers_once(tmp_path):
+    from src.application.multi_behavior_training_service import (
+        MultiBehaviorTrainingService,
+    )
+    from src.config.multi_behavior_training_config import MultiBehaviorTrainingConfig
+
+    class Registry:
+        def __init__(self):
+            self.registered = []
+
+        async def register_model(self, info):
+            self.registered.append(info)
+
+    data_yaml = tmp_path / "data.yaml"
+    data_yaml.write_text("names: []\n")
+    registry = Registry()
+    runner = _runner(tmp_path)
+    service = MultiBehaviorTrainingService(
+        MultiBehaviorTrainingConfig(output_dir=tmp_path, report_dir=tmp_path),
+        model_registry_service=registry,
+        job_runner=runner,
+    )
+
+    async def run():
+        runner.start()
+        try:
+            return await service.train(
+                tmp_path,
+                training_params={"mode": "ok", "priority": 3, "model_name": "mb"},
+                dataset_metadata={"dataset_id": "ds1"},
+            )
+        finally:
+            await runner.stop()
+
+    result = asyncio.run(run())
+    job = runner.store.list()[0]
+    assert job["priority"] == 3
+    assert json.loads(
+        Path(runner.store.job_dir(job["job_id"]) / "job.json").read_text()
+    )["params"]["dataset_metadata"] == {"dataset_id": "ds1"}
+    assert result.model_path == Path("m.pt")
+    assert result.artifacts["training_job_id"] == job["job_id"]
+    assert [info.name for info in registry.registered] == ["mb"]
+    assert registry.registered[0].dataset_id == "ds1"
+    assert service.checkpoint_path("job_x") == tmp_path / "runs/job_x/weights/last.pt"
@@ -0,0 +1,205 @@
+"""
+工作流引擎单元测试（DAG执行、步骤缓存、调度表达式）
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from src.workflow.dag import ResourceBudget, WorkflowDAG, WorkflowGraphError
+from src.workflow.schedule import (
+    CronSchedule,
+    IntervalSchedule,
+    ScheduleError,
+    parse_schedule,
+)
+from src.workflow.step_cache import StepCache, compute_step_key, is_step_cacheable
+from src.workflow.workflow_engine import StepType, WorkflowEngine
+
+
+class TestWorkflowDAG:
+    """DAG构建测试"""
+
+    def test_steps_without_dependencies_run_sequentially(self):
+        dag = WorkflowDAG.from_steps(
+            [{"name": "a", "type": "custom"}, {"name": "b", "type": "custom"}]
+        )
+        assert dag.nodes["b"].depends_on == ["a"]
+        assert dag.order == ["a", "b"]
+
+    def test_explicit_dependencies(self):
+        dag = WorkflowDAG.from_steps(
+            [
+                {"name": "ds1", "type": "custom", "depends_on": []},
+                {"name": "ds2", "type": "custom", "depends_on": []},
+                {"name": "train", "type": "custom", "depends_on": ["ds1", "ds2"]},
+            ]
+        )
+        assert dag.ready_steps(set(), set()) == ["ds1", "ds2"]
+        assert dag.ready_steps({"ds1"}, {"ds1", "ds2"}) == []
+        assert dag.ancestors("train") == {"ds1", "ds2"}
+
+    def test_cycle_detected(self):
+        with pytest.raises(WorkflowGraphError):
+            WorkflowDAG.from_steps(
+                [
+                    {"name": "a", "type": "custom", "depends_on": ["b"]},
+                    {"name": "b", "type": "custom", "depends_on": ["a"]},
+                ]
+            )
+
+    def test_unknown_dependency(self):
+        with pytest.raises(WorkflowGraphError):
+            WorkflowDAG.from_steps(
+                [{"name": "a", "type": "custom", "depends_on": ["x"]}]
+            )
+
+
+class TestResourceBudget:
+    """资源预算测试"""
+
+    @pytest.mark.asyncio
+    async def test_oversized_request_is_clamped(self):
+        budget = ResourceBudget(cpu_slots=2, memory_mb=1024)
+        await asyncio.wait_for(budget.acquire(8, 4096), timeout=1)
+        assert budget.usage()["cpu_in_use"] == 2
+        await budget.release(8, 4096)
+        assert budget.usage()["cpu_in_use"] == 0
+
+
+class TestSchedule:
+    """调度表达式测试"""
+
+    def test_interval(self):
+        schedule = parse_schedule("@every 1h30m")
+        assert isinstance(schedule, IntervalSchedule)
+        start = datetime(2025, 1, 1, 0, 0)
+        assert (schedule.next_after(start) - start).total_seconds() == 5400
+
+    def test_cron_next_is_aligned(self):
+        schedule = parse_schedule("*/15 * * * *")
+        assert isinstance(schedule, CronSchedule)
+        nxt = schedule.next_after(datetime(2025, 1, 1, 10, 7, 30))
+        assert nxt.minute % 15 == 0
+        assert nxt > datetime(2025, 1, 1, 10, 7, 30)
+
+    def test_alias(self):
+        assert isinstance(parse_schedule("@daily"), CronSchedule)
+
+    @pytest.mark.parametrize("expr", ["", "* * *", "61 * * * *", "@every 0m"])
+    def test_invalid(self, expr):
+        with pytest.raises(ScheduleError):
+            parse_schedule(expr)
+
+
+class TestStepCache:
+    """步骤缓存测试"""
+
+    def test_dataset_step_requires_closed_window(self):
+        assert not is_step_cacheable({"type": "handwash_dataset", "config": {}})
+        assert is_step_cacheable(
+            {"type": "handwash_dataset", "config": {"end_time": "2025-01-01"}}
+        )
+        assert not is_step_cacheable({"type": "notification"})
+        assert is_step_cacheable({"type": "notification", "cache": True})
+
+    def test_key_tracks_config_and_input_artifacts(self, tmp_path):
+        data_dir = tmp_path / "data"
+        data_dir.mkdir()
+        (data_dir / "a.txt").write_text("1")
+        step = {
+            "name": "t",
+            "type": "handwash_training",
+            "config": {"dataset_dir": str(data_dir)},
+        }
+
+        key1 = compute_step_key(step, {})
+        assert key1 == compute_step_key(dict(step, name="renamed"), {})
+
+        (data_dir / "b.txt").write_text("2")
+        assert compute_step_key(step, {}) != key1
+
+    def test_entry_invalidated_when_artifact_removed(self, tmp_path):
+        cache = StepCache(str(tmp_path / "cache"))
+        model = tmp_path / "model.pt"
+        model.write_text("w")
+        cache.put("ab" * 32, {"name": "t"}, {"model_path": str(model)})
+        assert cache.get("ab" * 32) is not None
+        model.unlink()
+        assert cache.get("ab" * 32) is None
+
+
+class TestWorkflowExecution:
+    """DAG执行测试"""
+
+    def _engine(self, tmp_path, delays):
+        engine = WorkflowEngine()
+        engine.step_cache = StepCache(str(tmp_path / "cache"))
+        engine.resource_budget = ResourceBudget(cpu_slots=4, memory_mb=4096)
+        engine.active = 0
+        engine.peak = 0
+        engine.calls = []
+
+        async def handler(step_config, workflow_config, context):
+            engine.calls.append(step_config["name"])
+            engine.active += 1
+            engine.peak = max(engine.peak, engine.active)
+            await asyncio.sleep(delays.get(step_config["name"], 0.05))
+            engine.active -= 1
+            if step_config.get("fail"):
+                return {"success": False, "error": "boom"}
+            upstream = [o["name"] for o in context["step_outputs"]]
+            return {
+                "success": True,
+                "output": {"step": step_config["name"], "upstream": upstream},
+            }
+
+        engine.step_handlers[StepType.CUSTOM] = handler
+        return engine
+
+    @pytest.mark.asyncio
+    async def test_independent_steps_overlap_and_cache(self, tmp_path):
+        engine = self._engine(tmp_path, {})
+        workflow = {
+            "id": "wf",
+            "name": "wf",
+            "steps": [
+                {"name": "a", "type": "custom", "cache": True, "depends_on": []},
+                {"name": "b", "type": "custom", "cache": True, "depends_on": []},
+                {
+                    "name": "c",
+                    "type": "custom",
+                    "cache": True,
+                    "depends_on": ["a", "b"],
+                },
+            ],
+        }
+
+        result = await engine.run_workflow("wf", workflow)
+        assert result["success"]
+        assert engine.peak == 2
+        assert result["outputs"][2]["output"]["upstream"] == ["a", "b"]
+
+        engine.calls.clear()
+        result = await engine.run_workflow("wf", workflow)
+        assert result["success"]
+        assert engine.calls == []
+        assert result["cached_steps"] == ["a", "b", "c"]
+
+    @pytest.mark.asyncio
+    async def test_failure_reports_step(self, tmp_path):
+        engine = self._engine(tmp_path, {})
+        workflow = {
+            "id": "wf",
+            "name": "wf",
+            "steps": [
+                {"name": "a", "type": "custom"},
+                {"name": "b", "type": "custom", "fail": True},
+                {"name": "c", "type": "custom"},
+            ],
+        }
+        result = await engine.run_workflow("wf", workflow)
+        assert not result["success"]
+        assert result["failed_step"] == 2
+        assert "c" not in engine.calls
@@ -0,0 +1,210 @@
+"""
+告警规则流式评估引擎单元测试
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils.alert_engine import AlertEngine, WindowCounter, compile_condition
+from src.utils.error_handler import (
+    ErrorCategory,
+    ErrorContext,
+    ErrorInfo,
+    ErrorSeverity,
+    UnifiedErrorHandler,
+)
+from src.utils.error_monitor import AlertLevel, AlertRule, ErrorMonitor
+
+
+def _error(severity="high", category="gpu", camera_id=None, ts=None):
+    context = ErrorContext(module_name="detector")
+    if ts is not None:
+        context.timestamp = ts
+    if camera_id is not None:
+        context.additional_data["camera_id"] = camera_id
+    return ErrorInfo(
+        error_id="E1",
+        exception=RuntimeError("x"),
+        severity=ErrorSeverity(severity),
+        category=ErrorCategory(category),
+        context=context,
+        message="x",
+        stack_trace="",
+    )
+
+
+class TestCompileCondition:
+    def test_string_expressions(self):
+        pred = compile_condition("severity == 'critical'")
+        assert pred.matches(_error("critical"))
+        assert not pred.matches(_error("high"))
+
+        pred = compile_condition("category in ('gpu', 'model') and camera_id == 'cam1'")
+        assert pred.matches(_error(category="model", camera_id="cam1"))
+        assert not pred.matches(_error(category="model", camera_id="cam2"))
+        assert not pred.matches(_error(category="network", camera_id="cam1"))
+
+        pred = compile_condition("severity not in ('low', 'medium')")
+        assert pred.matches(_error("critical"))
+        assert not pred.matches(_error("low"))
+
+    def test_dict_conditions_ignore_non_predicate_keys(self):
+        pred = compile_condition(
+            {"severity": ["high", "critical"], "threshold": 3, "time_window": 60}
+        )
+        assert pred.matches(_error("high"))
+        assert not pred.matches(_error("medium"))
+
+    def test_match_all_and_invalid(self):
+        for condition in (None, "", "*"):
+            assert compile_condition(condition).matches(_error("low", "unknown"))
+        with pytest.raises(ValueError):
+            compile_condition("len(errors) > 3")
+        with pytest.raises(ValueError):
+            compile_condition("user == 'bob'")
+
+
+def test_window_counter_expires_old_buckets():
+    counter = WindowCounter(60)
+    counter.add(1000.0)
+    counter.add(1030.0, 2)
+    assert counter.count(1030.0) == 3
+    assert counter.count(1075.0) == 2
+    assert counter.count(1200.0) == 0
+
+
+def test_window_counter_drops_out_of_order_stale_events():
+    counter = WindowCounter(60)
+    counter.add(1000.0, 3)
+    counter.add(940.0)  # 与 1000 同槽位但早一个窗口，不能清掉新数据
+    assert counter.count(1000.0) == 3
+    counter.add(990.0)  # 窗口内乱序到达仍然计数
+    assert counter.count(1000.0) == 4
+
+
+class TestAlertEngine:
+    def test_observe_evaluate_and_cooldown(self):
+        engine = AlertEngine()
+        engine.add_rule("gpu", "category == 'gpu'", threshold=2, time_window=60)
+        now = time.time()
+
+        engine.observe(_error(category="gpu", ts=now))
+        engine.observe(_error(category="model", ts=now))
+        assert engine.evaluate(now) == []
+
+        engine.observe(_error(category="gpu", ts=now))
+        fired = engine.evaluate(now)
+        assert [r.name for r in fired] == ["gpu"]
+
+        engine.mark_triggered("gpu", "A1", now)
+        assert engine.evaluate(now + 10) == []
+        assert engine.get_stats(now)["gpu"]["matched_total"] == 2
+
+    def test_state_survives_restart(self, tmp_path):
+        path = str(tmp_path / "state" / "alerts.json")
+        engine = AlertEngine(path)
+        engine.add_rule("gpu", "category == 'gpu'", 1, 60, cooldown=600)
+        engine.mark_triggered("gpu", "A1", 5000.0)
+
+        restarted = AlertEngine(path)
+        rule = restarted.add_rule("gpu", "category == 'gpu'", 1, 60, cooldown=600)
+        assert rule.last_triggered == 5000.0
+        # 活跃告警只存在于进程内，重启后不再用于去重
+        assert rule.active_alert_id is None
+
+        # 同名规则被替换时保留进程内的活跃告警
+        engine.add_rule("gpu", "category == 'model'", 1, 60)
+        assert engine.rules["gpu"].active_alert_id == "A1"
+
+
+class TestErrorMonitorIntegration:
+    def _monitor(self, tmp_path):
+        handler = UnifiedErrorHandler()
+        monitor = ErrorMonitor(handler, state_path=str(tmp_path / "state.json"))
+        monitor.alert_channels = []
+        for name in list(monitor.alert_rules):
+            monitor.remove_alert_rule(name)
+        return handler, monitor
+
+    def test_errors_flow_through_listener_and_dedup(self, tmp_path, monkeypatch):
+        handler, monitor = self._monitor(tmp_path)
+        sent = []
+        monkeypatch.setattr(monitor, "_send_alert", sent.append)
+        monitor.add_alert_rule(
+            AlertRule(
+                name="gpu",
+                condition="category == 'gpu'",
+                threshold=2,
+                time_window=60,
+                alert_level=AlertLevel.WARNING,
+                cooldown=0,
+            )
+        )
+
+        for _ in range(2):
+            handler.handle_error(RuntimeError("CUDA out of memory"), ErrorContext())
+        assert monitor._evaluate_rule(monitor.alert_rules["gpu"])
+
+        monitor._check_alert_rules()
+        monitor._check_alert_rules()
+        # 冷却期已过：对同一告警再次通知，不新建告警
+        assert len(sent) == 2 and sent[0] is sent[1]
+        alert = monitor.get_active_alerts()[0]
+        assert alert.data["repeat_count"] == 1
+
+        monitor.alert_rules["gpu"].cooldown = 600
+        monitor.engine.rules["gpu"].cooldown = 600
+        monitor._check_alert_rules()
+        assert len(sent) == 2  # 冷却中
+
+        monitor.resolve_alert(alert.alert_id)
+        monitor.engine.rules["gpu"].last_triggered = 0.0
+        monitor._check_alert_rules()
+        assert len(sent) == 3 and sent[2] is not alert
+
+    def test_invalid_condition_falls_back_to_total_count(self, tmp_path):
+        handler, monitor = self._monitor(tmp_path)
+        monitor.add_alert_rule(
+            AlertRule("legacy", "len(errors) > 0", 1, 60, AlertLevel.INFO)
+        )
+        handler.handle_error(ValueError("bad input"), ErrorContext())
+        assert monitor.engine.count("legacy") == 1
+
+    def test_load_rules_from_store(self, tmp_path):
+        _, monitor = self._monitor(tmp_path)
+
+        class FakeRepository:
+            def __init__(self, rules):
+                self.rules = rules
+
+            async def find_all(self, limit=100, offset=0, camera_id=None, enabled=None):
+                return [r for r in self.rules if enabled is None or r.enabled]
+
+        def stored(name, rule_type="error_monitor", **kwargs):
+            values = dict(
+                name=name,
+                rule_type=rule_type,
+                conditions={"category": "gpu", "threshold": 3},
+                camera_id="cam1",
+                enabled=True,
+                priority="critical",
+            )
+            values.update(kwargs)
+            return SimpleNamespace(**values)
+
+        repo = FakeRepository([stored("gpu_cam1"), stored("other", "violation")])
+        assert asyncio.run(monitor.load_rules_from_store(repo)) == 1
+        rule = monitor.alert_rules["gpu_cam1"]
+        assert rule.threshold == 3
+        assert rule.alert_level == AlertLevel.CRITICAL
+
+        monitor.engine.observe(_error(category="gpu", camera_id="cam2"))
+        monitor.engine.observe(_error(category="gpu", camera_id="cam1"))
+        assert monitor.engine.count("gpu_cam1") == 1
+
+        repo.rules = []
+        assert asyncio.run(monitor.load_rules_from_store(repo)) == 0
+        assert "gpu_cam1" not in monitor.alert_rules
@@ -1,18 +1,66 @@
 """Redis缓存装饰器单元测试."""
 
+import asyncio
 import json
 from unittest.mock import AsyncMock, patch
 
 import pytest
 
+from src.utils import cache as cache_module
 from src.utils.cache import (
+    LocalTTLCache,
     clear_cache,
+    dumps_value,
     generate_cache_key,
     get_cache_stats,
+    get_local_cache_stats,
+    invalidate_tags,
+    invalidate_tags_soon,
+    loads_value,
     redis_cache,
+    reset_cache_counters,
 )
 
 
+class FakeRedis:
+    """内存版Redis（仅实现缓存模块用到的命令）."""
+
+    def __init__(self):
+        self.data = {}
+        self.sets = {}
+        self.get_calls = 0
+
+    async def get(self, key):
+        self.get_calls += 1
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    async def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            removed += int(self.data.pop(key, None) is not None)
+            removed += int(self.sets.pop(key, None) is not None)
+        return removed
+
+    async def sadd(self, key, member):
+        self.sets.setdefault(key, set()).add(member)
+
+    async def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    async def expire(self, key, ttl):
+        return True
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    async def mget(self, keys):
+        return [self.data.get(k) for k in keys]
+
+
 class TestCacheKeyGeneration:
     """测试缓存键生成."""
 
@@ -243,3 +291,158 @@ class TestCacheManagement:
             assert stats["pattern"] == "test:*"
             assert stats["memory_used_mb"] == 10.0
             assert stats["memory_peak_mb"] == 20.0
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(cache_module, "_tag_versions", {})
+    monkeypatch.setattr(cache_module, "_tag_synced_at", 0.0)
+    reset_cache_counters()
+
+    async def _get_client():
+        return redis
+
+    with patch("src.utils.cache.get_redis_client", side_effect=_get_client):
+        yield redis
+
+
+class TestTwoTierCache:
+    """测试L1 + Redis两级缓存."""
+
+    @pytest.mark.asyncio
+    async def test_l1_hit_skips_redis(self, fake_redis):
+        """测试L1命中时不访问Redis."""
+        calls = []
+
+        @redis_cache(ttl=10, key_prefix="l1")
+        async def get_data():
+            calls.append(1)
+            return {"value": 1}
+
+        assert await get_data() == {"value": 1}
+        assert await get_data() == {"value": 1}
+        assert len(calls) == 1
+        assert fake_redis.get_calls == 1
+        stats = get_local_cache_stats()
+        assert stats["l1_hits"] == 1
+        assert stats["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_are_coalesced(self, fake_redis):
+        """测试并发未命中只执行一次原函数（single-flight）."""
+        calls = []
+
+        @redis_cache(ttl=10, key_prefix="sf")
+        async def slow_query():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"value": len(calls)}
+
+        results = await asyncio.gather(*[slow_query() for _ in range(20)])
+        assert len(calls) == 1
+        assert all(r == {"value": 1} for r in results)
+        assert get_local_cache_stats()["coalesced"] == 19
+
+    @pytest.mark.asyncio
+    async def test_stale_value_served_while_refreshing(self, fake_redis):
+        """测试过期后返回旧值并在后台刷新."""
+        calls = []
+
+        @redis_cache(ttl=10, key_prefix="swr", l1_ttl=0.05, stale_ttl=10)
+        async def get_data():
+            calls.append(1)
+            return {"version": len(calls)}
+
+        assert await get_data() == {"version": 1}
+        await asyncio.sleep(0.06)
+        fake_redis.data.clear()  # 强制刷新时重新计算
+
+        assert await get_data() == {"version": 1}
+        assert get_local_cache_stats()["stale"] == 1
+        await asyncio.sleep(0.01)
+        assert await get_data() == {"version": 2}
+
+    @pytest.mark.asyncio
+    async def test_tag_invalidation(self, fake_redis):
+        """测试标签失效同时清除L1与Redis中的键."""
+        calls = []
+
+        @redis_cache(ttl=10, key_prefix="tagged", tags=["cameras"])
+        async def get_data():
+            calls.append(1)
+            return {"version": len(calls)}
+
+        assert await get_data() == {"version": 1}
+        assert await get_data() == {"version": 1}
+
+        deleted = await invalidate_tags("cameras")
+        assert deleted == 1
+        assert await get_data() == {"version": 2}
+
+    @pytest.mark.asyncio
+    async def test_write_path_invalidation_is_coalesced(self, fake_redis):
+        """测试写入路径的标签失效在窗口内合并为一次."""
+        calls = []
+
+        @redis_cache(ttl=10, key_prefix="coalesce", tags=["detection_records"])
+        async def get_data():
+            calls.append(1)
+            return {"version": len(calls)}
+
+        assert await get_data() == {"version": 1}
+        for _ in range(50):
+            invalidate_tags_soon("detection_records", window=0.05)
+        # 窗口结束前缓存仍然命中
+        assert await get_data() == {"version": 1}
+
+        await asyncio.sleep(0.08)
+        assert fake_redis.data["cache:tagver:detection_records"] == "1"
+        assert await get_data() == {"version": 2}
+        stats = get_local_cache_stats()
+        assert stats["invalidations"] == 1
+        assert stats["invalidations_coalesced"] == 49
+
+        # 窗口结束后的写入开启新的窗口
+        invalidate_tags_soon("detection_records", window=0)
+        await asyncio.sleep(0.01)
+        assert fake_redis.data["cache:tagver:detection_records"] == "2"
+
+    @pytest.mark.asyncio
+    async def test_exception_is_not_cached(self, fake_redis):
+        """测试原函数异常不会被缓存，并传递给所有等待者."""
+        attempts = []
+
+        @redis_cache(ttl=10, key_prefix="err")
+        async def flaky():
+            attempts.append(1)
+            await asyncio.sleep(0.01)
+            if len(attempts) == 1:
+                raise RuntimeError("boom")
+            return {"ok": True}
+
+        results = await asyncio.gather(flaky(), flaky(), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert await flaky() == {"ok": True}
+
+
+class TestLocalTTLCache:
+    """测试L1缓存容量与序列化."""
+
+    def test_lru_eviction(self):
+        """测试超过容量时淘汰最久未使用的条目."""
+        local = LocalTTLCache(max_entries=2)
+        local.set("a", 1, 10)
+        local.set("b", 2, 10)
+        local.get("a")
+        local.set("c", 3, 10)
+        assert local.get("b") is None
+        assert local.get("a").value == 1
+        assert len(local) == 2
+
+    def test_serialization_roundtrip(self):
+        """测试序列化结果兼容JSON并支持非字符串键."""
+        data = {"a": [1, 2.5, None], 3: "x"}
+        encoded = dumps_value(data)
+        assert loads_value(encoded) == {"a": [1, 2.5, None], "3": "x"}
+        assert json.loads(encoded)["a"] == [1, 2.5, None]
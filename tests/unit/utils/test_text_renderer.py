@@ -0,0 +1,87 @@
+"""
+文字遮罩渲染器测试
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from src.utils.text_renderer import PIL_AVAILABLE, TextRenderer
+from src.utils.visualization import VisualizationManager
+
+pytestmark = pytest.mark.skipif(not PIL_AVAILABLE, reason="需要Pillow")
+
+
+@pytest.fixture
+def manager():
+    return VisualizationManager()
+
+
+def _pil_reference(manager, img, text, position, font_size, color):
+    """旧实现：整帧转换为PIL绘制后再转换回来"""
+    from PIL import Image, ImageDraw
+
+    img_pil = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    ImageDraw.Draw(img_pil).text(
+        position, text, font=manager.get_chinese_font(font_size), fill=color[::-1]
+    )
+    return cv2.cvtColor(np.array(img_pil), cv2.COLOR_RGB2BGR)
+
+
+class TestTextRenderer:
+    """遮罩缓存渲染测试"""
+
+    def test_matches_pil_round_trip(self, manager):
+        rng = np.random.default_rng(0)
+        frame = rng.integers(0, 256, size=(120, 320, 3), dtype=np.uint8)
+        expected = _pil_reference(
+            manager, frame.copy(), "Person 3: OK", (10, 40), 24, (0, 200, 255)
+        )
+
+        result = manager.cv2_add_chinese_text(
+            frame.copy(), "Person 3: OK", (10, 40), font_size=24, color=(0, 200, 255)
+        )
+        diff = np.abs(result.astype(int) - expected.astype(int))
+        assert diff.max() <= 1
+
+    def test_only_label_region_changes(self, manager):
+        frame = np.zeros((200, 400, 3), dtype=np.uint8)
+        result = manager.cv2_add_chinese_text(frame, "ID 7", (300, 150), font_size=20)
+        assert result is frame
+        changed = np.argwhere(frame.any(axis=2))
+        assert changed[:, 0].min() >= 150 and changed[:, 1].min() >= 300
+
+    def test_cache_hits_and_stats(self, manager):
+        frame = np.zeros((100, 200, 3), dtype=np.uint8)
+        for _ in range(5):
+            manager.cv2_add_chinese_text(frame, "洗手中", (5, 5), font_size=16)
+        manager.cv2_add_chinese_text(frame, "洗手中", (5, 5), 16, (0, 0, 255))
+
+        stats = manager.get_text_render_stats()
+        assert stats["misses"] == 2
+        assert stats["hits"] == 4
+        assert stats["draws"] == 6
+        assert stats["hit_rate"] == pytest.approx(4 / 6, abs=1e-4)
+        assert stats["entries"] == 2
+
+    def test_clipped_at_frame_edges(self, manager):
+        frame = np.zeros((30, 40, 3), dtype=np.uint8)
+        for position in [(-20, -10), (35, 25), (500, 500)]:
+            manager.cv2_add_chinese_text(frame, "Clipped", position, font_size=24)
+        assert frame.shape == (30, 40, 3)
+
+    def test_lru_eviction(self, manager):
+        renderer = TextRenderer(manager.get_chinese_font, max_entries=2)
+        frame = np.zeros((50, 100, 3), dtype=np.uint8)
+        for text in ("a", "b", "c", "a"):
+            renderer.draw(frame, text, (0, 0), 12)
+        stats = renderer.get_stats()
+        assert stats["entries"] == 2
+        assert stats["evictions"] == 2
+        assert stats["misses"] == 4
+
+    def test_no_font_falls_back(self):
+        renderer = TextRenderer(lambda size: None)
+        frame = np.zeros((20, 20, 3), dtype=np.uint8)
+        assert renderer.draw(frame, "x", (0, 0)) is False
+        assert not frame.any()
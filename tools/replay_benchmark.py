@@ -0,0 +1,130 @@
+"""
+录像回放基准测试
+
+用录制的视频或图片序列驱动真实检测循环（Redis/PostgreSQL 使用内存替身），
+输出各阶段延迟分位数、吞吐、CPU/RSS，并与保存的JSON基准对比性能与检测输出。
+
+用法:
+    # 生成/更新基准
+    python tools/replay_benchmark.py --source data/replay/kitchen.mp4 --update-baseline
+    # 改动后对比（存在回归时返回非0退出码）
+    python tools/replay_benchmark.py --source data/replay/kitchen.mp4
+    # 模拟25FPS实时摄像头（处理不及时则丢帧）
+    python tools/replay_benchmark.py --source data/replay/frames/ --fps 25
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.application.replay_harness import ReplayHarness, compare_reports  # noqa: E402
+
+DEFAULT_BASELINE_DIR = Path("reports/replay_baselines")
+
+
+def _pipeline_args(args) -> argparse.Namespace:
+    """构造与 main.py 检测模式一致的参数，用于初始化真实检测管线"""
+    return argparse.Namespace(
+        profile=args.profile,
+        device=args.device,
+        imgsz=args.imgsz,
+        human_weights=args.human_weights,
+        cascade_enable=args.cascade_enable,
+        log_interval=args.log_interval,
+    )
+
+
+def build_pipeline(args, logger):
+    from src.application.detection_initializer import DetectionInitializer
+    from src.config.config_loader import ConfigLoader
+
+    pipeline_args = _pipeline_args(args)
+    effective_config = ConfigLoader.load_and_merge(pipeline_args, logger)
+    if not effective_config:
+        raise RuntimeError("配置加载失败")
+    pipeline_args.device = ConfigLoader.select_device(pipeline_args, logger)
+    return DetectionInitializer.initialize_pipeline(
+        pipeline_args, logger, effective_config
+    )
+
+
+def _print_summary(report, comparison=None) -> None:
+    frames = report["frames"]
+    print(
+        f"帧: 读取={frames['read']} 处理={frames['processed']} 丢弃={frames['dropped']}, "
+        f"吞吐={report['throughput']['processed_fps']} FPS, "
+        f"耗时={report['wall_time_s']}s"
+    )
+    print(f"{'阶段':<36}{'次数':>8}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    for stage, stats in report["stages"].items():
+        print(
+            f"{stage:<36}{stats['count']:>8}{stats['p50_ms']:>10.2f}"
+            f"{stats['p90_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}"
+        )
+    if report["resources"]:
+        print(f"资源: {report['resources']}")
+    if comparison is not None:
+        print(json.dumps(comparison, ensure_ascii=False, indent=2))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="录像回放基准测试")
+    parser.add_argument("--source", required=True, help="视频文件或图片序列目录")
+    parser.add_argument("--name", default=None, help="基准名称（默认取源文件名）")
+    parser.add_argument("--fps", type=float, default=0.0, help="回放帧率，0为最大速度")
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--log-interval", type=int, default=1)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="模拟数据库写入延迟")
+    parser.add_argument("--baseline-dir", default=str(DEFAULT_BASELINE_DIR))
+    parser.add_argument("--update-baseline", action="store_true", help="将本次结果保存为基准")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="允许的相对性能退化")
+    parser.add_argument("--output", default=None, help="本次报告输出路径")
+    parser.add_argument("--profile", default=None)
+    parser.add_argument("--device", default=None)
+    parser.add_argument("--imgsz", type=int, default=None)
+    parser.add_argument("--human-weights", default=None)
+    parser.add_argument("--cascade-enable", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logger = logging.getLogger("replay_benchmark")
+
+    name = args.name or Path(args.source.rstrip("/")).stem
+    harness = ReplayHarness(
+        build_pipeline(args, logger),
+        args.source,
+        fps=args.fps,
+        max_frames=args.max_frames,
+        log_interval=args.log_interval,
+        db_latency_ms=args.db_latency_ms,
+    )
+    report = asyncio.run(harness.run(name=name))
+
+    if args.output:
+        Path(args.output).write_text(
+            json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+
+    baseline_path = Path(args.baseline_dir) / f"{name}.json"
+    if args.update_baseline or not baseline_path.exists():
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(
+            json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        _print_summary(report)
+        print(f"基准已保存: {baseline_path}")
+        return 0
+
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    comparison = compare_reports(baseline, report, args.tolerance)
+    _print_summary(report, comparison)
+    return 0 if comparison["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
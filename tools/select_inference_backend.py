@@ -0,0 +1,54 @@
+"""
+推理后端预选择
+
+在部署前为模型导出 ONNX / OpenVINO（可选INT8）并完成后端选择，结果写入缓存目录，
+服务启动时直接复用，避免首次启动时的导出与基准测试耗时。
+
+用法:
+    python tools/select_inference_backend.py models/yolo/yolov8s.pt --frames data/calib
+    python tools/select_inference_backend.py models/yolo/yolov8n-pose.pt --task pose \
+        --frames data/calib --int8
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.detection.inference_backend import (  # noqa: E402
+    BackendSettings,
+    available_backends,
+    load_frames,
+    select_backend,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="为YOLO模型选择最快的CPU推理后端")
+    parser.add_argument("models", nargs="+", help=".pt 模型路径")
+    parser.add_argument("--task", default="detect", choices=["detect", "pose"])
+    parser.add_argument("--frames", required=True, help="校准/验证帧目录")
+    parser.add_argument("--int8", action="store_true", help="启用INT8静态量化")
+    parser.add_argument("--imgsz", type=int, default=None)
+    parser.add_argument("--cache-dir", default=None)
+    args = parser.parse_args()
+
+    settings = BackendSettings.from_env()
+    settings.int8 = args.int8 or settings.int8
+    settings.calibration_dir = args.frames
+    if args.imgsz:
+        settings.imgsz = args.imgsz
+    if args.cache_dir:
+        settings.cache_dir = args.cache_dir
+
+    frames = load_frames(settings.calibration_dir, settings.max_frames)
+    print(f"可用后端: {available_backends()}，帧数: {len(frames)}")
+    for model in args.models:
+        selection = select_backend(model, args.task, settings, frames)
+        print(json.dumps(selection.to_dict(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+MultiObjectTracker 微基准
+
+模拟厨房场景中随机游走的人员（含漏检、遮挡），测量不同人数下每帧追踪耗时。
+
+用法:
+    python tools/tracker_benchmark.py
+    python tools/tracker_benchmark.py --people 5 10 20 40 --frames 300 --json out.json
+"""
+
+import argparse
+import json
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.tracker import ASSIGNMENT_STRATEGIES, MultiObjectTracker  # noqa: E402
+
+
+def generate_scene(
+    people: int, frames: int, seed: int = 0, miss_rate: float = 0.1
+) -> List[List[Dict]]:
+    """生成随机游走的人员检测序列"""
+    rng = random.Random(seed)
+    state = [
+        [
+            rng.uniform(0, 1800),
+            rng.uniform(0, 900),
+            rng.uniform(-12, 12),
+            rng.uniform(-8, 8),
+        ]
+        for _ in range(people)
+    ]
+    sequence = []
+    for _ in range(frames):
+        detections = []
+        for person in state:
+            person[0] = min(max(person[0] + person[2], 0), 1840)
+            person[1] = min(max(person[1] + person[3], 0), 880)
+            if rng.random() < miss_rate:
+                continue
+            x, y = int(person[0]), int(person[1])
+            detections.append(
+                {"bbox": [x, y, x + 80, y + 200], "confidence": rng.uniform(0.4, 0.95)}
+            )
+        rng.shuffle(detections)
+        sequence.append(detections)
+    return sequence
+
+
+def benchmark(people: int, frames: int, strategy: str) -> Dict:
+    sequence = generate_scene(people, frames)
+    tracker = MultiObjectTracker(match_strategy=strategy, force_revival=True)
+    timings_us = []
+    for detections in sequence:
+        t0 = time.perf_counter_ns()
+        tracker.update(detections)
+        timings_us.append((time.perf_counter_ns() - t0) / 1000.0)
+
+    timings_us.sort()
+    mean = sum(timings_us) / len(timings_us)
+    return {
+        "people": people,
+        "strategy": strategy,
+        "frames": frames,
+        "mean_us": round(mean, 1),
+        "p50_us": round(timings_us[len(timings_us) // 2], 1),
+        "p95_us": round(timings_us[int(len(timings_us) * 0.95) - 1], 1),
+        "max_us": round(timings_us[-1], 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="MultiObjectTracker 每帧耗时基准")
+    parser.add_argument("--people", type=int, nargs="+", default=[1, 5, 10, 20, 40, 80])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument(
+        "--strategies", nargs="+", default=sorted(ASSIGNMENT_STRATEGIES.keys())
+    )
+    parser.add_argument("--json", type=str, default=None, help="结果输出为JSON文件")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    results = []
+    print(
+        f"{'people':>6} {'strategy':>10} {'mean(us)':>10} {'p50(us)':>10} {'p95(us)':>10}"
+    )
+    for people in args.people:
+        for strategy in args.strategies:
+            r = benchmark(people, args.frames, strategy)
+            results.append(r)
+            print(
+                f"{r['people']:>6} {r['strategy']:>10} {r['mean_us']:>10} "
+                f"{r['p50_us']:>10} {r['p95_us']:>10}"
+            )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.json}")
+
+
+if __name__ == "__main__":
+    main()